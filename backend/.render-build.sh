@@ -1,6 +1,8 @@
 #!/bin/bash
 # Build script per Render
 
+set -e
+
 echo "🔧 Build Site Builder Backend"
 echo "=============================="
 
@@ -8,6 +10,22 @@ echo "=============================="
 echo "📦 Installazione dipendenze..."
 pip install -r requirements.txt
 
+# Indice binario del registry componenti
+echo "🗂️  Build components.idx..."
+python tools/build_component_index.py
+
+# Template Jinja2 v2 precompilati
+echo "🧩 Build components_v2/_compiled..."
+python tools/build_jinja_templates.py
+
+# Engine GSAP diviso in core + moduli per effetto
+echo "🎞️  Build components/gsap_modules..."
+python tools/build_gsap_modules.py
+
+# Font self-hosted (TTF non versionati): se il download fallisce la build fallisce
+echo "🔤 Build components/fonts..."
+python tools/vendor_fonts.py
+
 # Verifica installazione
 echo "✅ Verifica dipendenze..."
 python -c "import fastapi; print(f'FastAPI: {fastapi.__version__}')"
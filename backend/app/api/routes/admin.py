@@ -95,7 +95,7 @@ async def admin_login(data: AdminLoginRequest):
 
 
 @router.get("/stats")
-async def admin_stats(
+def admin_stats(
     admin=Depends(require_admin),
     db: Session = Depends(get_db)
 ):
@@ -158,6 +158,10 @@ async def admin_stats(
         ).scalar() or 0
         sub_statuses[st] = count
 
+    # Section render cache effectiveness (per process, since last restart)
+    from app.services.template_assembler import assembler as template_assembler
+    from app.services.jinja_assembler import jinja_assembler
+
     return {
         "users": {
             "total": total_users,
@@ -188,11 +192,15 @@ async def admin_stats(
             "active_subscriptions": active_subscriptions,
             "subscription_statuses": sub_statuses,
         },
+        "render_cache": {
+            "template": template_assembler.section_cache.stats(),
+            "jinja": jinja_assembler.section_cache.stats(),
+        },
     }
 
 
 @router.get("/users")
-async def admin_list_users(
+def admin_list_users(
     page: int = 1,
     per_page: int = 50,
     search: Optional[str] = None,
@@ -270,7 +278,7 @@ async def admin_list_users(
 
 
 @router.get("/users/{user_id}")
-async def admin_get_user(
+def admin_get_user(
     user_id: int,
     admin=Depends(require_admin),
     db: Session = Depends(get_db)
@@ -344,7 +352,7 @@ async def admin_get_user(
 
 
 @router.put("/users/{user_id}")
-async def admin_update_user(
+def admin_update_user(
     user_id: int,
     data: UserUpdateRequest,
     admin=Depends(require_admin),
@@ -379,7 +387,7 @@ async def admin_update_user(
 
 
 @router.post("/users/{user_id}/reset-password")
-async def admin_reset_password(
+def admin_reset_password(
     user_id: int,
     data: dict,
     admin=Depends(require_admin),
@@ -403,7 +411,7 @@ async def admin_reset_password(
 
 
 @router.delete("/users/{user_id}")
-async def admin_delete_user(
+def admin_delete_user(
     user_id: int,
     admin=Depends(require_admin),
     db: Session = Depends(get_db)
@@ -429,7 +437,7 @@ async def admin_delete_user(
 
 
 @router.get("/sites")
-async def admin_list_sites(
+def admin_list_sites(
     page: int = 1,
     per_page: int = 50,
     status: Optional[str] = None,
@@ -462,7 +470,7 @@ async def admin_list_sites(
                 "status": s.status,
                 "is_published": s.is_published,
                 "template": s.template,
-                "has_html": bool(s.html_content),
+                "has_html": s.has_html,
                 "owner_id": s.owner_id,
                 "owner_email": s.owner.email if s.owner else None,
                 "owner_name": s.owner.full_name if s.owner else None,
@@ -483,7 +491,7 @@ async def admin_list_sites(
 
 
 @router.get("/sites/{site_id}")
-async def admin_get_site(
+def admin_get_site(
     site_id: int,
     admin=Depends(require_admin),
     db: Session = Depends(get_db)
@@ -501,7 +509,7 @@ async def admin_get_site(
         "status": site.status,
         "is_published": site.is_published,
         "template": site.template,
-        "html_content": site.html_content,
+        "html_content": site.get_html(),
         "owner_id": site.owner_id,
         "owner_email": site.owner.email if site.owner else None,
         "owner_name": site.owner.full_name if site.owner else None,
@@ -516,7 +524,7 @@ async def admin_get_site(
 
 
 @router.delete("/sites/{site_id}")
-async def admin_delete_site(
+def admin_delete_site(
     site_id: int,
     admin=Depends(require_admin),
     db: Session = Depends(get_db)
@@ -537,7 +545,7 @@ async def admin_delete_site(
 # ============= SUBSCRIPTIONS =============
 
 @router.get("/subscriptions")
-async def admin_list_subscriptions(
+def admin_list_subscriptions(
     page: int = 1,
     per_page: int = 50,
     status: Optional[str] = None,
@@ -626,7 +634,7 @@ async def admin_list_subscriptions(
 
 
 @router.put("/subscriptions/{subscription_id}")
-async def admin_update_subscription(
+def admin_update_subscription(
     subscription_id: int,
     data: SubscriptionUpdateRequest,
     admin=Depends(require_admin),
@@ -716,7 +724,7 @@ async def admin_update_subscription(
 
 
 @router.delete("/subscriptions/{subscription_id}")
-async def admin_delete_subscription(
+def admin_delete_subscription(
     subscription_id: int,
     admin=Depends(require_admin),
     db: Session = Depends(get_db),
@@ -741,7 +749,7 @@ async def admin_delete_subscription(
 
 
 @router.get("/services-catalog")
-async def admin_list_services_catalog(
+def admin_list_services_catalog(
     admin=Depends(require_admin),
     db: Session = Depends(get_db),
 ):
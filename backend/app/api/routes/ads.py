@@ -48,7 +48,7 @@ router = APIRouter()
 # AUTH — Flexible dependency that works with both admin and user tokens
 # =============================================================================
 
-async def get_ads_user(
+def get_ads_user(
     authorization: str = Header(None),
     db: Session = Depends(get_db),
 ) -> User:
@@ -260,7 +260,7 @@ def _check_campaign_limit(user: User, db: Session):
 # =============================================================================
 
 @router.post("/clients")
-async def create_client(
+def create_client(
     data: AdClientCreate,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -273,7 +273,7 @@ async def create_client(
 
 
 @router.get("/clients")
-async def list_clients(
+def list_clients(
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
 ):
@@ -287,7 +287,7 @@ async def list_clients(
 
 
 @router.get("/clients/{client_id}")
-async def get_client(
+def get_client(
     client_id: int,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -297,7 +297,7 @@ async def get_client(
 
 
 @router.put("/clients/{client_id}")
-async def update_client(
+def update_client(
     client_id: int,
     data: AdClientUpdate,
     current_user: User = Depends(get_ads_user),
@@ -312,7 +312,7 @@ async def update_client(
 
 
 @router.delete("/clients/{client_id}")
-async def delete_client(
+def delete_client(
     client_id: int,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -350,7 +350,7 @@ def _serialize_client(c: AdClient) -> dict:
 # =============================================================================
 
 @router.post("/campaigns")
-async def create_campaign(
+def create_campaign(
     data: AdCampaignCreate,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -368,7 +368,7 @@ async def create_campaign(
 
 
 @router.get("/campaigns")
-async def list_campaigns(
+def list_campaigns(
     client_id: Optional[int] = None,
     status: Optional[str] = None,
     current_user: User = Depends(get_ads_user),
@@ -384,7 +384,7 @@ async def list_campaigns(
 
 
 @router.get("/campaigns/{campaign_id}")
-async def get_campaign(
+def get_campaign(
     campaign_id: int,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -399,7 +399,7 @@ async def get_campaign(
 
 
 @router.put("/campaigns/{campaign_id}")
-async def update_campaign(
+def update_campaign(
     campaign_id: int,
     data: AdCampaignUpdate,
     current_user: User = Depends(get_ads_user),
@@ -419,7 +419,7 @@ async def update_campaign(
 
 
 @router.delete("/campaigns/{campaign_id}")
-async def delete_campaign(
+def delete_campaign(
     campaign_id: int,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -463,7 +463,7 @@ def _serialize_campaign(c: AdCampaign) -> dict:
 # =============================================================================
 
 @router.post("/leads")
-async def create_lead(
+def create_lead(
     data: AdLeadCreate,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -483,7 +483,7 @@ async def create_lead(
 
 
 @router.get("/leads")
-async def list_leads(
+def list_leads(
     campaign_id: Optional[int] = None,
     status: Optional[str] = None,
     current_user: User = Depends(get_ads_user),
@@ -501,7 +501,7 @@ async def list_leads(
 
 
 @router.put("/leads/{lead_id}")
-async def update_lead(
+def update_lead(
     lead_id: int,
     data: AdLeadUpdate,
     current_user: User = Depends(get_ads_user),
@@ -521,7 +521,7 @@ async def update_lead(
 
 
 @router.delete("/leads/{lead_id}")
-async def delete_lead(
+def delete_lead(
     lead_id: int,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -558,7 +558,7 @@ def _serialize_lead(l: AdLead) -> dict:
 # =============================================================================
 
 @router.post("/metrics")
-async def create_metric(
+def create_metric(
     data: AdMetricCreate,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -606,7 +606,7 @@ async def create_metric(
 
 
 @router.get("/metrics")
-async def list_metrics(
+def list_metrics(
     campaign_id: Optional[int] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
@@ -647,7 +647,7 @@ def _serialize_metric(m: AdMetric) -> dict:
 # =============================================================================
 
 @router.get("/strategies")
-async def list_strategies(
+def list_strategies(
     client_id: Optional[int] = None,
     status: Optional[str] = None,
     current_user: User = Depends(get_ads_user),
@@ -663,7 +663,7 @@ async def list_strategies(
 
 
 @router.get("/strategies/{strategy_id}")
-async def get_strategy(
+def get_strategy(
     strategy_id: int,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -707,7 +707,7 @@ def _serialize_strategy(s: AdStrategy) -> dict:
 
 @router.get("/stats")
 @router.get("/stats/dashboard")
-async def ads_dashboard_stats(
+def ads_dashboard_stats(
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
 ):
@@ -757,7 +757,7 @@ async def ads_dashboard_stats(
 
 
 @router.get("/stats/performance")
-async def campaign_performance(
+def campaign_performance(
     days: int = Query(30, ge=1, le=365),
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -801,7 +801,7 @@ async def campaign_performance(
 
 
 @router.get("/stats/leads-by-status")
-async def leads_by_status(
+def leads_by_status(
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
 ):
@@ -821,7 +821,7 @@ async def leads_by_status(
 # =============================================================================
 
 @router.post("/investigate")
-async def investigate_website(
+def investigate_website(
     data: InvestigateRequest,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -1021,7 +1021,7 @@ def _calculate_confidence(profile: dict) -> int:
 # =============================================================================
 
 @router.post("/research")
-async def market_research(
+def market_research(
     data: ResearchRequest,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -1153,7 +1153,7 @@ def _analyze_trends(business_type: str, city: str) -> dict:
 # =============================================================================
 
 @router.post("/strategy")
-async def create_strategy(
+def create_strategy(
     data: StrategyRequest,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -1257,7 +1257,7 @@ async def create_strategy(
 # =============================================================================
 
 @router.post("/campaign/create")
-async def create_campaign_from_strategy(
+def create_campaign_from_strategy(
     data: CampaignCreateRequest,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -1318,7 +1318,7 @@ async def create_campaign_from_strategy(
 
 
 @router.get("/campaign/{campaign_id}/metrics")
-async def get_campaign_metrics_summary(
+def get_campaign_metrics_summary(
     campaign_id: int,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -1355,7 +1355,7 @@ async def get_campaign_metrics_summary(
 
 
 @router.post("/campaign/{campaign_id}/optimize")
-async def optimize_campaign(
+def optimize_campaign(
     campaign_id: int,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -1415,7 +1415,7 @@ class ModuleRunRequest(BaseModel):
 
 
 @router.post("/modules/run")
-async def run_module(
+def run_module(
     data: ModuleRunRequest,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -1450,7 +1450,7 @@ async def run_module(
 # =============================================================================
 
 @router.post("/pipeline/run")
-async def run_full_pipeline(
+def run_full_pipeline(
     data: PipelineRequest,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -1614,7 +1614,7 @@ async def wizard_config():
 
 
 @router.post("/wizard/start")
-async def wizard_start(
+def wizard_start(
     data: WizardStartRequest,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -1646,7 +1646,7 @@ async def wizard_start(
 
 
 @router.post("/wizard/step/{step}")
-async def wizard_step(
+def wizard_step(
     step: str,
     data: WizardStepRequest,
     current_user: User = Depends(get_ads_user),
@@ -1686,7 +1686,7 @@ async def wizard_step(
 
 
 @router.post("/wizard/complete")
-async def wizard_complete(
+def wizard_complete(
     data: dict,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -1715,7 +1715,7 @@ async def wizard_complete(
 # =============================================================================
 
 @router.get("/supervision")
-async def supervision_dashboard(
+def supervision_dashboard(
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
 ):
@@ -1804,7 +1804,7 @@ async def supervision_dashboard(
 
 
 @router.post("/supervision/{item_id}/approve")
-async def supervision_approve(
+def supervision_approve(
     item_id: str,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -1839,7 +1839,7 @@ async def supervision_approve(
 
 
 @router.post("/supervision/{item_id}/reject")
-async def supervision_reject(
+def supervision_reject(
     item_id: str,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -1869,7 +1869,7 @@ async def supervision_reject(
 
 
 @router.get("/supervision/pending")
-async def list_pending_decisions(
+def list_pending_decisions(
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
 ):
@@ -1899,7 +1899,7 @@ async def list_pending_decisions(
 
 
 @router.post("/supervision/strategies/{strategy_id}")
-async def supervise_strategy(
+def supervise_strategy(
     strategy_id: int,
     data: SupervisionActionRequest,
     current_user: User = Depends(get_ads_user),
@@ -1929,7 +1929,7 @@ async def supervise_strategy(
 
 
 @router.post("/supervision/activities/{activity_id}")
-async def supervise_activity(
+def supervise_activity(
     activity_id: int,
     data: SupervisionActionRequest,
     current_user: User = Depends(get_ads_user),
@@ -1961,7 +1961,7 @@ async def supervise_activity(
 # =============================================================================
 
 @router.get("/activities")
-async def list_ai_activities(
+def list_ai_activities(
     module: Optional[str] = None,
     severity: Optional[str] = None,
     limit: int = Query(50, ge=1, le=200),
@@ -1980,7 +1980,7 @@ async def list_ai_activities(
 
 
 @router.get("/traffic-light")
-async def traffic_light_status(
+def traffic_light_status(
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
 ):
@@ -2090,7 +2090,7 @@ def _get_knowledge_base() -> dict:
 
 
 @router.get("/knowledge")
-async def knowledge_all(
+def knowledge_all(
     current_user: User = Depends(get_ads_user),
 ):
     """Combined knowledge base endpoint — returns articles, benchmarks, problems, verticals."""
@@ -2161,7 +2161,7 @@ async def knowledge_all(
 
 
 @router.get("/knowledge/benchmarks")
-async def knowledge_benchmarks(
+def knowledge_benchmarks(
     sector: Optional[str] = None,
     current_user: User = Depends(get_ads_user),
 ):
@@ -2173,7 +2173,7 @@ async def knowledge_benchmarks(
 
 
 @router.get("/knowledge/sectors")
-async def knowledge_sectors(
+def knowledge_sectors(
     current_user: User = Depends(get_ads_user),
 ):
     kb = _get_knowledge_base()
@@ -2182,7 +2182,7 @@ async def knowledge_sectors(
 
 
 @router.get("/knowledge/templates")
-async def knowledge_templates(
+def knowledge_templates(
     sector: Optional[str] = None,
     current_user: User = Depends(get_ads_user),
 ):
@@ -2194,7 +2194,7 @@ async def knowledge_templates(
 
 
 @router.get("/knowledge/problems")
-async def knowledge_problems(
+def knowledge_problems(
     sector: Optional[str] = None,
     search: Optional[str] = None,
     current_user: User = Depends(get_ads_user),
@@ -2210,7 +2210,7 @@ async def knowledge_problems(
 
 
 @router.get("/knowledge/articles")
-async def knowledge_articles(
+def knowledge_articles(
     category: Optional[str] = None,
     search: Optional[str] = None,
     current_user: User = Depends(get_ads_user),
@@ -2233,7 +2233,7 @@ async def knowledge_articles(
 # =============================================================================
 
 @router.get("/admin/overview")
-async def admin_ads_overview(
+def admin_ads_overview(
     admin=Depends(require_admin),
     db: Session = Depends(get_db),
 ):
@@ -2269,7 +2269,7 @@ async def admin_ads_overview(
 
 
 @router.get("/admin/campaigns")
-async def admin_list_campaigns(
+def admin_list_campaigns(
     page: int = 1,
     per_page: int = 50,
     status: Optional[str] = None,
@@ -2304,7 +2304,7 @@ async def admin_list_campaigns(
 
 
 @router.get("/admin/clients")
-async def admin_list_clients(
+def admin_list_clients(
     page: int = 1,
     per_page: int = 50,
     admin=Depends(require_admin),
@@ -2333,7 +2333,7 @@ async def admin_list_clients(
 
 
 @router.get("/admin/activities")
-async def admin_list_activities(
+def admin_list_activities(
     module: Optional[str] = None,
     severity: Optional[str] = None,
     limit: int = Query(100, ge=1, le=500),
@@ -2453,7 +2453,7 @@ def _serialize_config(config: AdPlatformConfig) -> dict:
 
 
 @router.get("/config")
-async def get_platform_config(
+def get_platform_config(
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
 ):
@@ -2463,7 +2463,7 @@ async def get_platform_config(
 
 
 @router.get("/config/status")
-async def get_config_status(
+def get_config_status(
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
 ):
@@ -2488,7 +2488,7 @@ async def get_config_status(
 
 
 @router.put("/config/{platform}")
-async def update_platform_config(
+def update_platform_config(
     platform: str,
     data: PlatformConfigUpdate,
     current_user: User = Depends(get_ads_user),
@@ -2539,7 +2539,7 @@ async def update_platform_config(
 
 
 @router.post("/config/{platform}/test")
-async def test_platform_connection(
+def test_platform_connection(
     platform: str,
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
@@ -3011,7 +3011,7 @@ Inizia sempre con "@Image1 as first frame," se il video parte da un'immagine."""
 
 
 @router.get("/creatives")
-async def list_creatives(
+def list_creatives(
     current_user: User = Depends(get_ads_user),
     db: Session = Depends(get_db),
 ):
@@ -4,6 +4,7 @@ import logging
 import secrets
 import base64
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr, field_validator
@@ -79,7 +80,7 @@ FRONTEND_URL = settings.FRONTEND_URL
 
 @router.post("/register")
 @limiter.limit("5/day")
-async def register(request: Request, data: RegisterRequest, db: Session = Depends(get_db)):
+def register(request: Request, data: RegisterRequest, db: Session = Depends(get_db)):
     """Registra un nuovo utente. Rate limit: 5 registrazioni/giorno per IP."""
     # Verifica se esiste già
     existing = db.query(User).filter(User.email.ilike(data.email)).first()
@@ -124,7 +125,7 @@ async def register(request: Request, data: RegisterRequest, db: Session = Depend
 
 @router.post("/login")
 @limiter.limit("10/hour")
-async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Login utente. Rate limit: 10 tentativi/ora per IP."""
     user = db.query(User).filter(User.email.ilike(form_data.username)).first()
     if not user or not user.hashed_password or not verify_password(form_data.password, user.hashed_password):
@@ -155,6 +156,48 @@ async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends
     }
 
 
+def _get_or_create_oauth_user(db: Session, user_info: dict, provider: str) -> User:
+    """Utente OAuth: per oauth_id, poi per email (collega l'account), altrimenti nuovo.
+
+    Query sincrone, eseguite nel threadpool dalle route async.
+    """
+    user = db.query(User).filter(User.oauth_id == user_info["oauth_id"]).first()
+
+    if not user:
+        # Cerca per email
+        user = db.query(User).filter(User.email.ilike(user_info["email"])).first()
+
+        if user:
+            # Collega OAuth all'account esistente
+            user.oauth_provider = provider
+            user.oauth_id = user_info["oauth_id"]
+            if not user.avatar_url:
+                user.avatar_url = user_info.get("avatar_url")
+        else:
+            # Crea nuovo utente
+            user = User(
+                email=user_info["email"],
+                full_name=user_info["full_name"],
+                avatar_url=user_info.get("avatar_url"),
+                oauth_provider=provider,
+                oauth_id=user_info["oauth_id"],
+                hashed_password=None,  # No password per OAuth
+                email_verified=True,  # Google/Microsoft verificano gia l'email
+            )
+            db.add(user)
+
+        db.commit()
+        db.refresh(user)
+
+    # Admin/Premium override
+    if user.email.lower() in settings.admin_emails_list and not user.is_premium:
+        user.is_premium = True
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+    return user
+
+
 @router.post("/oauth", response_model=TokenResponse)
 async def oauth_login(data: OAuthLoginRequest, db: Session = Depends(get_db)):
     """
@@ -177,41 +220,7 @@ async def oauth_login(data: OAuthLoginRequest, db: Session = Depends(get_db)):
         if not user_info.get("verified_email"):
             raise HTTPException(status_code=400, detail="Email non verificata")
         
-        # Cerca utente esistente
-        user = db.query(User).filter(User.oauth_id == user_info["oauth_id"]).first()
-        
-        if not user:
-            # Cerca per email
-            user = db.query(User).filter(User.email.ilike(user_info["email"])).first()
-            
-            if user:
-                # Collega OAuth all'account esistente
-                user.oauth_provider = "google"
-                user.oauth_id = user_info["oauth_id"]
-                if not user.avatar_url:
-                    user.avatar_url = user_info.get("avatar_url")
-            else:
-                # Crea nuovo utente
-                user = User(
-                    email=user_info["email"],
-                    full_name=user_info["full_name"],
-                    avatar_url=user_info.get("avatar_url"),
-                    oauth_provider="google",
-                    oauth_id=user_info["oauth_id"],
-                    hashed_password=None,  # No password per OAuth
-                    email_verified=True,  # Google verifica gia l'email
-                )
-                db.add(user)
-
-            db.commit()
-            db.refresh(user)
-        
-        # Admin/Premium override
-        if user.email.lower() in settings.admin_emails_list and not user.is_premium:
-            user.is_premium = True
-            db.add(user)
-            db.commit()
-            db.refresh(user)
+        user = await run_in_threadpool(_get_or_create_oauth_user, db, user_info, "google")
 
         # Genera JWT
         access_token = create_access_token(data={"sub": str(user.id), "email": user.email})
@@ -340,38 +349,7 @@ async def google_oauth_callback(
         if not user_info:
             return RedirectResponse(url=f"{frontend_auth}?error=invalid_token")
 
-        # Cerca o crea utente
-        user = db.query(User).filter(User.oauth_id == user_info["oauth_id"]).first()
-
-        if not user:
-            user = db.query(User).filter(User.email.ilike(user_info["email"])).first()
-
-            if user:
-                user.oauth_provider = "google"
-                user.oauth_id = user_info["oauth_id"]
-                if not user.avatar_url:
-                    user.avatar_url = user_info.get("avatar_url")
-            else:
-                user = User(
-                    email=user_info["email"],
-                    full_name=user_info["full_name"],
-                    avatar_url=user_info.get("avatar_url"),
-                    oauth_provider="google",
-                    oauth_id=user_info["oauth_id"],
-                    hashed_password=None,
-                    email_verified=True,  # Google verifica gia l'email
-                )
-                db.add(user)
-
-            db.commit()
-            db.refresh(user)
-
-        # Admin override
-        if user.email.lower() in settings.admin_emails_list and not user.is_premium:
-            user.is_premium = True
-            db.add(user)
-            db.commit()
-            db.refresh(user)
+        user = await run_in_threadpool(_get_or_create_oauth_user, db, user_info, "google")
 
         # Genera JWT
         jwt_token = create_access_token(data={"sub": str(user.id), "email": user.email})
@@ -475,35 +453,7 @@ async def microsoft_oauth_callback(
         if not user_info or not user_info.get("email"):
             return RedirectResponse(url=f"{frontend_auth}?error=invalid_token")
 
-        # Cerca o crea utente
-        user = db.query(User).filter(User.oauth_id == user_info["oauth_id"]).first()
-
-        if not user:
-            user = db.query(User).filter(User.email.ilike(user_info["email"])).first()
-
-            if user:
-                user.oauth_provider = "microsoft"
-                user.oauth_id = user_info["oauth_id"]
-            else:
-                user = User(
-                    email=user_info["email"],
-                    full_name=user_info["full_name"],
-                    oauth_provider="microsoft",
-                    oauth_id=user_info["oauth_id"],
-                    hashed_password=None,
-                    email_verified=True,  # Microsoft verifica gia l'email
-                )
-                db.add(user)
-
-            db.commit()
-            db.refresh(user)
-
-        # Admin override
-        if user.email.lower() in settings.admin_emails_list and not user.is_premium:
-            user.is_premium = True
-            db.add(user)
-            db.commit()
-            db.refresh(user)
+        user = await run_in_threadpool(_get_or_create_oauth_user, db, user_info, "microsoft")
 
         jwt_token = create_access_token(data={"sub": str(user.id), "email": user.email})
 
@@ -525,7 +475,7 @@ async def microsoft_oauth_callback(
 
 
 @router.get("/me")
-async def me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """Ottiene info utente corrente con informazioni generazioni"""
     payload = decode_token(token)
     if not payload:
@@ -603,7 +553,7 @@ async def get_quota(current_user: User = Depends(get_current_active_user)):
 
 @router.post("/forgot-password")
 @limiter.limit("3/hour")
-async def forgot_password(request: Request, data: ForgotPasswordRequest, db: Session = Depends(get_db)):
+def forgot_password(request: Request, data: ForgotPasswordRequest, db: Session = Depends(get_db)):
     """Richiedi reset password. Rate limit: 3/ora per IP. Risponde sempre con successo."""
     from datetime import timedelta
 
@@ -631,7 +581,7 @@ async def forgot_password(request: Request, data: ForgotPasswordRequest, db: Ses
 
 
 @router.post("/reset-password")
-async def reset_password(data: ResetPasswordRequest, db: Session = Depends(get_db)):
+def reset_password(data: ResetPasswordRequest, db: Session = Depends(get_db)):
     """Reimposta la password usando il token di reset."""
     if not data.token or not data.new_password:
         raise HTTPException(status_code=400, detail="Token e nuova password sono obbligatori")
@@ -661,7 +611,7 @@ async def reset_password(data: ResetPasswordRequest, db: Session = Depends(get_d
 
 @router.post("/send-verification")
 @limiter.limit("3/hour")
-async def send_verification(request: Request, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+def send_verification(request: Request, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
     """Invia email di verifica. Rate limit: 3/ora per IP."""
     if current_user.email_verified:
         return {"message": "Email gia' verificata"}
@@ -689,7 +639,7 @@ async def send_verification(request: Request, current_user: User = Depends(get_c
 
 
 @router.get("/verify-email")
-async def verify_email(token: str, db: Session = Depends(get_db)):
+def verify_email(token: str, db: Session = Depends(get_db)):
     """Verifica email tramite token. Il token scade dopo 24 ore."""
     if not token:
         raise HTTPException(status_code=400, detail="Token mancante")
@@ -734,7 +684,7 @@ async def debug_oauth(current_user: User = Depends(get_current_active_user)):
 
 
 @router.post("/set-password")
-async def set_password(data: RegisterRequest, db: Session = Depends(get_db)):
+def set_password(data: RegisterRequest, db: Session = Depends(get_db)):
     """Imposta password per un account OAuth (senza password)"""
     user = db.query(User).filter(User.email.ilike(data.email)).first()
     if not user:
@@ -761,7 +711,7 @@ async def set_password(data: RegisterRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/migrate-db")
-async def migrate_db(current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+def migrate_db(current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
     """
     Endpoint admin per migrare il database.
     Aggiunge colonne mancanti alla tabella users.
@@ -823,6 +773,7 @@ async def migrate_db(current_user: User = Depends(get_current_active_user), db:
             ("published_at", "TIMESTAMP"),
             ("thumbnail", "VARCHAR"),
             ("html_content", "TEXT"),
+            ("html_ref", "VARCHAR"),
             ("template", "VARCHAR DEFAULT 'default'"),
             ("config", "TEXT"),
             ("custom_css", "TEXT"),
@@ -833,7 +784,13 @@ async def migrate_db(current_user: User = Depends(get_current_active_user), db:
             ("generation_message", "VARCHAR DEFAULT ''"),
         ]
 
-        tables = [("users", users_columns), ("sites", sites_columns)]
+        # Migrazioni per tabella site_versions (snapshot + delta)
+        site_versions_columns = [
+            ("delta", "BYTEA"),
+            ("base_version", "INTEGER"),
+        ]
+
+        tables = [("users", users_columns), ("sites", sites_columns), ("site_versions", site_versions_columns)]
 
         for table_name, columns_to_add in tables:
             try:
@@ -860,7 +817,9 @@ async def migrate_db(current_user: User = Depends(get_current_active_user), db:
                 CREATE TABLE IF NOT EXISTS site_versions (
                     id SERIAL PRIMARY KEY,
                     site_id INTEGER NOT NULL REFERENCES sites(id),
-                    html_content TEXT NOT NULL,
+                    html_content TEXT,
+                    delta BYTEA,
+                    base_version INTEGER,
                     version_number INTEGER NOT NULL,
                     change_description VARCHAR DEFAULT '',
                     created_at TIMESTAMPTZ DEFAULT NOW()
@@ -873,6 +832,14 @@ async def migrate_db(current_user: User = Depends(get_current_active_user), db:
             db.rollback()
             errors.append(f"site_versions: {str(e)}")
 
+        # Fix: html_content nullable (le versioni delta non hanno l'HTML completo)
+        try:
+            db.execute(text("ALTER TABLE site_versions ALTER COLUMN html_content DROP NOT NULL"))
+            db.commit()
+            added.append("site_versions.html_content: DROP NOT NULL")
+        except Exception:
+            db.rollback()
+
         # Crea tabella global_counters per spending cap
         try:
             db.execute(text("""
@@ -13,7 +13,7 @@ router = APIRouter()
 
 
 @router.get("/site/{site_id}")
-async def list_components(
+def list_components(
     site_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
@@ -27,7 +27,7 @@ async def list_components(
 
 
 @router.post("/")
-async def create_component(
+def create_component(
     site_id: int,
     name: str,
     type: ComponentType,
@@ -54,7 +54,7 @@ async def create_component(
 
 
 @router.put("/{component_id}")
-async def update_component(
+def update_component(
     component_id: int,
     content: dict = None,
     styles: dict = None,
@@ -89,7 +89,7 @@ async def update_component(
 
 
 @router.delete("/{component_id}")
-async def delete_component(
+def delete_component(
     component_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
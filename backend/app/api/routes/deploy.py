@@ -1,5 +1,7 @@
 """Routes per deploy siti (VPS / Vercel)"""
 
+import asyncio
+import base64
 import hashlib
 import logging
 import re
@@ -7,14 +9,19 @@ import time
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
 import httpx
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.config import settings
-from app.core.security import get_current_active_user
+from app.core.security import get_current_active_user_async
 from app.models.site import Site, SiteStatus
 from app.models.user import User
+from app.services.asset_bundles import publish_bundles
+from app.services.blob_store import load_site_html
+from app.services.deploy_optimizer import DeployArtifacts, optimize_for_deploy
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +38,16 @@ RESERVED_SLUGS = {
 _SLUG_RE = re.compile(r"^[a-z0-9][a-z0-9-]{1,61}[a-z0-9]$")
 
 
+async def _owned_site(db: AsyncSession, site_id: int, user_id: int, *options) -> Site:
+    """Il sito se appartiene all'utente, altrimenti 404."""
+    site = (await db.execute(
+        select(Site).options(*options).where(Site.id == site_id, Site.owner_id == user_id)
+    )).scalar_one_or_none()
+    if not site:
+        raise HTTPException(status_code=404, detail="Sito non trovato")
+    return site
+
+
 def _validate_slug(slug: str) -> None:
     """Validate a site slug for use as a subdomain."""
     if ".." in slug or "/" in slug or "\\" in slug:
@@ -48,8 +65,8 @@ def _validate_slug(slug: str) -> None:
 # VPS deploy helpers
 # ---------------------------------------------------------------------------
 
-async def _deploy_to_vps(site: Site) -> dict:
-    """Deploy HTML to VPS receiver service."""
+async def _deploy_to_vps(site: Site, artifacts: DeployArtifacts) -> dict:
+    """Deploy HTML (minified, with its .gz/.br siblings) to VPS receiver service."""
     if not settings.VPS_DEPLOY_URL:
         raise HTTPException(
             status_code=503,
@@ -67,7 +84,14 @@ async def _deploy_to_vps(site: Site) -> dict:
         async with httpx.AsyncClient(timeout=30.0) as client:
             resp = await client.post(
                 f"{settings.VPS_DEPLOY_URL}/deploy",
-                json={"slug": site.slug, "html": site.html_content},
+                json={
+                    "slug": site.slug,
+                    "html": artifacts.html,
+                    "compressed": {
+                        ext: base64.b64encode(data).decode("ascii")
+                        for ext, data in artifacts.compressed.items()
+                    },
+                },
                 headers={"X-Deploy-Secret": settings.VPS_DEPLOY_SECRET},
             )
             resp.raise_for_status()
@@ -127,7 +151,7 @@ def _team_params() -> dict:
     return {}
 
 
-async def _deploy_to_vercel(site: Site) -> dict:
+async def _deploy_to_vercel(site: Site, html: str) -> dict:
     """Deploy HTML to Vercel (existing logic extracted into helper)."""
     if not settings.VERCEL_TOKEN:
         raise HTTPException(
@@ -135,7 +159,7 @@ async def _deploy_to_vercel(site: Site) -> dict:
             detail="Servizio deploy non configurato. Contatta l'amministratore.",
         )
 
-    html_bytes = site.html_content.encode("utf-8")
+    html_bytes = html.encode("utf-8")
     html_sha1 = hashlib.sha1(html_bytes).hexdigest()
     html_size = len(html_bytes)
 
@@ -246,19 +270,13 @@ async def _deploy_to_vercel(site: Site) -> dict:
 @router.post("/{site_id}")
 async def deploy_site(
     site_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async),
 ):
     """Deploy del sito (VPS o Vercel in base a DEPLOY_TARGET)."""
 
     # --- Recupera il sito ---
-    site = (
-        db.query(Site)
-        .filter(Site.id == site_id, Site.owner_id == current_user.id)
-        .first()
-    )
-    if not site:
-        raise HTTPException(status_code=404, detail="Sito non trovato")
+    site = await _owned_site(db, site_id, current_user.id, undefer(Site.config))
 
     # --- Controlla piano utente ---
     if not current_user.can_publish:
@@ -271,8 +289,9 @@ async def deploy_site(
             },
         )
 
-    # --- Controlla che ci sia HTML da deployare ---
-    if not site.html_content:
+    # --- Controlla che ci sia HTML da deployare (letto una volta sola) ---
+    source_html = await load_site_html(db, site)
+    if not source_html:
         raise HTTPException(
             status_code=400,
             detail="Il sito non ha contenuto HTML. Genera il sito prima di pubblicarlo.",
@@ -284,15 +303,25 @@ async def deploy_site(
             detail="Il sito deve essere nello stato 'pronto' per essere pubblicato.",
         )
 
+    # --- Bundle condivisi (CSS core, Lenis, GSAP) linkati per URL, o inline per il sito ---
+    html = await publish_bundles(
+        source_html, inline=bool((site.config or {}).get("inline_assets")),
+    )
+
+    # --- HTML/CSS/JS minificati + .gz/.br precompressi (brotli 11: fuori dall'event loop) ---
+    artifacts = await asyncio.to_thread(
+        optimize_for_deploy, html, len(source_html.encode("utf-8")),
+    )
+
     # --- Dispatch in base al target ---
     if settings.DEPLOY_TARGET == "vps":
-        result = await _deploy_to_vps(site)
+        result = await _deploy_to_vps(site, artifacts)
         site.domain = result["url"]
         site.vercel_project_id = None
         deployment_id = result["deployment_id"]
         project_id = None
     else:
-        result = await _deploy_to_vercel(site)
+        result = await _deploy_to_vercel(site, artifacts.html)
         site.domain = result["url"]
         site.vercel_project_id = result.get("project_id", "")
         deployment_id = result["deployment_id"]
@@ -303,8 +332,8 @@ async def deploy_site(
     site.is_published = True
     site.published_at = datetime.now(timezone.utc)
 
-    db.commit()
-    db.refresh(site)
+    await db.commit()
+    await db.refresh(site)
 
     logger.info(
         "Site %s deployed (%s): %s (deployment_id=%s)",
@@ -321,23 +350,18 @@ async def deploy_site(
         "url": site.domain,
         "project_id": project_id,
         "status": "deployed",
+        "optimization": artifacts.report,
     }
 
 
 @router.delete("/{site_id}")
 async def unpublish_site(
     site_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async),
 ):
     """Rimuovi la pubblicazione di un sito."""
-    site = (
-        db.query(Site)
-        .filter(Site.id == site_id, Site.owner_id == current_user.id)
-        .first()
-    )
-    if not site:
-        raise HTTPException(status_code=404, detail="Sito non trovato")
+    site = await _owned_site(db, site_id, current_user.id)
 
     if settings.DEPLOY_TARGET == "vps" and site.slug:
         await _unpublish_from_vps(site.slug)
@@ -347,7 +371,7 @@ async def unpublish_site(
     site.domain = None
     site.published_at = None
 
-    db.commit()
+    await db.commit()
 
     logger.info("Site %s unpublished by user %s", site_id, current_user.id)
 
@@ -357,17 +381,11 @@ async def unpublish_site(
 @router.get("/{site_id}/status")
 async def deploy_status(
     site_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async),
 ):
     """Stato del deploy per un sito."""
-    site = (
-        db.query(Site)
-        .filter(Site.id == site_id, Site.owner_id == current_user.id)
-        .first()
-    )
-    if not site:
-        raise HTTPException(status_code=404, detail="Sito non trovato")
+    site = await _owned_site(db, site_id, current_user.id)
 
     result = {
         "site_id": site_id,
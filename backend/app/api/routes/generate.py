@@ -7,22 +7,26 @@ il timeout di 30s del proxy Render free tier.
 
 import asyncio
 from fastapi import APIRouter, HTTPException, Depends, status, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only, undefer
 
 from app.services.swarm_generator import swarm
 from app.services.databinding_generator import databinding_generator
 from app.services.ai_service import ai_service  # fallback
-from app.core.database import get_db, SessionLocal
-from app.core.security import get_current_active_user
+from app.core.database import async_session, get_async_db, get_db
+from app.core.security import get_current_active_user, get_current_active_user_async
 from app.core.config import settings
 from app.models.user import User
 from app.models.site import Site
-from app.models.site_version import SiteVersion
 from app.models.global_counter import GlobalCounter
+from app.services.blob_store import load_site_html, store_site_html
 from app.services.sanitizer import sanitize_output
+from app.services.site_versions import save_version
 from datetime import date
 import logging
 import json
@@ -64,6 +68,7 @@ class PhotoChoiceItem(BaseModel):
     action: str  # "stock" | "upload"
     photo_url: Optional[str] = None  # URL of uploaded photo (for action="upload")
     photo_urls: Optional[List[str]] = None  # Multiple URLs (for gallery/team sections)
+    photo_manifests: Optional[List[Dict[str, Any]]] = None  # Variant manifests from /media/upload (srcset/<picture>)
 
 
 class PhotoChoiceRequest(BaseModel):
@@ -132,42 +137,34 @@ def _check_and_increment_spending_cap(db: Session):
     return result.rowcount > 0
 
 
-# ============ HELPER: Save Version ============
-
-def _save_version(db: Session, site: Site, html_content: str, description: str):
-    """Salva una nuova versione del sito. Mantiene max 10 versioni."""
-    # Trova il numero di versione più alto
-    latest = (
-        db.query(SiteVersion)
-        .filter(SiteVersion.site_id == site.id)
-        .order_by(SiteVersion.version_number.desc())
-        .first()
-    )
-    next_version = (latest.version_number + 1) if latest else 1
-
-    version = SiteVersion(
-        site_id=site.id,
-        html_content=html_content,
-        version_number=next_version,
-        change_description=description,
-    )
-    db.add(version)
-
-    # Elimina versioni vecchie (mantieni max 10)
-    versions = (
-        db.query(SiteVersion)
-        .filter(SiteVersion.site_id == site.id)
-        .order_by(SiteVersion.version_number.desc())
-        .offset(10)
-        .all()
-    )
-    for old_version in versions:
-        db.delete(old_version)
-
-    db.flush()
+# ============ BACKGROUND GENERATION TASK ============
 
+async def _save_progress(
+    previous: Optional["asyncio.Task"],
+    site_id: int,
+    step: int,
+    message: str,
+    preview_data: Optional[dict],
+) -> None:
+    """Scrive un passo di avanzamento (dopo il precedente, con una sessione propria)."""
+    if previous is not None:
+        await asyncio.gather(previous, return_exceptions=True)
+    values = {"generation_step": step, "generation_message": message, "status": "generating"}
+    if preview_data:
+        values["config"] = {"_generation_preview": preview_data}
+    db = async_session()
+    try:
+        await db.execute(update(Site).where(Site.id == site_id).values(**values))
+        await db.commit()
+    except Exception as e:
+        logger.warning(f"[BG] on_progress commit failed (step={step}): {e}")
+        try:
+            await db.rollback()
+        except Exception:
+            pass
+    finally:
+        await db.close()
 
-# ============ BACKGROUND GENERATION TASK ============
 
 async def _run_generation_background(
     request: GenerateRequest,
@@ -177,33 +174,39 @@ async def _run_generation_background(
     """
     Esegue la generazione in background con una sessione DB propria.
     Necessario per evitare il timeout di 30s del proxy Render free tier.
+    Le query sono async: la generazione non blocca l'event loop.
     """
-    db = SessionLocal()
+    db = async_session()
+    loop = asyncio.get_running_loop()
+    progress: Dict[str, Optional[asyncio.Task]] = {"task": None}
+
+    async def wait_progress():
+        if progress["task"] is not None:
+            await asyncio.gather(progress["task"], return_exceptions=True)
+
     try:
         site = None
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             logger.error(f"[BG] User {user_id} non trovato")
             return
 
         if site_id:
-            site = db.query(Site).filter(Site.id == site_id, Site.owner_id == user_id).first()
+            site = (await db.execute(
+                select(Site).options(undefer(Site.config)).where(Site.id == site_id, Site.owner_id == user_id)
+            )).scalar_one_or_none()
+        # Niente transazione aperta (e connessione occupata) durante la generazione
+        await db.commit()
+
+        def queue_progress(step: int, message: str, preview_data: Optional[dict]):
+            progress["task"] = asyncio.create_task(
+                _save_progress(progress["task"], site_id, step, message, preview_data)
+            )
 
         def on_progress(step: int, message: str, preview_data: dict = None):
+            # Callback sincrono del generatore: scrittura in un task, nell'ordine dei passi
             if site:
-                try:
-                    site.generation_step = step
-                    site.generation_message = message
-                    site.status = "generating"
-                    if preview_data:
-                        site.config = {"_generation_preview": preview_data}
-                    db.commit()
-                except Exception as e:
-                    logger.warning(f"[BG] on_progress commit failed (step={step}): {e}")
-                    try:
-                        db.rollback()
-                    except Exception:
-                        pass
+                loop.call_soon_threadsafe(queue_progress, step, message, preview_data)
 
         # Seleziona pipeline in base alla configurazione
         pipeline = settings.GENERATION_PIPELINE
@@ -220,10 +223,9 @@ async def _run_generation_background(
         # Pass template_style_id and photo_urls for databinding generator
         # Auto-populate email in contact_info from user account if not provided
         contact_info = request.contact_info or {}
-        if not contact_info.get("email") and current_user.email:
+        if not contact_info.get("email") and user.email:
             contact_info = dict(contact_info)
-            contact_info["email"] = current_user.email
-
+            contact_info["email"] = user.email
         gen_kwargs = dict(
             business_name=request.business_name,
             business_description=request.business_description,
@@ -253,6 +255,9 @@ async def _run_generation_background(
                 gen_kwargs["generate_images"] = request.generate_images
 
         result = await generator.generate(**gen_kwargs)
+        await wait_progress()
+        if site:
+            await db.refresh(site, ["config"])  # anteprima scritta da on_progress
 
         if not result.get("success"):
             logger.error(f"[BG] Generazione fallita: {result.get('error')}")
@@ -260,14 +265,14 @@ async def _run_generation_background(
                 site.generation_step = 0
                 site.generation_message = result.get("error", "Errore generazione")
                 site.status = "draft"
-                db.commit()
+                await db.commit()
             return
 
         # NOTE: generations_used already incremented in request handler (before bg task)
 
         # Salva HTML, versione, site_data e QC report
         if site and result.get("html_content"):
-            site.html_content = result["html_content"]
+            await store_site_html(site, result["html_content"])
             site.status = "ready"
             site.generation_step = 0
             site.generation_message = ""
@@ -297,9 +302,9 @@ async def _run_generation_background(
                 site.tokens_output = result["tokens_output"]
             if result.get("model_used"):
                 site.ai_model = result["model_used"]
-            _save_version(db, site, result["html_content"], "Generazione iniziale AI")
+            await db.run_sync(save_version, site, result["html_content"], "Generazione iniziale AI")
 
-        db.commit()
+        await db.commit()
         logger.info(
             f"[BG] Generazione completata per user {user_id}: "
             f"{result.get('generation_time_ms')}ms, ${result.get('cost_usd')}"
@@ -308,25 +313,58 @@ async def _run_generation_background(
     except Exception as e:
         logger.exception(f"[BG] Errore generazione background")
         try:
-            db.rollback()
+            await db.rollback()
         except Exception:
             pass
+        await wait_progress()
         if site_id:
             try:
-                site = db.query(Site).filter(Site.id == site_id).first()
-                if site:
-                    site.generation_step = 0
-                    site.generation_message = str(e)[:200]
-                    site.status = "draft"
-                    db.commit()
+                await db.execute(
+                    update(Site).where(Site.id == site_id).values(
+                        generation_step=0, generation_message=str(e)[:200], status="draft",
+                    )
+                )
+                await db.commit()
             except Exception:
                 pass
     finally:
-        db.close()
+        await db.close()
 
 
 # ============ GENERATION ENDPOINTS ============
 
+def _start_generation(db: Session, current_user: User, data: GenerateRequest) -> None:
+    """Spending cap, contatore generazioni e sito in stato "generating" (query sincrone)."""
+    # Controlla spending cap globale (max 200 generazioni/giorno)
+    if not _check_and_increment_spending_cap(db):
+        logger.warning(f"Spending cap raggiunto! User {current_user.id} bloccato.")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Il sistema ha raggiunto il limite giornaliero di generazioni. Riprova domani.",
+        )
+
+    # Incrementa contatore generazioni PRIMA del background task (previene race condition)
+    if not current_user.is_premium and not current_user.is_superuser:
+        current_user.generations_used += 1
+
+    # Imposta sito in stato "generating" subito
+    site = None
+    if data.site_id:
+        site = db.query(Site).filter(
+            Site.id == data.site_id,
+            Site.owner_id == current_user.id,
+        ).first()
+        if not site:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Sito con id {data.site_id} non trovato per l'utente corrente",
+            )
+        site.status = "generating"
+        site.generation_step = 0
+        site.generation_message = "Avvio generazione..."
+    db.commit()
+
+
 @router.post("/website")
 @limiter.limit("3/hour")
 async def generate_website(
@@ -362,34 +400,8 @@ async def generate_website(
             },
         )
 
-    # Controlla spending cap globale (max 200 generazioni/giorno)
-    if not _check_and_increment_spending_cap(db):
-        logger.warning(f"Spending cap raggiunto! User {current_user.id} bloccato.")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Il sistema ha raggiunto il limite giornaliero di generazioni. Riprova domani.",
-        )
-
-    # Incrementa contatore generazioni PRIMA del background task (previene race condition)
-    if not current_user.is_premium and not current_user.is_superuser:
-        current_user.generations_used += 1
-
-    # Imposta sito in stato "generating" subito
-    site = None
-    if data.site_id:
-        site = db.query(Site).filter(
-            Site.id == data.site_id,
-            Site.owner_id == current_user.id,
-        ).first()
-        if not site:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Sito con id {data.site_id} non trovato per l'utente corrente",
-            )
-        site.status = "generating"
-        site.generation_step = 0
-        site.generation_message = "Avvio generazione..."
-    db.commit()
+    # Query sincrone nel threadpool: la route resta async per lanciare il task
+    await run_in_threadpool(_start_generation, db, current_user, data)
 
     # Lancia generazione in background (hold ref to prevent GC)
     task = asyncio.create_task(
@@ -414,8 +426,8 @@ async def generate_website(
 async def refine_website(
     request: Request,
     data: RefineRequest,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Modifica un sito esistente via chat AI.
@@ -439,25 +451,30 @@ async def refine_website(
         logger.warning(f"[Refine] User {current_user.id} has NULL refine counters, allowing request")
 
     # Carica il sito
-    site = db.query(Site).filter(
-        Site.id == data.site_id,
-        Site.owner_id == current_user.id,
-    ).first()
+    site = (await db.execute(
+        select(Site).options(undefer(Site.config)).where(
+            Site.id == data.site_id,
+            Site.owner_id == current_user.id,
+        )
+    )).scalar_one_or_none()
 
     if not site:
         # Log details for debugging 404
-        any_site = db.query(Site).filter(Site.id == data.site_id).first()
-        if any_site:
+        owner_id = await db.scalar(select(Site.owner_id).where(Site.id == data.site_id))
+        if owner_id is not None:
             logger.warning(
-                f"[Refine] 404: site_id={data.site_id} exists (owner={any_site.owner_id}) "
+                f"[Refine] 404: site_id={data.site_id} exists (owner={owner_id}) "
                 f"but current_user.id={current_user.id} doesn't match"
             )
         else:
             logger.warning(f"[Refine] 404: site_id={data.site_id} does not exist in DB")
         raise HTTPException(status_code=404, detail="Sito non trovato")
 
-    if not site.html_content:
+    current_html = await load_site_html(db, site)
+    if not current_html:
         raise HTTPException(status_code=400, detail="Il sito non ha ancora contenuto HTML")
+    # Nessuna transazione aperta (e connessione occupata) durante la chiamata AI
+    await db.commit()
 
     try:
         # Retrieve reference_analysis from site config for color/theme correction
@@ -473,7 +490,7 @@ async def refine_website(
                 logger.info(f"[Refine] {len(validated_photos)} photo(s) attached to refine request")
 
         result = await swarm.refine(
-            current_html=site.html_content,
+            current_html=current_html,
             modification_request=data.message,
             section_to_modify=data.section,
             reference_analysis=reference_analysis,
@@ -494,7 +511,7 @@ async def refine_website(
             raise HTTPException(status_code=500, detail=error_msg)
 
         # Aggiorna HTML del sito
-        site.html_content = result["html_content"]
+        await store_site_html(site, result["html_content"])
         site.status = "ready"
 
         # Accumulate AI cost tracking (add refine cost to existing generation cost)
@@ -511,9 +528,9 @@ async def refine_website(
 
         # Salva versione
         description = f"Chat: {data.message[:100]}"
-        _save_version(db, site, result["html_content"], description)
+        await db.run_sync(save_version, site, result["html_content"], description)
 
-        db.commit()
+        await db.commit()
 
         return {
             "success": True,
@@ -537,14 +554,19 @@ async def refine_website(
 @router.get("/status/{site_id}")
 async def get_generation_status(
     site_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Ritorna lo stato di avanzamento della generazione per un sito."""
-    site = db.query(Site).filter(
-        Site.id == site_id,
-        Site.owner_id == current_user.id,
-    ).first()
+    # Polling frequente: solo le colonne di stato (config solo durante la generazione)
+    site = (await db.execute(
+        select(Site).options(
+            load_only(Site.id, Site.status, Site.generation_step, Site.generation_message)
+        ).where(
+            Site.id == site_id,
+            Site.owner_id == current_user.id,
+        )
+    )).scalar_one_or_none()
 
     if not site:
         raise HTTPException(status_code=404, detail="Sito non trovato")
@@ -564,8 +586,10 @@ async def get_generation_status(
 
     # Extract preview data if generating
     preview_data = None
-    if is_generating and isinstance(site.config, dict):
-        preview_data = site.config.get("_generation_preview")
+    if is_generating:
+        config = await db.scalar(select(Site.config).where(Site.id == site.id))
+        if isinstance(config, dict):
+            preview_data = config.get("_generation_preview")
 
     return {
         "site_id": site.id,
@@ -582,7 +606,7 @@ async def get_generation_status(
 # ============ PHOTO CHOICES ============
 
 @router.post("/{site_id}/photo-choices")
-async def submit_photo_choices(
+def submit_photo_choices(
     site_id: int,
     data: PhotoChoiceRequest,
     current_user: User = Depends(get_current_active_user),
@@ -629,6 +653,18 @@ async def submit_photo_choices(
                     "[PhotoChoices] No valid URL for upload in section '%s', falling back to stock",
                     choice.section_type,
                 )
+            # Manifest solo per le foto scelte, con varianti su URL pubblici
+            chosen = {choice_dict.get("photo_url"), *choice_dict.get("photo_urls", [])}
+            manifests = [
+                m for m in choice.photo_manifests or []
+                if m.get("src") in chosen and all(
+                    isinstance(v, dict) and str(v.get("url", "")).startswith("https://")
+                    and _validate_image_url(v["url"])
+                    for v in m.get("variants", [])
+                )
+            ]
+            if manifests and choice_dict["action"] == "upload":
+                choice_dict["photo_manifests"] = manifests
         validated_choices.append(choice_dict)
 
     # Signal the generation pipeline
@@ -657,7 +693,7 @@ async def submit_photo_choices(
 # ============ QC REPORT ============
 
 @router.get("/qc-report/{site_id}")
-async def get_qc_report(
+def get_qc_report(
     site_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
@@ -911,8 +947,8 @@ class UpgradePaymentRequest(BaseModel):
 @router.post("/upgrade")
 async def upgrade_plan(
     data: UpgradeRequest,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Attiva un piano dopo il pagamento. Richiede verifica pagamento Revolut o admin."""
     from app.models.user import PLAN_CONFIG
@@ -935,7 +971,7 @@ async def upgrade_plan(
 
     try:
         current_user.activate_plan(data.plan)
-        db.commit()
+        await db.commit()
 
         config = PLAN_CONFIG[data.plan]
         logger.info(f"User {current_user.id} upgraded to plan '{data.plan}'")
@@ -960,8 +996,8 @@ async def upgrade_plan(
 @router.post("/upgrade-demo")
 async def upgrade_demo_user(
     plan: str = "premium",
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Endpoint DEMO per testare l'upgrade senza pagamento. Solo per superuser."""
     if not current_user.is_superuser:
@@ -971,7 +1007,7 @@ async def upgrade_demo_user(
         current_user.activate_plan(plan)
     except ValueError:
         current_user.is_premium = True
-    db.commit()
+    await db.commit()
 
     return {
         "message": f"Utente {current_user.email} upgradato a piano '{current_user.plan}' (DEMO)",
@@ -1010,7 +1046,7 @@ def _verify_n8n_secret(secret: str):
 
 
 @router.post("/n8n-progress")
-async def n8n_progress_update(
+def n8n_progress_update(
     data: N8nProgressRequest,
     db: Session = Depends(get_db),
 ):
@@ -1031,7 +1067,7 @@ async def n8n_progress_update(
 
 
 @router.post("/n8n-callback")
-async def n8n_generation_callback(
+def n8n_generation_callback(
     data: N8nCallbackRequest,
     db: Session = Depends(get_db),
 ):
@@ -1056,7 +1092,7 @@ async def n8n_generation_callback(
     else:
         raise HTTPException(status_code=400, detail="Either html_content or site_data required")
 
-    site.html_content = html_content
+    site.set_html(html_content)
     site.status = "ready"
     site.generation_step = 0
     site.generation_message = ""
@@ -1064,7 +1100,7 @@ async def n8n_generation_callback(
     if data.site_data:
         site.config = data.site_data
 
-    _save_version(db, site, html_content, "Generazione via n8n")
+    save_version(db, site, html_content, "Generazione via n8n")
 
     # Incrementa contatore generazioni per il proprietario
     user = db.query(User).filter(User.id == site.owner_id).first()
@@ -8,10 +8,12 @@ import logging
 from fastapi import APIRouter, HTTPException, Depends, status, Request
 from pydantic import BaseModel
 from typing import List, Optional, Dict
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
 
-from app.core.database import get_db
-from app.core.security import get_current_active_user
+from app.core.database import get_async_db
+from app.core.security import get_current_active_user, get_current_active_user_async
 from app.core.rate_limiter import limiter
 from app.models.user import User
 from app.models.site import Site
@@ -117,8 +119,8 @@ async def generate_images(
 async def regenerate_images(
     request: Request,
     data: RegenerateImagesRequest,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Rigenera immagini per una sezione di un sito esistente.
@@ -132,10 +134,12 @@ async def regenerate_images(
     )
 
     # Verifica proprieta del sito
-    site = db.query(Site).filter(
-        Site.id == data.site_id,
-        Site.owner_id == current_user.id,
-    ).first()
+    site = (await db.execute(
+        select(Site).options(undefer(Site.config)).where(
+            Site.id == data.site_id,
+            Site.owner_id == current_user.id,
+        )
+    )).scalar_one_or_none()
 
     if not site:
         raise HTTPException(status_code=404, detail="Sito non trovato")
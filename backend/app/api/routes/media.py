@@ -4,6 +4,7 @@ sostituzione immagini e aggiunta video embed.
 Includes wizard upload endpoints (no site_id required).
 """
 
+import asyncio
 import base64
 import logging
 import os
@@ -13,16 +14,20 @@ from typing import List, Optional
 
 from fastapi import APIRouter, Body, Depends, File, Form, HTTPException, Request, UploadFile
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.rate_limiter import limiter
-from app.core.security import get_current_active_user
+from app.core.security import get_current_active_user, get_current_active_user_async
 from app.models.site import Site
-from app.models.site_version import SiteVersion
 from app.models.user import User
+from app.services.blob_store import load_site_html, store_site_html
+from app.services.html_document import parse_html
+from app.services.images.optimizer import optimize_and_upload
 from app.services.r2_storage import is_r2_available, upload_to_r2
+from app.services.site_versions import save_version
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -138,49 +143,19 @@ def _validate_and_save_upload(content: bytes, original_filename: str, user_id: i
     )
 
 
-def _get_user_site(db: Session, site_id: int, user_id: int) -> Site:
+async def _get_user_site(db: AsyncSession, site_id: int, user_id: int) -> Site:
     """Fetch a site owned by the given user, or raise 404."""
-    site = db.query(Site).filter(
-        Site.id == site_id,
-        Site.owner_id == user_id,
-    ).first()
+    site = (await db.execute(
+        select(Site).where(
+            Site.id == site_id,
+            Site.owner_id == user_id,
+        )
+    )).scalar_one_or_none()
     if not site:
         raise HTTPException(status_code=404, detail="Sito non trovato")
     return site
 
 
-def _save_version(db: Session, site: Site, html_content: str, description: str):
-    """Save a new site version snapshot. Keeps max 10 versions."""
-    latest = (
-        db.query(SiteVersion)
-        .filter(SiteVersion.site_id == site.id)
-        .order_by(SiteVersion.version_number.desc())
-        .first()
-    )
-    next_version = (latest.version_number + 1) if latest else 1
-
-    version = SiteVersion(
-        site_id=site.id,
-        html_content=html_content,
-        version_number=next_version,
-        change_description=description,
-    )
-    db.add(version)
-
-    # Delete old versions beyond the 10 most recent
-    old_versions = (
-        db.query(SiteVersion)
-        .filter(SiteVersion.site_id == site.id)
-        .order_by(SiteVersion.version_number.desc())
-        .offset(10)
-        .all()
-    )
-    for old in old_versions:
-        db.delete(old)
-
-    db.flush()
-
-
 def _extract_video_id_youtube(url: str) -> Optional[str]:
     """Extract YouTube video ID from various URL formats."""
     patterns = [
@@ -229,8 +204,8 @@ async def upload_media(
     request: Request,
     file: UploadFile = File(...),
     site_id: int = Form(...),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Upload an image file for a site.
@@ -238,7 +213,7 @@ async def upload_media(
     Returns the public URL to access the uploaded file.
     """
     # Verify site ownership
-    _get_user_site(db, site_id, current_user.id)
+    await _get_user_site(db, site_id, current_user.id)
 
     # Validate extension
     if not file.filename:
@@ -259,10 +234,18 @@ async def upload_media(
             detail=f"File troppo grande ({len(content) / 1024 / 1024:.1f} MB). Massimo: 5 MB",
         )
 
-    # Try R2 first (persistent cloud storage), fall back to local filesystem
+    # Try R2 first (persistent cloud storage), fall back to local filesystem.
+    # On R2 the photo is optimized (WebP, max 1920px) with its srcset/AVIF
+    # variants; the manifest goes back to the client for the photo choices.
     r2_url = None
+    manifest = None
     if is_r2_available():
-        r2_url = upload_to_r2(content, ext, site_id=site_id)
+        # Pillow and boto3 are blocking: optimize_and_upload runs in a thread
+        if ext == ".gif":
+            r2_url = await asyncio.to_thread(upload_to_r2, content, ext, site_id=site_id)  # animated: kept as is
+        else:
+            manifest = await optimize_and_upload(content, file.filename, site_id, generate_srcset=True)
+            r2_url = manifest["src"] if manifest else await asyncio.to_thread(upload_to_r2, content, ext, site_id=site_id)
 
     if r2_url:
         url = r2_url
@@ -282,26 +265,27 @@ async def upload_media(
         filename = unique_name
 
     logger.info(f"File uploaded: {url} ({len(content)} bytes) by user {current_user.id}")
+    if manifest and manifest["variants"]:
+        return {"url": url, "filename": filename, "manifest": manifest}
     return {"url": url, "filename": filename}
 
 
 @router.get("/sites/{site_id}/images", response_model=ImagesListResponse)
 async def list_site_images(
     site_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Extract all <img> tags from the site HTML, grouped by section.
     Sections are detected by looking at ancestor elements with known section IDs.
     """
-    site = _get_user_site(db, site_id, current_user.id)
+    site = await _get_user_site(db, site_id, current_user.id)
 
-    if not site.html_content:
+    html = await load_site_html(db, site)
+    if not html:
         return ImagesListResponse(images=[])
 
-    html = site.html_content
-
     # Known section IDs
     section_ids = [
         "hero", "about", "gallery", "services", "features",
@@ -309,58 +293,29 @@ async def list_site_images(
         "menu", "pricing", "cta", "blog", "event", "video",
     ]
 
-    # Split HTML into section blocks by looking for id="section_name" patterns
-    # Build a map of character positions to section names
-    section_ranges: list[tuple[int, int, str]] = []
-    for sec_id in section_ids:
-        # Match section/div with id="hero" etc.
-        pattern = re.compile(
-            rf'<(?:section|div)[^>]*\bid=["\']({re.escape(sec_id)})["\'][^>]*>',
-            re.IGNORECASE,
-        )
-        for m in pattern.finditer(html):
-            section_ranges.append((m.start(), m.start(), sec_id))
-
-    # Sort by position
-    section_ranges.sort(key=lambda x: x[0])
-
-    def _get_section_for_pos(pos: int) -> str:
-        """Determine which section a given character position belongs to."""
-        result = "unknown"
-        for start, _, sec_id in section_ranges:
-            if start <= pos:
-                result = sec_id
-            else:
-                break
-        return result
-
-    # Find all <img> tags
-    img_pattern = re.compile(
-        r'<img\s[^>]*?>',
-        re.IGNORECASE | re.DOTALL,
-    )
+    known_ids = set(section_ids)
 
+    def _in_known_section(element) -> bool:
+        return element.tag in ("section", "div") and element.id.lower() in known_ids
+
+    doc = parse_html(html)
     images: list[ImageInfo] = []
     section_counters: dict[str, int] = {}
 
-    for match in img_pattern.finditer(html):
-        tag = match.group(0)
-
-        # Extract src
-        src_match = re.search(r'src=["\']([^"\']+)["\']', tag, re.IGNORECASE)
-        if not src_match:
+    for img in doc.images:
+        src = img.attrs.get("src", "")
+        if not src:
             continue
-        src = src_match.group(1)
 
         # Skip tiny tracking pixels and data URIs that are just placeholders
         if src.startswith("data:image/gif") or src.startswith("data:image/svg"):
             continue
 
-        # Extract alt
-        alt_match = re.search(r'alt=["\']([^"\']*)["\']', tag, re.IGNORECASE)
-        alt = alt_match.group(1) if alt_match else ""
+        alt = img.attrs.get("alt", "")
 
-        section = _get_section_for_pos(match.start())
+        # Innermost known section containing the image
+        container = doc.enclosing(img.start, _in_known_section)
+        section = container.id.lower() if container is not None else "unknown"
         idx = section_counters.get(section, 0)
         section_counters[section] = idx + 1
 
@@ -373,28 +328,29 @@ async def list_site_images(
 async def replace_image(
     site_id: int,
     data: ReplaceImageRequest,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Replace a specific image URL in the site HTML.
     Saves the updated HTML and creates a new version.
     """
-    site = _get_user_site(db, site_id, current_user.id)
+    site = await _get_user_site(db, site_id, current_user.id)
 
-    if not site.html_content:
+    html = await load_site_html(db, site)
+    if not html:
         raise HTTPException(status_code=400, detail="Il sito non ha ancora contenuto HTML")
 
-    if data.old_src not in site.html_content:
+    if data.old_src not in html:
         raise HTTPException(status_code=404, detail="Immagine non trovata nell'HTML del sito")
 
     # Replace only the first occurrence of old_src (not all duplicates)
-    updated_html = site.html_content.replace(data.old_src, data.new_src, 1)
-    site.html_content = updated_html
+    updated_html = html.replace(data.old_src, data.new_src, 1)
+    await store_site_html(site, updated_html)
 
     # Save version
-    _save_version(db, site, updated_html, f"Sostituzione immagine")
-    db.commit()
+    await db.run_sync(save_version, site, updated_html, f"Sostituzione immagine")
+    await db.commit()
 
     logger.info(f"Image replaced in site {site_id} by user {current_user.id}")
     return {"success": True, "html_content": updated_html}
@@ -404,16 +360,17 @@ async def replace_image(
 async def add_video(
     site_id: int,
     data: AddVideoRequest,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Add a responsive video embed section after the specified section.
     Supports YouTube and Vimeo URLs.
     """
-    site = _get_user_site(db, site_id, current_user.id)
+    site = await _get_user_site(db, site_id, current_user.id)
 
-    if not site.html_content:
+    html = await load_site_html(db, site)
+    if not html:
         raise HTTPException(status_code=400, detail="Il sito non ha ancora contenuto HTML")
 
     # Determine embed URL
@@ -437,55 +394,27 @@ async def add_video(
     video_html = _build_video_section_html(embed_url)
 
     # Find the closing tag of the target section and insert after it
-    html = site.html_content
     section_id = data.after_section.lower().strip()
 
-    # Look for </section> or </div> that closes the target section
-    # Strategy: find the section opening tag, then find its matching close
-    open_pattern = re.compile(
-        rf'<(section|div)[^>]*\bid=["\']({re.escape(section_id)})["\'][^>]*>',
-        re.IGNORECASE,
-    )
-    open_match = open_pattern.search(html)
+    # Find the target section and insert after its matching closing tag
+    doc = parse_html(html)
+    section = doc.find_section(section_id, ("section", "div"))
 
-    if not open_match:
+    if section is None:
         raise HTTPException(
             status_code=404,
             detail=f"Sezione '{section_id}' non trovata nell'HTML del sito",
         )
 
-    # Find the matching closing tag by counting nesting of the same tag type
-    tag_name = open_match.group(1).lower()
-    search_start = open_match.end()
-    depth = 1
-    pos = search_start
-
-    open_re = re.compile(rf'<{tag_name}[\s>]', re.IGNORECASE)
-    close_re = re.compile(rf'</{tag_name}\s*>', re.IGNORECASE)
+    if section.closed:
+        updated_html = doc.splice(section.end, section.end, "\n" + video_html)
 
-    while depth > 0 and pos < len(html):
-        next_open = open_re.search(html, pos)
-        next_close = close_re.search(html, pos)
+        await store_site_html(site, updated_html)
+        await db.run_sync(save_version, site, updated_html, f"Aggiunto video dopo sezione '{section_id}'")
+        await db.commit()
 
-        if next_close is None:
-            break
-
-        if next_open and next_open.start() < next_close.start():
-            depth += 1
-            pos = next_open.end()
-        else:
-            depth -= 1
-            if depth == 0:
-                insert_pos = next_close.end()
-                updated_html = html[:insert_pos] + "\n" + video_html + html[insert_pos:]
-
-                site.html_content = updated_html
-                _save_version(db, site, updated_html, f"Aggiunto video dopo sezione '{section_id}'")
-                db.commit()
-
-                logger.info(f"Video added to site {site_id} after section '{section_id}' by user {current_user.id}")
-                return {"success": True, "html_content": updated_html}
-            pos = next_close.end()
+        logger.info(f"Video added to site {site_id} after section '{section_id}' by user {current_user.id}")
+        return {"success": True, "html_content": updated_html}
 
     raise HTTPException(
         status_code=500,
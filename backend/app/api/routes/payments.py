@@ -27,6 +27,7 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional, List
 import httpx
 from fastapi import APIRouter, Depends, HTTPException, Request, Header
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func as sqlfunc
 from pydantic import BaseModel
@@ -289,7 +290,7 @@ def _verify_recurring_auth(authorization: str) -> bool:
 # ---- 1. CATALOG (PUBLIC) ----
 
 @router.get("/catalog")
-async def get_service_catalog(db: Session = Depends(get_db)):
+def get_service_catalog(db: Session = Depends(get_db)):
     """Ritorna il catalogo servizi attivi, raggruppati per categoria.
 
     Endpoint pubblico, non richiede autenticazione.
@@ -344,29 +345,19 @@ async def get_service_catalog(db: Session = Depends(get_db)):
 
 # ---- 2. CHECKOUT SERVICE (AUTH) ----
 
-@router.post("/checkout-service", response_model=ServiceCheckoutResponse)
-async def checkout_service(
-    body: ServiceCheckoutRequest,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
-):
-    """Crea un ordine Revolut per un servizio del catalogo.
+def _prepare_service_subscription(db: Session, current_user: User, service_slug: str):
+    """Servizio e subscription pending_setup per il checkout (query sincrone).
 
-    - Se il servizio ha setup_price > 0 O monthly_price > 0: crea ordine Revolut, ritorna checkout_url
-    - Se il servizio e' completamente gratuito (setup=0 e monthly=0): attiva subito
-    - Impedisce duplicati: se esiste gia' una subscription active/pending_setup, blocca
+    Blocca i duplicati attivi, fa scadere i pending vecchi e riusa quello recente.
     """
-    if not settings.REVOLUT_API_KEY:
-        raise HTTPException(status_code=503, detail="Pagamenti non configurati")
-
     # Cerca il servizio nel catalogo
     service = (
         db.query(ServiceCatalog)
-        .filter(ServiceCatalog.slug == body.service_slug, ServiceCatalog.is_active == True)
+        .filter(ServiceCatalog.slug == service_slug, ServiceCatalog.is_active == True)
         .first()
     )
     if not service:
-        raise HTTPException(status_code=404, detail=f"Servizio '{body.service_slug}' non trovato o non attivo")
+        raise HTTPException(status_code=404, detail=f"Servizio '{service_slug}' non trovato o non attivo")
 
     now = datetime.now(timezone.utc)
 
@@ -429,6 +420,29 @@ async def checkout_service(
         db.add(subscription)
         db.flush()  # per ottenere l'ID
 
+    return service, subscription, now
+
+
+@router.post("/checkout-service", response_model=ServiceCheckoutResponse)
+async def checkout_service(
+    body: ServiceCheckoutRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """Crea un ordine Revolut per un servizio del catalogo.
+
+    - Se il servizio ha setup_price > 0 O monthly_price > 0: crea ordine Revolut, ritorna checkout_url
+    - Se il servizio e' completamente gratuito (setup=0 e monthly=0): attiva subito
+    - Impedisce duplicati: se esiste gia' una subscription active/pending_setup, blocca
+    """
+    if not settings.REVOLUT_API_KEY:
+        raise HTTPException(status_code=503, detail="Pagamenti non configurati")
+
+    service, subscription, now = await run_in_threadpool(
+        _prepare_service_subscription, db, current_user, body.service_slug
+    )
+    subscription_id = subscription.id
+
     setup_amount = service.setup_price_cents or 0
     monthly_amount = service.monthly_price_cents or 0
 
@@ -454,12 +468,12 @@ async def checkout_service(
             "amount": first_payment_amount,
             "currency": "EUR",
             "description": payment_description,
-            "merchant_order_ext_ref": f"svc_{current_user.id}_{service.slug}_{subscription.id}",
+            "merchant_order_ext_ref": f"svc_{current_user.id}_{service.slug}_{subscription_id}",
             "customer_email": current_user.email,
             "metadata": {
                 "user_id": str(current_user.id),
                 "service_slug": service.slug,
-                "subscription_id": str(subscription.id),
+                "subscription_id": str(subscription_id),
                 "flow": "service_checkout",
                 "payment_type": "setup" if setup_amount > 0 else "first_monthly",
             },
@@ -481,54 +495,61 @@ async def checkout_service(
 
         if not checkout_url:
             logger.error(f"Revolut order senza checkout_url: {order}")
-            db.rollback()
+            await run_in_threadpool(db.rollback)
             raise HTTPException(status_code=502, detail="Errore: checkout URL non ricevuto")
 
         # Salva order_id nella subscription
         subscription.setup_order_id = order_id
-        db.commit()
+        await run_in_threadpool(db.commit)
 
         logger.info(
             f"Service checkout creato: user={current_user.id}, service={service.slug}, "
-            f"subscription={subscription.id}, order={order_id}, amount={first_payment_amount}c"
+            f"subscription={subscription_id}, order={order_id}, amount={first_payment_amount}c"
         )
 
         return ServiceCheckoutResponse(
             checkout_url=checkout_url,
             order_id=order_id,
             activated=False,
-            subscription_id=subscription.id,
+            subscription_id=subscription_id,
         )
 
     else:
         # Servizio completamente gratuito (setup=0 e monthly=0) - attiva subito
-        subscription.status = "active"
-        subscription.setup_paid = True
-        subscription.activated_by = "auto"
-        subscription.current_period_start = now
-        subscription.current_period_end = now + timedelta(days=30)
-        db.commit()
-
-        # Aggiorna limiti utente se il servizio li prevede
-        _apply_service_limits(current_user, service, db)
+        await run_in_threadpool(_activate_free_subscription, db, current_user, service, subscription, now)
 
         logger.info(
             f"Service gratuito attivato: user={current_user.id}, service={service.slug}, "
-            f"subscription={subscription.id}"
+            f"subscription={subscription_id}"
         )
 
         return ServiceCheckoutResponse(
             checkout_url=None,
             order_id=None,
             activated=True,
-            subscription_id=subscription.id,
+            subscription_id=subscription_id,
         )
 
 
+def _activate_free_subscription(
+    db: Session, user: User, service: ServiceCatalog, subscription: UserSubscription, now: datetime
+) -> None:
+    """Attiva subito un servizio gratuito e ne applica i limiti (query sincrone)."""
+    subscription.status = "active"
+    subscription.setup_paid = True
+    subscription.activated_by = "auto"
+    subscription.current_period_start = now
+    subscription.current_period_end = now + timedelta(days=30)
+    db.commit()
+
+    # Aggiorna limiti utente se il servizio li prevede
+    _apply_service_limits(user, service, db)
+
+
 # ---- 3. MY SUBSCRIPTIONS (AUTH) ----
 
 @router.get("/my-subscriptions")
-async def get_my_subscriptions(
+def get_my_subscriptions(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
@@ -572,7 +593,7 @@ async def get_my_subscriptions(
 # ---- 4. PAYMENT HISTORY (AUTH) ----
 
 @router.get("/history")
-async def get_payment_history(
+def get_payment_history(
     limit: int = 20,
     offset: int = 0,
     current_user: User = Depends(get_current_active_user),
@@ -616,7 +637,7 @@ async def get_payment_history(
 # ---- 5. CANCEL SUBSCRIPTION (AUTH) ----
 
 @router.post("/cancel-subscription/{subscription_id}")
-async def cancel_subscription(
+def cancel_subscription(
     subscription_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
@@ -733,7 +754,7 @@ async def _handle_order_completed(order_id: str, db: Session):
         return
 
     # ---- LEGACY FLOW: plan checkout ----
-    await _handle_legacy_order_completed(order_id, order, metadata, db)
+    await run_in_threadpool(_handle_legacy_order_completed, order_id, order, metadata, db)
 
 
 async def _handle_service_order_completed(
@@ -751,7 +772,29 @@ async def _handle_service_order_completed(
         )
         return
 
-    # Trova la subscription
+    found = await run_in_threadpool(_pending_service_subscription, db, order_id, subscription_id, service_slug)
+    if found is None:
+        return
+    subscription, service = found
+
+    # Recupera il payment_method_id per addebiti ricorrenti futuri
+    customer_id = order.get("customer_id")
+    payment_method_id = None
+    if customer_id and service and service.monthly_price_cents and service.monthly_price_cents > 0:
+        payment_methods = await _revolut_get_customer_payment_methods(customer_id)
+        if payment_methods:
+            # Prendi il primo metodo di pagamento salvato
+            pm = payment_methods[0] if isinstance(payment_methods, list) else None
+            if pm and isinstance(pm, dict):
+                payment_method_id = pm.get("id")
+
+    await run_in_threadpool(
+        _activate_service_subscription, db, order_id, order, metadata, subscription, service, payment_method_id
+    )
+
+
+def _pending_service_subscription(db: Session, order_id: str, subscription_id: str, service_slug: str):
+    """(subscription, servizio) da attivare, None se assente o gia' attiva (query sincrone)."""
     subscription = (
         db.query(UserSubscription)
         .filter(UserSubscription.id == int(subscription_id))
@@ -760,16 +803,31 @@ async def _handle_service_order_completed(
 
     if not subscription:
         logger.error(f"Subscription non trovata: id={subscription_id}, order_id={order_id}")
-        return
+        return None
 
     # Idempotenza: se gia' attivata, skip
     if subscription.status == "active" and subscription.setup_paid:
         logger.info(f"Subscription gia' attiva, skip: id={subscription_id}")
-        return
+        return None
 
     # Trova il servizio per ottenere monthly_price e limiti
     service = db.query(ServiceCatalog).filter(ServiceCatalog.slug == service_slug).first()
-
+    return subscription, service
+
+
+def _activate_service_subscription(
+    db: Session,
+    order_id: str,
+    order: dict,
+    metadata: dict,
+    subscription: UserSubscription,
+    service: Optional[ServiceCatalog],
+    payment_method_id: Optional[str],
+) -> None:
+    """Attiva la subscription pagata e registra il pagamento (query sincrone)."""
+    user_id = metadata.get("user_id")
+    service_slug = metadata.get("service_slug")
+    subscription_id = metadata.get("subscription_id")
     now = datetime.now(timezone.utc)
 
     try:
@@ -794,17 +852,10 @@ async def _handle_service_order_completed(
         if customer_id:
             subscription.revolut_customer_id = customer_id
 
-        # Recupera e salva payment_method_id per addebiti ricorrenti futuri
-        if customer_id and service and service.monthly_price_cents and service.monthly_price_cents > 0:
-            payment_methods = await _revolut_get_customer_payment_methods(customer_id)
-            if payment_methods:
-                # Prendi il primo metodo di pagamento salvato
-                pm = payment_methods[0] if isinstance(payment_methods, list) else None
-                if pm and isinstance(pm, dict):
-                    pm_id = pm.get("id")
-                    if pm_id:
-                        subscription.revolut_payment_method_id = pm_id
-                        logger.info(f"Payment method salvato: sub={subscription_id}, pm={pm_id}")
+        # Salva payment_method_id per addebiti ricorrenti futuri
+        if payment_method_id:
+            subscription.revolut_payment_method_id = payment_method_id
+            logger.info(f"Payment method salvato: sub={subscription_id}, pm={payment_method_id}")
 
         # Registra pagamento in PaymentHistory
         amount = order.get("amount", service.setup_price_cents if service else 0)
@@ -842,10 +893,10 @@ async def _handle_service_order_completed(
         db.rollback()
 
 
-async def _handle_legacy_order_completed(
+def _handle_legacy_order_completed(
     order_id: str, order: dict, metadata: dict, db: Session
 ):
-    """Gestisce completamento ordine per il flusso legacy (piani base/premium)."""
+    """Gestisce completamento ordine per il flusso legacy (piani base/premium, query sincrone)."""
     user_id = metadata.get("user_id")
     plan_name = metadata.get("plan")
 
@@ -910,7 +961,11 @@ async def _handle_payment_failed(order_id: str, db: Session):
     order = await _revolut_get_order(order_id)
     if not order:
         return
+    await run_in_threadpool(_record_payment_failed, db, order_id, order)
+
 
+def _record_payment_failed(db: Session, order_id: str, order: dict) -> None:
+    """PaymentHistory "failed" per l'ordine (query sincrone)."""
     metadata = order.get("metadata", {})
     user_id = metadata.get("user_id")
     subscription_id = metadata.get("subscription_id")
@@ -964,15 +1019,7 @@ async def process_recurring_payments(
     now = datetime.now(timezone.utc)
 
     # Trova subscription attive con billing scaduto
-    due_subscriptions = (
-        db.query(UserSubscription)
-        .filter(
-            UserSubscription.status == "active",
-            UserSubscription.monthly_amount_cents > 0,
-            UserSubscription.next_billing_date <= now,
-        )
-        .all()
-    )
+    due_subscriptions = await run_in_threadpool(_due_subscriptions, db, now)
 
     if not due_subscriptions:
         return {"processed": 0, "failed": 0, "details": [], "message": "Nessun pagamento ricorrente da processare"}
@@ -982,80 +1029,56 @@ async def process_recurring_payments(
     details = []
 
     for sub in due_subscriptions:
-        # Carica utente
-        user = db.query(User).filter(User.id == sub.user_id).first()
-        if not user:
+        # Carica utente e servizio (dopo i commit precedenti gli attributi vanno ricaricati)
+        renewal = await run_in_threadpool(_load_renewal, db, sub)
+        if "error" in renewal:
             failed += 1
-            details.append({
-                "subscription_id": sub.id,
-                "error": f"Utente non trovato: {sub.user_id}",
-            })
+            details.append(renewal)
             continue
 
-        # Carica servizio per il nome
-        service = db.query(ServiceCatalog).filter(ServiceCatalog.slug == sub.service_slug).first()
-        service_name = service.name if service else sub.service_slug
-
         try:
             # Crea ordine Revolut per il rinnovo mensile
             order_payload = {
-                "amount": sub.monthly_amount_cents,
+                "amount": renewal["amount_cents"],
                 "currency": "EUR",
-                "description": f"Site Builder - {service_name} (Rinnovo mensile)",
-                "merchant_order_ext_ref": f"recurring_{sub.user_id}_{sub.service_slug}_{sub.id}_{now.strftime('%Y%m')}",
-                "customer_email": user.email,
+                "description": f"Site Builder - {renewal['service_name']} (Rinnovo mensile)",
+                "merchant_order_ext_ref": (
+                    f"recurring_{renewal['user_id']}_{renewal['service']}_{renewal['subscription_id']}_{now.strftime('%Y%m')}"
+                ),
+                "customer_email": renewal["user_email"],
                 "metadata": {
-                    "user_id": str(user.id),
-                    "service_slug": sub.service_slug,
-                    "subscription_id": str(sub.id),
+                    "user_id": str(renewal["user_id"]),
+                    "service_slug": renewal["service"],
+                    "subscription_id": str(renewal["subscription_id"]),
                     "flow": "recurring",
                 },
             }
 
             # Se abbiamo un customer_id Revolut, usiamolo
-            customer_id = sub.revolut_customer_id or user.revolut_customer_id
-            if customer_id:
-                order_payload["customer_id"] = customer_id
+            if renewal["customer_id"]:
+                order_payload["customer_id"] = renewal["customer_id"]
 
             order = await _revolut_create_order(order_payload)
             revolut_order_id = order.get("id", "")
 
             # Tenta addebito automatico con metodo di pagamento salvato
             auto_charged = False
-            payment_method_id = getattr(sub, 'revolut_payment_method_id', None)
+            payment_method_id = renewal["payment_method_id"]
             if payment_method_id and revolut_order_id:
                 pay_result = await _revolut_pay_order(revolut_order_id, payment_method_id)
                 if pay_result:
                     auto_charged = True
-                    logger.info(f"Addebito automatico riuscito: sub={sub.id}, order={revolut_order_id}")
-
-            # Registra pagamento
-            payment_record = PaymentHistory(
-                user_id=user.id,
-                subscription_id=sub.id,
-                revolut_order_id=revolut_order_id,
-                amount_cents=sub.monthly_amount_cents,
-                currency="EUR",
-                payment_type="monthly",
-                status="completed" if auto_charged else "pending",
-                description=f"Rinnovo mensile - {service_name}",
-            )
-            db.add(payment_record)
-
-            # Avanza il periodo di fatturazione
-            sub.current_period_start = sub.next_billing_date
-            sub.current_period_end = sub.next_billing_date + timedelta(days=30)
-            sub.next_billing_date = sub.next_billing_date + timedelta(days=30)
+                    logger.info(f"Addebito automatico riuscito: sub={renewal['subscription_id']}, order={revolut_order_id}")
 
-            db.commit()
+            await run_in_threadpool(_record_renewal, db, sub, renewal, revolut_order_id, auto_charged)
             processed += 1
 
             details.append({
-                "subscription_id": sub.id,
-                "user_id": user.id,
-                "user_email": user.email,
-                "service": sub.service_slug,
-                "amount_cents": sub.monthly_amount_cents,
+                "subscription_id": renewal["subscription_id"],
+                "user_id": renewal["user_id"],
+                "user_email": renewal["user_email"],
+                "service": renewal["service"],
+                "amount_cents": renewal["amount_cents"],
                 "revolut_order_id": revolut_order_id,
                 "auto_charged": auto_charged,
                 "status": "auto_charged" if auto_charged else "order_created",
@@ -1063,28 +1086,28 @@ async def process_recurring_payments(
 
             logger.info(
                 f"Rinnovo {'auto-addebitato' if auto_charged else 'creato'}: "
-                f"subscription={sub.id}, user={user.id}, "
-                f"service={sub.service_slug}, amount={sub.monthly_amount_cents}c, order={revolut_order_id}"
+                f"subscription={renewal['subscription_id']}, user={renewal['user_id']}, "
+                f"service={renewal['service']}, amount={renewal['amount_cents']}c, order={revolut_order_id}"
             )
 
         except HTTPException as e:
             failed += 1
             details.append({
-                "subscription_id": sub.id,
-                "user_id": user.id,
+                "subscription_id": renewal["subscription_id"],
+                "user_id": renewal["user_id"],
                 "error": f"Revolut error: {e.detail}",
             })
-            db.rollback()
+            await run_in_threadpool(db.rollback)
 
         except Exception as e:
             failed += 1
             details.append({
-                "subscription_id": sub.id,
-                "user_id": user.id,
+                "subscription_id": renewal["subscription_id"],
+                "user_id": renewal["user_id"],
                 "error": str(e),
             })
-            logger.error(f"Errore rinnovo subscription {sub.id}: {e}")
-            db.rollback()
+            logger.error(f"Errore rinnovo subscription {renewal['subscription_id']}: {e}")
+            await run_in_threadpool(db.rollback)
 
     return {
         "processed": processed,
@@ -1094,13 +1117,72 @@ async def process_recurring_payments(
     }
 
 
+def _due_subscriptions(db: Session, now: datetime) -> List[UserSubscription]:
+    """Subscription attive con billing scaduto (query sincrona)."""
+    return (
+        db.query(UserSubscription)
+        .filter(
+            UserSubscription.status == "active",
+            UserSubscription.monthly_amount_cents > 0,
+            UserSubscription.next_billing_date <= now,
+        )
+        .all()
+    )
+
+
+def _load_renewal(db: Session, sub: UserSubscription) -> dict:
+    """Dati del rinnovo (utente, servizio, importo), o {"error": ...} senza utente (query sincrone)."""
+    user = db.query(User).filter(User.id == sub.user_id).first()
+    if not user:
+        return {
+            "subscription_id": sub.id,
+            "error": f"Utente non trovato: {sub.user_id}",
+        }
+
+    # Carica servizio per il nome
+    service = db.query(ServiceCatalog).filter(ServiceCatalog.slug == sub.service_slug).first()
+    return {
+        "subscription_id": sub.id,
+        "user_id": user.id,
+        "user_email": user.email,
+        "service": sub.service_slug,
+        "service_name": service.name if service else sub.service_slug,
+        "amount_cents": sub.monthly_amount_cents,
+        "customer_id": sub.revolut_customer_id or user.revolut_customer_id,
+        "payment_method_id": getattr(sub, 'revolut_payment_method_id', None),
+    }
+
+
+def _record_renewal(
+    db: Session, sub: UserSubscription, renewal: dict, revolut_order_id: str, auto_charged: bool
+) -> None:
+    """Registra il pagamento e avanza il periodo di fatturazione (query sincrone)."""
+    payment_record = PaymentHistory(
+        user_id=renewal["user_id"],
+        subscription_id=renewal["subscription_id"],
+        revolut_order_id=revolut_order_id,
+        amount_cents=renewal["amount_cents"],
+        currency="EUR",
+        payment_type="monthly",
+        status="completed" if auto_charged else "pending",
+        description=f"Rinnovo mensile - {renewal['service_name']}",
+    )
+    db.add(payment_record)
+
+    # Avanza il periodo di fatturazione
+    sub.current_period_start = sub.next_billing_date
+    sub.current_period_end = sub.next_billing_date + timedelta(days=30)
+    sub.next_billing_date = sub.next_billing_date + timedelta(days=30)
+
+    db.commit()
+
+
 # ---- LEGACY ENDPOINT: CREATE CHECKOUT (backward compatible) ----
 
 @router.post("/create-checkout", response_model=CheckoutResponse)
 async def create_checkout_session(
     body: CheckoutRequest,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
 ):
     """Crea un ordine Revolut e ritorna la checkout_url per il pagamento.
 
@@ -7,21 +7,36 @@ from urllib.parse import urlparse
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import Response
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, undefer
 from typing import Any, List, Optional
 from pydantic import BaseModel, field_serializer
 
-from app.core.database import get_db
-from app.core.security import get_current_active_user
-from app.models.site import Site, SiteStatus
+from app.core.database import get_async_db
+from app.core.security import get_current_active_user_async
+from app.models.site import SITE_SUMMARY_COLUMNS, Site, SiteStatus
 from app.models.site_version import SiteVersion
 from app.models.user import User
+from app.services.blob_store import load_site_html, store_site_html
+from app.services.html_document import parse_html
+from app.services.site_versions import VersionChainError, save_version, version_html
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+async def _owned_site(db: AsyncSession, site_id: int, user_id: int, *options) -> Site:
+    """Il sito se appartiene all'utente, altrimenti 404."""
+    site = (await db.execute(
+        select(Site).options(*options).where(Site.id == site_id, Site.owner_id == user_id)
+    )).scalar_one_or_none()
+    if not site:
+        raise HTTPException(status_code=404, detail="Sito non trovato")
+    return site
+
+
 def _section_aware_replace(
     html: str, old_url: str, new_url: str, section_name: str, occurrence_idx: int
 ) -> str:
@@ -30,48 +45,20 @@ def _section_aware_replace(
     Finds `<section id="section_name">` block and replaces the N-th occurrence
     of old_url within it. Falls back to global Nth occurrence if section not found.
     """
-    # Try to find the section block: <section id="gallery" ...> ... </section>
-    pattern = re.compile(
-        rf'(<section[^>]*\bid\s*=\s*["\']{re.escape(section_name)}["\'][^>]*>)',
-        re.IGNORECASE,
-    )
-    match = pattern.search(html)
-
-    if match:
-        section_start = match.start()
-        # Find the matching </section> after this point
-        # Count nested <section> tags to find the correct closing tag
-        depth = 1
-        pos = match.end()
-        while pos < len(html) and depth > 0:
-            next_open = html.find("<section", pos)
-            next_close = html.find("</section>", pos)
-            if next_close == -1:
-                break
-            if next_open != -1 and next_open < next_close:
-                depth += 1
-                pos = next_open + 8
-            else:
-                depth -= 1
-                if depth == 0:
-                    section_end = next_close + len("</section>")
-                    break
-                pos = next_close + 10
-        else:
-            section_end = len(html)
-
-        section_html = html[section_start:section_end]
+    # Find the section block: <section id="gallery" ...> ... </section>
+    doc = parse_html(html)
+    section = doc.find_section(section_name, ("section",))
 
+    if section is not None:
         # Replace the N-th occurrence within the section
         count = 0
-        search_pos = 0
-        while search_pos < len(section_html):
-            idx = section_html.find(old_url, search_pos)
+        search_pos = section.start
+        while True:
+            idx = html.find(old_url, search_pos, section.end)
             if idx == -1:
                 break
             if count == occurrence_idx:
-                new_section = section_html[:idx] + new_url + section_html[idx + len(old_url):]
-                return html[:section_start] + new_section + html[section_end:]
+                return doc.splice(idx, idx + len(old_url), new_url)
             count += 1
             search_pos = idx + len(old_url)
 
@@ -162,31 +149,38 @@ class SiteDetailResponse(SiteResponse):
 @router.get("/", response_model=List[SiteResponse])
 async def list_sites(
     status: Optional[str] = Query(None, description="Filtra per stato"),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Lista siti dell'utente corrente"""
-    query = db.query(Site).filter(Site.owner_id == current_user.id)
+    query = (
+        select(Site)
+        .options(load_only(*SITE_SUMMARY_COLUMNS))
+        .where(Site.owner_id == current_user.id)
+    )
     
     if status:
-        query = query.filter(Site.status == status)
+        query = query.where(Site.status == status)
     
-    sites = query.order_by(Site.updated_at.desc()).all()
+    sites = (await db.execute(query.order_by(Site.updated_at.desc()))).scalars().all()
     return sites
 
 
 @router.post("/", response_model=SiteResponse)
 async def create_site(
     data: SiteCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Crea un nuovo sito"""
+    async def slug_taken(candidate: str) -> bool:
+        return await db.scalar(select(Site.id).where(Site.slug == candidate).limit(1)) is not None
+
     # Genera slug unico: se esiste, aggiunge -2, -3, ecc.
     slug = data.slug
-    if db.query(Site).filter(Site.slug == slug).first():
+    if await slug_taken(slug):
         counter = 2
-        while db.query(Site).filter(Site.slug == f"{slug}-{counter}").first():
+        while await slug_taken(f"{slug}-{counter}"):
             counter += 1
         slug = f"{slug}-{counter}"
 
@@ -199,73 +193,59 @@ async def create_site(
         status=SiteStatus.DRAFT.value
     )
     db.add(site)
-    db.commit()
-    db.refresh(site)
+    await db.commit()
+    await db.refresh(site)
     return site
 
 
 @router.get("/{site_id}", response_model=SiteDetailResponse)
 async def get_site(
     site_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Ottiene un sito specifico (solo se proprietario)"""
-    site = db.query(Site).filter(
-        Site.id == site_id,
-        Site.owner_id == current_user.id
-    ).first()
-    
-    if not site:
-        raise HTTPException(status_code=404, detail="Sito non trovato")
+    site = await _owned_site(db, site_id, current_user.id)
     
-    return site
+    detail = {field: getattr(site, field) for field in SiteResponse.model_fields}
+    detail["html_content"] = await load_site_html(db, site)
+    return detail
 
 
 @router.put("/{site_id}", response_model=SiteResponse)
 async def update_site(
     site_id: int,
     data: SiteUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Aggiorna un sito"""
-    site = db.query(Site).filter(
-        Site.id == site_id,
-        Site.owner_id == current_user.id
-    ).first()
-    
-    if not site:
-        raise HTTPException(status_code=404, detail="Sito non trovato")
+    site = await _owned_site(db, site_id, current_user.id)
     
     # Aggiorna i campi forniti
     update_data = data.model_dump(exclude_unset=True)
+    if "html_content" in update_data:
+        await store_site_html(site, update_data.pop("html_content"))
     for field, value in update_data.items():
         setattr(site, field, value)
     
-    db.commit()
-    db.refresh(site)
+    await db.commit()
+    await db.refresh(site)
     return site
 
 
 @router.delete("/{site_id}")
 async def delete_site(
     site_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Elimina un sito"""
-    site = db.query(Site).filter(
-        Site.id == site_id,
-        Site.owner_id == current_user.id
-    ).first()
-    
-    if not site:
-        raise HTTPException(status_code=404, detail="Sito non trovato")
+    site = await _owned_site(db, site_id, current_user.id)
 
-    db.query(SiteVersion).filter(SiteVersion.site_id == site_id).delete()
-    db.delete(site)
-    db.commit()
+    await db.execute(delete(SiteVersion).where(SiteVersion.site_id == site_id))
+    await db.delete(site)
+    await db.commit()
     return {"message": "Sito eliminato"}
 
 
@@ -273,45 +253,34 @@ async def delete_site(
 async def update_site_html(
     site_id: int,
     html_content: str,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Aggiorna l'HTML generato di un sito"""
-    site = db.query(Site).filter(
-        Site.id == site_id,
-        Site.owner_id == current_user.id
-    ).first()
-    
-    if not site:
-        raise HTTPException(status_code=404, detail="Sito non trovato")
+    site = await _owned_site(db, site_id, current_user.id)
     
-    site.html_content = html_content
+    await store_site_html(site, html_content)
     site.status = SiteStatus.READY.value
-    db.commit()
-    db.refresh(site)
+    await db.commit()
+    await db.refresh(site)
     return {"message": "HTML aggiornato", "site": site}
 
 
 @router.get("/{site_id}/preview")
 async def preview_site(
     site_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Ottiene l'HTML preview di un sito"""
-    site = db.query(Site).filter(
-        Site.id == site_id,
-        Site.owner_id == current_user.id
-    ).first()
+    site = await _owned_site(db, site_id, current_user.id)
 
-    if not site:
-        raise HTTPException(status_code=404, detail="Sito non trovato")
-
-    if not site.html_content:
+    html = await load_site_html(db, site)
+    if not html:
         raise HTTPException(status_code=400, detail="Sito non ancora generato")
 
     return {
-        "html": site.html_content,
+        "html": html,
         "name": site.name,
         "status": site.status
     }
@@ -320,24 +289,21 @@ async def preview_site(
 @router.get("/{site_id}/versions")
 async def list_versions(
     site_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Lista versioni di un sito (solo proprietario)."""
-    site = db.query(Site).filter(
-        Site.id == site_id,
-        Site.owner_id == current_user.id,
-    ).first()
-
-    if not site:
-        raise HTTPException(status_code=404, detail="Sito non trovato")
-
-    versions = (
-        db.query(SiteVersion)
-        .filter(SiteVersion.site_id == site_id)
+    await _owned_site(db, site_id, current_user.id)
+
+    versions = (await db.execute(
+        select(SiteVersion)
+        .options(load_only(
+            SiteVersion.id, SiteVersion.version_number,
+            SiteVersion.change_description, SiteVersion.created_at,
+        ))
+        .where(SiteVersion.site_id == site_id)
         .order_by(SiteVersion.version_number.desc())
-        .all()
-    )
+    )).scalars().all()
 
     return [
         {
@@ -354,53 +320,43 @@ async def list_versions(
 async def rollback_version(
     site_id: int,
     version_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Ripristina il sito a una versione precedente."""
-    site = db.query(Site).filter(
-        Site.id == site_id,
-        Site.owner_id == current_user.id,
-    ).first()
-
-    if not site:
-        raise HTTPException(status_code=404, detail="Sito non trovato")
+    site = await _owned_site(db, site_id, current_user.id)
 
-    version = db.query(SiteVersion).filter(
-        SiteVersion.id == version_id,
-        SiteVersion.site_id == site_id,
-    ).first()
+    version = (await db.execute(
+        select(SiteVersion).where(
+            SiteVersion.id == version_id,
+            SiteVersion.site_id == site_id,
+        )
+    )).scalar_one_or_none()
 
     if not version:
         raise HTTPException(status_code=404, detail="Versione non trovata")
 
-    # Ripristina HTML
-    site.html_content = version.html_content
+    # Ripristina HTML (ricostruito dallo snapshot se la versione e' un delta)
+    try:
+        html_content = await db.run_sync(version_html, version)
+    except VersionChainError as e:
+        logger.error(f"Rollback sito {site_id} fallito: {e}")
+        raise HTTPException(status_code=409, detail="Versione non ripristinabile")
+    restored_version = version.version_number
+    await store_site_html(site, html_content)
     site.status = "ready"
 
     # Salva nuova versione di rollback
-    latest = (
-        db.query(SiteVersion)
-        .filter(SiteVersion.site_id == site.id)
-        .order_by(SiteVersion.version_number.desc())
-        .first()
+    rollback_entry = await db.run_sync(
+        save_version, site, html_content, f"Rollback alla versione {restored_version}"
     )
-    next_version = (latest.version_number + 1) if latest else 1
-
-    rollback_entry = SiteVersion(
-        site_id=site.id,
-        html_content=version.html_content,
-        version_number=next_version,
-        change_description=f"Rollback alla versione {version.version_number}",
-    )
-    db.add(rollback_entry)
-    db.commit()
+    await db.commit()
 
     return {
         "success": True,
-        "html_content": version.html_content,
-        "restored_version": version.version_number,
-        "new_version": next_version,
+        "html_content": html_content,
+        "restored_version": restored_version,
+        "new_version": rollback_entry.version_number,
     }
 
 
@@ -532,39 +488,19 @@ def _extract_photos_from_html(html: str) -> list:
     """Parse HTML to extract all real photo <img> tags with their section context."""
     photos = []
 
-    section_pattern = re.compile(
-        r'<section[^>]*\bid=["\']([^"\']+)["\']', re.IGNORECASE
-    )
-    img_pattern = re.compile(
-        r'<img\b[^>]*\bsrc=["\']([^"\']+)["\'][^>]*>', re.IGNORECASE
-    )
-
-    # Find all section start positions and their IDs
-    section_starts = []
-    for m in section_pattern.finditer(html):
-        section_starts.append((m.start(), m.group(1).lower().strip()))
+    doc = parse_html(html)
 
-    # For each img, determine which section it belongs to
-    for img_match in img_pattern.finditer(html):
-        src = img_match.group(1).strip()
+    for img in doc.images:
+        src = img.attrs.get("src", "").strip()
 
         if not _is_real_photo_url(src):
             continue
 
-        img_pos = img_match.start()
+        # Section containing this img (same lookup as _section_aware_replace)
+        section = doc.enclosing(img.start, lambda e: e.tag == "section" and bool(e.id))
+        current_section = section.id.lower().strip() if section is not None else "other"
 
-        # Find the closest section that starts before this img
-        current_section = "other"
-        for sec_start, sec_id in reversed(section_starts):
-            if sec_start <= img_pos:
-                current_section = sec_id
-                break
-
-        # Extract alt text
-        alt_match = re.search(
-            r'alt=["\']([^"\']*)["\']', img_match.group(0), re.IGNORECASE
-        )
-        alt_text = alt_match.group(1) if alt_match else ""
+        alt_text = img.attrs.get("alt", "")
 
         photos.append({
             "section_type": current_section,
@@ -622,8 +558,8 @@ def _build_photo_map(photos: list) -> list:
 @router.get("/{site_id}/photo-map")
 async def get_photo_map(
     site_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Returns a map of all photos in the site with Italian labels and section context.
 
@@ -631,18 +567,13 @@ async def get_photo_map(
     section (hero, about, gallery, team, etc.), and returns a structured list
     with user-friendly Italian labels, stock detection, and size hints.
     """
-    site = db.query(Site).filter(
-        Site.id == site_id,
-        Site.owner_id == current_user.id,
-    ).first()
+    site = await _owned_site(db, site_id, current_user.id)
 
-    if not site:
-        raise HTTPException(status_code=404, detail="Sito non trovato")
-
-    if not site.html_content:
+    html = await load_site_html(db, site)
+    if not html:
         raise HTTPException(status_code=400, detail="Sito non ancora generato")
 
-    raw_photos = _extract_photos_from_html(site.html_content)
+    raw_photos = _extract_photos_from_html(html)
     photo_map = _build_photo_map(raw_photos)
 
     stock_count = sum(1 for p in photo_map if p["is_stock"])
@@ -659,23 +590,17 @@ async def get_photo_map(
 @router.get("/{site_id}/export")
 async def export_site(
     site_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Scarica il file HTML completo del sito."""
-    site = db.query(Site).filter(
-        Site.id == site_id,
-        Site.owner_id == current_user.id
-    ).first()
-
-    if not site:
-        raise HTTPException(status_code=404, detail="Sito non trovato")
+    site = await _owned_site(db, site_id, current_user.id)
 
-    if not site.html_content:
+    html = await load_site_html(db, site)
+    if not html:
         raise HTTPException(status_code=400, detail="Sito non ancora generato")
 
     # Aggiungi meta commento
-    html = site.html_content
     meta_comment = f"<!-- Generated by E-quipe AI Site Builder | {site.name} -->\n"
     if not html.startswith("<!--"):
         html = meta_comment + html
@@ -705,8 +630,8 @@ class PhotoSwapRequest(BaseModel):
 async def swap_photo(
     site_id: int,
     data: PhotoSwapRequest,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Swap a single photo in a generated site's HTML.
 
@@ -758,18 +683,12 @@ async def swap_photo(
         )
 
     # Load site (owner check)
-    site = db.query(Site).filter(
-        Site.id == site_id,
-        Site.owner_id == current_user.id,
-    ).first()
+    site = await _owned_site(db, site_id, current_user.id)
 
-    if not site:
-        raise HTTPException(status_code=404, detail="Sito non trovato")
-
-    if not site.html_content:
+    html = await load_site_html(db, site)
+    if not html:
         raise HTTPException(status_code=400, detail="Sito non ancora generato")
 
-    html = site.html_content
     old_url = data.current_url
 
     # Check that the old URL actually exists in the HTML
@@ -799,9 +718,8 @@ async def swap_photo(
         )
 
     # Save updated HTML
-    site.html_content = new_html
-    db.commit()
-    db.refresh(site)
+    await store_site_html(site, new_html)
+    await db.commit()
 
     logger.info(
         "[PhotoSwap] User %d swapped photo '%s' in site %d",
@@ -825,11 +743,11 @@ class NotificationEmailRequest(BaseModel):
 
 
 @router.put("/{site_id}/notification-email")
-def set_notification_email(
+async def set_notification_email(
     site_id: int,
     data: NotificationEmailRequest,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Imposta l'email del proprietario per ricevere i messaggi dal form contatti.
@@ -842,17 +760,11 @@ def set_notification_email(
     if not email or "@" not in email or "." not in email.split("@")[-1]:
         raise HTTPException(status_code=400, detail="Email non valida")
 
-    site = db.query(Site).filter(
-        Site.id == site_id,
-        Site.owner_id == current_user.id,
-    ).first()
-    if not site:
-        raise HTTPException(status_code=404, detail="Sito non trovato")
-    if not site.html_content:
+    site = await _owned_site(db, site_id, current_user.id, undefer(Site.config))
+    html = await load_site_html(db, site)
+    if not html:
         raise HTTPException(status_code=400, detail="Sito non ancora generato")
 
-    html = site.html_content
-
     # Sostituisce BIZ_EMAIL nella variabile JS del form handler
     # Pattern: var BIZ_EMAIL = '...' (qualsiasi valore precedente, anche vuoto)
     new_html = re.sub(
@@ -876,7 +788,7 @@ def set_notification_email(
         else if(el.tagName==='TEXTAREA') data['message']=el.value;
       }});
       form.innerHTML='<div class="text-center py-12"><h3 style="color:var(--color-text)">Messaggio inviato!</h3><p style="color:var(--color-text-muted)">Grazie, ti risponderemo al pi\\u00f9 presto.</p></div>';
-      fetch('https://api.web3forms.com/submit',{{method:'POST',headers:{{'Content-Type':'application/json'}},body:JSON.stringify({{access_key:'{site.html_content.count("WEB3FORMS_KEY")}',to:'{email}',...data}})}}).catch(function(){{}});
+      fetch('https://api.web3forms.com/submit',{{method:'POST',headers:{{'Content-Type':'application/json'}},body:JSON.stringify({{access_key:'{html.count("WEB3FORMS_KEY")}',to:'{email}',...data}})}}).catch(function(){{}});
     }});
   }});
 }})();
@@ -884,12 +796,12 @@ def set_notification_email(
         new_html = html.replace("</body>", inject_script + "\n</body>")
 
     # Salva email in config per riferimento futuro
-    config = site.config if isinstance(site.config, dict) else {}
+    config = dict(site.config) if isinstance(site.config, dict) else {}
     config["_notification_email"] = email
     site.config = config
-    site.html_content = new_html
+    await store_site_html(site, new_html)
 
-    db.commit()
+    await db.commit()
 
     logger.info("[NotificationEmail] Site %d: BIZ_EMAIL set to %s by user %d", site_id, email, current_user.id)
 
@@ -901,25 +813,21 @@ def set_notification_email(
 
 
 @router.get("/{site_id}/notification-email")
-def get_notification_email(
+async def get_notification_email(
     site_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Ritorna l'email di notifica corrente del sito."""
-    site = db.query(Site).filter(
-        Site.id == site_id,
-        Site.owner_id == current_user.id,
-    ).first()
-    if not site:
-        raise HTTPException(status_code=404, detail="Sito non trovato")
+    site = await _owned_site(db, site_id, current_user.id, undefer(Site.config))
 
     # Prima cerca in config, poi nell'HTML
     config = site.config if isinstance(site.config, dict) else {}
     email = config.get("_notification_email", "")
 
-    if not email and site.html_content:
-        m = re.search(r"var BIZ_EMAIL\s*=\s*'([^']*)'", site.html_content)
+    html = await load_site_html(db, site) if not email else None
+    if html:
+        m = re.search(r"var BIZ_EMAIL\s*=\s*'([^']*)'", html)
         if m:
             email = m.group(1)
 
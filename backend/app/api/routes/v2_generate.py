@@ -1,13 +1,16 @@
 """
 Routes V2 - Component search (pgvector), generation pipeline, diversity dashboard, blueprints.
 All endpoints use JWT auth and follow existing patterns from sites.py/generate.py.
+Sync Session: routes without awaits are `def`, the async ones (embedding,
+AI calls) run their queries in the threadpool.
 """
 
 import logging
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from sqlalchemy import func as sql_func, text as sql_text
 from sqlalchemy.orm import Session
@@ -90,9 +93,9 @@ async def generate_v2(
     content injection -> HTML assembly -> log generation.
     """
     # Validate category blueprint exists
-    blueprint = db.query(CategoryBlueprint).filter(
-        CategoryBlueprint.category_slug == data.category
-    ).first()
+    blueprint = await run_in_threadpool(
+        lambda: db.query(CategoryBlueprint).filter(CategoryBlueprint.category_slug == data.category).first()
+    )
 
     if not blueprint:
         raise HTTPException(
@@ -184,12 +187,12 @@ async def search_components(
         LIMIT :limit
     """)
 
-    rows = db.execute(sql, {
+    rows = await run_in_threadpool(lambda: db.execute(sql, {
         "query_vec": vec_literal,
         "section_type": section_type,
         "category": category,
         "limit": limit,
-    }).fetchall()
+    }).fetchall())
 
     results = [
         {
@@ -212,50 +215,17 @@ async def search_components(
 
 # ============ 3. BATCH INSERT COMPONENTS ============
 
-@router.post("/components/batch-insert/")
-async def batch_insert_components(
-    data: ComponentBatchInsertRequest,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
-):
-    """
-    Bulk insert components with optional auto-embedding generation.
-    Admin-only endpoint. Upserts: skips components whose name already exists.
-    """
-    if not current_user.is_superuser:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Solo admin possono inserire componenti.",
-        )
-
-    if not data.components:
-        raise HTTPException(status_code=400, detail="Lista componenti vuota.")
-
+def _insert_components(
+    db: Session,
+    components: List[ComponentBatchItem],
+    embeddings: List[Optional[List[float]]],
+) -> Tuple[List[Dict[str, str]], List[Dict[str, str]], List[Dict[str, str]]]:
+    """Inserisce i componenti nuovi (query sincrone): (inserted, skipped, errors)."""
     inserted = []
     skipped = []
     errors = []
 
-    # Generate embeddings in batch if requested
-    embeddings = [None] * len(data.components)
-    if data.generate_embeddings:
-        from app.services.embedding_service import generate_embeddings_batch, build_component_description
-
-        descriptions = [
-            build_component_description({
-                "section_type": c.section_type,
-                "variant_cluster": c.variant_cluster,
-                "mood_tags": c.mood_tags,
-                "density": c.density,
-                "typography_style": c.typography_style,
-                "animation_level": c.animation_level,
-                "compatible_categories": c.compatible_categories,
-                "gsap_effects": c.gsap_effects,
-            })
-            for c in data.components
-        ]
-        embeddings = await generate_embeddings_batch(descriptions)
-
-    for i, item in enumerate(data.components):
+    for i, item in enumerate(components):
         # Check if component name already exists (skip duplicates)
         existing = db.query(ComponentV2).filter(ComponentV2.name == item.name).first()
         if existing:
@@ -296,6 +266,50 @@ async def batch_insert_components(
     if inserted:
         db.commit()
 
+    return inserted, skipped, errors
+
+
+@router.post("/components/batch-insert/")
+async def batch_insert_components(
+    data: ComponentBatchInsertRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Bulk insert components with optional auto-embedding generation.
+    Admin-only endpoint. Upserts: skips components whose name already exists.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo admin possono inserire componenti.",
+        )
+
+    if not data.components:
+        raise HTTPException(status_code=400, detail="Lista componenti vuota.")
+
+    # Generate embeddings in batch if requested
+    embeddings = [None] * len(data.components)
+    if data.generate_embeddings:
+        from app.services.embedding_service import generate_embeddings_batch, build_component_description
+
+        descriptions = [
+            build_component_description({
+                "section_type": c.section_type,
+                "variant_cluster": c.variant_cluster,
+                "mood_tags": c.mood_tags,
+                "density": c.density,
+                "typography_style": c.typography_style,
+                "animation_level": c.animation_level,
+                "compatible_categories": c.compatible_categories,
+                "gsap_effects": c.gsap_effects,
+            })
+            for c in data.components
+        ]
+        embeddings = await generate_embeddings_batch(descriptions)
+
+    inserted, skipped, errors = await run_in_threadpool(_insert_components, db, data.components, embeddings)
+
     return {
         "success": True,
         "inserted": len(inserted),
@@ -312,7 +326,7 @@ async def batch_insert_components(
 # ============ 4. DIVERSITY DASHBOARD (admin-only) ============
 
 @router.get("/diversity/dashboard/")
-async def diversity_dashboard(
+def diversity_dashboard(
     category: Optional[str] = Query(default=None, description="Filter by category"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
@@ -433,7 +447,7 @@ async def diversity_dashboard(
 # ============ 5. LIST BLUEPRINTS ============
 
 @router.get("/blueprints/")
-async def list_blueprints(
+def list_blueprints(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
@@ -463,7 +477,7 @@ async def list_blueprints(
 # ============ 6. CREATE/UPDATE BLUEPRINT (admin-only) ============
 
 @router.post("/blueprints/")
-async def upsert_blueprint(
+def upsert_blueprint(
     data: BlueprintCreateRequest,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
@@ -34,10 +34,10 @@ document.addEventListener('DOMContentLoaded', function () {
   var isIframe = false;
   try { isIframe = window.self !== window.top; } catch (e) { isIframe = true; }
 
-  // === LENIS SMOOTH SCROLL (skip in iframes — interferes with ScrollTrigger) ===
-  var lenis = null;
-  if (typeof Lenis !== 'undefined' && !isIframe) {
-    lenis = new Lenis({
+  // === LENIS SMOOTH SCROLL: set up by the head's Lenis bootstrap (none in iframes) ===
+  // Fallback for heads without the bootstrap (older or custom pages): set it up here
+  if (!window.lenis && typeof Lenis !== 'undefined' && !isIframe) {
+    window.lenis = new Lenis({
       duration: 1.2,
       easing: function (t) { return Math.min(1, 1.001 - Math.pow(2, -10 * t)); },
       direction: 'vertical',
@@ -46,20 +46,11 @@ document.addEventListener('DOMContentLoaded', function () {
       smoothTouch: false,
       touchMultiplier: 2,
     });
-
-    // Sync with GSAP ScrollTrigger
-    lenis.on('scroll', function () {
-      if (typeof ScrollTrigger !== 'undefined') {
-        ScrollTrigger.update();
-      }
-    });
-
-    gsap.ticker.add(function (time) {
-      lenis.raf(time * 1000);
-    });
-
+    window.lenis.on('scroll', function () { ScrollTrigger.update(); });
+    gsap.ticker.add(function (time) { window.lenis.raf(time * 1000); });
     gsap.ticker.lagSmoothing(0);
   }
+  var lenis = window.lenis || null;
 
   // === SMART NAVBAR (hide on scroll down, show on scroll up) ===
   var navEl = document.querySelector('nav, [data-nav]');
@@ -0,0 +1,378 @@
+"""Inizializzazione del database all'avvio, saltata quando e' gia' aggiornata.
+
+Ogni avvio eseguiva CREATE EXTENSION, create_all, ~25 ALTER TABLE, ~23
+ENABLE ROW LEVEL SECURITY e i seed prima di accettare richieste. Ora due
+marker nella tabella app_state decidono cosa serve:
+
+- "schema": fingerprint di tabelle/colonne dei modelli, SCHEMA_MIGRATIONS,
+  RLS_TABLES ed estensioni. Se coincide, ensure_schema() salta tutto il
+  blocco (una sola SELECT); cambia da solo quando cambia uno di questi, e
+  non viene scritto se una migrazione fallisce (si riprova al prossimo avvio).
+- "seed": SEED_VERSION dei seed su DB (catalogo servizi, category
+  blueprints); da incrementare quando cambiano i loro dati.
+
+I seed girano in un thread dopo l'avvio (run_startup_seeds), col server gia'
+in ascolto: quelli su DB solo se il marker seed e' vecchio, la design
+knowledge (SQLite locale, su Render il disco e' effimero) se vuota.
+STARTUP_FORCE_MIGRATIONS=true riesegue tutto ignorando i marker.
+
+StartupSeeds ne gestisce il ciclo di vita: segna la design knowledge come
+non pronta prima di avviare il thread (design_knowledge.is_ready(), i
+lettori la saltano finche' il seed non e' finito) e allo spegnimento
+chiede lo stop, controllato tra un passo e l'altro, e attende il thread.
+Un task asyncio.to_thread non si ferma con cancel(): il thread andrebbe
+avanti a scrivere durante lo spegnimento.
+
+StartupTimer misura le fasi per il log "[Startup] ..." di fine avvio.
+
+Usage (lifespan):
+    timer = StartupTimer()
+    ensure_schema(engine, Base.metadata, timer)
+    seeds = StartupSeeds(engine)
+    seeds.start()
+    ...
+    await seeds.stop()
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import MetaData, insert, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.models.app_state import AppState
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_MARKER = "schema"
+SEED_MARKER = "seed"
+
+# Da incrementare quando cambiano i dati di seed_services / seed_category_blueprints
+SEED_VERSION = 1
+
+EXTENSIONS = ["vector", "uuid-ossp"]
+
+# Add new columns to existing tables (create_all doesn't ALTER)
+SCHEMA_MIGRATIONS = [
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS password_reset_token VARCHAR",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS password_reset_token_expires TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS refines_used INTEGER DEFAULT 0",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS refines_limit INTEGER DEFAULT 3",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS pages_used INTEGER DEFAULT 0",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS pages_limit INTEGER DEFAULT 1",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS plan VARCHAR DEFAULT 'free'",
+    "ALTER TABLE sites ADD COLUMN IF NOT EXISTS qc_score FLOAT",
+    "ALTER TABLE sites ADD COLUMN IF NOT EXISTS qc_report JSON",
+    "ALTER TABLE sites ADD COLUMN IF NOT EXISTS generation_cost FLOAT",
+    "ALTER TABLE sites ADD COLUMN IF NOT EXISTS tokens_input INTEGER",
+    "ALTER TABLE sites ADD COLUMN IF NOT EXISTS tokens_output INTEGER",
+    "ALTER TABLE sites ADD COLUMN IF NOT EXISTS ai_model VARCHAR",
+    # Site HTML in the blob store (app/services/blob_store.py);
+    # existing rows: python tools/migrate_site_html.py
+    "ALTER TABLE sites ADD COLUMN IF NOT EXISTS html_ref VARCHAR",
+    # Site versions as snapshots + deltas (app/services/site_versions.py);
+    # existing rows: python tools/migrate_site_versions.py
+    "ALTER TABLE site_versions ADD COLUMN IF NOT EXISTS delta BYTEA",
+    "ALTER TABLE site_versions ADD COLUMN IF NOT EXISTS base_version INTEGER",
+    "ALTER TABLE site_versions ALTER COLUMN html_content DROP NOT NULL",
+    # Service tables (user_subscriptions, payment_history, service_catalog)
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS revolut_customer_id VARCHAR",
+    "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS revolut_payment_method_id VARCHAR",
+    "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS setup_order_id VARCHAR",
+    "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS activated_by VARCHAR",
+    "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS notes TEXT",
+    "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS cancelled_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS current_period_start TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS current_period_end TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS next_billing_date TIMESTAMP WITH TIME ZONE",
+]
+
+# Enable RLS on all tables (Supabase Security Advisor).
+# The backend connects as `postgres` superuser which bypasses RLS.
+# This blocks direct access via Supabase anon/authenticated roles.
+RLS_TABLES = [
+    "users", "sites", "site_versions", "components", "components_v2",
+    "generation_logs", "generation_log_components", "category_blueprints",
+    "service_catalog", "user_subscriptions", "payment_history",
+    "global_counters", "ad_leads", "ad_platform_configs", "ad_clients",
+    "ad_campaigns", "ad_optimization_logs", "ad_ai_activities",
+    "ad_metrics", "ad_wizard_progress", "ad_market_research",
+    "ad_strategies", "effect_usage", "app_state",
+]
+
+
+# ---------------------------------------------------------------------------
+# Timing
+# ---------------------------------------------------------------------------
+
+class StartupTimer:
+    """Durate in ms delle fasi di avvio, nell'ordine in cui sono state misurate."""
+
+    def __init__(self, started: Optional[float] = None) -> None:
+        self.started = started if started is not None else time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = round(seconds * 1000, 1)
+
+    @property
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 1)
+
+    def summary(self) -> str:
+        parts = [f"{name} {ms:.0f}ms" for name, ms in self.phases.items()]
+        return ", ".join(parts + [f"totale {self.total_ms:.0f}ms"])
+
+
+# ---------------------------------------------------------------------------
+# Markers
+# ---------------------------------------------------------------------------
+
+def schema_fingerprint(metadata: MetaData) -> str:
+    """Hash di tabelle/colonne, migrazioni, RLS ed estensioni: cambia se cambia lo schema atteso."""
+    digest = hashlib.sha256()
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        columns = ",".join(f"{c.name}:{c.type!r}:{c.nullable}" for c in table.columns)
+        digest.update(f"{table.name}({columns})\n".encode())
+    for line in EXTENSIONS + SCHEMA_MIGRATIONS + RLS_TABLES:
+        digest.update(f"{line}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def read_marker(engine: Engine, key: str) -> Optional[str]:
+    """Il valore di un marker, None se assente o se app_state non esiste ancora."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(AppState.value).where(AppState.key == key)).scalar()
+    except SQLAlchemyError:
+        return None
+
+
+def write_marker(engine: Engine, key: str, value: str) -> None:
+    table = AppState.__table__
+    try:
+        with engine.begin() as conn:
+            updated = conn.execute(update(table).where(table.c.key == key).values(value=value)).rowcount
+            if not updated:
+                conn.execute(insert(table).values(key=key, value=value))
+    except SQLAlchemyError as e:
+        # Un altro worker lo ha scritto in contemporanea: al prossimo avvio e' comunque aggiornato
+        logger.warning(f"[Startup] Marker {key} non salvato: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+
+def _execute_each(engine: Engine, statements: List[str]) -> List[str]:
+    """Esegue gli statement uno per uno (savepoint ciascuno); ritorna quelli falliti."""
+    failed = []
+    with engine.connect() as conn:
+        for stmt in statements:
+            try:
+                with conn.begin_nested():
+                    conn.execute(text(stmt))
+            except SQLAlchemyError:
+                failed.append(stmt)
+        conn.commit()
+    return failed
+
+
+def ensure_schema(engine: Engine, metadata: MetaData, timer: StartupTimer, force: bool = False) -> bool:
+    """Estensioni, create_all, migrazioni colonne e RLS, se il marker schema non e' aggiornato.
+
+    Ritorna False se il blocco e' stato saltato. Estensioni, migrazioni e RLS
+    sono SQL PostgreSQL: in sviluppo su SQLite gira solo create_all.
+    """
+    fingerprint = schema_fingerprint(metadata)
+    with timer.phase("schema_marker"):
+        current = read_marker(engine, SCHEMA_MARKER)
+    if current == fingerprint and not force:
+        logger.info(f"[Startup] Schema aggiornato ({fingerprint}): migrazioni e RLS saltate")
+        return False
+
+    postgres = engine.dialect.name == "postgresql"
+    if postgres:
+        with timer.phase("extensions"):
+            with engine.connect() as conn:
+                for extension in EXTENSIONS:
+                    conn.execute(text(f'CREATE EXTENSION IF NOT EXISTS "{extension}"'))
+                conn.commit()
+        logger.info("Estensioni PostgreSQL (vector, uuid-ossp) verificate")
+
+    with timer.phase("create_all"):
+        metadata.create_all(bind=engine)
+    logger.info("Database inizializzato correttamente")
+
+    failed: List[str] = []
+    if postgres:
+        with timer.phase("migrations"):
+            failed = _execute_each(engine, SCHEMA_MIGRATIONS)
+        logger.info("Migrazioni colonne completate")
+        with timer.phase("rls"):
+            # Table may not exist (components_v2 without pgvector): not an error
+            _execute_each(engine, [f'ALTER TABLE "{table}" ENABLE ROW LEVEL SECURITY' for table in RLS_TABLES])
+        logger.info("RLS abilitato su tutte le tabelle")
+
+    if failed:
+        logger.warning(f"[Startup] {len(failed)} migrazioni fallite, marker schema non aggiornato: {failed}")
+    else:
+        write_marker(engine, SCHEMA_MARKER, fingerprint)
+        logger.info(f"[Startup] Schema {fingerprint} salvato in app_state")
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Seeds
+# ---------------------------------------------------------------------------
+
+def _seed_database(engine: Engine, stop: threading.Event) -> None:
+    """Catalogo servizi e category blueprints (se vuoti); marker seed se entrambi riusciti."""
+    ok = True
+    try:
+        from app.services.seed_services import seed_service_catalog
+        seed_service_catalog()
+    except Exception as e:
+        ok = False
+        logger.warning(f"Seed catalogo servizi fallito: {e}")
+
+    if stop.is_set():
+        return
+    try:
+        from app.services.seed_category_blueprints import seed_category_blueprints
+        seed_category_blueprints()
+    except Exception as e:
+        ok = False
+        logger.warning(f"Seed category blueprints fallito: {e}")
+
+    if ok:
+        write_marker(engine, SEED_MARKER, str(SEED_VERSION))
+
+
+def _seed_design_knowledge(stop: threading.Event) -> None:
+    """Design knowledge (SQLite FTS5 store with BM25 ranking), guide di categoria e pattern dei template."""
+    try:
+        from app.services.design_knowledge import get_collection_stats, get_category_guide
+        stats = get_collection_stats()
+        if stats.get("total_patterns", 0) == 0:
+            logger.info("Design knowledge vuoto - seeding...")
+            from app.services.seed_design_knowledge import seed_all
+            seed_all()
+            stats = get_collection_stats()
+            logger.info(f"Design knowledge seeded: {stats['total_patterns']} patterns")
+        else:
+            logger.info(f"Design knowledge ready: {stats['total_patterns']} patterns")
+
+        if stop.is_set():
+            return
+        # Seed category design guides if not present
+        if not get_category_guide("restaurant"):
+            logger.info("Category design guides vuote - seeding...")
+            from app.services.seed_category_guides import seed_category_guides
+            count = seed_category_guides()
+            logger.info(f"Category design guides seeded: {count} categories")
+        else:
+            logger.info("Category design guides ready")
+
+        if stop.is_set():
+            return
+        # Extract and index patterns from professional templates (skip if already seeded)
+        try:
+            stats_after = get_collection_stats()
+            if stats_after.get("total_patterns", 0) < 800:
+                from app.services.extract_template_patterns import seed_extracted_patterns
+                tpl_count = seed_extracted_patterns()
+                if tpl_count > 0:
+                    logger.info(f"Template patterns indexed: {tpl_count}")
+            else:
+                logger.info("Template patterns already present, skipping extraction")
+        except Exception as e_tpl:
+            logger.warning(f"Template pattern extraction skipped: {e_tpl}")
+    except Exception as e:
+        logger.warning(f"Design knowledge non disponibile: {e}")
+
+
+def run_startup_seeds(
+    engine: Optional[Engine], force: bool = False, stop: Optional[threading.Event] = None,
+) -> Dict[str, float]:
+    """Seed di avvio, da eseguire in un thread col server gia' in ascolto; ritorna le durate.
+
+    stop interrompe i seed tra un passo e l'altro (spegnimento). Alla fine
+    la design knowledge torna leggibile (design_knowledge.set_ready).
+    """
+    from app.services.design_knowledge import set_ready
+
+    stop = stop or threading.Event()
+    timer = StartupTimer()
+    try:
+        if engine is not None:
+            with timer.phase("seed_marker"):
+                current = read_marker(engine, SEED_MARKER)
+            if force or current != str(SEED_VERSION):
+                with timer.phase("seed_db"):
+                    _seed_database(engine, stop)
+            else:
+                logger.info(f"[Startup] Seed DB v{SEED_VERSION} gia' eseguiti")
+        if not stop.is_set():
+            with timer.phase("design_knowledge"):
+                _seed_design_knowledge(stop)
+    finally:
+        set_ready(True)
+    if stop.is_set():
+        logger.info(f"[Startup] Seed in background interrotti allo spegnimento: {timer.summary()}")
+    else:
+        logger.info(f"[Startup] Seed in background completati: {timer.summary()}")
+    return timer.phases
+
+
+class StartupSeeds:
+    """run_startup_seeds in un thread, avviato e fermato dal lifespan."""
+
+    def __init__(self, engine: Optional[Engine], force: bool = False) -> None:
+        self.engine = engine
+        self.force = force
+        self.stop_event = threading.Event()
+        self.task: Optional["asyncio.Task[Dict[str, float]]"] = None
+
+    def start(self) -> None:
+        from app.services.design_knowledge import set_ready
+
+        # Prima del thread: nessuna richiesta legge la design knowledge a meta'
+        set_ready(False)
+        self.task = asyncio.create_task(
+            asyncio.to_thread(run_startup_seeds, self.engine, self.force, self.stop_event)
+        )
+
+    @property
+    def done(self) -> bool:
+        return self.task is not None and self.task.done()
+
+    async def stop(self, timeout: float = 15.0) -> bool:
+        """Chiede lo stop e attende il thread (al massimo timeout secondi); True se e' finito."""
+        if self.task is None or self.task.done():
+            return True
+        self.stop_event.set()
+        logger.info("[Startup] Seed in background ancora in corso allo spegnimento, stop richiesto")
+        try:
+            await asyncio.wait_for(asyncio.shield(self.task), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"[Startup] Seed in background non terminati dopo {timeout:.0f}s")
+            return False
+        except Exception as e:
+            logger.warning(f"[Startup] Seed in background falliti: {e}")
+        return True
@@ -1,10 +1,40 @@
-"""Database configuration"""
+"""Database configuration
+
+Due accessi allo stesso database:
+- engine/SessionLocal/get_db: Session sincrona (tool, seed, route non migrate)
+- async_engine/AsyncSessionLocal/get_async_db: AsyncSession (asyncpg per
+  PostgreSQL, aiosqlite in sviluppo) per le route async, che cosi' non
+  bloccano l'event loop durante le query.
+
+Ogni route usa un solo tipo di sessione, anche per l'autenticazione:
+get_current_active_user (Session) o get_current_active_user_async
+(AsyncSession). Le route sincrone sono `def` (threadpool di FastAPI); le
+route async sulla Session sincrona (chiamate AI/HTTP tra le query) eseguono
+le query con run_in_threadpool.
+
+I due engine hanno pool separati, ciascuno pool_size 5 + max_overflow 10:
+fino a 30 connessioni per processo (per worker uvicorn), da tenere sotto il
+limite di connessioni del database. Dietro il pooler di Supabase (porta
+6543, transaction mode) l'engine async non ha pool proprio.
+
+Senza driver async installato get_async_db ripiega su ThreadedSession:
+stessa interfaccia, query sincrone eseguite in un thread.
+"""
+
+import asyncio
+import logging
+import uuid
+from typing import Any, AsyncIterator, Callable, Optional
 
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import NullPool
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Supporta sia PostgreSQL che SQLite
 if settings.DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
@@ -35,3 +65,111 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ============ ASYNC ============
+
+def _prepared_statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+
+def _create_async_engine(database_url: Optional[str] = None):
+    """Engine async sullo stesso DATABASE_URL, None se il driver non e' installato."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = make_url(database_url or settings.DATABASE_URL)
+    if url.get_backend_name() == "sqlite":
+        return create_async_engine(url.set(drivername="sqlite+aiosqlite"))
+
+    # asyncpg non accetta sslmode e pgbouncer nell'URL: sslmode diventa un
+    # connect arg, pgbouncer serve solo a riconoscere il pooler
+    sslmode = url.query.get("sslmode", "require")
+    behind_pooler = url.port == 6543 or "pgbouncer" in url.query
+    url = url.set(drivername="postgresql+asyncpg").difference_update_query(["sslmode", "pgbouncer"])
+    connect_args: dict = {"ssl": sslmode}
+    if not behind_pooler:
+        return create_async_engine(url, connect_args=connect_args, pool_pre_ping=True, pool_recycle=300)
+
+    # Pooler in transaction mode (Supabase, porta 6543): transazioni successive
+    # possono finire su backend diversi. Nessun prepared statement in cache
+    # (ne' asyncpg ne' SQLAlchemy), nomi unici per quelli usati una volta, e
+    # nessun pool lato app: le connessioni le tiene il pooler
+    url = url.update_query_dict({"prepared_statement_cache_size": "0"})
+    connect_args["statement_cache_size"] = 0
+    connect_args["prepared_statement_name_func"] = _prepared_statement_name
+    return create_async_engine(url, connect_args=connect_args, poolclass=NullPool)
+
+
+try:
+    async_engine = _create_async_engine()
+except ImportError as e:
+    async_engine = None
+    logger.warning(f"Driver DB async non disponibile ({e}): le route async useranno query in thread")
+
+AsyncSessionLocal = None
+if async_engine is not None:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    # expire_on_commit=False: dopo il commit gli attributi restano leggibili
+    # senza lazy load (che con AsyncSession richiede un await)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+class ThreadedSession:
+    """Interfaccia di AsyncSession su una Session sincrona, query in un thread.
+
+    Fallback di get_async_db senza asyncpg/aiosqlite: le route scritte per
+    AsyncSession funzionano uguali e l'event loop resta libero.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.sync_session = session
+
+    def add(self, instance: Any) -> None:
+        self.sync_session.add(instance)
+
+    async def run_sync(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await asyncio.to_thread(fn, self.sync_session, *args, **kwargs)
+
+    async def execute(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        return await asyncio.to_thread(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def scalar(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        return await asyncio.to_thread(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def get(self, entity: Any, ident: Any, **kwargs: Any) -> Any:
+        return await asyncio.to_thread(self.sync_session.get, entity, ident, **kwargs)
+
+    async def refresh(self, instance: Any, attribute_names: Optional[list] = None) -> None:
+        await asyncio.to_thread(self.sync_session.refresh, instance, attribute_names)
+
+    async def delete(self, instance: Any) -> None:
+        await asyncio.to_thread(self.sync_session.delete, instance)
+
+    async def flush(self) -> None:
+        await asyncio.to_thread(self.sync_session.flush)
+
+    async def commit(self) -> None:
+        await asyncio.to_thread(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await asyncio.to_thread(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self.sync_session.close)
+
+
+def async_session():
+    """Una nuova AsyncSession (o ThreadedSession); chiuderla con await db.close()."""
+    if AsyncSessionLocal is not None:
+        return AsyncSessionLocal()
+    return ThreadedSession(SessionLocal())
+
+
+async def get_async_db() -> AsyncIterator[Any]:
+    """Dependency per ottenere la sessione DB async"""
+    db = async_session()
+    try:
+        yield db
+    finally:
+        await db.close()
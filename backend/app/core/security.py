@@ -6,10 +6,11 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from app.models.user import User
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -46,36 +47,67 @@ def decode_token(token: str) -> Optional[dict]:
         return None
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """Ottiene l'utente corrente dal token JWT."""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenziali non valide",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+
+def _token_user_id(token: str) -> int:
+    """L'id utente del token JWT, altrimenti 401."""
     payload = decode_token(token)
     if payload is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
     user_id: str = payload.get("sub")
     if user_id is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    return int(user_id)
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> User:
+    """Ottiene l'utente corrente dal token JWT (nella Session di get_db della route)."""
+    user = db.query(User).filter(User.id == _token_user_id(token)).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
     return user
 
 
-async def get_current_active_user(
+def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
     """Verifica che l'utente sia attivo."""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Utente disattivato")
     return current_user
+
+
+# Route con AsyncSession (get_async_db): l'utente va caricato nella stessa
+# sessione async, cosi' la route puo' modificarlo e salvarlo con await db.commit()
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    """Ottiene l'utente corrente dal token JWT (nell'AsyncSession di get_async_db della route)."""
+    user = await db.get(User, _token_user_id(token))
+    if user is None:
+        raise _credentials_exception()
+    
+    return user
+
+
+async def get_current_active_user_async(
+    current_user: User = Depends(get_current_user_async)
+) -> User:
+    """Verifica che l'utente sia attivo."""
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Utente disattivato")
+    return current_user
@@ -6,6 +6,7 @@ API per la gestione dei siti web, componenti e deploy
 import logging
 import os
 import sys
+import time
 import traceback
 from contextlib import asynccontextmanager
 
@@ -24,6 +25,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_BOOT_STARTED = time.perf_counter()
 logger.info("Inizializzazione backend...")
 
 # Rate Limiter (importato dal modulo dedicato per evitare import circolari)
@@ -97,137 +99,42 @@ class CORSMiddlewareCustom(BaseHTTPMiddleware):
 async def lifespan(app: FastAPI):
     """Gestione del ciclo di vita dell'applicazione"""
     logger.info("Avvio Site Builder API...")
+    from app.core.bootstrap import StartupSeeds, StartupTimer, ensure_schema
 
+    timer = StartupTimer(started=_BOOT_STARTED)
+    timer.record("import_app", time.perf_counter() - _BOOT_STARTED)
+
+    # Schema (estensioni, tabelle, colonne, RLS): saltato se il marker in app_state e' aggiornato
     if engine and Base:
         try:
             logger.info("Connessione al database...")
-            # Ensure required extensions exist before creating tables
-            from sqlalchemy import text as sql_text_ext
-            with engine.connect() as conn:
-                conn.execute(sql_text_ext("CREATE EXTENSION IF NOT EXISTS vector"))
-                conn.execute(sql_text_ext('CREATE EXTENSION IF NOT EXISTS "uuid-ossp"'))
-                conn.commit()
-            logger.info("Estensioni PostgreSQL (vector, uuid-ossp) verificate")
-
-            Base.metadata.create_all(bind=engine)
-            logger.info("Database inizializzato correttamente")
-
-            # Add new columns to existing tables (create_all doesn't ALTER)
-            from sqlalchemy import text as sql_text
-            migrations = [
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS password_reset_token VARCHAR",
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS password_reset_token_expires TIMESTAMP WITH TIME ZONE",
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS refines_used INTEGER DEFAULT 0",
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS refines_limit INTEGER DEFAULT 3",
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS pages_used INTEGER DEFAULT 0",
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS pages_limit INTEGER DEFAULT 1",
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS plan VARCHAR DEFAULT 'free'",
-                "ALTER TABLE sites ADD COLUMN IF NOT EXISTS qc_score FLOAT",
-                "ALTER TABLE sites ADD COLUMN IF NOT EXISTS qc_report JSON",
-                "ALTER TABLE sites ADD COLUMN IF NOT EXISTS generation_cost FLOAT",
-                "ALTER TABLE sites ADD COLUMN IF NOT EXISTS tokens_input INTEGER",
-                "ALTER TABLE sites ADD COLUMN IF NOT EXISTS tokens_output INTEGER",
-                "ALTER TABLE sites ADD COLUMN IF NOT EXISTS ai_model VARCHAR",
-                # Service tables (user_subscriptions, payment_history, service_catalog)
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS revolut_customer_id VARCHAR",
-                "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS revolut_payment_method_id VARCHAR",
-                "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS setup_order_id VARCHAR",
-                "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS activated_by VARCHAR",
-                "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS notes TEXT",
-                "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS cancelled_at TIMESTAMP WITH TIME ZONE",
-                "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE",
-                "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS current_period_start TIMESTAMP WITH TIME ZONE",
-                "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS current_period_end TIMESTAMP WITH TIME ZONE",
-                "ALTER TABLE user_subscriptions ADD COLUMN IF NOT EXISTS next_billing_date TIMESTAMP WITH TIME ZONE",
-            ]
-            with engine.connect() as conn:
-                for stmt in migrations:
-                    try:
-                        conn.execute(sql_text(stmt))
-                    except Exception:
-                        pass  # Column already exists or different DB dialect
-                conn.commit()
-            logger.info("Migrazioni colonne completate")
-
-            # Enable RLS on all tables (Supabase Security Advisor).
-            # The backend connects as `postgres` superuser which bypasses RLS.
-            # This blocks direct access via Supabase anon/authenticated roles.
-            rls_tables = [
-                "users", "sites", "site_versions", "components", "components_v2",
-                "generation_logs", "generation_log_components", "category_blueprints",
-                "service_catalog", "user_subscriptions", "payment_history",
-                "global_counters", "ad_leads", "ad_platform_configs", "ad_clients",
-                "ad_campaigns", "ad_optimization_logs", "ad_ai_activities",
-                "ad_metrics", "ad_wizard_progress", "ad_market_research",
-                "ad_strategies", "effect_usage",
-            ]
-            with engine.connect() as conn:
-                for table in rls_tables:
-                    try:
-                        conn.execute(sql_text(f'ALTER TABLE "{table}" ENABLE ROW LEVEL SECURITY'))
-                    except Exception:
-                        pass  # Table may not exist yet
-                conn.commit()
-            logger.info("RLS abilitato su tutte le tabelle")
+            ensure_schema(engine, Base.metadata, timer, force=settings.STARTUP_FORCE_MIGRATIONS)
         except Exception as e:
             logger.error(f"Errore connessione database: {e}")
             logger.error(traceback.format_exc())
     else:
         logger.warning("Database non disponibile - skip inizializzazione tabelle")
 
-    # Seed service catalog if empty
-    try:
-        from app.services.seed_services import seed_service_catalog
-        seed_service_catalog()
-    except Exception as e:
-        logger.warning(f"Seed catalogo servizi fallito: {e}")
-
-    # Seed category blueprints if empty
-    try:
-        from app.services.seed_category_blueprints import seed_category_blueprints
-        seed_category_blueprints()
-    except Exception as e:
-        logger.warning(f"Seed category blueprints fallito: {e}")
-
-    # Seed design knowledge (SQLite FTS5 store with BM25 ranking)
-    try:
-        from app.services.design_knowledge import get_collection_stats, get_category_guide
-        stats = get_collection_stats()
-        if stats.get("total_patterns", 0) == 0:
-            logger.info("Design knowledge vuoto - seeding...")
-            from app.services.seed_design_knowledge import seed_all
-            seed_all()
-            stats = get_collection_stats()
-            logger.info(f"Design knowledge seeded: {stats['total_patterns']} patterns")
-        else:
-            logger.info(f"Design knowledge ready: {stats['total_patterns']} patterns")
-
-        # Seed category design guides if not present
-        if not get_category_guide("restaurant"):
-            logger.info("Category design guides vuote - seeding...")
-            from app.services.seed_category_guides import seed_category_guides
-            count = seed_category_guides()
-            logger.info(f"Category design guides seeded: {count} categories")
-        else:
-            logger.info("Category design guides ready")
-
-        # Extract and index patterns from professional templates (skip if already seeded)
+    # Warm-up template Jinja2 v2 (precompilati o dalla bytecode cache)
+    if settings.USE_JINJA2_ASSEMBLER:
         try:
-            stats_after = get_collection_stats()
-            if stats_after.get("total_patterns", 0) < 800:
-                from app.services.extract_template_patterns import seed_extracted_patterns
-                tpl_count = seed_extracted_patterns()
-                if tpl_count > 0:
-                    logger.info(f"Template patterns indexed: {tpl_count}")
-            else:
-                logger.info("Template patterns already present, skipping extraction")
-        except Exception as e_tpl:
-            logger.warning(f"Template pattern extraction skipped: {e_tpl}")
-    except Exception as e:
-        logger.warning(f"Design knowledge non disponibile: {e}")
+            from app.services.jinja_assembler import jinja_assembler
+            with timer.phase("jinja_warm_up"):
+                jinja_assembler.warm_up()
+        except Exception as e:
+            logger.warning(f"Warm-up template Jinja2 fallito: {e}")
+
+    # Seed (catalogo, blueprints, design knowledge) in un thread, col server gia' in ascolto
+    seeds = StartupSeeds(engine, settings.STARTUP_FORCE_MIGRATIONS)
+    seeds.start()
+    app.state.startup_timings = timer.phases
+    logger.info(f"[Startup] Pronto: {timer.summary()}")
 
     yield
 
+    # Stop tra un passo e l'altro dei seed, poi attende il thread
+    await seeds.stop()
+
     # Cleanup: close AI client connections
     try:
         from app.services.kimi_client import kimi, kimi_refine
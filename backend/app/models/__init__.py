@@ -3,6 +3,7 @@ from app.models.site import Site
 from app.models.component import Component
 from app.models.site_version import SiteVersion
 from app.models.global_counter import GlobalCounter
+from app.models.app_state import AppState
 
 # Services & Payments
 from app.models.service import ServiceCatalog, UserSubscription, PaymentHistory
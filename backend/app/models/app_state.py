@@ -0,0 +1,14 @@
+"""Stato applicativo chiave/valore (marker di schema e seed dell'avvio)."""
+
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class AppState(Base):
+    __tablename__ = "app_state"
+
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
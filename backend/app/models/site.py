@@ -1,12 +1,34 @@
-"""Modello Sito Web"""
+"""Modello Sito Web
+
+L'HTML generato sta nel blob store (app/services/blob_store.py) quando e'
+configurato: html_ref ne tiene il riferimento. Altrimenti, e per le righe
+non ancora migrate (tools/migrate_site_html.py), resta nella colonna
+html_content (html_inline). Si legge e si scrive solo con get_html() e
+set_html(), chiamate esplicite perche' possono fare I/O di rete; le route
+async usano load_site_html()/store_site_html(). I blob che nessun sito
+referenzia piu' li cancella tools/gc_site_html.py.
+
+Le colonne pesanti sono deferred, in gruppi caricati (con una query) solo
+al primo accesso a una loro colonna:
+- "config": config (contiene tutto il site_data)
+- "code": custom_css, custom_js
+- "html": html_content legacy (html_inline)
+- "qc": qc_report
+Le liste usano load_only(*SITE_SUMMARY_COLUMNS).
+"""
+
+import logging
+from typing import Optional
 
 from sqlalchemy import Column, Integer, Float, String, Text, Boolean, DateTime, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 import enum
 
 from app.core.database import Base
 
+logger = logging.getLogger(__name__)
+
 
 class SiteStatus(str, enum.Enum):
     DRAFT = "draft"
@@ -25,9 +47,9 @@ class Site(Base):
     
     # Configurazione sito
     template = Column(String, default="default")
-    config = Column(JSON, default=dict)
-    custom_css = Column(Text)
-    custom_js = Column(Text)
+    config = deferred(Column(JSON, default=dict), group="config")
+    custom_css = deferred(Column(Text), group="code")
+    custom_js = deferred(Column(Text), group="code")
     
     # Stato
     status = Column(String, default=SiteStatus.DRAFT.value)
@@ -36,7 +58,8 @@ class Site(Base):
     
     # Preview
     thumbnail = Column(String)
-    html_content = Column(Text)  # HTML generato dall'AI
+    html_ref = Column(String, nullable=True)  # HTML generato dall'AI nel blob store ("r2:<sha256>")
+    html_inline = deferred(Column("html_content", Text), group="html")  # HTML legacy / fallback senza blob store
     
     # Generation progress tracking
     generation_step = Column(Integer, default=0)  # 0=idle, 1=analyzing, 2=generating, 3=reviewing
@@ -44,7 +67,7 @@ class Site(Base):
 
     # Quality Control
     qc_score = Column(Float, nullable=True)
-    qc_report = Column(JSON, nullable=True)
+    qc_report = deferred(Column(JSON, nullable=True), group="qc")
 
     # AI Cost tracking
     generation_cost = Column(Float, nullable=True)   # USD cost of generation
@@ -63,3 +86,34 @@ class Site(Base):
     # Timestamp
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    @property
+    def has_html(self) -> bool:
+        return bool(self.html_ref) or bool(self.html_inline)
+
+    def get_html(self) -> Optional[str]:
+        """L'HTML del sito: dal blob store (LRU, poi backend) o dalla colonna."""
+        if self.html_ref:
+            from app.services.blob_store import get_html
+
+            return get_html(self.html_ref)
+        return self.html_inline
+
+    def set_html(self, html: Optional[str]) -> None:
+        """Salva l'HTML nel blob store, o nella colonna se non c'e' o non risponde."""
+        from app.services.blob_store import BlobStoreError, put_html
+
+        ref = None
+        if html:
+            try:
+                ref = put_html(html)
+            except BlobStoreError as e:
+                logger.warning(f"[Blobs] Sito {self.id}: {e}, HTML salvato nella riga")
+        self.html_ref, self.html_inline = ref, (None if ref else html)
+
+
+# Colonne di SiteResponse (lista siti)
+SITE_SUMMARY_COLUMNS = (
+    Site.id, Site.name, Site.slug, Site.description, Site.status,
+    Site.is_published, Site.thumbnail, Site.created_at, Site.updated_at,
+)
@@ -1,6 +1,12 @@
-"""Modello Versione Sito - salva snapshot HTML ad ogni generazione/refine"""
+"""Modello Versione Sito - salva lo storico HTML ad ogni generazione/refine.
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+Ogni SNAPSHOT_INTERVAL versioni c'e' uno snapshot completo
+(html_content); le versioni intermedie salvano solo il diff compresso
+rispetto alla versione precedente (delta, base_version). Vedi
+app/services/site_versions.py.
+"""
+
+from sqlalchemy import Column, Integer, LargeBinary, String, Text, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -12,10 +18,16 @@ class SiteVersion(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     site_id = Column(Integer, ForeignKey("sites.id"), nullable=False)
-    html_content = Column(Text, nullable=False)
+    html_content = Column(Text, nullable=True)  # snapshot completo (NULL per i delta)
+    delta = Column(LargeBinary, nullable=True)  # diff compresso rispetto a base_version
+    base_version = Column(Integer, nullable=True)  # version_number su cui si applica il delta
     version_number = Column(Integer, nullable=False)
     change_description = Column(String, default="")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relazioni
     site = relationship("Site", backref="versions")
+
+    @property
+    def is_snapshot(self) -> bool:
+        return self.html_content is not None
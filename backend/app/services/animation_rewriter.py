@@ -0,0 +1,395 @@
+"""
+Animation Rewriter — one pass over the tags for every data-animate policy.
+
+The assembled page used to be rewritten three times, each with its own
+regexes: TemplateAssembler._apply_animation_map (Choreographer map),
+effect_diversifier.diversify_effects (inject/swap effects, one pass per
+element type) and databinding_generator._randomize_animations (eight
+re.sub passes). AnimationRewriter tokenizes the page once and runs the
+policies on each start tag, in this order:
+
+1. animation map: inside the first <section id="..."> of each mapped id,
+   the first h1 (else h2, else h3) without data-animate gets the heading
+   effect; CTA buttons/links, images and cards without one get theirs
+2. diversification: every section/heading/paragraph/image/CTA/card gets a
+   data-animate (or swaps its own, SWAP_PROBABILITY), headings/paragraphs/
+   cards get a data-delay staggered per <section>; skipped inside <nav>
+   and <head>
+3. randomization: the template defaults (text-split, blur-slide, bounce-in,
+   fade-up, scale-in) are swapped for equivalents, data-delay/duration/ease
+   get jitter
+
+Every random draw comes from one random.Random(seed), in document order, so
+the same seed and input give the same page. The contents of <script>,
+<style> and comments are not tags and are left alone. Tags are read up to
+their first '>' (like the regexes this replaces); markup inside attribute
+values is not visited.
+
+Usage:
+    from app.services.animation_rewriter import AnimationRewriter
+    rewriter = AnimationRewriter(animation_map=amap, used_effects=recent, randomize=True, seed=42)
+    html = rewriter.rewrite(html)          # can be called once per chunk, in order
+    rewriter.effects_used                  # {"h1": ["text-split"], "img": [...], ...}
+    rewriter.animate_values                # every data-animate value in the output
+"""
+
+import logging
+import random
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.config.variety_pools import ANIMATION_POOLS, EASE_VARIANTS
+from app.services.effect_diversifier import (
+    EFFECT_POOLS,
+    SWAP_PROBABILITY,
+    _build_animate_attr,
+    _pick_effect,
+)
+from app.services.tag_scan import TagPattern
+
+logger = logging.getLogger(__name__)
+
+_TAG_START_RE = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9-]*)')
+_RAW_TEXT_END_RES = {
+    "script": re.compile(r'</script\s*>', re.IGNORECASE),
+    "style": re.compile(r'</style\s*>', re.IGNORECASE),
+}
+# Diversification is skipped up to the first closing tag (as the old skip regexes)
+_NO_DIVERSIFY_END_RES = {
+    "nav": re.compile(r'</nav>', re.IGNORECASE),
+    "head": re.compile(r'</head>', re.IGNORECASE),
+}
+_SECTION_END_RE = re.compile(r'</section>', re.IGNORECASE)
+_ID_ATTR_RE = re.compile(r'(?<![\w-])id="([^"]*)"', re.IGNORECASE)
+_CLASS_ATTR_RE = re.compile(r'class="([^"]*)"', re.IGNORECASE)
+
+_ANIMATE_ATTR_RE = re.compile(r'data-animate="([^"]*)"')
+_SPLIT_TYPE_ATTR_RE = re.compile(r'\s*data-split-type="[^"]*"')
+_DELAY_ATTR_RE = re.compile(r'data-delay="([\d.]+)"')
+_DURATION_ATTR_RE = re.compile(r'data-duration="([\d.]+)"')
+_EASE_ATTR_RE = re.compile(r'data-ease="[^"]*"')
+
+# Animation map targets (first heading: h1, else h2, else h3)
+_MAP_HEADING_RES = [
+    TagPattern(rf'<{tag}\b(?![^>]*data-animate)[^>]*>', start=rf'<{tag}\b', exclude='data-animate',
+               flags=re.IGNORECASE)
+    for tag in ("h1", "h2", "h3")
+]
+_MAP_CTA_CLASS_RE = re.compile(r'class="[^"]*(?:btn|button|cta)[^"]*"', re.IGNORECASE)
+_MAP_CARD_CLASS_RE = re.compile(r'class="[^"]*(?:card|feature|service|pricing|team)[^"]*"', re.IGNORECASE)
+
+# Diversification targets: tag -> (pool, staggered delay)
+_DIVERSIFY_TAGS: Dict[str, Tuple[str, bool]] = {
+    "section": ("section_entrance", False),
+    "h1": ("h1", True),
+    "h2": ("h2", True),
+    "h3": ("h3", True),
+    "p": ("p", True),
+    "button": ("cta", False),
+}
+_CTA_LINK_CLASS_RE = re.compile(r'class="[^"]*(?:btn|cta|button|primary|action)[^"]*"', re.IGNORECASE)
+
+# Randomization: template default -> (tags, pool, probability of changing it)
+_RANDOMIZE_DEFAULTS: Dict[str, Tuple[frozenset, str, float]] = {
+    "text-split": (frozenset({"h1", "h2"}), "heading", 1.0),
+    "blur-slide": (frozenset({"p", "span"}), "subtitle", 1.0),
+    "bounce-in": (frozenset({"a", "button"}), "cta", 1.0),
+    # Only ~60% of the generic entrances, to keep some consistency
+    "fade-up": (frozenset({"div", "section", "article"}), "section", 0.6),
+    "scale-in": (frozenset({"img"}), "image", 1.0),
+}
+_EASE_PROBABILITY = 0.3
+
+
+class AnimationRewriter:
+    """Applies the animation map, diversification and randomization in one pass per call."""
+
+    def __init__(
+        self,
+        animation_map: Optional[Dict[str, Any]] = None,
+        used_effects: Optional[List[dict]] = None,
+        db_effects: Optional[Dict[str, List[str]]] = None,
+        diversify: bool = True,
+        randomize: bool = False,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.animation_map = {
+            section_id: effects for section_id, effects in (animation_map or {}).items()
+            if isinstance(effects, dict)
+        }
+        self.used_effects = used_effects
+        self.diversify = diversify
+        self.randomize = randomize
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.effects_used: Dict[str, List[str]] = {}
+        self.mapped_sections: List[str] = []
+        # data-animate values of every tag rewritten so far (GSAP engine modules)
+        self.animate_values: Set[str] = set()
+        self._delay_index = 0
+        self._section_end = -1
+
+        # Merge ChromaDB effects into local pools (db_effects take priority via prepend)
+        self.pools = dict(EFFECT_POOLS)
+        if db_effects:
+            for pool_key, effects in db_effects.items():
+                if pool_key in self.pools:
+                    self.pools[pool_key] = list(effects) + [e for e in self.pools[pool_key] if e not in effects]
+                else:
+                    self.pools[pool_key] = list(effects)
+            logger.info(f"[AnimationRewriter] Using {sum(len(v) for v in db_effects.values())} DB-sourced effects")
+
+    # ------------------------------------------------------------------
+    # Tag scan
+    # ------------------------------------------------------------------
+
+    def rewrite(self, html: str) -> str:
+        """Return html with every policy applied to each start tag."""
+        if not html:
+            return html
+        parts: List[str] = []
+        last = 0
+        pos = 0
+        no_diversify_until = -1
+        map_effects: Optional[Dict[str, Any]] = None
+        map_until = -1
+        map_heading_at = -1
+        dead_regions = set()
+        self._section_end = -1
+
+        while True:
+            lt = html.find("<", pos)
+            if lt < 0:
+                break
+            if html.startswith("<!--", lt):
+                end = html.find("-->", lt + 4)
+                if end < 0:
+                    break
+                pos = end + 3
+                continue
+            m = _TAG_START_RE.match(html, lt)
+            if not m:
+                pos = lt + 1
+                continue
+            gt = html.find(">", m.end())
+            if gt < 0:
+                break  # no later tag can be closed either
+            pos = gt + 1
+            if m.group(1):
+                continue  # end tag
+
+            name = m.group(2).lower()
+            attrs = html[m.end():gt]
+            close = ">"
+            if attrs.endswith("/"):
+                # " />" stays after any attribute added at the end
+                stripped = attrs[:-1].rstrip()
+                attrs, close = stripped, attrs[len(stripped):] + ">"
+
+            if lt >= map_until:
+                map_effects = None
+            if name == "section":
+                self._delay_index = 0
+                if self.animation_map:
+                    entered = self._enter_mapped_section(html, attrs, pos)
+                    if entered:
+                        map_effects, map_until, map_heading_at = entered
+            elif name in _NO_DIVERSIFY_END_RES and name not in dead_regions and html[m.end():m.end() + 1] in " \t\n\r\f>":
+                end = _NO_DIVERSIFY_END_RES[name].search(html, m.end())
+                if end:
+                    no_diversify_until = max(no_diversify_until, end.end())
+                else:
+                    dead_regions.add(name)
+
+            new_attrs = attrs
+            if map_effects is not None:
+                new_attrs = self._apply_map(name, new_attrs, map_effects, lt == map_heading_at)
+            if self.diversify and lt >= no_diversify_until:
+                new_attrs = self._apply_diversify(name, new_attrs)
+            if self.randomize:
+                new_attrs = self._apply_randomize(name, new_attrs)
+            if "data-animate" in new_attrs:
+                self.animate_values.update(_ANIMATE_ATTR_RE.findall(new_attrs))
+            if new_attrs != attrs:
+                parts.append(html[last:m.end()])
+                parts.append(new_attrs)
+                parts.append(close)
+                last = pos
+
+            if name in _RAW_TEXT_END_RES:
+                end = _RAW_TEXT_END_RES[name].search(html, pos)
+                if not end:
+                    break
+                pos = end.end()
+
+        if not parts:
+            return html
+        parts.append(html[last:])
+        return "".join(parts)
+
+    # ------------------------------------------------------------------
+    # 1. Animation map
+    # ------------------------------------------------------------------
+
+    def _enter_mapped_section(self, html: str, attrs: str, content_start: int) -> Optional[Tuple[Dict[str, Any], int, int]]:
+        """(effects, content end, offset of the heading to animate) for the first section of a mapped id."""
+        id_match = _ID_ATTR_RE.search(attrs)
+        if not id_match:
+            return None
+        section_id = id_match.group(1)
+        if section_id not in self.animation_map or section_id in self.mapped_sections:
+            return None
+        # The first '</section>' after the previous mapped section may still be
+        # the next one: each part of the page is searched once
+        if self._section_end < content_start:
+            end = _SECTION_END_RE.search(html, content_start)
+            self._section_end = end.start() if end else len(html)
+        if self._section_end >= len(html):
+            return None
+        content_end = self._section_end
+        self.mapped_sections.append(section_id)
+        effects = self.animation_map[section_id]
+        heading_at = -1
+        if effects.get("heading"):
+            content = html[content_start:content_end]
+            for heading_re in _MAP_HEADING_RES:
+                found = heading_re.search(content)
+                if found:
+                    heading_at = content_start + found.start()
+                    break
+        return effects, content_end, heading_at
+
+    @staticmethod
+    def _apply_map(name: str, attrs: str, effects: Dict[str, Any], is_heading: bool) -> str:
+        if "data-animate" in attrs.lower():
+            return attrs
+        effect = None
+        if is_heading:
+            effect = effects.get("heading")
+        elif name in ("a", "button") and _MAP_CTA_CLASS_RE.search(attrs):
+            effect = effects.get("cta")
+        elif name == "img":
+            effect = effects.get("image")
+        elif name == "div" and _MAP_CARD_CLASS_RE.search(attrs):
+            effect = effects.get("cards")
+        if not effect:
+            return attrs
+        return f'{attrs} data-animate="{effect}"'
+
+    # ------------------------------------------------------------------
+    # 2. Diversification
+    # ------------------------------------------------------------------
+
+    def _apply_diversify(self, name: str, attrs: str) -> str:
+        if name == "img":
+            if "data-animate" in attrs:
+                return attrs
+            effect = _pick_effect("img", self.used_effects, rng=self.rng)
+            self._record("img", effect)
+            return f' {_build_animate_attr(effect)}{attrs}'
+
+        if name in _DIVERSIFY_TAGS:
+            pool_key, add_delay = _DIVERSIFY_TAGS[name]
+        elif name == "a" and _CTA_LINK_CLASS_RE.search(attrs):
+            pool_key, add_delay = "cta", False
+        elif name == "div":
+            pool_key = self._div_pool(attrs)
+            if not pool_key:
+                return attrs
+            add_delay = pool_key == "card"
+        else:
+            return attrs
+        return self._inject_or_swap(attrs, pool_key, add_delay)
+
+    @staticmethod
+    def _div_pool(attrs: str) -> Optional[str]:
+        """Pool for a div by its classes: card, counter, decorative (None: left alone)."""
+        classes_match = _CLASS_ATTR_RE.search(attrs)
+        if not classes_match:
+            return None
+        classes = classes_match.group(1).lower()
+        if any(kw in classes for kw in ("card", "bento", "stagger-item", "feature-card", "pricing-card")):
+            return "card"
+        if "counter" in classes or "data-counter" in attrs.lower():
+            return "counter"
+        if any(kw in classes for kw in ("float", "decorative", "blob", "shape")):
+            return "decorative"
+        return None
+
+    def _inject_or_swap(self, attrs: str, pool_key: str, add_delay: bool) -> str:
+        """Inject an effect, swap the existing one (SWAP_PROBABILITY) or keep it."""
+        if "data-animate" not in attrs:
+            effect = _pick_effect(pool_key, self.used_effects, pools=self.pools, rng=self.rng)
+            delay_attr = ""
+            if add_delay:
+                delay = min(round(self._delay_index * 0.1, 1), 0.8)
+                self._delay_index += 1
+                if delay > 0:
+                    delay_attr = f' data-delay="{delay:.1f}"'
+            self._record(pool_key, effect)
+            return f' {_build_animate_attr(effect)}{delay_attr}{attrs}'
+
+        if self.rng.random() < SWAP_PROBABILITY:
+            effect = _pick_effect(pool_key, self.used_effects, pools=self.pools, rng=self.rng)
+            animate, _, split_type = effect.partition("|")
+            new_attrs = _ANIMATE_ATTR_RE.sub(f'data-animate="{animate}"', attrs)
+            if split_type:
+                if "data-split-type" in new_attrs:
+                    new_attrs = re.sub(r'data-split-type="[^"]*"', f'data-split-type="{split_type}"', new_attrs)
+                else:
+                    new_attrs += f' data-split-type="{split_type}"'
+            else:
+                # Remove stale split-type if new effect doesn't use it
+                new_attrs = _SPLIT_TYPE_ATTR_RE.sub("", new_attrs)
+            self._record(pool_key, effect)
+            return new_attrs
+
+        existing = _ANIMATE_ATTR_RE.search(attrs)
+        if existing:
+            self._record(pool_key, existing.group(1))
+        return attrs
+
+    def _record(self, pool_key: str, effect: str) -> None:
+        base = effect.split("|")[0]
+        used = self.effects_used.setdefault(pool_key, [])
+        if base not in used:
+            used.append(base)
+
+    # ------------------------------------------------------------------
+    # 3. Randomization
+    # ------------------------------------------------------------------
+
+    def _apply_randomize(self, name: str, attrs: str) -> str:
+        if "data-" not in attrs:
+            return attrs
+        rng = self.rng
+        current = _ANIMATE_ATTR_RE.search(attrs)
+        if current and current.group(1) in _RANDOMIZE_DEFAULTS:
+            tags, pool, probability = _RANDOMIZE_DEFAULTS[current.group(1)]
+            if name in tags and (probability >= 1.0 or rng.random() < probability):
+                anim = rng.choice(ANIMATION_POOLS[pool])
+                attrs = f'{attrs[:current.start()]}data-animate="{anim}"{attrs[current.end():]}'
+                # Keep data-split-type only for text-split/text-reveal
+                if pool == "heading" and anim not in ("text-split", "text-reveal"):
+                    attrs = _SPLIT_TYPE_ATTR_RE.sub("", attrs)
+
+        # data-delay +-0.1s, data-duration +-0.2s jitter
+        if "data-delay=" in attrs:
+            attrs = _DELAY_ATTR_RE.sub(lambda m: _jitter(m, "data-delay", 0.0, (-0.1, 0.15), rng), attrs)
+        if "data-duration=" in attrs:
+            attrs = _DURATION_ATTR_RE.sub(lambda m: _jitter(m, "data-duration", 0.3, (-0.2, 0.3), rng), attrs)
+        # Ease functions vary ~30% of the time
+        if "data-ease=" in attrs:
+            attrs = _EASE_ATTR_RE.sub(
+                lambda m: f'data-ease="{rng.choice(EASE_VARIANTS)}"' if rng.random() < _EASE_PROBABILITY else m.group(0),
+                attrs,
+            )
+        return attrs
+
+
+def _jitter(m: "re.Match[str]", attr: str, minimum: float, spread: Tuple[float, float], rng: random.Random) -> str:
+    try:
+        value = float(m.group(1))
+    except ValueError:
+        return m.group(0)
+    return f'{attr}="{max(minimum, value + rng.uniform(*spread)):.1f}"'
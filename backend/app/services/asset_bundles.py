@@ -0,0 +1,293 @@
+"""
+Shared asset bundles — content-hashed CSS/JS shared by published sites.
+
+Every published page used to carry its own copy of the same bytes: the
+head's core CSS (~21 KB), the Lenis bootstrap and the GSAP engine. The
+assembler marks those blocks with a data-bundle attribute:
+
+- <style data-bundle="core-css">: the static head CSS (the per-site :root
+  theme and per-style overrides stay in the next, unmarked <style>)
+- <script data-bundle="lenis-bootstrap">: Lenis smooth scroll set up for
+  the GSAP engine (window.lenis)
+- <script data-bundle="gsap-engine">: the page's tree-shaken engine, the
+  same bytes for every page with the same kept modules
+
+Pages are stored with the blocks inline, so previews, QC fixes and refine
+(refresh_engine, refresh_compiled_css) keep working on a self-contained
+page. At publish time link_bundles() swaps each block for a
+<link rel="stylesheet"> / <script src> at the same position, pointing at
+<name>.<sha256 prefix>.<ext>: the URL changes with the content, so the
+files are served with immutable caching and a browser reuses them across
+every site.
+
+The uploaded files are minified (deploy_optimizer), and the VPS receiver
+also gets their .gz/.br variants for nginx's gzip_static/brotli_static.
+File names follow the source bytes, so refresh_engine and friends still
+see the same names the published pages link to.
+
+The page's Google Fonts are self-hosted alongside (font_pipeline): their
+subsetted WOFF2 files are uploaded as bundles too, and the page gets
+@font-face rules pointing at them instead of the fonts.googleapis.com link.
+Fonts are fetched in CORS mode and the store is another origin than the
+site, so browsers drop them without Access-Control-Allow-Origin: the
+store's CORS is set up by tools/setup_assets_cors.py (R2) and by the
+equipe-assets router of vps-receiver/docker-compose.yml (VPS), and the
+Google link is only swapped once a font URL answers with that header
+(fonts_cross_origin_ok, checked once per process and base URL).
+
+publish_bundles() uploads the bundles a store doesn't have yet (once per
+process and file; the stores skip files they already have) to R2 when
+configured, else to the VPS receiver (assets.<SITE_BASE_DOMAIN>). The page
+stays inline when SHARED_ASSETS_MODE is "inline", the site's config has
+"inline_assets": true, no store is configured, or an upload fails.
+"""
+
+import asyncio
+import base64
+import hashlib
+import logging
+import re
+import threading
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+import httpx
+
+from app.core.config import settings
+from app.services.deploy_optimizer import minify_css, minify_js, precompress
+from app.services.tag_scan import ElementPattern
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_NAMES = ("core-css", "lenis-bootstrap", "gsap-engine")
+ASSETS_PREFIX = "assets"
+_DIGEST_LENGTH = 16
+
+BUNDLE_RE = ElementPattern(
+    r'<(?P<tag>style|script) data-bundle="(?P<bundle>[\w-]+)">\n?([\s\S]*?)</(?P=tag)>',
+    start=r'<(?P<name>style|script) data-bundle="',
+)
+
+_CONTENT_TYPES = {
+    "css": "text/css; charset=utf-8",
+    "js": "application/javascript; charset=utf-8",
+    "woff2": "font/woff2",
+}
+
+
+class Bundle(NamedTuple):
+    name: str
+    ext: str  # "css" | "js" | "woff2" (self-hosted fonts, font_pipeline)
+    content: Union[str, bytes]
+
+    @property
+    def binary(self) -> bool:
+        return isinstance(self.content, bytes)
+
+    @property
+    def digest(self) -> str:
+        data = self.content if self.binary else self.content.encode("utf-8")
+        return hashlib.sha256(data).hexdigest()[:_DIGEST_LENGTH]
+
+    @property
+    def filename(self) -> str:
+        return f"{self.name}.{self.digest}.{self.ext}"
+
+    @property
+    def content_type(self) -> str:
+        return _CONTENT_TYPES[self.ext]
+
+    def payload(self) -> bytes:
+        """The uploaded bytes: the content minified for its type (binary files as they are)."""
+        if self.binary:
+            return self.content
+        minify = minify_css if self.ext == "css" else minify_js
+        return minify(self.content).encode("utf-8")
+
+    def reference(self, base_url: str) -> str:
+        """The tag replacing the inline block (same position, same blocking behaviour)."""
+        url = f"{base_url.rstrip('/')}/{self.filename}"
+        if self.ext == "css":
+            return f'<link rel="stylesheet" href="{url}" data-bundle="{self.name}">'
+        return f'<script src="{url}" data-bundle="{self.name}"></script>'
+
+
+def _page_matches(html: str) -> Iterator[Tuple["re.Match[str]", Bundle]]:
+    for m in BUNDLE_RE.finditer(html):
+        if m.group("bundle") in BUNDLE_NAMES:
+            yield m, Bundle(m.group("bundle"), "css" if m.group("tag") == "style" else "js", m.group(3))
+
+
+def page_bundles(html: str) -> List[Bundle]:
+    """The shared bundles inlined in html, in document order."""
+    return [bundle for _, bundle in _page_matches(html)]
+
+
+def link_bundles(html: str, base_url: str) -> str:
+    """html with every inline shared bundle replaced by its URL reference."""
+    parts: List[str] = []
+    pos = 0
+    for m, bundle in _page_matches(html):
+        parts.append(html[pos:m.start()])
+        parts.append(bundle.reference(base_url))
+        pos = m.end()
+    if not parts:
+        return html
+    parts.append(html[pos:])
+    return "".join(parts)
+
+
+# ---------------------------------------------------------------------------
+# Stores
+# ---------------------------------------------------------------------------
+
+# "<store>:<filename>" already uploaded by this process
+_published: Set[str] = set()
+# Base URLs seen serving fonts with Access-Control-Allow-Origin
+_cors_ok: Set[str] = set()
+_published_lock = threading.Lock()
+
+
+def _store() -> Optional[str]:
+    """Where shared bundles go: "r2", "vps" or None (pages stay inline)."""
+    from app.services.r2_storage import is_r2_available
+
+    if settings.SHARED_ASSETS_MODE != "url":
+        return None
+    if is_r2_available() and settings.R2_PUBLIC_URL:
+        return "r2"
+    if settings.DEPLOY_TARGET == "vps" and settings.VPS_DEPLOY_URL and settings.VPS_DEPLOY_SECRET:
+        return "vps"
+    return None
+
+
+def bundles_base_url(store: str) -> str:
+    """Public URL prefix of the bundles in a store (SHARED_ASSETS_URL overrides it)."""
+    if settings.SHARED_ASSETS_URL:
+        return settings.SHARED_ASSETS_URL.rstrip("/")
+    if store == "r2":
+        return f"{settings.R2_PUBLIC_URL.rstrip('/')}/{ASSETS_PREFIX}"
+    return f"https://{ASSETS_PREFIX}.{settings.SITE_BASE_DOMAIN}"
+
+
+async def _upload_r2(bundles: List[Bundle]) -> bool:
+    from app.services.r2_storage import upload_immutable_to_r2
+
+    for bundle in bundles:
+        url = await asyncio.to_thread(
+            upload_immutable_to_r2,
+            f"{ASSETS_PREFIX}/{bundle.filename}",
+            bundle.payload(),
+            bundle.content_type,
+        )
+        if url is None:
+            return False
+    return True
+
+
+def _vps_asset(bundle: Bundle) -> dict:
+    payload = bundle.payload()
+    if bundle.binary:  # already compressed (WOFF2)
+        return {
+            "filename": bundle.filename,
+            "content": base64.b64encode(payload).decode("ascii"),
+            "encoding": "base64",
+        }
+    return {
+        "filename": bundle.filename,
+        "content": payload.decode("utf-8"),
+        "compressed": {ext: base64.b64encode(data).decode("ascii") for ext, data in precompress(payload).items()},
+    }
+
+
+async def _upload_vps(bundles: List[Bundle]) -> bool:
+    assets = await asyncio.to_thread(lambda: [_vps_asset(b) for b in bundles])
+    try:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            resp = await client.post(
+                f"{settings.VPS_DEPLOY_URL}/assets",
+                json={"assets": assets},
+                headers={"X-Deploy-Secret": settings.VPS_DEPLOY_SECRET},
+            )
+            resp.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.warning(f"[Bundles] Upload bundle su VPS fallito: {e}")
+        return False
+    return True
+
+
+_UPLOADERS = {"r2": _upload_r2, "vps": _upload_vps}
+
+
+async def fonts_cross_origin_ok(url: str) -> bool:
+    """Whether an uploaded font is served to a site's origin (Access-Control-Allow-Origin)."""
+    base_url = url.rsplit("/", 1)[0]
+    with _published_lock:
+        if base_url in _cors_ok:
+            return True
+    origin = f"https://www.{settings.SITE_BASE_DOMAIN}"
+    try:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            resp = await client.head(url, headers={"Origin": origin})
+    except httpx.HTTPError as e:
+        logger.warning(f"[Bundles] Verifica CORS dei font su {base_url} fallita: {e}")
+        return False
+    if resp.status_code != 200 or resp.headers.get("access-control-allow-origin") not in ("*", origin):
+        logger.warning(
+            f"[Bundles] Font su {base_url} senza Access-Control-Allow-Origin: la pagina resta su Google Fonts "
+            f"(tools/setup_assets_cors.py per R2, router equipe-assets per il VPS)"
+        )
+        return False
+    with _published_lock:
+        _cors_ok.add(base_url)
+    return True
+
+
+async def publish_bundles(html: str, inline: bool = False) -> str:
+    """html to publish: the shared bundles uploaded and linked by URL.
+
+    Returns html unchanged (inline fallback) when inline is set (per-site
+    mode), no store is configured or an upload fails.
+    """
+    from app.services.font_pipeline import self_host_fonts
+
+    store = None if inline else _store()
+    if store is None:
+        return html
+
+    source = html
+    base_url = bundles_base_url(store)
+    fonts_html, font_bundles = await asyncio.to_thread(self_host_fonts, html, base_url)
+    bundles = page_bundles(html) + font_bundles
+    if not bundles:
+        return html
+
+    unique: Dict[str, Bundle] = {bundle.filename: bundle for bundle in bundles}
+    with _published_lock:
+        missing = [b for name, b in unique.items() if f"{store}:{name}" not in _published]
+    if missing:
+        if not await _UPLOADERS[store](missing):
+            logger.warning("[Bundles] Bundle condivisi non disponibili: pagina pubblicata inline")
+            return source
+        with _published_lock:
+            _published.update(f"{store}:{b.filename}" for b in missing)
+        logger.info(
+            f"[Bundles] {len(missing)} bundle caricati su {store}: "
+            f"{', '.join(b.filename for b in missing)}"
+        )
+
+    # Self-hosted fonts only where the browser is allowed to use them
+    if font_bundles and await fonts_cross_origin_ok(f"{base_url}/{font_bundles[0].filename}"):
+        html = fonts_html
+    linked = link_bundles(html, base_url)
+    logger.info(
+        f"[Bundles] Pagina collegata a {len(unique)} bundle condivisi "
+        f"({len(source.encode('utf-8')) - len(linked.encode('utf-8'))} byte in meno)"
+    )
+    return linked
+
+
+def reset_published_bundles() -> None:
+    """Forget uploaded bundles and CORS checks (after switching store or clearing it)."""
+    with _published_lock:
+        _published.clear()
+        _cors_ok.clear()
@@ -0,0 +1,434 @@
+"""
+Blob store — site HTML kept out of the sites row.
+
+Site.html_content was a Text column on sites, so every ORM load of a Site
+(list_sites, the ownership checks of media/deploy/refine/status, admin
+listings) dragged the whole ~130-300 KB page along. With a blob store
+configured the page lives in a content-addressed store and the row only
+holds a reference (Site.html_ref), "<backend>:<sha256 of the HTML>":
+
+- R2BlobStore: objects "site-html/<sha256>" in HTML_BLOB_BUCKET, read
+  through the S3 API. The bucket must be a dedicated, private one:
+  R2_BUCKET_NAME is served publicly (R2_PUBLIC_URL), and drafts and
+  unpublished pages must not be reachable by URL, so it is refused.
+- LocalBlobStore: files under HTML_BLOB_DIR (default backend/storage/blobs),
+  <ab>/<sha256>, written atomically. Only with HTML_BLOB_STORE=local
+  (development, a persistent disk): on Render the disk is ephemeral.
+
+HTML_BLOB_STORE picks where new pages go: "r2", "local" or "inline". The
+default is r2 when HTML_BLOB_BUCKET and the R2 credentials are set, else
+inline: the page stays in the html_content column (Site.html_inline), as
+before the blob store, and nothing is lost on a redeploy.
+
+Blobs are zlib-compressed; the key is the hash of the uncompressed HTML,
+so identical pages share a blob, a put of a key already stored is
+skipped, and a key never goes stale. The backend named in the reference
+is the one read, so switching store doesn't break existing rows.
+
+get_html() goes through a bounded LRU (HTML_BLOB_CACHE_MB of HTML per
+process), so a refine or photo swap rereads the page it just wrote from
+memory. Reading a page from the store is network I/O: it happens only in
+the explicit calls Site.get_html()/Site.set_html() (sync code, threads)
+and load_site_html()/store_site_html() (async routes, blob I/O in a
+thread), never on plain attribute access.
+
+A blob is shared by every site with the same page, so replacing or
+deleting a page leaves its old blob in place. sweep_blobs() (run by
+tools/gc_site_html.py) deletes the blobs no site references any more,
+once they are older than a grace period: a page stored by a transaction
+that hasn't committed yet is still young, and a put of a blob already
+stored refreshes its age.
+
+Usage:
+    ref = put_html(html)      # "r2:9f86d0...", None when inline
+    html = get_html(ref)
+    html = await load_site_html(db, site)
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOB_DIR = Path(__file__).resolve().parent.parent.parent / "storage" / "blobs"
+R2_PREFIX = "site-html/"
+INLINE = "inline"
+
+
+class BlobStoreError(Exception):
+    """A blob that can't be stored or read (missing, backend unavailable)."""
+
+
+def blob_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class LocalBlobStore:
+    """Blobs as files under a directory, <digest[:2]>/<digest>."""
+
+    name = "local"
+
+    def __init__(self, root: Optional[Path] = None) -> None:
+        self.root = Path(root or settings.HTML_BLOB_DIR or DEFAULT_BLOB_DIR)
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def put(self, digest: str, data: bytes) -> None:
+        path = self._path(digest)
+        if path.is_file():
+            try:
+                os.utime(path)  # reused: not garbage for sweep_blobs() any more
+                return
+            except OSError:
+                pass  # vanished meanwhile: write it again
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            raise BlobStoreError(f"Scrittura blob {digest} fallita: {e}") from e
+
+    def get(self, digest: str) -> bytes:
+        try:
+            return self._path(digest).read_bytes()
+        except OSError as e:
+            raise BlobStoreError(f"Blob {digest} non leggibile: {e}") from e
+
+    def list(self) -> Iterator[Tuple[str, float]]:
+        """(digest, last modified timestamp) of every stored blob."""
+        for path in self.root.glob("??/*"):
+            if path.name.startswith(".tmp-"):
+                continue
+            try:
+                yield path.name, path.stat().st_mtime
+            except OSError:
+                continue  # deleted meanwhile
+
+    def modified(self, digest: str) -> Optional[float]:
+        try:
+            return self._path(digest).stat().st_mtime
+        except OSError:
+            return None
+
+    def delete(self, digest: str) -> None:
+        try:
+            self._path(digest).unlink(missing_ok=True)
+        except OSError as e:
+            raise BlobStoreError(f"Cancellazione blob {digest} fallita: {e}") from e
+
+
+class R2BlobStore:
+    """Blobs as objects in an R2 bucket, R2_PREFIX + digest."""
+
+    name = "r2"
+
+    def __init__(self, bucket: Optional[str] = None) -> None:
+        self.bucket = bucket or settings.HTML_BLOB_BUCKET
+        if not self.bucket:
+            raise BlobStoreError("HTML_BLOB_BUCKET non impostato")
+        if self.bucket == settings.R2_BUCKET_NAME:
+            raise BlobStoreError(
+                f"HTML_BLOB_BUCKET={self.bucket!r} e' il bucket pubblico degli upload, serve un bucket privato"
+            )
+
+    def _client(self):
+        from app.services.r2_storage import _get_s3_client
+
+        client = _get_s3_client()
+        if client is None:
+            raise BlobStoreError("R2 non configurato")
+        return client
+
+    def put(self, digest: str, data: bytes) -> None:
+        client = self._client()
+        key = R2_PREFIX + digest
+        headers = {"ContentType": "application/zlib", "CacheControl": "private, max-age=31536000, immutable"}
+        try:
+            client.head_object(Bucket=self.bucket, Key=key)
+        except Exception:
+            pass  # not in the bucket yet
+        else:
+            try:
+                # Reused: a server-side copy onto itself refreshes LastModified,
+                # so sweep_blobs() doesn't collect it
+                client.copy_object(
+                    Bucket=self.bucket, Key=key, CopySource={"Bucket": self.bucket, "Key": key},
+                    MetadataDirective="REPLACE", **headers,
+                )
+                return
+            except Exception:
+                pass  # upload it again
+        try:
+            client.put_object(Bucket=self.bucket, Key=key, Body=data, **headers)
+        except Exception as e:
+            raise BlobStoreError(f"Upload blob {digest} su R2 fallito: {e}") from e
+
+    def get(self, digest: str) -> bytes:
+        client = self._client()
+        try:
+            return client.get_object(Bucket=self.bucket, Key=R2_PREFIX + digest)["Body"].read()
+        except Exception as e:
+            raise BlobStoreError(f"Blob {digest} non leggibile da R2: {e}") from e
+
+    def list(self) -> Iterator[Tuple[str, float]]:
+        """(digest, last modified timestamp) of every stored blob."""
+        client = self._client()
+        try:
+            for page in client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=R2_PREFIX):
+                for obj in page.get("Contents", []):
+                    yield obj["Key"][len(R2_PREFIX):], obj["LastModified"].timestamp()
+        except Exception as e:
+            raise BlobStoreError(f"Elenco blob su R2 fallito: {e}") from e
+
+    def modified(self, digest: str) -> Optional[float]:
+        try:
+            head = self._client().head_object(Bucket=self.bucket, Key=R2_PREFIX + digest)
+        except Exception:
+            return None
+        return head["LastModified"].timestamp()
+
+    def delete(self, digest: str) -> None:
+        client = self._client()
+        try:
+            client.delete_object(Bucket=self.bucket, Key=R2_PREFIX + digest)
+        except Exception as e:
+            raise BlobStoreError(f"Cancellazione blob {digest} da R2 fallita: {e}") from e
+
+
+_BACKENDS = {"local": LocalBlobStore, "r2": R2BlobStore}
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+class BlobCache:
+    """Bounded LRU of fetched HTML by reference, limited by total size.
+
+    References are content hashes, so entries never need invalidating.
+    Hit/miss counters are cumulative; see stats().
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self._store: "OrderedDict[str, str]" = OrderedDict()
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, ref: str) -> Optional[str]:
+        with self._lock:
+            value = self._store.get(ref)
+            if value is None:
+                self.misses += 1
+                return None
+            self._store.move_to_end(ref)
+            self.hits += 1
+            return value
+
+    def put(self, ref: str, html: str) -> None:
+        if len(html) > self._max_bytes:
+            return
+        with self._lock:
+            old = self._store.pop(ref, None)
+            if old is not None:
+                self._size -= len(old)
+            self._store[ref] = html
+            self._size += len(html)
+            while self._size > self._max_bytes:
+                _, evicted = self._store.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._store.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._store),
+                "size": self._size,
+                "max_size": self._max_bytes,
+            }
+
+
+# ---------------------------------------------------------------------------
+# HTML
+# ---------------------------------------------------------------------------
+
+def _default_backend() -> str:
+    if settings.HTML_BLOB_STORE:
+        return settings.HTML_BLOB_STORE.lower()
+    from app.services.r2_storage import is_r2_available
+
+    return "r2" if settings.HTML_BLOB_BUCKET and is_r2_available() else INLINE
+
+
+def put_html(html: str) -> Optional[str]:
+    """Store a page in the configured backend; returns its reference (None: keep it inline)."""
+    store = get_blob_store()
+    if store is None:
+        return None
+    data = html.encode("utf-8")
+    digest = blob_digest(data)
+    store.put(digest, zlib.compress(data, 6))
+    ref = f"{store.name}:{digest}"
+    get_blob_cache().put(ref, html)
+    return ref
+
+
+def get_html(ref: str) -> str:
+    """The page of a reference (from the LRU, else from its backend)."""
+    cache = get_blob_cache()
+    html = cache.get(ref)
+    if html is not None:
+        return html
+    backend, _, digest = ref.partition(":")
+    if backend not in _BACKENDS or not digest:
+        raise BlobStoreError(f"Riferimento blob non valido: {ref!r}")
+    store = get_blob_store()
+    if store is None or store.name != backend:
+        store = _BACKENDS[backend]()
+    try:
+        data = zlib.decompress(store.get(digest))
+    except zlib.error as e:
+        raise BlobStoreError(f"Blob {digest} corrotto: {e}") from e
+    if blob_digest(data) != digest:
+        raise BlobStoreError(f"Blob {digest} corrotto: hash diverso")
+    html = data.decode("utf-8")
+    cache.put(ref, html)
+    return html
+
+
+def sweep_blobs(
+    referenced: Iterable[str],
+    min_age: float = 24 * 3600,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """Delete the blobs of the configured store that no site references.
+
+    referenced is every sites.html_ref, read before the sweep starts: a page
+    stored after that is younger than min_age (seconds) and kept, like any
+    blob put_html() stored or reused within min_age. The age is checked again
+    right before deleting. Returns the counts of blobs seen, kept and deleted.
+    """
+    store = get_blob_store()
+    if store is None:
+        raise BlobStoreError("Nessun blob store configurato")
+    prefix = f"{store.name}:"
+    keep = {ref[len(prefix):] for ref in referenced if ref and ref.startswith(prefix)}
+    cutoff = time.time() - min_age
+    stats = {"blobs": 0, "referenced": 0, "recent": 0, "deleted": 0}
+    for digest, modified in list(store.list()):
+        stats["blobs"] += 1
+        if digest in keep:
+            stats["referenced"] += 1
+            continue
+        if modified > cutoff:
+            stats["recent"] += 1
+            continue
+        # A put may have reused it since it was listed
+        modified = store.modified(digest)
+        if modified is None:
+            continue  # already gone
+        if modified > cutoff:
+            stats["recent"] += 1
+            continue
+        if not dry_run:
+            store.delete(digest)
+        stats["deleted"] += 1
+    logger.info(
+        f"[Blobs] Sweep '{store.name}': {stats['deleted']} blob non referenziati "
+        f"{'da cancellare' if dry_run else 'cancellati'} su {stats['blobs']}"
+    )
+    return stats
+
+
+async def load_site_html(db, site) -> Optional[str]:
+    """Site.get_html() for async routes (blob fetched in a thread)."""
+    if site.html_ref:
+        return await asyncio.to_thread(get_html, site.html_ref)
+    # Legacy row: the deferred html_content column, lazy-loaded inside run_sync
+    return await db.run_sync(lambda _session: site.html_inline)
+
+
+async def store_site_html(site, html: Optional[str]) -> None:
+    """Site.set_html() for async routes (blob stored in a thread)."""
+    await asyncio.to_thread(site.set_html, html)
+
+
+# ---------------------------------------------------------------------------
+# Singletons
+# ---------------------------------------------------------------------------
+
+_store = None
+_store_ready = False
+_cache: Optional[BlobCache] = None
+_lock = threading.Lock()
+
+
+def get_blob_store():
+    """The backend new pages are written to (HTML_BLOB_STORE), None when inline."""
+    global _store, _store_ready
+    if not _store_ready:
+        with _lock:
+            if not _store_ready:
+                backend = _default_backend()
+                _store = None
+                if backend in _BACKENDS:
+                    try:
+                        _store = _BACKENDS[backend]()
+                    except BlobStoreError as e:
+                        logger.warning(f"[Blobs] Blob store '{backend}' non utilizzabile: {e}")
+                elif backend != INLINE:
+                    logger.warning(f"[Blobs] HTML_BLOB_STORE={backend!r} sconosciuto")
+                if _store is None:
+                    logger.info("[Blobs] HTML dei siti nella colonna html_content (nessun blob store)")
+                else:
+                    logger.info(f"[Blobs] HTML dei siti su blob store '{_store.name}'")
+                _store_ready = True
+    return _store
+
+
+def get_blob_cache() -> BlobCache:
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = BlobCache(settings.HTML_BLOB_CACHE_MB * 1024 * 1024)
+    return _cache
+
+
+def reset_blob_store() -> None:
+    """Pick the backend again and empty the cache on next use (after changing settings)."""
+    global _store, _store_ready, _cache
+    with _lock:
+        _store = None
+        _store_ready = False
+        _cache = None
@@ -0,0 +1,300 @@
+"""
+Component Index — binary, lazily-decoded view of components.json.
+
+components.json (~300 KB) used to be JSON-parsed in full by every class that
+needed a single variant lookup. The index is built from it once (at build
+time, see tools/build_component_index.py) and memory-mapped at runtime:
+only the small header is parsed on load, each category's variant metadata is
+decoded on first access.
+
+File layout (components.idx, next to components.json):
+    b"CIDX" | u16 format version | u32 header length | header JSON | blobs
+The header holds the registry version, the source fingerprint (size, mtime,
+sha1), and per category: label, required, variant ids, blob offset/length.
+Each blob is the compact UTF-8 JSON of that category's variant list
+(id, file, name, description, placeholders, tags, ...).
+
+If the index is missing or stale, components.json is parsed directly
+(logged), so development checkouts keep working without a build step.
+
+Usage:
+    from app.services.component_index import get_component_index
+    index = get_component_index()
+    index.variant_ids("hero")            # no blob decoded
+    index.get_variant("hero-split-01")   # decodes only the "hero" category
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "components.idx"
+REGISTRY_FILENAME = "components.json"
+
+_MAGIC = b"CIDX"
+_FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct("<4sHI")  # magic, format version, header length
+
+_DEFAULT_COMPONENTS_DIR = Path(__file__).parent.parent / "components"
+
+
+def _source_fingerprint(registry_path: Path, data: Optional[bytes] = None) -> Dict[str, Any]:
+    stat = registry_path.stat()
+    if data is None:
+        data = registry_path.read_bytes()
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": hashlib.sha1(data).hexdigest(),
+    }
+
+
+def build_index(components_dir: Optional[Union[str, Path]] = None) -> Path:
+    """Build components.idx from components.json. Returns the index path.
+
+    Written to a temp file and renamed, so readers never see a partial index.
+    """
+    components_dir = Path(components_dir) if components_dir else _DEFAULT_COMPONENTS_DIR
+    registry_path = components_dir / REGISTRY_FILENAME
+    index_path = components_dir / INDEX_FILENAME
+
+    raw = registry_path.read_bytes()
+    registry = json.loads(raw.decode("utf-8"))
+
+    blobs: List[bytes] = []
+    categories: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    for name, cat_data in registry.get("categories", {}).items():
+        variants = cat_data.get("variants", [])
+        blob = json.dumps(variants, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        extra = {k: v for k, v in cat_data.items() if k != "variants"}
+        categories[name] = {
+            "meta": extra,
+            "ids": [v.get("id") for v in variants],
+            "offset": offset,
+            "length": len(blob),
+        }
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = json.dumps(
+        {
+            "registry": {k: v for k, v in registry.items() if k != "categories"},
+            "source": _source_fingerprint(registry_path, raw),
+            "categories": categories,
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+    tmp_path = index_path.with_suffix(".idx.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(_MAGIC, _FORMAT_VERSION, len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, index_path)
+    logger.info(
+        "[ComponentIndex] Built %s: %d categories, %d bytes",
+        index_path, len(categories), index_path.stat().st_size,
+    )
+    return index_path
+
+
+class ComponentIndex:
+    """Read-only registry of component categories and variants.
+
+    Thread-safe; decoded categories are memoized for the life of the process.
+    """
+
+    def __init__(self, components_dir: Optional[Union[str, Path]] = None) -> None:
+        self.components_dir = Path(components_dir) if components_dir else _DEFAULT_COMPONENTS_DIR
+        self._lock = threading.Lock()
+        self._mmap: Optional[mmap.mmap] = None
+        self._data_start = 0
+        self._registry_meta: Dict[str, Any] = {}
+        self._categories: Dict[str, Dict[str, Any]] = {}
+        self._variant_category: Dict[str, str] = {}
+        self._decoded: Dict[str, List[Dict[str, Any]]] = {}
+        self.source = "empty"  # "index", "json" or "empty"
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _load(self) -> None:
+        registry_path = self.components_dir / REGISTRY_FILENAME
+        index_path = self.components_dir / INDEX_FILENAME
+        if index_path.exists() and self._open_index(index_path, registry_path):
+            self.source = "index"
+        elif registry_path.exists():
+            logger.warning(
+                "[ComponentIndex] %s missing or stale, parsing %s "
+                "(run tools/build_component_index.py)",
+                INDEX_FILENAME, REGISTRY_FILENAME,
+            )
+            self._load_json(registry_path)
+            self.source = "json"
+        else:
+            logger.warning("[ComponentIndex] No components registry in %s", self.components_dir)
+        for name, cat in self._categories.items():
+            for variant_id in cat["ids"]:
+                self._variant_category.setdefault(variant_id, name)
+
+    def _open_index(self, index_path: Path, registry_path: Path) -> bool:
+        try:
+            with open(index_path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, header_len = _PREAMBLE.unpack_from(mm, 0)
+            if magic != _MAGIC or version != _FORMAT_VERSION:
+                mm.close()
+                return False
+            start = _PREAMBLE.size
+            header = json.loads(mm[start:start + header_len].decode("utf-8"))
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"[ComponentIndex] Unreadable index {index_path}: {e}")
+            return False
+
+        if registry_path.exists() and not self._is_current(header.get("source", {}), registry_path):
+            mm.close()
+            return False
+
+        self._mmap = mm
+        self._data_start = start + header_len
+        self._registry_meta = header.get("registry", {})
+        self._categories = header.get("categories", {})
+        return True
+
+    @staticmethod
+    def _is_current(source: Dict[str, Any], registry_path: Path) -> bool:
+        stat = registry_path.stat()
+        if stat.st_size != source.get("size"):
+            return False
+        if stat.st_mtime_ns == source.get("mtime_ns"):
+            return True
+        # Checkouts/copies change mtimes: fall back to the content hash
+        return hashlib.sha1(registry_path.read_bytes()).hexdigest() == source.get("sha1")
+
+    def _load_json(self, registry_path: Path) -> None:
+        with open(registry_path, "r", encoding="utf-8") as f:
+            registry = json.load(f)
+        self._registry_meta = {k: v for k, v in registry.items() if k != "categories"}
+        for name, cat_data in registry.get("categories", {}).items():
+            variants = cat_data.get("variants", [])
+            self._categories[name] = {
+                "meta": {k: v for k, v in cat_data.items() if k != "variants"},
+                "ids": [v.get("id") for v in variants],
+            }
+            self._decoded[name] = variants
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    @property
+    def version(self) -> str:
+        return self._registry_meta.get("version", "")
+
+    def categories(self) -> List[str]:
+        """Category names in registry order."""
+        return list(self._categories)
+
+    def category_meta(self, category: str) -> Dict[str, Any]:
+        """Category fields other than variants (label, required, ...)."""
+        cat = self._categories.get(category)
+        return dict(cat["meta"]) if cat else {}
+
+    def variant_ids(self, category: str) -> List[str]:
+        """Variant ids of a category, without decoding its metadata."""
+        cat = self._categories.get(category)
+        return list(cat["ids"]) if cat else []
+
+    def all_variant_ids(self) -> Dict[str, List[str]]:
+        """{category: [variant_id, ...]} for all categories."""
+        return {name: list(cat["ids"]) for name, cat in self._categories.items()}
+
+    def category_of(self, variant_id: str) -> Optional[str]:
+        return self._variant_category.get(variant_id)
+
+    def variants(self, category: str) -> List[Dict[str, Any]]:
+        """Full variant metadata of one category (decoded on first access).
+
+        The returned dicts are shared: callers must not mutate them.
+        """
+        decoded = self._decoded.get(category)
+        if decoded is not None:
+            return decoded
+        cat = self._categories.get(category)
+        if cat is None or self._mmap is None:
+            return []
+        with self._lock:
+            decoded = self._decoded.get(category)
+            if decoded is None:
+                start = self._data_start + cat["offset"]
+                decoded = json.loads(self._mmap[start:start + cat["length"]].decode("utf-8"))
+                self._decoded[category] = decoded
+        return decoded
+
+    def get_variant(self, variant_id: str) -> Optional[Dict[str, Any]]:
+        """Metadata for a variant (file, placeholders, tags, ...) or None."""
+        category = self._variant_category.get(variant_id)
+        if category is None:
+            return None
+        for variant in self.variants(category):
+            if variant.get("id") == variant_id:
+                return variant
+        return None
+
+    def variant_file(self, variant_id: str) -> Optional[str]:
+        variant = self.get_variant(variant_id)
+        return variant.get("file") if variant else None
+
+    def placeholders(self, variant_id: str) -> List[str]:
+        variant = self.get_variant(variant_id)
+        return list(variant.get("placeholders", [])) if variant else []
+
+    def to_registry(self) -> Dict[str, Any]:
+        """Materialize the full components.json structure (decodes everything)."""
+        return {
+            **self._registry_meta,
+            "categories": {
+                name: {**cat["meta"], "variants": self.variants(name)}
+                for name, cat in self._categories.items()
+            },
+        }
+
+    def decoded_categories(self) -> List[str]:
+        """Categories decoded so far (for diagnostics/tests)."""
+        return list(self._decoded)
+
+
+_indexes: Dict[str, ComponentIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_component_index(components_dir: Optional[Union[str, Path]] = None) -> ComponentIndex:
+    """Process-wide shared ComponentIndex for a components directory."""
+    key = str(Path(components_dir).resolve() if components_dir else _DEFAULT_COMPONENTS_DIR.resolve())
+    index = _indexes.get(key)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(key)
+            if index is None:
+                index = ComponentIndex(components_dir)
+                _indexes[key] = index
+    return index
+
+
+def reset_component_index() -> None:
+    """Drop the shared indexes (after rebuilding the index or editing the registry)."""
+    with _indexes_lock:
+        _indexes.clear()
@@ -21,6 +21,7 @@ Pipeline:
 """
 
 import asyncio
+import functools
 import json
 import logging
 import os
@@ -32,7 +33,12 @@ from typing import Dict, Any, Optional, List, Callable
 from app.core.config import settings
 from app.services.kimi_client import kimi, kimi_refine, kimi_text
 from app.services.template_assembler import assembler as template_assembler
+from app.services.html_document import parse_html
+from app.services.animation_rewriter import AnimationRewriter
+from app.services.tag_scan import ElementPattern, TagPattern, sub_closed_tags
+from app.services.images.responsive import add_image_manifests
 from app.services.sanitizer import sanitize_input, sanitize_output
+from app.services.tailwind_compiler import compile_page
 from app.services.quality_control import qc_pipeline
 from app.services.generation_tracker import (
     get_recently_used,
@@ -66,7 +72,7 @@ except Exception:
 
 # Design knowledge (SQLite FTS5) - graceful fallback if not available
 try:
-    from app.services.design_knowledge import get_creative_context, get_collection_stats
+    from app.services.design_knowledge import get_creative_context, get_collection_stats, is_ready as _design_knowledge_ready
     _has_design_knowledge = True
 except Exception:
     _has_design_knowledge = False
@@ -126,9 +132,7 @@ logger = logging.getLogger(__name__)
 from app.config.variety_pools import (
     PERSONALITY_POOL, COLOR_MOOD_POOL, FONT_PAIRING_POOL,
     FALLBACK_THEME_POOL, FEW_SHOT_EXAMPLES, _CATEGORY_FALLBACK_TEXTS,
-    ANIMATION_POOLS as _ANIMATION_POOLS,
     STAGGER_VARIANTS as _STAGGER_VARIANTS,
-    EASE_VARIANTS as _EASE_VARIANTS,
 )
 from app.config.style_maps import (
     CATEGORY_TONES, STYLE_TONE_MAP, STYLE_VARIANT_MAP,
@@ -272,109 +276,28 @@ def _build_few_shot_block(category: str) -> str:
     return "\n".join(lines)
 
 
-def _randomize_animations(html: str) -> str:
-    """Randomize GSAP data-animate attributes for per-site animation uniqueness.
-
-    Replaces specific animation values with alternatives from equivalent pools.
-    Also varies data-delay and data-duration slightly.
-    """
-    import re as _re
-
-    # Replace heading animations (h1, h2 with text-split)
-    def _vary_heading_anim(m):
-        prefix = m.group(1)
-        anim = random.choice(_ANIMATION_POOLS["heading"])
-        # Keep data-split-type only for text-split/text-reveal
-        suffix = m.group(0)[len(m.group(1)) + len('data-animate="text-split"'):]
-        if anim not in ("text-split", "text-reveal") and 'data-split-type' in suffix:
-            suffix = _re.sub(r'\s*data-split-type="[^"]*"', '', suffix)
-        return f'{prefix}data-animate="{anim}"{suffix}'
-
-    html = _re.sub(
-        r'(<h[12][^>]*?)data-animate="text-split"([^>]*)',
-        _vary_heading_anim,
-        html,
-    )
-
-    # Replace subtitle animations (p, span with blur-slide)
-    def _vary_subtitle(m):
-        anim = random.choice(_ANIMATION_POOLS["subtitle"])
-        return f'{m.group(1)}data-animate="{anim}"{m.group(2)}'
-
-    html = _re.sub(
-        r'(<(?:p|span)[^>]*?)data-animate="blur-slide"([^>]*)',
-        _vary_subtitle,
-        html,
-    )
-
-    # Replace CTA animations (a, button with bounce-in)
-    def _vary_cta(m):
-        anim = random.choice(_ANIMATION_POOLS["cta"])
-        return f'{m.group(1)}data-animate="{anim}"{m.group(2)}'
-
-    html = _re.sub(
-        r'(<(?:a|button)[^>]*?)data-animate="bounce-in"([^>]*)',
-        _vary_cta,
-        html,
-    )
+# _is_section_empty(): blocks stripped before measuring the visible text
+_STYLE_BLOCK_RE = ElementPattern(r'<style[^>]*>.*?</style>', start='<style', flags=re.DOTALL)
+_SCRIPT_BLOCK_RE = ElementPattern(r'<script[^>]*>.*?</script>', start='<script', flags=re.DOTALL)
+_HEADING_BLOCK_RE = ElementPattern(r'<h[1-3][^>]*>(.*?)</h[1-3]>', start='<h[1-3]', flags=re.DOTALL)
+_ANY_TAG_RE = re.compile(r'<[^>]+>')
 
-    # Replace generic fade-up with varied section entrances (on divs/sections)
-    def _vary_section_entrance(m):
-        # Only vary ~60% of the time to keep some consistency
-        if random.random() < 0.6:
-            anim = random.choice(_ANIMATION_POOLS["section"])
-            return f'{m.group(1)}data-animate="{anim}"{m.group(2)}'
-        return m.group(0)
-
-    html = _re.sub(
-        r'(<(?:div|section|article)[^>]*?)data-animate="fade-up"([^>]*)',
-        _vary_section_entrance,
-        html,
-    )
-
-    # Vary image animations
-    def _vary_image(m):
-        anim = random.choice(_ANIMATION_POOLS["image"])
-        return f'{m.group(1)}data-animate="{anim}"{m.group(2)}'
 
-    html = _re.sub(
-        r'(<img[^>]*?)data-animate="scale-in"([^>]*)',
-        _vary_image,
-        html,
-    )
+@functools.lru_cache(maxsize=None)
+def _empty_div_pattern(pattern: str) -> TagPattern:
+    """Empty-container check of _is_section_empty, tried only on <div tags with a class/data-animate."""
+    return TagPattern(pattern, start='<div', require=r'class="|data-animate=', flags=re.DOTALL)
 
-    # Vary data-delay values slightly (add +-0.1s jitter)
-    def _vary_delay(m):
-        try:
-            val = float(m.group(1))
-            jittered = max(0, val + random.uniform(-0.1, 0.15))
-            return f'data-delay="{jittered:.1f}"'
-        except ValueError:
-            return m.group(0)
-
-    html = _re.sub(r'data-delay="([\d.]+)"', _vary_delay, html)
-
-    # Vary data-duration values slightly (add +-0.2s jitter)
-    def _vary_duration(m):
-        try:
-            val = float(m.group(1))
-            jittered = max(0.3, val + random.uniform(-0.2, 0.3))
-            return f'data-duration="{jittered:.1f}"'
-        except ValueError:
-            return m.group(0)
 
-    html = _re.sub(r'data-duration="([\d.]+)"', _vary_duration, html)
-
-    # Randomly vary ease functions (~30% of the time)
-    def _vary_ease(m):
-        if random.random() < 0.3:
-            ease = random.choice(_EASE_VARIANTS)
-            return f'data-ease="{ease}"'
-        return m.group(0)
-
-    html = _re.sub(r'data-ease="[^"]*"', _vary_ease, html)
+def _randomize_animations(html: str, seed: Optional[int] = None) -> str:
+    """Randomize GSAP data-animate attributes for per-site animation uniqueness.
 
-    return html
+    Replaces specific animation values with alternatives from equivalent pools.
+    Also varies data-delay and data-duration slightly. The randomization
+    policy of AnimationRewriter, run on its own (the legacy assembler runs
+    it together with the animation map and the effect diversifier).
+    """
+    return AnimationRewriter(diversify=False, randomize=True, seed=seed).rewrite(html)
 
 
 def _jitter_rem(base_rem: str, delta_range: float = 0.8) -> str:
@@ -1828,7 +1751,7 @@ Return ONLY the JSON object."""
 
         # === QUERY DESIGN KNOWLEDGE (local, instant) ===
         creative_context = ""
-        if _has_design_knowledge:
+        if _has_design_knowledge and _design_knowledge_ready():
             try:
                 stats = get_collection_stats()
                 if stats.get("total_patterns", 0) > 0:
@@ -2428,26 +2351,37 @@ RULES:
                 logger.warning(f"[DataBinding] Could not fetch recent effects: {e}")
                 site_data["_recent_effects"] = []
 
+        # One seed for every random animation pick of this page (logged so a
+        # generation can be reproduced by passing it back in site_data)
+        site_data.setdefault("_animation_seed", random.randrange(2 ** 32))
+        site_data["_randomize_animations"] = True
+        logger.info(f"[DataBinding] Animation seed: {site_data['_animation_seed']}")
+
         try:
             # Feature flag: use new Jinja2 assembler (v2) or legacy template assembler
+            html_content = None
             if settings.USE_JINJA2_ASSEMBLER:
                 try:
-                    from app.services.jinja_assembler import JinjaAssembler
-                    jinja = JinjaAssembler()
+                    from app.services.jinja_assembler import jinja_assembler
                     # Convert legacy site_data format to Jinja2 format
                     jinja_data = self._convert_to_jinja_format(site_data)
-                    html_content = jinja.assemble(jinja_data)
+                    html_content = jinja_assembler.assemble(jinja_data)
                     logger.info("[DataBinding] Using Jinja2 assembler (v2)")
                 except Exception as jinja_err:
                     logger.warning(f"[DataBinding] Jinja2 assembler failed, falling back to legacy: {jinja_err}")
-                    html_content = self.assembler.assemble(site_data)
+            if html_content is not None:
+                html_content = sanitize_output(html_content, is_template_assembled=True)
+                # Post-process: randomize GSAP animations for per-site uniqueness
+                html_content = _randomize_animations(html_content, seed=site_data["_animation_seed"])
+                # Post-process: remove empty sections (better no section than blank space)
+                html_content = self._post_process_html(html_content)
             else:
-                html_content = self.assembler.assemble(site_data)
-            html_content = sanitize_output(html_content, is_template_assembled=True)
-            # Post-process: randomize GSAP animations for per-site uniqueness
-            html_content = _randomize_animations(html_content)
-            # Post-process: remove empty sections (better no section than blank space)
-            html_content = self._post_process_html(html_content)
+                # Legacy assembler streams the page: same passes, run per chunk
+                html_content = await self._assemble_streaming(
+                    site_data, on_progress=on_progress if site_id else None,
+                )
+            # Tailwind CDN script -> the page's compiled CSS
+            html_content = compile_page(html_content)
         except Exception as e:
             logger.exception("[DataBinding] Assembly failed")
             if _effect_db:
@@ -3374,6 +3308,37 @@ RULES:
 
     # ----- Post-processing: remove empty sections -----
 
+    async def _assemble_streaming(
+        self,
+        site_data: Dict[str, Any],
+        on_progress: Optional[Callable] = None,
+    ) -> str:
+        """Assemble with the legacy assembler's chunk stream.
+
+        Each chunk is animated, sanitized and cleaned of empty sections on its
+        own. Joined, the chunks are the same page as assemble() followed by a
+        whole-page sanitize_output() and _post_process_html(): there is a
+        single AnimationRewriter (one seeded rng, one delay counter) walking
+        the chunks in document order (site_data["_randomize_animations"] is
+        set, so it also randomizes), and every section is a chunk of its own,
+        so per-chunk filtering removes the same sections (a removed chunk also
+        drops its blank-line separator, nothing else differs). The caller compiles
+        the CSS afterwards, from the filtered page. When the first screen
+        (head, nav, first section) is ready on_progress gets a flag only: the
+        HTML itself would end up in every status poll.
+        """
+        chunks: List[str] = []
+        async for chunk in self.assembler.assemble_stream(
+            site_data, post_process=self._post_process_html,
+        ):
+            chunks.append(chunk)
+            if on_progress and len(chunks) == 3:
+                on_progress(6, "Assemblaggio sezioni...", {
+                    "phase": "assembling",
+                    "first_screen_ready": True,
+                })
+        return "".join(chunks)
+
     def _post_process_html(self, html: str) -> str:
         """Scan assembled HTML for empty sections and remove them entirely.
 
@@ -3392,62 +3357,19 @@ RULES:
         # that would appear as visible text to the user
         html = re.sub(r'\{\{[A-Z_]+\}\}', '', html)
 
-        # Find all <section ...>...</section> blocks (including nested divs)
-        # Use a balanced approach: find section tags and track nesting
-        result_parts = []
-        pos = 0
-        section_pattern = re.compile(r'<section\b[^>]*>', re.IGNORECASE)
-
-        while pos < len(html):
-            match = section_pattern.search(html, pos)
-            if not match:
-                # No more sections - append rest of html
-                result_parts.append(html[pos:])
-                break
-
-            # Append content before this section
-            result_parts.append(html[pos:match.start()])
-
-            # Find the matching </section> (handle nesting)
-            section_start = match.start()
-            depth = 1
-            search_pos = match.end()
-            while depth > 0 and search_pos < len(html):
-                open_tag = html.find('<section', search_pos)
-                close_tag = html.find('</section>', search_pos)
-
-                if close_tag == -1:
-                    # No closing tag found - broken HTML, keep everything
-                    search_pos = len(html)
-                    break
-
-                if open_tag != -1 and open_tag < close_tag:
-                    depth += 1
-                    search_pos = open_tag + 8  # len('<section')
-                else:
-                    depth -= 1
-                    if depth == 0:
-                        section_end = close_tag + len('</section>')
-                        break
-                    search_pos = close_tag + len('</section>')
-            else:
-                section_end = len(html)
-
-            section_html = html[section_start:section_end]
-
+        # Outermost <section> blocks, balanced (nested sections stay inside).
+        # An unclosed section would run to the end of the page: broken HTML,
+        # kept as is
+        doc = parse_html(html)
+        empty_sections = []
+        for section in doc.sections(("section",), closed_only=True):
             # Check if this section is empty (has heading but no real content)
-            if self._is_section_empty(section_html):
-                # Extract section id for logging
-                id_match = re.search(r'id=["\']([^"\']+)["\']', section_html)
-                section_id = id_match.group(1) if id_match else "unknown"
+            if self._is_section_empty(doc.slice(section)):
+                section_id = section.id or "unknown"
                 logger.info(f"[DataBinding] Post-process: removing empty section '{section_id}'")
-                # Skip this section (don't add to result)
-            else:
-                result_parts.append(section_html)
+                empty_sections.append(section)
 
-            pos = section_end
-
-        return "".join(result_parts)
+        return doc.remove(empty_sections)
 
     def _is_section_empty(self, section_html: str) -> bool:
         """Determine if a section is empty (has heading but no meaningful content).
@@ -3473,9 +3395,9 @@ RULES:
             return False
 
         # Strip HTML tags to get visible text content
-        text_only = re.sub(r'<style[^>]*>.*?</style>', '', section_html, flags=re.DOTALL)
-        text_only = re.sub(r'<script[^>]*>.*?</script>', '', text_only, flags=re.DOTALL)
-        text_only = re.sub(r'<[^>]+>', ' ', text_only)
+        text_only = _STYLE_BLOCK_RE.sub('', section_html)
+        text_only = _SCRIPT_BLOCK_RE.sub('', text_only)
+        text_only = sub_closed_tags(_ANY_TAG_RE, ' ', text_only)
         text_only = re.sub(r'\s+', ' ', text_only).strip()
 
         # If very little visible text (less than 30 chars), it's likely empty
@@ -3492,14 +3414,19 @@ RULES:
         # Content density check: if the section has a heading (h2/h3) but the content
         # OUTSIDE headings has very little text, it's a "shell" section with only a title
         heading_text = ""
-        for m in re.finditer(r'<h[1-3][^>]*>(.*?)</h[1-3]>', section_html, re.DOTALL):
-            heading_text += re.sub(r'<[^>]+>', '', m.group(1)) + " "
+        for m in _HEADING_BLOCK_RE.finditer(section_html):
+            heading_text += sub_closed_tags(_ANY_TAG_RE, '', m.group(1)) + " "
         heading_text = re.sub(r'\s+', ' ', heading_text).strip()
 
-        if heading_text and len(heading_text) > 10:
+        heading_words = heading_text.split()
+        # Each removed word takes away only its own characters: when the text
+        # without spaces is 40+ chars longer than the heading words, the
+        # per-word replace loop below (O(words x text)) can't find a shell
+        text_chars = len(text_only) - text_only.count(" ")
+        if heading_text and len(heading_text) > 10 and text_chars - sum(map(len, heading_words)) < 40:
             # Text outside headings (subtitle + items) should be substantial
             non_heading_text = text_only
-            for word in heading_text.split():
+            for word in heading_words:
                 non_heading_text = non_heading_text.replace(word, "", 1)
             non_heading_text = non_heading_text.strip()
             if len(non_heading_text) < 40:
@@ -3513,9 +3440,8 @@ RULES:
         # These patterns catch the case where a REPEAT block rendered "" (no items)
 
         # Pattern 1: Empty grid containers - <div class="grid ...">  \n  </div>
-        empty_grid = re.compile(
+        empty_grid = _empty_div_pattern(
             r'<div[^>]*class="[^"]*\bgrid\b[^"]*"[^>]*>\s*</div>',
-            re.DOTALL,
         )
         if empty_grid.search(section_html):
             return True
@@ -3529,17 +3455,15 @@ RULES:
             return True
 
         # Pattern 3: Empty space-y containers
-        empty_space = re.compile(
+        empty_space = _empty_div_pattern(
             r'<div[^>]*class="[^"]*\bspace-y-\d+\b[^"]*"[^>]*>\s*</div>',
-            re.DOTALL,
         )
         if empty_space.search(section_html):
             return True
 
         # Pattern 4: Empty svc-tab-panels (tabs template)
-        empty_tabs = re.compile(
+        empty_tabs = _empty_div_pattern(
             r'<div[^>]*class="[^"]*svc-tab-panels[^"]*"[^>]*>\s*</div>',
-            re.DOTALL,
         )
         if empty_tabs.search(section_html):
             return True
@@ -3551,40 +3475,35 @@ RULES:
                 return True
 
         # Pattern 6: Empty CSS columns containers (masonry layouts)
-        empty_columns = re.compile(
+        empty_columns = _empty_div_pattern(
             r'<div[^>]*class="[^"]*\bcolumns-\d+\b[^"]*"[^>]*>\s*</div>',
-            re.DOTALL,
         )
         if empty_columns.search(section_html):
             return True
         # Also catch columns with sm:/md: prefixes
-        empty_columns_responsive = re.compile(
+        empty_columns_responsive = _empty_div_pattern(
             r'<div[^>]*class="[^"]*\b(?:sm:|md:|lg:)?columns-\d+\b[^"]*"[^>]*>\s*</div>',
-            re.DOTALL,
         )
         if empty_columns_responsive.search(section_html):
             return True
 
         # Pattern 7: Empty flex containers that should hold items
-        empty_flex = re.compile(
+        empty_flex = _empty_div_pattern(
             r'<div[^>]*class="[^"]*\bflex\b[^"]*\bgap-\d+\b[^"]*"[^>]*>\s*</div>',
-            re.DOTALL,
         )
         if empty_flex.search(section_html):
             return True
 
         # Pattern 8: Empty marquee/scroll containers
-        empty_marquee = re.compile(
+        empty_marquee = _empty_div_pattern(
             r'<div[^>]*(?:data-animate=["\']marquee["\']|class="[^"]*marquee[^"]*")[^>]*>\s*</div>',
-            re.DOTALL,
         )
         if empty_marquee.search(section_html):
             return True
 
         # Pattern 9: Empty overflow-x scroll containers (filmstrip, carousel)
-        empty_scroll = re.compile(
+        empty_scroll = _empty_div_pattern(
             r'<div[^>]*class="[^"]*\boverflow-x-(?:auto|scroll)\b[^"]*"[^>]*>\s*</div>',
-            re.DOTALL,
         )
         if empty_scroll.search(section_html):
             return True
@@ -4188,6 +4107,9 @@ RULES:
         - section_type: "hero", "about", "gallery", etc.
         - action: "stock" | "upload"
         - photo_url: URL of the uploaded photo (only for action="upload")
+        - photo_manifests: optional variant manifests of the uploaded photos
+          (optimize_and_upload); kept in site_data["image_manifests"] so the
+          assembler emits srcset/<picture> for them
 
         For "stock" actions, injects stock photos for that section only.
         For "upload" actions, injects the user-provided photo_url.
@@ -4196,6 +4118,10 @@ RULES:
         if not choices:
             return site_data
 
+        for choice in choices:
+            if choice.get("action") == "upload" and choice.get("photo_manifests"):
+                add_image_manifests(site_data, choice["photo_manifests"])
+
         photos = _get_stock_photos(template_style_id or "default")
 
         # Build a lookup: section_type -> choice
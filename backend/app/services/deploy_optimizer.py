@@ -0,0 +1,479 @@
+"""
+Deploy Optimizer — minified HTML and precompressed artifacts for publishing.
+
+Published pages were written as stored: indented templates, comments and
+the inline CSS/JS as authored, with nginx compressing every response on the
+fly. optimize_for_deploy() runs once per deploy:
+
+- minify_html(): drops comments (conditional comments kept) and collapses
+  whitespace runs in text to one space or newline. Tags and attribute
+  values are copied as they are (data-* attributes read by GSAP, classes,
+  inline styles), and the text of <pre>, <textarea> and of elements with a
+  whitespace-pre* class or a white-space style is left untouched.
+- minify_css() for <style>: comments (but /*! ... */) and whitespace around
+  { } ; , : removed, strings and url() kept. A custom property with an
+  empty value keeps its space (--tw-x: ;).
+- minify_js() for inline scripts: comments removed (/*! ... */ kept),
+  indentation and blank lines dropped, spaces collapsed. Newlines are kept,
+  so automatic semicolon insertion is unchanged; strings, template
+  literals and regex literals are copied as they are. JSON scripts are
+  re-serialized compactly, other script types are left alone.
+- precompress(): .gz (gzip -9) and .br (brotli 11, when the brotli package
+  is installed) siblings for nginx gzip_static / brotli_static.
+
+The scanners are linear: a tag, comment, string or element that is never
+closed leaves the rest of the document as it is.
+"""
+
+import gzip
+import json
+import logging
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+try:
+    import brotli
+except ImportError:  # .br siblings are skipped, nginx falls back to .gz
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+_TAG_NAME_RE = re.compile(r"[a-zA-Z][a-zA-Z0-9:-]*")
+_TAG_TEXT_RE = re.compile(r"""[^>"']*""")
+_CLASS_ATTR_RE = re.compile(r"""\bclass\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+_STYLE_ATTR_RE = re.compile(r"""\bstyle\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+_WHITESPACE_CLASS_RE = re.compile(r"(?:^|[\s:!])whitespace-(?:pre|break-spaces)")
+_HTML_SPACE_RE = re.compile(r"[ \t\n\r\f]+")
+_RAW_TEXT_END_RES = {
+    "script": re.compile(r"</script\s*>", re.IGNORECASE),
+    "style": re.compile(r"</style\s*>", re.IGNORECASE),
+}
+_SCRIPT_TYPE_RE = re.compile(r"""\btype\s*=\s*["']?([\w/+.-]+)""", re.IGNORECASE)
+_JS_TYPES = {"", "text/javascript", "application/javascript", "module"}
+_JSON_TYPES = {"application/ld+json", "application/json", "importmap"}
+
+# Elements whose text is kept as it is
+_PREFORMATTED_TAGS = {"pre", "textarea"}
+_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "source", "track", "wbr",
+}
+
+_CSS_PUNCTUATION_RE = re.compile(r"([{};,:])")
+_CSS_TOKEN_RE = re.compile(r"""/\*|["']|url\(|[ \t\n\r\f]+""", re.IGNORECASE)
+_JS_TOKEN_RE = re.compile(r"""/|["'`]|[ \t\n\r\f]+""")
+_JS_KEYWORDS_BEFORE_REGEX = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+    "throw", "case", "do", "else", "yield", "await",
+}
+_JS_WORD_END_RE = re.compile(r"[\w$]+$")
+
+
+# ---------------------------------------------------------------------------
+# HTML
+# ---------------------------------------------------------------------------
+
+def _tag_end(html: str, pos: int) -> int:
+    """Index just past the '>' closing the tag starting at pos, -1 if unterminated.
+
+    Quotes delimit a value only after '=' (like the browser); a value that
+    is never closed runs to the end of the document.
+    """
+    n = len(html)
+    i = pos
+    while True:
+        i = _TAG_TEXT_RE.match(html, i).end()
+        if i >= n:
+            return -1
+        c = html[i]
+        if c == ">":
+            return i + 1
+        j = i - 1
+        while j > pos and html[j] in " \t\n\r\f":
+            j -= 1
+        if html[j] != "=":
+            i += 1  # a quote inside a name or an unquoted value
+            continue
+        close = html.find(c, i + 1)
+        if close < 0:
+            return -1
+        i = close + 1
+
+
+def _keeps_whitespace(tag: str) -> bool:
+    """True if the start tag's class/style makes its text whitespace-sensitive."""
+    m = _CLASS_ATTR_RE.search(tag)
+    if m and _WHITESPACE_CLASS_RE.search(m.group(1) or m.group(2) or ""):
+        return True
+    m = _STYLE_ATTR_RE.search(tag)
+    return bool(m and "white-space" in (m.group(1) or m.group(2) or "").lower())
+
+
+def _collapse_text(text: str) -> str:
+    return _HTML_SPACE_RE.sub(lambda m: "\n" if "\n" in m.group(0) else " ", text)
+
+
+def _minify_script(tag: str, content: str) -> str:
+    m = _SCRIPT_TYPE_RE.search(tag)
+    script_type = m.group(1).lower() if m else ""
+    if script_type in _JS_TYPES:
+        return minify_js(content)
+    if script_type in _JSON_TYPES:
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return content
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+    return content
+
+
+def minify_html(html: str) -> str:
+    """html with comments dropped, text whitespace collapsed, <style>/<script> minified."""
+    out: List[str] = []
+    n = len(html)
+    pos = 0
+    keep_tag = ""  # element whose text is kept as it is, and its nesting depth
+    keep_depth = 0
+    spaced = False  # the output ends with collapsed whitespace (a dropped comment in between)
+    while pos < n:
+        lt = html.find("<", pos)
+        if lt < 0:
+            lt = n
+        if lt > pos:
+            text = html[pos:lt]
+            if keep_depth:
+                out.append(text)
+            else:
+                text = _collapse_text(text)
+                if spaced:
+                    text = text.lstrip()
+                out.append(text)
+                if text:
+                    spaced = text[-1] in " \n"
+        if lt >= n:
+            break
+
+        if html.startswith("<!--", lt):
+            close = html.find("-->", lt + 4)
+            if close < 0:
+                out.append(html[lt:])
+                break
+            comment = html[lt:close + 3]
+            if comment.startswith(("<!--[if", "<!--<![endif]")) or keep_depth:
+                out.append(comment)
+                spaced = False
+            pos = close + 3
+            continue
+
+        spaced = False
+        closing = html.startswith("</", lt)
+        name_match = _TAG_NAME_RE.match(html, lt + (2 if closing else 1))
+        if name_match is None:
+            if html.startswith(("<!", "<?"), lt):  # doctype, processing instruction
+                end = html.find(">", lt)
+                if end < 0:
+                    out.append(html[lt:])
+                    break
+                out.append(html[lt:end + 1])
+                pos = end + 1
+            else:
+                out.append("<")
+                pos = lt + 1
+            continue
+
+        end = _tag_end(html, name_match.end())
+        if end < 0:
+            out.append(html[lt:])
+            break
+        tag = html[lt:end]
+        name = name_match.group(0).lower()
+        out.append(tag)
+        pos = end
+        if closing:
+            if keep_depth and name == keep_tag:
+                keep_depth -= 1
+            continue
+
+        if name in _RAW_TEXT_END_RES:
+            close = _RAW_TEXT_END_RES[name].search(html, end)
+            if close is None:
+                out.append(html[end:])
+                break
+            content = html[end:close.start()]
+            out.append(minify_css(content) if name == "style" else _minify_script(tag, content))
+            out.append(close.group(0))
+            pos = close.end()
+        elif name in _VOID_TAGS or tag.endswith("/>"):
+            continue
+        elif keep_depth:
+            if name == keep_tag:
+                keep_depth += 1
+        elif name in _PREFORMATTED_TAGS or _keeps_whitespace(tag):
+            keep_tag, keep_depth = name, 1
+    return "".join(out)
+
+
+# ---------------------------------------------------------------------------
+# CSS
+# ---------------------------------------------------------------------------
+
+def _quoted_end(text: str, start: int) -> int:
+    """Index just past the string opened by text[start] (backslash escapes), len(text) if unclosed."""
+    quote = text[start]
+    i = start + 1
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == "\\":
+            i += 2
+        elif c == quote or (c == "\n" and quote != "`"):
+            return i + 1
+        else:
+            i += 1
+    return n
+
+
+def minify_css(css: str) -> str:
+    """css without comments (/*! kept) and without whitespace around { } ; , :."""
+    out: List[str] = []
+    n = len(css)
+    pos = 0
+    pending_space = False
+
+    def last_char() -> str:
+        return out[-1][-1] if out and out[-1] else ""
+
+    def emit(chunk: str) -> None:
+        nonlocal pending_space
+        if pending_space:
+            prev, nxt = last_char(), chunk[:1]
+            if (prev == ":" and nxt in ";}") or (prev and prev not in "{};,:" and nxt not in "{};,)"):
+                out.append(" ")  # kept in "a :hover", "1px solid" and "--tw-x: ;"
+            pending_space = False
+        if chunk == "}" and last_char() == ";":
+            out.pop()
+        out.append(chunk)
+
+    while pos < n:
+        m = _CSS_TOKEN_RE.search(css, pos)
+        if m is None:
+            emit(css[pos:])
+            break
+        if m.start() > pos:
+            for piece in _CSS_PUNCTUATION_RE.split(css[pos:m.start()]):
+                if piece:
+                    emit(piece)
+        token = m.group(0)
+        if token == "/*":
+            close = css.find("*/", m.end())
+            end = n if close < 0 else close + 2
+            if css.startswith("/*!", m.start()):
+                emit(css[m.start():end])
+            pos = end  # not whitespace: .a/**/.b is .a.b
+        elif token in "\"'":
+            end = _quoted_end(css, m.start())
+            emit(css[m.start():end])
+            pos = end
+        elif token.lower() == "url(":
+            close = css.find(")", m.end())
+            end = n if close < 0 else close + 1
+            emit(css[m.start():end])
+            pos = end
+        else:
+            pending_space = bool(out)
+            pos = m.end()
+    # A trailing space (pending_space) is dropped
+    return "".join(out)
+
+
+# ---------------------------------------------------------------------------
+# JS
+# ---------------------------------------------------------------------------
+
+def _regex_allowed(out: List[str]) -> bool:
+    """True if a '/' after the emitted code starts a regex literal (not a division)."""
+    text = out[-1] if out else ""
+    k = len(out) - 1
+    while k > 0 and not text.strip():
+        k -= 1
+        text = out[k]
+    text = text.rstrip()
+    if not text:
+        return True
+    last = text[-1]
+    if last in ")]":
+        return False
+    if last.isalnum() or last in "_$":
+        word = _JS_WORD_END_RE.search(text)
+        return bool(word) and word.group(0) in _JS_KEYWORDS_BEFORE_REGEX
+    return last not in "\"'`"
+
+
+def _regex_end(js: str, start: int) -> int:
+    """Index just past the regex literal (and flags) opened at start."""
+    i = start + 1
+    n = len(js)
+    in_class = False
+    while i < n:
+        c = js[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "\n":
+            return i
+        if in_class:
+            in_class = c != "]"
+        elif c == "[":
+            in_class = True
+        elif c == "/":
+            i += 1
+            while i < n and (js[i].isalnum() or js[i] in "_$"):
+                i += 1
+            return i
+        i += 1
+    return n
+
+
+def _template_end(js: str, start: int) -> int:
+    """Index just past the template literal opened at start (${...} nesting followed)."""
+    n = len(js)
+    i = start + 1
+    # Innermost last: "`" for template text, an int for the brace depth inside ${ ... }
+    stack: List[object] = ["`"]
+    while i < n:
+        c = js[i]
+        top = stack[-1]
+        if top == "`":
+            if c == "\\":
+                i += 2
+                continue
+            if c == "`":
+                stack.pop()
+                if not stack:
+                    return i + 1
+            elif js.startswith("${", i):
+                stack.append(0)
+                i += 1
+        elif c in "\"'":
+            i = _quoted_end(js, i)
+            continue
+        elif c == "`":
+            stack.append("`")
+        elif c == "{":
+            stack[-1] = top + 1
+        elif c == "}":
+            if top == 0:
+                stack.pop()
+            else:
+                stack[-1] = top - 1
+        i += 1
+    return n
+
+
+def minify_js(js: str) -> str:
+    """js without comments (/*! kept), indentation and blank lines; newlines kept."""
+    out: List[str] = []
+    n = len(js)
+    pos = 0
+    pending = ""  # whitespace to emit before the next token: "", " " or "\n"
+
+    def emit(chunk: str) -> None:
+        nonlocal pending
+        if pending and out:
+            out.append(pending)
+        pending = ""
+        out.append(chunk)
+
+    while pos < n:
+        m = _JS_TOKEN_RE.search(js, pos)
+        if m is None:
+            emit(js[pos:])
+            break
+        if m.start() > pos:
+            emit(js[pos:m.start()])
+        token = m.group(0)
+        start = m.start()
+        if token == "/":
+            if js.startswith("//", start):
+                close = js.find("\n", start)
+                pos = n if close < 0 else close
+                continue
+            if js.startswith("/*", start):
+                close = js.find("*/", start + 2)
+                end = n if close < 0 else close + 2
+                if js.startswith("/*!", start):
+                    emit(js[start:end])
+                elif "\n" in js[start:end]:
+                    pending = "\n"  # a line break for automatic semicolon insertion
+                elif not pending:
+                    pending = " "
+                pos = end
+                continue
+            if _regex_allowed(out):
+                end = _regex_end(js, start)
+            else:
+                end = start + 1
+            emit(js[start:end])
+            pos = end
+        elif token in "\"'":
+            end = _quoted_end(js, start)
+            emit(js[start:end])
+            pos = end
+        elif token == "`":
+            end = _template_end(js, start)
+            emit(js[start:end])
+            pos = end
+        else:
+            if "\n" in token or "\r" in token:
+                pending = "\n"
+            elif pending != "\n":
+                pending = " "
+            pos = m.end()
+    return "".join(out)
+
+
+# ---------------------------------------------------------------------------
+# Artifacts
+# ---------------------------------------------------------------------------
+
+def precompress(data: bytes) -> Dict[str, bytes]:
+    """{"gz": ..., "br": ...} siblings of data ("br" only with the brotli package)."""
+    artifacts = {"gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        artifacts["br"] = brotli.compress(data, mode=brotli.MODE_TEXT, quality=11)
+    return artifacts
+
+
+class DeployArtifacts(NamedTuple):
+    html: str
+    compressed: Dict[str, bytes]  # "gz", "br" -> index.html.gz / index.html.br
+    report: List[Dict[str, int]]
+
+
+def optimize_for_deploy(html: str, source_bytes: Optional[int] = None) -> DeployArtifacts:
+    """Minified html, its precompressed siblings and the size of each stage.
+
+    source_bytes is the size before earlier stages (the shared bundles);
+    the report then starts from it.
+    """
+    report: List[Dict[str, int]] = []
+    size = len(html.encode("utf-8"))
+    if source_bytes is not None and source_bytes != size:
+        report.append({"stage": "original", "bytes": source_bytes, "saved_bytes": 0})
+        report.append({"stage": "bundles", "bytes": size, "saved_bytes": source_bytes - size})
+    else:
+        report.append({"stage": "original", "bytes": size, "saved_bytes": 0})
+
+    minified = minify_html(html)
+    data = minified.encode("utf-8")
+    report.append({"stage": "minify", "bytes": len(data), "saved_bytes": size - len(data)})
+
+    compressed = precompress(data)
+    for key, stage in (("gz", "gzip"), ("br", "brotli")):
+        if key in compressed:
+            report.append({"stage": stage, "bytes": len(compressed[key]), "saved_bytes": len(data) - len(compressed[key])})
+
+    logger.info(
+        "[DeployOptimizer] " + " -> ".join(f"{s['stage']} {s['bytes']}" for s in report) + " byte"
+    )
+    return DeployArtifacts(minified, compressed, report)
@@ -13,6 +13,7 @@ import math
 import random
 import sqlite3
 import logging
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional
 
@@ -122,6 +123,30 @@ def _get_conn() -> sqlite3.Connection:
     return con
 
 
+# ---------------------------------------------------------------------------
+# Readiness
+# ---------------------------------------------------------------------------
+# Cleared while the startup seed (app.core.bootstrap, in a background
+# thread) fills the store: generation skips design knowledge until it is
+# complete instead of ranking over a half-written index. Set by default, so
+# tools and scripts that use the store directly are unaffected.
+_ready = threading.Event()
+_ready.set()
+
+
+def set_ready(ready: bool) -> None:
+    """Mark the store complete (True) or being seeded (False)."""
+    if ready:
+        _ready.set()
+    else:
+        _ready.clear()
+
+
+def is_ready() -> bool:
+    """Whether the store can be read (no startup seed in progress)."""
+    return _ready.is_set()
+
+
 # ---------------------------------------------------------------------------
 # FTS query builder
 # ---------------------------------------------------------------------------
@@ -6,10 +6,12 @@ Post-processes assembled HTML to:
 2. Vary effects across sites to avoid repetition (deprioritize recently used)
 3. Add staggered data-delay for sequential elements within each section
 4. Track effect usage per user for cross-site diversity
+
+Pools and picks live here; the tag rewriting is the diversification policy
+of animation_rewriter.AnimationRewriter.
 """
 
 import json
-import re
 import random
 import logging
 from typing import Dict, List, Optional, Tuple
@@ -40,25 +42,25 @@ EFFECT_POOLS: Dict[str, List[str]] = {
 # Probability of swapping an existing effect for a different one from the same pool
 SWAP_PROBABILITY = 0.3
 
-# Regex to detect skip regions (nav, script, style, head) for placeholder protection
-_SKIP_REGIONS_RE = re.compile(
-    r'(<nav[\s>].*?</nav>|<script[\s>].*?</script>|<style[\s>].*?</style>|<head[\s>].*?</head>)',
-    re.IGNORECASE | re.DOTALL,
-)
-
-
-def _pick_effect(pool_key: str, used_effects: Optional[List[dict]] = None, pools: Optional[Dict[str, List[str]]] = None) -> str:
+def _pick_effect(
+    pool_key: str,
+    used_effects: Optional[List[dict]] = None,
+    pools: Optional[Dict[str, List[str]]] = None,
+    rng: Optional[random.Random] = None,
+) -> str:
     """Pick an effect from the pool, deprioritizing recently used ones.
 
     Uses weighted random selection: effects used fewer times recently
     get higher weight, making them more likely to be picked.
+    rng: source of the draw (default: the random module).
     """
+    rng = rng or random
     pool = (pools or EFFECT_POOLS).get(pool_key, [])
     if not pool:
         return "fade-up"
 
     if not used_effects:
-        return random.choice(pool)
+        return rng.choice(pool)
 
     # Count how many times each effect was used recently
     usage_counts: Dict[str, int] = {}
@@ -77,7 +79,7 @@ def _pick_effect(pool_key: str, used_effects: Optional[List[dict]] = None, pools
         weight = max(1, max_uses + 1 - uses)
         weighted.extend([eff] * weight)
 
-    return random.choice(weighted) if weighted else random.choice(pool)
+    return rng.choice(weighted) if weighted else rng.choice(pool)
 
 
 def _build_animate_attr(effect: str) -> str:
@@ -92,6 +94,7 @@ def diversify_effects(
     html: str,
     used_effects: Optional[List[dict]] = None,
     db_effects: Optional[Dict[str, List[str]]] = None,
+    seed: Optional[int] = None,
 ) -> Tuple[str, dict]:
     """Post-process assembled HTML to ensure all key elements have animations.
 
@@ -100,10 +103,14 @@ def diversify_effects(
     - Adds staggered data-delay within each section (resets per <section>)
     - Skips elements inside <nav>, <script>, <style>, <head>
 
+    The diversification policy of AnimationRewriter, run on its own; the
+    assembler runs it together with the animation map and randomization.
+
     Args:
         html: The assembled HTML string.
         used_effects: List of effects_used dicts from previous sites
                       (for deprioritizing recently used effects).
+        seed: RNG seed (same seed and html give the same result).
 
     Returns:
         Tuple of (modified_html, effects_used_dict).
@@ -112,183 +119,11 @@ def diversify_effects(
     if not html:
         return html, {}
 
-    # Merge ChromaDB effects into local pools (db_effects take priority via prepend)
-    active_pools = dict(EFFECT_POOLS)
-    if db_effects:
-        for pool_key, effects in db_effects.items():
-            if pool_key in active_pools:
-                # Prepend DB effects so they are picked first (higher weight)
-                merged = list(effects) + [e for e in active_pools[pool_key] if e not in effects]
-                active_pools[pool_key] = merged
-            else:
-                active_pools[pool_key] = list(effects)
-        logger.info(f"Effect diversifier: using {sum(len(v) for v in db_effects.values())} DB-sourced effects")
-
-    effects_used: Dict[str, List[str]] = {}
-
-    def _record(pool_key: str, effect: str):
-        base = effect.split("|")[0] if "|" in effect else effect
-        effects_used.setdefault(pool_key, [])
-        if base not in effects_used[pool_key]:
-            effects_used[pool_key].append(base)
-
-    # -----------------------------------------------------------------------
-    # Step 1: Protect skip regions by replacing with placeholders
-    # -----------------------------------------------------------------------
-    skip_regions: List[Tuple[str, str]] = []
-
-    def _save_skip(match):
-        placeholder = f"__SKIP_{len(skip_regions)}__"
-        skip_regions.append((placeholder, match.group(0)))
-        return placeholder
-
-    working = _SKIP_REGIONS_RE.sub(_save_skip, html)
-
-    # -----------------------------------------------------------------------
-    # Step 2: Delay counter state (resets per section)
-    # -----------------------------------------------------------------------
-    delay_counter = [0]
-
-    def _next_delay() -> str:
-        val = round(delay_counter[0] * 0.1, 1)
-        delay_counter[0] += 1
-        return f"{min(val, 0.8):.1f}"
-
-    # -----------------------------------------------------------------------
-    # Helper: inject or swap a data-animate on a matched tag
-    # -----------------------------------------------------------------------
-    def _inject_or_swap(
-        tag_open: str, attrs: str, tag_close: str,
-        pool_key: str, *, add_delay: bool = False,
-    ) -> Optional[str]:
-        """Returns new tag string, or None if no change needed."""
-        has_animate = 'data-animate' in attrs
-
-        if not has_animate:
-            # Inject new effect (use DB-enriched pools)
-            effect = _pick_effect(pool_key, used_effects, pools=active_pools)
-            animate_attr = _build_animate_attr(effect)
-            delay_attr = ""
-            if add_delay:
-                dv = _next_delay()
-                if float(dv) > 0:
-                    delay_attr = f' data-delay="{dv}"'
-            _record(pool_key, effect)
-            return f'{tag_open} {animate_attr}{delay_attr}{attrs}{tag_close}'
-
-        elif random.random() < SWAP_PROBABILITY:
-            # Swap existing effect to a different one from the same pool (use DB-enriched pools)
-            effect = _pick_effect(pool_key, used_effects, pools=active_pools)
-            animate_val = effect.split("|")[0] if "|" in effect else effect
-            new_attrs = re.sub(
-                r'data-animate="[^"]*"',
-                f'data-animate="{animate_val}"',
-                attrs,
-            )
-            if "|" in effect:
-                split_type = effect.split("|")[1]
-                if 'data-split-type' in new_attrs:
-                    new_attrs = re.sub(
-                        r'data-split-type="[^"]*"',
-                        f'data-split-type="{split_type}"',
-                        new_attrs,
-                    )
-                else:
-                    new_attrs += f' data-split-type="{split_type}"'
-            else:
-                # Remove stale split-type if new effect doesn't use it
-                new_attrs = re.sub(r'\s*data-split-type="[^"]*"', '', new_attrs)
-            _record(pool_key, effect)
-            return f'{tag_open}{new_attrs}{tag_close}'
-        else:
-            # Keep existing, just record it
-            existing = re.search(r'data-animate="([^"]*)"', attrs)
-            if existing:
-                _record(pool_key, existing.group(1))
-            return None  # no change
-
-    # -----------------------------------------------------------------------
-    # Step 3: Process each element type via regex (reverse order for safety)
-    # -----------------------------------------------------------------------
-
-    # --- Sections (entrance animation + delay counter reset) ---
-    sec_pat = re.compile(r'(<section\b)([^>]*?)(>)', re.IGNORECASE | re.DOTALL)
-    for m in reversed(list(sec_pat.finditer(working))):
-        delay_counter[0] = 0  # reset delay for each section
-        result = _inject_or_swap(m.group(1), m.group(2), m.group(3), "section_entrance")
-        if result is not None:
-            working = working[:m.start()] + result + working[m.end():]
-
-    # --- Headings: h1, h2, h3 ---
-    for tag in ["h1", "h2", "h3"]:
-        pattern = re.compile(rf'(<{tag}\b)([^>]*?)(>)', re.IGNORECASE | re.DOTALL)
-        for m in reversed(list(pattern.finditer(working))):
-            result = _inject_or_swap(m.group(1), m.group(2), m.group(3), tag, add_delay=True)
-            if result is not None:
-                working = working[:m.start()] + result + working[m.end():]
-
-    # --- Paragraphs ---
-    p_pat = re.compile(r'(<p\b)([^>]*?)(>)', re.IGNORECASE | re.DOTALL)
-    for m in reversed(list(p_pat.finditer(working))):
-        result = _inject_or_swap(m.group(1), m.group(2), m.group(3), "p", add_delay=True)
-        if result is not None:
-            working = working[:m.start()] + result + working[m.end():]
-
-    # --- Images ---
-    img_pat = re.compile(r'(<img\b)([^>]*?)(/?>)', re.IGNORECASE | re.DOTALL)
-    for m in reversed(list(img_pat.finditer(working))):
-        attrs = m.group(2)
-        if 'data-animate' not in attrs:
-            effect = _pick_effect("img", used_effects)
-            animate_attr = _build_animate_attr(effect)
-            new_tag = f'{m.group(1)} {animate_attr}{attrs}{m.group(3)}'
-            working = working[:m.start()] + new_tag + working[m.end():]
-            _record("img", effect)
-
-    # --- CTA links (with btn/cta/button/primary/action class) ---
-    cta_link_pat = re.compile(
-        r'(<a\b)([^>]*?class="[^"]*(?:btn|cta|button|primary|action)[^"]*"[^>]*?)(>)',
-        re.IGNORECASE | re.DOTALL,
-    )
-    for m in reversed(list(cta_link_pat.finditer(working))):
-        result = _inject_or_swap(m.group(1), m.group(2), m.group(3), "cta")
-        if result is not None:
-            working = working[:m.start()] + result + working[m.end():]
-
-    # --- Buttons ---
-    btn_pat = re.compile(r'(<button\b)([^>]*?)(>)', re.IGNORECASE | re.DOTALL)
-    for m in reversed(list(btn_pat.finditer(working))):
-        result = _inject_or_swap(m.group(1), m.group(2), m.group(3), "cta")
-        if result is not None:
-            working = working[:m.start()] + result + working[m.end():]
-
-    # --- Divs with card/counter/decorative classes ---
-    div_pat = re.compile(r'(<div\b)([^>]*?class="[^"]*"[^>]*?)(>)', re.IGNORECASE | re.DOTALL)
-    for m in reversed(list(div_pat.finditer(working))):
-        classes_match = re.search(r'class="([^"]*)"', m.group(2), re.IGNORECASE)
-        if not classes_match:
-            continue
-        classes = classes_match.group(1).lower()
-        pool_key = None
-        if any(kw in classes for kw in ("card", "bento", "stagger-item", "feature-card", "pricing-card")):
-            pool_key = "card"
-        elif "counter" in classes or "data-counter" in m.group(2).lower():
-            pool_key = "counter"
-        elif any(kw in classes for kw in ("float", "decorative", "blob", "shape")):
-            pool_key = "decorative"
-        if pool_key:
-            result = _inject_or_swap(
-                m.group(1), m.group(2), m.group(3), pool_key,
-                add_delay=(pool_key == "card"),
-            )
-            if result is not None:
-                working = working[:m.start()] + result + working[m.end():]
-
-    # -----------------------------------------------------------------------
-    # Step 4: Restore skip regions
-    # -----------------------------------------------------------------------
-    for placeholder, original in skip_regions:
-        working = working.replace(placeholder, original)
+    from app.services.animation_rewriter import AnimationRewriter
+
+    rewriter = AnimationRewriter(used_effects=used_effects, db_effects=db_effects, seed=seed)
+    working = rewriter.rewrite(html)
+    effects_used = rewriter.effects_used
 
     count_added = sum(len(v) for v in effects_used.values())
     logger.info(
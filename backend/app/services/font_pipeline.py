@@ -0,0 +1,366 @@
+"""
+Font pipeline — self-hosted, subsetted WOFF2 fonts for published sites.
+
+Generated pages load their two theme fonts from fonts.googleapis.com (the
+head template's {{FONT_HEADING_URL}}/{{FONT_BODY_URL}} link): one more
+origin to connect to before first paint, a render-blocking stylesheet and
+full character sets for pages that use a few dozen glyphs.
+
+The fonts the generator can pick (app/components/fonts/fonts.json) are
+vendored at build time as TTF files by tools/vendor_fonts.py, next to a
+manifest.json mapping family -> weight -> file. At publish time
+self_host_fonts() replaces the Google Fonts link with an inline
+<style data-fonts="self-hosted"> of @font-face rules (font-display: swap)
+pointing at WOFF2 files subsetted offline (fontTools) to:
+
+- every character of the page's text (and alt/placeholder/value
+  attributes), outside <script>/<style>
+- Latin-1 plus typographic punctuation, so small later edits and form
+  input keep rendering in the theme font
+
+The WOFF2 files are shared asset bundles (asset_bundles.Bundle, ext
+"woff2"): named by content hash, uploaded once per store and served with
+immutable caching. They live on another origin than the site, so
+publish_bundles() only uses the rewritten page once the store answers
+with Access-Control-Allow-Origin (asset_bundles.fonts_cross_origin_ok). A family that isn't vendored, asks for italics or
+variable ranges, or fails to subset stays on Google Fonts (the link is
+rebuilt with the remaining families); without fontTools the page is left
+as it is.
+
+Usage:
+    html, font_bundles = self_host_fonts(html, bundles_base_url(store))
+"""
+
+import html as html_lib
+import json
+import logging
+import re
+import threading
+from functools import lru_cache
+from html.parser import HTMLParser
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from app.services.asset_bundles import Bundle
+
+try:
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+except ImportError:
+    subset = None
+    TTFont = None
+
+logger = logging.getLogger(__name__)
+
+FONTS_DIR = Path(__file__).resolve().parent.parent / "components" / "fonts"
+CATALOG_FILE = "fonts.json"
+MANIFEST_FILE = "manifest.json"
+
+# Always kept: Latin-1 and the punctuation Italian copy uses
+LATIN_1: FrozenSet[int] = frozenset(range(0x20, 0x7F)) | frozenset(range(0xA0, 0x100))
+EXTRA_CODEPOINTS: FrozenSet[int] = frozenset(map(ord, "‘’‚“”„–—…•€™"))
+
+GOOGLE_FONTS_LINK_RE = re.compile(
+    r"""<link\b[^>]*\bhref\s*=\s*["'](https://fonts\.googleapis\.com/css2\?[^"']*)["'][^>]*>\n?""",
+    re.IGNORECASE,
+)
+_FONT_PRECONNECT_RE = re.compile(
+    r"""[ \t]*<link\b[^>]*\brel\s*=\s*["']preconnect["'][^>]*fonts\.(?:googleapis|gstatic)\.com[^>]*>\n?""",
+    re.IGNORECASE,
+)
+SELF_HOSTED_STYLE_RE = re.compile(r'<style data-fonts="self-hosted">([\s\S]*?)</style>')
+FONT_FACE_FAMILY_RE = re.compile(r"font-family:'([^']+)'")
+
+
+def font_slug(family: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", family.lower()).strip("-")
+
+
+def font_filename(family: str, weight: int) -> str:
+    """Vendored file name of one weight (tools/vendor_fonts.py)."""
+    return f"{font_slug(family)}-{weight}.ttf"
+
+
+def load_catalog(fonts_dir: Path = FONTS_DIR) -> Dict[str, List[int]]:
+    """Families and weights to vendor: fonts.json's {"families": {name: [weights]}}."""
+    data = json.loads((fonts_dir / CATALOG_FILE).read_text(encoding="utf-8"))
+    return {name: sorted(int(w) for w in weights) for name, weights in data["families"].items()}
+
+
+# ---------------------------------------------------------------------------
+# Google Fonts URLs
+# ---------------------------------------------------------------------------
+
+class FontSpec(NamedTuple):
+    family: str
+    weights: Tuple[int, ...]  # () when the pipeline can't serve the spec
+    param: str  # the original family= value, to keep it on Google
+
+
+def parse_google_fonts_url(url: str) -> List[FontSpec]:
+    """One FontSpec per family= parameter of a css2 URL.
+
+    "Inter:wght@400;700" -> Inter 400/700, "Inter" -> Inter 400. Italic
+    axes ("ital,wght@0,400;1,400") and ranges ("wght@100..900") get no
+    weights.
+    """
+    specs: List[FontSpec] = []
+    for param in parse_qs(urlsplit(url).query).get("family", []):
+        family, _, axes = param.partition(":")
+        family = family.strip()
+        if not axes:
+            specs.append(FontSpec(family, (400,), param))
+            continue
+        axis, _, values = axes.partition("@")
+        weights = values.split(";")
+        if axis != "wght" or not all(w.isdigit() for w in weights):
+            specs.append(FontSpec(family, (), param))
+            continue
+        specs.append(FontSpec(family, tuple(sorted({int(w) for w in weights})), param))
+    return specs
+
+
+def google_fonts_url(params: Iterable[str]) -> str:
+    return (
+        "https://fonts.googleapis.com/css2?"
+        + "&".join(f"family={p.replace(' ', '+')}" for p in params)
+        + "&display=swap"
+    )
+
+
+# ---------------------------------------------------------------------------
+# Page text
+# ---------------------------------------------------------------------------
+
+class _TextCollector(HTMLParser):
+    """Characters a page can render in its web fonts."""
+
+    _SKIPPED = {"script", "style", "template", "noscript"}
+    _TEXT_ATTRS = {"alt", "placeholder", "value"}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.chars: Set[str] = set()
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIPPED:
+            self._skip += 1
+        for name, value in attrs:
+            if name in self._TEXT_ATTRS and value:
+                self.chars.update(value)
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIPPED and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.chars.update(data)
+
+
+def page_codepoints(html: str) -> FrozenSet[int]:
+    """The page's text characters plus LATIN_1 and EXTRA_CODEPOINTS."""
+    collector = _TextCollector()
+    collector.feed(html)
+    collector.close()
+    used = {ord(c) for c in collector.chars if c.isprintable()}
+    return frozenset(used) | LATIN_1 | EXTRA_CODEPOINTS
+
+
+# ---------------------------------------------------------------------------
+# Vendored fonts
+# ---------------------------------------------------------------------------
+
+class FontLibrary:
+    """The vendored fonts listed in <fonts_dir>/manifest.json."""
+
+    def __init__(self, fonts_dir: Path = FONTS_DIR) -> None:
+        self.fonts_dir = fonts_dir
+        self.files: Dict[str, Dict[int, str]] = {}
+        path = fonts_dir / MANIFEST_FILE
+        if not path.exists():
+            logger.info(f"[Fonts] Nessun font locale ({path} mancante): Google Fonts")
+            return
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            self.files = {
+                family: {int(weight): name for weight, name in weights.items()}
+                for family, weights in data.items()
+            }
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"[Fonts] {path} non leggibile: {e}")
+
+    def path(self, family: str, weight: int) -> Optional[Path]:
+        """The vendored file of one weight, None when it isn't on disk."""
+        name = self.files.get(family, {}).get(weight)
+        if name is None:
+            return None
+        path = self.fonts_dir / name
+        return path if path.is_file() else None
+
+    def has(self, spec: FontSpec) -> bool:
+        return bool(spec.weights) and all(self.path(spec.family, w) is not None for w in spec.weights)
+
+
+@lru_cache(maxsize=256)
+def cmap(path: Path) -> FrozenSet[int]:
+    """Codepoints a vendored font has glyphs for."""
+    font = TTFont(str(path), lazy=True)
+    try:
+        return frozenset(font.getBestCmap() or ())
+    finally:
+        font.close()
+
+
+@lru_cache(maxsize=128)
+def subset_woff2(path: Path, codepoints: FrozenSet[int]) -> bytes:
+    """The font reduced to codepoints (those it has), as WOFF2."""
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+    font = TTFont(str(path))
+    try:
+        subsetter = subset.Subsetter(options=options)
+        subsetter.populate(unicodes=codepoints & cmap(path))
+        subsetter.subset(font)
+        buffer = BytesIO()
+        font.flavor = "woff2"
+        font.save(buffer)
+        return buffer.getvalue()
+    finally:
+        font.close()
+
+
+def font_face(family: str, weight: int, url: str) -> str:
+    return (
+        f"@font-face{{font-family:'{family}';src:url({url}) format(\"woff2\");"
+        f"font-weight:{weight};font-style:normal;font-display:swap}}"
+    )
+
+
+# ---------------------------------------------------------------------------
+# Publishing
+# ---------------------------------------------------------------------------
+
+def self_host_fonts(
+    html: str,
+    base_url: str,
+    library: Optional["FontLibrary"] = None,
+) -> Tuple[str, List[Bundle]]:
+    """html with its Google Fonts served from base_url, and the WOFF2 bundles to upload.
+
+    Families that can't be self-hosted stay on a reduced Google Fonts link;
+    (html, []) when nothing can.
+    """
+    link = GOOGLE_FONTS_LINK_RE.search(html)
+    if subset is None or link is None:
+        return html, []
+    library = library or get_font_library()
+
+    codepoints: Optional[FrozenSet[int]] = None
+    bundles: List[Bundle] = []
+    faces: List[str] = []
+    remote: List[str] = []
+    for spec in parse_google_fonts_url(html_lib.unescape(link.group(1))):
+        if not library.has(spec):
+            remote.append(spec.param)
+            continue
+        if codepoints is None:
+            codepoints = page_codepoints(html)
+        try:
+            family_bundles = [
+                Bundle(f"font-{font_slug(spec.family)}-{w}", "woff2",
+                       subset_woff2(library.path(spec.family, w), codepoints))
+                for w in spec.weights
+            ]
+        except Exception as e:  # a broken vendored file must not block the publish
+            logger.warning(f"[Fonts] Subset di {spec.family} fallito, resta su Google Fonts: {e}")
+            remote.append(spec.param)
+            continue
+        bundles.extend(family_bundles)
+        faces.extend(
+            font_face(spec.family, w, f"{base_url.rstrip('/')}/{b.filename}")
+            for w, b in zip(spec.weights, family_bundles)
+        )
+
+    if not bundles:
+        return html, []
+
+    style = f'<style data-fonts="self-hosted">{"".join(faces)}</style>\n'
+    replacement = style
+    if remote:
+        replacement += f'  <link href="{html_lib.escape(google_fonts_url(remote))}" rel="stylesheet">\n'
+    out = html[:link.start()] + replacement + html[link.end():]
+    if not remote:
+        out = _FONT_PRECONNECT_RE.sub("", out)
+    return out, bundles
+
+
+def self_hosted_families(html: str) -> Set[str]:
+    """Families of the page's <style data-fonts="self-hosted"> @font-face rules."""
+    return {family for m in SELF_HOSTED_STYLE_RE.finditer(html) for family in FONT_FACE_FAMILY_RE.findall(m.group(1))}
+
+
+def check_vendored_fonts(html: str, url: str, library: Optional["FontLibrary"] = None) -> List[str]:
+    """Problems self-hosting the fonts of a Google Fonts URL would hit (empty if none).
+
+    Reports families/weights that aren't vendored (they stay on Google
+    Fonts) and page characters a vendored font has no glyph for.
+    """
+    if subset is None:
+        return []
+    library = library or get_font_library()
+    if not library.files:
+        return []
+    problems: List[str] = []
+    codepoints: Optional[FrozenSet[int]] = None
+    for spec in parse_google_fonts_url(url):
+        if not spec.weights:
+            problems.append(f"{spec.family}: italic/variable axes not supported, served by Google Fonts")
+            continue
+        missing = [w for w in spec.weights if library.path(spec.family, w) is None]
+        if missing:
+            problems.append(f"{spec.family} {', '.join(map(str, missing))} not vendored: served by Google Fonts")
+            continue
+        if codepoints is None:
+            codepoints = page_codepoints(html) - LATIN_1 - EXTRA_CODEPOINTS
+        try:
+            uncovered = codepoints - cmap(library.path(spec.family, spec.weights[0]))
+        except Exception as e:
+            problems.append(f"{spec.family}: vendored file unreadable ({e})")
+            continue
+        if uncovered:
+            chars = "".join(sorted(chr(c) for c in uncovered))[:20]
+            problems.append(f"{spec.family} has no glyphs for: {chars}")
+    return problems
+
+
+# ---------------------------------------------------------------------------
+# Singleton
+# ---------------------------------------------------------------------------
+
+_library: Optional[FontLibrary] = None
+_library_lock = threading.Lock()
+
+
+def get_font_library() -> FontLibrary:
+    global _library
+    if _library is None:
+        with _library_lock:
+            if _library is None:
+                _library = FontLibrary()
+    return _library
+
+
+def reset_font_library() -> None:
+    """Reload manifest.json on next use (after vendoring) and drop subset caches."""
+    global _library
+    with _library_lock:
+        _library = None
+    cmap.cache_clear()
+    subset_woff2.cache_clear()
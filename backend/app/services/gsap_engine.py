@@ -0,0 +1,369 @@
+"""
+GSAP Engine — gsap-universal.js tree-shaken per generated page.
+
+Every page used to inline the whole engine (~85 KB, 50+ blocks) while it
+uses a handful of data-animate values. The engine is split at its block
+comments (/* ---- N. NAME ---- */) into:
+
+- core: the header comment, the prelude (fallbacks, the head's Lenis, smart navbar,
+  reduced motion, _animSpeed/isMobile) and every block not gated on
+  data-animate values (organic entropy, parallax, counter, scroll progress,
+  img-reveal, horizontal scroll, cursor glow/follower, navbar, hamburger,
+  smooth scroll, CSS scroll-driven layer, preloader)
+- effect modules: blocks whose top-level statements are loops over
+  document.querySelectorAll('[data-animate="x"]') (optionally inside an
+  if guard) and nothing else. A module is kept when the page has one of
+  its values.
+
+build(values) joins the core and the kept modules in source order. The core
+handler (block 1) skips the values handled by a module; that list is
+regenerated so a value whose module was left out falls back to opacity 1
+(visible, not animated) instead of staying hidden by the head CSS. The
+header comment stays first (sanitizer TRUSTED_SCRIPT_MARKERS, swarm
+_GSAP_SCRIPT_RE) and is followed by a /* Tree-shaken: ... */ line with the
+kept values, read by refresh_engine() to re-shake an engine already in a
+page after QC fixes or an AI refine changed its data-animate values.
+
+The split is made at build time by tools/build_gsap_modules.py into
+components/gsap_modules/ (one file per block, manifest.json with the source
+fingerprint). If that directory is missing or stale, gsap-universal.js is
+split at load (logged); if it can no longer be split, every page gets the
+full engine.
+
+Usage:
+    from app.services.gsap_engine import get_gsap_engine, refresh_engine
+    engine = get_gsap_engine()
+    js = engine.build({"text-split", "fade-up"})   # core + text-split module
+    html = refresh_engine(html)                   # after data-animate edits
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+from app.services.tag_scan import ElementPattern
+
+logger = logging.getLogger(__name__)
+
+ENGINE_FILENAME = "gsap-universal.js"
+MODULES_DIRNAME = "gsap_modules"
+MODULES_MANIFEST = "manifest.json"
+_FORMAT_VERSION = 1
+
+_DEFAULT_COMPONENTS_DIR = Path(__file__).parent.parent / "components"
+
+# "  /* ------ ... ------ */" and "  /* ====== ... ====== */" block comments
+_BLOCK_HEADER_RE = re.compile(r"^  /\* ([-=])\1{9,}\n(.*?)\1{10,} \*/\n", re.MULTILINE | re.DOTALL)
+_DOC_QUERY_RE = re.compile(r"document\.querySelector(?:All)?\(")
+_DOC_SELECTOR_RE = re.compile(r"document\.querySelector(?:All)?\('([^']*)'\)")
+_ANIMATE_SELECTOR_RE = re.compile(r'\[data-animate="([\w-]+)"\]')
+_MODULE_LOOP_RE = re.compile(r"""document\.querySelectorAll\('\[data-animate=""")
+_GUARD_RE = re.compile(r"if \(.*\) \{$")
+
+# Block 1: if (['stagger', 'parallax', ...].indexOf(type) !== -1) return;
+_SKIP_LIST_RE = re.compile(r"if \(\[((?:'[\w-]+', )*'[\w-]+')\]\.indexOf\(type\) !== -1\) return;")
+_SKIP_LIST_PLACEHOLDER = "'__GSAP_MODULE_EFFECTS__'"
+
+_SHAKEN_LINE_RE = re.compile(r"/\* Tree-shaken: ([\w\- ]*) \*/")
+_ANIMATE_VALUE_RE = re.compile(r"""\bdata-animate\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+_RAW_TEXT_START_RE = re.compile(r"<(script|style)\b", re.IGNORECASE)
+_RAW_TEXT_END_RES = {
+    "script": re.compile(r"</script\s*>", re.IGNORECASE),
+    "style": re.compile(r"</style\s*>", re.IGNORECASE),
+}
+
+# The engine's <script> block (also stripped by SwarmGenerator._strip_for_refine);
+# pages assembled before the shared bundles have no data-bundle attribute
+ENGINE_SCRIPT_RE = ElementPattern(
+    r'<script(?: data-bundle="gsap-engine")?>\s*/\*[\s\S]*?GSAP Universal Animation Engine[\s\S]*?</script>',
+    start=r'<script(?: data-bundle="gsap-engine")?>\s*/\*',
+)
+
+
+class EngineBlock(NamedTuple):
+    name: str
+    effects: Tuple[str, ...]  # empty for core
+    code: str
+
+
+def split_engine(source: str) -> Tuple[List[EngineBlock], List[str]]:
+    """Split gsap-universal.js into core/effect blocks. Returns (blocks, skip list).
+
+    Consecutive core blocks are merged. The core handler's skip list is
+    replaced by a placeholder filled in by GsapEngine.build(). Raises
+    ValueError if the source no longer has the expected layout.
+    """
+    headers = list(_BLOCK_HEADER_RE.finditer(source))
+    if not headers or not source.startswith("/*"):
+        raise ValueError("no block comments found")
+
+    raw: List[Tuple[str, Tuple[str, ...], str]] = [("core", (), source[:headers[0].start()])]
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(source)
+        title = header.group(2).strip().splitlines()[0]
+        effects = _module_effects(source[header.end():end]) if header.group(1) == "-" else ()
+        raw.append((title, effects, source[header.start():end]))
+
+    blocks: List[EngineBlock] = []
+    for title, effects, code in raw:
+        if not effects and blocks and not blocks[-1].effects:
+            blocks[-1] = blocks[-1]._replace(code=blocks[-1].code + code)
+            continue
+        name = _slug(title) if effects else "core"
+        blocks.append(EngineBlock(f"{len(blocks):02d}-{name}", effects, code))
+
+    skip_list: List[str] = []
+    for i, block in enumerate(blocks):
+        if block.effects:
+            continue
+        found = list(_SKIP_LIST_RE.finditer(block.code))
+        if not found:
+            continue
+        if skip_list or len(found) > 1:
+            raise ValueError("more than one core skip list")
+        m = found[0]
+        skip_list = [name.strip("'") for name in m.group(1).split(", ")]
+        code = block.code[:m.start(1)] + _SKIP_LIST_PLACEHOLDER + block.code[m.end(1):]
+        blocks[i] = block._replace(code=code)
+    if not skip_list:
+        raise ValueError("core skip list not found")
+    return blocks, skip_list
+
+
+def _module_effects(code: str) -> Tuple[str, ...]:
+    """data-animate values gating a block, () if the block belongs to the core."""
+    selectors = _DOC_SELECTOR_RE.findall(code)
+    if not selectors or len(selectors) != len(_DOC_QUERY_RE.findall(code)):
+        return ()
+    effects: List[str] = []
+    for selector in selectors:
+        for part in selector.split(","):
+            m = _ANIMATE_SELECTOR_RE.fullmatch(part.strip())
+            if not m:
+                return ()
+            if m.group(1) not in effects:
+                effects.append(m.group(1))
+
+    # Top-level statements: data-animate loops, or if guards containing only those
+    in_guard = False
+    for line in code.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("//"):
+            continue
+        indent = len(line) - len(line.lstrip(" "))
+        if indent == 2:
+            if stripped.startswith("}"):
+                in_guard = False
+            elif _MODULE_LOOP_RE.match(stripped):
+                in_guard = False
+            elif _GUARD_RE.match(stripped):
+                in_guard = True
+            else:
+                return ()
+        elif indent == 4 and in_guard:
+            if not (stripped.startswith("}") or _MODULE_LOOP_RE.match(stripped)):
+                return ()
+        elif indent < 2:
+            return ()
+    return tuple(effects)
+
+
+def _slug(title: str) -> str:
+    words = re.sub(r"^[\w]+\.\s*", "", title.split("(")[0]).lower()
+    return re.sub(r"[^a-z0-9]+", "-", words).strip("-") or "block"
+
+
+def _source_fingerprint(data: bytes) -> Dict[str, Any]:
+    return {"size": len(data), "sha1": hashlib.sha1(data).hexdigest()}
+
+
+def build_modules(components_dir: Optional[Union[str, Path]] = None) -> Path:
+    """Write components/gsap_modules/ from gsap-universal.js (build step). Returns the directory.
+
+    Built next to the old directory and swapped in, so readers never see a
+    partial split.
+    """
+    components_dir = Path(components_dir) if components_dir else _DEFAULT_COMPONENTS_DIR
+    data = (components_dir / ENGINE_FILENAME).read_bytes()
+    blocks, skip_list = split_engine(data.decode("utf-8"))
+
+    target = components_dir / MODULES_DIRNAME
+    tmp_target = target.with_name(MODULES_DIRNAME + ".tmp")
+    shutil.rmtree(tmp_target, ignore_errors=True)
+    tmp_target.mkdir(parents=True)
+    for block in blocks:
+        (tmp_target / f"{block.name}.js").write_text(block.code, encoding="utf-8")
+    manifest = {
+        "format": _FORMAT_VERSION,
+        "source": _source_fingerprint(data),
+        "skip_list": skip_list,
+        "blocks": [{"file": f"{block.name}.js", "effects": list(block.effects)} for block in blocks],
+    }
+    (tmp_target / MODULES_MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    old_target = target.with_name(MODULES_DIRNAME + ".old")
+    if target.exists():
+        os.replace(target, old_target)
+    os.replace(tmp_target, target)
+    shutil.rmtree(old_target, ignore_errors=True)
+    logger.info(
+        "[GsapEngine] %d blocks (%d effect modules) written to %s",
+        len(blocks), sum(1 for b in blocks if b.effects), target,
+    )
+    return target
+
+
+class GsapEngine:
+    """Core + effect modules of gsap-universal.js; build() emits the engine for a page."""
+
+    def __init__(self, components_dir: Optional[Union[str, Path]] = None) -> None:
+        self.components_dir = Path(components_dir) if components_dir else _DEFAULT_COMPONENTS_DIR
+        self.blocks: List[EngineBlock] = []
+        self.skip_list: List[str] = []
+        self.full_source = ""
+        self.source = "full"  # "modules", "split" or "full"
+        self._load()
+        self.module_effects: Set[str] = {e for block in self.blocks for e in block.effects}
+        self._header_end = self._find_header_end()
+
+    def _load(self) -> None:
+        data = (self.components_dir / ENGINE_FILENAME).read_bytes()
+        self.full_source = data.decode("utf-8")
+        if self._load_modules(_source_fingerprint(data)):
+            self.source = "modules"
+            return
+        logger.warning(
+            "[GsapEngine] %s missing or stale, splitting %s (run tools/build_gsap_modules.py)",
+            MODULES_DIRNAME, ENGINE_FILENAME,
+        )
+        try:
+            self.blocks, self.skip_list = split_engine(self.full_source)
+            self.source = "split"
+        except ValueError as e:
+            logger.warning(f"[GsapEngine] Cannot split {ENGINE_FILENAME} ({e}), using the full engine")
+
+    def _load_modules(self, fingerprint: Dict[str, Any]) -> bool:
+        modules_dir = self.components_dir / MODULES_DIRNAME
+        try:
+            manifest = json.loads((modules_dir / MODULES_MANIFEST).read_text(encoding="utf-8"))
+            if manifest.get("format") != _FORMAT_VERSION or manifest.get("source") != fingerprint:
+                return False
+            self.blocks = [
+                EngineBlock(
+                    entry["file"].rsplit(".", 1)[0],
+                    tuple(entry["effects"]),
+                    (modules_dir / entry["file"]).read_text(encoding="utf-8"),
+                )
+                for entry in manifest["blocks"]
+            ]
+            self.skip_list = list(manifest["skip_list"])
+            return True
+        except (OSError, ValueError, KeyError, TypeError):
+            self.blocks, self.skip_list = [], []
+            return False
+
+    def _find_header_end(self) -> int:
+        if not self.blocks:
+            return -1
+        end = self.blocks[0].code.find("*/\n")
+        return end + 3 if end >= 0 else -1
+
+    @property
+    def shaken(self) -> bool:
+        return bool(self.blocks) and self._header_end >= 0
+
+    def kept_effects(self, values: Iterable[str]) -> List[str]:
+        """Module values whose blocks build(values) keeps (sorted)."""
+        values = set(values)
+        return sorted({
+            effect for block in self.blocks
+            if block.effects and values.intersection(block.effects)
+            for effect in block.effects
+        })
+
+    def build(self, values: Optional[Iterable[str]] = None) -> str:
+        """Engine JS with the core and the modules for these data-animate values.
+
+        values=None (or an engine that could not be split) gives the full engine.
+        """
+        if values is None or not self.shaken:
+            return self.full_source
+        values = set(values)
+        kept = [block for block in self.blocks if not block.effects or values.intersection(block.effects)]
+        kept_effects = self.kept_effects(values)
+        skip = [e for e in self.skip_list if e not in self.module_effects or e in kept_effects]
+
+        parts = [block.code for block in kept]
+        head = parts[0]
+        parts[0] = f"{head[:self._header_end]}/* Tree-shaken: {' '.join(kept_effects)} */\n{head[self._header_end:]}"
+        js = "".join(parts)
+        return js.replace(_SKIP_LIST_PLACEHOLDER, ", ".join(f"'{e}'" for e in skip), 1)
+
+    def script_tag(self, values: Optional[Iterable[str]] = None) -> str:
+        return f'<script data-bundle="gsap-engine">\n{self.build(values)}\n</script>'
+
+
+def animate_values(html: str) -> Set[str]:
+    """data-animate values in html, outside <script> and <style> contents."""
+    values: Set[str] = set()
+    pos = 0
+    while True:
+        raw = _RAW_TEXT_START_RE.search(html, pos)
+        values.update(a or b for a, b in _ANIMATE_VALUE_RE.findall(html, pos, raw.start() if raw else len(html)))
+        if not raw:
+            return values
+        end = _RAW_TEXT_END_RES[raw.group(1).lower()].search(html, raw.end())
+        if not end:
+            return values  # unclosed: raw text up to the end of the document
+        pos = end.end()
+
+
+def refresh_engine(html: str, engine: Optional[GsapEngine] = None) -> str:
+    """Re-shake the tree-shaken engine embedded in html for its current data-animate values.
+
+    Pages with the full engine (no Tree-shaken line) or without one are returned unchanged.
+    """
+    script = ENGINE_SCRIPT_RE.search(html)
+    if not script:
+        return html
+    shaken = _SHAKEN_LINE_RE.search(script.group(0), 0, 4096)
+    if not shaken:
+        return html
+    engine = engine or get_gsap_engine()
+    if not engine.shaken:
+        return html
+    values = animate_values(html[:script.start()]) | animate_values(html[script.end():])
+    kept = engine.kept_effects(values)
+    if kept == shaken.group(1).split():
+        return html
+    logger.info(f"[GsapEngine] Engine re-shaken: {shaken.group(1) or '-'} -> {' '.join(kept) or '-'}")
+    return html[:script.start()] + engine.script_tag(values) + html[script.end():]
+
+
+_engines: Dict[str, GsapEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_gsap_engine(components_dir: Optional[Union[str, Path]] = None) -> GsapEngine:
+    """Process-wide shared GsapEngine for a components directory."""
+    key = str(Path(components_dir).resolve() if components_dir else _DEFAULT_COMPONENTS_DIR.resolve())
+    engine = _engines.get(key)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(key)
+            if engine is None:
+                engine = GsapEngine(components_dir)
+                _engines[key] = engine
+    return engine
+
+
+def reset_gsap_engine() -> None:
+    """Drop the shared engines (after rebuilding the modules or editing the engine)."""
+    with _engines_lock:
+        _engines.clear()
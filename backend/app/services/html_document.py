@@ -0,0 +1,401 @@
+"""
+HTML Document — one tokenization pass shared by every section-aware scan.
+
+Generated pages are ~300 KB and several services used to re-scan them with
+their own regex + depth counting to find <section> boundaries (post-process,
+photo swap, refine extract/remove, image listing, pre-delivery checks).
+HtmlDocument tokenizes the page once and exposes:
+
+- a tree of structural elements (section, footer, header, nav, main,
+  article, aside, and divs with an id) with character offsets of the opening
+  tag, the content and the closing tag; nesting is balanced per tag name
+- every <img> and <a> with its offsets and attributes
+- every element id (with tag and offset) and data-section value
+- offset -> line number and offset -> enclosing element lookups
+- splice helpers that rebuild the string once for any number of edits
+
+The contents of <script>, <style> and comments are skipped, so markup inside
+JS strings or commented-out blocks is not mistaken for page structure.
+
+parse_html() memoizes documents per HTML content (LRU), so the checks of one
+pipeline step share a single parse.
+
+Usage:
+    from app.services.html_document import parse_html
+    doc = parse_html(html)
+    hero = doc.find_section("hero")
+    doc.slice(hero)                    # '<section id="hero" ...>...</section>'
+    html = doc.remove([hero])          # new HTML string without the section
+"""
+
+import bisect
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+# Elements that make up the section tree (divs only when they carry an id)
+STRUCTURAL_TAGS = frozenset({"section", "footer", "header", "nav", "main", "article", "aside", "div"})
+_RAW_TEXT_TAGS = frozenset({"script", "style"})
+_TRACKED_TAGS = STRUCTURAL_TAGS | {"a"}
+
+_TOKEN_RE = re.compile(
+    r"<!--.*?(?:-->|\Z)"
+    r"""|<(/?)([a-zA-Z][a-zA-Z0-9:-]*)((?:[^>"']|"[^"]*"|'[^']*')*)>""",
+    re.DOTALL,
+)
+_ATTR_RE = re.compile(
+    r"""([^\s=/>"']+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?"""
+)
+_RAW_TEXT_END_RE = {
+    tag: re.compile(rf"</{tag}\s*>", re.IGNORECASE) for tag in _RAW_TEXT_TAGS
+}
+
+
+def parse_attrs(attr_text: str) -> Dict[str, str]:
+    """Attributes of a tag (names lowercased, first occurrence wins)."""
+    attrs: Dict[str, str] = {}
+    for m in _ATTR_RE.finditer(attr_text):
+        name = m.group(1).lower()
+        if name not in attrs:
+            value = m.group(2)
+            if value is None:
+                value = m.group(3)
+            if value is None:
+                value = m.group(4) or ""
+            attrs[name] = value
+    return attrs
+
+
+@dataclass(eq=False)
+class Element:
+    """One element with its character offsets in the document.
+
+    start/end span the whole element; open_end is just past the opening tag
+    and close_start is where the closing tag begins (both equal open_end for
+    void elements). Unclosed elements end at the end of the document.
+    """
+
+    tag: str
+    start: int
+    open_end: int
+    attrs: Dict[str, str]
+    close_start: int = -1
+    end: int = -1
+    closed: bool = False
+    parent: Optional["Element"] = field(default=None, repr=False)
+    children: List["Element"] = field(default_factory=list, repr=False)
+
+    @property
+    def id(self) -> str:
+        return self.attrs.get("id", "")
+
+    def contains(self, pos: int) -> bool:
+        return self.start <= pos < self.end
+
+
+class HtmlDocument:
+    """Parsed, read-only view of an HTML string. Edits return new strings."""
+
+    def __init__(self, html: str) -> None:
+        self.html = html
+        self.elements: List[Element] = []  # structural elements, document order
+        self.roots: List[Element] = []
+        self.images: List[Element] = []
+        self.links: List[Element] = []
+        # (offset, tag, id) for every element with an id, document order
+        self.id_tags: List[Tuple[int, str, str]] = []
+        self.data_sections: List[str] = []
+        self._line_starts: Optional[List[int]] = None
+        self._tokenize()
+        self._build_tree()
+
+    # ------------------------------------------------------------------
+    # Parsing
+    # ------------------------------------------------------------------
+
+    def _tokenize(self) -> None:
+        html = self.html
+        length = len(html)
+        open_stacks: Dict[str, List[Optional[Element]]] = {tag: [] for tag in _TRACKED_TAGS}
+        for m in self._iter_markup():
+            closing, tag, attr_text = m.group(1, 2, 3)
+            if tag is None:
+                continue  # comment
+            tag = tag.lower()
+
+            if closing:
+                stack = open_stacks.get(tag)
+                if stack:
+                    element = stack.pop()
+                    if element is not None:
+                        element.close_start = m.start()
+                        element.end = m.end()
+                        element.closed = True
+                continue
+
+            attrs: Optional[Dict[str, str]] = None
+            if "id" in attr_text or "data-section" in attr_text:
+                attrs = parse_attrs(attr_text)
+                if attrs.get("id"):
+                    self.id_tags.append((m.start(), tag, attrs["id"]))
+                if "data-section" in attrs:
+                    self.data_sections.append(attrs["data-section"])
+
+            if tag in _RAW_TEXT_TAGS:
+                continue
+
+            if tag == "img":
+                if attrs is None:
+                    attrs = parse_attrs(attr_text)
+                self.images.append(Element(
+                    "img", m.start(), m.end(), attrs,
+                    close_start=m.end(), end=m.end(), closed=True,
+                ))
+                continue
+
+            if tag not in _TRACKED_TAGS or attr_text.rstrip().endswith("/"):
+                continue
+            if attrs is None and tag != "div":
+                attrs = parse_attrs(attr_text)
+            element: Optional[Element] = None
+            if tag != "div" or (attrs and attrs.get("id")):
+                element = Element(tag, m.start(), m.end(), attrs or {})
+                if tag == "a":
+                    self.links.append(element)
+                else:
+                    self.elements.append(element)
+            # Anonymous divs are still pushed so nesting stays balanced
+            open_stacks[tag].append(element)
+
+        for element in self.elements + self.links:
+            if not element.closed:
+                element.close_start = length
+                element.end = length
+
+    def _iter_markup(self) -> Iterator["re.Match[str]"]:
+        """Tag and comment matches, skipping <script>/<style> contents.
+
+        Matching restarts after each raw text block, so markup-like strings
+        inside a script (e.g. an unterminated "<!--") cannot swallow the
+        tags that follow it.
+        """
+        html = self.html
+        pos = 0
+        while True:
+            for m in _TOKEN_RE.finditer(html, pos):
+                yield m
+                tag = m.group(2)
+                if tag is not None and not m.group(1) and tag.lower() in _RAW_TEXT_TAGS:
+                    end_match = _RAW_TEXT_END_RE[tag.lower()].search(html, m.end())
+                    pos = end_match.end() if end_match else len(html)
+                    break
+            else:
+                return
+
+    def _build_tree(self) -> None:
+        stack: List[Element] = []
+        for element in self.elements:
+            while stack and stack[-1].end <= element.start:
+                stack.pop()
+            # Overlapping (mis-nested) elements are attached to the nearest
+            # ancestor that fully contains them
+            while stack and stack[-1].end < element.end:
+                stack.pop()
+            if stack:
+                element.parent = stack[-1]
+                stack[-1].children.append(element)
+            else:
+                self.roots.append(element)
+            stack.append(element)
+        self._element_starts = [e.start for e in self.elements]
+        self._image_starts = [e.start for e in self.images]
+        self._link_starts = [e.start for e in self.links]
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def sections(self, tags: Sequence[str] = ("section",), closed_only: bool = False) -> List[Element]:
+        """Outermost elements with one of the tags (not nested in another of them)."""
+        wanted = set(tags)
+        result: List[Element] = []
+        for element in self.elements:
+            if element.tag not in wanted or (closed_only and not element.closed):
+                continue
+            parent = element.parent
+            while parent is not None and parent.tag not in wanted:
+                parent = parent.parent
+            if parent is None:
+                result.append(element)
+        return result
+
+    def find_section(
+        self,
+        section_id: str,
+        tags: Sequence[str] = ("section",),
+        match: str = "exact",
+    ) -> Optional[Element]:
+        """First element with one of the tags whose id matches (case-insensitive).
+
+        match: "exact" (whole id), "word" (id contains section_id delimited by
+        non-word characters, e.g. "hero" in "hero-main"), or "contains".
+        """
+        wanted = set(tags)
+        needle = section_id.lower()
+        word_re = re.compile(rf"(?:^|\b){re.escape(needle)}(?:\b|$)") if match == "word" else None
+        for element in self.elements:
+            if element.tag not in wanted or not element.id:
+                continue
+            element_id = element.id.lower()
+            if match == "exact":
+                found = element_id == needle
+            elif word_re is not None:
+                found = bool(word_re.search(element_id))
+            else:
+                found = needle in element_id
+            if found:
+                return element
+        return None
+
+    def enclosing(self, pos: int, predicate: Optional[Callable[[Element], bool]] = None) -> Optional[Element]:
+        """Innermost structural element containing pos (and matching predicate)."""
+        i = bisect.bisect_right(self._element_starts, pos) - 1
+        if i < 0:
+            return None
+        element: Optional[Element] = self.elements[i]
+        # Walk up from the last element starting before pos
+        while element is not None:
+            if element.contains(pos) and (predicate is None or predicate(element)):
+                return element
+            element = element.parent
+        return None
+
+    def last_id_before(self, pos: int, tags: Optional[Iterable[str]] = None) -> Optional[str]:
+        """Id of the last element (optionally limited to tags) opening at or before pos."""
+        wanted = set(tags) if tags is not None else None
+        i = bisect.bisect_right(self.id_tags, (pos, "￿", "")) - 1
+        while i >= 0:
+            _, tag, element_id = self.id_tags[i]
+            if wanted is None or tag in wanted:
+                return element_id
+            i -= 1
+        return None
+
+    def all_ids(self) -> Set[str]:
+        return {element_id for _, _, element_id in self.id_tags}
+
+    def images_in(self, element: Element) -> List[Element]:
+        return self._between(self.images, self._image_starts, element)
+
+    def links_in(self, element: Element) -> List[Element]:
+        return self._between(self.links, self._link_starts, element)
+
+    @staticmethod
+    def _between(items: List[Element], starts: List[int], element: Element) -> List[Element]:
+        lo = bisect.bisect_left(starts, element.open_end)
+        hi = bisect.bisect_left(starts, element.close_start)
+        return items[lo:hi]
+
+    def segments(self) -> Optional[List[Tuple[int, int]]]:
+        """Contiguous (start, end) spans covering the whole document.
+
+        Every top-level structural element (nav, each section, footer, ...)
+        is one span, and the markup between them (head, trailing scripts)
+        forms the spans in between, so an edit to one section changes one
+        span. None when an element is unclosed or mis-nested and the page
+        can't be cut at element boundaries.
+        """
+        if any(not element.closed for element in self.elements):
+            return None
+        spans: List[Tuple[int, int]] = []
+        pos = 0
+        for root in self.roots:
+            if root.start < pos:
+                return None
+            if root.start > pos:
+                spans.append((pos, root.start))
+            spans.append((root.start, root.end))
+            pos = root.end
+        if pos < len(self.html) or not spans:
+            spans.append((pos, len(self.html)))
+        return spans
+
+    def line_of(self, pos: int) -> int:
+        """1-based line number of a character offset."""
+        if self._line_starts is None:
+            self._line_starts = [m.end() for m in re.finditer("\n", self.html)]
+        return bisect.bisect_right(self._line_starts, pos) + 1
+
+    # ------------------------------------------------------------------
+    # Slicing / splicing
+    # ------------------------------------------------------------------
+
+    def slice(self, element: Element) -> str:
+        return self.html[element.start:element.end]
+
+    def inner(self, element: Element) -> str:
+        return self.html[element.open_end:element.close_start]
+
+    def splice(self, start: int, end: int, replacement: str = "") -> str:
+        """New HTML with html[start:end] replaced."""
+        return self.html[:start] + replacement + self.html[end:]
+
+    def splice_many(self, edits: Iterable[Tuple[int, int, str]]) -> str:
+        """New HTML with several (start, end, replacement) edits applied at once.
+
+        Edits are applied in offset order; an edit overlapping an earlier one
+        is dropped (removing a section also removes what is inside it).
+        """
+        parts: List[str] = []
+        pos = 0
+        for start, end, replacement in sorted(edits, key=lambda e: (e[0], -e[1])):
+            if start < pos:
+                continue
+            parts.append(self.html[pos:start])
+            parts.append(replacement)
+            pos = end
+        if not parts:
+            return self.html
+        parts.append(self.html[pos:])
+        return "".join(parts)
+
+    def remove(self, elements: Iterable[Element]) -> str:
+        """New HTML without the given elements."""
+        return self.splice_many((e.start, e.end, "") for e in elements)
+
+
+# ---------------------------------------------------------------------------
+# Per-content cache
+# ---------------------------------------------------------------------------
+
+_CACHE_SIZE = 16
+_cache: "OrderedDict[Tuple[int, int], HtmlDocument]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def parse_html(html: str) -> HtmlDocument:
+    """Parsed document for html, shared by callers that see the same content.
+
+    Keyed by the string hash (memoized on the str object by CPython) and
+    verified by equality, so a hit costs no re-tokenization.
+    """
+    key = (len(html), hash(html))
+    with _cache_lock:
+        doc = _cache.get(key)
+        if doc is not None and (doc.html is html or doc.html == html):
+            _cache.move_to_end(key)
+            return doc
+    doc = HtmlDocument(html)
+    with _cache_lock:
+        _cache[key] = doc
+        _cache.move_to_end(key)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return doc
+
+
+def clear_document_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,259 @@
+"""
+Icon sprite — Iconify references resolved at assembly time.
+
+The head template used to load iconify.min.js from code.iconify.design,
+which then fetched every icon of the page from the Iconify API on each
+visit (and the sanitizer blocks that CDN, so sanitized pages showed no
+icons at all). The icons now come from vendored sets in Iconify JSON
+format, app/components/icons/<prefix>.json ({"prefix", "width",
+"height", "icons": {name: {"body", ...}}, "aliases": {name: {"parent"}}};
+entries can be copied from the @iconify-json/<prefix> packages).
+
+IconSprite rewrites the page's references, chunk by chunk:
+
+- <span class="iconify" data-icon="lucide:phone"></span> (also <i>,
+  class="iconify-inline", data-width/data-height)
+- <iconify-icon icon="lucide:phone" width="24"></iconify-icon>
+
+into <svg ... width="1em" height="1em"><use href="#icon-lucide-phone"/></svg>
+(other attributes kept), and sprite() is the single inline
+<svg><symbol>...</svg> with every icon used, emitted once in the page tail.
+An icon missing from its set is looked up by name in DEFAULT_PREFIX (the
+AI writes mdi:phone as often as lucide:phone). References that still
+can't be resolved are left as they are and, with ICONIFY_RUNTIME_FALLBACK
+(default on), sprite() adds the Iconify runtime for them (from unpkg, the
+CDN the sanitizer allows): only pages with a missing icon load it.
+Without the fallback those icons render blank, and the pre-delivery
+check reports them (missing_icons()) as high severity.
+
+Usage:
+    icons = IconSprite()
+    sections = [icons.rewrite(s) for s in sections]
+    tail = icons.sprite() + tail
+"""
+
+import html as html_lib
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from app.core.config import settings
+from app.services.tag_scan import TagPattern
+
+logger = logging.getLogger(__name__)
+
+ICONS_DIR = Path(__file__).resolve().parent.parent / "components" / "icons"
+DEFAULT_PREFIX = "lucide"
+
+ICON_REF = TagPattern(
+    r"<(?P<tag>span|i|iconify-icon)\b(?P<attrs>[^>]*?)\s*(?P<close>/?)>(?P<end>\s*</(?P=tag)>)?",
+    start=r"<(?:span|i|iconify-icon)\b",
+    require=r"(?<![\w-])(?:data-icon|icon)\s*=",
+    flags=re.IGNORECASE,
+)
+_ATTR_RE = re.compile(r"""([^\s"'=/]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?""")
+_ICON_NAME_RE = re.compile(r"^([a-z0-9]+(?:-[a-z0-9]+)*):([a-z0-9]+(?:-[a-z0-9]+)*)$")
+# Iconify attributes consumed by the rewrite
+_ICON_ATTRS = {"data-icon", "icon", "data-width", "data-height", "width", "height", "data-inline", "inline"}
+# Runtime for unresolved references, by kind: <span class="iconify"> (SVG
+# framework) and <iconify-icon> (web component)
+RUNTIME_SCRIPTS = {
+    "class": "https://unpkg.com/@iconify/iconify@3.1.1/dist/iconify.min.js",
+    "element": "https://unpkg.com/iconify-icon@2.1.0/dist/iconify-icon.min.js",
+}
+
+
+class Icon(NamedTuple):
+    prefix: str
+    name: str
+    body: str
+    width: int
+    height: int
+
+    @property
+    def symbol_id(self) -> str:
+        return f"icon-{self.prefix}-{self.name}"
+
+    def symbol(self) -> str:
+        return f'<symbol id="{self.symbol_id}" viewBox="0 0 {self.width} {self.height}">{self.body}</symbol>'
+
+
+class IconLibrary:
+    """The vendored icon sets of a directory, by prefix."""
+
+    def __init__(self, icons_dir: Path = ICONS_DIR) -> None:
+        self.sets: Dict[str, dict] = {}
+        for path in sorted(icons_dir.glob("*.json")):
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                self.sets[data["prefix"]] = data
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"[Icons] Set di icone {path.name} non leggibile: {e}")
+
+    def _get(self, prefix: str, name: str) -> Optional[Icon]:
+        icon_set = self.sets.get(prefix)
+        if icon_set is None:
+            return None
+        name = icon_set.get("aliases", {}).get(name, {}).get("parent", name)
+        entry = icon_set["icons"].get(name)
+        if entry is None:
+            return None
+        return Icon(
+            prefix, name, entry["body"],
+            entry.get("width", icon_set.get("width", 16)),
+            entry.get("height", icon_set.get("height", 16)),
+        )
+
+    def resolve(self, ref: str) -> Optional[Icon]:
+        """The icon for "prefix:name" (its set, then DEFAULT_PREFIX by name)."""
+        m = _ICON_NAME_RE.match(ref.strip().lower())
+        if not m:
+            return None
+        prefix, name = m.groups()
+        return self._get(prefix, name) or self._get(DEFAULT_PREFIX, name)
+
+
+def _attrs(raw: str) -> Dict[str, str]:
+    return {
+        m.group(1).lower(): html_lib.unescape(next((g for g in m.groups()[1:] if g is not None), ""))
+        for m in _ATTR_RE.finditer(raw)
+    }
+
+
+def _size(value: Optional[str]) -> Optional[str]:
+    """An Iconify width/height as an SVG attribute value ("auto": none)."""
+    if not value or value == "auto":
+        return None
+    return value
+
+
+class _Reference(NamedTuple):
+    ref: str
+    kind: str  # "class" | "element" (RUNTIME_SCRIPTS)
+    attrs: Dict[str, str]
+    inline: bool
+
+
+def _reference(m: "re.Match[str]") -> Optional[_Reference]:
+    """The Iconify reference of an ICON_REF match (None: not one, or has content)."""
+    attrs = _attrs(m.group("attrs"))
+    classes = attrs.get("class", "").split()
+    if m.group("tag").lower() == "iconify-icon":
+        ref = _Reference(attrs.get("icon", ""), "element", attrs, "inline" in attrs)
+    elif "iconify" in classes or "iconify-inline" in classes:
+        ref = _Reference(
+            attrs.get("data-icon", ""), "class", attrs, "iconify-inline" in classes or "data-inline" in attrs,
+        )
+    else:
+        return None
+    if not m.group("close") and m.group("end") is None:
+        return None  # has content: not ours to replace
+    return ref
+
+
+def missing_icons(html: str, library: Optional[IconLibrary] = None) -> List[str]:
+    """Iconify references in html the vendored sets can't resolve, in order."""
+    if "icon" not in html:
+        return []
+    library = library or get_icon_library()
+    missing: List[str] = []
+    for m in ICON_REF.finditer(html):
+        ref = _reference(m)
+        if ref is not None and library.resolve(ref.ref) is None and ref.ref not in missing:
+            missing.append(ref.ref)
+    return missing
+
+
+class IconSprite:
+    """Rewrites a page's Iconify references; see the module docstring."""
+
+    def __init__(self, library: Optional[IconLibrary] = None, runtime_fallback: Optional[bool] = None) -> None:
+        self.library = library or get_icon_library()
+        self.runtime_fallback = settings.ICONIFY_RUNTIME_FALLBACK if runtime_fallback is None else runtime_fallback
+        self.used: Dict[str, Icon] = {}
+        self.missing: Set[str] = set()
+        self.missing_kinds: Set[str] = set()
+
+    def rewrite(self, html: str) -> str:
+        if "icon" not in html:
+            return html
+        return ICON_REF.sub(self._replace, html)
+
+    def _replace(self, m: "re.Match[str]") -> str:
+        reference = _reference(m)
+        if reference is None:
+            return m.group(0)
+        ref, attrs, inline = reference.ref, reference.attrs, reference.inline
+        icon = self.library.resolve(ref)
+        if icon is None:
+            self.missing.add(ref)
+            self.missing_kinds.add(reference.kind)
+            return m.group(0)
+        self.used.setdefault(icon.symbol_id, icon)
+
+        # Iconify's defaults: 1em high, width from the icon's aspect ratio
+        width = _size(attrs.get("data-width") or attrs.get("width"))
+        height = _size(attrs.get("data-height") or attrs.get("height"))
+        if width is None and height is None:
+            height = "1em"
+            width = f"{round(icon.width / icon.height, 4):g}em"
+        if inline:
+            attrs["style"] = "vertical-align:-0.125em;" + attrs.get("style", "")
+
+        svg_attrs: List[str] = ['xmlns="http://www.w3.org/2000/svg"']
+        svg_attrs += [
+            f'{name}="{html_lib.escape(value, quote=True)}"'
+            for name, value in attrs.items() if name not in _ICON_ATTRS
+        ]
+        for name, value in (("width", width), ("height", height)):
+            if value is not None:
+                svg_attrs.append(f'{name}="{html_lib.escape(value, quote=True)}"')
+        svg_attrs.append(f'viewBox="0 0 {icon.width} {icon.height}"')
+        if "aria-label" not in attrs:
+            svg_attrs.append('aria-hidden="true"')
+        return f'<svg {" ".join(svg_attrs)}><use href="#{icon.symbol_id}"/></svg>'
+
+    def sprite(self) -> str:
+        """The inline <svg> with a <symbol> per icon used, then the runtime for missing ones ("" when none)."""
+        out = ""
+        if self.used:
+            symbols = "".join(icon.symbol() for icon in self.used.values())
+            out = (
+                '<svg xmlns="http://www.w3.org/2000/svg" data-icons="sprite" aria-hidden="true" '
+                f'style="position:absolute;width:0;height:0;overflow:hidden">{symbols}</svg>\n'
+            )
+        if self.missing:
+            names = ", ".join(sorted(self.missing))
+            if self.runtime_fallback:
+                logger.warning(f"[Icons] Icone non nei set locali, caricate da Iconify a runtime: {names}")
+                out += "".join(f'<script src="{RUNTIME_SCRIPTS[kind]}"></script>\n' for kind in sorted(self.missing_kinds))
+            else:
+                logger.warning(f"[Icons] Icone non disponibili nei set locali (vuote nella pagina): {names}")
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Singleton
+# ---------------------------------------------------------------------------
+
+_library: Optional[IconLibrary] = None
+_library_lock = threading.Lock()
+
+
+def get_icon_library() -> IconLibrary:
+    global _library
+    if _library is None:
+        with _library_lock:
+            if _library is None:
+                _library = IconLibrary()
+    return _library
+
+
+def reset_icon_library() -> None:
+    """Reload the icon sets on next use (after editing app/components/icons)."""
+    global _library
+    with _library_lock:
+        _library = None
@@ -0,0 +1,151 @@
+"""Image loading hints — LCP priority, preload and lazy loading by section order.
+
+Every <img> on a generated page used to load eagerly (the templates only
+mark some heroes loading="eager"), so the hero photo, usually the page's
+Largest Contentful Paint, competed with gallery, team and blog photos.
+
+ImageLoadingHints rewrites the rendered sections in page order (the order
+of site_data["components"]); the first section is the one above the fold:
+
+- its first <img> is the LCP candidate: fetchpriority="high", and a lazy
+  loading attribute becomes "eager". preload_link() is the matching
+  <link rel="preload" as="image" fetchpriority="high"> for the <head>
+  (with imagesrcset/imagesizes from the tag, or the AVIF set of the
+  photo's manifest when it is wrapped in a <picture>). A first section
+  with no <img> preloads its CSS background-image instead.
+- every <img> of the following sections gets loading="lazy" (replacing
+  any other value) and decoding="async".
+
+Intrinsic width/height come from the photo manifests in the responsive
+pass (responsive.py), which runs on each section first.
+
+Usage:
+    hints = ImageLoadingHints(site_data.get("image_manifests"))
+    sections = [hints.rewrite(s) for s in sections]
+    head = insert_preload(head, hints.preload_link())
+"""
+
+import html as html_lib
+import re
+from typing import Any, Dict, List, Optional
+
+from app.services.images.optimizer import AVIF_TYPE
+from app.services.images.responsive import srcset
+from app.services.tag_scan import TagPattern
+
+_IMG_TAG = TagPattern(r"<img\b[^>]*>", start=r"<img\b", flags=re.IGNORECASE)
+
+
+def _attr_re(name: str) -> "re.Pattern[str]":
+    return re.compile(rf"""\s{name}\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"']+))""", re.IGNORECASE)
+
+
+_SRC_ATTR_RE = _attr_re("src")
+_SRCSET_ATTR_RE = _attr_re("srcset")
+_SIZES_ATTR_RE = _attr_re("sizes")
+_LOADING_ATTR_RE = _attr_re("loading")
+_DECODING_ATTR_RE = _attr_re("decoding")
+_FETCHPRIORITY_ATTR_RE = _attr_re("fetchpriority")
+_BACKGROUND_URL_RE = re.compile(
+    r"""background(?:-image)?\s*:[^;"]*?url\(\s*(?:&quot;|['"]?)([^'")&]+)""",
+    re.IGNORECASE,
+)
+_VIEWPORT_META_RE = re.compile(r"<meta\s+name=[\"']viewport[\"'][^>]*>", re.IGNORECASE)
+
+
+def _value(m: Optional["re.Match[str]"]) -> str:
+    if m is None:
+        return ""
+    return html_lib.unescape(next((g for g in m.groups() if g is not None), "")).strip()
+
+
+def _set_attr(tag: str, pattern: "re.Pattern[str]", name: str, value: str) -> str:
+    """tag with the attribute set to value (replaced in place or added before '>')."""
+    attr = f' {name}="{value}"'
+    m = pattern.search(tag)
+    if m:
+        return tag[:m.start()] + attr + tag[m.end():]
+    end = len(tag) - (2 if tag.endswith("/>") else 1)
+    return f"{tag[:end].rstrip()}{attr}{tag[end:]}"
+
+
+def _is_loadable(src: str) -> bool:
+    return bool(src) and not src.startswith(("data:", "{{"))
+
+
+class ImageLoadingHints:
+    """Rewrites a page's sections in order; see the module docstring."""
+
+    def __init__(self, manifests: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        self.manifests = manifests or {}
+        self.sections = 0
+        self.lcp: Dict[str, str] = {}  # href, imagesrcset, imagesizes, type of the preload
+
+    def rewrite(self, section_html: str) -> str:
+        self.sections += 1
+        if self.sections == 1:
+            return self._above_fold(section_html)
+        if "<img" not in section_html:
+            return section_html
+        return _IMG_TAG.sub(lambda m: self._lazy(m.group(0)), section_html)
+
+    def _above_fold(self, section_html: str) -> str:
+        for m in _IMG_TAG.finditer(section_html):
+            tag = m.group(0)
+            src = _value(_SRC_ATTR_RE.search(tag))
+            if not _is_loadable(src):
+                continue
+            self._set_lcp(src, tag)
+            priority = _set_attr(tag, _FETCHPRIORITY_ATTR_RE, "fetchpriority", "high")
+            if _value(_LOADING_ATTR_RE.search(priority)).lower() == "lazy":
+                priority = _set_attr(priority, _LOADING_ATTR_RE, "loading", "eager")
+            return section_html[:m.start()] + priority + section_html[m.end():]
+        background = _BACKGROUND_URL_RE.search(section_html)
+        if background and _is_loadable(background.group(1).strip()):
+            self.lcp = {"href": html_lib.unescape(background.group(1).strip())}
+        return section_html
+
+    def _set_lcp(self, src: str, tag: str) -> None:
+        self.lcp = {"href": src}
+        manifest = self.manifests.get(src)
+        avif = srcset(manifest, AVIF_TYPE) if manifest else ""
+        sizes = _value(_SIZES_ATTR_RE.search(tag))
+        if avif:
+            # The <picture> serves AVIF where supported: preloading the WebP
+            # set would fetch the photo twice there
+            self.lcp.update(imagesrcset=avif, type=AVIF_TYPE)
+        elif _SRCSET_ATTR_RE.search(tag):
+            self.lcp["imagesrcset"] = _value(_SRCSET_ATTR_RE.search(tag))
+        if "imagesrcset" in self.lcp and sizes:
+            self.lcp["imagesizes"] = sizes
+
+    @staticmethod
+    def _lazy(tag: str) -> str:
+        tag = _set_attr(tag, _LOADING_ATTR_RE, "loading", "lazy")
+        if not _DECODING_ATTR_RE.search(tag):
+            tag = _set_attr(tag, _DECODING_ATTR_RE, "decoding", "async")
+        return tag
+
+    def preload_link(self) -> str:
+        """<link rel="preload"> for the LCP image ("" if the first section has none)."""
+        if not self.lcp:
+            return ""
+        attrs: List[str] = ['rel="preload"', 'as="image"']
+        for name in ("href", "imagesrcset", "imagesizes", "type"):
+            if name in self.lcp:
+                attrs.append(f'{name}="{html_lib.escape(self.lcp[name], quote=True)}"')
+        attrs.append('fetchpriority="high"')
+        return f"<link {' '.join(attrs)}>"
+
+
+def insert_preload(head_html: str, link: str) -> str:
+    """head_html with link right after the viewport meta (before </head> without one)."""
+    if not link:
+        return head_html
+    m = _VIEWPORT_META_RE.search(head_html)
+    if m:
+        return f"{head_html[:m.end()]}\n  {link}{head_html[m.end():]}"
+    end = head_html.find("</head>")
+    if end < 0:
+        return head_html
+    return f"{head_html[:end]}{link}\n{head_html[end:]}"
@@ -3,19 +3,37 @@
 Converts user-uploaded base64 images to optimized CDN URLs.
 Also handles stock photo proxying through R2 for reliability.
 
+Every optimized photo comes with a variant manifest: its URL, size and
+the uploaded width variants (WebP, plus AVIF when Pillow can encode it).
+The assembler turns a manifest into srcset/sizes or a <picture> element
+(see app/services/images/responsive.py):
+
+    {
+        "src": "https://media.e-quipe.app/sites/42/ab12.webp",
+        "width": 1920, "height": 1280,
+        "variants": [
+            {"url": ".../cd34.webp", "width": 400, "type": "image/webp"},
+            ...
+            {"url": ".../ab12.webp", "width": 1920, "type": "image/webp"},
+            {"url": ".../ef56.avif", "width": 400, "type": "image/avif"},
+            ...
+        ],
+    }
+
 Usage:
     from app.services.images.optimizer import optimize_and_upload, process_user_photos
 
-    cdn_url = await optimize_and_upload(raw_bytes, "hero-bg.jpg", site_id=42)
-    cdn_urls = await process_user_photos(["data:image/png;base64,..."], site_id=42)
+    manifest = await optimize_and_upload(raw_bytes, "hero-bg.jpg", site_id=42)
+    manifests = await process_user_photos(["data:image/png;base64,..."], site_id=42)
 """
 
+import asyncio
 import base64
 import io
 import logging
 import re
 import uuid
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.core.config import settings
 from app.services.r2_storage import upload_to_r2, is_r2_available
@@ -28,8 +46,12 @@ logger = logging.getLogger(__name__)
 
 MAX_WIDTH = 1920
 WEBP_QUALITY = 80
+AVIF_QUALITY = 55  # AVIF matches WebP 80 at a lower setting
 SRCSET_WIDTHS = (400, 800, 1200)
 
+WEBP_TYPE = "image/webp"
+AVIF_TYPE = "image/avif"
+
 # Regex for data URL parsing: data:image/png;base64,iVBOR...
 _DATA_URL_RE = re.compile(
     r"^data:image/(?P<fmt>[a-zA-Z0-9+.-]+);base64,(?P<data>.+)$",
@@ -54,6 +76,15 @@ def _get_pil():
         return None, False
 
 
+def _avif_supported() -> bool:
+    """True if the installed Pillow can encode AVIF (Pillow >= 11.3 with libavif)."""
+    try:
+        from PIL import features
+        return bool(features.check("avif"))
+    except Exception:
+        return False
+
+
 # ---------------------------------------------------------------------------
 # Core functions
 # ---------------------------------------------------------------------------
@@ -121,20 +152,39 @@ def _to_webp_bytes(img, quality: int = WEBP_QUALITY) -> bytes:
     return buffer.getvalue()
 
 
+def _to_avif_bytes(img, quality: int = AVIF_QUALITY) -> bytes:
+    """Convert a PIL Image to AVIF bytes.
+
+    Args:
+        img: PIL Image object.
+        quality: AVIF quality (0-100).
+
+    Returns:
+        Raw AVIF bytes.
+    """
+    buffer = io.BytesIO()
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if img.mode in ("LA", "P") else "RGB")
+    img.save(buffer, format="AVIF", quality=quality, speed=6)
+    return buffer.getvalue()
+
+
 def _generate_srcset_variants(
     img,
     widths: Tuple[int, ...] = SRCSET_WIDTHS,
     quality: int = WEBP_QUALITY,
+    encode=_to_webp_bytes,
 ) -> Dict[int, bytes]:
     """Generate multiple width variants for srcset.
 
     Args:
         img: PIL Image object (original size).
         widths: Tuple of target widths.
-        quality: WebP quality.
+        quality: Encoder quality.
+        encode: Encoder (_to_webp_bytes or _to_avif_bytes).
 
     Returns:
-        Dict mapping width -> WebP bytes. Only includes widths smaller
+        Dict mapping width -> encoded bytes. Only includes widths smaller
         than the original image.
     """
     variants: Dict[int, bytes] = {}
@@ -142,7 +192,7 @@ def _generate_srcset_variants(
         if w >= img.width:
             continue
         resized = _resize_image(img, w)
-        variants[w] = _to_webp_bytes(resized, quality)
+        variants[w] = encode(resized, quality)
     return variants
 
 
@@ -155,32 +205,47 @@ async def optimize_and_upload(
     filename: str,
     site_id: int,
     generate_srcset: bool = False,
-) -> Optional[str]:
+) -> Optional[Dict[str, Any]]:
     """Optimize an image and upload to R2 CDN.
 
+    Decoding, encoding and the boto3 uploads are blocking: they run in a
+    worker thread (_optimize_and_upload_sync) so the event loop stays free.
+
     Pipeline:
     1. Open with Pillow
     2. Resize to max 1920px width
     3. Convert to WebP (80% quality)
     4. Upload to R2
-    5. Optionally generate srcset variants (400w, 800w, 1200w)
+    5. Optionally generate srcset variants (400w, 800w, 1200w WebP, and
+       AVIF at the same widths plus full size when Pillow supports it)
 
     Args:
         image_data: Raw image bytes (any format Pillow supports).
         filename: Base filename (extension will be replaced with .webp).
         site_id: Site ID for R2 key path.
-        generate_srcset: If True, also upload 400w/800w/1200w variants.
+        generate_srcset: If True, also upload the width/AVIF variants.
 
     Returns:
-        R2 CDN URL of the main (largest) image, or None on failure.
+        Variant manifest of the image (see module docstring; "src" is the
+        R2 CDN URL of the main image), or None on failure. Variants whose
+        upload failed are left out of the manifest.
     """
+    return await asyncio.to_thread(_optimize_and_upload_sync, image_data, filename, site_id, generate_srcset)
+
+
+def _optimize_and_upload_sync(
+    image_data: bytes,
+    filename: str,
+    site_id: int,
+    generate_srcset: bool,
+) -> Optional[Dict[str, Any]]:
     Image, pil_available = _get_pil()
 
     if not pil_available:
         # Without Pillow, upload the raw bytes unchanged
         ext = _extract_extension(filename)
         url = upload_to_r2(image_data, ext, site_id=site_id)
-        return url
+        return {"src": url, "variants": []} if url else None
 
     try:
         img = Image.open(io.BytesIO(image_data))
@@ -209,24 +274,39 @@ async def optimize_and_upload(
         len(image_data), len(main_bytes),
     )
 
+    manifest: Dict[str, Any] = {
+        "src": main_url,
+        "width": main_img.width,
+        "height": main_img.height,
+        "variants": [],
+    }
+
     # Optional srcset variants
     if generate_srcset:
-        variants = _generate_srcset_variants(img)
-        for width, variant_bytes in variants.items():
-            variant_key = f"{base_name}-{width}w.webp"
-            variant_url = upload_to_r2(variant_bytes, ".webp", site_id=site_id)
-            if variant_url:
-                logger.info("Uploaded srcset variant %dw (%d bytes)", width, len(variant_bytes))
-
-    return main_url
+        encodings = [(WEBP_TYPE, ".webp", _to_webp_bytes, WEBP_QUALITY)]
+        if _avif_supported():
+            encodings.append((AVIF_TYPE, ".avif", _to_avif_bytes, AVIF_QUALITY))
+        for mime, ext, encode, quality in encodings:
+            variants = _generate_srcset_variants(main_img, quality=quality, encode=encode)
+            for width, variant_bytes in variants.items():
+                variant_url = upload_to_r2(variant_bytes, ext, site_id=site_id)
+                if variant_url:
+                    logger.info("Uploaded srcset variant %s %dw (%d bytes)", ext, width, len(variant_bytes))
+                    manifest["variants"].append({"url": variant_url, "width": width, "type": mime})
+            # The full-size entry: the main image itself for WebP
+            full_url = main_url if mime == WEBP_TYPE else upload_to_r2(encode(main_img, quality), ext, site_id=site_id)
+            if full_url:
+                manifest["variants"].append({"url": full_url, "width": main_img.width, "type": mime})
+
+    return manifest
 
 
 async def process_user_photos(
     photo_data_urls: List[str],
     site_id: int,
     generate_srcset: bool = False,
-) -> List[str]:
-    """Process a list of base64 data URLs into optimized R2 CDN URLs.
+) -> List[Dict[str, Any]]:
+    """Process a list of base64 data URLs into optimized R2 CDN images.
 
     Each data URL is decoded, optimized (resize + WebP), and uploaded.
     Failed images are skipped (logged, not raised).
@@ -237,13 +317,14 @@ async def process_user_photos(
         generate_srcset: If True, generate srcset width variants.
 
     Returns:
-        List of R2 CDN URLs (may be shorter than input if some failed).
+        List of variant manifests, one per uploaded photo ("src" is the
+        R2 CDN URL; may be shorter than input if some failed).
     """
     if not is_r2_available():
         logger.warning("R2 not available — cannot process user photos")
         return []
 
-    cdn_urls: List[str] = []
+    manifests: List[Dict[str, Any]] = []
 
     for idx, data_url in enumerate(photo_data_urls):
         raw_bytes, fmt = _decode_data_url(data_url)
@@ -253,23 +334,23 @@ async def process_user_photos(
 
         filename = f"user-photo-{uuid.uuid4().hex[:8]}.{fmt}"
 
-        url = await optimize_and_upload(
+        manifest = await optimize_and_upload(
             image_data=raw_bytes,
             filename=filename,
             site_id=site_id,
             generate_srcset=generate_srcset,
         )
 
-        if url:
-            cdn_urls.append(url)
+        if manifest:
+            manifests.append(manifest)
         else:
             logger.warning("Skipping photo %d: optimization/upload failed", idx)
 
     logger.info(
         "Processed %d/%d user photos for site %d",
-        len(cdn_urls), len(photo_data_urls), site_id,
+        len(manifests), len(photo_data_urls), site_id,
     )
-    return cdn_urls
+    return manifests
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,134 @@
+"""Responsive images — srcset/sizes and <picture> for managed photos.
+
+optimize_and_upload() returns a variant manifest for every photo it stores
+(see optimizer.py). The manifests of the photos used by a site are kept in
+site_data["image_manifests"], keyed by the photo's src, and the assembler
+runs apply_responsive_images() on the rendered sections. Every <img> whose
+src has a manifest gets:
+
+- srcset with the WebP widths and sizes (DEFAULT_SIZES unless the tag has
+  its own), plus width/height from the manifest when the tag has none
+- when the manifest has AVIF variants, a <picture> around it with an AVIF
+  <source>; the <img> keeps the WebP srcset for browsers without AVIF.
+  The <picture> is display:contents, so the <img> stays laid out (and
+  styled by its classes) as a child of its original parent.
+
+Tags that already have a srcset and photos without a manifest (stock
+photos, background images, pasted URLs) are left as they are.
+
+Usage:
+    from app.services.images.responsive import add_image_manifests, apply_responsive_images
+
+    add_image_manifests(site_data, [manifest])
+    html = apply_responsive_images(html, site_data.get("image_manifests"))
+"""
+
+import html as html_lib
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.services.images.optimizer import AVIF_TYPE, WEBP_TYPE
+from app.services.tag_scan import TagPattern
+
+logger = logging.getLogger(__name__)
+
+# Full viewport width: right for heroes, an upper bound for grid items
+DEFAULT_SIZES = "100vw"
+
+_IMG_TAG = TagPattern(
+    r"<img\b[^>]*>",
+    start=r"<img\b",
+    exclude=r"(?<![\w-])srcset\s*=",
+    flags=re.IGNORECASE,
+)
+_SRC_ATTR_RE = re.compile(r"""(?<![\w-])src\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+_SIZES_ATTR_RE = re.compile(r"""(?<![\w-])sizes\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+_HAS_ATTR_RES = {
+    name: re.compile(rf"(?<![\w-]){name}\s*=", re.IGNORECASE)
+    for name in ("width", "height")
+}
+
+
+def _valid_manifest(manifest: Any) -> bool:
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("src"), str):
+        return False
+    variants = manifest.get("variants", [])
+    return isinstance(variants, list) and all(
+        isinstance(v, dict)
+        and isinstance(v.get("url"), str)
+        and isinstance(v.get("width"), int)
+        and v.get("type") in (WEBP_TYPE, AVIF_TYPE)
+        for v in variants
+    )
+
+
+def add_image_manifests(site_data: Dict[str, Any], manifests: Iterable[Any]) -> int:
+    """Store manifests in site_data["image_manifests"] by src; returns how many were kept."""
+    kept = 0
+    for manifest in manifests:
+        if not _valid_manifest(manifest):
+            logger.warning("[ResponsiveImages] Manifest non valido ignorato")
+            continue
+        site_data.setdefault("image_manifests", {})[manifest["src"]] = manifest
+        kept += 1
+    return kept
+
+
+def srcset(manifest: Dict[str, Any], mime: str) -> str:
+    """"url 400w, url 800w, ..." for the manifest's variants of one type."""
+    variants = sorted(
+        (v for v in manifest.get("variants", []) if v["type"] == mime),
+        key=lambda v: v["width"],
+    )
+    return ", ".join(f"{v['url']} {v['width']}w" for v in variants)
+
+
+def _attr(value: str) -> str:
+    return html_lib.escape(value, quote=True)
+
+
+def responsive_img(tag: str, manifest: Dict[str, Any]) -> str:
+    """The <img> tag with srcset/sizes, wrapped in <picture> when AVIF variants exist."""
+    webp = srcset(manifest, WEBP_TYPE)
+    avif = srcset(manifest, AVIF_TYPE)
+    if not webp and not avif:
+        return tag
+
+    sizes_match = _SIZES_ATTR_RE.search(tag)
+    sizes = (sizes_match.group(1) or sizes_match.group(2) or "") if sizes_match else DEFAULT_SIZES
+
+    added: List[str] = []
+    if webp:
+        added.append(f'srcset="{_attr(webp)}"')
+        if not sizes_match:
+            added.append(f'sizes="{_attr(sizes)}"')
+    for name in ("width", "height"):
+        if isinstance(manifest.get(name), int) and not _HAS_ATTR_RES[name].search(tag):
+            added.append(f'{name}="{manifest[name]}"')
+
+    end = len(tag) - (2 if tag.endswith("/>") else 1)
+    img = f"{tag[:end].rstrip()} {' '.join(added)}{tag[end:]}" if added else tag
+    if not avif:
+        return img
+    return (
+        '<picture style="display:contents">'
+        f'<source type="{AVIF_TYPE}" srcset="{_attr(avif)}" sizes="{_attr(sizes)}">'
+        f"{img}</picture>"
+    )
+
+
+def apply_responsive_images(html: str, manifests: Optional[Dict[str, Dict[str, Any]]]) -> str:
+    """html with every <img> backed by a manifest made responsive (one pass)."""
+    if not manifests or "<img" not in html:
+        return html
+
+    def repl(m: "re.Match[str]") -> str:
+        tag = m.group(0)
+        src = _SRC_ATTR_RE.search(tag)
+        if not src:
+            return tag
+        manifest = manifests.get(html_lib.unescape(src.group(1) or src.group(2) or "").strip())
+        return responsive_img(tag, manifest) if manifest else tag
+
+    return _IMG_TAG.sub(repl, html)
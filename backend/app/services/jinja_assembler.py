@@ -12,16 +12,39 @@ Usage:
     html = assembler.render_component("hero-classic-01", {"business_name": "Trattoria"})
     # or full page:
     html = assembler.assemble(site_data)
+
+Template loading:
+- Precompiled: tools/build_jinja_templates.py compiles every v2 template into
+  a package of Python modules (Environment.compile_templates) under
+  components_v2/_compiled/, byte-compiled to .pyc. It is used while its
+  manifest matches the templates on disk and the installed Jinja2 version;
+  otherwise templates load from source.
+- From source: compiled bytecode is cached on disk (FileSystemBytecodeCache,
+  directory from JINJA_BYTECODE_CACHE_DIR or a per-user temp dir), so only the
+  first process after a template change pays for compilation.
+- warm_up() loads every template up front (called from the app lifespan).
 """
 
+import compileall
+import hashlib
+import json
 import logging
+import os
+import shutil
+import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
 import jinja2
 
+from app.services.template_assembler import SectionRenderCache, _fingerprint
+
 logger = logging.getLogger(__name__)
 
+COMPILED_DIRNAME = "_compiled"
+COMPILED_MANIFEST = "manifest.json"
+_TEMPLATE_EXTENSIONS = ("html",)
+
 
 # Section labels for navigation (Italian)
 _SECTION_NAV_LABELS: Dict[str, Optional[str]] = {
@@ -95,6 +118,28 @@ def _is_valid_image(url: Optional[str]) -> bool:
     return True
 
 
+def _templates_fingerprint(components_dir: Path) -> str:
+    """Hash of the v2 template sources (names and contents)."""
+    digest = hashlib.sha1()
+    for path in sorted(components_dir.rglob("*.html")):
+        digest.update(path.relative_to(components_dir).as_posix().encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _bytecode_cache() -> Optional[jinja2.BytecodeCache]:
+    """Filesystem bytecode cache, or None if the directory is not writable."""
+    directory = os.environ.get("JINJA_BYTECODE_CACHE_DIR") or None
+    try:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return jinja2.FileSystemBytecodeCache(directory)
+    except (OSError, RuntimeError) as e:
+        logger.warning("[JinjaAssembler] Bytecode cache disabled: %s", e)
+        return None
+
+
 class JinjaAssembler:
     """Assembles HTML pages from Jinja2 component templates.
 
@@ -105,14 +150,35 @@ class JinjaAssembler:
     Both can be used in the same codebase during migration.
     """
 
-    def __init__(self, components_dir: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        components_dir: Optional[str] = None,
+        section_cache: Optional[SectionRenderCache] = None,
+        precompiled: bool = True,
+        bytecode_cache: bool = True,
+    ) -> None:
         if components_dir is None:
             components_dir = str(Path(__file__).parent.parent / "components_v2")
 
         self._components_dir = Path(components_dir)
+        self.section_cache = section_cache if section_cache is not None else SectionRenderCache()
+        # Per-call section cache hits/misses of the last assemble()
+        self._last_cache_stats: Dict[str, Any] = {}
+
+        self._source_loader = jinja2.FileSystemLoader(str(self._components_dir))
+        loader: jinja2.BaseLoader = self._source_loader
+        # "precompiled", or "source" when templates are compiled at load time
+        self.template_source = "source"
+        if precompiled and self._precompiled_is_current():
+            loader = jinja2.ChoiceLoader([
+                jinja2.ModuleLoader(str(self._components_dir / COMPILED_DIRNAME)),
+                self._source_loader,  # templates skipped at build time (syntax errors)
+            ])
+            self.template_source = "precompiled"
 
         self.env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(str(self._components_dir)),
+            loader=loader,
+            bytecode_cache=_bytecode_cache() if bytecode_cache else None,
             autoescape=jinja2.select_autoescape(["html"]),
             undefined=jinja2.Undefined,  # Permissive: missing vars render as empty string
             trim_blocks=True,
@@ -127,6 +193,91 @@ class JinjaAssembler:
         # Register global functions
         self.env.globals["css_gradient_fallback"] = _css_gradient_fallback
 
+    # ------------------------------------------------------------------
+    # Precompiled templates / warm-up
+    # ------------------------------------------------------------------
+
+    def _precompiled_is_current(self) -> bool:
+        manifest_path = self._components_dir / COMPILED_DIRNAME / COMPILED_MANIFEST
+        if not manifest_path.exists():
+            return False
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        if manifest.get("jinja2") != jinja2.__version__:
+            logger.warning("[JinjaAssembler] %s/ built with another Jinja2 version, ignoring", COMPILED_DIRNAME)
+            return False
+        if manifest.get("fingerprint") != _templates_fingerprint(self._components_dir):
+            logger.warning(
+                "[JinjaAssembler] %s/ is stale, loading templates from source "
+                "(run tools/build_jinja_templates.py)", COMPILED_DIRNAME,
+            )
+            return False
+        return True
+
+    def template_names(self) -> List[str]:
+        """All v2 template paths (e.g. "hero/hero-classic-01.html")."""
+        return [
+            name for name in self._source_loader.list_templates()
+            if name.rsplit(".", 1)[-1] in _TEMPLATE_EXTENSIONS
+        ]
+
+    def compile_templates(self) -> Path:
+        """Precompile every template into components_v2/_compiled/ (build step).
+
+        The generated modules are byte-compiled too, so loading them is an
+        unmarshal instead of a parse. The directory is built next to the old
+        one and swapped in. Templates with syntax errors are skipped (and
+        logged); at runtime they still load from source, so render_component
+        reports the error. Returns the package directory.
+        """
+        target = self._components_dir / COMPILED_DIRNAME
+        tmp_target = target.with_name(COMPILED_DIRNAME + ".tmp")
+        shutil.rmtree(tmp_target, ignore_errors=True)
+        fingerprint = _templates_fingerprint(self._components_dir)
+        names = self.template_names()
+
+        self.env.compile_templates(
+            str(tmp_target),
+            extensions=_TEMPLATE_EXTENSIONS,
+            zip=None,
+            log_function=logger.debug,
+        )
+        compileall.compile_dir(str(tmp_target), quiet=1)
+        manifest = {
+            "fingerprint": fingerprint,
+            "jinja2": jinja2.__version__,
+            "templates": len(names),
+        }
+        (tmp_target / COMPILED_MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+        old_target = target.with_name(COMPILED_DIRNAME + ".old")
+        if target.exists():
+            os.replace(target, old_target)
+        os.replace(tmp_target, target)
+        shutil.rmtree(old_target, ignore_errors=True)
+        logger.info("[JinjaAssembler] Compiled %d templates into %s", len(names), target)
+        return target
+
+    def warm_up(self) -> int:
+        """Load every template into the environment cache. Returns the count loaded."""
+        start = time.perf_counter()
+        loaded = 0
+        for name in self.template_names():
+            if not name.endswith(".html"):
+                continue
+            try:
+                self.env.get_template(name)
+                loaded += 1
+            except jinja2.TemplateError as e:
+                logger.warning("[JinjaAssembler] Warm-up skipped %s: %s", name, e)
+        logger.info(
+            "[JinjaAssembler] Warm-up: %d templates (%s) in %.0f ms",
+            loaded, self.template_source, (time.perf_counter() - start) * 1000,
+        )
+        return loaded
+
     def render_component(
         self,
         variant_id: str,
@@ -192,7 +343,9 @@ class JinjaAssembler:
         # Build nav links from active sections
         nav_links = self._build_nav_links(sections, section_order)
 
-        # Render each section
+        # Render each section, reusing cached HTML for unchanged sections
+        theme_key = _fingerprint(head_data)
+        cache_hits = cache_misses = 0
         rendered_sections: List[str] = []
         for section_key in section_order:
             if section_key not in sections:
@@ -207,10 +360,26 @@ class JinjaAssembler:
             section_data.setdefault("nav_links", nav_links)
             section_data.setdefault("nav_links_mobile", nav_links)
 
-            html = self.render_component(variant_id, section_data)
+            cache_key = (variant_id, _fingerprint(section_data), theme_key)
+            html = self.section_cache.get(cache_key)
+            if html is not None:
+                cache_hits += 1
+            else:
+                cache_misses += 1
+                html = self.render_component(variant_id, section_data)
+                # Error comments are not cached so a fixed template is picked up
+                if not html.startswith("<!-- ERROR"):
+                    self.section_cache.put(cache_key, html)
             if html:
                 rendered_sections.append(html)
 
+        rendered_total = cache_hits + cache_misses
+        self._last_cache_stats = {
+            "hits": cache_hits,
+            "misses": cache_misses,
+            "hit_rate": round(cache_hits / rendered_total, 4) if rendered_total else 0.0,
+        }
+
         body_html = "\n\n".join(rendered_sections)
 
         return self._wrap_in_document(body_html, head_data)
@@ -331,3 +500,7 @@ body {{
             else:
                 result[lower_key] = value
         return result
+
+
+# Singleton instance (keeps its section render cache across requests)
+jinja_assembler = JinjaAssembler()
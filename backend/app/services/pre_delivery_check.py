@@ -3,18 +3,29 @@ Pre-Delivery Quality Check - Fast deterministic validation for generated HTML.
 
 Runs AFTER template assembly and BEFORE the AI-powered QC pipeline.
 Catches common issues: leftover placeholders, missing images, empty sections,
-banned generic text, missing alt text, broken links, missing GSAP animations.
+banned generic text, missing alt text, broken links, missing GSAP animations,
+icons missing from the vendored sets.
 
 Auto-fixes what it can (placeholders, alt text, broken images, empty sections).
 Returns a scored report with issues and the fixed HTML.
+
+The read-only checks (GSAP, generic text, links, word counts, nav anchors,
+CSS variables) work from per-section facts cached by section content hash,
+so re-checking a page after a refine only re-scans the edited section.
 """
 
+import hashlib
+import html as html_lib
 import re
 import logging
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple
 
 from app.services.banned_phrases import BANNED_PHRASES
+from app.services.font_pipeline import check_vendored_fonts, self_hosted_families
+from app.services.html_document import Element, HtmlDocument, parse_html
+from app.services.icon_sprite import RUNTIME_SCRIPTS, missing_icons
+from app.services.template_assembler import SectionRenderCache
 
 logger = logging.getLogger(__name__)
 
@@ -56,6 +67,26 @@ class PreDeliveryReport:
         }
 
 
+@dataclass
+class _SectionFacts:
+    """What the read-only checks need from one section of the page.
+
+    Offsets are relative to the section (phrase offsets to its lowercased
+    text), so the facts stay valid when other sections change size.
+    """
+    lower_len: int = 0
+    animate_count: int = 0
+    phrase_hits: Dict[str, Tuple[int, int]] = field(default_factory=dict)  # phrase -> (count, first offset)
+    css_defs: Set[str] = field(default_factory=set)
+    css_refs: Set[str] = field(default_factory=set)
+    link_issues: List[Tuple[int, str]] = field(default_factory=list)  # (offset, message)
+    has_nav: bool = False
+    nav_hrefs: Set[str] = field(default_factory=set)
+    ids: Set[str] = field(default_factory=set)
+    # section id -> word count rule -> issues (last section with an id wins)
+    word_counts: Dict[str, Dict[str, List["PreDeliveryIssue"]]] = field(default_factory=dict)
+
+
 # ---------------------------------------------------------------------------
 # Severity weights for scoring
 # ---------------------------------------------------------------------------
@@ -111,34 +142,15 @@ class PreDeliveryCheck:
     # Patterns for placeholder detection
     _PLACEHOLDER_RE = re.compile(r"\{\{[A-Z_][A-Z0-9_]*\}\}")
 
-    # Patterns for broken image detection
-    _IMG_TAG_RE = re.compile(r"<img\b[^>]*?>", re.IGNORECASE | re.DOTALL)
-    _SRC_ATTR_RE = re.compile(r"""\bsrc\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
-    _ALT_ATTR_RE = re.compile(r"""\balt\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+    # Tags whose id counts as a section id (<section id="...">, <footer id="...">, ...)
+    _SECTION_ID_TAGS = ("section", "footer", "div", "header")
 
-    # Section detection: <section id="...">, <footer id="...">, or data-section="..."
-    _SECTION_ID_RE = re.compile(
-        r"""<(?:section|footer|div|header)\b[^>]*?\bid\s*=\s*["']([^"']+)["'][^>]*?>""",
-        re.IGNORECASE | re.DOTALL,
-    )
-    _DATA_SECTION_RE = re.compile(
-        r"""data-section\s*=\s*["']([^"']+)["']""",
-        re.IGNORECASE,
-    )
-
-    # Entire section block (greedy enough to capture content, non-greedy overall)
-    _SECTION_BLOCK_RE = re.compile(
-        r"(<(?:section|footer)\b[^>]*?>)(.*?)(</(?:section|footer)>)",
-        re.IGNORECASE | re.DOTALL,
-    )
+    # Section blocks checked for content (balanced, outermost)
+    _SECTION_BLOCK_TAGS = ("section", "footer")
 
     # GSAP data-animate attributes
     _DATA_ANIMATE_RE = re.compile(r'data-animate\s*=\s*["\'][^"\']+["\']', re.IGNORECASE)
 
-    # Link detection
-    _LINK_RE = re.compile(r"<a\b[^>]*?>", re.IGNORECASE | re.DOTALL)
-    _HREF_RE = re.compile(r"""\bhref\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
-
     # Strip HTML tags for text content check
     _STRIP_TAGS_RE = re.compile(r"<[^>]+>")
 
@@ -157,6 +169,14 @@ class PreDeliveryCheck:
     # CSS variable reference and definition patterns
     _CSS_VAR_REF_RE = re.compile(r'var\(\s*(--[\w-]+)', re.IGNORECASE)
     _CSS_VAR_DEF_RE = re.compile(r'(--[\w-]+)\s*:', re.IGNORECASE)
+    _STYLE_BLOCK_RE = re.compile(r'<style[^>]*>(.*?)</style>', re.DOTALL | re.IGNORECASE)
+    _BANNED_PHRASES_LOWER = [(phrase, phrase.lower()) for phrase in BANNED_PHRASES]
+    _INLINE_VAR_DEF_RE = re.compile(r'style\s*=\s*["\'][^"\']*?(--[\w-]+)\s*:', re.IGNORECASE)
+
+    def __init__(self, section_cache: Optional[SectionRenderCache] = None) -> None:
+        # Per-section facts for the read-only checks, keyed by content hash
+        self.section_cache = section_cache if section_cache is not None else SectionRenderCache(max_size=256)
+        self._last_page_facts: Optional[Tuple[str, List[Tuple[int, _SectionFacts]]]] = None
 
     def check(
         self,
@@ -223,6 +243,9 @@ class PreDeliveryCheck:
         issues = self._check_nav_anchors(working_html)
         all_issues.extend(issues)
 
+        issues = self._check_icons(working_html)
+        all_issues.extend(issues)
+
         # --- Font URL and CSS variable checks (auto-fixable) ---
 
         issues, working_html, fixes = self._check_font_urls(working_html, theme_config)
@@ -322,24 +345,24 @@ class PreDeliveryCheck:
         """Check for broken/missing images and remove them."""
         issues: List[PreDeliveryIssue] = []
         fixes: List[Dict[str, str]] = []
-        tags_to_remove: List[str] = []
+        images_to_remove = []
 
-        for img_match in self._IMG_TAG_RE.finditer(html):
-            img_tag = img_match.group(0)
-            src_match = self._SRC_ATTR_RE.search(img_tag)
+        doc = parse_html(html)
+        for img in doc.images:
+            src_value = img.attrs.get("src")
 
-            if not src_match:
+            if src_value is None:
                 # No src attribute at all
                 issues.append(PreDeliveryIssue(
                     severity="high",
                     check_type="missing_image",
                     message="<img> tag has no src attribute",
-                    location=self._approx_location(html, img_match.start()),
+                    location=self._approx_location(html, img.start),
                 ))
-                tags_to_remove.append(img_tag)
+                images_to_remove.append(img)
                 continue
 
-            src_value = (src_match.group(1) or src_match.group(2) or "").strip()
+            src_value = src_value.strip()
 
             # Empty src
             if not src_value:
@@ -347,9 +370,9 @@ class PreDeliveryCheck:
                     severity="high",
                     check_type="missing_image",
                     message='<img> tag has empty src=""',
-                    location=self._approx_location(html, img_match.start()),
+                    location=self._approx_location(html, img.start),
                 ))
-                tags_to_remove.append(img_tag)
+                images_to_remove.append(img)
                 continue
 
             # Placeholder image services
@@ -358,7 +381,7 @@ class PreDeliveryCheck:
                     severity="medium",
                     check_type="placeholder_image",
                     message=f"Image uses placeholder service: {src_value[:80]}",
-                    location=self._approx_location(html, img_match.start()),
+                    location=self._approx_location(html, img.start),
                 ))
                 # Don't remove placeholder images - they're better than nothing
                 continue
@@ -369,19 +392,18 @@ class PreDeliveryCheck:
                     severity="high",
                     check_type="missing_image",
                     message=f"<img> has invalid/truncated data URI: {src_value[:50]}",
-                    location=self._approx_location(html, img_match.start()),
+                    location=self._approx_location(html, img.start),
                 ))
-                tags_to_remove.append(img_tag)
+                images_to_remove.append(img)
                 continue
 
         # Auto-fix: remove broken image tags
         fixed_html = html
-        if tags_to_remove:
-            for tag in tags_to_remove:
-                fixed_html = fixed_html.replace(tag, "", 1)
+        if images_to_remove:
+            fixed_html = doc.remove(images_to_remove)
             fixes.append({
                 "type": "remove_broken_images",
-                "description": f"Removed {len(tags_to_remove)} broken <img> tag(s) with empty/missing src",
+                "description": f"Removed {len(images_to_remove)} broken <img> tag(s) with empty/missing src",
             })
 
         return issues, fixed_html, fixes
@@ -393,11 +415,14 @@ class PreDeliveryCheck:
         issues: List[PreDeliveryIssue] = []
 
         # Collect all section IDs present in the HTML
+        doc = parse_html(html)
         present_ids: set = set()
-        for m in self._SECTION_ID_RE.finditer(html):
-            present_ids.add(m.group(1).lower().strip())
-        for m in self._DATA_SECTION_RE.finditer(html):
-            present_ids.add(m.group(1).lower().strip())
+        for _, tag, element_id in doc.id_tags:
+            if tag in self._SECTION_ID_TAGS:
+                present_ids.add(element_id.lower().strip())
+        for data_section in doc.data_sections:
+            if data_section:
+                present_ids.add(data_section.lower().strip())
 
         for section_name in requested:
             canonical = section_name.lower().strip()
@@ -435,19 +460,14 @@ class PreDeliveryCheck:
         """Find sections with no meaningful text content and remove them."""
         issues: List[PreDeliveryIssue] = []
         fixes: List[Dict[str, str]] = []
-        blocks_to_remove: List[str] = []
+        sections_to_remove = []
 
-        for m in self._SECTION_BLOCK_RE.finditer(html):
-            open_tag = m.group(1)
-            inner_content = m.group(2)
-            full_block = m.group(0)
-
-            # Extract section ID for location reporting
-            id_match = re.search(r'id\s*=\s*["\']([^"\']+)["\']', open_tag, re.IGNORECASE)
-            section_id = id_match.group(1) if id_match else "unknown"
+        doc = parse_html(html)
+        for section in doc.sections(self._SECTION_BLOCK_TAGS, closed_only=True):
+            section_id = section.id or "unknown"
 
             # Strip all HTML tags and check remaining text
-            text_content = self._STRIP_TAGS_RE.sub("", inner_content).strip()
+            text_content = self._STRIP_TAGS_RE.sub("", doc.inner(section)).strip()
             # Also remove common whitespace-like entities
             text_content = re.sub(r"&(?:nbsp|#160|#xa0);", "", text_content).strip()
 
@@ -458,20 +478,16 @@ class PreDeliveryCheck:
                     message=f"Section '{section_id}' has no text content",
                     location=f"section#{section_id}",
                 ))
-                blocks_to_remove.append(full_block)
+                sections_to_remove.append(section)
 
         # Auto-fix: remove empty sections
         fixed_html = html
-        if blocks_to_remove:
-            for block in blocks_to_remove:
-                fixed_html = fixed_html.replace(block, "", 1)
-            removed_ids = []
-            for block in blocks_to_remove:
-                id_m = re.search(r'id\s*=\s*["\']([^"\']+)["\']', block, re.IGNORECASE)
-                removed_ids.append(id_m.group(1) if id_m else "unknown")
+        if sections_to_remove:
+            fixed_html = doc.remove(sections_to_remove)
+            removed_ids = [section.id or "unknown" for section in sections_to_remove]
             fixes.append({
                 "type": "remove_empty_sections",
-                "description": f"Removed {len(blocks_to_remove)} empty section(s): {', '.join(removed_ids)}",
+                "description": f"Removed {len(sections_to_remove)} empty section(s): {', '.join(removed_ids)}",
             })
 
         return issues, fixed_html, fixes
@@ -480,7 +496,7 @@ class PreDeliveryCheck:
         """Verify GSAP data-animate attributes are present."""
         issues: List[PreDeliveryIssue] = []
 
-        animate_count = len(self._DATA_ANIMATE_RE.findall(html))
+        animate_count = sum(facts.animate_count for _, facts in self._page_facts(html))
 
         if animate_count == 0:
             issues.append(PreDeliveryIssue(
@@ -510,22 +526,21 @@ class PreDeliveryCheck:
         """Detect banned generic phrases in the HTML."""
         issues: List[PreDeliveryIssue] = []
 
-        # Extract visible text (strip tags) for searching
-        # We also search the raw HTML to catch text inside attributes, but
-        # primarily we care about visible content.
-        html_lower = html.lower()
+        # Occurrences in the lowercased HTML (text inside attributes too),
+        # summed over the sections; first_pos is the first one in the page
+        totals: Dict[str, List[int]] = {}
+        lower_pos = 0
+        for _, facts in self._page_facts(html):
+            for phrase, (count, first) in facts.phrase_hits.items():
+                if phrase in totals:
+                    totals[phrase][0] += count
+                else:
+                    totals[phrase] = [count, lower_pos + first]
+            lower_pos += facts.lower_len
 
         for phrase in BANNED_PHRASES:
             phrase_lower = phrase.lower()
-            # Find all occurrences
-            start = 0
-            count = 0
-            while True:
-                idx = html_lower.find(phrase_lower, start)
-                if idx == -1:
-                    break
-                count += 1
-                start = idx + len(phrase_lower)
+            count, first_pos = totals.get(phrase, (0, -1))
 
             if count > 0:
                 # "lorem ipsum" is critical; other banned phrases are high
@@ -538,7 +553,7 @@ class PreDeliveryCheck:
                     severity=severity,
                     check_type="generic_text",
                     message=f"Banned generic phrase found ({count}x): \"{phrase}\"",
-                    location=self._approx_location(html, html_lower.find(phrase_lower)),
+                    location=self._approx_location(html, first_pos),
                 ))
 
         return issues
@@ -551,38 +566,39 @@ class PreDeliveryCheck:
         fixes: List[Dict[str, str]] = []
         fix_count = 0
 
-        fixed_html = html
+        edits = []
 
-        for img_match in self._IMG_TAG_RE.finditer(html):
-            img_tag = img_match.group(0)
-            alt_match = self._ALT_ATTR_RE.search(img_tag)
+        doc = parse_html(html)
+        for img in doc.images:
+            alt_value = img.attrs.get("alt")
 
-            if not alt_match:
+            if alt_value is None:
                 # No alt attribute at all
                 issues.append(PreDeliveryIssue(
                     severity="medium",
                     check_type="missing_alt",
                     message="<img> tag missing alt attribute",
-                    location=self._approx_location(html, img_match.start()),
+                    location=self._approx_location(html, img.start),
                 ))
                 # Auto-fix: add alt="Immagine" before the closing >
+                img_tag = doc.slice(img)
                 if img_tag.endswith("/>"):
                     fixed_tag = img_tag[:-2].rstrip() + ' alt="Immagine" />'
                 else:
                     fixed_tag = img_tag[:-1].rstrip() + ' alt="Immagine">'
-                fixed_html = fixed_html.replace(img_tag, fixed_tag, 1)
+                edits.append((img.start, img.end, fixed_tag))
                 fix_count += 1
-            else:
-                alt_value = (alt_match.group(1) or alt_match.group(2) or "").strip()
-                if not alt_value:
-                    issues.append(PreDeliveryIssue(
-                        severity="low",
-                        check_type="empty_alt",
-                        message='<img> tag has empty alt=""',
-                        location=self._approx_location(html, img_match.start()),
-                    ))
-                    # Empty alt is acceptable for decorative images (WCAG),
-                    # so we don't auto-fix it - just report.
+            elif not alt_value.strip():
+                issues.append(PreDeliveryIssue(
+                    severity="low",
+                    check_type="empty_alt",
+                    message='<img> tag has empty alt=""',
+                    location=self._approx_location(html, img.start),
+                ))
+                # Empty alt is acceptable for decorative images (WCAG),
+                # so we don't auto-fix it - just report.
+
+        fixed_html = doc.splice_many(edits) if edits else html
 
         if fix_count > 0:
             fixes.append({
@@ -596,65 +612,97 @@ class PreDeliveryCheck:
         """Find links with empty or broken href (except legitimate anchors)."""
         issues: List[PreDeliveryIssue] = []
 
-        for link_match in self._LINK_RE.finditer(html):
-            link_tag = link_match.group(0)
-            href_match = self._HREF_RE.search(link_tag)
-
-            if not href_match:
-                # No href attribute
+        for start, facts in self._page_facts(html):
+            for offset, message in facts.link_issues:
                 issues.append(PreDeliveryIssue(
                     severity="low",
                     check_type="empty_link",
-                    message="<a> tag has no href attribute",
-                    location=self._approx_location(html, link_match.start()),
+                    message=message,
+                    location=self._approx_location(html, start + offset),
                 ))
+
+        return issues
+
+    @staticmethod
+    def _empty_link_messages(links: List[Element]) -> List[Tuple[int, str]]:
+        """(offset, message) for each <a> with a missing, empty or non-functional href."""
+        messages: List[Tuple[int, str]] = []
+
+        for link in links:
+            href_value = link.attrs.get("href")
+
+            if href_value is None:
+                # No href attribute
+                messages.append((link.start, "<a> tag has no href attribute"))
                 continue
 
-            href_value = (href_match.group(1) or href_match.group(2) or "").strip()
+            href_value = href_value.strip()
 
             # Empty href
             if not href_value:
-                issues.append(PreDeliveryIssue(
-                    severity="low",
-                    check_type="empty_link",
-                    message='<a> tag has empty href=""',
-                    location=self._approx_location(html, link_match.start()),
-                ))
+                messages.append((link.start, '<a> tag has empty href=""'))
                 continue
 
             # href="#" (but NOT anchor links like #about, #services, etc.)
             if href_value == "#":
-                issues.append(PreDeliveryIssue(
-                    severity="low",
-                    check_type="empty_link",
-                    message='<a> tag has href="#" (non-functional link)',
-                    location=self._approx_location(html, link_match.start()),
-                ))
+                messages.append((link.start, '<a> tag has href="#" (non-functional link)'))
                 continue
 
             # href="javascript:void(0)" or similar
             if href_value.lower().startswith("javascript:"):
+                messages.append((link.start, f"<a> tag uses javascript: href ({href_value[:40]})"))
+
+        return messages
+
+    def _check_icons(self, html: str) -> List[PreDeliveryIssue]:
+        """Iconify references not in the vendored icon sets: blank unless the
+        page loads the Iconify runtime (ICONIFY_RUNTIME_FALLBACK)."""
+        missing = missing_icons(html)
+        if not missing:
+            return []
+        runtime = any(url in html for url in RUNTIME_SCRIPTS.values())
+        return [PreDeliveryIssue(
+            severity="low" if runtime else "high",
+            check_type="missing_icon",
+            message=(
+                f"Icon {ref} not in the vendored sets: "
+                + ("loaded from Iconify at runtime" if runtime else "renders blank")
+            ),
+            location=self._approx_location(html, html.find(ref)),
+        ) for ref in missing]
+
+    def _check_font_urls(
+        self,
+        html: str,
+        theme_config: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[PreDeliveryIssue], str, List[Dict[str, str]]]:
+        """Verify the page's fonts (Google Fonts URLs or self-hosted @font-face
+        rules) contain the fonts specified in theme config, and that the
+        Google Fonts families have vendored files to self-host at publish."""
+        issues, fixed_html, fixes = self._check_theme_fonts(html, theme_config)
+        for match in self._GOOGLE_FONTS_RE.finditer(fixed_html):
+            url = html_lib.unescape(match.group(1))
+            for problem in check_vendored_fonts(fixed_html, url):
                 issues.append(PreDeliveryIssue(
                     severity="low",
-                    check_type="empty_link",
-                    message=f"<a> tag uses javascript: href ({href_value[:40]})",
-                    location=self._approx_location(html, link_match.start()),
+                    check_type="font_not_vendored",
+                    message=f"Font not self-hostable: {problem}",
+                    location="<head>",
                 ))
+        return issues, fixed_html, fixes
 
-        return issues
-
-    def _check_font_urls(
+    def _check_theme_fonts(
         self,
         html: str,
         theme_config: Optional[Dict[str, Any]] = None,
     ) -> Tuple[List[PreDeliveryIssue], str, List[Dict[str, str]]]:
-        """Verify Google Fonts URLs contain the fonts specified in theme config."""
         issues: List[PreDeliveryIssue] = []
         fixes: List[Dict[str, str]] = []
 
-        # Find Google Fonts URLs in the HTML
+        # Find Google Fonts URLs and self-hosted fonts (already published pages)
         font_url_matches = list(self._GOOGLE_FONTS_RE.finditer(html))
-        if not font_url_matches:
+        self_hosted = self_hosted_families(html)
+        if not font_url_matches and not self_hosted:
             issues.append(PreDeliveryIssue(
                 severity="high",
                 check_type="missing_font_url",
@@ -674,15 +722,30 @@ class PreDeliveryCheck:
         if not font_heading and not font_body:
             return issues, html, fixes
 
+        if not font_url_matches:
+            missing_names = [
+                f"{role}: {name}"
+                for role, name in (("font_heading", font_heading), ("font_body", font_body))
+                if name and not any(name.lower() in f.lower() for f in self_hosted)
+            ]
+            if missing_names:
+                issues.append(PreDeliveryIssue(
+                    severity="high",
+                    check_type="font_mismatch",
+                    message=f"Self-hosted fonts missing theme fonts: {', '.join(missing_names)}",
+                    location="<head>",
+                ))
+            return issues, html, fixes
+
         # Check each Google Fonts URL
         fixed_html = html
         for match in font_url_matches:
             full_url = match.group(1)
-            # Extract font family names from URL
+            # Extract font family names from URL (plus the self-hosted ones)
             families_in_url = [
                 f.replace("+", " ")
                 for f in self._FONT_FAMILY_RE.findall(full_url)
-            ]
+            ] + sorted(self_hosted)
 
             missing_fonts = []
             if font_heading and not any(
@@ -734,26 +797,11 @@ class PreDeliveryCheck:
         """Check that var(--*) references have matching :root definitions."""
         issues: List[PreDeliveryIssue] = []
 
-        # Find all CSS variable definitions in style blocks
-        style_blocks = re.findall(
-            r'<style[^>]*>(.*?)</style>', html, re.DOTALL | re.IGNORECASE
-        )
         defined_vars: set = set()
-        for block in style_blocks:
-            for var_def in self._CSS_VAR_DEF_RE.findall(block):
-                defined_vars.add(var_def)
-
-        # Also count definitions in inline styles (rare but possible)
-        inline_style_defs = re.findall(
-            r'style\s*=\s*["\'][^"\']*?(--[\w-]+)\s*:', html, re.IGNORECASE
-        )
-        for var_name in inline_style_defs:
-            defined_vars.add(var_name)
-
-        # Find all var(--*) references in the entire HTML
         all_refs: set = set()
-        for var_ref in self._CSS_VAR_REF_RE.findall(html):
-            all_refs.add(var_ref)
+        for _, facts in self._page_facts(html):
+            defined_vars.update(facts.css_defs)
+            all_refs.update(facts.css_refs)
 
         # Check for undefined variables
         # Only flag the core design token variables - skip computed ones like
@@ -798,23 +846,36 @@ class PreDeliveryCheck:
 
     _REPEATING_SECTION_MIN_WORDS = 5
 
+    # Sections whose <p> descriptions are checked against the minimum above
+    _DESCRIPTION_SECTION_IDS = ("services", "features")
+
     def _check_word_counts(self, html: str) -> List[PreDeliveryIssue]:
         """Validate word counts for key section elements."""
         issues: List[PreDeliveryIssue] = []
 
-        # Build map of section_id -> inner HTML
-        section_map: Dict[str, str] = {}
-        for m in self._SECTION_BLOCK_RE.finditer(html):
-            open_tag = m.group(1)
-            inner = m.group(2)
-            id_match = re.search(r'id\s*=\s*["\']([^"\']+)["\']', open_tag, re.IGNORECASE)
-            if id_match:
-                section_map[id_match.group(1).lower()] = inner
+        # section_id -> rule -> issues, for the last section with each id
+        section_map: Dict[str, Dict[str, List[PreDeliveryIssue]]] = {}
+        for _, facts in self._page_facts(html):
+            section_map.update(facts.word_counts)
+
+        # Fixed rules (hero heading, hero subtitle, about text), then
+        # service/feature descriptions
+        for rule_name, rule in self._WORD_COUNT_RULES.items():
+            issues.extend(section_map.get(rule["selector_id"], {}).get(rule_name, []))
+        for section_id in self._DESCRIPTION_SECTION_IDS:
+            issues.extend(section_map.get(section_id, {}).get("description", []))
+
+        return issues
+
+    def _section_word_counts(
+        self, section_id: str, section_html: str
+    ) -> Dict[str, List[PreDeliveryIssue]]:
+        """Word count issues of one section, per rule name ("description" for services/features)."""
+        result: Dict[str, List[PreDeliveryIssue]] = {}
 
         # Check fixed rules (hero heading, hero subtitle, about text)
         for rule_name, rule in self._WORD_COUNT_RULES.items():
-            section_html = section_map.get(rule["selector_id"], "")
-            if not section_html:
+            if rule["selector_id"] != section_id or not section_html:
                 continue
 
             tag = rule["tag"]
@@ -826,6 +887,7 @@ class PreDeliveryCheck:
             if not matches:
                 continue
 
+            issues: List[PreDeliveryIssue] = []
             texts = [matches[0]] if tag == "h1" else matches
             for text_html in texts:
                 text = self._STRIP_TAGS_RE.sub("", text_html).strip()
@@ -851,13 +913,11 @@ class PreDeliveryCheck:
                     ))
                 if tag == "p" and word_count >= min_w:
                     break
+            result[rule_name] = issues
 
         # Check service/feature descriptions
-        for section_id in ("services", "features"):
-            section_html = section_map.get(section_id, "")
-            if not section_html:
-                continue
-
+        if section_id in self._DESCRIPTION_SECTION_IDS and section_html:
+            issues = []
             desc_re = re.compile(r"<p\b[^>]*>(.*?)</p>", re.IGNORECASE | re.DOTALL)
             for p_match in desc_re.finditer(section_html):
                 text = self._STRIP_TAGS_RE.sub("", p_match.group(1)).strip()
@@ -869,38 +929,32 @@ class PreDeliveryCheck:
                         message=f"{section_id} description: {len(words)} words (min {self._REPEATING_SECTION_MIN_WORDS})",
                         location=f"section#{section_id}",
                     ))
+            result["description"] = issues
 
-        return issues
+        return result
 
     # ---------------------------------------------------------------------------
     # Nav anchor validation
     # ---------------------------------------------------------------------------
 
-    _NAV_BLOCK_RE = re.compile(
-        r"<nav\b[^>]*>.*?</nav>", re.IGNORECASE | re.DOTALL
-    )
-    _ANCHOR_HREF_RE = re.compile(
-        r'<a\b[^>]*href="#([^"]+)"', re.IGNORECASE
-    )
-    _ALL_IDS_RE = re.compile(r'\bid="([^"]*)"')
-
     def _check_nav_anchors(self, html: str) -> List[PreDeliveryIssue]:
         """Verify that every href='#section-id' in <nav> resolves to an existing element ID."""
         issues: List[PreDeliveryIssue] = []
 
-        nav_blocks = self._NAV_BLOCK_RE.findall(html)
-        if not nav_blocks:
+        # Computed from the per-section summaries: nav hrefs and ids of every section
+        page_facts = self._page_facts(html)
+        if not any(facts.has_nav for _, facts in page_facts):
             return issues
 
         nav_hrefs: set = set()
-        for nav_html in nav_blocks:
-            nav_hrefs.update(self._ANCHOR_HREF_RE.findall(nav_html))
+        all_ids: set = set()
+        for _, facts in page_facts:
+            nav_hrefs.update(facts.nav_hrefs)
+            all_ids.update(facts.ids)
 
         if not nav_hrefs:
             return issues
 
-        all_ids = set(self._ALL_IDS_RE.findall(html))
-
         for href_id in sorted(nav_hrefs):
             if href_id not in all_ids:
                 issues.append(PreDeliveryIssue(
@@ -912,6 +966,81 @@ class PreDeliveryCheck:
 
         return issues
 
+    # ---------------------------------------------------------------------------
+    # Per-section facts (incremental read-only checks)
+    # ---------------------------------------------------------------------------
+
+    def _page_facts(self, html: str) -> List[Tuple[int, _SectionFacts]]:
+        """(start offset, facts) for each section of the page, in document order.
+
+        Sections come from HtmlDocument.segments(); facts of unchanged
+        sections are reused from earlier runs. Pages that can't be cut at
+        element boundaries are handled as a single section.
+        """
+        last = self._last_page_facts
+        if last is not None and last[0] is html:
+            return last[1]
+
+        doc = parse_html(html)
+        spans = doc.segments() or [(0, len(html))]
+        page_facts = [(start, self._section_facts(doc, start, end)) for start, end in spans]
+        self._last_page_facts = (html, page_facts)
+        return page_facts
+
+    def _section_facts(self, doc: HtmlDocument, start: int, end: int) -> _SectionFacts:
+        """Facts of doc.html[start:end], taken from the page's parsed document."""
+        section_html = doc.html[start:end]
+        key = ("pre_delivery", hashlib.blake2b(section_html.encode("utf-8"), digest_size=16).digest())
+        facts = self.section_cache.get(key)
+        if facts is not None:
+            return facts
+
+        section_lower = section_html.lower()
+        facts = _SectionFacts(
+            lower_len=len(section_lower),
+            animate_count=len(self._DATA_ANIMATE_RE.findall(section_html)),
+        )
+
+        for phrase, phrase_lower in self._BANNED_PHRASES_LOWER:
+            first = idx = section_lower.find(phrase_lower)
+            count = 0
+            while idx != -1:
+                count += 1
+                idx = section_lower.find(phrase_lower, idx + len(phrase_lower))
+            if count:
+                facts.phrase_hits[phrase] = (count, first)
+
+        # CSS variable definitions (style blocks, inline styles) and references
+        for block in self._STYLE_BLOCK_RE.findall(section_html):
+            facts.css_defs.update(self._CSS_VAR_DEF_RE.findall(block))
+        facts.css_defs.update(self._INLINE_VAR_DEF_RE.findall(section_html))
+        facts.css_refs.update(self._CSS_VAR_REF_RE.findall(section_html))
+
+        # Elements of the section (segments never cut through an element)
+        facts.link_issues = [
+            (offset - start, message)
+            for offset, message in self._empty_link_messages(
+                [link for link in doc.links if start <= link.start < end]
+            )
+        ]
+
+        nav_blocks = [nav for nav in doc.sections(("nav",)) if start <= nav.start < end]
+        facts.has_nav = bool(nav_blocks)
+        for nav in nav_blocks:
+            for link in doc.links_in(nav):
+                href = link.attrs.get("href", "")
+                if href.startswith("#") and len(href) > 1:
+                    facts.nav_hrefs.add(href[1:])
+        facts.ids = {element_id for offset, _, element_id in doc.id_tags if start <= offset < end}
+
+        for section in doc.sections(self._SECTION_BLOCK_TAGS, closed_only=True):
+            if section.id and start <= section.start < end:
+                section_id = section.id.lower()
+                facts.word_counts[section_id] = self._section_word_counts(section_id, doc.inner(section))
+
+        self.section_cache.put(key, facts)
+        return facts
+
     # ---------------------------------------------------------------------------
     # Scoring
     # ---------------------------------------------------------------------------
@@ -954,20 +1083,10 @@ class PreDeliveryCheck:
         if char_pos < 0:
             return "unknown"
 
-        # Find the nearest section ID above this position
-        section_id_re = re.compile(
-            r'<(?:section|footer|div|header)\b[^>]*?\bid\s*=\s*["\']([^"\']+)["\']',
-            re.IGNORECASE | re.DOTALL,
-        )
-        last_section = None
-        for m in section_id_re.finditer(html):
-            if m.start() <= char_pos:
-                last_section = m.group(1)
-            else:
-                break
-
-        # Calculate line number
-        line_num = html[:char_pos].count("\n") + 1
+        # Nearest section ID above this position, and the line number
+        doc = parse_html(html)
+        last_section = doc.last_id_before(char_pos, PreDeliveryCheck._SECTION_ID_TAGS)
+        line_num = doc.line_of(char_pos)
 
         if last_section:
             return f"near line {line_num}, section#{last_section}"
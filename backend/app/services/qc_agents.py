@@ -6,17 +6,112 @@ or AI-assisted fixes to the HTML output.
 
 All fix methods return a tuple of (modified_html, QCFixResult) so the
 orchestrator can chain HTML modifications across agents.
+
+The deterministic agents (animation, color, accessibility, layout) also have
+plan() methods that queue their changes as edits on a shared FixDocument
+instead of rewriting the page; the orchestrator applies the edits of all
+agents in one pass. The output is byte-identical to chaining fix().
 """
 
+import bisect
+import functools
 import logging
 import re
 import json
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Callable, Iterable, Optional, Pattern, Tuple, Union
 
 from app.models.qc_report import QCIssue, QCFixResult
+from app.services.tag_scan import TagPattern
 
 logger = logging.getLogger(__name__)
 
+Edit = Tuple[int, int, str]  # (start, end, replacement)
+# Regions a fix step reads: a pattern's matches, or a function returning spans
+Footprint = Union[Pattern[str], Callable[[str], Iterable[Tuple[int, int]]]]
+
+
+# =========================================================
+# Shared document for fused fixes
+# =========================================================
+class FixDocument:
+    """Page HTML shared by the fix agents of one QC round.
+
+    Agents plan edits against `html` (see text_for()) and queue them with
+    add(); render() applies every pending edit in one pass.
+
+    A fix step is planned on the text before the pending edits, which gives
+    the same result as running the steps one after the other as long as no
+    pending edit can change what the step matches. Each step passes its
+    footprint (a pattern covering every region its own patterns read) and
+    the characters whose insertion or removal could create a new match
+    (e.g. "<>" for tag patterns). If a pending edit is within one character
+    of a footprint region, or adds/removes a trigger character, the pending
+    edits are rendered first (rebase) and the step is planned on the result.
+    """
+
+    def __init__(self, html: str) -> None:
+        self.html = html
+        self.rebases = 0
+        self._edits: List[Edit] = []  # sorted by start, non-overlapping
+
+    def text_for(self, footprint: Footprint, triggers: str = "") -> str:
+        """Text to plan the next step on, rebased if pending edits could affect it."""
+        if self._edits and self._conflicts(footprint, triggers):
+            self.rebase()
+        return self.html
+
+    def add(self, edits: List[Edit]) -> None:
+        """Queue edits planned on the text returned by text_for()."""
+        if edits:
+            self._edits = sorted(self._edits + edits, key=lambda e: (e[0], e[1]))
+
+    def render(self) -> str:
+        """HTML with all pending edits applied."""
+        if not self._edits:
+            return self.html
+        parts: List[str] = []
+        pos = 0
+        for start, end, replacement in self._edits:
+            parts.append(self.html[pos:start])
+            parts.append(replacement)
+            pos = end
+        parts.append(self.html[pos:])
+        return "".join(parts)
+
+    def rebase(self) -> None:
+        """Apply the pending edits; later steps are planned on the result."""
+        if self._edits:
+            self.html = self.render()
+            self._edits = []
+            self.rebases += 1
+
+    def _conflicts(self, footprint: Footprint, triggers: str) -> bool:
+        html = self.html
+        edits = self._edits
+        for start, end, replacement in edits:
+            if any(ch in replacement or ch in html[start:end] for ch in triggers):
+                return True
+        if isinstance(footprint, re.Pattern):
+            spans = (m.span() for m in footprint.finditer(html))
+        else:
+            spans = footprint(html)
+        ends = [end for _, end, _ in edits]
+        for start, end in spans:
+            # First edit ending at or after the region (edits are disjoint and sorted)
+            i = bisect.bisect_left(ends, start - 1)
+            if i < len(edits) and edits[i][0] <= end + 1:
+                return True
+        return False
+
+
+_TAG_TRIGGERS = "<>"
+
+
+@functools.lru_cache(maxsize=None)
+def _tag_footprint(tag: str) -> Pattern[str]:
+    """Every <tag ...> (up to the first '>'), as read by the agents' tag patterns."""
+    return re.compile(rf'<{tag}\b[^>]*>?', re.IGNORECASE)
+
 
 # =========================================================
 # Animation Fix Agent
@@ -66,13 +161,82 @@ class AnimationFixAgent:
         )
         return html, result
 
+    def plan(self, doc: FixDocument, issues: List[QCIssue]) -> QCFixResult:
+        """Same fixes as fix(), queued as edits on the shared document."""
+        fixed_count = 0
+
+        if [i for i in issues if "h1" in i.element.lower() and "text-split" in i.description]:
+            fixed_count += self._plan_attribute(
+                doc, "h1", self._without_animate("h1"), ' data-animate="text-split" data-split-type="words"',
+            )
+
+        if [i for i in issues if "h2" in i.element.lower() and "text-split" in i.description]:
+            fixed_count += self._plan_attribute(
+                doc, "h2", self._without_animate("h2"), ' data-animate="text-split" data-split-type="words"',
+            )
+
+        if [i for i in issues if "magnetic" in i.description.lower()]:
+            fixed_count += self._plan_attribute(doc, "a", self._CTA_RE, ' data-animate="magnetic"')
+            fixed_count += self._plan_attribute(doc, "button", self._without_animate("button"), ' data-animate="magnetic"')
+
+        if [i for i in issues if "card" in i.element.lower() and "fade-up" in i.description]:
+            fixed_count += self._plan_attribute(doc, "div", self._CARD_RE, ' data-animate="fade-up"')
+
+        if [i for i in issues if "img" in i.element.lower() and i.type == "animation"]:
+            fixed_count += self._plan_attribute(
+                doc, "img", self._without_animate("img"), ' data-animate="fade-up"',
+                skip=lambda m: self._is_small_image(m.group(2)),
+            )
+
+        return QCFixResult(
+            issue_type="animation",
+            issues_fixed=fixed_count,
+            description=f"Added data-animate to {fixed_count} elements",
+            success=fixed_count > 0,
+        )
+
+    @staticmethod
+    def _plan_attribute(doc: FixDocument, tag: str, pattern: TagPattern, attribute: str, skip=None) -> int:
+        """Queue attribute inserts after '<tag' for every match of pattern (group 1 = '<tag')."""
+        html = doc.text_for(_tag_footprint(tag), _TAG_TRIGGERS)
+        edits = [
+            (m.end(1), m.end(1), attribute)
+            for m in pattern.finditer(html)
+            if skip is None or not skip(m)
+        ]
+        doc.add(edits)
+        return len(edits)
+
+    # CTA-like <a> tags and card-like <div> containers without data-animate
+    # (TagPattern: same regex, linear on unclosed tags and tags nested in attributes)
+    _CTA_RE = TagPattern(
+        r'(<a\b)(?![^>]*data-animate)([^>]*(?:bg-\[var\(--color-primary\)\]|btn|cta|bg-primary)[^>]*>)',
+        start=r'<a\b', exclude='data-animate', require=r'bg-\[var\(--color-primary\)\]|btn|cta|bg-primary',
+        flags=re.IGNORECASE,
+    )
+    _CARD_RE = TagPattern(
+        r'(<div\b)(?![^>]*data-animate)([^>]*(?:rounded-(?:xl|2xl|3xl)|shadow-(?:lg|xl|2xl)|card)[^>]*>)',
+        start=r'<div\b', exclude='data-animate', require=r'rounded-(?:xl|2xl|3xl)|shadow-(?:lg|xl|2xl)|card',
+        flags=re.IGNORECASE,
+    )
+    # Logos and icons don't get an entrance animation
+    _SMALL_IMAGE_CLASSES = ('h-6', 'h-8', 'h-10', 'w-6', 'w-8', 'w-10', 'h-4', 'w-4')
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _without_animate(tag: str) -> TagPattern:
+        return TagPattern(
+            rf'(<{tag}\b)(?![^>]*data-animate)([^>]*>)',
+            start=rf'<{tag}\b', exclude='data-animate', flags=re.IGNORECASE,
+        )
+
+    def _is_small_image(self, tag_content: str) -> bool:
+        return any(x in tag_content for x in self._SMALL_IMAGE_CLASSES)
+
     def _add_animate_to_tag(self, html: str, tag: str, animate_value: str, extra_attrs: str = "") -> Tuple[str, int]:
         """Add data-animate to tags that don't have it."""
         count = 0
-        pattern = re.compile(
-            rf'(<{tag}\b)(?![^>]*data-animate)([^>]*>)',
-            re.IGNORECASE
-        )
+        pattern = self._without_animate(tag)
 
         def replacer(m):
             nonlocal count
@@ -87,10 +251,7 @@ class AnimationFixAgent:
         """Add data-animate="magnetic" to CTA-like links/buttons."""
         count = 0
         # Match <a> tags with CTA-like classes that don't already have data-animate
-        cta_pattern = re.compile(
-            r'(<a\b)(?![^>]*data-animate)([^>]*(?:bg-\[var\(--color-primary\)\]|btn|cta|bg-primary)[^>]*>)',
-            re.IGNORECASE
-        )
+        cta_pattern = self._CTA_RE
 
         def replacer(m):
             nonlocal count
@@ -100,10 +261,7 @@ class AnimationFixAgent:
         html = cta_pattern.sub(replacer, html)
 
         # Also match <button> tags without data-animate
-        btn_pattern = re.compile(
-            r'(<button\b)(?![^>]*data-animate)([^>]*>)',
-            re.IGNORECASE
-        )
+        btn_pattern = self._without_animate("button")
 
         def btn_replacer(m):
             nonlocal count
@@ -116,10 +274,7 @@ class AnimationFixAgent:
     def _add_animate_to_cards(self, html: str) -> Tuple[str, int]:
         """Add fade-up to card-like div containers."""
         count = 0
-        card_pattern = re.compile(
-            r'(<div\b)(?![^>]*data-animate)([^>]*(?:rounded-(?:xl|2xl|3xl)|shadow-(?:lg|xl|2xl)|card)[^>]*>)',
-            re.IGNORECASE
-        )
+        card_pattern = self._CARD_RE
 
         def replacer(m):
             nonlocal count
@@ -132,16 +287,12 @@ class AnimationFixAgent:
     def _add_animate_to_images(self, html: str) -> Tuple[str, int]:
         """Add fade-up to non-icon images that don't have animation."""
         count = 0
-        img_pattern = re.compile(
-            r'(<img\b)(?![^>]*data-animate)([^>]*>)',
-            re.IGNORECASE
-        )
+        img_pattern = self._without_animate("img")
 
         def replacer(m):
             nonlocal count
-            tag_content = m.group(2)
             # Skip tiny images (logos, icons)
-            if any(x in tag_content for x in ['h-6', 'h-8', 'h-10', 'w-6', 'w-8', 'w-10', 'h-4', 'w-4']):
+            if self._is_small_image(m.group(2)):
                 return m.group(0)
             count += 1
             return f'{m.group(1)} data-animate="fade-up"{m.group(2)}'
@@ -192,6 +343,69 @@ class ColorCoherenceAgent:
         )
         return html, result
 
+    def plan(self, doc: FixDocument, theme_config: Dict[str, Any], issues: List[QCIssue]) -> QCFixResult:
+        """Same fixes as fix(), queued as edits on the shared document."""
+        fixed_count = 0
+
+        for issue in issues:
+            if issue.type != "color":
+                continue
+
+            color_match = re.search(r'#[0-9a-fA-F]{3,8}', issue.description)
+            if not color_match:
+                continue
+
+            bad_color = color_match.group(0)
+            closest_var = self._find_closest_theme_var(bad_color, theme_config)
+            if not closest_var:
+                continue
+
+            html = doc.text_for(functools.partial(self._declaration_spans, bad_color), ":#")
+            edits = [
+                (m.start(), m.end(), m.group(0).replace(bad_color, f'var(--color-{closest_var})'))
+                for m in self._iter_declarations(html, bad_color)
+            ]
+            if edits:
+                fixed_count += 1
+                doc.add(edits)
+
+        return QCFixResult(
+            issue_type="color",
+            issues_fixed=fixed_count,
+            description=f"Replaced {fixed_count} off-palette colors with theme variables",
+            success=fixed_count > 0,
+        )
+
+    def _iter_declarations(self, html: str, bad_color: str):
+        """Same matches as finditer() of the fix() pattern, searched only
+        around the occurrences of the color. A match ends at an occurrence
+        and lies within its declaration span, and since colors start with
+        '#' no match contains an earlier occurrence."""
+        pattern = re.compile(rf'(?:color|background-color|background|border-color)\s*:\s*{re.escape(bad_color)}')
+        last_end = 0
+        for start, end in self._declaration_spans(bad_color, html):
+            m = pattern.search(html, max(start, last_end), end)
+            if m:
+                yield m
+                last_end = m.end()
+
+    @staticmethod
+    def _declaration_spans(value: str, html: str) -> Iterable[Tuple[int, int]]:
+        """Every occurrence of value with the "property :" run before it."""
+        pos = html.find(value)
+        while pos != -1:
+            start = pos
+            while start and html[start - 1].isspace():
+                start -= 1
+            if start and html[start - 1] == ":":
+                start -= 1
+            while start and html[start - 1].isspace():
+                start -= 1
+            while start and (html[start - 1].isalnum() or html[start - 1] in "_-"):
+                start -= 1
+            yield start, pos + len(value)
+            pos = html.find(value, pos + 1)
+
     def _find_closest_theme_var(self, hex_color: str, theme: Dict[str, Any]) -> Optional[str]:
         """Find the closest theme color variable name for a given hex."""
         color_map = {
@@ -409,29 +623,58 @@ class AccessibilityAgent:
         )
         return html, result
 
+    def plan(self, doc: FixDocument, issues: List[QCIssue]) -> QCFixResult:
+        """Same fixes as fix(), queued as edits on the shared document."""
+        fixed_count = 0
+
+        if [i for i in issues if "alt" in i.description.lower()]:
+            html = doc.text_for(_tag_footprint("img"), _TAG_TRIGGERS)
+            edits = [
+                (m.end(1), m.end(1), f' alt="{self._alt_text(m.group(0))}"')
+                for m in self._MISSING_ALT_RE.finditer(html)
+            ]
+            doc.add(edits)
+            fixed_count += len(edits)
+
+        return QCFixResult(
+            issue_type="accessibility",
+            issues_fixed=fixed_count,
+            description=f"Fixed {fixed_count} accessibility issues",
+            success=fixed_count > 0,
+        )
+
+    _MISSING_ALT_RE = TagPattern(
+        r'(<img\b)(?![^>]*\balt\b)([^>]*)(>|/>)',
+        start=r'<img\b', exclude=r'\balt\b', flags=re.IGNORECASE,
+    )
+
+    @staticmethod
+    def _alt_text(img_tag: str) -> str:
+        """Alt text derived from the image src (placeholder text or file name)."""
+        src_match = re.search(r'src="([^"]*)"', img_tag)
+        alt_text = ""
+        if src_match:
+            src = src_match.group(1)
+            if "placehold" in src:
+                text_match = re.search(r'text=([^&"]+)', src)
+                if text_match:
+                    alt_text = text_match.group(1).replace('+', ' ')
+            elif src:
+                name = src.rsplit('/', 1)[-1].rsplit('.', 1)[0]
+                alt_text = name.replace('-', ' ').replace('_', ' ')
+        return alt_text
+
     def _fix_missing_alt(self, html: str) -> Tuple[str, int]:
         """Add alt attribute to img tags that are missing it."""
         count = 0
-        pattern = re.compile(r'(<img\b)(?![^>]*\balt\b)([^>]*)(>|/>)', re.IGNORECASE)
 
         def replacer(m):
             nonlocal count
             count += 1
-            src_match = re.search(r'src="([^"]*)"', m.group(0))
-            alt_text = ""
-            if src_match:
-                src = src_match.group(1)
-                if "placehold" in src:
-                    text_match = re.search(r'text=([^&"]+)', src)
-                    if text_match:
-                        alt_text = text_match.group(1).replace('+', ' ')
-                elif src:
-                    name = src.rsplit('/', 1)[-1].rsplit('.', 1)[0]
-                    alt_text = name.replace('-', ' ').replace('_', ' ')
-
+            alt_text = self._alt_text(m.group(0))
             return f'{m.group(1)} alt="{alt_text}"{m.group(2)}{m.group(3)}'
 
-        html = pattern.sub(replacer, html)
+        html = self._MISSING_ALT_RE.sub(replacer, html)
         return html, count
 
 
@@ -463,11 +706,83 @@ class LayoutFixAgent:
         )
         return html, result
 
+    def plan(self, doc: FixDocument, issues: List[QCIssue]) -> QCFixResult:
+        """Same fixes as fix(), queued as edits on the shared document."""
+        fixed_count = 0
+
+        if [i for i in issues if "duplicate" in i.description.lower() and "id" in i.description.lower()]:
+            # Whether an id is a duplicate depends on every id before it, all
+            # of them inside the footprint
+            html = doc.text_for(self._ID_FOOTPRINT, '"')
+            seen_ids = set()
+            edits = []
+            for m in self._iter_ids(html):
+                if m.group(2) in seen_ids:
+                    edits.append((m.start(1), m.end(1), ""))
+                seen_ids.add(m.group(2))
+            doc.add(edits)
+            fixed_count += len(edits)
+
+        if [i for i in issues if "placeholder" in i.description.lower() or "{{" in i.description]:
+            html = doc.text_for(self._PLACEHOLDER_FOOTPRINT, "{}")
+            edits = [
+                (m.start(), m.end(), self.PLACEHOLDER_DEFAULTS.get(m.group(1), ""))
+                for m in self._PLACEHOLDER_RE.finditer(html)
+            ]
+            doc.add(edits)
+            fixed_count += len(edits)
+
+        return QCFixResult(
+            issue_type="layout",
+            issues_fixed=fixed_count,
+            description=f"Fixed {fixed_count} layout/structure issues",
+            success=fixed_count > 0,
+        )
+
+    _ID_RE = re.compile(r'(\bid="([^"]*)")')
+    _ID_SCAN_RE = re.compile(r'(id="([^"]*)")')
+    _WORD_CHAR_RE = re.compile(r'\w')
+    _ID_FOOTPRINT = re.compile(r'id="[^"]*"?')
+    _PLACEHOLDER_RE = re.compile(r'\{\{(\w+)\}\}')
+    # A new or removed placeholder needs a '{'/'}' edit or an edit right
+    # after the word run following an existing '{{'
+    _PLACEHOLDER_FOOTPRINT = re.compile(r'\{\{\w*')
+
+    PLACEHOLDER_DEFAULTS = {
+        "LOGO_URL": "",
+        "BUSINESS_NAME": "Business Name",
+        "HERO_TITLE": "Il Tuo Titolo",
+        "HERO_SUBTITLE": "La tua descrizione qui",
+        "HERO_CTA_TEXT": "Scopri di Pi\u00f9",
+        "HERO_CTA_URL": "#contact",
+        "HERO_IMAGE_URL": "data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' width='800' height='600'%3E%3Crect fill='%23eee' width='800' height='600'/%3E%3Ctext x='50%25' y='50%25' fill='%23999' font-family='system-ui' font-size='18' text-anchor='middle' dy='.3em'%3EImmagine%3C/text%3E%3C/svg%3E",
+        "HERO_IMAGE_ALT": "Immagine principale",
+        "CONTACT_EMAIL": "",
+        "CONTACT_PHONE": "",
+        "CONTACT_ADDRESS": "",
+        "CURRENT_YEAR": "2026",
+    }
+
+    @classmethod
+    def _iter_ids(cls, html: str):
+        """Same matches as _ID_RE.finditer(); the leading word boundary defeats the
+        regex engine's literal prefix search, so it is checked by hand."""
+        pos = 0
+        while True:
+            m = cls._ID_SCAN_RE.search(html, pos)
+            if not m:
+                return
+            if m.start() and cls._WORD_CHAR_RE.match(html, m.start() - 1):
+                pos = m.start() + 1
+                continue
+            yield m
+            pos = m.end()
+
     def _fix_duplicate_ids(self, html: str) -> Tuple[str, int]:
         """Remove duplicate id attributes, keeping the first occurrence."""
         count = 0
         seen_ids = set()
-        id_pattern = re.compile(r'(\bid="([^"]*)")')
+        id_pattern = self._ID_RE
 
         def replacer(m):
             nonlocal count
@@ -484,22 +799,8 @@ class LayoutFixAgent:
     def _fix_placeholders(self, html: str) -> Tuple[str, int]:
         """Replace remaining {{PLACEHOLDER}} with sensible defaults."""
         count = 0
-        placeholder_pattern = re.compile(r'\{\{(\w+)\}\}')
-
-        defaults = {
-            "LOGO_URL": "",
-            "BUSINESS_NAME": "Business Name",
-            "HERO_TITLE": "Il Tuo Titolo",
-            "HERO_SUBTITLE": "La tua descrizione qui",
-            "HERO_CTA_TEXT": "Scopri di Pi\u00f9",
-            "HERO_CTA_URL": "#contact",
-            "HERO_IMAGE_URL": "data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' width='800' height='600'%3E%3Crect fill='%23eee' width='800' height='600'/%3E%3Ctext x='50%25' y='50%25' fill='%23999' font-family='system-ui' font-size='18' text-anchor='middle' dy='.3em'%3EImmagine%3C/text%3E%3C/svg%3E",
-            "HERO_IMAGE_ALT": "Immagine principale",
-            "CONTACT_EMAIL": "",
-            "CONTACT_PHONE": "",
-            "CONTACT_ADDRESS": "",
-            "CURRENT_YEAR": "2026",
-        }
+        placeholder_pattern = self._PLACEHOLDER_RE
+        defaults = self.PLACEHOLDER_DEFAULTS
 
         def replacer(m):
             nonlocal count
@@ -0,0 +1,1145 @@
+"""
+QC Rules - single-pass rule engine for the automated QC checks.
+
+QualityControlPipeline.run_automated_checks used to run ~15 independent
+regex scans over the full page (plus several html.lower() copies). Here the
+page is tokenized once by a streaming tokenizer and every rule receives only
+the tokens it subscribed to:
+
+- start_tags / end_tags: tag names (lowercase) or ALL_TAGS
+- text: visible text between tags
+- raw_text: contents of <script>/<style> (one token per element)
+- comments, declarations (<!DOCTYPE ...>)
+
+Rules collect state in their hooks and build their QCIssue list in finish();
+issues are returned in rule registration order, so the list is the same one
+the per-check scans produced.
+
+The former scans were plain regexes over the whole page, so they also
+matched inside <script>/<style> contents and comments. To keep the issue
+list identical, rules matching attribute-like strings anywhere (ids,
+data-animate values, inline colors, placeholders, resource URLs) visit those
+tokens too, and rules about elements (img, headings, links, nav) set
+embedded_markup to also receive the tags found inside them (e.g. the
+'<h3 ...>' string built by the form handler script).
+
+run_incremental() gives the same issues while re-running the rules only on
+the parts of the page that changed: the page is cut into its top-level
+sections plus the markup between them (HtmlDocument.segments()), the rule
+state collected on each part is cached by content hash, and the cached
+states are merged in document order before finish(). Page-level checks
+(duplicate ids, nav anchors, heading order, section flow) are computed from
+the merged per-section states. After a refine only the edited section is
+tokenized again.
+
+Usage:
+    from app.services.qc_rules import qc_rule_engine
+    issues = qc_rule_engine.run(html, theme_config, requested_sections)
+    issues = qc_rule_engine.run_incremental(html, theme_config, requested_sections)
+"""
+
+import hashlib
+import re
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Sequence, Type
+
+from app.models.qc_report import QCIssue
+from app.services.banned_phrases import BANNED_PHRASES
+from app.services.html_document import parse_html
+from app.services.template_assembler import SectionRenderCache
+
+# Token kinds
+TEXT = "text"
+RAW_TEXT = "raw_text"
+START_TAG = "start_tag"
+END_TAG = "end_tag"
+COMMENT = "comment"
+DECLARATION = "declaration"
+
+ALL_TAGS = None  # subscription wildcard for start_tags / end_tags
+
+_RAW_TEXT_TAGS = frozenset({"script", "style"})
+
+_TOKEN_RE = re.compile(
+    r"<!--.*?(?:-->|\Z)"
+    r"|<![^>]*>"
+    r"""|<(/?)([a-zA-Z][a-zA-Z0-9:-]*)((?:[^>"']|"[^"]*"|'[^']*')*)>""",
+    re.DOTALL,
+)
+_RAW_TEXT_END_RE = {
+    tag: re.compile(rf"</{tag}\s*>", re.IGNORECASE) for tag in _RAW_TEXT_TAGS
+}
+
+
+class Token:
+    """One token of the page. raw is the exact source text of the token."""
+
+    __slots__ = ("kind", "name", "raw", "start", "embedded", "_lower")
+
+    def __init__(self, kind: str, name: str, raw: str, start: int, embedded: bool = False) -> None:
+        self.kind = kind
+        self.name = name  # lowercase tag name (start/end tags, raw_text parent)
+        self.raw = raw
+        self.start = start
+        self.embedded = embedded  # tag found inside script/style contents or a comment
+        self._lower: Optional[str] = None
+
+    @property
+    def lower(self) -> str:
+        """raw.lower(), computed once and shared by all rules."""
+        if self._lower is None:
+            self._lower = self.raw.lower()
+        return self._lower
+
+    @property
+    def head(self) -> str:
+        """Tag source up to the first '>' (what a `<tag\\b[^>]*>` regex matched)."""
+        i = self.raw.find(">")
+        return self.raw if i == len(self.raw) - 1 else self.raw[:i + 1]
+
+    def __repr__(self) -> str:
+        return f"Token({self.kind}, {self.name!r}, {self.raw[:40]!r}, {self.start})"
+
+
+def iter_tokens(html: str) -> Iterator[Token]:
+    """Stream the tokens of html in document order.
+
+    Text between tags, <script>/<style> contents and unterminated markup are
+    emitted as text tokens, so the raw values of all tokens concatenate back
+    to the input.
+    """
+    pos = 0
+    length = len(html)
+    while True:
+        for m in _TOKEN_RE.finditer(html, pos):
+            start = m.start()
+            if start > pos:
+                yield Token(TEXT, "", html[pos:start], pos)
+            raw = m.group(0)
+            pos = m.end()
+            tag = m.group(2)
+            if tag is None:
+                yield Token(COMMENT if raw.startswith("<!--") else DECLARATION, "", raw, start)
+                continue
+            tag = tag.lower()
+            if m.group(1):
+                yield Token(END_TAG, tag, raw, start)
+                continue
+            yield Token(START_TAG, tag, raw, start)
+            if tag in _RAW_TEXT_TAGS:
+                end_match = _RAW_TEXT_END_RE[tag].search(html, pos)
+                end = end_match.start() if end_match else length
+                if end > pos:
+                    yield Token(RAW_TEXT, tag, html[pos:end], pos)
+                pos = end
+                # Resume after the raw text: markup-like strings inside a
+                # script (e.g. an unterminated "<!--") must not be tokenized
+                break
+        else:
+            break
+    if pos < length:
+        yield Token(TEXT, "", html[pos:], pos)
+
+
+def iter_embedded_tags(token: Token) -> Iterator[Token]:
+    """Start/end tags inside a raw text or comment token (markup in JS strings)."""
+    raw = token.raw
+    if token.kind is COMMENT:
+        begin, end = 4, len(raw) - 3 if raw.endswith("-->") else len(raw)
+    else:
+        begin, end = 0, len(raw)
+    for m in _TOKEN_RE.finditer(raw, begin, end):
+        tag = m.group(2)
+        if tag is None:
+            continue
+        kind = END_TAG if m.group(1) else START_TAG
+        yield Token(kind, tag.lower(), m.group(0), token.start + m.start(), embedded=True)
+
+
+# ---------------------------------------------------------------------------
+# Rule base class and engine
+# ---------------------------------------------------------------------------
+
+class QCRule:
+    """Base class for a QC rule. Subscribe via the class attributes and
+    override the matching hooks; build the issues in finish().
+
+    A new instance is created for every run, so rules keep per-page state
+    in instance attributes. Hooks only collect state; theme_config and
+    requested_sections are used in enabled and finish(), so the state
+    collected on a section doesn't depend on them and can be cached.
+    """
+
+    start_tags: Optional[FrozenSet[str]] = frozenset()
+    end_tags: Optional[FrozenSet[str]] = frozenset()
+    text: bool = False
+    raw_text: bool = False
+    comments: bool = False
+    declarations: bool = False
+    # Also pass the tags found inside script/style contents and comments to
+    # on_start_tag/on_end_tag (token.embedded is True for those)
+    embedded_markup: bool = False
+
+    def __init__(self, theme_config: Dict[str, Any], requested_sections: List[str]) -> None:
+        self.theme_config = theme_config
+        self.requested_sections = requested_sections
+
+    @property
+    def enabled(self) -> bool:
+        """False to skip the rule for this run (e.g. no theme to compare with)."""
+        return True
+
+    def on_start_tag(self, token: Token) -> None:
+        pass
+
+    def on_end_tag(self, token: Token) -> None:
+        pass
+
+    def on_text(self, token: Token) -> None:
+        """Visible text (kind TEXT) or <script>/<style> contents (kind RAW_TEXT)."""
+
+    def on_comment(self, token: Token) -> None:
+        pass
+
+    def on_declaration(self, token: Token) -> None:
+        pass
+
+    def merge(self, other: "QCRule") -> bool:
+        """Fold in the state other collected on the following part of the page.
+
+        Returns False when self's state can't be continued by a part that
+        was visited from a fresh state (e.g. the page was cut inside a
+        <nav>); the caller then runs the rule over the whole page.
+        """
+        raise NotImplementedError
+
+    def finish(self) -> List[QCIssue]:
+        return []
+
+
+class AnywhereRule(QCRule):
+    """Rule matching a pattern in every token (tags, text, scripts, comments)."""
+
+    start_tags = ALL_TAGS
+    end_tags = ALL_TAGS
+    text = True
+    raw_text = True
+    comments = True
+    declarations = True
+
+    def on_token(self, token: Token) -> None:
+        pass
+
+    def on_start_tag(self, token: Token) -> None:
+        self.on_token(token)
+
+    def on_end_tag(self, token: Token) -> None:
+        self.on_token(token)
+
+    def on_text(self, token: Token) -> None:
+        self.on_token(token)
+
+    def on_comment(self, token: Token) -> None:
+        self.on_token(token)
+
+    def on_declaration(self, token: Token) -> None:
+        self.on_token(token)
+
+
+Handler = Callable[[Token], None]
+
+
+class QCRuleEngine:
+    """Runs a set of rules over one tokenization pass of the page."""
+
+    def __init__(self, rules: Sequence[Type[QCRule]], section_cache: Optional[SectionRenderCache] = None) -> None:
+        self.rules = list(rules)
+        # Rule states collected per page section, keyed by content hash
+        self.section_cache = section_cache if section_cache is not None else SectionRenderCache(max_size=256)
+
+    def run(
+        self,
+        html: str,
+        theme_config: Optional[Dict[str, Any]] = None,
+        requested_sections: Optional[List[str]] = None,
+    ) -> List[QCIssue]:
+        rules = [cls(theme_config or {}, requested_sections or []) for cls in self.rules]
+        rules = [rule for rule in rules if rule.enabled]
+        self._visit(html, rules)
+
+        issues: List[QCIssue] = []
+        for rule in rules:
+            issues.extend(rule.finish())
+        return issues
+
+    def run_incremental(
+        self,
+        html: str,
+        theme_config: Optional[Dict[str, Any]] = None,
+        requested_sections: Optional[List[str]] = None,
+    ) -> List[QCIssue]:
+        """Same issues as run(), reusing the rule states of unchanged sections."""
+        spans = parse_html(html).segments()
+        if spans is None:
+            return self.run(html, theme_config, requested_sections)
+
+        rules = [cls(theme_config or {}, requested_sections or []) for cls in self.rules]
+        for start, end in spans:
+            for rule, part in zip(rules, self._section_states(html[start:end])):
+                if not rule.merge(part):
+                    return self.run(html, theme_config, requested_sections)
+
+        issues: List[QCIssue] = []
+        for rule in rules:
+            if rule.enabled:
+                issues.extend(rule.finish())
+        return issues
+
+    def _section_states(self, section_html: str) -> List[QCRule]:
+        """Rule states collected on one section (all rules, cached by content)."""
+        key = ("qc_rules", hashlib.blake2b(section_html.encode("utf-8"), digest_size=16).digest())
+        states = self.section_cache.get(key)
+        if states is None:
+            states = [cls({}, []) for cls in self.rules]
+            self._visit(section_html, states)
+            self.section_cache.put(key, states)
+        return states
+
+    def _visit(self, html: str, rules: List[QCRule]) -> None:
+        """Feed the tokens of html to the rules' hooks."""
+        start_any: List[Handler] = []
+        start_by_tag: Dict[str, List[Handler]] = {}
+        end_any: List[Handler] = []
+        end_by_tag: Dict[str, List[Handler]] = {}
+        text: List[Handler] = []
+        raw_text: List[Handler] = []
+        comments: List[Handler] = []
+        declarations: List[Handler] = []
+        embedded_start_any: List[Handler] = []
+        embedded_start_by_tag: Dict[str, List[Handler]] = {}
+        embedded_end_any: List[Handler] = []
+        embedded_end_by_tag: Dict[str, List[Handler]] = {}
+
+        for rule in rules:
+            self._subscribe(rule.start_tags, rule.on_start_tag, start_any, start_by_tag)
+            self._subscribe(rule.end_tags, rule.on_end_tag, end_any, end_by_tag)
+            if rule.embedded_markup:
+                self._subscribe(rule.start_tags, rule.on_start_tag, embedded_start_any, embedded_start_by_tag)
+                self._subscribe(rule.end_tags, rule.on_end_tag, embedded_end_any, embedded_end_by_tag)
+            if rule.text:
+                text.append(rule.on_text)
+            if rule.raw_text:
+                raw_text.append(rule.on_text)
+            if rule.comments:
+                comments.append(rule.on_comment)
+            if rule.declarations:
+                declarations.append(rule.on_declaration)
+
+        wants_embedded = bool(
+            embedded_start_any or embedded_start_by_tag or embedded_end_any or embedded_end_by_tag
+        )
+        no_handlers: List[Handler] = []
+        for token in iter_tokens(html):
+            kind = token.kind
+            if kind is START_TAG:
+                for handler in start_any:
+                    handler(token)
+                for handler in start_by_tag.get(token.name, no_handlers):
+                    handler(token)
+            elif kind is TEXT:
+                for handler in text:
+                    handler(token)
+            elif kind is END_TAG:
+                for handler in end_any:
+                    handler(token)
+                for handler in end_by_tag.get(token.name, no_handlers):
+                    handler(token)
+            elif kind is RAW_TEXT or kind is COMMENT:
+                for handler in (raw_text if kind is RAW_TEXT else comments):
+                    handler(token)
+                if wants_embedded and "<" in token.raw[1:]:
+                    for tag in iter_embedded_tags(token):
+                        if tag.kind is START_TAG:
+                            handlers = embedded_start_any + embedded_start_by_tag.get(tag.name, no_handlers)
+                        else:
+                            handlers = embedded_end_any + embedded_end_by_tag.get(tag.name, no_handlers)
+                        for handler in handlers:
+                            handler(tag)
+            else:
+                for handler in declarations:
+                    handler(token)
+
+    @staticmethod
+    def _subscribe(
+        tags: Optional[FrozenSet[str]],
+        handler: Handler,
+        any_handlers: List[Handler],
+        by_tag: Dict[str, List[Handler]],
+    ) -> None:
+        if tags is ALL_TAGS:
+            any_handlers.append(handler)
+            return
+        for tag in tags:
+            by_tag.setdefault(tag, []).append(handler)
+
+
+# ---------------------------------------------------------------------------
+# Rules (same order, checks and messages as the former per-check scans)
+# ---------------------------------------------------------------------------
+
+_ID_RE = re.compile(r'\bid="([^"]*)"')
+_DATA_ANIMATE_RE = re.compile(r'data-animate="([^"]*)"')
+
+VALID_ANIMATIONS = frozenset({
+    'fade-up', 'fade-down', 'fade-left', 'fade-right',
+    'scale-in', 'scale-up', 'rotate-in', 'flip-up', 'blur-in',
+    'slide-up', 'reveal-left', 'reveal-right', 'reveal-up', 'reveal-down',
+    'bounce-in', 'zoom-out', 'text-split', 'text-reveal', 'typewriter',
+    'clip-reveal', 'blur-slide', 'rotate-3d', 'stagger', 'stagger-scale',
+    'tilt', 'magnetic', 'card-hover-3d', 'float', 'gradient-flow',
+    'morph-bg', 'image-zoom', 'draw-svg', 'split-screen', 'parallax',
+    'marquee', 'count-up',
+})
+
+# Scroll-entrance animations (interactive ones don't count towards density)
+ENTRANCE_ANIMATIONS = frozenset({
+    "fade-up", "fade-down", "fade-left", "fade-right",
+    "scale-in", "scale-up", "rotate-in", "flip-up", "blur-in",
+    "slide-up", "reveal-left", "reveal-right", "reveal-up", "reveal-down",
+    "bounce-in", "zoom-out", "clip-reveal", "blur-slide", "rotate-3d",
+})
+
+
+class StructureRule(QCRule):
+    start_tags = frozenset({"html"})
+    end_tags = frozenset({"body", "html"})
+    declarations = True
+    embedded_markup = True
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.has_doctype = False
+        self.has_html = False
+        self.closes_body = False
+        self.closes_html = False
+
+    def on_declaration(self, token: Token) -> None:
+        if "<!doctype html>" in token.lower:
+            self.has_doctype = True
+
+    def on_start_tag(self, token: Token) -> None:
+        self.has_html = True
+
+    def on_end_tag(self, token: Token) -> None:
+        if token.lower == f"</{token.name}>":
+            if token.name == "body":
+                self.closes_body = True
+            else:
+                self.closes_html = True
+
+    def merge(self, other: "StructureRule") -> bool:
+        self.has_doctype |= other.has_doctype
+        self.has_html |= other.has_html
+        self.closes_body |= other.closes_body
+        self.closes_html |= other.closes_html
+        return True
+
+    def finish(self) -> List[QCIssue]:
+        issues = []
+        if not self.has_doctype:
+            issues.append(QCIssue(
+                type="structure", severity="warning",
+                element="document", description="Missing <!DOCTYPE html> declaration",
+                auto_fixable=False,
+            ))
+        if not self.has_html:
+            issues.append(QCIssue(
+                type="structure", severity="critical",
+                element="document", description="Missing <html> tag",
+                auto_fixable=False,
+            ))
+        if not self.closes_body:
+            issues.append(QCIssue(
+                type="structure", severity="critical",
+                element="document", description="Missing </body> closing tag",
+                auto_fixable=False,
+            ))
+        if not self.closes_html:
+            issues.append(QCIssue(
+                type="structure", severity="critical",
+                element="document", description="Missing </html> closing tag",
+                auto_fixable=False,
+            ))
+        return issues
+
+
+class PlaceholderRule(AnywhereRule):
+    _PLACEHOLDER_RE = re.compile(r'\{\{(\w+)\}\}')
+    _REPEAT_RE = re.compile(r'<!-- REPEAT:(\w+) -->')
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.placeholders: List[str] = []
+        self.repeats: List[str] = []
+
+    def on_token(self, token: Token) -> None:
+        if "{{" in token.raw:
+            self.placeholders.extend(self._PLACEHOLDER_RE.findall(token.raw))
+
+    def on_comment(self, token: Token) -> None:
+        self.on_token(token)
+        if "REPEAT:" in token.raw:
+            self.repeats.extend(self._REPEAT_RE.findall(token.raw))
+
+    def merge(self, other: "PlaceholderRule") -> bool:
+        self.placeholders.extend(other.placeholders)
+        self.repeats.extend(other.repeats)
+        return True
+
+    def finish(self) -> List[QCIssue]:
+        issues = []
+        # Unreplaced {{PLACEHOLDER}} tokens
+        for ph in self.placeholders:
+            if ph in ("LOGO_URL",):
+                continue
+            issues.append(QCIssue(
+                type="structure", severity="critical",
+                element=f"{{{{{ph}}}}}",
+                description=f"Unreplaced placeholder: {{{{{ph}}}}}",
+                auto_fixable=True,
+            ))
+        # Unexpanded REPEAT blocks (template engine failed to process them)
+        for repeat_key in self.repeats:
+            issues.append(QCIssue(
+                type="structure", severity="warning",
+                element=f"REPEAT:{repeat_key}",
+                description=f"Unexpanded REPEAT block: {repeat_key} (missing data array)",
+                auto_fixable=False,
+            ))
+        return issues
+
+
+class RequiredSectionsRule(AnywhereRule):
+    _ANY_ID_RE = re.compile(r"""id=(?:"([^"]*)"|'([^']*)')""")
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.double_quoted: set = set()
+        self.single_quoted: set = set()
+        self.comment_text: List[str] = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.requested_sections)
+
+    def on_token(self, token: Token) -> None:
+        lower = token.lower
+        if "id=" not in lower:
+            return
+        for double, single in self._ANY_ID_RE.findall(lower):
+            if double:
+                self.double_quoted.add(double)
+            else:
+                self.single_quoted.add(single)
+
+    def on_comment(self, token: Token) -> None:
+        self.on_token(token)
+        self.comment_text.append(token.lower)
+
+    def merge(self, other: "RequiredSectionsRule") -> bool:
+        self.double_quoted.update(other.double_quoted)
+        self.single_quoted.update(other.single_quoted)
+        self.comment_text.extend(other.comment_text)
+        return True
+
+    def finish(self) -> List[QCIssue]:
+        issues = []
+        for section in self.requested_sections:
+            section_found = (
+                section in self.double_quoted
+                or section in self.single_quoted
+                or f"{section}-section" in self.double_quoted
+                or any(f"<!-- {section}" in comment for comment in self.comment_text)
+            )
+            if not section_found:
+                issues.append(QCIssue(
+                    type="section", severity="warning",
+                    element=f"section#{section}",
+                    description=f"Requested section '{section}' not found in HTML",
+                    auto_fixable=False,
+                ))
+        return issues
+
+
+class GsapAnimationRule(AnywhereRule):
+    _CTA_RE = re.compile(
+        r'<a\b[^>]*(?:bg-\[var\(--color-primary\)\]|btn|cta|bg-primary)[^>]*>',
+        re.IGNORECASE
+    )
+    _CARD_RE = re.compile(
+        r'<div\b[^>]*(?:rounded-(?:xl|2xl|3xl))[^>]*(?:shadow-(?:lg|xl|2xl))[^>]*>',
+        re.IGNORECASE
+    )
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.h1_missing = False
+        self.h2_total = 0
+        self.h2_without = 0
+        self.cta_without = 0
+        self.cards_without = 0
+        self.animations: List[str] = []
+
+    def on_token(self, token: Token) -> None:
+        if 'data-animate="' in token.raw:
+            self.animations.extend(_DATA_ANIMATE_RE.findall(token.raw))
+
+    embedded_markup = True
+
+    def on_start_tag(self, token: Token) -> None:
+        if not token.embedded:  # embedded tags were already seen as raw text
+            self.on_token(token)
+        name = token.name
+        if name == "h1":
+            if 'data-animate' not in token.head:
+                self.h1_missing = True
+        elif name == "h2":
+            self.h2_total += 1
+            if 'data-animate' not in token.head:
+                self.h2_without += 1
+        elif name == "a":
+            m = self._CTA_RE.match(token.raw)
+            if m and 'data-animate="magnetic"' not in m.group(0):
+                self.cta_without += 1
+        elif name == "div":
+            m = self._CARD_RE.match(token.raw)
+            if m and 'data-animate' not in m.group(0):
+                self.cards_without += 1
+
+    def merge(self, other: "GsapAnimationRule") -> bool:
+        self.h1_missing |= other.h1_missing
+        self.h2_total += other.h2_total
+        self.h2_without += other.h2_without
+        self.cta_without += other.cta_without
+        self.cards_without += other.cards_without
+        self.animations.extend(other.animations)
+        return True
+
+    def finish(self) -> List[QCIssue]:
+        issues = []
+
+        # h1 tags should have text-split
+        if self.h1_missing:
+            issues.append(QCIssue(
+                type="animation", severity="warning",
+                element="h1",
+                description="h1 missing data-animate=\"text-split\"",
+                auto_fixable=True,
+            ))
+
+        # h2 tags should have text-split
+        if self.h2_without and self.h2_without > self.h2_total // 2:
+            issues.append(QCIssue(
+                type="animation", severity="warning",
+                element="h2",
+                description=f"{self.h2_without}/{self.h2_total} h2 tags missing data-animate=\"text-split\"",
+                auto_fixable=True,
+            ))
+
+        # CTA buttons should have magnetic
+        if self.cta_without:
+            issues.append(QCIssue(
+                type="animation", severity="warning",
+                element="a.cta-button",
+                description=f"{self.cta_without} CTA buttons missing data-animate=\"magnetic\"",
+                auto_fixable=True,
+            ))
+
+        # Cards should have animation
+        if self.cards_without > 2:
+            issues.append(QCIssue(
+                type="animation", severity="info",
+                element="div.card",
+                description=f"{self.cards_without} card elements missing data-animate=\"fade-up\"",
+                auto_fixable=True,
+            ))
+
+        # Validate data-animate values
+        for anim in self.animations:
+            if anim not in VALID_ANIMATIONS:
+                issues.append(QCIssue(
+                    type="animation", severity="warning",
+                    element=f'[data-animate="{anim}"]',
+                    description=f"Invalid data-animate value: '{anim}'",
+                    auto_fixable=False,
+                ))
+        return issues
+
+
+class ColorCoherenceRule(AnywhereRule):
+    _INLINE_COLOR_RE = re.compile(
+        r'(?:color|background-color|background|border-color)\s*:\s*(#[0-9a-fA-F]{3,8})'
+    )
+    # Common neutrals always acceptable
+    _ACCEPTABLE = {'#fff', '#ffffff', '#000', '#000000', '#333', '#333333',
+                   '#666', '#666666', '#999', '#999999', '#ccc', '#cccccc',
+                   '#eee', '#eeeeee', '#f8f8f8', '#f0f0f0', 'transparent',
+                   '#111', '#111111', '#222', '#222222'}
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.colors: List[str] = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.theme_config)
+
+    def on_token(self, token: Token) -> None:
+        if "#" in token.raw:
+            self.colors.extend(self._INLINE_COLOR_RE.findall(token.raw))
+
+    def merge(self, other: "ColorCoherenceRule") -> bool:
+        self.colors.extend(other.colors)
+        return True
+
+    def finish(self) -> List[QCIssue]:
+        palette = set()
+        for key in ["primary_color", "secondary_color", "accent_color", "bg_color",
+                    "bg_alt_color", "text_color", "text_muted_color"]:
+            color = self.theme_config.get(key, "")
+            if color:
+                palette.add(color.lower().strip())
+        palette.update(self._ACCEPTABLE)
+
+        off_palette = set()
+        for color in self.colors:
+            normalized = color.lower().strip()
+            if len(normalized) == 4:
+                normalized = '#' + ''.join(c * 2 for c in normalized[1:])
+            if normalized not in palette:
+                off_palette.add(color)
+
+        return [
+            QCIssue(
+                type="color", severity="info",
+                element="inline-style",
+                description=f"Off-palette color found: {color}",
+                auto_fixable=True,
+            )
+            for color in list(off_palette)[:5]
+        ]
+
+
+class RequiredResourcesRule(AnywhereRule):
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.viewport = False
+        self.tailwind = False
+        self.gsap = False
+        self.fonts = False
+
+    def on_token(self, token: Token) -> None:
+        if self.viewport and self.tailwind and self.gsap and self.fonts:
+            return
+        raw = token.raw
+        if not self.viewport and 'name="viewport"' in raw:
+            self.viewport = True
+        if not self.fonts and ('fonts.googleapis.com' in raw or 'fonts.google' in raw):
+            self.fonts = True
+        if not (self.tailwind and self.gsap):
+            lower = token.lower
+            if 'tailwind' in lower:
+                self.tailwind = True
+            if 'gsap' in lower:
+                self.gsap = True
+
+    def merge(self, other: "RequiredResourcesRule") -> bool:
+        self.viewport |= other.viewport
+        self.tailwind |= other.tailwind
+        self.gsap |= other.gsap
+        self.fonts |= other.fonts
+        return True
+
+    def finish(self) -> List[QCIssue]:
+        issues = []
+        if not self.viewport:
+            issues.append(QCIssue(
+                type="structure", severity="critical",
+                element="meta[viewport]",
+                description="Missing responsive viewport meta tag",
+                auto_fixable=False,
+            ))
+        if not self.tailwind:
+            issues.append(QCIssue(
+                type="structure", severity="critical",
+                element="script[tailwind]",
+                description="Tailwind CSS not found (CDN script or compiled style)",
+                auto_fixable=False,
+            ))
+        if not self.gsap:
+            issues.append(QCIssue(
+                type="structure", severity="critical",
+                element="script[gsap]",
+                description="GSAP library not loaded",
+                auto_fixable=False,
+            ))
+        if not self.fonts:
+            issues.append(QCIssue(
+                type="structure", severity="warning",
+                element="link[google-fonts]",
+                description="Google Fonts not loaded",
+                auto_fixable=False,
+            ))
+        return issues
+
+
+class DuplicateIdsRule(AnywhereRule):
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.ids: List[str] = []
+
+    def on_token(self, token: Token) -> None:
+        if 'id="' in token.raw:
+            self.ids.extend(_ID_RE.findall(token.raw))
+
+    def merge(self, other: "DuplicateIdsRule") -> bool:
+        self.ids.extend(other.ids)
+        return True
+
+    def finish(self) -> List[QCIssue]:
+        issues = []
+        seen = set()
+        for id_val in self.ids:
+            if not id_val:
+                continue
+            if id_val in seen:
+                issues.append(QCIssue(
+                    type="structure", severity="warning",
+                    element=f'#{id_val}',
+                    description=f"Duplicate id=\"{id_val}\" found in document",
+                    auto_fixable=True,
+                ))
+            seen.add(id_val)
+        return issues
+
+
+class AccessibilityRule(QCRule):
+    start_tags = frozenset({"img"})
+    embedded_markup = True
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.without_alt = 0
+        self.empty_src = 0
+
+    def on_start_tag(self, token: Token) -> None:
+        tag = token.head
+        if 'alt' not in tag.lower():
+            self.without_alt += 1
+        if 'src=""' in tag or "src=''" in tag:
+            self.empty_src += 1
+
+    def merge(self, other: "AccessibilityRule") -> bool:
+        self.without_alt += other.without_alt
+        self.empty_src += other.empty_src
+        return True
+
+    def finish(self) -> List[QCIssue]:
+        issues = []
+        if self.without_alt:
+            issues.append(QCIssue(
+                type="accessibility", severity="warning",
+                element="img",
+                description=f"{self.without_alt} images missing alt attribute",
+                auto_fixable=True,
+            ))
+        if self.empty_src:
+            issues.append(QCIssue(
+                type="accessibility", severity="warning",
+                element="img[src='']",
+                description=f"{self.empty_src} images have empty src attribute",
+                auto_fixable=False,
+            ))
+        return issues
+
+
+class HeadingHierarchyRule(QCRule):
+    start_tags = frozenset({"h1", "h2", "h3", "h4", "h5", "h6"})
+    embedded_markup = True
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.levels: List[int] = []
+
+    def on_start_tag(self, token: Token) -> None:
+        self.levels.append(int(token.name[1]))
+
+    def merge(self, other: "HeadingHierarchyRule") -> bool:
+        self.levels.extend(other.levels)
+        return True
+
+    def finish(self) -> List[QCIssue]:
+        issues = []
+        levels = self.levels
+        if not levels:
+            return issues
+
+        if levels[0] != 1:
+            issues.append(QCIssue(
+                type="accessibility", severity="info",
+                element=f"h{levels[0]}",
+                description=f"First heading is h{levels[0]}, expected h1",
+                auto_fixable=False,
+            ))
+
+        for i in range(1, len(levels)):
+            if levels[i] > levels[i - 1] + 1:
+                issues.append(QCIssue(
+                    type="accessibility", severity="info",
+                    element=f"h{levels[i]}",
+                    description=f"Heading hierarchy skip: h{levels[i-1]} -> h{levels[i]}",
+                    auto_fixable=False,
+                ))
+                break
+        return issues
+
+
+class BannedPhrasesRule(AnywhereRule):
+    # Markup inside script/style contents is blanked like any other tag
+    _TAG_RE = re.compile(r'<[^>]+>')
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.parts: List[str] = []
+
+    def on_token(self, token: Token) -> None:
+        # Every tag/comment becomes a single space, as in the stripped text
+        self.parts.append(" ")
+
+    def on_text(self, token: Token) -> None:
+        if token.kind is RAW_TEXT and "<" in token.raw:
+            self.parts.append(self._TAG_RE.sub(" ", token.raw))
+        else:
+            self.parts.append(token.raw)
+
+    def merge(self, other: "BannedPhrasesRule") -> bool:
+        self.parts.extend(other.parts)
+        return True
+
+    def finish(self) -> List[QCIssue]:
+        text_content = "".join(self.parts).lower()
+        return [
+            QCIssue(
+                type="text", severity="warning",
+                element="text-content",
+                description=f"Banned generic phrase found: \"{phrase}\"",
+                auto_fixable=True,
+            )
+            for phrase in BANNED_PHRASES
+            if phrase.lower() in text_content
+        ]
+
+
+class NavAnchorRule(AnywhereRule):
+    """Every href="#section-id" in <nav> must resolve to an existing element ID."""
+
+    _NAV_HREF_RE = re.compile(r'<a\b[^>]*href="#([^"]+)"', re.IGNORECASE)
+    embedded_markup = True
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.in_nav = False
+        self.has_nav = False
+        self.pending_hrefs: List[str] = []
+        self.nav_hrefs: set = set()
+        self.ids: set = set()
+
+    def on_token(self, token: Token) -> None:
+        if 'id="' in token.raw:
+            self.ids.update(_ID_RE.findall(token.raw))
+
+    def on_start_tag(self, token: Token) -> None:
+        if not token.embedded:
+            self.on_token(token)
+        if token.name == "nav":
+            self.in_nav = True
+        elif self.in_nav and token.name == "a":
+            m = self._NAV_HREF_RE.match(token.raw)
+            if m:
+                self.pending_hrefs.append(m.group(1))
+
+    def on_end_tag(self, token: Token) -> None:
+        # A nav block ends at the first </nav> (unclosed navs don't count)
+        if token.name == "nav" and self.in_nav:
+            self.in_nav = False
+            self.has_nav = True
+            self.nav_hrefs.update(self.pending_hrefs)
+            self.pending_hrefs = []
+
+    def merge(self, other: "NavAnchorRule") -> bool:
+        if self.in_nav:
+            return False  # cut inside an open <nav>
+        self.in_nav = other.in_nav
+        self.has_nav |= other.has_nav
+        self.pending_hrefs = list(other.pending_hrefs)
+        self.nav_hrefs.update(other.nav_hrefs)
+        self.ids.update(other.ids)
+        return True
+
+    def finish(self) -> List[QCIssue]:
+        issues = []
+        if not self.has_nav or not self.nav_hrefs:
+            return issues
+        for href_id in sorted(self.nav_hrefs):
+            if href_id not in self.ids:
+                issues.append(QCIssue(
+                    type="structure", severity="warning",
+                    element=f'a[href="#{href_id}"]',
+                    description=f"Nav link #{href_id} does not resolve to any element ID in the page",
+                    auto_fixable=False,
+                ))
+        return issues
+
+
+class PlaceholderImagesRule(QCRule):
+    """Warn if >50% of images use placeholder sources (placehold.co or SVG data URIs)."""
+
+    start_tags = frozenset({"img"})
+    embedded_markup = True
+    _SRC_RE = re.compile(r'src="([^"]*)"')
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.total = 0
+        self.placeholders = 0
+
+    def on_start_tag(self, token: Token) -> None:
+        self.total += 1
+        src_match = self._SRC_RE.search(token.head)
+        if src_match:
+            src = src_match.group(1)
+            if "placehold.co" in src or src.startswith("data:image/svg+xml,"):
+                self.placeholders += 1
+
+    def merge(self, other: "PlaceholderImagesRule") -> bool:
+        self.total += other.total
+        self.placeholders += other.placeholders
+        return True
+
+    def finish(self) -> List[QCIssue]:
+        total, placeholder_count = self.total, self.placeholders
+        if total > 0 and placeholder_count > total / 2:
+            return [QCIssue(
+                type="structure", severity="warning",
+                element="img",
+                description=(
+                    f"{placeholder_count}/{total} images ({int(placeholder_count/total*100)}%) "
+                    f"are external placeholders. Consider adding real or AI-generated images."
+                ),
+                auto_fixable=False,
+            )]
+        return []
+
+
+class AnimationDensityRule(AnywhereRule):
+    """More than 6 distinct scroll-entrance animation types creates visual chaos."""
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.used_types: set = set()
+
+    def on_token(self, token: Token) -> None:
+        if 'data-animate="' in token.raw:
+            self.used_types.update(_DATA_ANIMATE_RE.findall(token.raw))
+
+    def merge(self, other: "AnimationDensityRule") -> bool:
+        self.used_types.update(other.used_types)
+        return True
+
+    def finish(self) -> List[QCIssue]:
+        entrance_used = self.used_types & ENTRANCE_ANIMATIONS
+        if len(entrance_used) > 6:
+            return [QCIssue(
+                type="animation", severity="warning",
+                element="data-animate",
+                description=(
+                    f"Animation overload: {len(entrance_used)} distinct entrance types "
+                    f"({', '.join(sorted(entrance_used))}). "
+                    f"Consider limiting to 4-5 for visual cohesion."
+                ),
+                auto_fixable=False,
+            )]
+        return []
+
+
+class SectionFlowRule(AnywhereRule):
+    """Logical section ordering (about before testimonials, etc.)."""
+
+    # Expected narrative flow — sections that should appear before others
+    FLOW_RULES = [
+        ("about", "testimonials"),
+        ("services", "pricing"),
+        ("about", "team"),
+        ("hero", "about"),
+        ("features", "pricing"),
+        ("services", "cta"),
+    ]
+    _SECTION_ID_RE = re.compile(r'id="([a-z]+)(?:-section)?"')
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.positions: Dict[str, int] = {}
+        self.count = 0
+
+    def on_token(self, token: Token) -> None:
+        lower = token.lower
+        if 'id="' not in lower:
+            return
+        for sid in self._SECTION_ID_RE.findall(lower):
+            if sid not in self.positions:
+                self.positions[sid] = self.count
+            self.count += 1
+
+    def merge(self, other: "SectionFlowRule") -> bool:
+        for sid, position in other.positions.items():
+            if sid not in self.positions:
+                self.positions[sid] = self.count + position
+        self.count += other.count
+        return True
+
+    def finish(self) -> List[QCIssue]:
+        issues = []
+        positions = self.positions
+        for before, after in self.FLOW_RULES:
+            if before in positions and after in positions:
+                if positions[before] > positions[after]:
+                    issues.append(QCIssue(
+                        type="layout", severity="info",
+                        element=f"section#{after}",
+                        description=(
+                            f"Section flow: '{after}' appears before '{before}'. "
+                            f"Consider placing '{before}' first for better narrative."
+                        ),
+                        auto_fixable=False,
+                    ))
+        return issues
+
+
+DEFAULT_RULES: List[Type[QCRule]] = [
+    StructureRule,
+    PlaceholderRule,
+    RequiredSectionsRule,
+    GsapAnimationRule,
+    ColorCoherenceRule,
+    RequiredResourcesRule,
+    DuplicateIdsRule,
+    AccessibilityRule,
+    HeadingHierarchyRule,
+    BannedPhrasesRule,
+    NavAnchorRule,
+    PlaceholderImagesRule,
+    AnimationDensityRule,
+    SectionFlowRule,
+]
+
+
+qc_rule_engine = QCRuleEngine(DEFAULT_RULES)
@@ -16,6 +16,8 @@ import time
 import json
 from typing import Dict, Any, List, Optional, Callable
 
+from app.services.gsap_engine import refresh_engine
+from app.services.tailwind_compiler import refresh_compiled_css
 from app.services.kimi_client import kimi
 from app.services.qc_agents import (
     AnimationFixAgent,
@@ -24,8 +26,10 @@ from app.services.qc_agents import (
     AccessibilityAgent,
     LayoutFixAgent,
     SectionFixAgent,
+    FixDocument,
 )
 from app.models.qc_report import QCIssue, QCReport, QCFixResult
+from app.services.qc_rules import qc_rule_engine
 
 logger = logging.getLogger(__name__)
 
@@ -165,6 +169,13 @@ class QualityControlPipeline:
             fixable_issues = new_fixable
             automated_issues = new_issues
 
+        # Fixes can add data-animate values (magnetic, text-split, ...) and
+        # classes: the tree-shaken GSAP engine gets their modules, the
+        # compiled Tailwind CSS their rules
+        if all_fixes:
+            html = refresh_engine(html)
+            html = refresh_compiled_css(html)
+
         report.automated_issues = automated_issues
         report.fixes_applied = all_fixes
         report.iterations = iteration
@@ -207,7 +218,26 @@ class QualityControlPipeline:
         requested_sections: List[str],
         variant_selections: Optional[Dict[str, str]] = None,
     ) -> List[QCIssue]:
-        """Phase 1: Fast automated validation (no AI). Should complete <1 second."""
+        """Phase 1: Fast automated validation (no AI). Should complete <1 second.
+
+        All HTML checks run as rules of one tokenizer pass (qc_rules.py);
+        the issue list is the same as _run_legacy_checks(). Rule results are
+        cached per page section, so re-checking after fixes or a refine only
+        re-runs the rules on the sections that changed.
+        """
+        issues = qc_rule_engine.run_incremental(html, theme_config, requested_sections)
+        if variant_selections:
+            issues.extend(self._check_visual_harmony(variant_selections))
+        return issues
+
+    def _run_legacy_checks(
+        self,
+        html: str,
+        theme_config: Dict[str, Any],
+        requested_sections: List[str],
+        variant_selections: Optional[Dict[str, str]] = None,
+    ) -> List[QCIssue]:
+        """One regex scan per check. Reference for the rule engine (parity tests, benchmark)."""
         issues: List[QCIssue] = []
 
         issues.extend(self._check_html_structure(html))
@@ -437,7 +467,7 @@ class QualityControlPipeline:
             issues.append(QCIssue(
                 type="structure", severity="critical",
                 element="script[tailwind]",
-                description="Tailwind CSS CDN not found",
+                description="Tailwind CSS not found (CDN script or compiled style)",
                 auto_fixable=False,
             ))
         if 'gsap' not in html.lower():
@@ -829,8 +859,9 @@ Rispondi SOLO con il JSON."""
         Apply targeted fixes using specialized agents.
         Returns (modified_html, list_of_fix_results).
 
-        Each agent receives the current HTML and returns (modified_html, QCFixResult).
-        Agents are chained so each one operates on the output of the previous.
+        The deterministic agents queue their fixes as edits on a shared
+        FixDocument, applied in one pass; the result is the same as chaining
+        each agent's fix() on the output of the previous one.
         Order: layout -> animation -> color -> text -> accessibility -> section
         """
         results: List[QCFixResult] = []
@@ -844,26 +875,27 @@ Rispondi SOLO con il JSON."""
         for issue in fixable:
             by_type.setdefault(issue.type, []).append(issue)
 
-        # Apply fixes in order, chaining HTML through each agent
+        # Apply fixes in order; edits are planned against the shared document
+        doc = FixDocument(html)
         if "structure" in by_type:
-            html, fix_result = self.layout_agent.fix(html, by_type["structure"])
-            results.append(fix_result)
+            results.append(self.layout_agent.plan(doc, by_type["structure"]))
 
         if "animation" in by_type:
-            html, fix_result = self.animation_agent.fix(html, by_type["animation"])
-            results.append(fix_result)
+            results.append(self.animation_agent.plan(doc, by_type["animation"]))
 
         if "color" in by_type:
-            html, fix_result = self.color_agent.fix(html, theme_config, by_type["color"])
-            results.append(fix_result)
+            results.append(self.color_agent.plan(doc, theme_config, by_type["color"]))
 
         if "text" in by_type:
-            html, fix_result = await self.text_agent.fix(html, by_type["text"], kimi_client=self.kimi)
+            # The text agent rewrites the string (AI or replacement table)
+            html, fix_result = await self.text_agent.fix(doc.render(), by_type["text"], kimi_client=self.kimi)
             results.append(fix_result)
+            doc = FixDocument(html)
 
         if "accessibility" in by_type:
-            html, fix_result = self.accessibility_agent.fix(html, by_type["accessibility"])
-            results.append(fix_result)
+            results.append(self.accessibility_agent.plan(doc, by_type["accessibility"]))
+
+        html = doc.render()
 
         if "section" in by_type:
             missing = [i.element.replace("section#", "") for i in by_type["section"]]
@@ -79,6 +79,7 @@ _MIME_TYPES = {
     ".png": "image/png",
     ".webp": "image/webp",
     ".gif": "image/gif",
+    ".avif": "image/avif",
 }
 
 
@@ -126,6 +127,38 @@ def upload_to_r2(
         return None
 
 
+def upload_immutable_to_r2(key: str, content: bytes, content_type: str) -> Optional[str]:
+    """Upload a content-addressed file (the key changes with the content) once.
+
+    Files already in the bucket are not uploaded again. Returns the public
+    URL, or None if R2 is not available or the upload failed.
+    """
+    client = _get_s3_client()
+    if client is None:
+        return None
+
+    public_url = f"{settings.R2_PUBLIC_URL.rstrip('/')}/{key}"
+    try:
+        client.head_object(Bucket=settings.R2_BUCKET_NAME, Key=key)
+        return public_url
+    except Exception:
+        pass  # not in the bucket yet
+
+    try:
+        client.put_object(
+            Bucket=settings.R2_BUCKET_NAME,
+            Key=key,
+            Body=content,
+            ContentType=content_type,
+            CacheControl="public, max-age=31536000, immutable",
+        )
+        logger.info("Uploaded to R2: %s (%d bytes)", key, len(content))
+        return public_url
+    except Exception as e:
+        logger.error("R2 upload failed for key %s: %s", key, e)
+        return None
+
+
 def delete_from_r2(url: str) -> bool:
     """Delete a file from R2 by its public URL.
 
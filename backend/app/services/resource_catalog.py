@@ -2,8 +2,9 @@
 Resource Catalog — Intelligent inventory of all HTML component templates.
 
 Scans backend/app/components/ on initialization, analyzes each HTML file,
-and merges metadata from components.json. Provides search, filtering, and
-coverage reporting for the generation pipeline.
+and merges metadata from components.json (per component, on first access,
+so loading the catalog does not decode the whole component index). Provides
+search, filtering, and coverage reporting for the generation pipeline.
 
 Usage:
     from app.services.resource_catalog import catalog
@@ -17,6 +18,8 @@ import re
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Set
 
+from app.services.component_index import ComponentIndex, get_component_index
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -92,7 +95,7 @@ class ResourceCatalog:
 
         # Internal storage
         self._components: Dict[str, Dict[str, Any]] = {}  # variant_id -> metadata
-        self._registry: Dict[str, Any] = {}  # raw components.json
+        self._index: Optional[ComponentIndex] = None  # shared components.json index
         self._section_index: Dict[str, List[str]] = {}  # section_type -> [variant_ids]
 
         self._load()
@@ -112,21 +115,26 @@ class ResourceCatalog:
         )
 
     def _load_registry(self) -> None:
-        """Load and index components.json."""
-        registry_path = self.components_dir / "components.json"
-        if not registry_path.exists():
+        """Attach the shared components.json index."""
+        self._index = get_component_index(self.components_dir)
+        if self._index.source == "empty":
             logger.warning("[ResourceCatalog] components.json not found")
-            return
-        with open(registry_path, "r", encoding="utf-8") as f:
-            self._registry = json.load(f)
 
     def _get_registry_variant(self, variant_id: str) -> Optional[Dict]:
         """Look up a variant in the registry by ID."""
-        for cat_data in self._registry.get("categories", {}).values():
-            for variant in cat_data.get("variants", []):
-                if variant.get("id") == variant_id:
-                    return variant
-        return None
+        return self._index.get_variant(variant_id) if self._index else None
+
+    def _meta(self, variant_id: str) -> Dict[str, Any]:
+        """Component metadata, merged with its registry entry on first access."""
+        meta = self._components[variant_id]
+        if "name" not in meta:
+            registry_info = self._get_registry_variant(variant_id) or {}
+            meta["description"] = registry_info.get("description", "")
+            meta["tags"] = registry_info.get("tags", [])
+            meta["registry_placeholders"] = registry_info.get("placeholders", [])
+            # Set last: marks the merge as done
+            meta["name"] = registry_info.get("name", variant_id)
+        return meta
 
     def _scan_html_files(self) -> None:
         """Walk the components directory and analyze every HTML file."""
@@ -163,17 +171,11 @@ class ResourceCatalog:
 
             analysis = _analyze_html(html_content)
 
-            # Merge with registry metadata if available
-            registry_info = self._get_registry_variant(variant_id)
-
+            # Registry metadata (name, tags, ...) is merged in by _meta()
             self._components[variant_id] = {
                 "variant_id": variant_id,
                 "section_type": section_type,
                 "file": file_rel,
-                "name": registry_info.get("name", variant_id) if registry_info else variant_id,
-                "description": registry_info.get("description", "") if registry_info else "",
-                "tags": registry_info.get("tags", []) if registry_info else [],
-                "registry_placeholders": registry_info.get("placeholders", []) if registry_info else [],
                 # From HTML analysis
                 "placeholders": analysis["placeholders"],
                 "repeat_blocks": analysis["repeat_blocks"],
@@ -210,7 +212,8 @@ class ResourceCatalog:
         all_animations: Set[str] = set()
         total_placeholders: Set[str] = set()
 
-        for meta in self._components.values():
+        for variant_id in self._components:
+            meta = self._meta(variant_id)
             all_tags.update(meta["tags"])
             all_animations.update(meta["gsap_animations"])
             total_placeholders.update(meta["placeholders"])
@@ -254,7 +257,7 @@ class ResourceCatalog:
             search_tags.add(mood)
 
         for vid in variant_ids:
-            meta = self._components[vid]
+            meta = self._meta(vid)
 
             # Tag filter: component must have at least one matching tag
             if search_tags and not search_tags.intersection(meta["tags"]):
@@ -272,7 +275,9 @@ class ResourceCatalog:
 
     def get_component_metadata(self, variant_id: str) -> Optional[Dict[str, Any]]:
         """Return full metadata for a single component by variant ID."""
-        return self._components.get(variant_id)
+        if variant_id not in self._components:
+            return None
+        return self._meta(variant_id)
 
     def get_alternatives(self, variant_id: str) -> List[Dict[str, Any]]:
         """Return other components of the same section type (excluding the given one)."""
@@ -282,18 +287,17 @@ class ResourceCatalog:
 
         section = meta["section_type"]
         return [
-            self._components[vid]
+            self._meta(vid)
             for vid in self._section_index.get(section, [])
             if vid != variant_id
         ]
 
     def get_section_coverage(self) -> Dict[str, Dict[str, Any]]:
         """Return per-section breakdown: variant count, variant IDs, whether required."""
-        registry_categories = self._registry.get("categories", {})
         coverage = {}
 
         for section, variant_ids in sorted(self._section_index.items()):
-            reg_cat = registry_categories.get(section, {})
+            reg_cat = self._index.category_meta(section) if self._index else {}
             coverage[section] = {
                 "count": len(variant_ids),
                 "variants": variant_ids,
@@ -4,6 +4,8 @@ Servizio sanitizzazione input/output per protezione AI.
 - Output: rimuovi script/iframe, whitelist CDN, valida HTML
 """
 
+import functools
+import html as html_lib
 import re
 import logging
 from typing import List, Optional, Tuple
@@ -161,6 +163,36 @@ ALLOWED_SCRIPT_SRCS = [
 ]
 
 
+# Patterns that indicate malicious or dangerous inline JS
+DANGEROUS_JS_PATTERNS = [
+    r'document\.cookie',
+    r'localStorage',
+    r'sessionStorage',
+    r'XMLHttpRequest',
+    r'\bfetch\s*\(',
+    r'eval\s*\(',
+    r'Function\s*\(',
+    r'window\.location\s*=',
+    r'document\.write',
+    r'\.innerHTML\s*=',
+    r'importScripts',
+    r'navigator\.sendBeacon',
+    r'WebSocket',
+    r'postMessage',
+]
+
+# Fingerprints of our own trusted inline scripts (template-assembled)
+TRUSTED_SCRIPT_MARKERS = [
+    "GSAP Universal Animation Engine",
+    "ScrollTrigger",
+    "data-animate",
+    "web3forms",
+    "hamburger",
+    "mobile-nav",
+    "accordion",
+]
+
+
 def _sanitize_scripts(html: str, is_template_assembled: bool = False) -> str:
     """
     Filtra script tag selettivamente:
@@ -171,34 +203,8 @@ def _sanitize_scripts(html: str, is_template_assembled: bool = False) -> str:
     """
     import re as _re
 
-    # Patterns that indicate malicious or dangerous inline JS
-    _DANGEROUS_JS_PATTERNS = [
-        r'document\.cookie',
-        r'localStorage',
-        r'sessionStorage',
-        r'XMLHttpRequest',
-        r'\bfetch\s*\(',
-        r'eval\s*\(',
-        r'Function\s*\(',
-        r'window\.location\s*=',
-        r'document\.write',
-        r'\.innerHTML\s*=',
-        r'importScripts',
-        r'navigator\.sendBeacon',
-        r'WebSocket',
-        r'postMessage',
-    ]
-
-    # Fingerprints of our own trusted inline scripts (template-assembled)
-    _TRUSTED_SCRIPT_MARKERS = [
-        "GSAP Universal Animation Engine",
-        "ScrollTrigger",
-        "data-animate",
-        "web3forms",
-        "hamburger",
-        "mobile-nav",
-        "accordion",
-    ]
+    _DANGEROUS_JS_PATTERNS = DANGEROUS_JS_PATTERNS
+    _TRUSTED_SCRIPT_MARKERS = TRUSTED_SCRIPT_MARKERS
 
     def _check_script(match):
         tag = match.group(0)
@@ -247,6 +253,39 @@ def sanitize_output(html: str, is_template_assembled: bool = False) -> str:
     if not html:
         return html
 
+    html = sanitize_fragment(html, is_template_assembled=is_template_assembled)
+
+    # Assicurati che ci sia struttura HTML minima
+    if "<!DOCTYPE" not in html.upper() and "<html" not in html.lower():
+        html = f"<!DOCTYPE html>\n<html lang=\"it\">\n<head><meta charset=\"UTF-8\"><meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\"></head>\n<body>\n{html}\n</body>\n</html>"
+
+    return html
+
+
+def sanitize_fragment(html: str, is_template_assembled: bool = False) -> str:
+    """
+    Come sanitize_output, ma per un frammento di pagina (head, nav, una sezione):
+    non aggiunge la struttura DOCTYPE/html/body mancante.
+
+    Usato dallo streaming dell'assembler, che sanitizza ogni chunk separatamente.
+    """
+    if not html:
+        return html
+
+    # L'input e' gia' tutto in memoria: nessun limite sul costrutto in sospeso
+    sanitizer = StreamingSanitizer(is_template_assembled=is_template_assembled, max_pending=None)
+    return sanitizer.close(html)
+
+
+def _legacy_sanitize_fragment(html: str, is_template_assembled: bool = False) -> str:
+    """
+    Implementazione precedente di sanitize_fragment (passate regex sull'intero
+    documento). Tenuta come riferimento per test e benchmark: alcune regex
+    diventano quadratiche su script/iframe non chiusi.
+    """
+    if not html:
+        return html
+
     # Rimuovi script pericolosi ma mantieni Tailwind CDN e inline vanilla JS
     # Per template-assembled HTML, preserva script trusted (GSAP, form handler)
     html = _sanitize_scripts(html, is_template_assembled=is_template_assembled)
@@ -297,17 +336,490 @@ def sanitize_output(html: str, is_template_assembled: bool = False) -> str:
         flags=re.IGNORECASE
     )
 
-    # Controlla domini esterni nelle src/href (non bloccare, solo log)
-    external_urls = re.findall(r'(?:src|href)\s*=\s*["\']https?://([^/\s"\']+)', html)
+    _log_external_domains(html)
+    return html
+
+
+def _log_external_domains(html: str) -> None:
+    """Controlla domini esterni nelle src/href (non bloccare, solo log)."""
+    external_urls = _EXTERNAL_URL_RE.findall(html)
     for domain in external_urls:
         if not any(domain.endswith(allowed) for allowed in ALLOWED_DOMAINS):
             logger.info(f"External domain in generated HTML: {domain}")
 
-    # Assicurati che ci sia struttura HTML minima
-    if "<!DOCTYPE" not in html.upper() and "<html" not in html.lower():
-        html = f"<!DOCTYPE html>\n<html lang=\"it\">\n<head><meta charset=\"UTF-8\"><meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\"></head>\n<body>\n{html}\n</body>\n</html>"
 
-    return html
+_EXTERNAL_URL_RE = re.compile(r'(?:src|href)\s*=\s*["\']https?://([^/\s"\']+)')
+
+
+# =========================================================
+# Sanitizzatore a token (tempo lineare, streaming)
+# =========================================================
+# Limite di default per un singolo costrutto (tag, commento, script) ancora
+# incompleto in modalita' streaming
+MAX_PENDING_CHARS = 4 * 1024 * 1024
+
+_HTML_SPACE = "\t\n\f\r "
+
+# Un tag letto come dal tokenizer del browser: il nome arriva fino a spazio,
+# "/" o ">", le virgolette contano solo all'inizio di un valore e un valore
+# non chiuso arriva fino in fondo. I quantificatori possessivi escludono il
+# backtracking: ogni tag e' letto in un solo passaggio, anche se malformato.
+_TAG_RE = re.compile(r"""
+    </?([a-zA-Z][^\t\n\f\r />]*+)
+    (?:
+        [\t\n\f\r /]++
+      | [^\t\n\f\r />][^\t\n\f\r />=]*+
+        (?:[\t\n\f\r ]*+=[\t\n\f\r ]*+(?:"[^"]*+"?|'[^']*+'?|[^\t\n\f\r >]*+))?+
+    )*+
+    (>)?
+""", re.VERBOSE)
+
+# Un attributo (nome ed eventuale valore) dentro un tag letto da _TAG_RE
+_ATTR_RE = re.compile(r"""
+    ([^\t\n\f\r />][^\t\n\f\r />=]*+)
+    (?:[\t\n\f\r ]*+=[\t\n\f\r ]*+("[^"]*+"?|'[^']*+'?|[^\t\n\f\r >]*+))?+
+""", re.VERBOSE)
+
+# Tag che possono avere attributi da ripulire (event handler, href e
+# xlink:href o altri href con prefisso negli SVG)
+_HANDLER_HINT_RE = re.compile(r'[\t\n\f\r /"\':](?:on|href)', re.IGNORECASE)
+_HREF_HINT_RE = re.compile(r'[\t\n\f\r /"\':]href', re.IGNORECASE)
+
+# Fine di un commento: "<!-->" e "<!--->" si chiudono subito
+_COMMENT_END_RE = re.compile(r'--!?>')
+
+# Token che cambiano stato dentro uno script (commenti HTML e <script>
+# annidati: un "<!--<script>" nasconde il primo </script> al browser)
+_SCRIPT_DATA_RE = re.compile(r'<!--|-->|<(/?)script(?=[\t\n\f\r />])', re.IGNORECASE)
+
+_LT_RUN_RE = re.compile(r'<+')
+_URL_IGNORED_RE = re.compile(r'[\t\n\r]')
+
+_DANGEROUS_JS_RES = [re.compile(pattern, re.IGNORECASE) for pattern in DANGEROUS_JS_PATTERNS]
+_EVENT_HANDLER_NAMES = frozenset(EVENT_HANDLERS)
+_REMOVED_TAGS = frozenset(DANGEROUS_TAGS)
+
+# Elementi il cui contenuto e' testo per il browser (solo nel namespace HTML)
+_RAW_TEXT_TAGS = frozenset({
+    "style", "xmp", "noembed", "noframes", "noscript", "textarea", "title",
+})
+
+# SVG/MathML: tag che riportano all'HTML e punti di integrazione HTML
+_FOREIGN_ROOTS = frozenset({"svg", "math"})
+_FOREIGN_BREAKOUT_TAGS = frozenset({
+    "b", "big", "blockquote", "body", "br", "center", "code", "dd", "div",
+    "dl", "dt", "em", "embed", "h1", "h2", "h3", "h4", "h5", "h6", "head",
+    "hr", "i", "img", "li", "listing", "menu", "meta", "nobr", "ol", "p",
+    "pre", "ruby", "s", "small", "span", "strong", "strike", "sub", "sup",
+    "table", "tt", "u", "ul", "var",
+})
+_INTEGRATION_POINTS = {
+    "svg": frozenset({"foreignobject", "desc", "title"}),
+    "math": frozenset({"mi", "mo", "mn", "ms", "mtext"}),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _end_tag_re(name: str) -> "re.Pattern[str]":
+    return re.compile(rf'</{name}(?=[\t\n\f\r />])', re.IGNORECASE)
+
+
+def _attr_value(raw: Optional[str]) -> str:
+    """Valore di un attributo (senza virgolette, entita' decodificate)."""
+    if raw is None:
+        return ""
+    if raw[:1] in ('"', "'"):
+        raw = raw[1:-1] if len(raw) > 1 and raw[-1] == raw[0] else raw[1:]
+    return html_lib.unescape(raw)
+
+
+def _is_href(name: str) -> bool:
+    """href o un href con prefisso (xlink:href negli SVG)."""
+    return name == "href" or name.endswith(":href")
+
+
+def _is_javascript_url(value: str) -> bool:
+    # Il browser ignora tab/a capo nell'URL e gli spazi/controlli iniziali
+    value = _URL_IGNORED_RE.sub("", value).lstrip("".join(map(chr, range(33))))
+    return value[:11].lower() == "javascript:"
+
+
+class StreamingSanitizer:
+    """
+    Sanitizzatore HTML a token, in tempo lineare e con memoria limitata.
+
+    Applica le stesse regole di _legacy_sanitize_fragment (CDN consentite per
+    gli script, pattern JS pericolosi, iframe video trusted, object/embed/
+    applet, event handler, href javascript:) leggendo il documento come il
+    tokenizer del browser: tag con attributi tra virgolette, commenti,
+    elementi a testo grezzo (script, style, textarea...) e contenuto SVG/
+    MathML. Ogni carattere e' letto un numero costante di volte: niente
+    ricerche lazy che ripartono da ogni "<script" non chiuso.
+
+    feed() restituisce l'HTML sanitizzato fin dove i costrutti sono completi;
+    close() sanitizza il resto (i costrutti non chiusi arrivano a fine
+    documento). Un costrutto incompleto piu' lungo di max_pending caratteri
+    fa scartare il resto del documento.
+    """
+
+    def __init__(self, is_template_assembled: bool = False, max_pending: Optional[int] = MAX_PENDING_CHARS):
+        self.is_template_assembled = is_template_assembled
+        self.max_pending = max_pending
+        self._pending: List[str] = []
+        self._pending_len = 0
+        self._retry_at = 0
+        self._discarding = False
+        self._plaintext = False
+        # Elementi SVG/MathML aperti: (nome, True se il contenuto e' "foreign")
+        self._foreign: List[Tuple[str, bool]] = []
+        # Tag di chiusura gia' cercati senza successo fino in fondo
+        self._missing_ends: set = set()
+
+    def feed(self, chunk: str) -> str:
+        if self._discarding or not chunk:
+            return ""
+        self._pending.append(chunk)
+        self._pending_len += len(chunk)
+        # Un costrutto incompleto viene riletto solo quando il buffer e'
+        # raddoppiato: il costo totale resta lineare anche con chunk piccoli
+        if self._pending_len < self._retry_at:
+            self._check_pending_limit()
+            return ""
+        return self._run(final=False)
+
+    def close(self, chunk: str = "") -> str:
+        """Sanitizza chunk e tutto cio' che e' ancora in sospeso."""
+        if self._discarding:
+            return ""
+        if chunk:
+            self._pending.append(chunk)
+        return self._run(final=True)
+
+    # ---- scansione -------------------------------------------------------
+
+    def _run(self, final: bool) -> str:
+        html = "".join(self._pending)
+        out: List[str] = []
+        self._missing_ends.clear()
+        pos = self._scan(html, final, out)
+        rest = html[pos:]
+        self._pending = [rest] if rest else []
+        self._pending_len = len(rest)
+        self._retry_at = 2 * len(rest)
+        self._check_pending_limit()
+        result = "".join(out)
+        _log_external_domains(result)
+        return result
+
+    def _check_pending_limit(self) -> None:
+        if self.max_pending is not None and self._pending_len > self.max_pending:
+            logger.warning(
+                f"[Sanitizer] Costrutto HTML incompleto oltre {self.max_pending} caratteri, "
+                f"resto del documento scartato"
+            )
+            self._discarding = True
+            self._pending = []
+            self._pending_len = 0
+
+    def _scan(self, html: str, final: bool, out: List[str]) -> int:
+        """Sanitizza html in out; ritorna l'inizio del primo costrutto incompleto."""
+        n = len(html)
+        if self._plaintext:
+            out.append(html)
+            return n
+        pos = 0
+        while pos < n:
+            lt = html.find("<", pos)
+            if lt < 0:
+                out.append(html[pos:])
+                return n
+            if lt > pos:
+                out.append(html[pos:lt])
+            # In una serie "<<<" solo l'ultimo puo' aprire un costrutto
+            start = _LT_RUN_RE.match(html, lt).end() - 1
+            mark = len(out)
+            end = self._markup(html, start, final, out)
+            if end < 0:
+                return lt
+            if start > lt:
+                text = html[lt:start]
+                if len(out) == mark:
+                    # Costrutto rimosso: l'ultimo "<" non deve unirsi a cio' che segue
+                    text = text[:-1] + "&lt;"
+                out.insert(mark, text)
+            pos = end
+            if self._plaintext:
+                out.append(html[pos:])
+                return n
+        return n
+
+    def _markup(self, html: str, lt: int, final: bool, out: List[str]) -> int:
+        """Gestisce il costrutto che inizia con "<" in lt; -1 se incompleto."""
+        n = len(html)
+        if lt + 2 > n or (not final and lt + 4 > n and html[lt + 1] in "!/"):
+            # Serve qualche carattere in piu' per capire cosa apre "<"
+            if not final:
+                return -1
+            out.append(html[lt:])
+            return n
+        c = html[lt + 1]
+        if c == "!" and html.startswith("<!--", lt):
+            end = self._or_eof(self._comment_end(html, lt + 4), n, final)
+            if end >= 0:
+                out.append(html[lt:end])
+            return end
+        if c in "!?" or (c == "/" and not self._is_tag_name_start(html[lt + 2:lt + 3])):
+            # Commento "bogus" (<!DOCTYPE>, <?xml>, </ >): fino al primo ">"
+            end = self._or_eof(html.find(">", lt + 2) + 1 or -1, n, final)
+            if end >= 0:
+                out.append(html[lt:end])
+            return end
+        if not self._is_tag_name_start(c):
+            out.append("<")
+            return lt + 1
+
+        m = _TAG_RE.match(html, lt)
+        if m.group(2) is None:
+            # Tag non chiuso: a fine documento il browser lo scarta
+            return -1 if not final else n
+        name = m.group(1).lower()
+        if c == "/":
+            self._end_tag(name)
+            out.append(m.group(0))
+            return m.end()
+        return self._start_tag(html, lt, m, name, final, out)
+
+    @staticmethod
+    def _is_tag_name_start(c: str) -> bool:
+        return c.isascii() and c.isalpha()
+
+    @staticmethod
+    def _comment_end(html: str, pos: int) -> int:
+        if html.startswith(">", pos):
+            return pos + 1
+        if html.startswith("->", pos):
+            return pos + 2
+        m = _COMMENT_END_RE.search(html, pos)
+        return m.end() if m else -1
+
+    @staticmethod
+    def _or_eof(end: int, n: int, final: bool) -> int:
+        """end, oppure la fine del documento se il costrutto e' l'ultimo."""
+        if end >= 0:
+            return end
+        return n if final else -1
+
+    def _find_end_tag(self, html: str, name: str, pos: int) -> int:
+        """Inizio del primo </name> da pos, -1 se non c'e'."""
+        if name in self._missing_ends:
+            return -1
+        m = _end_tag_re(name).search(html, pos)
+        if not m:
+            # Non c'e' nemmeno piu' avanti: niente nuove ricerche fino in fondo
+            self._missing_ends.add(name)
+            return -1
+        return m.start()
+
+    @staticmethod
+    def _end_tag_end(html: str, pos: int, final: bool) -> int:
+        """Fine del tag di chiusura che inizia in pos."""
+        m = _TAG_RE.match(html, pos)
+        return m.end() if m.group(2) else (len(html) if final else -1)
+
+    # ---- tag -------------------------------------------------------------
+    # Lo stato SVG/MathML segue l'HTML in uscita: i tag rimossi non lo cambiano
+
+    def _in_foreign(self) -> bool:
+        return bool(self._foreign) and self._foreign[-1][1]
+
+    def _leave_foreign(self) -> None:
+        while self._in_foreign():
+            self._foreign.pop()
+
+    def _end_tag(self, name: str) -> None:
+        for i in range(len(self._foreign) - 1, -1, -1):
+            if self._foreign[i][0] == name:
+                del self._foreign[i:]
+                return
+        if name in ("p", "br"):
+            self._leave_foreign()
+
+    def _track_foreign(self, tag: str, name: str) -> bool:
+        """Aggiorna gli elementi SVG/MathML aperti; True se il tag e' SVG/MathML."""
+        self_closing = tag.endswith("/>")
+        if self._in_foreign():
+            if name in _FOREIGN_BREAKOUT_TAGS or (
+                name == "font" and {"color", "face", "size"} & {a for a, _ in self._attributes(tag)}
+            ):
+                self._leave_foreign()
+                return False
+            if not self_closing:
+                if name in _INTEGRATION_POINTS[self._foreign[-1][0]] or (
+                    name == "annotation-xml"
+                    and dict(self._attributes(tag)).get("encoding", "").lower()
+                    in ("text/html", "application/xhtml+xml")
+                ):
+                    self._foreign.append((name, False))
+                elif name in _FOREIGN_ROOTS:
+                    self._foreign.append((name, True))
+            return True
+        if name in _FOREIGN_ROOTS:
+            if not self_closing:
+                self._foreign.append((name, True))
+            return True
+        return False
+
+    @staticmethod
+    def _attributes(tag: str) -> List[Tuple[str, str]]:
+        """(nome minuscolo, valore) degli attributi di un tag, in ordine."""
+        name_end = _TAG_RE.match(tag).end(1)
+        return [
+            (m.group(1).lower(), _attr_value(m.group(2)))
+            for m in _ATTR_RE.finditer(tag, name_end, len(tag) - 1)
+        ]
+
+    def _clean_tag(self, html: str, start: int, end: int) -> str:
+        """Tag senza event handler e con gli href javascript: neutralizzati."""
+        hint = _HREF_HINT_RE if self.is_template_assembled else _HANDLER_HINT_RE
+        tag = html[start:end]
+        if not hint.search(html, start, end):
+            return tag
+        parts: List[str] = []
+        pos = 0
+        name_end = _TAG_RE.match(tag).end(1)
+        for m in _ATTR_RE.finditer(tag, name_end, len(tag) - 1):
+            name = m.group(1).lower()
+            if name in _EVENT_HANDLER_NAMES and not self.is_template_assembled:
+                cut = m.start() - 1 if tag[m.start() - 1] in _HTML_SPACE else m.start()
+                parts.append(tag[pos:cut])
+                # Un attributo attaccato al successivo resta separato
+                if tag[m.end()] not in _HTML_SPACE + "/>":
+                    parts.append(" ")
+                pos = m.end()
+            elif _is_href(name) and _is_javascript_url(_attr_value(m.group(2))):
+                parts.append(tag[pos:m.start()])
+                parts.append(m.group(1)[:-4] + 'href="#"')
+                pos = m.end()
+        parts.append(tag[pos:])
+        return "".join(parts)
+
+    def _start_tag(self, html: str, lt: int, m: "re.Match[str]", name: str, final: bool, out: List[str]) -> int:
+        tag_end = m.end()
+        tag = m.group(0)
+
+        if name == "script":
+            return self._script(html, lt, tag_end, self._in_foreign(), final, out)
+
+        if name in _REMOVED_TAGS:
+            close = self._find_end_tag(html, name, tag_end)
+            if close < 0:
+                # Senza chiusura si rimuove solo il tag
+                return tag_end if final else -1
+            return self._end_tag_end(html, close, final)
+
+        if name == "iframe":
+            src = dict(self._attributes(tag)).get("src", "")
+            if self._in_foreign():
+                close = end = -1
+            else:
+                close = self._find_end_tag(html, name, tag_end)
+                if close < 0 and not final:
+                    return -1
+            if close >= 0:
+                end = self._end_tag_end(html, close, final)
+                if end < 0:
+                    return -1
+            else:
+                end = tag_end  # senza chiusura si decide solo sul tag
+            if not any(domain in src for domain in ALLOWED_IFRAME_DOMAINS):
+                logger.warning(f"Blocked untrusted iframe: {html[lt:end][:120]}")
+                return end
+            out.append(self._clean_tag(html, lt, tag_end))
+            out.append(html[tag_end:end])
+            return end
+
+        foreign = self._track_foreign(tag, name)
+        if not foreign and name in _RAW_TEXT_TAGS:
+            close = self._find_end_tag(html, name, tag_end)
+            if close < 0:
+                if not final:
+                    return -1
+                close = len(html)
+            out.append(self._clean_tag(html, lt, tag_end))
+            out.append(html[tag_end:close])
+            return close
+        out.append(self._clean_tag(html, lt, tag_end))
+        if not foreign and name == "plaintext":
+            self._plaintext = True
+        return tag_end
+
+    def _script(self, html: str, lt: int, tag_end: int, foreign: bool, final: bool, out: List[str]) -> int:
+        if foreign:
+            # In SVG/MathML il contenuto e' markup: va chiuso dal primo </script>
+            close = self._find_end_tag(html, "script", tag_end)
+        else:
+            close = self._script_data_end(html, tag_end)
+        if close < 0:
+            if not final:
+                return -1
+            close = end = len(html)
+        else:
+            end = self._end_tag_end(html, close, final)
+            if end < 0:
+                return -1
+        tag = html[lt:tag_end]
+        content = html[tag_end:close]
+        if foreign:
+            if "<" in content:
+                logger.warning("Blocked inline script with markup inside SVG/MathML")
+                return end
+            content = html_lib.unescape(content)
+        if self._script_allowed(tag, content):
+            out.append(self._clean_tag(html, lt, tag_end))
+            out.append(html[tag_end:end])
+        return end
+
+    @staticmethod
+    def _script_data_end(html: str, pos: int) -> int:
+        """Inizio del </script> che chiude lo script, come lo legge il browser."""
+        state = 0  # 0 = script, 1 = dentro "<!--", 2 = "<!--<script>" annidato
+        m = _SCRIPT_DATA_RE.search(html, pos)
+        while m:
+            token = m.group(0)
+            if token == "<!--":
+                if state == 0:
+                    state = 1
+                # "<!-->" si chiude subito: si riparte dai trattini
+                m = _SCRIPT_DATA_RE.search(html, m.start() + 2)
+                continue
+            if token == "-->":
+                state = 0
+            elif m.group(1):
+                if state != 2:
+                    return m.start()
+                state = 1
+            elif state == 1:
+                state = 2
+            m = _SCRIPT_DATA_RE.search(html, m.end())
+        return -1
+
+    def _script_allowed(self, tag: str, content: str) -> bool:
+        src = dict(self._attributes(tag)).get("src", "")
+        if src:
+            for allowed in ALLOWED_SCRIPT_SRCS:
+                if allowed in src:
+                    return True
+            logger.warning(f"Blocked script src: {src}")
+            return False
+        if self.is_template_assembled:
+            for marker in TRUSTED_SCRIPT_MARKERS:
+                if marker in content:
+                    return True  # Trusted template script, keep it
+        for pattern in _DANGEROUS_JS_RES:
+            if pattern.search(content):
+                logger.warning(f"Blocked inline script with dangerous pattern: {pattern.pattern}")
+                return False
+        return True
 
 
 def sanitize_refine_input(message: str) -> str:
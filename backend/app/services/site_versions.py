@@ -0,0 +1,286 @@
+"""
+Site versions — full snapshots plus compressed line diffs.
+
+Every generation, refine, photo swap and video add saves a version of the
+site's HTML (site_versions). Storing the whole ~300 KB page each time
+kept ten near-identical copies per site; a refine usually changes a few
+lines of one section.
+
+A version is now either:
+
+- a snapshot: html_content holds the whole page. The first version, and
+  then one every SNAPSHOT_INTERVAL versions, are snapshots.
+- a delta: html_content is NULL and delta holds the zlib-compressed line
+  diff against the previous version (base_version), as JSON ops:
+  [start, end] copies base lines [start:end], a string is inserted text.
+
+The diff skips the lines the two pages share at the start and the end,
+then runs SequenceMatcher, quadratic in the lines left, on the rest. When
+more than MAX_DIFF_LINES lines are left (a regenerated page, a huge one)
+the version is saved as a snapshot instead: save_version() runs inside
+the request.
+
+version_html() rebuilds a delta from the nearest snapshot before it (at
+most SNAPSHOT_INTERVAL - 1 diffs, each a list splice). Pruning to
+MAX_VERSIONS turns the oldest kept version into a snapshot first, so a
+chain never starts from a deleted row. Rows written before this change are
+all snapshots and stay readable; migrate_site_versions() rewrites them
+(tools/migrate_site_versions.py, tools/bench_site_versions.py for the
+storage/latency numbers).
+
+Usage:
+    version = save_version(db, site, html, "Refine: hero")
+    html = version_html(db, version)
+"""
+
+import difflib
+import json
+import logging
+import zlib
+from typing import Dict, List, Optional, Union
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.site_version import SiteVersion
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_INTERVAL = 5
+MAX_VERSIONS = 10
+# Changed lines (either page, past the common head and tail) above which
+# make_delta() gives up: a 5000-line diff takes up to ~130 ms
+MAX_DIFF_LINES = 5000
+
+DeltaOp = Union[List[int], str]
+
+
+class VersionChainError(Exception):
+    """A delta version whose base versions are missing or inconsistent."""
+
+
+# ---------------------------------------------------------------------------
+# Line diffs
+# ---------------------------------------------------------------------------
+
+def make_delta(base: str, html: str) -> Optional[bytes]:
+    """Compressed ops rebuilding html from base (apply_delta).
+
+    None when more than MAX_DIFF_LINES lines differ: save a snapshot.
+    """
+    a = base.splitlines(keepends=True)
+    b = html.splitlines(keepends=True)
+    # Common head and tail, in linear time: a refine leaves a small middle
+    limit = min(len(a), len(b))
+    head = 0
+    while head < limit and a[head] == b[head]:
+        head += 1
+    tail = 0
+    while tail < limit - head and a[-1 - tail] == b[-1 - tail]:
+        tail += 1
+    a_mid, b_mid = a[head:len(a) - tail], b[head:len(b) - tail]
+    if max(len(a_mid), len(b_mid)) > MAX_DIFF_LINES:
+        return None
+
+    ops: List[DeltaOp] = [[0, head]] if head else []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a_mid, b_mid, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append([head + i1, head + i2])
+        elif j2 > j1:
+            text = "".join(b_mid[j1:j2])
+            if ops and isinstance(ops[-1], str):
+                ops[-1] += text
+            else:
+                ops.append(text)
+    if tail:
+        ops.append([len(a) - tail, len(a)])
+    return zlib.compress(json.dumps(ops, separators=(",", ":")).encode("utf-8"), 9)
+
+
+def apply_delta(base: str, delta: bytes) -> str:
+    """The HTML a make_delta() result rebuilds from base."""
+    lines = base.splitlines(keepends=True)
+    parts: List[str] = []
+    for op in json.loads(zlib.decompress(delta)):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(lines[op[0]:op[1]])
+    return "".join(parts)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def _chain(db: Session, site_id: int, version_number: int) -> List[SiteVersion]:
+    """The nearest snapshot at or before version_number and the versions after it, in order."""
+    snapshot_number = (
+        db.query(func.max(SiteVersion.version_number))
+        .filter(
+            SiteVersion.site_id == site_id,
+            SiteVersion.version_number <= version_number,
+            SiteVersion.html_content.isnot(None),
+        )
+        .scalar()
+    )
+    if snapshot_number is None:
+        raise VersionChainError(f"Nessuno snapshot prima della versione {version_number} (sito {site_id})")
+    return (
+        db.query(SiteVersion)
+        .filter(
+            SiteVersion.site_id == site_id,
+            SiteVersion.version_number >= snapshot_number,
+            SiteVersion.version_number <= version_number,
+        )
+        .order_by(SiteVersion.version_number.asc())
+        .all()
+    )
+
+
+def _rebuild_all(chain: List[SiteVersion]) -> List[str]:
+    """The HTML of every version of a chain starting with a snapshot."""
+    pages: List[str] = []
+    for i, version in enumerate(chain):
+        if version.is_snapshot:
+            pages.append(version.html_content)
+        elif i and version.delta is not None and version.base_version == chain[i - 1].version_number:
+            pages.append(apply_delta(pages[-1], version.delta))
+        else:
+            raise VersionChainError(
+                f"Versione {version.version_number}: base {version.base_version} mancante"
+            )
+    return pages
+
+
+def version_html(db: Session, version: SiteVersion) -> str:
+    """The full HTML of a version (rebuilt from its snapshot when it is a delta)."""
+    if version.is_snapshot:
+        return version.html_content
+    return _rebuild_all(_chain(db, version.site_id, version.version_number))[-1]
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def _make_snapshot(db: Session, version: SiteVersion) -> None:
+    if not version.is_snapshot:
+        version.html_content = version_html(db, version)
+        version.delta = None
+        version.base_version = None
+
+
+def _prune(db: Session, site_id: int) -> None:
+    """Keep the MAX_VERSIONS most recent versions, the oldest kept as a snapshot."""
+    kept = (
+        db.query(SiteVersion)
+        .filter(SiteVersion.site_id == site_id)
+        .order_by(SiteVersion.version_number.desc())
+        .limit(MAX_VERSIONS)
+        .all()
+    )
+    if len(kept) < MAX_VERSIONS:
+        return
+    oldest = kept[-1]
+    _make_snapshot(db, oldest)
+    old_versions = (
+        db.query(SiteVersion)
+        .filter(SiteVersion.site_id == site_id, SiteVersion.version_number < oldest.version_number)
+        .all()
+    )
+    for old in old_versions:
+        db.delete(old)
+
+
+def save_version(db: Session, site, html_content: str, description: str) -> SiteVersion:
+    """Save a new version of the site (snapshot or delta). Keeps MAX_VERSIONS versions."""
+    latest = (
+        db.query(SiteVersion)
+        .filter(SiteVersion.site_id == site.id)
+        .order_by(SiteVersion.version_number.desc())
+        .first()
+    )
+    next_version = (latest.version_number + 1) if latest else 1
+    version = SiteVersion(
+        site_id=site.id,
+        version_number=next_version,
+        change_description=description,
+    )
+
+    snapshot_number = None
+    if latest is not None:
+        snapshot_number = (
+            db.query(func.max(SiteVersion.version_number))
+            .filter(SiteVersion.site_id == site.id, SiteVersion.html_content.isnot(None))
+            .scalar()
+        )
+    delta = None
+    if snapshot_number is not None and next_version - snapshot_number < SNAPSHOT_INTERVAL:
+        try:
+            delta = make_delta(version_html(db, latest), html_content)
+        except VersionChainError as e:
+            logger.warning(f"[Versions] {e}: salvo uno snapshot completo")
+    if delta is None:
+        version.html_content = html_content
+    else:
+        version.delta = delta
+        version.base_version = latest.version_number
+    db.add(version)
+    db.flush()
+
+    _prune(db, site.id)
+    db.flush()
+    return version
+
+
+# ---------------------------------------------------------------------------
+# Migration
+# ---------------------------------------------------------------------------
+
+def migrate_site_versions(db: Session, site_id: Optional[int] = None) -> Dict[str, int]:
+    """Rewrite full-copy versions as snapshots + deltas (one commit per site).
+
+    Sites already migrated are rewritten to the same layout, so the
+    migration can be run again. Returns bytes before/after and counts.
+    """
+    stats = {"sites": 0, "versions": 0, "deltas": 0, "bytes_before": 0, "bytes_after": 0}
+    query = db.query(SiteVersion.site_id).distinct()
+    if site_id is not None:
+        query = query.filter(SiteVersion.site_id == site_id)
+    for (sid,) in query.all():
+        versions = (
+            db.query(SiteVersion)
+            .filter(SiteVersion.site_id == sid)
+            .order_by(SiteVersion.version_number.asc())
+            .all()
+        )
+        try:
+            pages = _rebuild_all(versions)
+        except VersionChainError as e:
+            logger.warning(f"[Versions] Sito {sid} saltato: {e}")
+            continue
+        snapshot_number = None
+        for i, (version, html) in enumerate(zip(versions, pages)):
+            stats["bytes_before"] += len(html.encode("utf-8"))
+            delta = None
+            if i and version.version_number - snapshot_number < SNAPSHOT_INTERVAL:
+                delta = make_delta(pages[i - 1], html)
+            if delta is None:
+                version.html_content, version.delta, version.base_version = html, None, None
+                snapshot_number = version.version_number
+                stats["bytes_after"] += len(html.encode("utf-8"))
+            else:
+                version.html_content = None
+                version.delta = delta
+                version.base_version = versions[i - 1].version_number
+                stats["deltas"] += 1
+                stats["bytes_after"] += len(version.delta)
+        db.commit()
+        stats["sites"] += 1
+        stats["versions"] += len(versions)
+    logger.info(
+        f"[Versions] Migrazione: {stats['versions']} versioni di {stats['sites']} siti, "
+        f"{stats['bytes_before']} -> {stats['bytes_after']} byte"
+    )
+    return stats
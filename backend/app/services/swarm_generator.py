@@ -23,14 +23,19 @@ from typing import Dict, Any, Optional, List, Callable, Tuple
 from app.services.kimi_client import kimi, kimi_refine, KimiClient
 from app.services.sanitizer import sanitize_input, sanitize_output, sanitize_refine_input
 from app.services.template_assembler import assembler as _assembler, _SECTION_NAV_LABELS
+from app.services.html_document import parse_html
+from app.services.gsap_engine import ENGINE_SCRIPT_RE, refresh_engine
+from app.services.tailwind_compiler import refresh_compiled_css
+from app.services.tag_scan import ElementPattern, TagPattern
 
 try:
-    from app.services.design_knowledge import get_refine_context, get_collection_stats
+    from app.services.design_knowledge import get_refine_context, get_collection_stats, is_ready as design_knowledge_ready
     _has_design_knowledge = True
 except ImportError:
     _has_design_knowledge = False
     def get_refine_context(*a, **kw): return ""
     def get_collection_stats(): return {}
+    def design_knowledge_ready(): return False
 
 logger = logging.getLogger(__name__)
 
@@ -566,6 +571,13 @@ IMPORTANT:
         HTML is denser than natural text, so we use a lower ratio than the typical 4."""
         return int(len(text) / 3.3)
 
+    # Blocks stripped by _strip_for_refine (tag_scan drivers: linear on
+    # unclosed <style>/<svg>/<script> and on "<!--" without "-->")
+    _GSAP_SCRIPT_RE = ENGINE_SCRIPT_RE
+    _STYLE_BLOCK_RE = ElementPattern(r'<style[^>]*>[\s\S]*?</style>', start='<style')
+    _SVG_BLOCK_RE = ElementPattern(r'(<svg[^>]*>)([\s\S]*?)(</svg>)', start='<svg')
+    _COMMENT_RE = TagPattern(r'<!--(?!\s*__)[^>]*?-->', start='<!--', require='-->')
+
     @staticmethod
     def _strip_for_refine(html: str) -> Tuple[str, Dict[str, Any]]:
         """Aggressively strip heavy content from HTML before sending to Kimi.
@@ -583,43 +595,47 @@ IMPORTANT:
         stash: Dict[str, Any] = {"gsap": "", "styles": [], "svgs": []}
 
         # 1. Strip GSAP Universal Animation Engine script
-        gsap_pattern = r'<script>\s*/\*[\s\S]*?GSAP Universal Animation Engine[\s\S]*?</script>'
-        gsap_match = re.search(gsap_pattern, html)
+        gsap_match = SwarmGenerator._GSAP_SCRIPT_RE.search(html)
         if gsap_match:
             stash["gsap"] = gsap_match.group(0)
             html = html[:gsap_match.start()] + '<!-- __GSAP_PLACEHOLDER__ -->' + html[gsap_match.end():]
             logger.info(f"[Swarm] Stripped GSAP script ({len(stash['gsap'])} chars)")
 
         # 2. Strip all <style> blocks (numbered placeholders)
-        style_pattern = r'<style[^>]*>[\s\S]*?</style>'
-        style_matches = list(re.finditer(style_pattern, html))
-        # Process in reverse so indices stay valid
-        for i, m in enumerate(reversed(style_matches)):
-            idx = len(style_matches) - 1 - i
-            stash["styles"].insert(0, m.group(0))
-            html = html[:m.start()] + f'<!-- __STYLE_{idx}__ -->' + html[m.end():]
-        if style_matches:
-            logger.info(f"[Swarm] Stripped {len(style_matches)} <style> blocks ({sum(len(s) for s in stash['styles'])} chars)")
+        def _stash_style(m):
+            stash["styles"].append(m.group(0))
+            return f'<!-- __STYLE_{len(stash["styles"]) - 1}__ -->'
+
+        html = SwarmGenerator._STYLE_BLOCK_RE.sub(_stash_style, html)
+        if stash["styles"]:
+            logger.info(f"[Swarm] Stripped {len(stash['styles'])} <style> blocks ({sum(len(s) for s in stash['styles'])} chars)")
 
         # 3. Strip SVG content (keep the <svg> tag with attributes but remove inner paths/shapes)
-        svg_pattern = r'(<svg[^>]*>)([\s\S]*?)(</svg>)'
-        svg_matches = list(re.finditer(svg_pattern, html))
-        for i, m in enumerate(reversed(svg_matches)):
-            idx = len(svg_matches) - 1 - i
+        svg_count = 0
+
+        def _stash_svg(m):
+            nonlocal svg_count
+            idx = svg_count
+            svg_count += 1
             inner = m.group(2)
             # Only strip if SVG inner content is substantial (>200 chars)
-            if len(inner) > 200:
-                stash["svgs"].insert(0, {"index": idx, "inner": inner, "open_tag": m.group(1), "close_tag": m.group(3)})
-                html = html[:m.start()] + f'{m.group(1)}<!-- __SVG_INNER_{idx}__ -->{m.group(3)}' + html[m.end():]
+            if len(inner) <= 200:
+                return m.group(0)
+            stash["svgs"].append({"index": idx, "inner": inner, "open_tag": m.group(1), "close_tag": m.group(3)})
+            return f'{m.group(1)}<!-- __SVG_INNER_{idx}__ -->{m.group(3)}'
+
+        html = SwarmGenerator._SVG_BLOCK_RE.sub(_stash_svg, html)
         if stash["svgs"]:
             logger.info(f"[Swarm] Stripped {len(stash['svgs'])} large SVG inners ({sum(len(s['inner']) for s in stash['svgs'])} chars)")
 
         # 4. Strip HTML comments (except our placeholders)
-        html = re.sub(r'<!--(?!\s*__)[^>]*?-->', '', html)
+        html = SwarmGenerator._COMMENT_RE.sub('', html)
 
         # 5. Collapse excessive whitespace: multiple blank lines -> single, trim line whitespace
         html = re.sub(r'\n\s*\n\s*\n', '\n\n', html)  # 3+ blank lines -> 1
-        html = re.sub(r'[ \t]+\n', '\n', html)  # trailing whitespace
+        # trailing whitespace (matched from the start of each run: a run not
+        # followed by a newline is scanned once, not once per character)
+        html = re.sub(r'(?<![ \t])[ \t]+\n', '\n', html)
         html = re.sub(r'\n[ \t]+', '\n', html)  # leading whitespace (careful with pre tags, but HTML templates don't use them)
         html = re.sub(r'  +', ' ', html)  # multiple spaces -> single
 
@@ -651,15 +667,17 @@ IMPORTANT:
                 html = html[:idx] + '\n' + gsap_block + '\n' + html[idx:]
             else:
                 html = html + '\n' + gsap_block
+            # The refine may have added data-animate values: re-shake the engine
+            html = refresh_engine(html)
 
-        return html
+        # ... and classes: recompile the page's Tailwind CSS
+        return refresh_compiled_css(html)
 
     # Keep legacy methods for backward compatibility with any other callers
     @staticmethod
     def _strip_gsap_script(html: str) -> Tuple[str, str]:
         """Legacy: Strip only GSAP script. Use _strip_for_refine for full stripping."""
-        pattern = r'<script>\s*/\*[\s\S]*?GSAP Universal Animation Engine[\s\S]*?</script>'
-        match = re.search(pattern, html)
+        match = ENGINE_SCRIPT_RE.search(html)
         if match:
             gsap_block = match.group(0)
             stripped = html[:match.start()] + '<!-- __GSAP_PLACEHOLDER__ -->' + html[match.end():]
@@ -938,61 +956,23 @@ IMPORTANT:
 
         logger.info(f"[RemoveSection] Removing section: '{section_id}'")
 
-        # 2. Find the section in HTML using balanced tag matching
+        # 2. Find the section in HTML (balanced tags from the shared document parse)
         # Match <section id="X">, <div id="X">, <header id="X">, <footer id="X">
-        pattern = re.compile(
-            rf'<(section|div|header|footer)(\s[^>]*?\bid\s*=\s*["\'](?:[^"\']*\b)?{re.escape(section_id)}(?:\b[^"\']*)?["\'][^>]*)>',
-            re.IGNORECASE,
-        )
-        match = pattern.search(html)
-        if not match:
+        doc = parse_html(html)
+        tags = ("section", "div", "header", "footer")
+        element = doc.find_section(section_id, tags, match="word")
+        if element is None:
             # Try without word boundaries for hyphenated IDs
-            pattern2 = re.compile(
-                rf'<(section|div|header|footer)(\s[^>]*?\bid\s*=\s*["\'][^"\']*{re.escape(section_id)}[^"\']*["\'][^>]*)>',
-                re.IGNORECASE,
-            )
-            match = pattern2.search(html)
+            element = doc.find_section(section_id, tags, match="contains")
 
-        if not match:
+        if element is None:
             return {"success": False, "error": f"Section '{section_id}' not found in HTML"}
 
-        tag_name = match.group(1).lower()
-        start_pos = match.start()
-
-        # 3. Balanced tag matching to find the closing tag
-        depth = 0
-        i = start_pos
-        open_tag_re = re.compile(rf'<{tag_name}[\s>/]', re.IGNORECASE)
-        close_tag_re = re.compile(rf'</{tag_name}\s*>', re.IGNORECASE)
-
-        # First, skip past the opening tag
-        depth = 1
-        i = match.end()
-
-        while i < len(html):
-            # Check for closing tag first
-            close_match = close_tag_re.match(html, i)
-            if close_match:
-                depth -= 1
-                if depth == 0:
-                    end_pos = close_match.end()
-                    break
-                i = close_match.end()
-                continue
-
-            # Check for nested opening tag
-            open_match = open_tag_re.match(html, i)
-            if open_match:
-                # Make sure it's not a self-closing tag
-                tag_end = html.find('>', i)
-                if tag_end != -1 and html[tag_end - 1] != '/':
-                    depth += 1
-                i = (tag_end + 1) if tag_end != -1 else (i + 1)
-                continue
-
-            i += 1
-        else:
+        # 3. Closing tag from balanced tag matching
+        if not element.closed:
             return {"success": False, "error": f"Could not find closing tag for section '{section_id}'"}
+        start_pos = element.start
+        end_pos = element.end
 
         # 4. Remove the section (including surrounding whitespace/newlines)
         # Expand to consume blank lines around the section
@@ -1739,36 +1719,38 @@ Return ONLY valid JSON array, no explanation."""
         Returns the section HTML or None if not found."""
         section_name_lower = section_name.lower().strip()
 
-        # Try multiple patterns to find the section
-        patterns = [
-            # id="hero", id="about", etc.
-            rf'(<(?:section|div|header|footer)[^>]*\bid\s*=\s*["\'](?:[^"\']*\b)?{re.escape(section_name_lower)}(?:\b[^"\']*)?["\'][^>]*>)',
-            # <!-- HERO SECTION --> or <!-- hero -->
-            rf'(<!--\s*{re.escape(section_name_lower)}[\s\w]*-->)',
+        # id="hero", id="hero-main", etc.: the whole element, closing tag included
+        doc = parse_html(html)
+        element = doc.find_section(
+            section_name_lower, ("section", "div", "header", "footer"), match="word"
+        )
+        if element is not None:
+            return doc.slice(element)
+
+        # Fallback: <!-- HERO SECTION --> or <!-- hero --> markers
+        match = re.search(
+            rf'<!--\s*{re.escape(section_name_lower)}[\s\w]*-->', html, re.IGNORECASE
+        )
+        if not match:
+            return None
+        start_pos = match.start()
+        # Find the end of this section (next section or end of body)
+        # Look for next <section, <footer, <!-- next section -->, or </body>
+        end_patterns = [
+            r'<(?:section|footer)[^>]*\bid\s*=\s*["\']',
+            r'<!--\s*(?:end|/)\s',
+            r'</body>',
         ]
+        end_pos = len(html)
+        remaining = html[match.end():]
+        for ep in end_patterns:
+            end_match = re.search(ep, remaining, re.IGNORECASE)
+            if end_match:
+                candidate = match.end() + end_match.start()
+                if candidate < end_pos:
+                    end_pos = candidate
 
-        for pattern in patterns:
-            match = re.search(pattern, html, re.IGNORECASE)
-            if match:
-                start_pos = match.start()
-                # Find the end of this section (next section or end of body)
-                # Look for next <section, <footer, <!-- next section -->, or </body>
-                end_patterns = [
-                    r'<(?:section|footer)[^>]*\bid\s*=\s*["\']',
-                    r'<!--\s*(?:end|/)\s',
-                    r'</body>',
-                ]
-                end_pos = len(html)
-                remaining = html[match.end():]
-                for ep in end_patterns:
-                    end_match = re.search(ep, remaining, re.IGNORECASE)
-                    if end_match:
-                        candidate = match.end() + end_match.start()
-                        if candidate < end_pos:
-                            end_pos = candidate
-
-                return html[start_pos:end_pos]
-        return None
+        return html[start_pos:end_pos]
 
     async def refine(
         self,
@@ -1899,7 +1881,7 @@ Place images in contextually appropriate locations within the HTML."""
 
         # === QUERY CHROMADB for GSAP snippets and design patterns ===
         design_knowledge_context = ""
-        if _has_design_knowledge:
+        if _has_design_knowledge and design_knowledge_ready():
             try:
                 stats = get_collection_stats()
                 if stats.get("total_patterns", 0) > 0:
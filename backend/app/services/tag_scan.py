@@ -0,0 +1,186 @@
+"""
+Tag Scan — linear-time drivers for the hot-path tag regexes.
+
+The post-processing and QC agents rewrite tags with regexes such as
+
+    (<a\\b)(?![^>]*data-animate)([^>]*(?:btn|cta)[^>]*>)
+    (<h[12][^>]*?)data-animate="text-split"([^>]*)
+    <style[^>]*>[\\s\\S]*?</style>
+
+Python's re tries every '<a' / '<style' in the page, and each attempt scans
+up to the next '>' or closing tag. On a well-formed page that is one short
+scan per tag, but when the attempts fail the scans overlap: a tag without
+'>' (truncated AI output) makes every later start scan to the end of the
+document, and so does a '<style>' without '</style>'; '<a' repeated inside
+a 1 MB attribute re-scans the attribute once per occurrence. The time then
+grows with the square of the page size.
+
+The drivers below run the same regex but only at starts that can match,
+with conditions that are computed once per tag span:
+
+- TagPattern: regexes anchored on one start tag whose match cannot cross
+  the tag's first '>' before the required parts. A start is tried only if
+  the span up to that '>' has no `exclude` match and has a `require`
+  match; both are looked up once per span.
+- ElementPattern: regexes of the form <name ...>...</name> that, once
+  they fail at one start, fail at every later one (nothing to close them).
+  The scan stops at the first failure.
+
+Matches are produced by the original regex at the original offsets, so
+finditer()/sub()/search() return the same re.Match objects as the plain
+pattern; tests/test_regex_performance.py checks this against random pages.
+
+Usage:
+    from app.services.tag_scan import TagPattern
+    CTA = TagPattern(r'(<a\\b)(?![^>]*data-animate)([^>]*(?:btn|cta)[^>]*>)',
+                     start=r'<a\\b', exclude='data-animate', require='btn|cta',
+                     flags=re.IGNORECASE)
+    html = CTA.sub(lambda m: f'{m.group(1)} data-animate="magnetic"{m.group(2)}', html)
+"""
+
+import re
+from typing import Callable, Iterator, List, Match, Optional, Pattern, Union
+
+Repl = Union[str, Callable[["Match[str]"], str]]
+
+
+def _sub(matches: Iterator["Match[str]"], repl: Repl, html: str) -> str:
+    """Rebuild html once with every match replaced (like Pattern.sub)."""
+    parts: List[str] = []
+    pos = 0
+    for m in matches:
+        parts.append(html[pos:m.start()])
+        parts.append(repl(m) if callable(repl) else m.expand(repl))
+        pos = m.end()
+    if not parts:
+        return html
+    parts.append(html[pos:])
+    return "".join(parts)
+
+
+class _ScanPattern:
+    """search()/sub() on top of a subclass's finditer()."""
+
+    pattern: Pattern[str]
+
+    def finditer(self, html: str) -> Iterator["Match[str]"]:
+        raise NotImplementedError
+
+    def search(self, html: str) -> Optional["Match[str]"]:
+        return next(self.finditer(html), None)
+
+    def sub(self, repl: Repl, html: str) -> str:
+        return _sub(self.finditer(html), repl, html)
+
+
+class TagPattern(_ScanPattern):
+    """
+    finditer()/search()/sub() for a regex that starts with `start` and, up to the
+    first '>' after it, needs `require` and must not contain `exclude`.
+
+    closed=True: the regex needs that '>' (a start with no '>' after it, and
+    every later start, is skipped). closed=False: a start with no '>' after
+    it spans to the end of the document.
+    """
+
+    def __init__(
+        self,
+        pattern: str,
+        start: str,
+        exclude: Optional[str] = None,
+        require: Optional[str] = None,
+        closed: bool = True,
+        flags: int = 0,
+    ) -> None:
+        self.pattern = re.compile(pattern, flags)
+        self._start = re.compile(start, flags)
+        self._exclude = re.compile(exclude, flags) if exclude else None
+        self._require = re.compile(require, flags) if require else None
+        self.closed = closed
+
+    def finditer(self, html: str) -> Iterator["Match[str]"]:
+        n = len(html)
+        pos = 0
+        span_end = -1
+        last_exclude = last_require = -1
+        while True:
+            s = self._start.search(html, pos)
+            if not s:
+                return
+            start, body = s.start(), s.end()
+            if start > span_end:
+                # First start in a new tag span: look the span up once
+                span_end = html.find(">", body)
+                if span_end < 0:
+                    if self.closed:
+                        return
+                    span_end = n
+                last_exclude = self._last_start(self._exclude, html, body, span_end) if self._exclude else -1
+                last_require = self._last_start(self._require, html, body, span_end) if self._require else n
+            # Later starts in the same span see a suffix of it
+            if last_exclude < body <= last_require:
+                m = self.pattern.match(html, start)
+                if m:
+                    yield m
+                    pos = max(m.end(), start + 1)
+                    continue
+            pos = start + 1
+
+    @staticmethod
+    def _last_start(pattern: Pattern[str], html: str, lo: int, span_end: int) -> int:
+        """Last position in [lo, span_end] where pattern matches, -1 if none."""
+        end = min(span_end + 1, len(html))
+        last = -1
+        m = pattern.search(html, lo, end)
+        while m:
+            last = m.start()
+            m = pattern.search(html, last + 1, end)
+        return last
+
+
+class ElementPattern(_ScanPattern):
+    """
+    finditer()/sub()/search() for a regex matching a whole element
+    (<name ...>...</name>) that fails at every start after a failed one.
+
+    `start` finds the candidate starts (for alternations, group "name" tells
+    the branches apart: a failed branch only stops starts with that name).
+    """
+
+    def __init__(self, pattern: str, start: str, flags: int = 0) -> None:
+        self.pattern = re.compile(pattern, flags)
+        self._start = re.compile(start, flags)
+
+    def finditer(self, html: str) -> Iterator["Match[str]"]:
+        named = "name" in self._start.groupindex
+        dead = set()
+        pos = 0
+        while True:
+            s = self._start.search(html, pos)
+            if not s:
+                return
+            name = s.group("name").lower() if named else ""
+            if name in dead:
+                pos = s.start() + 1
+                continue
+            m = self.pattern.match(html, s.start())
+            if m:
+                yield m
+                pos = max(m.end(), s.start() + 1)
+                continue
+            if not named:
+                return
+            dead.add(name)
+            pos = s.start() + 1
+
+
+def sub_closed_tags(pattern: Pattern[str], repl: str, html: str) -> str:
+    """
+    pattern.sub() for regexes like <[^>]+> that need a '>' after the start:
+    text after the last '>' can't match and is left as it is, so no start
+    scans to the end of the document.
+    """
+    last = html.rfind(">")
+    if last < 0:
+        return html
+    return pattern.sub(repl, html[:last + 1]) + html[last + 1:]
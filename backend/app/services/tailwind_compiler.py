@@ -0,0 +1,1527 @@
+"""
+Tailwind Compiler — per-page Tailwind CSS compiled at assembly time.
+
+The head template loaded https://cdn.tailwindcss.com: the browser downloads
+the Tailwind JIT (~110 KB of JS), scans the DOM and builds the stylesheet on
+every page view, with the page unstyled until it has run. The CDN build is
+documented as not meant for production.
+
+compile_page() does that work once, when the page is assembled:
+
+- class names are collected from class="..." attributes and from the
+  string literals of classList.add/remove/toggle/replace and className
+  assignments in inline scripts (menus toggling "hidden", "active", ...)
+- a tailwind.config = {...} script on the page is read (theme.extend colors
+  and fontFamily, darkMode), like the CDN build does
+- the CSS for those classes is generated from the vendored Tailwind v3.4
+  build in components/tailwind/ (theme.json: default theme; preflight.css:
+  base layer) by the utility/variant port below
+- the CDN <script> is replaced, at the same position, by
+  <style data-tailwind="compiled"> (so the head template's own <style>
+  blocks after it still override preflight, as they did the injected CDN
+  styles) and the config and console.warn-suppression scripts are dropped
+
+The port covers the core utilities and variants Tailwind v3.4 documents,
+with arbitrary values/variants/properties, opacity modifiers, negative and
+!important utilities, and sorts rules like Tailwind (layer, then variants
+in registration order, then utility order). Class names that are not
+Tailwind utilities (template classes like "blog__item", unknown variants
+like "xxl:") get no CSS, as with the CDN. A class with an arbitrary value or
+variant the port can't compile keeps the whole page on the CDN (logged), so
+a page is never served with missing styles.
+
+The compiled <style> starts with the license comment and a
+/* tailwind.config: {...} */ line with the page's config, read by
+refresh_compiled_css() to recompile after QC fixes or an AI refine changed
+the page's classes.
+
+Usage:
+    from app.services.tailwind_compiler import compile_page, refresh_compiled_css
+    html = compile_page(html)            # CDN script -> compiled <style>
+    html = refresh_compiled_css(html)    # after class edits
+"""
+
+import html as html_lib
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+from app.services.tag_scan import ElementPattern
+
+logger = logging.getLogger(__name__)
+
+TAILWIND_DIRNAME = "tailwind"
+THEME_FILENAME = "theme.json"
+PREFLIGHT_FILENAME = "preflight.css"
+CDN_URL = "https://cdn.tailwindcss.com"
+
+_DEFAULT_TAILWIND_DIR = Path(__file__).parent.parent / "components" / TAILWIND_DIRNAME
+
+# Every <script> element (classified by _classify_script) and the compiled <style>
+_SCRIPT_RE = ElementPattern(r"<script\b([^>]*)>([\s\S]*?)</script\s*>", start=r"<script\b", flags=re.IGNORECASE)
+COMPILED_STYLE_RE = ElementPattern(
+    r'<style data-tailwind="compiled">([\s\S]*?)</style>',
+    start=r'<style data-tailwind="compiled">',
+)
+_CDN_SRC_RE = re.compile(r"""\bsrc\s*=\s*["']?https?://cdn\.tailwindcss\.com""", re.IGNORECASE)
+_CONFIG_RE = re.compile(r"^\s*tailwind\.config\s*=\s*(\{[\s\S]*\})\s*;?\s*$")
+_CONFIG_LINE_RE = re.compile(r"/\* tailwind\.config: (.*?) \*/")
+
+_CLASS_ATTR_RE = re.compile(r"""\sclass\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+_CLASS_CALL_RE = re.compile(r"""(?:classList\.(?:add|remove|toggle|replace)|className\s*\+?=)\s*\(?([^;\n)]*)""")
+_JS_STRING_RE = re.compile(r"""'([^'\\\n]*)'|"([^"\\\n]*)"|`([^`\\$]*)`""")
+
+Decls = List[Tuple[str, str]]
+
+
+# ---------------------------------------------------------------------------
+# Vendored theme and value helpers
+# ---------------------------------------------------------------------------
+
+_LENGTH_RE = re.compile(
+    r"^-?(?:\d+\.?\d*|\.\d+)(?:%|px|r?em|ex|ch|vw|vh|vmin|vmax|[sld]v[hw]|cq[whib]|cqmin|cqmax|cm|mm|in|pt|pc)?$"
+)
+_MATH_FN_RE = re.compile(r"^(?:calc|min|max|clamp)\(")
+_NUMBER_RE = re.compile(r"^-?(?:\d+\.?\d*|\.\d+)$")
+_HEX_RE = re.compile(r"^#([0-9a-fA-F]{3,4}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})$")
+_RGB_FN_RE = re.compile(r"^rgba?\(\s*([\d.]+)[\s,]+([\d.]+)[\s,]+([\d.]+)\s*\)$")
+_CALC_OP_RE = re.compile(r"(?<=[\d%)])([+-])(?=[\d(.])")
+_COLOR_FNS = ("rgb(", "rgba(", "hsl(", "hsla(", "hwb(", "lab(", "lch(", "oklab(", "oklch(", "color(", "color-mix(")
+_NAMED_COLORS = {
+    "transparent", "currentcolor", "black", "white", "red", "green", "blue", "yellow", "orange", "purple",
+    "pink", "gray", "grey", "silver", "gold", "navy", "teal", "maroon", "olive", "lime", "aqua", "fuchsia",
+    "inherit",
+}
+
+
+def _decode_arbitrary(value: str) -> str:
+    """[...] contents as CSS: '_' is a space ('\\_' an underscore), spaced calc operators."""
+    if value.startswith("url("):
+        return value
+    out = re.sub(r"(?<!\\)_", " ", value).replace("\\_", "_")
+    if "calc(" in out:
+        out = _CALC_OP_RE.sub(r" \1 ", out)
+    return out
+
+
+def _is_length(value: str) -> bool:
+    return bool(_LENGTH_RE.match(value) or _MATH_FN_RE.match(value))
+
+
+def _is_color(value: str) -> bool:
+    lower = value.lower()
+    return bool(_HEX_RE.match(value)) or lower.startswith(_COLOR_FNS) or lower in _NAMED_COLORS
+
+
+def _rgb_channels(color: str) -> Optional[Tuple[str, Optional[str]]]:
+    """'#ef4444' -> ('239 68 68', None), '#ef444480' -> (.., '0.502'); None if not parseable."""
+    m = _HEX_RE.match(color)
+    if m:
+        digits = m.group(1)
+        if len(digits) in (3, 4):
+            digits = "".join(ch * 2 for ch in digits)
+        channels = " ".join(str(int(digits[i:i + 2], 16)) for i in (0, 2, 4))
+        alpha = f"{int(digits[6:8], 16) / 255:.3g}" if len(digits) == 8 else None
+        return channels, alpha
+    m = _RGB_FN_RE.match(color)
+    if m:
+        return " ".join(m.groups()), None
+    return None
+
+
+def _negate(value: str) -> Optional[str]:
+    if value in ("0", "0px", "0%", "0rem"):
+        return value
+    if value.startswith(("calc(", "var(", "min(", "max(", "clamp(")):
+        return f"calc({value} * -1)"
+    if value.startswith("-"):
+        return value[1:]
+    if value[:1].isdigit() or value[:1] == ".":
+        return f"-{value}"
+    return None
+
+
+def escape_class(name: str) -> str:
+    """CSS selector for a class name: '.md\\:w-1\\/2'."""
+    out = []
+    for i, ch in enumerate(name):
+        if ch.isalnum() and ch.isascii() or ch in "-_" or not ch.isascii():
+            if ch.isdigit() and (i == 0 or (i == 1 and name[0] == "-")):
+                out.append(f"\\3{ch} ")
+            else:
+                out.append(ch)
+        else:
+            out.append("\\" + ch)
+    return "." + "".join(out)
+
+
+def _split_top(text: str, sep: str) -> List[str]:
+    """Split on sep outside [...] and (...)."""
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch in "[(":
+            depth += 1
+        elif ch in "])":
+            depth -= 1
+        elif ch == sep and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+class _Value(NamedTuple):
+    raw: str                 # text after "root-" ("DEFAULT" for the bare root)
+    arbitrary: Optional[str]  # decoded [...] contents
+    hint: Optional[str]       # [length:...] / [color:...] type hint
+    modifier: Optional[str]   # text after the last top-level '/'
+
+
+def _parse_value(raw: str, modifier: Optional[str] = None) -> _Value:
+    if raw.startswith("[") and raw.endswith("]") and len(raw) > 2:
+        inner = raw[1:-1]
+        hint = None
+        m = re.match(r"^(length|color|url|image|percentage|number|position|size|family-name|line-width|shadow|any):", inner)
+        if m:
+            hint, inner = m.group(1), inner[m.end():]
+        return _Value(raw, _decode_arbitrary(inner), hint, modifier)
+    if raw.startswith("(") or "[" in raw:
+        return _Value(raw, None, "invalid", modifier)
+    return _Value(raw, None, None, modifier)
+
+
+# ---------------------------------------------------------------------------
+# Utilities (Tailwind v3.4 core plugins, in registration order)
+# ---------------------------------------------------------------------------
+
+class _Out(NamedTuple):
+    decls: Decls
+    selector: str = "&"           # '&' is the class selector with its variants
+    media: Tuple[str, ...] = ()   # extra at-rules (container)
+    keyframes: Optional[str] = None
+
+
+Handler = Callable[["_Generator", _Value, bool], Optional[Union[Decls, List[_Out]]]]
+
+_STATIC: Dict[str, Tuple[int, int, List[_Out]]] = {}
+_FUNCTIONAL: Dict[str, List[Tuple[int, Handler]]] = {}
+_COMPONENTS: Set[str] = {"container"}
+_order = [0]
+
+
+def _decls(text: str) -> Decls:
+    return [tuple(part.split(":", 1)) for part in text.split(";") if part]  # type: ignore[misc]
+
+
+def _static(utilities: Dict[str, str], selector: str = "&") -> None:
+    """Register a plugin of fixed utilities: {"flex": "display:flex", ...}."""
+    index = _order[0]
+    _order[0] += 1
+    for position, (name, text) in enumerate(utilities.items()):
+        _STATIC[name] = (index, position, [_Out(_decls(text), selector)])
+
+
+def _functional(*roots: str) -> Callable[[Handler], Handler]:
+    """Register a value plugin under one or more roots (same sort index)."""
+    def register(handler: Handler) -> Handler:
+        index = _order[0]
+        _order[0] += 1
+        for root in roots:
+            _FUNCTIONAL.setdefault(root, []).append((index, handler))
+        return handler
+    return register
+
+
+def _scale(root_props: Dict[str, Tuple[str, ...]], scale: Callable[["_Generator"], Dict[str, str]],
+           negative: bool = False, types: Tuple[str, ...] = ("length",)) -> None:
+    """One plugin per root: root-{key} sets every property of the root to the scale value."""
+    for root, props in root_props.items():
+        def handler(gen: "_Generator", value: _Value, neg: bool, props=props) -> Optional[Decls]:
+            resolved = gen.lookup(scale(gen), value, types)
+            if resolved is None or (neg and not negative):
+                return None
+            if neg:
+                resolved = _negate(resolved)
+                if resolved is None:
+                    return None
+            return [(prop, resolved) for prop in props]
+        _functional(root)(handler)
+
+
+def _keywords(*names: str, prefix: str = "", prop: str, values: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    values = list(values) if values is not None else list(names)
+    return {f"{prefix}{name}": f"{prop}:{value}" for name, value in zip(names, values)}
+
+
+def _spacing(gen: "_Generator") -> Dict[str, str]:
+    return gen.theme["spacing"]
+
+
+def _with(*extra: Dict[str, str], base: Callable[["_Generator"], Dict[str, str]] = _spacing):
+    def scale(gen: "_Generator") -> Dict[str, str]:
+        merged = dict(base(gen))
+        for part in extra:
+            merged.update(gen.theme[part] if isinstance(part, str) else part)
+        return merged
+    return scale
+
+
+def _theme_key(key: str) -> Callable[["_Generator"], Dict[str, str]]:
+    return lambda gen: gen.theme[key]
+
+
+_SIZE_KEYWORDS = {"auto": "auto", "full": "100%", "min": "min-content", "max": "max-content", "fit": "fit-content"}
+_TRANSFORM = (
+    "translate(var(--tw-translate-x), var(--tw-translate-y)) rotate(var(--tw-rotate)) "
+    "skewX(var(--tw-skew-x)) skewY(var(--tw-skew-y)) scaleX(var(--tw-scale-x)) scaleY(var(--tw-scale-y))"
+)
+_FILTER = (
+    "var(--tw-blur) var(--tw-brightness) var(--tw-contrast) var(--tw-grayscale) var(--tw-hue-rotate) "
+    "var(--tw-invert) var(--tw-saturate) var(--tw-sepia) var(--tw-drop-shadow)"
+)
+_BACKDROP_FILTER = (
+    "var(--tw-backdrop-blur) var(--tw-backdrop-brightness) var(--tw-backdrop-contrast) "
+    "var(--tw-backdrop-grayscale) var(--tw-backdrop-hue-rotate) var(--tw-backdrop-invert) "
+    "var(--tw-backdrop-opacity) var(--tw-backdrop-saturate) var(--tw-backdrop-sepia)"
+)
+_NUMERIC = (
+    "var(--tw-ordinal) var(--tw-slashed-zero) var(--tw-numeric-figure) "
+    "var(--tw-numeric-spacing) var(--tw-numeric-fraction)"
+)
+_CHILDREN = "& > :not([hidden]) ~ :not([hidden])"
+_BLEND_MODES = (
+    "normal", "multiply", "screen", "overlay", "darken", "lighten", "color-dodge", "color-burn", "hard-light",
+    "soft-light", "difference", "exclusion", "hue", "saturation", "color", "luminosity", "plus-darker",
+    "plus-lighter",
+)
+_POSITIONS = {
+    "bottom": "bottom", "center": "center", "left": "left", "left-bottom": "left bottom",
+    "left-top": "left top", "right": "right", "right-bottom": "right bottom", "right-top": "right top",
+    "top": "top",
+}
+
+
+def _register_utilities() -> None:
+    # container (components layer), sr-only, pointer-events, visibility, position
+    @_functional("container")
+    def container(gen: "_Generator", value: _Value, neg: bool) -> Optional[List[_Out]]:
+        if value.raw != "DEFAULT" or neg:
+            return None
+        return [_Out([("width", "100%")])] + [
+            _Out([("max-width", width)], media=(f"@media (min-width: {width})",))
+            for width in gen.theme["screens"].values()
+        ]
+
+    _static({
+        "sr-only": "position:absolute;width:1px;height:1px;padding:0;margin:-1px;overflow:hidden;"
+                   "clip:rect(0, 0, 0, 0);white-space:nowrap;border-width:0",
+        "not-sr-only": "position:static;width:auto;height:auto;padding:0;margin:0;overflow:visible;"
+                       "clip:auto;white-space:normal",
+    })
+    _static(_keywords("none", "auto", prefix="pointer-events-", prop="pointer-events"))
+    _static(_keywords("visible", "invisible", "collapse", prop="visibility", values=("visible", "hidden", "collapse")))
+    _static(_keywords("static", "fixed", "absolute", "relative", "sticky", prop="position"))
+
+    inset = _with({"auto": "auto", "full": "100%"}, "fractions")
+    _scale({"inset": ("inset",)}, inset, negative=True)
+    _scale({"inset-x": ("left", "right"), "inset-y": ("top", "bottom")}, inset, negative=True)
+    _scale({"start": ("inset-inline-start",), "end": ("inset-inline-end",), "top": ("top",),
+            "right": ("right",), "bottom": ("bottom",), "left": ("left",)}, inset, negative=True)
+    _static({"isolate": "isolation:isolate", "isolation-auto": "isolation:auto"})
+    _scale({"z": ("z-index",)}, _theme_key("zIndex"), negative=True, types=("number",))
+    _scale({"order": ("order",)}, lambda gen: dict({str(i): str(i) for i in range(1, 13)},
+                                                    first="-9999", last="9999", none="0"),
+           negative=True, types=("number",))
+
+    # grid placement
+    spans = {str(i): f"span {i} / span {i}" for i in range(1, 13)}
+    _static({"col-auto": "grid-column:auto", "col-span-full": "grid-column:1 / -1"})
+    _scale({"col-span": ("grid-column",)}, lambda gen: spans, types=("any",))
+    _scale({"col": ("grid-column",)}, lambda gen: {}, types=("any",))
+    lines = dict({str(i): str(i) for i in range(1, 14)}, auto="auto")
+    _scale({"col-start": ("grid-column-start",)}, lambda gen: lines, negative=True, types=("number", "any"))
+    _scale({"col-end": ("grid-column-end",)}, lambda gen: lines, negative=True, types=("number", "any"))
+    _static({"row-auto": "grid-row:auto", "row-span-full": "grid-row:1 / -1"})
+    _scale({"row-span": ("grid-row",)}, lambda gen: spans, types=("any",))
+    _scale({"row": ("grid-row",)}, lambda gen: {}, types=("any",))
+    _scale({"row-start": ("grid-row-start",)}, lambda gen: lines, negative=True, types=("number", "any"))
+    _scale({"row-end": ("grid-row-end",)}, lambda gen: lines, negative=True, types=("number", "any"))
+    _static(_keywords("start", "end", "right", "left", "none", prefix="float-", prop="float",
+                      values=("inline-start", "inline-end", "right", "left", "none")))
+    _static(_keywords("start", "end", "left", "right", "both", "none", prefix="clear-", prop="clear",
+                      values=("inline-start", "inline-end", "left", "right", "both", "none")))
+
+    # margin
+    margin = _with({"auto": "auto"})
+    _scale({"m": ("margin",)}, margin, negative=True)
+    _scale({"mx": ("margin-left", "margin-right"), "my": ("margin-top", "margin-bottom")}, margin, negative=True)
+    _scale({"ms": ("margin-inline-start",), "me": ("margin-inline-end",), "mt": ("margin-top",),
+            "mr": ("margin-right",), "mb": ("margin-bottom",), "ml": ("margin-left",)}, margin, negative=True)
+    _static({"box-border": "box-sizing:border-box", "box-content": "box-sizing:content-box"})
+
+    @_functional("line-clamp")
+    def line_clamp(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        if value.raw == "none":
+            return _decls("overflow:visible;display:block;-webkit-box-orient:horizontal;-webkit-line-clamp:none")
+        lines_ = gen.lookup(gen.theme["lineClamp"], value, ("number",))
+        if lines_ is None or neg:
+            return None
+        return _decls(f"overflow:hidden;display:-webkit-box;-webkit-box-orient:vertical;-webkit-line-clamp:{lines_}")
+
+    _static({
+        "block": "display:block", "inline-block": "display:inline-block", "inline": "display:inline",
+        "flex": "display:flex", "inline-flex": "display:inline-flex", "table": "display:table",
+        "inline-table": "display:inline-table", "table-caption": "display:table-caption",
+        "table-cell": "display:table-cell", "table-column": "display:table-column",
+        "table-column-group": "display:table-column-group", "table-footer-group": "display:table-footer-group",
+        "table-header-group": "display:table-header-group", "table-row-group": "display:table-row-group",
+        "table-row": "display:table-row", "flow-root": "display:flow-root", "grid": "display:grid",
+        "inline-grid": "display:inline-grid", "contents": "display:contents", "list-item": "display:list-item",
+        "hidden": "display:none",
+    })
+    _scale({"aspect": ("aspect-ratio",)}, _theme_key("aspectRatio"), types=("any",))
+
+    # sizing
+    viewport = {"screen": "100vh", "svh": "100svh", "lvh": "100lvh", "dvh": "100dvh"}
+    _scale({"size": ("width", "height")}, _with(_SIZE_KEYWORDS, "fractions"))
+    _scale({"h": ("height",)}, _with(_SIZE_KEYWORDS, viewport, "fractions"))
+    _scale({"max-h": ("max-height",)}, _with(_SIZE_KEYWORDS, viewport, {"none": "none"}))
+    _scale({"min-h": ("min-height",)}, _with(_SIZE_KEYWORDS, viewport))
+    _scale({"w": ("width",)}, _with(_SIZE_KEYWORDS, "fractions", "width_fractions",
+                                    {"screen": "100vw", "svw": "100svw", "lvw": "100lvw", "dvw": "100dvw"}))
+    _scale({"min-w": ("min-width",)}, _with(_SIZE_KEYWORDS))
+    _scale({"max-w": ("max-width",)}, _with("maxWidth"))
+
+    # flex
+    _scale({"flex": ("flex",)}, lambda gen: {"1": "1 1 0%", "auto": "1 1 auto", "initial": "0 1 auto", "none": "none"},
+           types=("any",))
+    for root in ("flex-shrink", "shrink"):
+        _scale({root: ("flex-shrink",)}, lambda gen: {"DEFAULT": "1", "0": "0"}, types=("number",))
+    for root in ("flex-grow", "grow"):
+        _scale({root: ("flex-grow",)}, lambda gen: {"DEFAULT": "1", "0": "0"}, types=("number",))
+    _scale({"basis": ("flex-basis",)}, _with(_SIZE_KEYWORDS, "fractions", "width_fractions"))
+    _static({"table-auto": "table-layout:auto", "table-fixed": "table-layout:fixed"})
+    _static({"caption-top": "caption-side:top", "caption-bottom": "caption-side:bottom"})
+    _static({"border-collapse": "border-collapse:collapse", "border-separate": "border-collapse:separate"})
+    _scale({"origin": ("transform-origin",)}, lambda gen: {
+        "center": "center", "top": "top", "top-right": "top right", "right": "right",
+        "bottom-right": "bottom right", "bottom": "bottom", "bottom-left": "bottom left", "left": "left",
+        "top-left": "top left"}, types=("any",))
+
+    # transforms
+    translate = _with({"full": "100%"}, "fractions")
+    for root, var in (("translate-x", "--tw-translate-x"), ("translate-y", "--tw-translate-y")):
+        _transform_plugin(root, (var,), translate)
+    for root, var in (("rotate", "--tw-rotate"),):
+        _transform_plugin(root, (var,), _theme_key("rotate"), types=("any",))
+    for root, var in (("skew-x", "--tw-skew-x"), ("skew-y", "--tw-skew-y")):
+        _transform_plugin(root, (var,), _theme_key("skew"), types=("any",))
+    _transform_plugin("scale", ("--tw-scale-x", "--tw-scale-y"), _theme_key("scale"), types=("number", "any"))
+    _transform_plugin("scale-x", ("--tw-scale-x",), _theme_key("scale"), types=("number", "any"))
+    _transform_plugin("scale-y", ("--tw-scale-y",), _theme_key("scale"), types=("number", "any"))
+    _static({
+        "transform": f"transform:{_TRANSFORM}",
+        "transform-cpu": f"transform:{_TRANSFORM}",
+        "transform-gpu": "transform:" + _TRANSFORM.replace(
+            "translate(var(--tw-translate-x), var(--tw-translate-y))",
+            "translate3d(var(--tw-translate-x), var(--tw-translate-y), 0)"),
+        "transform-none": "transform:none",
+    })
+
+    @_functional("animate")
+    def animate(gen: "_Generator", value: _Value, neg: bool) -> Optional[List[_Out]]:
+        animation = gen.lookup(gen.theme["animation"], value, ("any",))
+        if animation is None or neg:
+            return None
+        name = animation.split(" ", 1)[0]
+        frames = gen.theme["keyframes"].get(name)
+        return [_Out([("animation", animation)], keyframes=f"@keyframes {name}{{{frames}}}" if frames else None)]
+
+    _static(_keywords(
+        "auto", "default", "pointer", "wait", "text", "move", "help", "not-allowed", "none", "context-menu",
+        "progress", "cell", "crosshair", "vertical-text", "alias", "copy", "no-drop", "grab", "grabbing",
+        "all-scroll", "col-resize", "row-resize", "n-resize", "e-resize", "s-resize", "w-resize", "ne-resize",
+        "nw-resize", "se-resize", "sw-resize", "ew-resize", "ns-resize", "nesw-resize", "nwse-resize",
+        "zoom-in", "zoom-out", prefix="cursor-", prop="cursor"))
+    _static(_keywords("auto", "none", "manipulation", "pan-x", "pan-y", "pinch-zoom", prefix="touch-",
+                      prop="touch-action", values=("auto", "none", "manipulation", "pan-x", "pan-y", "pinch-zoom")))
+    _static(_keywords("none", "text", "all", "auto", prefix="select-", prop="user-select"))
+    _static({"resize-none": "resize:none", "resize-y": "resize:vertical", "resize-x": "resize:horizontal",
+             "resize": "resize:both"})
+    _static({
+        "snap-none": "scroll-snap-type:none",
+        "snap-x": "scroll-snap-type:x var(--tw-scroll-snap-strictness)",
+        "snap-y": "scroll-snap-type:y var(--tw-scroll-snap-strictness)",
+        "snap-both": "scroll-snap-type:both var(--tw-scroll-snap-strictness)",
+        "snap-mandatory": "--tw-scroll-snap-strictness:mandatory",
+        "snap-proximity": "--tw-scroll-snap-strictness:proximity",
+    })
+    _static({"snap-start": "scroll-snap-align:start", "snap-end": "scroll-snap-align:end",
+             "snap-center": "scroll-snap-align:center", "snap-align-none": "scroll-snap-align:none"})
+    _static({"snap-normal": "scroll-snap-stop:normal", "snap-always": "scroll-snap-stop:always"})
+    _scale({"scroll-m": ("scroll-margin",), "scroll-mx": ("scroll-margin-left", "scroll-margin-right"),
+            "scroll-my": ("scroll-margin-top", "scroll-margin-bottom"), "scroll-mt": ("scroll-margin-top",),
+            "scroll-mr": ("scroll-margin-right",), "scroll-mb": ("scroll-margin-bottom",),
+            "scroll-ml": ("scroll-margin-left",)}, _spacing, negative=True)
+    _scale({"scroll-p": ("scroll-padding",), "scroll-px": ("scroll-padding-left", "scroll-padding-right"),
+            "scroll-py": ("scroll-padding-top", "scroll-padding-bottom"), "scroll-pt": ("scroll-padding-top",),
+            "scroll-pr": ("scroll-padding-right",), "scroll-pb": ("scroll-padding-bottom",),
+            "scroll-pl": ("scroll-padding-left",)}, _spacing)
+    _static({"list-inside": "list-style-position:inside", "list-outside": "list-style-position:outside"})
+    _scale({"list": ("list-style-type",)}, lambda gen: {"none": "none", "disc": "disc", "decimal": "decimal"},
+           types=("any",))
+    _static({"appearance-none": "appearance:none", "appearance-auto": "appearance:auto"})
+    _scale({"columns": ("columns",)}, _theme_key("columns"), types=("number", "length"))
+    _static(_keywords("auto", "avoid", "avoid-page", "avoid-column", prefix="break-inside-", prop="break-inside"))
+    _scale({"auto-cols": ("grid-auto-columns",)}, lambda gen: {
+        "auto": "auto", "min": "min-content", "max": "max-content", "fr": "minmax(0, 1fr)"}, types=("any",))
+    _static({"grid-flow-row": "grid-auto-flow:row", "grid-flow-col": "grid-auto-flow:column",
+             "grid-flow-dense": "grid-auto-flow:dense", "grid-flow-row-dense": "grid-auto-flow:row dense",
+             "grid-flow-col-dense": "grid-auto-flow:column dense"})
+    _scale({"auto-rows": ("grid-auto-rows",)}, lambda gen: {
+        "auto": "auto", "min": "min-content", "max": "max-content", "fr": "minmax(0, 1fr)"}, types=("any",))
+    tracks = dict({str(i): f"repeat({i}, minmax(0, 1fr))" for i in range(1, 13)}, none="none", subgrid="subgrid")
+    _scale({"grid-cols": ("grid-template-columns",)}, lambda gen: tracks, types=("any",))
+    _scale({"grid-rows": ("grid-template-rows",)}, lambda gen: tracks, types=("any",))
+    _static({"flex-row": "flex-direction:row", "flex-row-reverse": "flex-direction:row-reverse",
+             "flex-col": "flex-direction:column", "flex-col-reverse": "flex-direction:column-reverse"})
+    _static({"flex-wrap": "flex-wrap:wrap", "flex-wrap-reverse": "flex-wrap:wrap-reverse",
+             "flex-nowrap": "flex-wrap:nowrap"})
+    _static(_keywords("center", "start", "end", "between", "around", "evenly", "baseline", "stretch",
+                      prefix="place-content-", prop="place-content",
+                      values=("center", "start", "end", "space-between", "space-around", "space-evenly",
+                              "baseline", "stretch")))
+    _static(_keywords("start", "end", "center", "baseline", "stretch", prefix="place-items-", prop="place-items"))
+    _static(_keywords("normal", "center", "start", "end", "between", "around", "evenly", "baseline", "stretch",
+                      prefix="content-", prop="align-content",
+                      values=("normal", "center", "flex-start", "flex-end", "space-between", "space-around",
+                              "space-evenly", "baseline", "stretch")))
+    _static(_keywords("start", "end", "center", "baseline", "stretch", prefix="items-", prop="align-items",
+                      values=("flex-start", "flex-end", "center", "baseline", "stretch")))
+    _static(_keywords("normal", "start", "end", "center", "between", "around", "evenly", "stretch",
+                      prefix="justify-", prop="justify-content",
+                      values=("normal", "flex-start", "flex-end", "center", "space-between", "space-around",
+                              "space-evenly", "stretch")))
+    _static(_keywords("start", "end", "center", "stretch", prefix="justify-items-", prop="justify-items"))
+    _scale({"gap": ("gap",)}, _spacing)
+    _scale({"gap-x": ("column-gap",), "gap-y": ("row-gap",)}, _spacing)
+
+    @_functional("space-x")
+    def space_x(gen: "_Generator", value: _Value, neg: bool) -> Optional[List[_Out]]:
+        if value.raw == "reverse":
+            return [_Out([("--tw-space-x-reverse", "1")], _CHILDREN)]
+        size = gen.signed(_spacing(gen), value, neg)
+        if size is None:
+            return None
+        return [_Out([("--tw-space-x-reverse", "0"),
+                      ("margin-right", f"calc({size} * var(--tw-space-x-reverse))"),
+                      ("margin-left", f"calc({size} * calc(1 - var(--tw-space-x-reverse)))")], _CHILDREN)]
+
+    @_functional("space-y")
+    def space_y(gen: "_Generator", value: _Value, neg: bool) -> Optional[List[_Out]]:
+        if value.raw == "reverse":
+            return [_Out([("--tw-space-y-reverse", "1")], _CHILDREN)]
+        size = gen.signed(_spacing(gen), value, neg)
+        if size is None:
+            return None
+        return [_Out([("--tw-space-y-reverse", "0"),
+                      ("margin-top", f"calc({size} * calc(1 - var(--tw-space-y-reverse)))"),
+                      ("margin-bottom", f"calc({size} * var(--tw-space-y-reverse))")], _CHILDREN)]
+
+    @_functional("divide-x")
+    def divide_x(gen: "_Generator", value: _Value, neg: bool) -> Optional[List[_Out]]:
+        if value.raw == "reverse":
+            return [_Out([("--tw-divide-x-reverse", "1")], _CHILDREN)]
+        width = gen.lookup(gen.theme["borderWidth"], value, ("length",))
+        if width is None or neg:
+            return None
+        return [_Out([("--tw-divide-x-reverse", "0"),
+                      ("border-right-width", f"calc({width} * var(--tw-divide-x-reverse))"),
+                      ("border-left-width", f"calc({width} * calc(1 - var(--tw-divide-x-reverse)))")], _CHILDREN)]
+
+    @_functional("divide-y")
+    def divide_y(gen: "_Generator", value: _Value, neg: bool) -> Optional[List[_Out]]:
+        if value.raw == "reverse":
+            return [_Out([("--tw-divide-y-reverse", "1")], _CHILDREN)]
+        width = gen.lookup(gen.theme["borderWidth"], value, ("length",))
+        if width is None or neg:
+            return None
+        return [_Out([("--tw-divide-y-reverse", "0"),
+                      ("border-top-width", f"calc({width} * calc(1 - var(--tw-divide-y-reverse)))"),
+                      ("border-bottom-width", f"calc({width} * var(--tw-divide-y-reverse))")], _CHILDREN)]
+
+    _static(_keywords("solid", "dashed", "dotted", "double", "none", prefix="divide-", prop="border-style"),
+            selector=_CHILDREN)
+
+    @_functional("divide")
+    def divide_color(gen: "_Generator", value: _Value, neg: bool) -> Optional[List[_Out]]:
+        decls = gen.color_decls(value, ("border-color",), "--tw-divide-opacity")
+        return [_Out(decls, _CHILDREN)] if decls and not neg else None
+
+    _opacity_plugin("divide-opacity", "--tw-divide-opacity", _CHILDREN)
+    _static(_keywords("auto", "start", "end", "center", "stretch", prefix="place-self-", prop="place-self"))
+    _static(_keywords("auto", "start", "end", "center", "stretch", "baseline", prefix="self-", prop="align-self",
+                      values=("auto", "flex-start", "flex-end", "center", "stretch", "baseline")))
+    _static(_keywords("auto", "start", "end", "center", "stretch", prefix="justify-self-", prop="justify-self"))
+    for prefix, prop in (("overflow-", "overflow"), ("overflow-x-", "overflow-x"), ("overflow-y-", "overflow-y")):
+        _static(_keywords("auto", "hidden", "clip", "visible", "scroll", prefix=prefix, prop=prop))
+    for prefix, prop in (("overscroll-", "overscroll-behavior"), ("overscroll-y-", "overscroll-behavior-y"),
+                         ("overscroll-x-", "overscroll-behavior-x")):
+        _static(_keywords("auto", "contain", "none", prefix=prefix, prop=prop))
+    _static({"scroll-auto": "scroll-behavior:auto", "scroll-smooth": "scroll-behavior:smooth"})
+    _static({"truncate": "overflow:hidden;text-overflow:ellipsis;white-space:nowrap",
+             "overflow-ellipsis": "text-overflow:ellipsis", "text-ellipsis": "text-overflow:ellipsis",
+             "text-clip": "text-overflow:clip"})
+    _static(_keywords("none", "manual", "auto", prefix="hyphens-", prop="hyphens"))
+    _static(_keywords("normal", "nowrap", "pre", "pre-line", "pre-wrap", "break-spaces", prefix="whitespace-",
+                      prop="white-space"))
+    _static(_keywords("wrap", "nowrap", "balance", "pretty", prefix="text-", prop="text-wrap"))
+    _static({"break-normal": "overflow-wrap:normal;word-break:normal", "break-words": "overflow-wrap:break-word",
+             "break-all": "word-break:break-all", "break-keep": "word-break:keep-all"})
+
+    # borders
+    radius = _theme_key("borderRadius")
+    _scale({"rounded": ("border-radius",)}, radius)
+    _scale({"rounded-s": ("border-start-start-radius", "border-end-start-radius"),
+            "rounded-e": ("border-start-end-radius", "border-end-end-radius"),
+            "rounded-t": ("border-top-left-radius", "border-top-right-radius"),
+            "rounded-r": ("border-top-right-radius", "border-bottom-right-radius"),
+            "rounded-b": ("border-bottom-right-radius", "border-bottom-left-radius"),
+            "rounded-l": ("border-top-left-radius", "border-bottom-left-radius")}, radius)
+    _scale({"rounded-ss": ("border-start-start-radius",), "rounded-se": ("border-start-end-radius",),
+            "rounded-ee": ("border-end-end-radius",), "rounded-es": ("border-end-start-radius",),
+            "rounded-tl": ("border-top-left-radius",), "rounded-tr": ("border-top-right-radius",),
+            "rounded-br": ("border-bottom-right-radius",), "rounded-bl": ("border-bottom-left-radius",)}, radius)
+    border_width = _theme_key("borderWidth")
+    _scale({"border": ("border-width",)}, border_width)
+    _scale({"border-x": ("border-left-width", "border-right-width"),
+            "border-y": ("border-top-width", "border-bottom-width")}, border_width)
+    _scale({"border-s": ("border-inline-start-width",), "border-e": ("border-inline-end-width",),
+            "border-t": ("border-top-width",), "border-r": ("border-right-width",),
+            "border-b": ("border-bottom-width",), "border-l": ("border-left-width",)}, border_width)
+    _static(_keywords("solid", "dashed", "dotted", "double", "hidden", "none", prefix="border-", prop="border-style"))
+    for roots in ((("border", ("border-color",)),),
+                  (("border-x", ("border-left-color", "border-right-color")),
+                   ("border-y", ("border-top-color", "border-bottom-color"))),
+                  (("border-s", ("border-inline-start-color",)), ("border-e", ("border-inline-end-color",)),
+                   ("border-t", ("border-top-color",)), ("border-r", ("border-right-color",)),
+                   ("border-b", ("border-bottom-color",)), ("border-l", ("border-left-color",)))):
+        index = _order[0]
+        _order[0] += 1
+        for root, props in roots:
+            _FUNCTIONAL.setdefault(root, []).append((index, _color_plugin(props, "--tw-border-opacity")))
+    _opacity_plugin("border-opacity", "--tw-border-opacity")
+    _functional("bg")(_color_plugin(("background-color",), "--tw-bg-opacity"))
+    _opacity_plugin("bg-opacity", "--tw-bg-opacity")
+
+    @_functional("bg")
+    def bg_image(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        directions = {"t": "top", "tr": "top right", "r": "right", "br": "bottom right", "b": "bottom",
+                      "bl": "bottom left", "l": "left", "tl": "top left"}
+        if value.raw == "none":
+            return [("background-image", "none")]
+        if value.raw.startswith("gradient-to-") and value.raw[12:] in directions:
+            return [("background-image", f"linear-gradient(to {directions[value.raw[12:]]}, var(--tw-gradient-stops))")]
+        image = value.arbitrary
+        if image is not None and (value.hint in ("url", "image") or value.hint is None and re.match(
+                r"^(?:url|(?:repeating-)?(?:linear|radial|conic)-gradient|image-set|cross-fade|element)\(", image)):
+            return [("background-image", image)]
+        return None
+
+    @_functional("from", "via", "to")
+    def gradient_stops(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        return None  # registered for the sort index, resolved by _Generator.gradient
+
+    _static({"box-decoration-slice": "-webkit-box-decoration-break:slice;box-decoration-break:slice",
+             "box-decoration-clone": "-webkit-box-decoration-break:clone;box-decoration-break:clone"})
+
+    @_functional("bg")
+    def bg_size(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        if value.raw in ("auto", "cover", "contain"):
+            return [("background-size", value.raw)]
+        if value.arbitrary is not None and value.hint in ("length", "size", "percentage"):
+            return [("background-size", value.arbitrary)]
+        return None
+
+    _static({"bg-fixed": "background-attachment:fixed", "bg-local": "background-attachment:local",
+             "bg-scroll": "background-attachment:scroll"})
+    _static({"bg-clip-border": "background-clip:border-box", "bg-clip-padding": "background-clip:padding-box",
+             "bg-clip-content": "background-clip:content-box",
+             "bg-clip-text": "-webkit-background-clip:text;background-clip:text"})
+
+    @_functional("bg")
+    def bg_position(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        if value.raw in _POSITIONS:
+            return [("background-position", _POSITIONS[value.raw])]
+        if value.arbitrary is not None and value.hint == "position":
+            return [("background-position", value.arbitrary)]
+        return None
+
+    _static({"bg-repeat": "background-repeat:repeat", "bg-no-repeat": "background-repeat:no-repeat",
+             "bg-repeat-x": "background-repeat:repeat-x", "bg-repeat-y": "background-repeat:repeat-y",
+             "bg-repeat-round": "background-repeat:round", "bg-repeat-space": "background-repeat:space"})
+    _static({"bg-origin-border": "background-origin:border-box", "bg-origin-padding": "background-origin:padding-box",
+             "bg-origin-content": "background-origin:content-box"})
+    _functional("fill")(_color_plugin(("fill",), None, extra={"none": "none"}))
+    _functional("stroke")(_color_plugin(("stroke",), None, extra={"none": "none"}))
+    _scale({"stroke": ("stroke-width",)}, _theme_key("strokeWidth"), types=("length", "number"))
+    _static(_keywords("contain", "cover", "fill", "none", "scale-down", prefix="object-", prop="object-fit"))
+    _scale({"object": ("object-position",)}, lambda gen: _POSITIONS, types=("position",))
+
+    # padding, text
+    _scale({"p": ("padding",)}, _spacing)
+    _scale({"px": ("padding-left", "padding-right"), "py": ("padding-top", "padding-bottom")}, _spacing)
+    _scale({"ps": ("padding-inline-start",), "pe": ("padding-inline-end",), "pt": ("padding-top",),
+            "pr": ("padding-right",), "pb": ("padding-bottom",), "pl": ("padding-left",)}, _spacing)
+    _static(_keywords("left", "center", "right", "justify", "start", "end", prefix="text-", prop="text-align"))
+    _scale({"indent": ("text-indent",)}, _spacing, negative=True)
+    _static(_keywords("baseline", "top", "middle", "bottom", "text-top", "text-bottom", "sub", "super",
+                      prefix="align-", prop="vertical-align"))
+
+    @_functional("font")
+    def font_family(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        family = gen.theme["fontFamily"].get(value.raw) if value.arbitrary is None else None
+        if family is None and value.arbitrary is not None and (
+                value.hint in ("family-name", "any") or value.hint is None and not _NUMBER_RE.match(value.arbitrary)
+                and not value.arbitrary.startswith("var(")):
+            family = value.arbitrary
+        if family is None or neg:
+            return None
+        return [("font-family", family)]
+
+    @_functional("text")
+    def font_size(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        if neg:
+            return None
+        if value.arbitrary is not None:
+            if value.hint not in (None, "length", "percentage") or not (
+                    value.hint or _is_length(value.arbitrary) or value.arbitrary.endswith(("%", "em"))):
+                return None
+            decls = [("font-size", value.arbitrary)]
+        else:
+            size = gen.theme["fontSize"].get(value.raw)
+            if size is None:
+                return None
+            decls = [("font-size", size[0]), ("line-height", size[1])]
+        if value.modifier is not None:
+            mod = _parse_value(value.modifier)
+            line_height = mod.arbitrary if mod.arbitrary is not None else gen.theme["lineHeight"].get(value.modifier)
+            if line_height is None:
+                return None
+            decls = [decls[0], ("line-height", line_height)]
+        return decls
+
+    @_functional("font")
+    def font_weight(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        weight = gen.lookup(gen.theme["fontWeight"], value, ("number",))
+        if weight is None or neg:
+            return None
+        return [("font-weight", weight)]
+
+    _static({"uppercase": "text-transform:uppercase", "lowercase": "text-transform:lowercase",
+             "capitalize": "text-transform:capitalize", "normal-case": "text-transform:none"})
+    _static({"italic": "font-style:italic", "not-italic": "font-style:normal"})
+    _static({
+        "normal-nums": "font-variant-numeric:normal",
+        "ordinal": f"--tw-ordinal:ordinal;font-variant-numeric:{_NUMERIC}",
+        "slashed-zero": f"--tw-slashed-zero:slashed-zero;font-variant-numeric:{_NUMERIC}",
+        "lining-nums": f"--tw-numeric-figure:lining-nums;font-variant-numeric:{_NUMERIC}",
+        "oldstyle-nums": f"--tw-numeric-figure:oldstyle-nums;font-variant-numeric:{_NUMERIC}",
+        "proportional-nums": f"--tw-numeric-spacing:proportional-nums;font-variant-numeric:{_NUMERIC}",
+        "tabular-nums": f"--tw-numeric-spacing:tabular-nums;font-variant-numeric:{_NUMERIC}",
+        "diagonal-fractions": f"--tw-numeric-fraction:diagonal-fractions;font-variant-numeric:{_NUMERIC}",
+        "stacked-fractions": f"--tw-numeric-fraction:stacked-fractions;font-variant-numeric:{_NUMERIC}",
+    })
+    _scale({"leading": ("line-height",)}, _theme_key("lineHeight"), types=("length", "number", "any"))
+    _scale({"tracking": ("letter-spacing",)}, _theme_key("letterSpacing"), negative=True)
+    _functional("text")(_color_plugin(("color",), "--tw-text-opacity"))
+    _opacity_plugin("text-opacity", "--tw-text-opacity")
+    _static({"underline": "text-decoration-line:underline", "overline": "text-decoration-line:overline",
+             "line-through": "text-decoration-line:line-through", "no-underline": "text-decoration-line:none"})
+    _functional("decoration")(_color_plugin(("text-decoration-color",), None))
+    _static(_keywords("solid", "double", "dotted", "dashed", "wavy", prefix="decoration-",
+                      prop="text-decoration-style"))
+    _scale({"decoration": ("text-decoration-thickness",)}, _theme_key("textDecorationThickness"),
+           types=("length", "percentage"))
+    _scale({"underline-offset": ("text-underline-offset",)}, lambda gen: {
+        "auto": "auto", "0": "0px", "1": "1px", "2": "2px", "4": "4px", "8": "8px"}, types=("length", "percentage"))
+    _static({"antialiased": "-webkit-font-smoothing:antialiased;-moz-osx-font-smoothing:grayscale",
+             "subpixel-antialiased": "-webkit-font-smoothing:auto;-moz-osx-font-smoothing:auto"})
+
+    @_functional("placeholder")
+    def placeholder_color(gen: "_Generator", value: _Value, neg: bool) -> Optional[List[_Out]]:
+        decls = gen.color_decls(value, ("color",), "--tw-placeholder-opacity")
+        return [_Out(decls, "&::placeholder")] if decls and not neg else None
+
+    _opacity_plugin("placeholder-opacity", "--tw-placeholder-opacity", "&::placeholder")
+
+    _functional("caret")(_color_plugin(("caret-color",), None))
+    _functional("accent")(_color_plugin(("accent-color",), None, extra={"auto": "auto"}))
+    _scale({"opacity": ("opacity",)}, _theme_key("opacity"), types=("number", "percentage", "any"))
+    _static(_keywords(*_BLEND_MODES, prefix="bg-blend-", prop="background-blend-mode"))
+    _static(_keywords(*_BLEND_MODES, prefix="mix-blend-", prop="mix-blend-mode"))
+
+    @_functional("shadow")
+    def box_shadow(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        shadow = gen.theme["boxShadow"].get(value.raw) if value.arbitrary is None else None
+        if shadow is None and value.arbitrary is not None and (
+                value.hint == "shadow" or value.hint is None and re.search(r"\d", value.arbitrary)
+                and not _is_color(value.arbitrary) and not value.arbitrary.startswith("var(")):
+            shadow = value.arbitrary
+        if shadow is None or neg:
+            return None
+        return [("--tw-shadow", shadow), ("--tw-shadow-colored", _colored_shadow(shadow)),
+                ("box-shadow", "var(--tw-ring-offset-shadow, 0 0 #0000), var(--tw-ring-shadow, 0 0 #0000), var(--tw-shadow)")]
+
+    @_functional("shadow")
+    def shadow_color(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        color = gen.color(value)
+        if color is None or neg:
+            return None
+        return [("--tw-shadow-color", color), ("--tw-shadow", "var(--tw-shadow-colored)")]
+
+    _static({"outline-none": "outline:2px solid transparent;outline-offset:2px", "outline": "outline-style:solid",
+             "outline-dashed": "outline-style:dashed", "outline-dotted": "outline-style:dotted",
+             "outline-double": "outline-style:double"})
+    _scale({"outline": ("outline-width",)}, _theme_key("outlineWidth"))
+    _scale({"outline-offset": ("outline-offset",)}, _theme_key("outlineWidth"), negative=True)
+    _functional("outline")(_color_plugin(("outline-color",), None))
+
+    @_functional("ring")
+    def ring_width(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        if value.raw == "inset":
+            return [("--tw-ring-inset", "inset")]
+        width = gen.lookup(gen.theme["ringWidth"], value, ("length",))
+        if width is None or neg:
+            return None
+        return [
+            ("--tw-ring-offset-shadow",
+             "var(--tw-ring-inset) 0 0 0 var(--tw-ring-offset-width) var(--tw-ring-offset-color)"),
+            ("--tw-ring-shadow",
+             f"var(--tw-ring-inset) 0 0 0 calc({width} + var(--tw-ring-offset-width)) var(--tw-ring-color)"),
+            ("box-shadow", "var(--tw-ring-offset-shadow), var(--tw-ring-shadow), var(--tw-shadow, 0 0 #0000)"),
+        ]
+
+    @_functional("ring")
+    def ring_color(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        return None if neg else gen.color_decls(value, ("--tw-ring-color",), "--tw-ring-opacity")
+
+    _opacity_plugin("ring-opacity", "--tw-ring-opacity")
+    _scale({"ring-offset": ("--tw-ring-offset-width",)}, _theme_key("ringWidth"))
+    _functional("ring-offset")(_color_plugin(("--tw-ring-offset-color",), None))
+
+    # filters
+    for root, var, scale, types in (
+        ("blur", "--tw-blur", "blur", ("length",)),
+        ("brightness", "--tw-brightness", "brightness", ("number", "any")),
+        ("contrast", "--tw-contrast", "contrast", ("number", "any")),
+    ):
+        _filter_plugin(root, var, scale, types, "filter", _FILTER)
+
+    @_functional("drop-shadow")
+    def drop_shadow(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        shadows = gen.theme["dropShadow"].get(value.raw) if value.arbitrary is None else [value.arbitrary]
+        if shadows is None or neg:
+            return None
+        return [("--tw-drop-shadow", " ".join(f"drop-shadow({shadow})" for shadow in shadows)),
+                ("filter", _FILTER)]
+
+    for root, var, scale, types in (
+        ("grayscale", "--tw-grayscale", {"DEFAULT": "100%", "0": "0"}, ("any",)),
+        ("hue-rotate", "--tw-hue-rotate", "hueRotate", ("any",)),
+        ("invert", "--tw-invert", {"DEFAULT": "100%", "0": "0"}, ("any",)),
+        ("saturate", "--tw-saturate", "saturate", ("number", "any")),
+        ("sepia", "--tw-sepia", {"DEFAULT": "100%", "0": "0"}, ("any",)),
+    ):
+        _filter_plugin(root, var, scale, types, "filter", _FILTER, negative=root == "hue-rotate")
+    _static({"filter": f"filter:{_FILTER}", "filter-none": "filter:none"})
+    for root, var, scale, types in (
+        ("backdrop-blur", "--tw-backdrop-blur", "blur", ("length",)),
+        ("backdrop-brightness", "--tw-backdrop-brightness", "brightness", ("number", "any")),
+        ("backdrop-contrast", "--tw-backdrop-contrast", "contrast", ("number", "any")),
+        ("backdrop-grayscale", "--tw-backdrop-grayscale", {"DEFAULT": "100%", "0": "0"}, ("any",)),
+        ("backdrop-hue-rotate", "--tw-backdrop-hue-rotate", "hueRotate", ("any",)),
+        ("backdrop-invert", "--tw-backdrop-invert", {"DEFAULT": "100%", "0": "0"}, ("any",)),
+        ("backdrop-opacity", "--tw-backdrop-opacity", "opacity", ("number", "any")),
+        ("backdrop-saturate", "--tw-backdrop-saturate", "saturate", ("number", "any")),
+        ("backdrop-sepia", "--tw-backdrop-sepia", {"DEFAULT": "100%", "0": "0"}, ("any",)),
+    ):
+        _filter_plugin(root, var, scale, types, "backdrop-filter", _BACKDROP_FILTER,
+                       negative=root == "backdrop-hue-rotate")
+    _static({"backdrop-filter": f"-webkit-backdrop-filter:{_BACKDROP_FILTER};backdrop-filter:{_BACKDROP_FILTER}",
+             "backdrop-filter-none": "-webkit-backdrop-filter:none;backdrop-filter:none"})
+
+    # transitions, will-change, content
+    @_functional("transition")
+    def transition(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        prop = gen.lookup(gen.theme["transitionProperty"], value, ("any",))
+        if prop is None or neg:
+            return None
+        if prop == "none":
+            return [("transition-property", "none")]
+        return [("transition-property", prop),
+                ("transition-timing-function", gen.theme["transitionTimingFunction"]["DEFAULT"]),
+                ("transition-duration", gen.theme["transitionDuration"]["DEFAULT"])]
+
+    _scale({"delay": ("transition-delay",)}, _theme_key("transitionDelay"), types=("any",))
+    _scale({"duration": ("transition-duration",)}, _theme_key("transitionDuration"), types=("any",))
+    _scale({"ease": ("transition-timing-function",)}, _theme_key("transitionTimingFunction"), types=("any",))
+    _scale({"will-change": ("will-change",)}, lambda gen: {
+        "auto": "auto", "scroll": "scroll-position", "contents": "contents", "transform": "transform"},
+        types=("any",))
+
+    @_functional("content")
+    def content(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        text = "none" if value.raw == "none" else value.arbitrary
+        if text is None or neg:
+            return None
+        return [("--tw-content", text), ("content", "var(--tw-content)")]
+
+
+def _transform_plugin(root: str, variables: Tuple[str, ...], scale, types: Tuple[str, ...] = ("length",)) -> None:
+    @_functional(root)
+    def handler(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        resolved = gen.signed(scale(gen), value, neg, types)
+        if resolved is None:
+            return None
+        return [(var, resolved) for var in variables] + [("transform", _TRANSFORM)]
+
+
+def _opacity_plugin(root: str, var: str, selector: str = "&") -> None:
+    """bg-opacity-50 and the other deprecated (still enabled in v3) color opacity utilities."""
+    @_functional(root)
+    def handler(gen: "_Generator", value: _Value, neg: bool) -> Optional[List[_Out]]:
+        opacity = None if neg else gen.lookup(gen.theme["opacity"], value, ("number", "any"))
+        return [_Out([(var, opacity)], selector)] if opacity is not None else None
+
+
+def _filter_plugin(root: str, var: str, scale: Union[str, Dict[str, str]], types: Tuple[str, ...],
+                   prop: str, chain: str, negative: bool = False) -> None:
+    fn = {"--tw-backdrop-opacity": "opacity"}.get(var, root.replace("backdrop-", ""))
+
+    @_functional(root)
+    def handler(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        values = gen.theme[scale] if isinstance(scale, str) else scale
+        resolved = gen.signed(values, value, neg, types) if negative else (
+            None if neg else gen.lookup(values, value, types))
+        if resolved is None:
+            return None
+        decls = [(var, f"{fn}({resolved})")]
+        if prop == "backdrop-filter":
+            decls.append(("-webkit-backdrop-filter", chain))
+        return decls + [(prop, chain)]
+
+
+def _color_plugin(props: Tuple[str, ...], opacity_var: Optional[str],
+                  extra: Optional[Dict[str, str]] = None) -> Handler:
+    def handler(gen: "_Generator", value: _Value, neg: bool) -> Optional[Decls]:
+        if neg:
+            return None
+        if extra and value.raw in extra:
+            return [(prop, extra[value.raw]) for prop in props]
+        return gen.color_decls(value, props, opacity_var)
+    return handler
+
+
+def _colored_shadow(shadow: str) -> str:
+    """Each shadow layer with its color replaced by var(--tw-shadow-color) (shadow-{color})."""
+    if shadow == "none":
+        return "0 0 #0000"
+    layers = []
+    for layer in _split_top(shadow.replace(", ", ","), ","):
+        parts = _split_top(layer.strip(), " ")
+        kept = [part for part in parts if not _is_color(part) and not part.startswith("var(")]
+        layers.append(" ".join(kept + ["var(--tw-shadow-color)"]))
+    return ", ".join(layers)
+
+
+# ---------------------------------------------------------------------------
+# Variants (registration order = sort order)
+# ---------------------------------------------------------------------------
+
+_PSEUDO_ELEMENTS = {
+    "first-letter": "::first-letter", "first-line": "::first-line", "marker": "::marker",
+    "selection": "::selection", "file": "::file-selector-button", "placeholder": "::placeholder",
+    "backdrop": "::backdrop", "before": "::before", "after": "::after",
+}
+_PSEUDO_CLASSES = {
+    "first": ":first-child", "last": ":last-child", "only": ":only-child", "odd": ":nth-child(odd)",
+    "even": ":nth-child(even)", "first-of-type": ":first-of-type", "last-of-type": ":last-of-type",
+    "only-of-type": ":only-of-type", "visited": ":visited", "target": ":target", "open": "[open]",
+    "default": ":default", "checked": ":checked", "indeterminate": ":indeterminate",
+    "placeholder-shown": ":placeholder-shown", "autofill": ":autofill", "optional": ":optional",
+    "required": ":required", "valid": ":valid", "invalid": ":invalid", "in-range": ":in-range",
+    "out-of-range": ":out-of-range", "read-only": ":read-only", "empty": ":empty", "focus-within": ":focus-within",
+    "hover": ":hover", "focus": ":focus", "focus-visible": ":focus-visible", "active": ":active",
+    "enabled": ":enabled", "disabled": ":disabled",
+}
+_ARIA = ("busy", "checked", "disabled", "expanded", "hidden", "pressed", "readonly", "required", "selected")
+_MEDIA_VARIANTS = {
+    "ltr": None, "rtl": None,
+    "motion-safe": "@media (prefers-reduced-motion: no-preference)",
+    "motion-reduce": "@media (prefers-reduced-motion: reduce)",
+    "dark": "@media (prefers-color-scheme: dark)",
+    "forced-colors": "@media (forced-colors: active)",
+    "print": "@media print",
+}
+
+
+def _variant_ranks(screens: Iterable[str]) -> Dict[str, int]:
+    names = list(_PSEUDO_ELEMENTS) + ["*"] + list(_PSEUDO_CLASSES)
+    names += [f"group-{name}" for name in _PSEUDO_CLASSES] + [f"peer-{name}" for name in _PSEUDO_CLASSES]
+    names += ["has", "group-has", "peer-has"]
+    names += [f"aria-{name}" for name in _ARIA] + ["aria", "data", "supports"]
+    names += list(_MEDIA_VARIANTS) + list(screens) + [f"max-{screen}" for screen in screens]
+    names += ["portrait", "landscape", "contrast-more", "contrast-less", "arbitrary"]
+    return {name: rank for rank, name in enumerate(names)}
+
+
+class _Variant(NamedTuple):
+    rank: int
+    selector: Optional[str] = None   # '&' template applied to the selector
+    element: Optional[str] = None    # pseudo-element appended last
+    media: Optional[str] = None      # wrapping at-rule
+
+
+class _Rule(NamedTuple):
+    key: Tuple[Any, ...]
+    media: Tuple[str, ...]
+    selector: str
+    decls: Decls
+    keyframes: Optional[str]
+
+
+# ---------------------------------------------------------------------------
+# Generator
+# ---------------------------------------------------------------------------
+
+class _Generator:
+    """The CSS for one page's classes with one theme (default + page config)."""
+
+    def __init__(self, theme: Dict[str, Any], dark_mode: str = "media") -> None:
+        self.theme = theme
+        self.dark_mode = dark_mode
+        self.ranks = _variant_ranks(theme["screens"])
+        self.dropped = False  # the last class is one Tailwind itself generates nothing for
+
+    # -- values --
+
+    def lookup(self, scale: Dict[str, str], value: _Value, types: Tuple[str, ...] = ("length",)) -> Optional[str]:
+        """Theme key or arbitrary value (checked against the plugin's value types)."""
+        if value.modifier is not None:
+            return None
+        if value.arbitrary is None:
+            return None if value.hint == "invalid" else scale.get(value.raw)
+        arbitrary = value.arbitrary
+        if value.hint is not None:
+            return arbitrary if value.hint in types or "any" in types or value.hint == "any" else None
+        if "any" in types or arbitrary.startswith("var("):
+            return arbitrary
+        if "length" in types and _is_length(arbitrary):
+            return arbitrary
+        if "percentage" in types and arbitrary.endswith("%"):
+            return arbitrary
+        if "number" in types and (_NUMBER_RE.match(arbitrary) or _MATH_FN_RE.match(arbitrary)):
+            return arbitrary
+        if "position" in types:
+            return arbitrary
+        return None
+
+    def signed(self, scale: Dict[str, str], value: _Value, neg: bool,
+               types: Tuple[str, ...] = ("length",)) -> Optional[str]:
+        resolved = self.lookup(scale, value, types)
+        if resolved is None or not neg:
+            return resolved
+        return _negate(resolved)
+
+    def color(self, value: _Value, with_alpha: bool = True) -> Optional[str]:
+        """The color of a color utility value, with its /opacity modifier applied."""
+        if value.arbitrary is not None:
+            if value.hint not in (None, "color", "any"):
+                return None
+            color = value.arbitrary
+            if value.hint is None and not (_is_color(color) or color.startswith("var(")):
+                return None
+        else:
+            color = self._theme_color(value.raw)
+            if color is None:
+                return None
+        if value.modifier is None:
+            return color
+        alpha = self._alpha(value.modifier)
+        channels = _rgb_channels(color)
+        if alpha is None or channels is None:
+            # Tailwind v3 has no alpha for colors it can't parse (var(--x)/50)
+            # or for opacities outside the theme (/33): no rule
+            self.dropped = True
+            return None
+        return f"rgb({channels[0]} / {alpha})"
+
+    def color_decls(self, value: _Value, props: Tuple[str, ...], opacity_var: Optional[str]) -> Optional[Decls]:
+        color = self.color(value)
+        if color is None:
+            return None
+        channels = _rgb_channels(color)
+        if opacity_var and value.modifier is None and channels and channels[1] is None:
+            rgb = f"rgb({channels[0]} / var({opacity_var}))"
+            return [(opacity_var, "1")] + [(prop, rgb) for prop in props]
+        if channels and channels[1] is not None:
+            color = f"rgb({channels[0]} / {channels[1]})"
+        return [(prop, color) for prop in props]
+
+    def gradient(self, root: str, value: _Value) -> Optional[Decls]:
+        """from-/via-/to- stops: colors (with a transparent end) or %-positions."""
+        if value.modifier is None and (value.raw in self.theme["gradientColorStopPositions"] or (
+                value.arbitrary is not None and (value.hint == "percentage" or value.hint is None
+                                                 and _is_length(value.arbitrary)))):
+            position = value.arbitrary if value.arbitrary is not None else \
+                self.theme["gradientColorStopPositions"][value.raw]
+            return [(f"--tw-gradient-{root}-position", position)]
+        color = self.color(value)
+        if color is None:
+            return None
+        if color == "transparent":
+            channels: Optional[Tuple[str, Optional[str]]] = ("0 0 0", None)
+        elif color.startswith("rgb("):
+            channels = (color[4:].split(" / ")[0], None)
+        else:
+            channels = _rgb_channels(color)
+        transparent = f"rgb({channels[0]} / 0)" if channels else "rgb(255 255 255 / 0)"
+        if root == "from":
+            return [("--tw-gradient-from", f"{color} var(--tw-gradient-from-position)"),
+                    ("--tw-gradient-to", f"{transparent} var(--tw-gradient-to-position)"),
+                    ("--tw-gradient-stops", "var(--tw-gradient-from), var(--tw-gradient-to)")]
+        if root == "via":
+            return [("--tw-gradient-to", f"{transparent} var(--tw-gradient-to-position)"),
+                    ("--tw-gradient-stops",
+                     f"var(--tw-gradient-from), {color} var(--tw-gradient-via-position), var(--tw-gradient-to)")]
+        return [("--tw-gradient-to", f"{color} var(--tw-gradient-to-position)")]
+
+    def _theme_color(self, name: str) -> Optional[str]:
+        colors = self.theme["colors"]
+        if name in colors and isinstance(colors[name], str):
+            return colors[name]
+        family, _, shade = name.rpartition("-")
+        palette = colors.get(family)
+        if isinstance(palette, dict):
+            return palette.get(shade)
+        palette = colors.get(name)
+        if isinstance(palette, dict):
+            return palette.get("DEFAULT")
+        return None
+
+    def _alpha(self, modifier: str) -> Optional[str]:
+        mod = _parse_value(modifier)
+        if mod.arbitrary is not None:
+            return mod.arbitrary
+        return self.theme["opacity"].get(modifier)
+
+    # -- classes --
+
+    def rules(self, name: str) -> Optional[List[_Rule]]:
+        """Rules for one class name: [] for non-Tailwind classes, None if unsupported."""
+        parts = _split_top(name, ":")
+        utility, variant_names = parts[-1], parts[:-1]
+        if not utility:
+            return []
+        important = utility.startswith("!")
+        utility = utility.lstrip("!")
+        negative = utility.startswith("-")
+        if negative:
+            utility = utility[1:]
+        self.dropped = False
+        resolved = self._utility(utility, negative)
+        if resolved is None:
+            if "[" in utility and utility.count("[") == utility.count("]") and self._known_root(utility) \
+                    and not self.dropped:
+                return None
+            return []
+        index, position, outs, arbitrary_property = resolved
+        variants = []
+        for variant_name in variant_names:
+            variant = self._variant(variant_name)
+            if variant is None:
+                if "[" in variant_name:
+                    return None
+                return []  # unknown variant (xxl:): no rule, as with the CDN
+            variants.append(variant)
+
+        mask = 0
+        media: List[str] = []
+        selector, elements = "&", []
+        for variant in reversed(variants):
+            mask |= 1 << variant.rank
+            if variant.selector:
+                selector = variant.selector.replace("&", selector)
+            if variant.element:
+                elements.insert(0, variant.element)
+        for variant in variants:
+            if variant.media:
+                media.append(variant.media)
+        class_selector = escape_class(name)
+        layer = 1 if utility in _COMPONENTS else 2
+        rules = []
+        for sub_index, out in enumerate(outs):
+            full = out.selector.replace("&", selector.replace("&", class_selector) + "".join(elements))
+            decls = [(prop, f"{val} !important" if important else val) for prop, val in out.decls]
+            if any(element in ("::before", "::after") for element in elements) and not any(
+                    prop == "content" for prop, _ in decls):
+                decls.append(("content", "var(--tw-content)"))
+            key = (mask != 0, layer, mask, arbitrary_property, index, position, name, sub_index)
+            rules.append(_Rule(key, tuple(media) + out.media, full, decls, out.keyframes))
+        return rules
+
+    def _utility(self, utility: str, negative: bool) -> Optional[Tuple[int, int, List[_Out], bool]]:
+        """(plugin index, position in the plugin, outputs, arbitrary property) or None."""
+        if utility.startswith("[") and utility.endswith("]") and ":" in utility:
+            prop, _, val = utility[1:-1].partition(":")
+            if negative or not re.match(r"^-?-?[a-zA-Z][\w-]*$", prop) or not val:
+                return None
+            return _order[0], 0, [_Out([(prop, _decode_arbitrary(val))])], True
+        if not negative and utility in _STATIC:
+            index, position, outs = _STATIC[utility]
+            return index, position, outs, False
+        for root, raw in self._candidates(utility):
+            for index, handler in _FUNCTIONAL.get(root, ()):
+                outs = self._apply(root, handler, raw, negative)
+                if outs:
+                    return index, 0, outs, False
+        return None
+
+    def _apply(self, root: str, handler: Handler, raw: str, negative: bool) -> Optional[List[_Out]]:
+        attempts = [_parse_value(raw)]
+        cut = _split_top(raw, "/")
+        if len(cut) > 1:
+            attempts.append(_parse_value("/".join(cut[:-1]), cut[-1]))
+        for value in attempts:
+            if root in ("from", "via", "to"):
+                result = None if negative else self.gradient(root, value)
+            else:
+                result = handler(self, value, negative)
+            if result:
+                return result if isinstance(result[0], _Out) else [_Out(result)]
+        return None
+
+    @staticmethod
+    def _candidates(utility: str) -> Iterable[Tuple[str, str]]:
+        """(root, value) splits, longest root first; the bare root has value DEFAULT."""
+        if utility in _FUNCTIONAL:
+            yield utility, "DEFAULT"
+        bracket = utility.find("[")
+        limit = bracket if bracket >= 0 else len(utility)
+        for i in range(limit - 1, 0, -1):
+            if utility[i] == "-" and utility[:i] in _FUNCTIONAL:
+                yield utility[:i], utility[i + 1:]
+
+    def _known_root(self, utility: str) -> bool:
+        return any(True for _ in self._candidates(utility.lstrip("-")))
+
+    def _variant(self, name: str) -> Optional[_Variant]:
+        ranks = self.ranks
+        if name in _PSEUDO_ELEMENTS:
+            if name in ("selection", "marker"):
+                return _Variant(ranks[name], selector=f"& *{_PSEUDO_ELEMENTS[name]}, &", element=_PSEUDO_ELEMENTS[name])
+            return _Variant(ranks[name], element=_PSEUDO_ELEMENTS[name])
+        if name == "*":
+            return _Variant(ranks[name], selector=":is(& > *)")
+        if name in _PSEUDO_CLASSES:
+            return _Variant(ranks[name], selector="&" + _PSEUDO_CLASSES[name])
+        if name.startswith(("group-", "peer-")):
+            kind, _, rest = name.partition("-")
+            state, _, label = rest.partition("/")
+            marker = escape_class(f"{kind}/{label}" if label else kind)
+            combinator = " " if kind == "group" else " ~ "
+            if state in _PSEUDO_CLASSES:
+                return _Variant(ranks[f"{kind}-{state}"], selector=f"{marker}{_PSEUDO_CLASSES[state]}{combinator}&")
+            arbitrary = self._arbitrary_selector(state, "has-")
+            if arbitrary:
+                return _Variant(ranks[f"{kind}-has"], selector=f"{marker}:has({arbitrary}){combinator}&")
+            arbitrary = self._arbitrary_selector(state, "aria-") or (
+                f'[aria-{state[5:]}="true"]' if state[5:] in _ARIA and state.startswith("aria-") else None)
+            if arbitrary:
+                attr = arbitrary if arbitrary.startswith("[aria-") else f"[aria-{arbitrary}]"
+                return _Variant(ranks["aria"], selector=f"{marker}{attr}{combinator}&")
+            arbitrary = self._arbitrary_selector(state, "data-")
+            if arbitrary:
+                return _Variant(ranks["data"], selector=f"{marker}[data-{arbitrary}]{combinator}&")
+            if state.startswith("[") and state.endswith("]"):
+                inner = _decode_arbitrary(state[1:-1])
+                inner = inner.replace("&", marker) if "&" in inner else marker + inner
+                return _Variant(ranks["arbitrary"], selector=f"{inner}{combinator}&")
+            return None
+        if name.startswith("aria-"):
+            state = name[5:]
+            if state in _ARIA:
+                return _Variant(ranks[name], selector=f'&[aria-{state}="true"]')
+            arbitrary = self._arbitrary_selector(name, "aria-")
+            return _Variant(ranks["aria"], selector=f"&[aria-{arbitrary}]") if arbitrary else None
+        if name.startswith("data-"):
+            arbitrary = self._arbitrary_selector(name, "data-")
+            return _Variant(ranks["data"], selector=f"&[data-{arbitrary}]") if arbitrary else None
+        if name.startswith("has-"):
+            arbitrary = self._arbitrary_selector(name, "has-")
+            return _Variant(ranks["has"], selector=f"&:has({arbitrary})") if arbitrary else None
+        if name.startswith("supports-"):
+            arbitrary = self._arbitrary_selector(name, "supports-")
+            if not arbitrary:
+                return None
+            condition = arbitrary if ":" in arbitrary or arbitrary.startswith("(") else f"{arbitrary}: var(--tw)"
+            if not condition.startswith(("(", "not ", "selector(")):
+                condition = f"({condition})"
+            return _Variant(ranks["supports"], media=f"@supports {condition}")
+        if name in ("ltr", "rtl"):
+            return _Variant(ranks[name], selector=f'&:where([dir="{name}"], [dir="{name}"] *)')
+        if name == "dark" and self.dark_mode == "class":
+            return _Variant(ranks[name], selector="&:is(.dark *)")
+        if name in _MEDIA_VARIANTS:
+            return _Variant(ranks[name], media=_MEDIA_VARIANTS[name])
+        screens = self.theme["screens"]
+        if name in screens:
+            return _Variant(ranks[name], media=f"@media (min-width: {screens[name]})")
+        if name.startswith("max-") and name[4:] in screens:
+            return _Variant(ranks[name], media=f"@media not all and (min-width: {screens[name[4:]]})")
+        if name in ("portrait", "landscape"):
+            return _Variant(ranks[name], media=f"@media (orientation: {name})")
+        if name in ("contrast-more", "contrast-less"):
+            return _Variant(ranks[name], media=f"@media (prefers-contrast: {name[9:]})")
+        if name.startswith("[") and name.endswith("]"):
+            inner = _decode_arbitrary(name[1:-1])
+            if inner.startswith("@"):
+                return _Variant(ranks["arbitrary"], media=inner.replace("(", " (", 1) if " " not in inner else inner)
+            if "&" in inner:
+                return _Variant(ranks["arbitrary"], selector=inner)
+        return None
+
+    @staticmethod
+    def _arbitrary_selector(name: str, prefix: str) -> Optional[str]:
+        if not name.startswith(prefix + "[") or not name.endswith("]"):
+            return None
+        return _decode_arbitrary(name[len(prefix) + 1:-1]) or None
+
+
+# ---------------------------------------------------------------------------
+# Compiler
+# ---------------------------------------------------------------------------
+
+class TailwindCompiler:
+    """
+    CSS for a set of class names from the vendored Tailwind build.
+
+    compile() returns (css, unsupported): the preflight/base layer followed by
+    the rules for the classes that are Tailwind utilities; unsupported lists
+    the classes with an arbitrary value or variant the port can't compile.
+    """
+
+    def __init__(self, tailwind_dir: Optional[Union[str, Path]] = None) -> None:
+        self.tailwind_dir = Path(tailwind_dir) if tailwind_dir else _DEFAULT_TAILWIND_DIR
+        self.theme: Dict[str, Any] = json.loads((self.tailwind_dir / THEME_FILENAME).read_text(encoding="utf-8"))
+        self.preflight = (self.tailwind_dir / PREFLIGHT_FILENAME).read_text(encoding="utf-8")
+        if not _STATIC:
+            with _registry_lock:
+                if not _STATIC:
+                    _register_utilities()
+
+    def compile(self, classes: Iterable[str], config: Optional[Dict[str, Any]] = None) -> Tuple[str, List[str]]:
+        generator = _Generator(self._theme_for(config or {}), (config or {}).get("darkMode", "media"))
+        rules: List[_Rule] = []
+        unsupported = []
+        for name in sorted(set(classes)):
+            class_rules = generator.rules(name)
+            if class_rules is None:
+                unsupported.append(name)
+            else:
+                rules.extend(class_rules)
+        rules.sort(key=lambda rule: rule.key)
+
+        license_line, _, base = self.preflight.partition("\n")
+        out = [license_line]
+        if config:
+            config_json = json.dumps(config, separators=(",", ":")).replace("*/", "*\\/")
+            out.append(f"/* tailwind.config: {config_json} */")
+        out.append(base.rstrip("\n"))
+        keyframes = []
+        for rule in rules:
+            if rule.keyframes and rule.keyframes not in keyframes:
+                keyframes.append(rule.keyframes)
+        out.extend(keyframes)
+        open_media: Tuple[str, ...] = ()
+        for rule in rules:
+            common = 0
+            while common < min(len(open_media), len(rule.media)) and open_media[common] == rule.media[common]:
+                common += 1
+            out.extend("}" for _ in open_media[common:])
+            out.extend(f"{at_rule}{{" for at_rule in rule.media[common:])
+            open_media = rule.media
+            body = ";".join(f"{prop}:{val}" for prop, val in rule.decls)
+            out.append(f"{rule.selector}{{{body}}}")
+        out.extend("}" for _ in open_media)
+        return "\n".join(out) + "\n", unsupported
+
+    def _theme_for(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        extend = config.get("theme", {}).get("extend", {})
+        if not extend:
+            return self.theme
+        theme = dict(self.theme)
+        theme["colors"] = dict(theme["colors"], **extend.get("colors", {}))
+        fonts = {name: ", ".join(value) if isinstance(value, list) else value
+                 for name, value in extend.get("fontFamily", {}).items()}
+        theme["fontFamily"] = dict(theme["fontFamily"], **fonts)
+        return theme
+
+
+_registry_lock = threading.Lock()
+
+# Keys of a page's tailwind.config the compiler understands (anything else keeps the CDN)
+_CONFIG_KEYS = {"theme", "darkMode"}
+_EXTEND_KEYS = {"colors", "fontFamily"}
+
+
+def parse_config(source: str) -> Optional[Dict[str, Any]]:
+    """tailwind.config = {...} script body -> dict; None if it isn't plain data we support."""
+    m = _CONFIG_RE.match(source.strip())
+    if not m:
+        return None
+    strings: List[str] = []
+
+    def stash(match: "re.Match[str]") -> str:
+        strings.append(next(group for group in match.groups() if group is not None))
+        return f'"\x00{len(strings) - 1}"'
+
+    text = _JS_STRING_RE.sub(stash, m.group(1))
+    text = re.sub(r"//[^\n]*", "", text)
+    text = re.sub(r"([{,]\s*)([A-Za-z_$][\w$]*)\s*:", r'\1"\2":', text)
+    text = re.sub(r",(\s*[}\]])", r"\1", text)
+    text = re.sub(r'"\x00(\d+)"', lambda s: json.dumps(strings[int(s.group(1))]), text)
+    try:
+        config = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(config, dict) or set(config) - _CONFIG_KEYS:
+        return None
+    theme = config.get("theme", {})
+    if set(theme) - {"extend"} or set(theme.get("extend", {})) - _EXTEND_KEYS:
+        return None
+    if config.get("darkMode", "media") not in ("media", "class"):
+        return None
+    return config
+
+
+def page_classes(html: str) -> Set[str]:
+    """Class names of class attributes and of class-list string literals in scripts."""
+    classes: Set[str] = set()
+    for m in _CLASS_ATTR_RE.finditer(html):
+        value = m.group(1) if m.group(1) is not None else m.group(2)
+        classes.update(html_lib.unescape(value).split())
+    for m in _CLASS_CALL_RE.finditer(html):
+        for literal in _JS_STRING_RE.finditer(m.group(1)):
+            text = next(group for group in literal.groups() if group is not None)
+            classes.update(text.split())
+    return {name for name in classes if "{" not in name and "<" not in name}
+
+
+def _classify_script(attrs: str, body: str) -> Optional[str]:
+    if _CDN_SRC_RE.search(attrs):
+        return "cdn"
+    if "src" in attrs.lower():
+        return None
+    if "cdn.tailwindcss.com" in body and "console.warn" in body and len(body) < 600:
+        return "warn"
+    if _CONFIG_RE.match(body.strip()):
+        return "config"
+    return None
+
+
+def compile_page(html: str, compiler: Optional[TailwindCompiler] = None) -> str:
+    """Replace the Tailwind CDN script with the page's compiled CSS (unchanged if it has none)."""
+    scripts: Dict[str, List["re.Match[str]"]] = {"cdn": [], "warn": [], "config": []}
+    for m in _SCRIPT_RE.finditer(html):
+        kind = _classify_script(m.group(1), m.group(2))
+        if kind:
+            scripts[kind].append(m)
+    if not scripts["cdn"]:
+        return html
+    config: Dict[str, Any] = {}
+    for m in scripts["config"]:
+        parsed = parse_config(m.group(2))
+        if parsed is None:
+            logger.warning("[Tailwind] tailwind.config non supportato: CDN mantenuto")
+            return html
+        config = parsed
+    style = _compiled_style(html, config, compiler)
+    if style is None:
+        return html
+    first = scripts["cdn"][0]
+    cut = {first.start(): first.end()}
+    for m in scripts["cdn"][1:] + scripts["warn"] + scripts["config"]:
+        # Removed scripts take their own line with them
+        start, end = m.start(), m.end()
+        line_start = html.rfind("\n", 0, start) + 1
+        if not html[line_start:start].strip() and html.startswith("\n", end):
+            start, end = line_start, end + 1
+        cut[start] = end
+    parts, pos = [], 0
+    for start in sorted(cut):
+        parts.append(html[pos:start])
+        if start == first.start():
+            parts.append(style)
+        pos = cut[start]
+    parts.append(html[pos:])
+    return "".join(parts)
+
+
+def refresh_compiled_css(html: str, compiler: Optional[TailwindCompiler] = None) -> str:
+    """Recompile the page's compiled <style> after class edits (unchanged if up to date)."""
+    m = COMPILED_STYLE_RE.search(html)
+    if not m:
+        return html
+    line = _CONFIG_LINE_RE.search(m.group(1), 0, 4096)
+    config = json.loads(line.group(1)) if line else {}
+    rest = html[:m.start()] + html[m.end():]
+    style = _compiled_style(rest, config, compiler)
+    if style is None:
+        # Classes the port can't compile: back to the CDN build
+        cdn = f'<script src="{CDN_URL}"></script>'
+        if config:
+            cdn += f"\n  <script>tailwind.config = {json.dumps(config)}</script>"
+        return html[:m.start()] + cdn + html[m.end():]
+    if style == m.group(0):
+        return html
+    logger.info("[Tailwind] CSS ricompilato dopo modifiche alle classi")
+    return html[:m.start()] + style + html[m.end():]
+
+
+def _compiled_style(html: str, config: Dict[str, Any], compiler: Optional[TailwindCompiler]) -> Optional[str]:
+    compiler = compiler or get_tailwind_compiler()
+    css, unsupported = compiler.compile(page_classes(html), config)
+    if unsupported:
+        logger.warning(
+            f"[Tailwind] {len(unsupported)} classi non compilabili ({', '.join(unsupported[:5])}): CDN mantenuto"
+        )
+        return None
+    return f'<style data-tailwind="compiled">{css}</style>'
+
+
+_compilers: Dict[str, TailwindCompiler] = {}
+_compilers_lock = threading.Lock()
+
+
+def get_tailwind_compiler(tailwind_dir: Optional[Union[str, Path]] = None) -> TailwindCompiler:
+    """Process-wide shared TailwindCompiler for a vendored build directory."""
+    key = str(Path(tailwind_dir).resolve() if tailwind_dir else _DEFAULT_TAILWIND_DIR.resolve())
+    compiler = _compilers.get(key)
+    if compiler is None:
+        with _compilers_lock:
+            compiler = _compilers.get(key)
+            if compiler is None:
+                compiler = TailwindCompiler(tailwind_dir)
+                _compilers[key] = compiler
+    return compiler
+
+
+def reset_tailwind_compiler() -> None:
+    """Drop the shared compilers (after editing the vendored build)."""
+    with _compilers_lock:
+        _compilers.clear()
@@ -7,15 +7,34 @@ No framework imports (no FastAPI, no SQLAlchemy).
 Usage:
     assembler = TemplateAssembler()
     html = assembler.assemble(site_data)
+
+    # Or chunk by chunk (head, nav, each section, tail), e.g. for previews:
+    async for chunk in assembler.assemble_stream(site_data):
+        ...
 """
 
+import asyncio
+import hashlib
+import itertools
 import json
 import os
 import re
 import logging
-from typing import Dict, Any, List, Optional
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Set, Tuple
 from pathlib import Path
 
+from app.services.animation_rewriter import AnimationRewriter
+from app.services.component_index import ComponentIndex, get_component_index
+from app.services.gsap_engine import GsapEngine, animate_values, get_gsap_engine
+from app.services.icon_sprite import IconSprite
+from app.services.images.loading import ImageLoadingHints, insert_preload
+from app.services.images.responsive import apply_responsive_images
+from app.services.sanitizer import sanitize_fragment
+from app.services.tailwind_compiler import compile_page
+
 logger = logging.getLogger(__name__)
 
 
@@ -147,38 +166,409 @@ _SECTION_NAV_LABELS = {
 }
 
 
+# ---------------------------------------------------------------------------
+# Single-pass REPEAT / placeholder engine
+# ---------------------------------------------------------------------------
+
+_PLACEHOLDER_RE = re.compile(r'\{\{(\w+)\}\}')
+_REPEAT_MARKER_RE = re.compile(r'<!-- (/?)REPEAT:(\w+) -->')
+
+# REPEAT items rendering fewer visible characters than this are dropped
+_REPEAT_ITEM_MIN_VISIBLE = 5
+
+# Op codes of a compiled template
+_OP_TEXT = 0
+_OP_PLACEHOLDER = 1
+_OP_REPEAT = 2
+
+
+def _substitute_placeholders(text: str, data: Dict[str, Any]) -> str:
+    """Single regex pass replacing {{KEY}} with str(data[KEY]) ('' if missing/None)."""
+    def replacer(match):
+        value = data.get(match.group(1), "")
+        if value is None:
+            value = ""
+        return str(value)
+    return _PLACEHOLDER_RE.sub(replacer, text)
+
+
+class _RepeatBlock:
+    """A compiled <!-- REPEAT:KEY --> block: item body ops + raw inner source."""
+
+    __slots__ = ("key", "body", "raw")
+
+    def __init__(self, key: str, body: tuple, raw: str):
+        self.key = key
+        self.body = body
+        self.raw = raw
+
+
+def _compile_ops(
+    template: str,
+    start: int,
+    end: int,
+    markers: List[tuple],
+    lo: int,
+    hi: int,
+    next_close: List[Optional[int]],
+    resolve: bool,
+) -> tuple:
+    r"""Compile template[start:end] (markers[lo:hi]) into a tuple of ops.
+
+    Block matching mirrors the historical regex
+    ``<!-- REPEAT:(\w+) -->(.*?)<!-- /REPEAT:\1 -->``: the leftmost opening
+    marker that has a closing marker inside the segment wins, and it pairs
+    with the *first* closing marker of the same key.
+    """
+    ops: List[tuple] = []
+
+    def add_text(a: int, b: int) -> None:
+        if a >= b:
+            return
+        if not resolve:
+            ops.append((_OP_TEXT, template[a:b]))
+            return
+        pos = a
+        for m in _PLACEHOLDER_RE.finditer(template, a, b):
+            if m.start() > pos:
+                ops.append((_OP_TEXT, template[pos:m.start()]))
+            ops.append((_OP_PLACEHOLDER, m.group(1)))
+            pos = m.end()
+        if pos < b:
+            ops.append((_OP_TEXT, template[pos:b]))
+
+    pos = start
+    i = lo
+    while i < hi:
+        m_start, m_end, is_close, key = markers[i]
+        j = None if is_close else next_close[i]
+        if j is None or j >= hi:
+            i += 1
+            continue
+        c_start, c_end = markers[j][0], markers[j][1]
+        add_text(pos, m_start)
+        body = _compile_ops(template, m_end, c_start, markers, i + 1, j, next_close, True)
+        ops.append((_OP_REPEAT, _RepeatBlock(key, body, template[m_end:c_start])))
+        pos = c_end
+        i = j + 1
+    add_text(pos, end)
+    return tuple(ops)
+
+
+@lru_cache(maxsize=1024)
+def _compile_template(template: str) -> tuple:
+    """Tokenize a component template once. Top-level text keeps its placeholders."""
+    markers = [
+        (m.start(), m.end(), m.group(1) == "/", m.group(2))
+        for m in _REPEAT_MARKER_RE.finditer(template)
+    ]
+    next_close: List[Optional[int]] = [None] * len(markers)
+    nearest: Dict[str, int] = {}
+    for idx in range(len(markers) - 1, -1, -1):
+        _, _, is_close, key = markers[idx]
+        if is_close:
+            nearest[key] = idx
+        else:
+            next_close[idx] = nearest.get(key)
+    return _compile_ops(template, 0, len(template), markers, 0, len(markers), next_close, False)
+
+
+class _VisibleTextCounter:
+    r"""Streaming equivalent of
+    ``len(re.sub(r'\s+', ' ', re.sub(r'<[^>]+>', '', html)).strip())``.
+
+    Chunks are fed in document order; counting stops once ``limit`` is reached
+    since the result is only ever compared against it.
+    """
+
+    __slots__ = ("limit", "length", "_gap", "_state", "_pending")
+
+    # _state: 0 = text, 1 = just after '<', 2 = inside a tag
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.length = 0
+        self._gap = False
+        self._state = 0
+        self._pending: List[str] = []
+
+    @property
+    def done(self) -> bool:
+        return self.length >= self.limit
+
+    def _text(self, text: str) -> None:
+        if not text:
+            return
+        words = text.split()
+        if not words:
+            if self.length:
+                self._gap = True
+            return
+        if self.length and (self._gap or text[0].isspace()):
+            self.length += 1
+        self.length += sum(map(len, words)) + len(words) - 1
+        self._gap = text[-1].isspace()
+
+    def feed(self, chunk: str) -> None:
+        i, n = 0, len(chunk)
+        while i < n and self.length < self.limit:
+            if self._state == 0:
+                j = chunk.find("<", i)
+                if j < 0:
+                    self._text(chunk[i:])
+                    return
+                self._text(chunk[i:j])
+                self._pending = ["<"]
+                self._state = 1
+                i = j + 1
+            elif self._state == 1:
+                if chunk[i] == ">":
+                    # "<>" is not a tag: both characters stay visible
+                    self._pending = []
+                    self._state = 0
+                    self._text("<>")
+                    i += 1
+                else:
+                    self._state = 2
+            else:
+                j = chunk.find(">", i)
+                if j < 0:
+                    self._pending.append(chunk[i:])
+                    return
+                self._pending = []
+                self._state = 0
+                i = j + 1
+
+    def finish(self) -> int:
+        """Flush an unterminated '<...' (visible, like the regex) and return the length."""
+        if self._state and self.length < self.limit:
+            self._state = 0
+            for piece in self._pending:
+                self._text(piece)
+        self._pending = []
+        return self.length
+
+
+class _RenderFrame:
+    """Output buffer for one template scope (the page or a single REPEAT item).
+
+    ``marked`` indexes chunks inserted from data that still contain ``{{``:
+    like the previous recursive implementation, these are re-substituted by
+    every enclosing item scope.
+    """
+
+    __slots__ = ("data", "resolve", "chunks", "marked", "counter", "_key_lookup")
+
+    def __init__(self, data: Dict[str, Any], resolve: bool, counter: Optional[_VisibleTextCounter] = None):
+        self.data = data
+        self.resolve = resolve
+        self.chunks: List[str] = []
+        self.marked: List[int] = []
+        self.counter = counter
+        self._key_lookup: Optional[Dict[str, str]] = None
+
+    def _emit(self, chunk: str, mark: bool = False) -> None:
+        if mark and "{{" in chunk:
+            self.marked.append(len(self.chunks))
+        self.chunks.append(chunk)
+        if self.counter is not None and not self.counter.done:
+            self.counter.feed(chunk)
+
+    def _join(self, child: "_RenderFrame") -> None:
+        chunks = child.chunks
+        offset = len(self.chunks)
+        if self.resolve:
+            for idx in child.marked:
+                value = _substitute_placeholders(chunks[idx], self.data)
+                chunks[idx] = value
+                if "{{" in value:
+                    self.marked.append(offset + idx)
+        self.chunks.extend(chunks)
+        counter = self.counter
+        if counter is not None:
+            for chunk in chunks:
+                if counter.done:
+                    break
+                counter.feed(chunk)
+
+    def _lookup_items(self, key: str) -> Any:
+        data = self.data
+        items = data.get(key)
+        if items is None:
+            if self._key_lookup is None:
+                self._key_lookup = {k.upper(): k for k in data.keys() if isinstance(data[k], list)}
+            real_key = self._key_lookup.get(key.upper())
+            if real_key:
+                items = data[real_key]
+                logger.info(f"[Assembler] REPEAT:{key} resolved via case-insensitive lookup to '{real_key}'")
+        return items
+
+    def render(self, ops: tuple) -> None:
+        data = self.data
+        for op, arg in ops:
+            if op == _OP_TEXT:
+                self._emit(arg)
+            elif op == _OP_PLACEHOLDER:
+                value = data.get(arg, "")
+                if value is None:
+                    value = ""
+                self._emit(str(value), mark=True)
+            else:
+                self._render_repeat(arg)
+
+    def _render_repeat(self, block: _RepeatBlock) -> None:
+        key = block.key
+        items = self._lookup_items(key)
+        if not isinstance(items, list) or not items:
+            data = self.data
+            available_lists = {k: len(v) for k, v in data.items() if isinstance(v, list)}
+            logger.warning(
+                f"[Assembler] REPEAT:{key} has no items (key missing or empty array). "
+                f"Available list keys in data: {available_lists}. "
+                f"All data keys: {list(data.keys())}"
+            )
+            return
+
+        real_idx = 0
+        for item in items:
+            if isinstance(item, dict):
+                # Inject index placeholders for templates that need them
+                item_with_index = {
+                    **item,
+                    "INDEX": str(real_idx + 1),
+                    "INDEX_PADDED": f"{real_idx + 1:02d}",
+                    "INDEX_ZERO": str(real_idx),
+                }
+                child = _RenderFrame(
+                    item_with_index, resolve=True,
+                    counter=_VisibleTextCounter(_REPEAT_ITEM_MIN_VISIBLE),
+                )
+                child.render(block.body)
+                # Skip items that rendered with no visible text content
+                # (happens when AI returned items with empty/missing values)
+                if child.counter.finish() < _REPEAT_ITEM_MIN_VISIBLE:
+                    logger.warning(
+                        f"[Assembler] REPEAT:{key} item {real_idx} has no visible text, skipping"
+                    )
+                    continue
+                if real_idx:
+                    self._emit("\n")
+                self._join(child)
+            else:
+                if real_idx:
+                    self._emit("\n")
+                if self.resolve:
+                    self._emit(_substitute_placeholders(block.raw, self.data), mark=True)
+                else:
+                    self._emit(block.raw)
+            real_idx += 1
+
+
+# ---------------------------------------------------------------------------
+# Section render cache
+# ---------------------------------------------------------------------------
+
+def _fingerprint(obj: Any) -> str:
+    """Stable content hash of JSON-like data (dict key order does not matter)."""
+    try:
+        payload = json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str)
+    except TypeError:
+        # Mixed-type dict keys can't be sorted; fall back to repr
+        payload = repr(obj)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class SectionRenderCache:
+    """Bounded LRU of rendered section HTML, shared across assemble() calls.
+
+    Keys are (variant_id, hash of section data, hash of theme, ...), so a
+    refine or photo swap that touches one section only re-renders that one.
+    Hit/miss counters are cumulative; see stats().
+    """
+
+    def __init__(self, max_size: int = 512) -> None:
+        self._store: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[Any]:
+        with self._lock:
+            value = self._store.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._store.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple, value: Any) -> None:
+        with self._lock:
+            self._store[key] = value
+            self._store.move_to_end(key)
+            while len(self._store) > self._max_size:
+                self._store.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._store.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._store),
+                "max_size": self._max_size,
+            }
+
+
 class TemplateAssembler:
-    def __init__(self, components_dir: Optional[str] = None):
+    def __init__(
+        self,
+        components_dir: Optional[str] = None,
+        section_cache: Optional[SectionRenderCache] = None,
+    ):
         if components_dir is None:
             components_dir = str(Path(__file__).parent.parent / "components")
         self.components_dir = Path(components_dir)
+        self._index: Optional[ComponentIndex] = None
         self._registry: Optional[Dict] = None
-        self._gsap_script: Optional[str] = None
+        self.section_cache = section_cache if section_cache is not None else SectionRenderCache()
+        # Per-call section cache hits/misses of the last assemble()
+        self._last_cache_stats: Dict[str, Any] = {}
+
+    @property
+    def index(self) -> ComponentIndex:
+        """Shared, lazily-decoded component registry (see component_index)."""
+        if self._index is None:
+            self._index = get_component_index(self.components_dir)
+        return self._index
 
     @property
     def registry(self) -> Dict:
-        """Lazy-load and cache components.json."""
+        """Full components.json structure (decodes every category, once)."""
         if self._registry is None:
-            registry_path = self.components_dir / "components.json"
-            with open(registry_path, "r", encoding="utf-8") as f:
-                self._registry = json.load(f)
+            self._registry = self.index.to_registry()
         return self._registry
 
+    @property
+    def gsap_engine(self) -> GsapEngine:
+        """Shared gsap-universal.js split into core and effect modules (see gsap_engine)."""
+        return get_gsap_engine(self.components_dir)
+
     @property
     def gsap_script(self) -> str:
-        """Lazy-load and cache gsap-universal.js."""
-        if self._gsap_script is None:
-            js_path = self.components_dir / "gsap-universal.js"
-            with open(js_path, "r", encoding="utf-8") as f:
-                self._gsap_script = f.read()
-        return self._gsap_script
+        """The full gsap-universal.js (every effect module)."""
+        return self.gsap_engine.full_source
 
     def get_variant_ids(self) -> Dict[str, List[str]]:
         """Returns {category: [variant_id, ...]} for all categories."""
-        result = {}
-        for cat_name, cat_data in self.registry["categories"].items():
-            result[cat_name] = [v["id"] for v in cat_data["variants"]]
-        return result
+        return self.index.all_variant_ids()
 
     def _build_contrast_fix_css(self, head_data: Dict[str, Any]) -> str:
         """Generate CSS overrides to fix .text-white on light backgrounds.
@@ -245,83 +635,29 @@ class TemplateAssembler:
 
     def _replace_placeholders(self, template: str, data: Dict[str, Any]) -> str:
         """Replaces {{PLACEHOLDER}} with values from data dict."""
-        def replacer(match):
-            key = match.group(1)
-            value = data.get(key, "")
-            if value is None:
-                value = ""
-            return str(value)
-        return re.sub(r'\{\{(\w+)\}\}', replacer, template)
+        return _substitute_placeholders(template, data)
 
     def _expand_repeats(self, template: str, data: Dict[str, Any]) -> str:
         """Expands <!-- REPEAT:KEY -->...<!-- /REPEAT:KEY --> blocks.
 
-        Supports nested repeats: outer repeats are expanded first, then inner
-        repeats within each item are expanded recursively using item data.
+        Supports nested repeats: inner repeats within each item are expanded
+        using that item's data.
 
         Auto-injects INDEX (1-based) and INDEX_PADDED (zero-padded, e.g. "01")
         into each item so templates like services-tabs-01 and services-minimal-list-01
         can reference {{INDEX}} and {{INDEX_PADDED}}.
 
         Includes case-insensitive key lookup as a safety net for data normalization.
-        """
-        pattern = r'<!-- REPEAT:(\w+) -->(.*?)<!-- /REPEAT:\1 -->'
-
-        # Build a case-insensitive lookup map for the data keys
-        key_lookup = {k.upper(): k for k in data.keys() if isinstance(data[k], list)}
-
-        def expand_block(match):
-            key = match.group(1)
-            inner_template = match.group(2)
-
-            # Try exact key first, then case-insensitive lookup
-            items = data.get(key)
-            if items is None:
-                real_key = key_lookup.get(key.upper())
-                if real_key:
-                    items = data[real_key]
-                    logger.info(f"[Assembler] REPEAT:{key} resolved via case-insensitive lookup to '{real_key}'")
-
-            if not isinstance(items, list) or not items:
-                available_lists = {k: len(v) for k, v in data.items() if isinstance(v, list)}
-                logger.warning(
-                    f"[Assembler] REPEAT:{key} has no items (key missing or empty array). "
-                    f"Available list keys in data: {available_lists}. "
-                    f"All data keys: {list(data.keys())}"
-                )
-                return ""
-
-            fragments = []
-            real_idx = 0
-            for item in items:
-                if isinstance(item, dict):
-                    # Inject index placeholders for templates that need them
-                    item_with_index = {
-                        **item,
-                        "INDEX": str(real_idx + 1),
-                        "INDEX_PADDED": f"{real_idx + 1:02d}",
-                        "INDEX_ZERO": str(real_idx),
-                    }
-                    # Recursively expand nested repeats within this item
-                    fragment = self._expand_repeats(inner_template, item_with_index)
-                    fragment = self._replace_placeholders(fragment, item_with_index)
-
-                    # Skip items that rendered with no visible text content
-                    # (happens when AI returned items with empty/missing values)
-                    visible = re.sub(r'<[^>]+>', '', fragment)
-                    visible = re.sub(r'\s+', ' ', visible).strip()
-                    if len(visible) < 5:
-                        logger.warning(
-                            f"[Assembler] REPEAT:{key} item {real_idx} has no visible text, skipping"
-                        )
-                        continue
-                else:
-                    fragment = inner_template
-                fragments.append(fragment)
-                real_idx += 1
-            return "\n".join(fragments)
 
-        return re.sub(pattern, expand_block, template, flags=re.DOTALL)
+        The template is tokenized once (cached per template string) and rendered
+        in a single walk: item placeholders are substituted while emitting, and
+        the visible-text length used to drop empty items is tracked on the fly
+        instead of re-stripping tags from every rendered fragment.
+        Top-level placeholders are left in place for _replace_placeholders().
+        """
+        root = _RenderFrame(data, resolve=False)
+        root.render(_compile_template(template))
+        return "".join(root.chunks)
 
     def _validate_repeat_results(
         self,
@@ -411,19 +747,11 @@ class TemplateAssembler:
 
     def _find_variant_file(self, variant_id: str) -> Optional[str]:
         """Finds the file path for a variant ID."""
-        for cat_data in self.registry["categories"].values():
-            for variant in cat_data["variants"]:
-                if variant["id"] == variant_id:
-                    return variant["file"]
-        return None
+        return self.index.variant_file(variant_id)
 
     def get_variant_info(self, variant_id: str) -> Optional[Dict]:
         """Returns metadata for a variant (placeholders, tags, etc.)."""
-        for cat_data in self.registry["categories"].values():
-            for variant in cat_data["variants"]:
-                if variant["id"] == variant_id:
-                    return variant
-        return None
+        return self.index.get_variant(variant_id)
 
     def get_default_variant_for_section(
         self, section_type: str, style_variant_map: Optional[Dict[str, str]] = None
@@ -436,10 +764,8 @@ class TemplateAssembler:
         if style_variant_map and section_type in style_variant_map:
             return style_variant_map[section_type]
 
-        cat_data = self.registry["categories"].get(section_type)
-        if cat_data and cat_data.get("variants"):
-            return cat_data["variants"][0]["id"]
-        return None
+        variant_ids = self.index.variant_ids(section_type)
+        return variant_ids[0] if variant_ids else None
 
     def assemble_single_component(
         self,
@@ -509,10 +835,126 @@ class TemplateAssembler:
                 "BUSINESS_ADDRESS": "...",
                 "LOGO_URL": "...",
                 "CURRENT_YEAR": "2026",
-            }
+            },
+            # optional: variant manifests of managed photos, by src
+            # (app/services/images/responsive.py)
+            "image_manifests": {"https://...": {"src": "https://...", "variants": [...]}},
         }
         """
         # 1. Build head from template
+        head_html, head_data = self._build_head(site_data)
+
+        # 2. Build body sections (unchanged sections come from the render cache)
+        sections_html = list(self._iter_sections(site_data))
+
+        # 3. Build navigation bar from section IDs
+        nav_style = site_data.get("nav_style", "nav-classic-01")
+        nav_html = self._build_nav(site_data, nav_style=nav_style)
+
+        # 4. Head, nav and sections: managed photos get srcset/<picture>, the
+        # first section's image the LCP priority and preload, the others lazy
+        image_hints = ImageLoadingHints(site_data.get("image_manifests"))
+        sections_html = [self._rewrite_images(image_hints, s) for s in sections_html]
+        head_html = insert_preload(head_html, image_hints.preload_link())
+
+        # Iconify references -> <use> of the inline sprite (in the tail)
+        icons = IconSprite()
+        nav_html = icons.rewrite(nav_html)
+        sections_html = [icons.rewrite(s) for s in sections_html]
+        body_content = "\n\n".join(sections_html)
+        document_html = (
+            self._build_document_open(site_data, head_html, head_data)
+            + f"{nav_html}\n\n{body_content}\n\n"
+        )
+
+        # Post-process: Choreographer animation map, effect diversification
+        # and (site_data["_randomize_animations"]) randomization, one tag pass
+        rewriter = self._animation_rewriter(site_data)
+        document_html = self._rewrite_animations(rewriter, document_html)
+
+        # 5-6. Tail (icon sprite, Schema.org JSON-LD, form handler, GSAP core + the modules
+        # for the data-animate values on the page), with the fix hiding
+        # empty/broken images to prevent white-space blocks
+        values = rewriter.animate_values if rewriter else animate_values(document_html)
+        tail = self._inject_empty_image_fix(icons.sprite() + self._build_document_close(site_data, values))
+        complete_html = document_html + self._rewrite_animations(rewriter, tail)
+        self._last_effects_used = rewriter.effects_used if rewriter else {}
+        if rewriter and rewriter.mapped_sections:
+            logger.info("[Assembler] Animation map applied: %d sections", len(rewriter.mapped_sections))
+
+        # 7. Tailwind CDN script -> CSS compiled for the page's classes
+        return compile_page(complete_html)
+
+    async def assemble_stream(
+        self,
+        site_data: Dict[str, Any],
+        sanitize: bool = True,
+        post_process: Optional[Callable[[str], str]] = None,
+    ) -> AsyncIterator[str]:
+        """Async variant of assemble() yielding the page as it is built.
+
+        Chunks come in document order: the head (up to and including the
+        <body> tag), the nav, one chunk per body section, then the tail
+        (icon sprite, JSON-LD, form handler, GSAP engine, </body></html>). The head and
+        nav chunks are always the first two. The GSAP engine in the tail
+        has the modules for the data-animate values of the chunks before it.
+
+        Each chunk is sanitized (sanitize_fragment) and then passed to
+        post_process on its own; chunks left blank are not yielded, so a
+        post_process that drops empty sections filters them out of the stream.
+        One AnimationRewriter rewrites the chunks in order before that, so
+        joining the chunks gives the same page as assemble() followed by the
+        same whole-page passes (with site_data["_animation_seed"] set, the
+        same random effect picks too). The head chunk keeps the Tailwind CDN
+        script (a preview styles itself while the sections arrive):
+        compile_page() on the joined chunks gives assemble()'s compiled CSS.
+        """
+        def finish(chunk: str) -> str:
+            if sanitize:
+                chunk = sanitize_fragment(chunk, is_template_assembled=True)
+            if post_process is not None:
+                chunk = post_process(chunk)
+            return chunk
+
+        rewriter = self._animation_rewriter(site_data)
+        values: Set[str] = rewriter.animate_values if rewriter else set()
+
+        def animate(chunk: str) -> str:
+            chunk = self._rewrite_animations(rewriter, chunk)
+            if rewriter is None:
+                values.update(animate_values(chunk))
+            return chunk
+
+        # The first section is rendered before the head is sent: its image
+        # is the one preloaded there
+        image_hints = ImageLoadingHints(site_data.get("image_manifests"))
+        icons = IconSprite()
+        sections = (
+            icons.rewrite(self._rewrite_images(image_hints, s)) for s in self._iter_sections(site_data)
+        )
+        first_section = next(sections, None)
+
+        head_html, head_data = self._build_head(site_data)
+        head_html = insert_preload(head_html, image_hints.preload_link())
+        yield finish(animate(self._build_document_open(site_data, head_html, head_data)))
+        await asyncio.sleep(0)
+
+        nav_style = site_data.get("nav_style", "nav-classic-01")
+        yield finish(animate(icons.rewrite(self._build_nav(site_data, nav_style=nav_style)) + "\n\n"))
+        await asyncio.sleep(0)
+
+        for section_html in itertools.chain([first_section] if first_section is not None else [], sections):
+            chunk = finish(animate(section_html + "\n\n"))
+            if chunk.strip():
+                yield chunk
+            await asyncio.sleep(0)
+
+        tail = animate(self._inject_empty_image_fix(icons.sprite() + self._build_document_close(site_data, values)))
+        self._last_effects_used = rewriter.effects_used if rewriter else {}
+        yield finish(tail)
+
+    def _build_head(self, site_data: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Render the <head> document prefix. Returns (head_html, head_data)."""
         head_template = self._read_template("head/head-template.html")
 
         # Merge theme + meta + global into a single dict for head replacement
@@ -609,124 +1051,165 @@ class TemplateAssembler:
         per_style_css = site_data.get("per_style_css", "")
         head_html = head_html.replace("<!-- PER_STYLE_CSS -->", per_style_css)
 
-        # 2. Build body sections
-        sections_html = []
+        return head_html, head_data
+
+    def _iter_sections(self, site_data: Dict[str, Any]) -> Iterator[str]:
+        """Render body sections in order, skipping missing and empty ones.
+
+        Unchanged sections come from the render cache; self._last_cache_stats
+        is updated once the iterator is exhausted.
+        """
+        global_data = site_data.get("global", {})
+        theme = site_data.get("theme", {})
+        theme_key = _fingerprint(theme)
+        footer_key = ""
+        cache_hits = cache_misses = 0
         for component in site_data.get("components", []):
             variant_id = component.get("variant_id")
             component_data = component.get("data", {})
 
             # Handle inline raw HTML components (e.g., YouTube video section)
             if variant_id == "__inline_video__" and "__RAW_HTML__" in component_data:
-                sections_html.append(component_data["__RAW_HTML__"])
+                yield component_data["__RAW_HTML__"]
                 continue
 
             # Merge global data (lower priority) with component data (higher priority)
             merged_data = {**global_data, **component_data}
 
-            file_path = self._find_variant_file(variant_id)
-            if not file_path:
-                logger.warning(f"Variant '{variant_id}' not found in registry, skipping")
-                continue
-
-            try:
-                template = self._read_template(file_path)
-            except FileNotFoundError:
-                logger.warning(f"Template file '{file_path}' not found, skipping")
-                continue
+            cache_key = (variant_id, _fingerprint(merged_data), theme_key)
+            if variant_id and variant_id.startswith("footer"):
+                # Footer output also depends on which sections the page has
+                if not footer_key:
+                    footer_key = _fingerprint(
+                        [c.get("variant_id", "") for c in site_data.get("components", [])]
+                    )
+                cache_key += (footer_key,)
+
+            cached = self.section_cache.get(cache_key)
+            if cached is not None:
+                cache_hits += 1
+                section_html, repeat_issues = cached
+            else:
+                rendered = self._render_section(variant_id, merged_data, site_data)
+                if rendered is None:
+                    continue
+                cache_misses += 1
+                section_html, repeat_issues = rendered
+                self.section_cache.put(cache_key, rendered)
 
-            # First expand repeats, then validate and replace remaining placeholders
-            section_html = self._expand_repeats(template, merged_data)
-            section_html, repeat_issues = self._validate_repeat_results(
-                template, section_html, variant_id, merged_data,
-            )
             if repeat_issues:
                 # Store validation issues on site_data for downstream reporting
-                site_data.setdefault("_repeat_validation_issues", []).extend(repeat_issues)
-            section_html = self._replace_placeholders(section_html, merged_data)
-
-            # Skip sections where all REPEAT blocks were empty (just structure, no content)
-            has_repeats = bool(re.search(r'<!-- REPEAT:\w+ -->', template))
-            if has_repeats and self._is_empty_section(section_html, variant_id):
-                logger.info(f"[Assembler] Skipping empty section '{variant_id}' — all REPEAT blocks produced no content")
-                continue
-
-            # For footer sections, strip nav links to non-existent sections
-            if variant_id and variant_id.startswith("footer"):
-                section_html = self._clean_footer_nav(section_html, site_data)
-
-            sections_html.append(section_html)
-
-        # 3. Build navigation bar from section IDs
-        nav_style = site_data.get("nav_style", "nav-classic-01")
-        nav_html = self._build_nav(site_data, nav_style=nav_style)
-
-        # 4. Generate Schema.org JSON-LD
-        schema_ld = self._build_schema_ld(site_data)
-
-        # 5. Build Web3Forms contact handler script
-        form_handler = self._build_form_handler(site_data)
-
-        # 6. Assemble complete page
-        body_content = "\n\n".join(sections_html)
-        gsap_script_tag = f"<script>\n{self.gsap_script}\n</script>"
+                site_data.setdefault("_repeat_validation_issues", []).extend(
+                    dict(issue) for issue in repeat_issues
+                )
+            if section_html is not None:
+                yield section_html
+
+        rendered_total = cache_hits + cache_misses
+        self._last_cache_stats = {
+            "hits": cache_hits,
+            "misses": cache_misses,
+            "hit_rate": round(cache_hits / rendered_total, 4) if rendered_total else 0.0,
+        }
+        if cache_hits:
+            logger.info(
+                "[Assembler] Section cache: %d/%d sections reused", cache_hits, rendered_total,
+            )
 
+    def _build_document_open(
+        self, site_data: Dict[str, Any], head_html: str, head_data: Dict[str, Any],
+    ) -> str:
+        """Head, contrast fix CSS and the opening <body> tag."""
         style_id = site_data.get("style_id", "")
         body_style_class = f"style-{style_id} " if style_id else ""
 
         # Fix: Override .text-white on light backgrounds to prevent unreadable text
         contrast_fix_css = self._build_contrast_fix_css(head_data)
 
-        complete_html = f"""{head_html}
+        return f"""{head_html}
 {contrast_fix_css}
 <body class="{body_style_class}bg-[var(--color-bg)] text-[var(--color-text)] font-body antialiased">
 
-{nav_html}
+"""
 
-{body_content}
+    def _build_document_close(
+        self, site_data: Dict[str, Any], values: Optional[Set[str]] = None,
+    ) -> str:
+        """Schema.org JSON-LD, Web3Forms handler, GSAP engine and closing tags.
 
-{schema_ld}
+        The engine has the core plus the modules for values (the data-animate
+        values on the page); None gives the full engine.
+        """
+        schema_ld = self._build_schema_ld(site_data)
+        form_handler = self._build_form_handler(site_data)
+        gsap_script_tag = self.gsap_engine.script_tag(values)
+        return f"""{schema_ld}
 {form_handler}
 {gsap_script_tag}
 </body>
 </html>"""
 
-        # Post-process: hide empty/broken images to prevent white-space blocks
-        complete_html = self._inject_empty_image_fix(complete_html)
+    def _lookup_db_effects(self, site_data: Dict[str, Any]) -> Optional[Dict[str, List[str]]]:
+        """Query ChromaDB for category-specific GSAP effects (None if unavailable)."""
+        db_effects = None
+        try:
+            from app.services.design_knowledge import get_gsap_effects_for_category, get_collection_stats, is_ready
+            if not is_ready():
+                return None
+            stats = get_collection_stats()
+            if stats.get("total_patterns", 0) > 0:
+                template_style_id = site_data.get("_template_style_id", "")
+                category_label = template_style_id.split("-")[0] if template_style_id else ""
+                if not category_label:
+                    # Try to detect from global data
+                    global_d = site_data.get("global", {})
+                    category_label = global_d.get("_category", "")
+                if category_label:
+                    db_effects = get_gsap_effects_for_category(category_label, template_style_id)
+        except Exception as e_dk:
+            logger.debug(f"[Assembler] ChromaDB effects skipped: {e_dk}")
+        return db_effects
+
+    def _render_section(
+        self,
+        variant_id: str,
+        merged_data: Dict[str, Any],
+        site_data: Dict[str, Any],
+    ) -> Optional[tuple]:
+        """Render one body section.
 
-        # Post-process: apply animation map from Choreographer (if available)
-        animation_map = site_data.get("_animation_map")
-        if animation_map:
-            complete_html = self._apply_animation_map(complete_html, animation_map)
+        Returns (section_html, repeat_issues) where section_html is None for
+        sections skipped as empty, or None if the variant/template is missing.
+        """
+        file_path = self._find_variant_file(variant_id)
+        if not file_path:
+            logger.warning(f"Variant '{variant_id}' not found in registry, skipping")
+            return None
 
-        # Post-process: diversify GSAP effects across elements
         try:
-            from app.services.effect_diversifier import diversify_effects
-            recent_effects = site_data.get("_recent_effects")
+            template = self._read_template(file_path)
+        except FileNotFoundError:
+            logger.warning(f"Template file '{file_path}' not found, skipping")
+            return None
 
-            # Query ChromaDB for category-specific GSAP effects and pass to diversifier
-            db_effects = None
-            try:
-                from app.services.design_knowledge import get_gsap_effects_for_category, get_collection_stats
-                stats = get_collection_stats()
-                if stats.get("total_patterns", 0) > 0:
-                    template_style_id = site_data.get("_template_style_id", "")
-                    category_label = template_style_id.split("-")[0] if template_style_id else ""
-                    if not category_label:
-                        # Try to detect from global data
-                        global_d = site_data.get("global", {})
-                        category_label = global_d.get("_category", "")
-                    if category_label:
-                        db_effects = get_gsap_effects_for_category(category_label, template_style_id)
-            except Exception as e_dk:
-                logger.debug(f"[Assembler] ChromaDB effects skipped: {e_dk}")
-
-            complete_html, effects_used = diversify_effects(complete_html, used_effects=recent_effects, db_effects=db_effects)
-            self._last_effects_used = effects_used
-        except Exception as e:
-            logger.warning(f"[Assembler] Effect diversifier skipped: {e}")
-            self._last_effects_used = {}
+        # First expand repeats, then validate and replace remaining placeholders
+        section_html = self._expand_repeats(template, merged_data)
+        section_html, repeat_issues = self._validate_repeat_results(
+            template, section_html, variant_id, merged_data,
+        )
+        section_html = self._replace_placeholders(section_html, merged_data)
 
-        return complete_html
+        # Skip sections where all REPEAT blocks were empty (just structure, no content)
+        has_repeats = bool(re.search(r'<!-- REPEAT:\w+ -->', template))
+        if has_repeats and self._is_empty_section(section_html, variant_id):
+            logger.info(f"[Assembler] Skipping empty section '{variant_id}' — all REPEAT blocks produced no content")
+            return None, repeat_issues
+
+        # For footer sections, strip nav links to non-existent sections
+        if variant_id and variant_id.startswith("footer"):
+            section_html = self._clean_footer_nav(section_html, site_data)
+
+        return section_html, repeat_issues
 
     def _is_empty_section(self, section_html: str, variant_id: str) -> bool:
         """Check if a section is effectively empty after repeat expansion.
@@ -793,87 +1276,30 @@ document.querySelectorAll('img').forEach(function(img) {
             html += "\n" + empty_img_fix
         return html
 
-    def _apply_animation_map(self, html: str, animation_map: Dict[str, Any]) -> str:
-        """Apply the Animation Choreographer's map to the assembled HTML.
-
-        For each section in the map, replaces or injects data-animate attributes
-        on key elements (headings, paragraphs, images, buttons) within that section.
-        """
-        import re as _re
-
-        for section_id, effects in animation_map.items():
-            if not isinstance(effects, dict):
-                continue
-
-            # Find the section block in HTML by id attribute
-            section_pattern = _re.compile(
-                rf'(<section[^>]*id="{_re.escape(section_id)}"[^>]*>)(.*?)(</section>)',
-                _re.DOTALL | _re.IGNORECASE,
-            )
-            match = section_pattern.search(html)
-            if not match:
-                continue
-
-            section_html = match.group(2)
-
-            # Apply heading effect
-            heading_effect = effects.get("heading")
-            if heading_effect:
-                # Add data-animate to first h1/h2/h3 without one
-                for tag in ("h1", "h2", "h3"):
-                    pattern = _re.compile(
-                        rf'(<{tag}(?![^>]*data-animate)[^>]*)(>)',
-                        _re.IGNORECASE,
-                    )
-                    section_html, count = pattern.subn(
-                        rf'\1 data-animate="{heading_effect}"\2',
-                        section_html, count=1,
-                    )
-                    if count > 0:
-                        break
-
-            # Apply CTA effect
-            cta_effect = effects.get("cta")
-            if cta_effect:
-                # Target buttons and <a> with button-like classes
-                btn_pattern = _re.compile(
-                    r'(<(?:button|a)[^>]*class="[^"]*(?:btn|button|cta)[^"]*"(?![^>]*data-animate)[^>]*)(>)',
-                    _re.IGNORECASE,
-                )
-                section_html = btn_pattern.sub(
-                    rf'\1 data-animate="{cta_effect}"\2',
-                    section_html,
-                )
-
-            # Apply image effect
-            image_effect = effects.get("image")
-            if image_effect:
-                img_pattern = _re.compile(
-                    r'(<img(?![^>]*data-animate)[^>]*)(>)',
-                    _re.IGNORECASE,
-                )
-                section_html = img_pattern.sub(
-                    rf'\1 data-animate="{image_effect}"\2',
-                    section_html,
-                )
-
-            # Apply card effect
-            card_effect = effects.get("cards")
-            if card_effect:
-                card_pattern = _re.compile(
-                    r'(<div[^>]*class="[^"]*(?:card|feature|service|pricing|team)[^"]*"(?![^>]*data-animate)[^>]*)(>)',
-                    _re.IGNORECASE,
-                )
-                section_html = card_pattern.sub(
-                    rf'\1 data-animate="{card_effect}"\2',
-                    section_html,
-                )
-
-            # Replace section content in full HTML
-            html = html[:match.start(2)] + section_html + html[match.end(2):]
+    @staticmethod
+    def _rewrite_images(hints: ImageLoadingHints, section_html: str) -> str:
+        """One rendered section with its responsive images and loading hints."""
+        return hints.rewrite(apply_responsive_images(section_html, hints.manifests))
+
+    def _animation_rewriter(self, site_data: Dict[str, Any]) -> Optional[AnimationRewriter]:
+        """AnimationRewriter for this page's map, recent/DB effects and seed."""
+        return AnimationRewriter(
+            animation_map=site_data.get("_animation_map"),
+            used_effects=site_data.get("_recent_effects"),
+            db_effects=self._lookup_db_effects(site_data),
+            randomize=bool(site_data.get("_randomize_animations")),
+            seed=site_data.get("_animation_seed"),
+        )
 
-        logger.info("[Assembler] Animation map applied: %d sections", len(animation_map))
-        return html
+    @staticmethod
+    def _rewrite_animations(rewriter: Optional[AnimationRewriter], html: str) -> str:
+        if rewriter is None:
+            return html
+        try:
+            return rewriter.rewrite(html)
+        except Exception as e:
+            logger.warning(f"[Assembler] Effect diversifier skipped: {e}")
+            return html
 
     def _build_nav(self, site_data: Dict[str, Any], nav_style: str = "nav-classic-01") -> str:
         """Generate a sticky navigation bar with anchor links to each section.
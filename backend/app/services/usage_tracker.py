@@ -226,22 +226,11 @@ class UsageTracker:
 
     def _find_never_used_components(self, conn: sqlite3.Connection) -> List[str]:
         """Cross-reference components.json with usage data to find unused variants."""
-        components_json_path = os.path.join(
-            os.path.dirname(__file__), "..", "components", "components.json"
-        )
-        try:
-            with open(components_json_path, "r", encoding="utf-8") as f:
-                registry = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+        from app.services.component_index import get_component_index
 
         all_ids: set = set()
-        categories = registry.get("categories", {})
-        for cat_data in categories.values():
-            for variant in cat_data.get("variants", []):
-                vid = variant.get("id")
-                if vid:
-                    all_ids.add(vid)
+        for variant_ids in get_component_index().all_variant_ids().values():
+            all_ids.update(vid for vid in variant_ids if vid)
 
         used_ids = set()
         rows = conn.execute(
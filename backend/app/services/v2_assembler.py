@@ -10,7 +10,9 @@ import logging
 import os
 import re
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Set
+
+from app.services.gsap_engine import animate_values, get_gsap_engine
 
 logger = logging.getLogger(__name__)
 
@@ -59,10 +61,9 @@ def _load_head_template() -> str:
     return head_path.read_text(encoding="utf-8")
 
 
-def _load_gsap_script() -> str:
-    """Load gsap-universal.js from components directory."""
-    js_path = Path(__file__).parent.parent / "components" / "gsap-universal.js"
-    return js_path.read_text(encoding="utf-8")
+def _load_gsap_script(values: Optional[Set[str]] = None) -> str:
+    """gsap-universal.js core + the modules for these data-animate values (None: full engine)."""
+    return get_gsap_engine().build(values)
 
 
 def _build_nav_html(sections: List[str], business_name: str) -> str:
@@ -190,8 +191,8 @@ def assemble(
         if html:
             body_parts.append(html)
 
-    # Load GSAP
-    gsap_js = _load_gsap_script()
+    # Load GSAP (core + modules for the data-animate values on the page)
+    gsap_js = _load_gsap_script(animate_values(nav_html + "".join(body_parts)))
 
     # Compose full page
     full_html = f"""{head_html}
@@ -200,7 +201,7 @@ def assemble(
 
 {''.join(body_parts)}
 
-<script>
+<script data-bundle="gsap-engine">
 {gsap_js}
 </script>
 </body>
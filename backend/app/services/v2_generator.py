@@ -129,17 +129,7 @@ class V2Generator:
 
         # ---- Step 2: Load Category Blueprint ----
         _progress(2, "Caricamento blueprint di categoria...")
-        blueprint = self.db.query(CategoryBlueprint).filter(
-            CategoryBlueprint.category_slug == category
-        ).first()
-
-        if not blueprint:
-            logger.warning(f"No blueprint for category '{category}', using default sections")
-            sections_required = ["hero", "about", "services", "contact", "footer"]
-            sections_optional = ["testimonials", "faq", "cta"]
-        else:
-            sections_required = blueprint.sections_required or []
-            sections_optional = blueprint.sections_optional or []
+        sections_required, sections_optional = await asyncio.to_thread(self._load_sections, category)
 
         # Determine which optional sections to include
         selected_optional = self._pick_optionals(sections_optional, style_dna)
@@ -160,52 +150,10 @@ class V2Generator:
         query_text = dna_to_query_text(style_dna, category)
         query_embedding = await generate_embedding(query_text)
 
-        components_selected: Dict[str, Dict[str, Any]] = {}
-        for section_type in all_sections:
-            candidates = _query_pgvector(
-                db=self.db,
-                section_type=section_type,
-                category=category,
-                embedding=query_embedding,
-                variant_cluster=style_dna.get("variant_cluster"),
-                top_k=5,
-            )
-            if not candidates:
-                logger.warning(f"No candidates for section '{section_type}', skipping")
-                continue
-
-            winner = select_with_diversity(
-                candidates=candidates,
-                section_type=section_type,
-                category=category,
-                db=self.db,
-            )
-            if winner:
-                components_selected[section_type] = winner
-                logger.info(f"  {section_type} -> {winner['name']} (score={winner.get('final_score', 0):.3f})")
-
-        # ---- Step 4: Ensure layout uniqueness ----
-        _progress(4, "Verifica unicita' layout...")
-        name_map = {sec: comp["name"] for sec, comp in components_selected.items()}
-        unique_map, layout_hash = ensure_unique_layout(
-            category=category,
-            components=name_map,
-            db=self.db,
+        components_selected, layout_hash = await asyncio.to_thread(
+            self._select_components, all_sections, category, query_embedding, style_dna,
         )
 
-        # If force_diversity changed components, reload them
-        if unique_map != name_map:
-            for sec, new_name in unique_map.items():
-                if new_name != name_map.get(sec):
-                    new_comp = self.db.query(ComponentV2).filter(ComponentV2.name == new_name).first()
-                    if new_comp:
-                        components_selected[sec] = {
-                            "id": str(new_comp.id),
-                            "name": new_comp.name,
-                            "html_code": new_comp.html_code,
-                            "placeholders": new_comp.placeholders or [],
-                        }
-
         if not components_selected:
             return {"success": False, "error": "Nessun componente trovato per questa categoria"}
 
@@ -272,7 +220,8 @@ class V2Generator:
 
         # ---- Step 7: Log generation + update cooldowns ----
         _progress(7, "Salvataggio log generazione...")
-        self._log_generation(
+        await asyncio.to_thread(
+            self._log_generation,
             category=category,
             style_dna=style_dna,
             color_primary=color_primary,
@@ -294,6 +243,71 @@ class V2Generator:
             "tokens_output": total_tokens_out,
         }
 
+    def _load_sections(self, category: str) -> Tuple[List[str], List[str]]:
+        """Sezioni obbligatorie e opzionali dal blueprint della categoria (query sincrona)."""
+        blueprint = self.db.query(CategoryBlueprint).filter(
+            CategoryBlueprint.category_slug == category
+        ).first()
+
+        if not blueprint:
+            logger.warning(f"No blueprint for category '{category}', using default sections")
+            return ["hero", "about", "services", "contact", "footer"], ["testimonials", "faq", "cta"]
+        return blueprint.sections_required or [], blueprint.sections_optional or []
+
+    def _select_components(
+        self,
+        all_sections: List[str],
+        category: str,
+        query_embedding: Optional[List[float]],
+        style_dna: Dict[str, Any],
+    ) -> Tuple[Dict[str, Dict[str, Any]], str]:
+        """Componenti per sezione (pgvector + diversita') e layout hash unico (query sincrone)."""
+        components_selected: Dict[str, Dict[str, Any]] = {}
+        for section_type in all_sections:
+            candidates = _query_pgvector(
+                db=self.db,
+                section_type=section_type,
+                category=category,
+                embedding=query_embedding,
+                variant_cluster=style_dna.get("variant_cluster"),
+                top_k=5,
+            )
+            if not candidates:
+                logger.warning(f"No candidates for section '{section_type}', skipping")
+                continue
+
+            winner = select_with_diversity(
+                candidates=candidates,
+                section_type=section_type,
+                category=category,
+                db=self.db,
+            )
+            if winner:
+                components_selected[section_type] = winner
+                logger.info(f"  {section_type} -> {winner['name']} (score={winner.get('final_score', 0):.3f})")
+
+        # Ensure layout uniqueness
+        name_map = {sec: comp["name"] for sec, comp in components_selected.items()}
+        unique_map, layout_hash = ensure_unique_layout(
+            category=category,
+            components=name_map,
+            db=self.db,
+        )
+
+        # If force_diversity changed components, reload them
+        if unique_map != name_map:
+            for sec, new_name in unique_map.items():
+                if new_name != name_map.get(sec):
+                    new_comp = self.db.query(ComponentV2).filter(ComponentV2.name == new_name).first()
+                    if new_comp:
+                        components_selected[sec] = {
+                            "id": str(new_comp.id),
+                            "name": new_comp.name,
+                            "html_code": new_comp.html_code,
+                            "placeholders": new_comp.placeholders or [],
+                        }
+        return components_selected, layout_hash
+
     def _pick_optionals(
         self,
         sections_optional: List[str],
@@ -10,6 +10,18 @@ echo "=========================================="
 echo "📦 Installazione dipendenze..."
 pip install -r requirements.txt
 
+echo "🗂️  Indice componenti (components.idx)..."
+python tools/build_component_index.py
+
+echo "🧩 Template Jinja2 precompilati (components_v2/_compiled)..."
+python tools/build_jinja_templates.py
+
+echo "🎞️  Moduli GSAP per effetto (components/gsap_modules)..."
+python tools/build_gsap_modules.py
+
+echo "🔤 Font self-hosted (components/fonts, non versionati)..."
+python tools/vendor_fonts.py
+
 echo "✅ Build completata!"
 echo ""
 echo "📝 Variabili ambiente richieste:"
@@ -0,0 +1,222 @@
+"""Tests for the single-pass animation attribute rewriter (app/services/animation_rewriter.py).
+
+Covers:
+- Animation map: first-heading priority, section scope, CTA/image/card
+  targets, tags that already have data-animate, self-closing tags
+- Diversification: injection, per-section delay stagger, nav/head/script/
+  style/comments left alone, div classification
+- Randomization: template defaults swapped only on their tags, split-type
+  cleanup, delay/duration jitter bounds
+- Policy order (map -> diversify -> randomize) and seed reproducibility,
+  including a page rewritten chunk by chunk
+- The diversify_effects/_randomize_animations wrappers; linear time on
+  unbalanced and unclosed markup
+"""
+
+import re
+import time
+
+import pytest
+
+from app.services.animation_rewriter import AnimationRewriter
+from app.services.databinding_generator import _randomize_animations
+from app.services.effect_diversifier import EFFECT_POOLS, diversify_effects
+
+MAP = {"s": {"heading": "blur-in", "cta": "magnetic", "image": "clip-reveal", "cards": "tilt"}}
+
+
+def _map_only(html, animation_map=MAP):
+    return AnimationRewriter(animation_map=animation_map, diversify=False).rewrite(html)
+
+
+def _animate_values(html, tag):
+    return re.findall(rf'<{tag}\b[^>]*data-animate="([^"]*)"', html)
+
+
+# ---------------------------------------------------------------------------
+# Animation map
+# ---------------------------------------------------------------------------
+
+class TestAnimationMap:
+    def test_first_h1_wins_over_earlier_h2(self):
+        html = '<section id="s"><h2>a</h2><h1 data-animate="x">b</h1><h1>c</h1><h3>d</h3></section>'
+        assert _map_only(html) == (
+            '<section id="s"><h2>a</h2><h1 data-animate="x">b</h1>'
+            '<h1 data-animate="blur-in">c</h1><h3>d</h3></section>'
+        )
+
+    def test_heading_falls_back_to_h2_then_h3(self):
+        assert _map_only('<section id="s"><h3>a</h3><h2>b</h2></section>') == \
+            '<section id="s"><h3>a</h3><h2 data-animate="blur-in">b</h2></section>'
+        assert _map_only('<section id="s"><h3>a</h3></section>') == \
+            '<section id="s"><h3 data-animate="blur-in">a</h3></section>'
+
+    def test_targets_inside_the_first_mapped_section_only(self):
+        html = (
+            '<img src="0"><section id="s"><a class="btn-primary">a</a><button class="x">b</button>'
+            '<img src="1" /><div class="service-card">c</div><div class="grid">d</div></section>'
+            '<section id="s"><img src="2"></section><img src="3">'
+        )
+        assert _map_only(html) == (
+            '<img src="0"><section id="s"><a class="btn-primary" data-animate="magnetic">a</a>'
+            '<button class="x">b</button><img src="1" data-animate="clip-reveal" />'
+            '<div class="service-card" data-animate="tilt">c</div><div class="grid">d</div></section>'
+            '<section id="s"><img src="2"></section><img src="3">'
+        )
+
+    def test_existing_data_animate_anywhere_in_the_tag_is_kept(self):
+        # The old CTA/card regexes only looked for data-animate after class="..."
+        html = '<section id="s"><a data-animate="fade-up" class="btn">a</a></section>'
+        assert _map_only(html) == html
+
+    @pytest.mark.parametrize("animation_map", [{"other": MAP["s"]}, {"s": "blur-in"}, {}])
+    def test_unmapped_sections_are_unchanged(self, animation_map):
+        html = '<section id="s"><h1>a</h1><img src="x"></section>'
+        assert _map_only(html, animation_map) == html
+
+    def test_unclosed_section_is_not_mapped(self):
+        html = '<section id="s"><h1>a</h1>'
+        assert _map_only(html) == html
+
+
+# ---------------------------------------------------------------------------
+# Diversification
+# ---------------------------------------------------------------------------
+
+class TestDiversify:
+    def test_injects_and_staggers_delays_per_section(self):
+        html = "<section><h2>a</h2><p>b</p><p>c</p></section><section><p>d</p><p>e</p></section>"
+        out = AnimationRewriter(seed=1).rewrite(html)
+        assert len(_animate_values(out, "section")) == 2
+        delays = [re.findall(r'data-delay="([\d.]+)"', attrs) for attrs in re.findall(r"<p\b([^>]*)>", out)]
+        assert delays == [["0.1"], ["0.2"], [], ["0.1"]]
+
+    def test_skipped_regions_and_raw_text(self):
+        html = (
+            '<head><title>t</title></head><nav><a class="btn">x</a></nav>'
+            '<script>var s = "<p>";</script><style>p{}</style><!-- <p> --><p>ok</p>'
+        )
+        out = AnimationRewriter(seed=1).rewrite(html)
+        assert out.startswith(html[:html.index("<p>ok")])
+        assert out.count("data-animate") == 1
+
+    def test_unclosed_nav_does_not_hide_the_page(self):
+        out = AnimationRewriter(seed=1).rewrite("<nav><p>a</p>")
+        assert len(_animate_values(out, "p")) == 1
+
+    def test_images_keep_their_effect(self):
+        html = '<img src="a" data-animate="fade-up"><img src="b">'
+        out = AnimationRewriter(seed=1).rewrite(html)
+        assert out.startswith('<img src="a" data-animate="fade-up">')
+        assert _animate_values(out, "img")[1] in EFFECT_POOLS["img"]
+
+    @pytest.mark.parametrize("classes,pool", [
+        ("bento-card", "card"), ("stat counter", "counter"), ("blob absolute", "decorative"), ("grid", None),
+    ])
+    def test_div_pools(self, classes, pool):
+        rewriter = AnimationRewriter(seed=1)
+        out = rewriter.rewrite(f'<div class="{classes}">x</div>')
+        if pool is None:
+            assert "data-animate" not in out and rewriter.effects_used == {}
+        else:
+            assert list(rewriter.effects_used) == [pool]
+
+    def test_markup_inside_attribute_values_is_not_a_tag(self):
+        html = '<div title="<p <img src=x" data-x="1">t</div>'
+        assert AnimationRewriter(seed=1).rewrite(html) == html
+
+
+# ---------------------------------------------------------------------------
+# Randomization
+# ---------------------------------------------------------------------------
+
+class TestRandomize:
+    def _randomize(self, html, seed=3):
+        return AnimationRewriter(diversify=False, randomize=True, seed=seed).rewrite(html)
+
+    def test_defaults_change_only_on_their_tags(self):
+        html = '<h3 data-animate="text-split">a</h3><div data-animate="bounce-in">b</div><p data-animate="tilt">c</p>'
+        assert self._randomize(html) == html
+
+    def test_split_type_follows_the_heading_effect(self):
+        for seed in range(30):
+            out = self._randomize('<h1 data-animate="text-split" data-split-type="chars">a</h1>', seed)
+            effect = _animate_values(out, "h1")[0]
+            assert ("data-split-type" in out) == (effect in ("text-split", "text-reveal"))
+
+    def test_jitter_bounds(self):
+        for seed in range(30):
+            out = self._randomize('<p data-delay="0" data-duration="0.3">a</p>', seed)
+            delay, duration = map(float, re.search(r'data-delay="([\d.]+)" data-duration="([\d.]+)"', out).groups())
+            assert 0 <= delay <= 0.2 and 0.3 <= duration <= 0.6
+
+
+# ---------------------------------------------------------------------------
+# Order and reproducibility
+# ---------------------------------------------------------------------------
+
+PAGE = (
+    '<head><title>t</title></head><nav><a class="btn" href="#s">s</a></nav>'
+    '<section id="s"><h1 class="t">Titolo</h1><p data-animate="blur-slide">x</p>'
+    '<a class="btn" data-animate="bounce-in" data-delay="0.2">vai</a><img src="a.jpg"/></section>'
+    '<section id="t"><div class="card">c</div><p>y</p></section><script>gsap.to(".x", {})</script>'
+)
+
+
+class TestOrderAndSeed:
+    def test_map_runs_before_diversify(self):
+        rewriter = AnimationRewriter(animation_map=MAP, seed=4)
+        out = rewriter.rewrite(PAGE)
+        # The mapped heading counts as existing: never a second data-animate
+        assert all(tag.count("data-animate=") <= 1 for tag in re.findall(r"<[^>]+>", out))
+        assert rewriter.mapped_sections == ["s"]
+
+    def test_same_seed_same_page(self):
+        first = AnimationRewriter(animation_map=MAP, randomize=True, seed=9).rewrite(PAGE)
+        assert AnimationRewriter(animation_map=MAP, randomize=True, seed=9).rewrite(PAGE) == first
+        others = {AnimationRewriter(animation_map=MAP, randomize=True, seed=s).rewrite(PAGE) for s in range(8)}
+        assert len(others) > 1
+
+    def test_chunks_rewritten_in_order_match_the_whole_page(self):
+        cuts = [0, PAGE.index("<section"), PAGE.index('<section id="t"'), PAGE.index("<script"), len(PAGE)]
+        whole = AnimationRewriter(animation_map=MAP, randomize=True, seed=11)
+        chunked = AnimationRewriter(animation_map=MAP, randomize=True, seed=11)
+        parts = [chunked.rewrite(PAGE[a:b]) for a, b in zip(cuts, cuts[1:])]
+        assert "".join(parts) == whole.rewrite(PAGE)
+        assert chunked.effects_used == whole.effects_used
+
+    def test_wrappers(self):
+        out, effects = diversify_effects(PAGE, seed=2)
+        assert (out, effects) == diversify_effects(PAGE, seed=2)
+        assert "h1" in effects and "<script>gsap.to" in out
+        assert diversify_effects("") == ("", {})
+        assert _randomize_animations(PAGE, seed=2) == _randomize_animations(PAGE, seed=2)
+
+
+# ---------------------------------------------------------------------------
+# Linear time
+# ---------------------------------------------------------------------------
+
+ADVERSARIAL = {
+    "unbalanced_tags": lambda n: '<section id="s" <h1 <p data-delay="0.1" <img ' * n,
+    "unclosed_script": lambda n: "<p>a</p><script>" + "<p>" * n,
+    "nested_starts": lambda n: '<div title="' + "<h1 <p <a class=btn " * n + '">',
+    "many_sections": lambda n: '<section id="s"><h2>a</h2><p>b</p>' * n,
+}
+
+
+class TestLinearTime:
+    @pytest.mark.parametrize("name", sorted(ADVERSARIAL))
+    def test_four_times_the_input_about_four_times_the_time(self, name):
+        make = ADVERSARIAL[name]
+
+        def timed(html):
+            rewriter = AnimationRewriter(animation_map=MAP, randomize=True, seed=1)
+            start = time.perf_counter()
+            rewriter.rewrite(html)
+            return time.perf_counter() - start
+
+        small, large = make(2000), make(8000)
+        t_small = min(timed(small) for _ in range(2))
+        t_large = min(timed(large) for _ in range(2))
+        assert t_large < max(8 * t_small, 0.05)
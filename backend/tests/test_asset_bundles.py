@@ -0,0 +1,151 @@
+"""Tests for the shared content-hashed bundles (app/services/asset_bundles.py).
+
+Covers:
+- page_bundles: core CSS, Lenis bootstrap and GSAP engine found in an
+  assembled page, identical across sites, per-site theme left out; the
+  engine's own Lenis setup for heads without the bootstrap
+- link_bundles: blocks replaced in place by <link>/<script src>, hashed
+  file names changing with the content
+- publish_bundles: each bundle uploaded once per store, inline fallback
+  (SHARED_ASSETS_MODE, per-site inline, no store, failed upload)
+- The sanitizer keeping the marked blocks
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import asset_bundles
+from app.services.asset_bundles import (
+    BUNDLE_NAMES,
+    Bundle,
+    link_bundles,
+    page_bundles,
+    publish_bundles,
+    reset_published_bundles,
+)
+from app.services.gsap_engine import ENGINE_SCRIPT_RE
+from app.services.sanitizer import sanitize_output
+from app.services.template_assembler import SectionRenderCache, TemplateAssembler
+
+
+def _site(primary: str) -> dict:
+    return {
+        "theme": {"primary_color": primary},
+        "meta": {"title": "Trattoria"},
+        "global": {"BUSINESS_NAME": "Trattoria"},
+        "per_style_css": "body.style-x { --x: 1; }",
+        "_animation_seed": 40,
+        "components": [{"variant_id": "hero-split-01", "data": {}}, {"variant_id": "contact-form-01", "data": {}}],
+    }
+
+
+@pytest.fixture(scope="module")
+def pages():
+    assembler = TemplateAssembler(section_cache=SectionRenderCache(max_size=0))
+    return [
+        assembler.assemble(_site("#c8102e")),
+        assembler.assemble(_site("#1e40af")),
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Bundles in a page
+# ---------------------------------------------------------------------------
+
+class TestPageBundles:
+    def test_assembled_page_bundles(self, pages):
+        bundles = page_bundles(pages[0])
+        assert [b.name for b in bundles] == ["lenis-bootstrap", "core-css", "gsap-engine"]
+        assert [b.ext for b in bundles] == ["js", "css", "js"]
+        core = bundles[1].content
+        assert "{{" not in core and ":root" not in core and "--x: 1" not in core
+        assert "window.lenis = lenis" in bundles[0].content
+        assert bundles[2].content.startswith("/* ====")
+        assert "if (!window.lenis && typeof Lenis !== 'undefined'" in bundles[2].content
+
+    def test_same_bytes_across_sites(self, pages):
+        assert [b.filename for b in page_bundles(pages[0])] == [b.filename for b in page_bundles(pages[1])]
+        assert pages[0] != pages[1]
+
+    def test_filename_follows_content(self):
+        a, b = Bundle("core-css", "css", "p{}"), Bundle("core-css", "css", "p{ }")
+        assert a.filename.startswith("core-css.") and a.filename.endswith(".css")
+        assert len(a.digest) == 16 and a.digest != b.digest
+
+    def test_sanitizer_keeps_the_marked_blocks(self, pages):
+        clean = sanitize_output(pages[0], is_template_assembled=True)
+        assert [b.filename for b in page_bundles(clean)] == [b.filename for b in page_bundles(pages[0])]
+
+
+class TestLinkBundles:
+    def test_blocks_replaced_in_place(self, pages):
+        html = pages[0]
+        bundles = page_bundles(html)
+        linked = link_bundles(html, "https://assets.example.com/")
+        assert page_bundles(linked) == [] and ENGINE_SCRIPT_RE.search(linked) is None
+        refs = [b.reference("https://assets.example.com") for b in bundles]
+        assert refs[1] == f'<link rel="stylesheet" href="https://assets.example.com/{bundles[1].filename}" data-bundle="core-css">'
+        assert refs[2] == f'<script src="https://assets.example.com/{bundles[2].filename}" data-bundle="gsap-engine"></script>'
+        positions = [linked.index(ref) for ref in refs]
+        assert positions == sorted(positions) and positions[2] > linked.index("<body")
+        # The per-site theme stays inline, after the core CSS
+        assert positions[1] < linked.index("--color-primary: #c8102e") < linked.index("</head>")
+        assert len(linked) < len(html) - 40000
+
+    def test_unknown_bundles_and_plain_pages(self):
+        html = '<style data-bundle="other">p{}</style><script>x()</script>'
+        assert link_bundles(html, "https://a") == html
+        assert set(BUNDLE_NAMES) == {"core-css", "lenis-bootstrap", "gsap-engine"}
+
+
+# ---------------------------------------------------------------------------
+# Publish
+# ---------------------------------------------------------------------------
+
+class TestPublish:
+    @pytest.fixture
+    def uploads(self, monkeypatch):
+        calls = []
+
+        async def upload(bundles):
+            calls.append([b.filename for b in bundles])
+            return True
+
+        monkeypatch.setattr(asset_bundles, "_store", lambda: "vps")
+        monkeypatch.setitem(asset_bundles._UPLOADERS, "vps", upload)
+        monkeypatch.setattr(settings, "SHARED_ASSETS_URL", "")
+        monkeypatch.setattr(settings, "SITE_BASE_DOMAIN", "e-quipe.app")
+        reset_published_bundles()
+        yield calls
+        reset_published_bundles()
+
+    def test_uploaded_once(self, pages, uploads):
+        first = asyncio.run(publish_bundles(pages[0]))
+        second = asyncio.run(publish_bundles(pages[1]))
+        assert uploads == [[b.filename for b in page_bundles(pages[0])]]
+        assert f"https://assets.e-quipe.app/{page_bundles(pages[0])[1].filename}" in first
+        assert page_bundles(second) == []
+
+    def test_inline_fallbacks(self, pages, uploads, monkeypatch):
+        assert asyncio.run(publish_bundles(pages[0], inline=True)) == pages[0]
+
+        async def fail(bundles):
+            return False
+
+        monkeypatch.setitem(asset_bundles._UPLOADERS, "vps", fail)
+        assert asyncio.run(publish_bundles(pages[0])) == pages[0]
+        monkeypatch.setattr(asset_bundles, "_store", lambda: None)
+        assert asyncio.run(publish_bundles(pages[0])) == pages[0]
+        assert uploads == []
+
+    def test_store_selection(self, monkeypatch):
+        monkeypatch.setattr("app.services.r2_storage.is_r2_available", lambda: False)
+        monkeypatch.setattr(settings, "DEPLOY_TARGET", "vps")
+        monkeypatch.setattr(settings, "VPS_DEPLOY_URL", "http://vps:8090")
+        monkeypatch.setattr(settings, "VPS_DEPLOY_SECRET", "s")
+        monkeypatch.setattr(settings, "SHARED_ASSETS_MODE", "url")
+        assert asset_bundles._store() == "vps"
+        monkeypatch.setattr(settings, "SHARED_ASSETS_MODE", "inline")
+        assert asset_bundles._store() is None
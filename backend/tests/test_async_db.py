@@ -0,0 +1,273 @@
+"""Tests for the async DB access (app/core/database.py, app/core/security.py).
+
+Covers:
+- ThreadedSession: the AsyncSession interface over a sync Session
+- Async engine behind the Supabase transaction pooler: no prepared
+  statement cache, unique statement names, no app-side pool, pgbouncer
+  stripped from the connect kwargs
+- get_current_user_async on the async session; no route mixes get_db and
+  get_async_db (the current user lives in the route's own session); async
+  routes on the sync Session run their queries in the threadpool, and no
+  async dependency takes the sync Session
+- Sites, media and deploy routes on a real AsyncSession (aiosqlite): legacy
+  inline HTML, HTML written to the blob store, versions saved through
+  run_sync, notification email, deploy reading the page once
+"""
+
+import inspect
+import re
+
+import pytest
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.core.database import Base, ThreadedSession, _create_async_engine, get_async_db, get_db
+from app.core.security import create_access_token, get_current_user_async
+from app.main import app
+from app.models.site import Site
+from app.models.site_version import SiteVersion
+from app.models.user import User
+from app.services.blob_store import load_site_html, reset_blob_store
+
+aiosqlite = pytest.importorskip("aiosqlite")
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+PAGE = '<html><body><section id="hero"><img src="/a.jpg" alt="Sala"></section></body></html>'
+TABLES = [User.__table__, Site.__table__, SiteVersion.__table__]
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "HTML_BLOB_STORE", "local")
+    monkeypatch.setattr(settings, "HTML_BLOB_DIR", str(tmp_path / "blobs"))
+    reset_blob_store()
+    path = tmp_path / "app.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=TABLES)
+    with Session(engine) as session:
+        user = User(email="mario@example.com", hashed_password="x")
+        session.add(user)
+        session.flush()
+        session.execute(Site.__table__.insert().values(
+            name="Trattoria", slug="trattoria", owner_id=user.id, status="ready", html_content=PAGE,
+        ))
+        session.commit()
+    engine.dispose()
+    yield path
+    reset_blob_store()
+
+
+@pytest.fixture
+def sync_session(db_path):
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def client(db_path):
+    # NullPool: TestClient runs the app on its own event loop
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def _override_async_db():
+        async with factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = _override_async_db
+    token = create_access_token({"sub": "1"})
+    yield TestClient(app, headers={"Authorization": f"Bearer {token}"})
+    app.dependency_overrides.clear()
+
+
+# ---------------------------------------------------------------------------
+# ThreadedSession / auth
+# ---------------------------------------------------------------------------
+
+class TestThreadedSession:
+    async def test_queries_and_commit(self, sync_session):
+        db = ThreadedSession(sync_session)
+        site = (await db.execute(select(Site).where(Site.slug == "trattoria"))).scalar_one()
+        assert await db.scalar(select(Site.name).where(Site.id == site.id)) == "Trattoria"
+
+        site.name = "Trattoria da Mario"
+        await db.commit()
+        await db.refresh(site, ["name"])
+        assert site.name == "Trattoria da Mario"
+        assert await db.run_sync(lambda session, slug: session.query(Site).filter_by(slug=slug).count(), "trattoria") == 1
+        await db.close()
+
+    async def test_current_user_async(self, sync_session):
+        token = create_access_token({"sub": "1"})
+        user = await get_current_user_async(token=token, db=ThreadedSession(sync_session))
+        assert user.email == "mario@example.com"
+
+
+def _dependency_calls(dependant):
+    for dep in dependant.dependencies:
+        yield dep.call
+        yield from _dependency_calls(dep)
+
+
+def _offloads_sync_session(fn, seen=None) -> bool:
+    """The coroutine runs its sync queries in the threadpool, itself or in a helper it awaits."""
+    seen = seen if seen is not None else set()
+    seen.add(fn)
+    source = inspect.getsource(fn)
+    if "run_in_threadpool(" in source:
+        return True
+    awaited = (fn.__globals__.get(name) for name in re.findall(r"await (\w+)\(", source))
+    return any(
+        inspect.iscoroutinefunction(helper) and helper not in seen and _offloads_sync_session(helper, seen)
+        for helper in awaited
+    )
+
+
+def test_async_routes_offload_sync_session():
+    blocking = [
+        route.path for route in app.routes
+        if isinstance(route, APIRoute)
+        and inspect.iscoroutinefunction(route.endpoint)
+        and any(dep.call is get_db for dep in route.dependant.dependencies)
+        and not _offloads_sync_session(route.endpoint)
+    ]
+    assert blocking == []
+
+
+def test_async_dependencies_do_not_take_sync_session():
+    def _async_with_sync_session(dependant):
+        for dep in dependant.dependencies:
+            if inspect.iscoroutinefunction(dep.call) and any(d.call is get_db for d in dep.dependencies):
+                yield dep.call.__name__
+            yield from _async_with_sync_session(dep)
+
+    found = {name for route in app.routes if isinstance(route, APIRoute) for name in _async_with_sync_session(route.dependant)}
+    assert found == set()
+
+
+def test_routes_use_one_session_type():
+    mixed = [
+        route.path for route in app.routes
+        if isinstance(route, APIRoute)
+        and {get_db, get_async_db} <= set(_dependency_calls(route.dependant))
+    ]
+    assert mixed == []
+
+
+# ---------------------------------------------------------------------------
+# Async engine
+# ---------------------------------------------------------------------------
+
+class TestAsyncEngine:
+    async def _connect_kwargs(self, url, monkeypatch):
+        asyncpg = pytest.importorskip("asyncpg")
+        engine = _create_async_engine(url)
+        dbapi = engine.sync_engine.dialect.loaded_dbapi
+        adapter_kwargs, driver_kwargs = {}, {}
+        adapter_connect = dbapi.connect
+
+        def _adapter_connect(*args, **kwargs):
+            adapter_kwargs.update(kwargs)
+            return adapter_connect(*args, **kwargs)
+
+        async def _driver_connect(*args, **kwargs):
+            driver_kwargs.update(kwargs)
+            raise ConnectionRefusedError("nessun database nei test")
+
+        monkeypatch.setattr(dbapi, "connect", _adapter_connect)
+        monkeypatch.setattr(asyncpg, "connect", _driver_connect)
+        with pytest.raises(Exception):
+            async with engine.connect():
+                pass
+        await engine.dispose()
+        return engine, adapter_kwargs, driver_kwargs
+
+    async def test_behind_transaction_pooler(self, monkeypatch):
+        engine, adapter_kwargs, driver_kwargs = await self._connect_kwargs(
+            "postgresql://u:p@pooler.supabase.com:6543/postgres?pgbouncer=true", monkeypatch,
+        )
+        assert isinstance(engine.pool, NullPool)
+        assert adapter_kwargs["prepared_statement_cache_size"] == 0
+        name_func = adapter_kwargs["prepared_statement_name_func"]
+        assert name_func() != name_func()
+        assert driver_kwargs["statement_cache_size"] == 0 and driver_kwargs["ssl"] == "require"
+        assert "pgbouncer" not in driver_kwargs and "sslmode" not in driver_kwargs
+
+    async def test_direct_connection(self, monkeypatch):
+        engine, adapter_kwargs, driver_kwargs = await self._connect_kwargs(
+            "postgresql://u:p@db.supabase.co:5432/postgres?sslmode=verify-full", monkeypatch,
+        )
+        assert not isinstance(engine.pool, NullPool)
+        assert "prepared_statement_name_func" not in adapter_kwargs
+        assert driver_kwargs["ssl"] == "verify-full" and "statement_cache_size" not in driver_kwargs
+
+
+# ---------------------------------------------------------------------------
+# Routes on AsyncSession
+# ---------------------------------------------------------------------------
+
+class TestAsyncRoutes:
+    def test_get_site_legacy_inline_html(self, client):
+        resp = client.get("/api/sites/1")
+        assert resp.status_code == 200
+        assert resp.json()["html_content"] == PAGE
+
+    def test_update_site_html_to_blob_store(self, client, sync_session):
+        resp = client.put("/api/sites/1", json={"name": "Da Mario", "html_content": PAGE + "<!-- v2 -->"})
+        assert resp.status_code == 200 and resp.json()["name"] == "Da Mario"
+
+        site = sync_session.get(Site, 1)
+        assert site.html_ref.startswith("local:") and site.html_inline is None
+        assert client.get("/api/sites/1").json()["html_content"] == PAGE + "<!-- v2 -->"
+
+    def test_media_replace_image_saves_version(self, client, sync_session):
+        assert client.get("/api/media/sites/1/images").json()["images"][0]["src"] == "/a.jpg"
+
+        resp = client.put("/api/media/sites/1/replace-image", json={"old_src": "/a.jpg", "new_src": "/b.jpg"})
+        assert resp.status_code == 200
+        assert '<img src="/b.jpg"' in resp.json()["html_content"]
+
+        assert sync_session.get(Site, 1).html_ref
+        versions = sync_session.query(SiteVersion).filter_by(site_id=1).all()
+        assert [v.change_description for v in versions] == ["Sostituzione immagine"]
+
+    def test_other_users_site_not_found(self, client):
+        assert client.get("/api/sites/2").status_code == 404
+
+    def test_notification_email(self, client, sync_session):
+        resp = client.put("/api/sites/1/notification-email", json={"email": "Info@Trattoria.it "})
+        assert resp.status_code == 200 and resp.json()["email"] == "info@trattoria.it"
+
+        site = sync_session.get(Site, 1)
+        assert site.config["_notification_email"] == "info@trattoria.it"
+        assert site.html_ref and "to:'info@trattoria.it'" in site.get_html()
+        assert client.get("/api/sites/1/notification-email").json()["email"] == "info@trattoria.it"
+
+    def test_deploy_reads_html_once(self, client, sync_session, monkeypatch):
+        from app.api.routes import deploy
+
+        reads = []
+
+        async def _load(db, site):
+            reads.append(site.id)
+            return await load_site_html(db, site)
+
+        async def _deploy_to_vps(site, artifacts):
+            return {"url": f"https://{site.slug}.e-quipe.app", "deployment_id": "vps-test"}
+
+        monkeypatch.setattr(deploy, "load_site_html", _load)
+        monkeypatch.setattr(deploy, "_deploy_to_vps", _deploy_to_vps)
+        monkeypatch.setattr(settings, "DEPLOY_TARGET", "vps")
+        sync_session.get(User, 1).is_premium = True
+        sync_session.commit()
+
+        resp = client.post("/api/deploy/1")
+        assert resp.status_code == 200 and resp.json()["url"] == "https://trattoria.e-quipe.app"
+        assert reads == [1]
+        assert client.get("/api/deploy/1/status").json()["is_published"] is True
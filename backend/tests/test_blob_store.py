@@ -0,0 +1,337 @@
+"""Tests for the site HTML blob store (app/services/blob_store.py).
+
+Covers:
+- LocalBlobStore: content-addressed files, a second put skipped
+- R2BlobStore against a fake S3 client
+- Backend choice: inline by default, r2 only with a dedicated
+  HTML_BLOB_BUCKET (the public uploads bucket is refused)
+- put_html/get_html: "<backend>:<sha256>" references, LRU hits, the
+  backend named in the reference, invalid and corrupted blobs
+- BlobCache: bounded by size, least recently used evicted first
+- sweep_blobs: unreferenced blobs past the grace period deleted (local
+  and R2), referenced, recent and reused ones kept, dry run
+- Site: get_html/set_html through html_ref, the html_content column
+  deferred and left NULL, legacy rows read inline, inline without a blob
+  store and when the store fails
+"""
+
+import os
+import time
+import zlib
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.database import Base
+from app.models.site import Site
+from app.models.user import User
+from app.services import blob_store
+from app.services.blob_store import (
+    BlobCache,
+    BlobStoreError,
+    LocalBlobStore,
+    R2BlobStore,
+    blob_digest,
+    get_blob_cache,
+    get_html,
+    put_html,
+    reset_blob_store,
+    sweep_blobs,
+)
+
+PAGE = "<html><body><h1>Trattoria da Mario</h1>" + "<p>Cucina romana</p>" * 200 + "</body></html>"
+
+
+@pytest.fixture(autouse=True)
+def local_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "HTML_BLOB_STORE", "local")
+    monkeypatch.setattr(settings, "HTML_BLOB_DIR", str(tmp_path))
+    reset_blob_store()
+    yield tmp_path
+    reset_blob_store()
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+        self.modified = {}
+        self.puts = 0
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise KeyError(Key)
+        return {"LastModified": self.modified[(Bucket, Key)]}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.puts += 1
+        self.objects[(Bucket, Key)] = Body
+        self.modified[(Bucket, Key)] = datetime.now(timezone.utc)
+
+    def copy_object(self, Bucket, Key, CopySource, **kwargs):
+        self.objects[(Bucket, Key)] = self.objects[(CopySource["Bucket"], CopySource["Key"])]
+        self.modified[(Bucket, Key)] = datetime.now(timezone.utc)
+
+    def get_object(self, Bucket, Key):
+        import io
+
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def get_paginator(self, operation):
+        s3 = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                yield {"Contents": [
+                    {"Key": key, "LastModified": s3.modified[(bucket, key)]}
+                    for bucket, key in s3.objects if bucket == Bucket and key.startswith(Prefix)
+                ]}
+
+        return Paginator()
+
+
+class TestBackends:
+    def test_local(self, local_store):
+        store = LocalBlobStore()
+        digest = blob_digest(b"abc")
+        store.put(digest, b"abc")
+        assert (local_store / digest[:2] / digest).read_bytes() == b"abc"
+        store.put(digest, b"other")
+        assert store.get(digest) == b"abc"
+        with pytest.raises(BlobStoreError):
+            store.get(blob_digest(b"missing"))
+
+    def test_r2(self, monkeypatch):
+        from app.services import r2_storage
+
+        s3 = FakeS3()
+        monkeypatch.setattr(r2_storage, "_get_s3_client", lambda: s3)
+        store = R2BlobStore(bucket="private-html")
+        store.put("d1", b"abc")
+        store.put("d1", b"abc")
+        assert s3.puts == 1 and s3.objects[("private-html", "site-html/d1")] == b"abc"
+        assert store.get("d1") == b"abc"
+        with pytest.raises(BlobStoreError):
+            store.get("d2")
+        monkeypatch.setattr(r2_storage, "_get_s3_client", lambda: None)
+        with pytest.raises(BlobStoreError):
+            store.put("d3", b"x")
+
+
+class TestBackendChoice:
+    @pytest.fixture
+    def r2(self, monkeypatch):
+        from app.services import r2_storage
+
+        monkeypatch.setattr(settings, "HTML_BLOB_STORE", "")
+        monkeypatch.setattr(r2_storage, "is_r2_available", lambda: True)
+        reset_blob_store()
+
+    def test_inline_by_default(self, r2, monkeypatch):
+        monkeypatch.setattr(settings, "HTML_BLOB_BUCKET", "")
+        assert blob_store.get_blob_store() is None
+        assert put_html(PAGE) is None
+
+    def test_r2_with_dedicated_bucket(self, r2, monkeypatch):
+        monkeypatch.setattr(settings, "HTML_BLOB_BUCKET", "site-html-private")
+        store = blob_store.get_blob_store()
+        assert store.name == "r2" and store.bucket == "site-html-private"
+
+    def test_public_uploads_bucket_refused(self, r2, monkeypatch):
+        monkeypatch.setattr(settings, "HTML_BLOB_STORE", "r2")
+        monkeypatch.setattr(settings, "HTML_BLOB_BUCKET", settings.R2_BUCKET_NAME)
+        assert blob_store.get_blob_store() is None
+        with pytest.raises(BlobStoreError, match="pubblico"):
+            R2BlobStore()
+
+
+# ---------------------------------------------------------------------------
+# HTML references
+# ---------------------------------------------------------------------------
+
+class TestHtml:
+    def test_round_trip(self, local_store):
+        ref = put_html(PAGE)
+        digest = blob_digest(PAGE.encode("utf-8"))
+        assert ref == f"local:{digest}"
+        stored = (local_store / digest[:2] / digest).read_bytes()
+        assert zlib.decompress(stored) == PAGE.encode("utf-8") and len(stored) < len(PAGE) / 10
+        assert put_html(PAGE) == ref
+
+        get_blob_cache().clear()
+        assert get_html(ref) == PAGE
+        (local_store / digest[:2] / digest).unlink()
+        assert get_html(ref) == PAGE
+        assert get_blob_cache().stats()["hits"] == 1
+
+    def test_reference_backend_is_read(self, monkeypatch):
+        ref = put_html(PAGE)
+        get_blob_cache().clear()
+        monkeypatch.setattr(blob_store, "get_blob_store", lambda: R2BlobStore(bucket="private-html"))
+        assert get_html(ref) == PAGE
+
+    def test_bad_blobs(self, local_store):
+        for ref in ("nope", "s3:abc", "local:"):
+            with pytest.raises(BlobStoreError):
+                get_html(ref)
+        digest = blob_digest(PAGE.encode("utf-8"))
+        LocalBlobStore().put(digest, zlib.compress(b"tampered"))
+        with pytest.raises(BlobStoreError, match="hash"):
+            get_html(f"local:{digest}")
+        with pytest.raises(BlobStoreError):
+            get_html(f"local:{blob_digest(b'missing')}")
+
+
+def test_cache_bounded():
+    cache = BlobCache(max_bytes=10)
+    cache.put("a", "xxxx")
+    cache.put("b", "yyyy")
+    assert cache.get("a") == "xxxx"
+    cache.put("c", "zzzz")
+    assert cache.get("b") is None and cache.get("a") and cache.get("c")
+    cache.put("huge", "x" * 11)
+    assert cache.get("huge") is None
+    assert cache.stats()["size"] == 8
+
+
+# ---------------------------------------------------------------------------
+# Site model
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__, Site.__table__])
+    session = sessionmaker(bind=engine, autoflush=False)()
+    user = User(email="mario@example.com", hashed_password="x")
+    session.add(user)
+    session.flush()
+    session.info["owner_id"] = user.id
+    yield session
+    session.close()
+
+
+class TestSite:
+    def test_html_in_blob_store(self, db):
+        site = Site(name="Trattoria", slug="trattoria", owner_id=db.info["owner_id"])
+        site.set_html(PAGE)
+        db.add(site)
+        db.commit()
+        assert site.html_ref.startswith("local:") and site.has_html
+        row = db.execute(Site.__table__.select()).mappings().one()
+        assert row["html_content"] is None and row["html_ref"] == site.html_ref
+
+        statements = []
+        event.listen(db.bind, "before_cursor_execute", lambda *a: statements.append(a[2]))
+        db.expunge_all()
+        site = db.query(Site).one()
+        assert "html_content" not in statements[-1]
+        get_blob_cache().clear()
+        assert site.get_html() == PAGE
+
+        site.set_html(None)
+        assert site.html_ref is None and not site.has_html
+
+    def test_legacy_row(self, db):
+        db.execute(Site.__table__.insert().values(
+            name="Legacy", slug="legacy", owner_id=db.info["owner_id"], html_content=PAGE,
+        ))
+        site = db.query(Site).one()
+        assert site.html_ref is None and site.has_html and site.get_html() == PAGE
+
+    def test_inline_without_blob_store(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "HTML_BLOB_STORE", "inline")
+        reset_blob_store()
+        site = Site(name="Trattoria", slug="trattoria", owner_id=db.info["owner_id"])
+        site.set_html(PAGE)
+        assert site.html_ref is None and site.html_inline == PAGE and site.get_html() == PAGE
+
+    def test_store_failure_keeps_inline(self, db, monkeypatch):
+        def fail(digest, data):
+            raise BlobStoreError("disco pieno")
+
+        monkeypatch.setattr(blob_store.get_blob_store(), "put", fail)
+        site = Site(name="Trattoria", slug="trattoria", owner_id=db.info["owner_id"])
+        site.set_html(PAGE)
+        assert site.html_ref is None and site.html_inline == PAGE and site.get_html() == PAGE
+
+
+# ---------------------------------------------------------------------------
+# Garbage collection
+# ---------------------------------------------------------------------------
+
+OTHER_PAGE = PAGE.replace("Mario", "Gino")
+DAY = 24 * 3600
+
+
+def _age(local_store, ref: str, seconds: float) -> None:
+    digest = ref.partition(":")[2]
+    past = time.time() - seconds
+    os.utime(local_store / digest[:2] / digest, (past, past))
+
+
+class TestSweep:
+    def test_unreferenced_blobs_deleted(self, local_store):
+        kept, old = put_html(PAGE), put_html(OTHER_PAGE)
+        recent = put_html(PAGE + "<!-- bozza -->")
+        for ref in (kept, old):
+            _age(local_store, ref, 2 * DAY)
+
+        assert sweep_blobs([kept, None], dry_run=True)["deleted"] == 1
+        assert sweep_blobs([kept, None]) == {"blobs": 3, "referenced": 1, "recent": 1, "deleted": 1}
+        get_blob_cache().clear()
+        assert get_html(kept) == PAGE and get_html(recent)
+        with pytest.raises(BlobStoreError):
+            get_html(old)
+
+    def test_reused_blob_kept(self, local_store):
+        ref = put_html(PAGE)
+        _age(local_store, ref, 2 * DAY)
+        assert put_html(PAGE) == ref  # a new save of the same page
+        assert sweep_blobs([])["deleted"] == 0
+        assert sweep_blobs([], min_age=0)["deleted"] == 1
+
+    def test_replaced_site_html(self, db, local_store):
+        site = Site(name="Trattoria", slug="trattoria", owner_id=db.info["owner_id"])
+        site.set_html(PAGE)
+        db.add(site)
+        db.commit()
+        previous = site.html_ref
+        site.set_html(OTHER_PAGE)
+        db.commit()
+        for ref in (previous, site.html_ref):
+            _age(local_store, ref, 2 * DAY)
+
+        referenced = {ref for (ref,) in db.query(Site.html_ref).filter(Site.html_ref.isnot(None))}
+        assert sweep_blobs(referenced)["deleted"] == 1
+        get_blob_cache().clear()
+        assert site.get_html() == OTHER_PAGE
+        with pytest.raises(BlobStoreError):
+            get_html(previous)
+
+    def test_r2(self, monkeypatch):
+        from app.services import r2_storage
+
+        s3 = FakeS3()
+        monkeypatch.setattr(r2_storage, "_get_s3_client", lambda: s3)
+        monkeypatch.setattr(blob_store, "get_blob_store", lambda: R2BlobStore(bucket="private-html"))
+        kept, old = put_html(PAGE), put_html(OTHER_PAGE)
+        assert kept.startswith("r2:")
+        assert sweep_blobs([kept], min_age=0)["deleted"] == 1
+        assert list(s3.objects) == [("private-html", "site-html/" + kept[3:])]
+        assert sweep_blobs([kept])["deleted"] == 0
+
+    def test_needs_a_blob_store(self, monkeypatch):
+        monkeypatch.setattr(settings, "HTML_BLOB_STORE", "inline")
+        reset_blob_store()
+        with pytest.raises(BlobStoreError):
+            sweep_blobs([])
@@ -0,0 +1,179 @@
+"""Tests for the startup database initialization (app/core/bootstrap.py).
+
+Covers:
+- ensure_schema: full run on a fresh DB, then skipped with a single SELECT
+  while the schema marker matches; rerun when the models or the migration
+  list change, or when forced
+- run_startup_seeds: DB seeds once per SEED_VERSION, marker not written
+  when a seed fails or the stop signal interrupts it
+- StartupSeeds: design knowledge not ready while the thread runs, stop()
+  signals the thread and waits for it
+- StartupTimer: phases in order, summary line
+"""
+
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, event
+
+from app.core import bootstrap
+from app.core.bootstrap import (
+    SCHEMA_MARKER,
+    SEED_MARKER,
+    SEED_VERSION,
+    StartupSeeds,
+    StartupTimer,
+    ensure_schema,
+    read_marker,
+    run_startup_seeds,
+    schema_fingerprint,
+)
+from app.models.app_state import AppState
+from app.services import design_knowledge
+
+
+def _metadata(*extra_columns):
+    metadata = MetaData()
+    AppState.__table__.to_metadata(metadata)
+    Table("menu_items", metadata, Column("id", Integer, primary_key=True), Column("name", String), *extra_columns)
+    return metadata
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def statements(engine):
+    captured = []
+    event.listen(engine, "before_cursor_execute", lambda *args: captured.append(args[2]))
+    return captured
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+
+class TestEnsureSchema:
+    def test_runs_once_then_skipped(self, engine, statements):
+        metadata = _metadata()
+        timer = StartupTimer()
+        assert ensure_schema(engine, metadata, timer) is True
+        assert read_marker(engine, SCHEMA_MARKER) == schema_fingerprint(metadata)
+        assert "create_all" in timer.phases
+
+        statements.clear()
+        timer = StartupTimer()
+        assert ensure_schema(engine, metadata, timer) is False
+        assert len(statements) == 1 and statements[0].startswith("SELECT")
+        assert list(timer.phases) == ["schema_marker"]
+
+    def test_rerun_when_models_change(self, engine):
+        ensure_schema(engine, _metadata(), StartupTimer())
+        changed = _metadata(Column("price", Integer))
+        assert ensure_schema(engine, changed, StartupTimer()) is True
+        assert ensure_schema(engine, changed, StartupTimer()) is False
+
+    def test_rerun_when_migrations_change(self, engine, monkeypatch):
+        metadata = _metadata()
+        ensure_schema(engine, metadata, StartupTimer())
+        monkeypatch.setattr(bootstrap, "SCHEMA_MIGRATIONS", bootstrap.SCHEMA_MIGRATIONS + [
+            "ALTER TABLE menu_items ADD COLUMN IF NOT EXISTS price INTEGER",
+        ])
+        assert ensure_schema(engine, metadata, StartupTimer()) is True
+
+    def test_force(self, engine):
+        metadata = _metadata()
+        ensure_schema(engine, metadata, StartupTimer())
+        assert ensure_schema(engine, metadata, StartupTimer(), force=True) is True
+
+
+# ---------------------------------------------------------------------------
+# Seeds
+# ---------------------------------------------------------------------------
+
+class TestStartupSeeds:
+    @pytest.fixture
+    def seeds(self, engine, monkeypatch):
+        from app.services import seed_category_blueprints, seed_services
+
+        ensure_schema(engine, _metadata(), StartupTimer())
+        calls = []
+        monkeypatch.setattr(seed_services, "seed_service_catalog", lambda: calls.append("services"))
+        monkeypatch.setattr(seed_category_blueprints, "seed_category_blueprints", lambda: calls.append("blueprints"))
+        monkeypatch.setattr(bootstrap, "_seed_design_knowledge", lambda stop: calls.append("design_knowledge"))
+        return calls
+
+    def test_db_seeds_once_per_version(self, engine, seeds, monkeypatch):
+        phases = run_startup_seeds(engine)
+        assert seeds == ["services", "blueprints", "design_knowledge"]
+        assert read_marker(engine, SEED_MARKER) == str(SEED_VERSION)
+        assert "seed_db" in phases
+
+        seeds.clear()
+        run_startup_seeds(engine)
+        assert seeds == ["design_knowledge"]
+
+        monkeypatch.setattr(bootstrap, "SEED_VERSION", SEED_VERSION + 1)
+        run_startup_seeds(engine)
+        assert seeds == ["design_knowledge", "services", "blueprints", "design_knowledge"]
+
+    def test_failed_seed_retried_next_boot(self, engine, seeds, monkeypatch):
+        from app.services import seed_services
+
+        def _fail():
+            raise RuntimeError("service_catalog non raggiungibile")
+
+        monkeypatch.setattr(seed_services, "seed_service_catalog", _fail)
+        run_startup_seeds(engine)
+        assert read_marker(engine, SEED_MARKER) is None
+
+    def test_stop_between_steps(self, engine, seeds, monkeypatch):
+        from app.services import seed_services
+
+        stop = threading.Event()
+        monkeypatch.setattr(seed_services, "seed_service_catalog", lambda: (seeds.append("services"), stop.set()))
+        run_startup_seeds(engine, stop=stop)
+        assert seeds == ["services"]
+        assert read_marker(engine, SEED_MARKER) is None
+        assert design_knowledge.is_ready()
+
+    async def test_startup_seeds_lifecycle(self, engine, seeds, monkeypatch):
+        started, release = threading.Event(), threading.Event()
+        readiness = []
+
+        def _slow_design_knowledge(stop):
+            started.set()
+            readiness.append(design_knowledge.is_ready())
+            release.wait(5)
+            readiness.append(stop.is_set())
+
+        monkeypatch.setattr(bootstrap, "_seed_design_knowledge", _slow_design_knowledge)
+        runner = StartupSeeds(engine)
+        runner.start()
+        assert not design_knowledge.is_ready()
+        await asyncio.to_thread(started.wait, 5)
+        assert await runner.stop(timeout=0.05) is False
+
+        release.set()
+        assert await runner.stop(timeout=5) is True
+        assert runner.done and readiness == [False, True]
+        assert design_knowledge.is_ready()
+
+
+# ---------------------------------------------------------------------------
+# Timer
+# ---------------------------------------------------------------------------
+
+def test_startup_timer():
+    timer = StartupTimer()
+    timer.record("import_app", 1.2)
+    with timer.phase("create_all"):
+        pass
+    assert list(timer.phases) == ["import_app", "create_all"]
+    assert timer.phases["import_app"] == 1200.0
+    assert timer.summary().startswith("import_app 1200ms, create_all 0ms, totale ")
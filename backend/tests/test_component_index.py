@@ -0,0 +1,128 @@
+"""Tests for the binary component registry index (components.idx).
+
+Covers:
+- Round trip: index contents equal components.json
+- Lazy decoding: only touched categories are decoded
+- Stale/missing index falls back to parsing the JSON
+- Shared singleton per components directory
+- TemplateAssembler.registry built once; ResourceCatalog loads without
+  decoding any category
+"""
+
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from app.services.component_index import (
+    INDEX_FILENAME,
+    REGISTRY_FILENAME,
+    ComponentIndex,
+    build_index,
+    get_component_index,
+    reset_component_index,
+)
+from app.services.resource_catalog import ResourceCatalog
+from app.services.template_assembler import TemplateAssembler
+
+REAL_COMPONENTS = Path(__file__).parent.parent / "app" / "components"
+REAL_REGISTRY = REAL_COMPONENTS / REGISTRY_FILENAME
+
+
+@pytest.fixture
+def components_dir(tmp_path: Path) -> Path:
+    shutil.copy(REAL_REGISTRY, tmp_path / REGISTRY_FILENAME)
+    build_index(tmp_path)
+    return tmp_path
+
+
+def test_round_trip_matches_json(components_dir: Path) -> None:
+    index = ComponentIndex(components_dir)
+    assert index.source == "index"
+    registry = json.loads(REAL_REGISTRY.read_text(encoding="utf-8"))
+    assert index.to_registry() == registry
+    assert index.version == registry["version"]
+
+
+def test_only_touched_categories_are_decoded(components_dir: Path) -> None:
+    index = ComponentIndex(components_dir)
+    assert "hero" in index.categories()
+    assert index.variant_ids("hero")[0] == "hero-split-01"
+    assert index.decoded_categories() == []
+
+    variant = index.get_variant("hero-split-01")
+    assert variant["file"] == "hero/hero-split-01.html"
+    assert "HERO_TITLE" in index.placeholders("hero-split-01")
+    assert index.decoded_categories() == ["hero"]
+    assert index.get_variant("does-not-exist") is None
+
+
+def test_category_meta_without_variants(components_dir: Path) -> None:
+    index = ComponentIndex(components_dir)
+    meta = index.category_meta("hero")
+    assert meta == {"label": "Hero", "required": True}
+
+
+def test_stale_index_falls_back_to_json(components_dir: Path) -> None:
+    registry_path = components_dir / REGISTRY_FILENAME
+    registry = json.loads(registry_path.read_text(encoding="utf-8"))
+    registry["categories"]["hero"]["variants"].append(
+        {"id": "hero-new-01", "file": "hero/hero-new-01.html", "placeholders": []}
+    )
+    registry_path.write_text(json.dumps(registry), encoding="utf-8")
+
+    index = ComponentIndex(components_dir)
+    assert index.source == "json"
+    assert index.variant_file("hero-new-01") == "hero/hero-new-01.html"
+
+    build_index(components_dir)
+    rebuilt = ComponentIndex(components_dir)
+    assert rebuilt.source == "index"
+    assert rebuilt.variant_file("hero-new-01") == "hero/hero-new-01.html"
+
+
+def test_missing_index_falls_back_to_json(components_dir: Path) -> None:
+    (components_dir / INDEX_FILENAME).unlink()
+    index = ComponentIndex(components_dir)
+    assert index.source == "json"
+    assert index.variant_ids("hero")[0] == "hero-split-01"
+
+
+def test_shared_singleton(components_dir: Path) -> None:
+    reset_component_index()
+    first = get_component_index(components_dir)
+    assert get_component_index(str(components_dir)) is first
+    assembler = TemplateAssembler(components_dir=str(components_dir))
+    assert assembler.index is first
+    assert assembler._find_variant_file("hero-split-01") == "hero/hero-split-01.html"
+    assert assembler.get_default_variant_for_section("hero") == "hero-split-01"
+    reset_component_index()
+
+
+def test_assembler_registry_is_built_once(components_dir: Path) -> None:
+    assembler = TemplateAssembler(components_dir=str(components_dir))
+    registry = assembler.registry
+    assert assembler.registry is registry
+    assert registry["categories"]["hero"]["variants"][0]["id"] == "hero-split-01"
+
+
+def test_catalog_merges_registry_lazily(components_dir: Path) -> None:
+    for rel in ("hero/hero-split-01.html", "about/about-magazine-01.html"):
+        (components_dir / rel).parent.mkdir(exist_ok=True)
+        shutil.copy(REAL_COMPONENTS / rel, components_dir / rel)
+
+    catalog = ResourceCatalog(str(components_dir))
+    index = get_component_index(components_dir)
+    assert catalog.get_all_variant_ids() == ["about-magazine-01", "hero-split-01"]
+    assert index.decoded_categories() == []
+
+    meta = catalog.get_component_metadata("hero-split-01")
+    registry_entry = index.get_variant("hero-split-01")
+    assert meta["name"] == registry_entry["name"]
+    assert meta["tags"] == registry_entry["tags"]
+    assert meta["registry_placeholders"] == registry_entry["placeholders"]
+    assert "HERO_TITLE" in meta["placeholders"]
+    assert index.decoded_categories() == ["hero"]
+    assert catalog.get_component_metadata("does-not-exist") is None
+    reset_component_index()
@@ -0,0 +1,206 @@
+"""Tests for the deploy-time minifier and precompressed artifacts (app/services/deploy_optimizer.py).
+
+Covers:
+- minify_html: comments and whitespace dropped, conditional comments,
+  <pre>/<textarea>/whitespace-pre text and data-* attributes kept
+- minify_css: comments, spacing around punctuation, descendant :hover,
+  empty custom properties, /*! comments, strings and url()
+- minify_js: comments, regex vs division, template literals with ${},
+  strings, newlines kept for automatic semicolon insertion
+- JSON scripts re-serialized compactly, unknown script types untouched
+- Unterminated input left as it is
+- optimize_for_deploy: report stages, gzip round-trip, an assembled page
+  with the same element structure after minification
+- Bundle.payload(): the uploaded bundles are minified
+"""
+
+import gzip
+from html.parser import HTMLParser
+
+import pytest
+
+from app.services.asset_bundles import page_bundles
+from app.services.deploy_optimizer import (
+    minify_css,
+    minify_html,
+    minify_js,
+    optimize_for_deploy,
+    precompress,
+)
+from app.services.template_assembler import SectionRenderCache, TemplateAssembler
+
+
+class _Structure(HTMLParser):
+    """Start/end tags with their attributes, in document order."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.events = []
+
+    def handle_starttag(self, tag, attrs):
+        self.events.append(("start", tag, tuple(attrs)))
+
+    def handle_endtag(self, tag):
+        self.events.append(("end", tag))
+
+
+def _structure(html: str) -> list:
+    parser = _Structure()
+    parser.feed(html)
+    parser.close()
+    return parser.events
+
+
+# ---------------------------------------------------------------------------
+# HTML
+# ---------------------------------------------------------------------------
+
+class TestMinifyHtml:
+    def test_comments_and_whitespace(self):
+        html = "<div>\n    <!-- section -->\n    <p>Ciao   <b>mondo</b>  </p>\n\n</div>"
+        assert minify_html(html) == "<div>\n<p>Ciao <b>mondo</b> </p>\n</div>"
+
+    def test_conditional_comments_kept(self):
+        html = "<head><!--[if lt IE 9]><script src=x.js></script><![endif]--></head>"
+        assert minify_html(html) == html
+
+    def test_preformatted_text_kept(self):
+        html = (
+            "<pre>  a\n    b</pre>\n  <textarea>  x\n\n y</textarea>"
+            '<p class="whitespace-pre-line">riga 1\n\n  riga 2</p>'
+            '<div style="white-space: pre">  <span>a  b</span>  </div>'
+        )
+        out = minify_html(html)
+        assert "<pre>  a\n    b</pre>" in out
+        assert "<textarea>  x\n\n y</textarea>" in out
+        assert "riga 1\n\n  riga 2" in out
+        assert "<span>a  b</span>  </div>" in out
+
+    def test_attributes_copied_as_they_are(self):
+        html = '<div  data-animate="fade-up"   data-delay="0.2" class="a  b" title="x > y">  t </div>'
+        out = minify_html(html)
+        assert '<div  data-animate="fade-up"   data-delay="0.2" class="a  b" title="x > y">' in out
+        assert _structure(out) == _structure(html)
+
+    def test_style_and_script_contents_minified(self):
+        html = "<style>\n  p {\n    color: red;\n  }\n</style><script>\n  // init\n  var a = 1;\n</script>"
+        assert minify_html(html) == "<style>p{color:red}</style><script>var a = 1;</script>"
+
+    def test_json_scripts_compacted(self):
+        html = '<script type="application/ld+json">\n{\n  "@type": "Restaurant",\n  "url": "</x>"\n}\n</script>'
+        assert minify_html(html) == '<script type="application/ld+json">{"@type":"Restaurant","url":"<\\/x>"}</script>'
+
+    def test_other_script_types_untouched(self):
+        html = '<script type="text/x-template">\n  <p>  {{ a }}  </p>\n</script>'
+        assert minify_html(html) == html
+
+    def test_unterminated_input(self):
+        assert minify_html("<p>a  b<!-- never   closed") == "<p>a b<!-- never   closed"
+        assert minify_html("<p>a</p><script>  var a  =  1") == "<p>a</p><script>  var a  =  1"
+        assert minify_html('<p>a  b</p><div title="a  >') == '<p>a b</p><div title="a  >'
+
+
+# ---------------------------------------------------------------------------
+# CSS
+# ---------------------------------------------------------------------------
+
+class TestMinifyCss:
+    def test_punctuation_and_comments(self):
+        css = "/* reset */\n.a ,\n.b {\n  margin: 0 auto ;\n  color: red;\n}\n"
+        assert minify_css(css) == ".a,.b{margin:0 auto;color:red}"
+
+    def test_descendant_selectors_keep_their_space(self):
+        assert minify_css("a :hover { x: 1 }") == "a :hover{x:1}"
+        assert minify_css(".nav   a:hover > span { x: 1 }") == ".nav a:hover > span{x:1}"
+
+    def test_empty_custom_property(self):
+        assert minify_css(":root { --tw-x: ; --y: 1 }") == ":root{--tw-x: ;--y:1}"
+
+    def test_kept_verbatim(self):
+        css = "/*! licence */ a { content: \"  a ; b \"; background: url( 'x y.png' ) }"
+        out = minify_css(css)
+        assert out.startswith("/*! licence */")
+        assert '"  a ; b "' in out and "url( 'x y.png' )" in out
+
+    def test_calc_spaces(self):
+        assert minify_css("a { width: calc(100% - 2rem) }") == "a{width:calc(100% - 2rem)}"
+
+
+# ---------------------------------------------------------------------------
+# JS
+# ---------------------------------------------------------------------------
+
+class TestMinifyJs:
+    def test_comments_and_indentation(self):
+        js = "// top\nfunction f() {\n    /* inner */\n    return 1;\n}\n\n\nf();"
+        assert minify_js(js) == "function f() {\nreturn 1;\n}\nf();"
+
+    def test_newlines_kept_for_asi(self):
+        js = "var a = b\n(c)\nvar d = e\n/* x\n y */ f()"
+        out = minify_js(js)
+        assert out == "var a = b\n(c)\nvar d = e\nf()"
+
+    def test_regex_and_division(self):
+        js = "var r = /a\\/b  c[/]/g; var d = x / 2 / y;  var s = s.replace(/ +/g, ' ');"
+        out = minify_js(js)
+        assert "/a\\/b  c[/]/g" in out and "x / 2 / y" in out and "/ +/g" in out
+
+    def test_strings_and_templates(self):
+        js = "var a = '  // not a comment  '; var t = `  ${ f(`  in ${x}  `) }  /* kept */ `;"
+        out = minify_js(js)
+        assert "'  // not a comment  '" in out
+        assert "`  ${ f(`  in ${x}  `) }  /* kept */ `" in out
+
+    def test_licence_comments_kept(self):
+        assert minify_js("/*! GSAP */\nvar a;").startswith("/*! GSAP */")
+
+    def test_unterminated_input(self):
+        for js in ("var a = 'open", "var t = `open ${", "var r = /open", "/* open"):
+            minify_js(js)
+
+
+# ---------------------------------------------------------------------------
+# Artifacts
+# ---------------------------------------------------------------------------
+
+@pytest.fixture(scope="module")
+def page():
+    assembler = TemplateAssembler(section_cache=SectionRenderCache(max_size=0))
+    return assembler.assemble({
+        "theme": {"primary_color": "#c8102e"},
+        "meta": {"title": "Trattoria"},
+        "global": {"BUSINESS_NAME": "Trattoria"},
+        "_animation_seed": 41,
+        "components": [{"variant_id": "hero-split-01", "data": {}}, {"variant_id": "contact-form-01", "data": {}}],
+    })
+
+
+class TestOptimizeForDeploy:
+    def test_report_stages(self, page):
+        artifacts = optimize_for_deploy(page)
+        stages = [s["stage"] for s in artifacts.report]
+        assert stages[:3] == ["original", "minify", "gzip"]
+        original, minify, gz = artifacts.report[:3]
+        assert original["bytes"] == len(page.encode("utf-8"))
+        assert minify["bytes"] == len(artifacts.html.encode("utf-8")) < original["bytes"]
+        assert minify["saved_bytes"] == original["bytes"] - minify["bytes"]
+        assert gz["bytes"] == len(artifacts.compressed["gz"])
+
+    def test_bundles_stage(self):
+        artifacts = optimize_for_deploy("<p>a</p>", source_bytes=100)
+        assert artifacts.report[:2] == [
+            {"stage": "original", "bytes": 100, "saved_bytes": 0},
+            {"stage": "bundles", "bytes": 8, "saved_bytes": 92},
+        ]
+
+    def test_gzip_round_trip(self, page):
+        artifacts = optimize_for_deploy(page)
+        assert gzip.decompress(artifacts.compressed["gz"]).decode("utf-8") == artifacts.html
+        assert precompress(b"x")["gz"] == precompress(b"x")["gz"]  # mtime=0: reproducible
+
+    def test_structure_unchanged(self, page):
+        assert _structure(optimize_for_deploy(page).html) == _structure(page)
+
+    def test_minified_bundles_uploaded(self, page):
+        for bundle in page_bundles(page):
+            assert len(bundle.payload()) < len(bundle.content.encode("utf-8"))
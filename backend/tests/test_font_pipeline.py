@@ -0,0 +1,253 @@
+"""Tests for the self-hosted web fonts (app/services/font_pipeline.py).
+
+Covers:
+- parse_google_fonts_url: families and weights, default 400, italic and
+  range specs not self-hostable
+- page_codepoints: text and alt/placeholder outside <script>/<style>,
+  plus Latin-1
+- subset_woff2: WOFF2 output keeping only the requested glyphs
+- self_host_fonts: Google link replaced by @font-face rules (swap) and
+  WOFF2 bundles, preconnects dropped, non-vendored families kept on a
+  reduced Google link, broken files falling back to Google
+- publish_bundles uploading the font bundles with the page, Google Fonts
+  kept while the store doesn't send Access-Control-Allow-Origin
+- _check_font_urls: self-hosted pages validated against the theme,
+  missing vendored weights and uncovered characters reported
+"""
+
+import asyncio
+import io
+import json
+
+import pytest
+
+pytest.importorskip("fontTools")
+pytest.importorskip("brotli")
+
+from fontTools.fontBuilder import FontBuilder  # noqa: E402
+from fontTools.pens.ttGlyphPen import TTGlyphPen  # noqa: E402
+from fontTools.ttLib import TTFont  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.services import asset_bundles, font_pipeline  # noqa: E402
+from app.services.asset_bundles import publish_bundles, reset_published_bundles  # noqa: E402
+from app.services.font_pipeline import (  # noqa: E402
+    LATIN_1,
+    FontLibrary,
+    font_filename,
+    page_codepoints,
+    parse_google_fonts_url,
+    self_host_fonts,
+    subset_woff2,
+)
+from app.services.pre_delivery_check import PreDeliveryCheck  # noqa: E402
+
+BASE = "https://assets.e-quipe.app"
+GOOGLE_LINK = (
+    '<link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;700'
+    '&family=Playfair+Display:wght@400&display=swap" rel="stylesheet">'
+)
+HEAD = (
+    '<head>\n  <link rel="preconnect" href="https://fonts.googleapis.com">\n'
+    '  <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>\n'
+    f"  {GOOGLE_LINK}\n</head>"
+)
+
+
+def _font(family: str, chars: str) -> bytes:
+    """A TrueType font with a square glyph for each of chars."""
+    names = [".notdef"] + [f"uni{ord(c):04X}" for c in chars]
+    pen = TTGlyphPen(None)
+    pen.moveTo((0, 0))
+    pen.lineTo((0, 500))
+    pen.lineTo((400, 500))
+    pen.lineTo((400, 0))
+    pen.closePath()
+    square = pen.glyph()
+    fb = FontBuilder(1000, isTTF=True)
+    fb.setupGlyphOrder(names)
+    fb.setupCharacterMap({ord(c): f"uni{ord(c):04X}" for c in chars})
+    fb.setupGlyf({name: square for name in names})
+    fb.setupHorizontalMetrics({name: (500, 0) for name in names})
+    fb.setupHorizontalHeader(ascent=800, descent=-200)
+    fb.setupNameTable({"familyName": family, "styleName": "Regular"})
+    fb.setupOS2()
+    fb.setupPost()
+    buffer = io.BytesIO()
+    fb.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def library(tmp_path):
+    chars = "".join(map(chr, sorted(LATIN_1))) + "’—ā"
+    manifest = {}
+    for family, weights in (("Inter", (400, 700)), ("Playfair Display", (400,))):
+        manifest[family] = {}
+        for weight in weights:
+            (tmp_path / font_filename(family, weight)).write_bytes(_font(family, chars))
+            manifest[family][str(weight)] = font_filename(family, weight)
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    font_pipeline.cmap.cache_clear()
+    font_pipeline.subset_woff2.cache_clear()
+    return FontLibrary(tmp_path)
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+class TestParsing:
+    def test_google_fonts_url(self):
+        specs = parse_google_fonts_url(
+            "https://fonts.googleapis.com/css2?family=Playfair+Display:wght@700;400"
+            "&family=Inter&family=Lora:ital,wght@0,400;1,400&family=Sora:wght@100..800&display=swap"
+        )
+        assert [(s.family, s.weights) for s in specs] == [
+            ("Playfair Display", (400, 700)), ("Inter", (400,)), ("Lora", ()), ("Sora", ()),
+        ]
+
+    def test_page_codepoints(self):
+        html = (
+            '<style>.x{content:"ж"}</style><script>var s = "ж";</script>'
+            '<p>Caffè ā</p><img alt="Ω"><input placeholder="Ψ">'
+        )
+        codepoints = page_codepoints(html)
+        assert {ord("ā"), ord("Ω"), ord("Ψ")} <= codepoints and LATIN_1 <= codepoints
+        assert ord("ж") not in codepoints
+
+
+# ---------------------------------------------------------------------------
+# Subsetting
+# ---------------------------------------------------------------------------
+
+class TestSubset:
+    def test_woff2_subset(self, library):
+        path = library.path("Inter", 400)
+        woff2 = subset_woff2(path, frozenset(map(ord, "Ciao ā")))
+        assert woff2[:4] == b"wOF2"
+        font = TTFont(io.BytesIO(woff2))
+        assert set(font.getBestCmap()) == set(map(ord, "Ciao ā"))
+        assert len(woff2) < path.stat().st_size
+
+    def test_self_host_fonts(self, library):
+        html = f"{HEAD}<body><h1>Caffè — ā</h1></body>"
+        out, bundles = self_host_fonts(html, BASE, library)
+        assert "fonts.googleapis.com" not in out and "fonts.gstatic.com" not in out
+        assert [b.filename.split(".")[0] for b in bundles] == [
+            "font-inter-400", "font-inter-700", "font-playfair-display-400",
+        ]
+        assert all(b.ext == "woff2" and b.content[:4] == b"wOF2" for b in bundles)
+        assert (
+            f"@font-face{{font-family:'Inter';src:url({BASE}/{bundles[1].filename}) format(\"woff2\");"
+            "font-weight:700;font-style:normal;font-display:swap}"
+        ) in out
+        assert out.index('<style data-fonts="self-hosted">') < out.index("</head>")
+
+    def test_not_vendored_family_stays_on_google(self, library):
+        html = HEAD.replace("Playfair+Display", "Lora") + "<p>x</p>"
+        out, bundles = self_host_fonts(html, BASE, library)
+        assert len(bundles) == 2
+        assert '<link href="https://fonts.googleapis.com/css2?family=Lora:wght@400&amp;display=swap"' in out
+        assert 'rel="preconnect"' in out
+
+    def test_broken_file_falls_back(self, library):
+        library.path("Inter", 400).write_bytes(b"not a font")
+        out, bundles = self_host_fonts(f"{HEAD}<p>x</p>", BASE, library)
+        assert [b.name for b in bundles] == ["font-playfair-display-400"]
+        assert "family=Inter:wght@400;700" in out
+
+    def test_nothing_to_self_host(self, tmp_path):
+        html = f"{HEAD}<p>x</p>"
+        assert self_host_fonts(html, BASE, FontLibrary(tmp_path)) == (html, [])
+        assert self_host_fonts("<p>x</p>", BASE) == ("<p>x</p>", [])
+
+
+# ---------------------------------------------------------------------------
+# Publish
+# ---------------------------------------------------------------------------
+
+def test_publish_uploads_fonts(library, monkeypatch):
+    uploaded = []
+
+    async def upload(bundles):
+        uploaded.extend(b.filename for b in bundles)
+        return True
+
+    async def cors_ok(url):
+        return True
+
+    monkeypatch.setattr(asset_bundles, "_store", lambda: "vps")
+    monkeypatch.setitem(asset_bundles._UPLOADERS, "vps", upload)
+    monkeypatch.setattr(asset_bundles, "fonts_cross_origin_ok", cors_ok)
+    monkeypatch.setattr(settings, "SHARED_ASSETS_URL", BASE)
+    monkeypatch.setattr(font_pipeline, "get_font_library", lambda: library)
+    reset_published_bundles()
+    try:
+        out = asyncio.run(publish_bundles(f"{HEAD}<p>Ciao</p>"))
+    finally:
+        reset_published_bundles()
+    assert len(uploaded) == 3 and all(name.endswith(".woff2") for name in uploaded)
+    assert f"{BASE}/{uploaded[0]}" in out
+    vps = asset_bundles._vps_asset(asset_bundles.Bundle("font-inter-400", "woff2", b"wOF2"))
+    assert vps == {"filename": vps["filename"], "content": "d09GMg==", "encoding": "base64"}
+
+
+def test_google_fonts_kept_without_cors(library, monkeypatch):
+    import httpx
+
+    probes = []
+
+    def handler(request):
+        probes.append((request.method, request.headers["origin"]))
+        headers = {"access-control-allow-origin": "*"} if cors else {}
+        return httpx.Response(200, headers=headers)
+
+    async def upload(bundles):
+        return True
+
+    client_cls = httpx.AsyncClient
+    monkeypatch.setattr(
+        asset_bundles.httpx, "AsyncClient",
+        lambda **kwargs: client_cls(transport=httpx.MockTransport(handler), **kwargs),
+    )
+    monkeypatch.setattr(asset_bundles, "_store", lambda: "vps")
+    monkeypatch.setitem(asset_bundles._UPLOADERS, "vps", upload)
+    monkeypatch.setattr(settings, "SHARED_ASSETS_URL", BASE)
+    monkeypatch.setattr(settings, "SITE_BASE_DOMAIN", "e-quipe.app")
+    monkeypatch.setattr(font_pipeline, "get_font_library", lambda: library)
+    page = f"{HEAD}<p>Ciao</p>"
+    reset_published_bundles()
+    try:
+        cors = False
+        assert asyncio.run(publish_bundles(page)) == page
+        cors = True
+        assert 'data-fonts="self-hosted"' in asyncio.run(publish_bundles(page))
+        asyncio.run(publish_bundles(page))
+    finally:
+        reset_published_bundles()
+    assert probes == [("HEAD", "https://www.e-quipe.app")] * 2
+
+
+# ---------------------------------------------------------------------------
+# Pre-delivery check
+# ---------------------------------------------------------------------------
+
+class TestCheckFontUrls:
+    THEME = {"font_heading": "Playfair Display", "font_body": "Inter"}
+
+    def test_self_hosted_page(self, library):
+        html, _ = self_host_fonts(f"{HEAD}<p>x</p>", BASE, library)
+        issues, _, _ = PreDeliveryCheck()._check_font_urls(html, self.THEME)
+        assert issues == []
+        issues, _, _ = PreDeliveryCheck()._check_font_urls(html, {"font_heading": "Lora", "font_body": "Inter"})
+        assert [(i.check_type, i.severity) for i in issues] == [("font_mismatch", "high")]
+
+    def test_vendored_files_checked(self, library, monkeypatch):
+        monkeypatch.setattr(font_pipeline, "get_font_library", lambda: library)
+        html = f"{HEAD.replace('wght@400;700', 'wght@400;900')}<p>Привет</p>"
+        issues, _, _ = PreDeliveryCheck()._check_font_urls(html, self.THEME)
+        messages = [i.message for i in issues if i.check_type == "font_not_vendored"]
+        assert len(messages) == 2
+        assert "Inter 900 not vendored" in messages[0]
+        assert "Playfair Display has no glyphs for" in messages[1]
@@ -0,0 +1,181 @@
+"""Tests for the tree-shaken GSAP engine (app/services/gsap_engine.py).
+
+Covers:
+- split_engine: core/effect module classification, the core skip list,
+  every module joined back gives gsap-universal.js
+- build(): header comment first, modules kept by value, skip list
+  regenerated for the kept modules, full engine for values=None
+- build_modules and GsapEngine loading: prebuilt modules, stale or missing
+  modules (split at load), a source that can't be split (full engine)
+- animate_values, refresh_engine after data-animate edits
+- TemplateAssembler emitting the engine for the page's data-animate values
+"""
+
+import re
+import shutil
+
+import pytest
+
+from app.services.gsap_engine import (
+    ENGINE_FILENAME,
+    ENGINE_SCRIPT_RE,
+    GsapEngine,
+    animate_values,
+    build_modules,
+    get_gsap_engine,
+    refresh_engine,
+    split_engine,
+)
+from app.services.sanitizer import sanitize_output
+
+SHAKEN_LINE_RE = re.compile(r"/\* Tree-shaken: ([\w\- ]*) \*/\n")
+SKIP_LIST_RE = re.compile(r"if \(\[([^\]]*)\]\.indexOf\(type\) !== -1\) return;")
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return get_gsap_engine()
+
+
+def _skip_list(js):
+    return [name.strip("'") for name in SKIP_LIST_RE.search(js).group(1).split(", ")]
+
+
+# ---------------------------------------------------------------------------
+# Split
+# ---------------------------------------------------------------------------
+
+class TestSplit:
+    def test_all_modules_give_the_source_back(self, engine):
+        full = engine.build(engine.module_effects)
+        assert SHAKEN_LINE_RE.sub("", full, count=1) == engine.full_source
+
+    def test_module_classification(self, engine):
+        modules = {block.name.split("-", 1)[1]: block.effects for block in engine.blocks if block.effects}
+        assert modules["stagger-animation"] == ("stagger",)
+        assert modules["card-border-glow"] == ("tilt", "card-hover-3d")
+        core = "".join(block.code for block in engine.blocks if not block.effects)
+        # Not gated on data-animate values: always in the core
+        for title in ("COUNTER ANIMATION", "PARALLAX SCROLLING", "ORGANIC ENTROPY", "HAMBURGER MENU",
+                      "STICKY CTA BUTTON", "CSS SCROLL-DRIVEN ANIMATIONS", "LOADING REVEAL"):
+            assert title in core
+
+    def test_skip_list_values_are_modules_or_core(self, engine):
+        assert set(engine.skip_list) - engine.module_effects == {"parallax", "sticky-cta"}
+        assert engine.module_effects <= set(engine.skip_list)
+
+    def test_unexpected_layout_raises(self):
+        with pytest.raises(ValueError):
+            split_engine("document.addEventListener('DOMContentLoaded', function () {});")
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+class TestBuild:
+    def test_core_only(self, engine):
+        js = engine.build(())
+        assert js.startswith("/* ====") and "GSAP Universal Animation Engine" in js[:200]
+        assert SHAKEN_LINE_RE.search(js).group(1) == ""
+        assert js.rstrip().endswith("});")
+        assert '[data-animate="text-split"]' not in js
+        # Shaken-out values fall back to opacity 1 in the core handler
+        assert _skip_list(js) == ["parallax", "sticky-cta"]
+        assert len(js) < len(engine.full_source) / 2
+
+    def test_modules_by_value(self, engine):
+        js = engine.build({"tilt", "fade-up", "unknown"})
+        assert SHAKEN_LINE_RE.search(js).group(1) == "card-hover-3d tilt"
+        assert '[data-animate="tilt"]' in js and "CARD BORDER GLOW" in js
+        assert "CARD HOVER 3D" not in js
+        assert _skip_list(js) == ["parallax", "tilt", "card-hover-3d", "sticky-cta"]
+
+    def test_none_is_the_full_engine(self, engine):
+        assert engine.build(None) == engine.full_source
+
+    def test_sanitizer_keeps_the_shaken_engine(self, engine):
+        html = f"<html><body><p>x</p>{engine.script_tag({'stagger'})}</body></html>"
+        assert engine.build({"stagger"}) in sanitize_output(html, is_template_assembled=True)
+
+
+# ---------------------------------------------------------------------------
+# Build step and loading
+# ---------------------------------------------------------------------------
+
+class TestLoading:
+    @pytest.fixture
+    def components_dir(self, engine, tmp_path):
+        shutil.copy(engine.components_dir / ENGINE_FILENAME, tmp_path / ENGINE_FILENAME)
+        return tmp_path
+
+    def test_prebuilt_modules(self, engine, components_dir):
+        build_modules(components_dir)
+        built = GsapEngine(components_dir)
+        assert built.source == "modules"
+        assert built.build({"ripple"}) == engine.build({"ripple"})
+
+    def test_missing_or_stale_modules_are_split_at_load(self, components_dir):
+        assert GsapEngine(components_dir).source == "split"
+        build_modules(components_dir)
+        path = components_dir / ENGINE_FILENAME
+        path.write_text(path.read_text(encoding="utf-8") + "\n", encoding="utf-8")
+        stale = GsapEngine(components_dir)
+        assert stale.source == "split" and stale.build(()).endswith("});\n\n")
+
+    def test_unsplittable_source_gives_the_full_engine(self, components_dir):
+        (components_dir / ENGINE_FILENAME).write_text("/* custom */ console.log(1);", encoding="utf-8")
+        custom = GsapEngine(components_dir)
+        assert custom.source == "full" and custom.build({"tilt"}) == "/* custom */ console.log(1);"
+
+
+# ---------------------------------------------------------------------------
+# Page values and refresh
+# ---------------------------------------------------------------------------
+
+class TestRefresh:
+    def test_animate_values_skip_script_and_style(self):
+        html = (
+            "<p data-animate=\"fade-up\">a</p><div data-animate='tilt'></div>"
+            '<script>x = \'<p data-animate="ripple">\'</script><style>[data-animate="shimmer"]{}</style>'
+            '<SCRIPT>unclosed <p data-animate="float">'
+        )
+        assert animate_values(html) == {"fade-up", "tilt"}
+
+    def test_new_values_get_their_modules(self, engine):
+        html = f'<body><h1 data-animate="fade-up">a</h1>{engine.script_tag({"fade-up"})}</body>'
+        edited = html.replace('data-animate="fade-up"', 'data-animate="typewriter"')
+        refreshed = refresh_engine(edited, engine)
+        assert ENGINE_SCRIPT_RE.search(refreshed).group(0) == engine.script_tag({"typewriter"})
+        assert refresh_engine(refreshed, engine) == refreshed
+        assert refresh_engine(html, engine) == html
+
+    def test_full_engine_is_left_alone(self, engine):
+        html = f'<body><h1 data-animate="typewriter">a</h1>{engine.script_tag(None)}</body>'
+        assert refresh_engine(html, engine) == html
+        assert refresh_engine("<p>no engine</p>", engine) == "<p>no engine</p>"
+
+
+# ---------------------------------------------------------------------------
+# Assembler
+# ---------------------------------------------------------------------------
+
+def test_assembled_page_has_the_modules_for_its_values(engine):
+    from app.services.template_assembler import SectionRenderCache, TemplateAssembler
+
+    assembler = TemplateAssembler(section_cache=SectionRenderCache(max_size=0))
+    html = assembler.assemble({
+        "theme": {"primary_color": "#c8102e"},
+        "meta": {"title": "Trattoria"},
+        "global": {"BUSINESS_NAME": "Trattoria"},
+        "_animation_seed": 38,
+        "components": [
+            {"variant_id": "hero-split-01", "data": {}},
+            {"variant_id": "contact-form-01", "data": {}},
+        ],
+    })
+    script = ENGINE_SCRIPT_RE.search(html)
+    page_values = animate_values(html[:script.start()])
+    assert script.group(0) == engine.script_tag(page_values)
+    assert SHAKEN_LINE_RE.search(script.group(0)).group(1).split() == engine.kept_effects(page_values)
+    assert len(script.group(0)) < len(engine.full_source)
@@ -0,0 +1,236 @@
+"""Tests for the shared parsed HTML document (app/services/html_document.py).
+
+Covers:
+- Element tree with character offsets, balanced nesting, unclosed elements
+- <script>/<style>/comment contents are not parsed as markup
+- find_section match modes, enclosing(), last_id_before(), line_of()
+- segments() cut at top-level elements
+- splice_many() / remove() edits and the per-content parse cache
+- Consumers: post-process empty-section removal (truncated sections kept),
+  section-aware photo swap,
+  refine section extraction/removal
+"""
+
+import pytest
+
+from app.services.html_document import (
+    HtmlDocument,
+    clear_document_cache,
+    parse_attrs,
+    parse_html,
+)
+
+PAGE = """<html><body>
+<nav><a href="#hero">Home</a><a href="#about">Chi siamo</a></nav>
+<section id="hero" class="min-h-screen">
+  <div class="grid"><div id="hero-media"><img src="a.jpg" alt="A"></div></div>
+  <h1>Benvenuti</h1>
+</section>
+<script>var s = '<section id="fake">';</script>
+<!-- <section id="commented"></section> -->
+<section id="about">
+  <section id="inner"><p>Annidata</p></section>
+  <img src='b.jpg'>
+</section>
+<footer id="footer"><a href="/privacy">Privacy</a></footer>
+</body></html>"""
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    clear_document_cache()
+    yield
+    clear_document_cache()
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+class TestParsing:
+    def test_offsets_span_whole_element(self):
+        doc = HtmlDocument(PAGE)
+        hero = doc.find_section("hero")
+        assert doc.slice(hero).startswith('<section id="hero"')
+        assert doc.slice(hero).endswith("</section>")
+        assert doc.inner(hero).strip().endswith("<h1>Benvenuti</h1>")
+        assert hero.closed
+
+    def test_nested_sections_are_balanced(self):
+        doc = HtmlDocument(PAGE)
+        about = doc.find_section("about")
+        inner = doc.find_section("inner")
+        assert inner.parent is about
+        assert "b.jpg" in doc.slice(about)
+        assert [s.id for s in doc.sections()] == ["hero", "about"]
+
+    def test_anonymous_divs_keep_nesting(self):
+        doc = HtmlDocument(PAGE)
+        media = doc.find_section("hero-media", ("div",))
+        assert doc.slice(media) == '<div id="hero-media"><img src="a.jpg" alt="A"></div>'
+        assert media.parent.id == "hero"
+
+    def test_script_and_comments_are_skipped(self):
+        doc = HtmlDocument(PAGE)
+        ids = doc.all_ids()
+        assert "fake" not in ids
+        assert "commented" not in ids
+        assert {"hero", "hero-media", "about", "inner", "footer"} <= ids
+
+    def test_comment_opener_inside_script_does_not_hide_markup(self):
+        html = '<script>var s = "<!--";</script><section id="after"><img src="x.jpg"></section>'
+        doc = HtmlDocument(html)
+        assert doc.find_section("after").closed
+        assert [img.attrs["src"] for img in doc.images] == ["x.jpg"]
+
+    def test_images_and_links_with_attributes(self):
+        doc = HtmlDocument(PAGE)
+        assert [img.attrs.get("src") for img in doc.images] == ["a.jpg", "b.jpg"]
+        assert doc.images[0].attrs["alt"] == "A"
+        assert "alt" not in doc.images[1].attrs
+        assert [a.attrs["href"] for a in doc.links] == ["#hero", "#about", "/privacy"]
+        nav = doc.sections(("nav",))[0]
+        assert len(doc.links_in(nav)) == 2
+
+    def test_unclosed_element_ends_at_document_end(self):
+        html = '<section id="a"><p>testo</p>'
+        doc = HtmlDocument(html)
+        section = doc.find_section("a")
+        assert not section.closed
+        assert section.end == len(html)
+
+    def test_parse_attrs(self):
+        attrs = parse_attrs(' SRC="x.jpg" data-x=1 hidden alt=\'y\' src="ignored"')
+        assert attrs == {"src": "x.jpg", "data-x": "1", "hidden": "", "alt": "y"}
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+class TestQueries:
+    def test_find_section_match_modes(self):
+        doc = HtmlDocument(PAGE)
+        tags = ("section", "div")
+        assert doc.find_section("HERO", tags).id == "hero"
+        assert doc.find_section("media", tags) is None
+        assert doc.find_section("media", tags, match="word").id == "hero-media"
+        assert doc.find_section("nne", tags, match="word") is None
+        assert doc.find_section("nne", tags, match="contains").id == "inner"
+
+    def test_enclosing_returns_innermost_match(self):
+        doc = HtmlDocument(PAGE)
+        img = doc.images[0]
+        assert doc.enclosing(img.start).id == "hero-media"
+        section = doc.enclosing(img.start, lambda e: e.tag == "section")
+        assert section.id == "hero"
+        assert doc.enclosing(PAGE.index("<footer") - 1, lambda e: e.tag == "section") is None
+
+    def test_segments_cover_document_at_top_level_elements(self):
+        doc = HtmlDocument(PAGE)
+        spans = doc.segments()
+        assert "".join(PAGE[start:end] for start, end in spans) == PAGE
+        cut = [PAGE[start:end] for start, end in spans]
+        assert cut[1].startswith("<nav>") and cut[1].endswith("</nav>")
+        assert sum(1 for part in cut if part.startswith("<section")) == 2  # hero, about
+        assert cut[-2].startswith('<footer id="footer">')
+        assert HtmlDocument("").segments() == [(0, 0)]
+
+    def test_segments_need_closed_elements(self):
+        assert HtmlDocument('<section id="a"><p>testo</p>').segments() is None
+        assert HtmlDocument("<p>solo testo</p>").segments() == [(0, 17)]
+
+    def test_last_id_before_and_line_of(self):
+        doc = HtmlDocument(PAGE)
+        pos = PAGE.index("b.jpg")
+        assert doc.last_id_before(pos) == "inner"
+        assert doc.last_id_before(pos, ("footer",)) is None
+        assert doc.line_of(0) == 1
+        assert doc.line_of(PAGE.index("<nav")) == 2
+
+
+# ---------------------------------------------------------------------------
+# Editing and caching
+# ---------------------------------------------------------------------------
+
+class TestEditing:
+    def test_splice_many_applies_edits_in_one_pass(self):
+        doc = HtmlDocument("<p>abc</p>")
+        assert doc.splice_many([(4, 5, "B"), (3, 4, "A")]) == "<p>ABc</p>"
+        assert doc.splice_many([]) == "<p>abc</p>"
+
+    def test_remove_drops_elements_nested_in_removed_ones(self):
+        doc = HtmlDocument(PAGE)
+        html = doc.remove([doc.find_section("about"), doc.find_section("inner")])
+        assert 'id="about"' not in html
+        assert 'id="hero"' in html
+        assert "Annidata" not in html
+        assert "b.jpg" not in html
+
+    def test_parse_html_is_cached_per_content(self):
+        doc = parse_html(PAGE)
+        assert parse_html(PAGE) is doc
+        assert parse_html("".join(list(PAGE))) is doc  # equal content, other object
+        assert parse_html(PAGE + " ") is not doc
+
+
+# ---------------------------------------------------------------------------
+# Consumers
+# ---------------------------------------------------------------------------
+
+class TestConsumers:
+    def test_post_process_removes_empty_sections(self):
+        from app.services.databinding_generator import DataBindingGenerator
+
+        gen = DataBindingGenerator.__new__(DataBindingGenerator)
+        html = (
+            '<section id="hero"><h1>{{HERO_TITLE}}</h1></section>\n'
+            '<section id="services"><h2>Servizi</h2><div class="grid"></div></section>\n'
+            '<section id="about"><p>' + "Una storia lunga e piena di passione " * 3 + "</p></section>"
+        )
+        result = gen._post_process_html(html)
+        assert 'id="hero"' in result
+        assert 'id="services"' not in result
+        assert 'id="about"' in result
+        assert "{{HERO_TITLE}}" not in result
+
+    def test_post_process_keeps_truncated_last_section(self):
+        from app.services.databinding_generator import DataBindingGenerator
+
+        gen = DataBindingGenerator.__new__(DataBindingGenerator)
+        about = '<section id="about"><p>' + "Una storia lunga e piena di passione " * 3 + "</p></section>"
+        html = (
+            about + '\n<section id="services"><h2>Servizi</h2><div class="grid">'
+            '\n<div class="credits">Mario</div></body></html>'
+        )
+        assert gen._post_process_html(html) == html
+
+    def test_section_aware_replace_targets_section(self):
+        from app.api.routes.sites import _section_aware_replace
+
+        html = (
+            '<section id="hero"><img src="x.jpg"></section>'
+            '<section id="gallery"><img src="x.jpg"><img src="x.jpg"></section>'
+        )
+        result = _section_aware_replace(html, "x.jpg", "new.jpg", "gallery", 1)
+        assert result == (
+            '<section id="hero"><img src="x.jpg"></section>'
+            '<section id="gallery"><img src="x.jpg"><img src="new.jpg"></section>'
+        )
+        # Unknown section: global Nth occurrence
+        result = _section_aware_replace(html, "x.jpg", "new.jpg", "team", 0)
+        assert result.startswith('<section id="hero"><img src="new.jpg">')
+
+    def test_refine_extract_and_remove_section(self):
+        from app.services.swarm_generator import SwarmGenerator
+
+        extracted = SwarmGenerator._extract_section_html(PAGE, "about")
+        assert extracted.startswith('<section id="about">')
+        assert extracted.endswith("</section>")
+        assert "b.jpg" in extracted  # after the nested section's closing tag
+
+        result = SwarmGenerator._refine_remove_section(PAGE, "rimuovi la sezione about")
+        assert result["success"]
+        assert 'id="about"' not in result["html_content"]
+        assert 'href="#about"' not in result["html_content"]
+        assert 'id="footer"' in result["html_content"]
@@ -0,0 +1,178 @@
+"""Tests for the inline icon sprite (app/services/icon_sprite.py).
+
+Covers:
+- IconLibrary: vendored sets by prefix, aliases, DEFAULT_PREFIX fallback
+  by name, malformed names
+- IconSprite.rewrite: class="iconify"/"iconify-inline" data-icon and
+  <iconify-icon icon> to <svg><use>, sizes, kept attributes, unresolved
+  references and unrelated data-icon left alone
+- sprite(): one <symbol> per icon used, "" when none; the Iconify runtime
+  for unresolved references (ICONIFY_RUNTIME_FALLBACK), kept by the
+  sanitizer
+- missing_icons and the pre-delivery missing_icon issue (high when the
+  icon renders blank)
+- The assembler: no Iconify script in the head, icons resolved in
+  sections and nav, sprite in the tail, the same in assemble_stream, kept
+  by the sanitizer
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.services.icon_sprite import RUNTIME_SCRIPTS, IconLibrary, IconSprite, missing_icons
+from app.services.pre_delivery_check import PreDeliveryCheck
+from app.services.sanitizer import sanitize_output
+from app.services.template_assembler import SectionRenderCache, TemplateAssembler
+
+
+@pytest.fixture(scope="module")
+def library(tmp_path_factory):
+    icons_dir = tmp_path_factory.mktemp("icons")
+    (icons_dir / "lucide.json").write_text(json.dumps({
+        "prefix": "lucide", "width": 24, "height": 24,
+        "icons": {"phone": {"body": '<path d="M1 1h2"/>'}, "house": {"body": '<path d="M2 2h2"/>'}},
+        "aliases": {"home": {"parent": "house"}},
+    }))
+    (icons_dir / "wide.json").write_text(json.dumps({
+        "prefix": "wide", "icons": {"logo": {"body": "<circle r='1'/>", "width": 32, "height": 16}},
+    }))
+    (icons_dir / "broken.json").write_text("{")
+    return IconLibrary(icons_dir)
+
+
+# ---------------------------------------------------------------------------
+# Library
+# ---------------------------------------------------------------------------
+
+class TestIconLibrary:
+    def test_resolve(self, library):
+        assert library.resolve("lucide:phone").symbol_id == "icon-lucide-phone"
+        assert library.resolve("lucide:home").name == "house"
+        assert library.resolve("mdi:phone").symbol_id == "icon-lucide-phone"
+        assert library.resolve("wide:logo")[3:] == (32, 16)
+        for ref in ("lucide:nope", "phone", "", "lucide:<x>"):
+            assert library.resolve(ref) is None
+        assert set(library.sets) == {"lucide", "wide"}
+
+    def test_vendored_sets(self):
+        library = IconLibrary()
+        assert library.resolve("lucide:phone") is not None
+        for icon_set in library.sets.values():
+            for name, alias in icon_set.get("aliases", {}).items():
+                assert alias["parent"] in icon_set["icons"], name
+
+
+# ---------------------------------------------------------------------------
+# Rewriting
+# ---------------------------------------------------------------------------
+
+class TestRewrite:
+    def test_span_reference(self, library):
+        icons = IconSprite(library)
+        out = icons.rewrite('<div><span class="iconify text-2xl" data-icon="lucide:phone"></span></div>')
+        assert out == (
+            '<div><svg xmlns="http://www.w3.org/2000/svg" class="iconify text-2xl" width="1em" height="1em" '
+            'viewBox="0 0 24 24" aria-hidden="true"><use href="#icon-lucide-phone"/></svg></div>'
+        )
+
+    def test_sizes_and_inline(self, library):
+        icons = IconSprite(library)
+        out = icons.rewrite(
+            '<i class="iconify-inline" data-icon="mdi:home" data-width="20" aria-label="Casa"></i>'
+            '<iconify-icon icon="wide:logo"></iconify-icon><span class="iconify" data-icon="lucide:phone" />'
+        )
+        assert out.count("<svg") == 3
+        assert 'aria-label="Casa" style="vertical-align:-0.125em;" width="20" viewBox="0 0 24 24"><use' in out
+        assert 'width="2em" height="1em" viewBox="0 0 32 16" aria-hidden="true"' in out
+        assert list(icons.used) == ["icon-lucide-house", "icon-wide-logo", "icon-lucide-phone"]
+
+    def test_left_alone(self, library):
+        icons = IconSprite(library, runtime_fallback=False)
+        for html in (
+            '<span class="iconify" data-icon="ph:rocket-duotone"></span>',
+            '<span class="iconify" data-icon="lucide:phone">Chiama</span>',
+            '<button data-icon="lucide:phone"></button><span data-icon="lucide:phone"></span>',
+            "<p>icone</p>",
+        ):
+            assert icons.rewrite(html) == html
+        assert icons.missing == {"ph:rocket-duotone"} and icons.sprite() == ""
+
+    def test_sprite(self, library):
+        icons = IconSprite(library)
+        icons.rewrite('<span class="iconify" data-icon="lucide:phone"></span>' * 2)
+        icons.rewrite('<span class="iconify" data-icon="mdi:phone"></span>')
+        sprite = icons.sprite()
+        assert sprite.count("<symbol") == 1
+        assert '<symbol id="icon-lucide-phone" viewBox="0 0 24 24"><path d="M1 1h2"/></symbol>' in sprite
+
+    def test_runtime_fallback(self, library):
+        icons = IconSprite(library, runtime_fallback=True)
+        icons.rewrite('<span class="iconify" data-icon="lucide:phone"></span>')
+        icons.rewrite('<span class="iconify" data-icon="ph:rocket"></span><iconify-icon icon="ph:star"></iconify-icon>')
+        sprite = icons.sprite()
+        assert sprite.index("<symbol") < sprite.index(RUNTIME_SCRIPTS["class"]) < sprite.index(RUNTIME_SCRIPTS["element"])
+        sanitized = sanitize_output(f"<body>{sprite}</body>", is_template_assembled=True)
+        assert all(url in sanitized for url in RUNTIME_SCRIPTS.values())
+
+        icons = IconSprite(library, runtime_fallback=True)
+        icons.rewrite('<span class="iconify" data-icon="lucide:home"></span>')
+        assert "<script" not in icons.sprite()
+
+
+def test_missing_icons_reported(library, monkeypatch):
+    from app.services import icon_sprite
+
+    page = (
+        '<section id="hero"><span class="iconify" data-icon="lucide:phone"></span>'
+        '<span class="iconify" data-icon="ph:rocket"></span><span class="iconify" data-icon="ph:rocket"></span>'
+        '<span class="iconify" data-icon="ph:star">testo</span></section>'
+    )
+    assert missing_icons(page, library) == ["ph:rocket"]
+
+    monkeypatch.setattr(icon_sprite, "get_icon_library", lambda: library)
+    issues = [i for i in PreDeliveryCheck().check(page).issues if i.check_type == "missing_icon"]
+    assert [i.severity for i in issues] == ["high"]
+    with_runtime = page + f'<script src="{RUNTIME_SCRIPTS["class"]}"></script>'
+    issues = [i for i in PreDeliveryCheck().check(with_runtime).issues if i.check_type == "missing_icon"]
+    assert [i.severity for i in issues] == ["low"]
+
+
+# ---------------------------------------------------------------------------
+# Assembler
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def site_data():
+    return {
+        "theme": {"primary_color": "#c8102e"},
+        "meta": {"title": "Trattoria"},
+        "global": {"BUSINESS_NAME": "Trattoria"},
+        "_animation_seed": 45,
+        "components": [{"variant_id": "hero-split-01", "data": {
+            "HERO_TITLE": 'Chiamaci <span class="iconify" data-icon="lucide:phone"></span>',
+        }}],
+    }
+
+
+class TestAssembler:
+    def test_assembled_page(self, site_data):
+        html = TemplateAssembler(section_cache=SectionRenderCache(max_size=0)).assemble(site_data)
+        assert "iconify.min.js" not in html
+        assert '<use href="#icon-lucide-phone"/>' in html
+        sprite = html.index('data-icons="sprite"')
+        assert html.index("<use") < sprite < html.index("</body>")
+        sanitized = sanitize_output(html, is_template_assembled=True)
+        assert '<symbol id="icon-lucide-phone"' in sanitized and '<use href="#icon-lucide-phone"/>' in sanitized
+
+    def test_stream(self, site_data):
+        assembler = TemplateAssembler(section_cache=SectionRenderCache(max_size=0))
+
+        async def collect():
+            return [c async for c in assembler.assemble_stream(site_data, sanitize=False)]
+
+        chunks = asyncio.run(collect())
+        assert "iconify.min.js" not in chunks[0]
+        assert '<use href="#icon-lucide-phone"/>' in "".join(chunks[2:-1])
+        assert '<symbol id="icon-lucide-phone"' in chunks[-1]
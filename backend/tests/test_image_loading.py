@@ -0,0 +1,119 @@
+"""Tests for the LCP-aware image loading hints (app/services/images/loading.py).
+
+Covers:
+- First section: first loadable <img> gets fetchpriority="high" (lazy ->
+  eager), empty/placeholder srcs skipped, CSS background fallback
+- Later sections: loading="lazy" and decoding="async" on every <img>
+- preload_link: href, imagesrcset/imagesizes, AVIF set of a manifest
+- insert_preload: after the viewport meta, before </head> without one
+- The assembler: preload in the head, lazy photos after the hero, in
+  assemble() and in the streamed head/sections
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.images.loading import ImageLoadingHints, insert_preload
+from app.services.images.optimizer import AVIF_TYPE, WEBP_TYPE
+from app.services.template_assembler import SectionRenderCache, TemplateAssembler
+
+HERO = "https://media.e-quipe.app/sites/1/hero.webp"
+
+
+# ---------------------------------------------------------------------------
+# Sections
+# ---------------------------------------------------------------------------
+
+class TestRewrite:
+    def test_lcp_image(self):
+        hints = ImageLoadingHints()
+        out = hints.rewrite(
+            '<section><img src="" alt=""><img src="{{HERO_IMAGE_URL}}">'
+            f'<img src="{HERO}" loading="lazy" class="w-full"><img src="b.jpg"></section>'
+        )
+        assert f'<img src="{HERO}" loading="eager" class="w-full" fetchpriority="high">' in out
+        assert '<img src="b.jpg">' in out and out.count("fetchpriority") == 1
+        assert hints.preload_link() == f'<link rel="preload" as="image" href="{HERO}" fetchpriority="high">'
+
+    def test_below_the_fold(self):
+        hints = ImageLoadingHints()
+        hints.rewrite("<section><h1>Ciao</h1></section>")
+        out = hints.rewrite('<img src="a.jpg" loading="eager"><img src=b.jpg decoding="sync" />')
+        assert out == (
+            '<img src="a.jpg" loading="lazy" decoding="async">'
+            '<img src=b.jpg decoding="sync" loading="lazy"/>'
+        )
+        assert hints.preload_link() == ""
+
+    def test_background_image_hero(self):
+        hints = ImageLoadingHints()
+        html = f'<section style="background-image: url(&quot;{HERO}&quot;)"><h1>x</h1></section>'
+        assert hints.rewrite(html) == html
+        assert f'href="{HERO}"' in hints.preload_link()
+
+
+class TestPreloadLink:
+    def test_srcset_and_sizes(self):
+        hints = ImageLoadingHints()
+        hints.rewrite(f'<img src="{HERO}" srcset="a.webp 400w, {HERO} 1600w" sizes="50vw">')
+        assert hints.preload_link() == (
+            f'<link rel="preload" as="image" href="{HERO}" imagesrcset="a.webp 400w, {HERO} 1600w" '
+            'imagesizes="50vw" fetchpriority="high">'
+        )
+
+    def test_avif_manifest(self):
+        manifest = {"src": HERO, "variants": [
+            {"url": HERO, "width": 1600, "type": WEBP_TYPE},
+            {"url": "https://m/h.avif", "width": 1600, "type": AVIF_TYPE},
+        ]}
+        hints = ImageLoadingHints({HERO: manifest})
+        hints.rewrite(f'<img src="{HERO}" srcset="{HERO} 1600w" sizes="100vw">')
+        link = hints.preload_link()
+        assert 'imagesrcset="https://m/h.avif 1600w"' in link and f'type="{AVIF_TYPE}"' in link
+
+    def test_insert_preload(self):
+        link = '<link rel="preload" as="image" href="x">'
+        head = '<head><meta charset="UTF-8">\n<meta name="viewport" content="width=device-width"><title>t</title></head>'
+        assert insert_preload(head, link).index(link) == head.index("<title>") + 3
+        assert insert_preload("<head><title>t</title></head>", link) == f"<head><title>t</title>{link}\n</head>"
+        assert insert_preload(head, "") == head
+
+
+# ---------------------------------------------------------------------------
+# Assembler
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def site_data():
+    return {
+        "theme": {"primary_color": "#c8102e"},
+        "meta": {"title": "Trattoria"},
+        "global": {"BUSINESS_NAME": "Trattoria"},
+        "_animation_seed": 43,
+        "components": [
+            {"variant_id": "hero-split-01", "data": {"HERO_IMAGE_URL": HERO}},
+            {"variant_id": "about-alternating-01", "data": {"ABOUT_IMAGE_URL": "https://m/about.jpg"}},
+        ],
+    }
+
+
+class TestAssembler:
+    def test_assembled_page(self, site_data):
+        html = TemplateAssembler(section_cache=SectionRenderCache(max_size=0)).assemble(site_data)
+        head = html[:html.index("</head>")]
+        assert f'<link rel="preload" as="image" href="{HERO}" fetchpriority="high">' in head
+        hero_tag = html[html.rindex("<img", 0, html.index(f'src="{HERO}"')):]
+        assert 'fetchpriority="high"' in hero_tag[:hero_tag.index(">")]
+        about = html[html.index('src="https://m/about.jpg"'):]
+        assert 'loading="lazy"' in about[:about.index(">")] and 'decoding="async"' in about[:about.index(">")]
+
+    def test_stream_matches(self, site_data):
+        assembler = TemplateAssembler(section_cache=SectionRenderCache(max_size=0))
+
+        async def collect():
+            return [c async for c in assembler.assemble_stream(site_data, sanitize=False)]
+
+        chunks = asyncio.run(collect())
+        assert f'href="{HERO}" fetchpriority="high"' in chunks[0]
+        assert 'decoding="async"' in "".join(chunks[2:])
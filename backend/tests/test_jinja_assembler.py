@@ -8,11 +8,20 @@ Covers:
 - Loop rendering (services, gallery, testimonials, stats)
 - Full page assembly
 - Data normalization from old uppercase format
+- Precompiled templates (build, staleness detection) and warm-up
 """
 
+import shutil
+from pathlib import Path
+
 import pytest
 
-from app.services.jinja_assembler import JinjaAssembler, _hex_to_rgb, _css_gradient_fallback
+from app.services.jinja_assembler import (
+    COMPILED_DIRNAME,
+    JinjaAssembler,
+    _hex_to_rgb,
+    _css_gradient_fallback,
+)
 
 
 @pytest.fixture
@@ -387,3 +396,74 @@ class TestAssemble:
         site_data = {"head": {}, "sections": {}}
         html = assembler.assemble(site_data)
         assert "<!DOCTYPE html>" in html
+
+    def test_unchanged_sections_come_from_cache(self, assembler: JinjaAssembler) -> None:
+        site_data = {
+            "head": {"BUSINESS_NAME": "Bar Sport", "PRIMARY_COLOR": "#c8102e"},
+            "sections": {
+                "hero": {"variant": "hero-classic-01", "data": {"hero_title": "Benvenuti"}},
+                "contact": {"variant": "contact-minimal-01", "data": {"contact_title": "Contatti"}},
+            },
+        }
+        first = assembler.assemble(site_data)
+        assert assembler._last_cache_stats == {"hits": 0, "misses": 2, "hit_rate": 0.0}
+
+        site_data["sections"]["hero"]["data"]["hero_title"] = "Bentornati"
+        second = assembler.assemble(site_data)
+        assert assembler._last_cache_stats == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+        assert "Bentornati" in second
+        assert first.replace("Benvenuti", "Bentornati") == second
+
+        site_data["head"]["PRIMARY_COLOR"] = "#000000"
+        assembler.assemble(site_data)
+        assert assembler._last_cache_stats["hits"] == 0
+        assert assembler.section_cache.stats()["hits"] == 1
+
+
+# ---------------------------------------------------------------------------
+# Precompiled templates
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def components_copy(tmp_path: Path) -> Path:
+    """A private copy of components_v2 (the build writes into it)."""
+    source = Path(__file__).parent.parent / "app" / "components_v2"
+    target = tmp_path / "components_v2"
+    shutil.copytree(source, target, ignore=shutil.ignore_patterns(COMPILED_DIRNAME))
+    return target
+
+
+class TestPrecompiledTemplates:
+    def test_without_build_loads_from_source(self, components_copy: Path) -> None:
+        assert JinjaAssembler(str(components_copy)).template_source == "source"
+
+    def test_precompiled_renders_identically(self, components_copy: Path) -> None:
+        JinjaAssembler(str(components_copy), precompiled=False).compile_templates()
+        precompiled = JinjaAssembler(str(components_copy), bytecode_cache=False)
+        source = JinjaAssembler(str(components_copy), precompiled=False, bytecode_cache=False)
+        assert precompiled.template_source == "precompiled"
+
+        data = {
+            "hero_title": "Benvenuti <da Mario>",
+            "hero_subtitle": "Cucina romana",
+            "hero_image_url": "https://images.unsplash.com/photo-1.jpg",
+            "business_name": "Trattoria da Mario",
+        }
+        for name in source.template_names():
+            variant_id = Path(name).stem
+            assert precompiled.render_component(variant_id, data) == source.render_component(variant_id, data)
+
+    def test_edited_template_invalidates_build(self, components_copy: Path) -> None:
+        JinjaAssembler(str(components_copy), precompiled=False).compile_templates()
+        template = components_copy / "hero" / "hero-classic-01.html"
+        template.write_text(template.read_text(encoding="utf-8") + "\n<!-- edited -->\n", encoding="utf-8")
+
+        assembler = JinjaAssembler(str(components_copy))
+        assert assembler.template_source == "source"
+        assert "<!-- edited -->" in assembler.render_component("hero-classic-01", {})
+
+    def test_warm_up_loads_every_template(self, components_copy: Path) -> None:
+        assembler = JinjaAssembler(str(components_copy), bytecode_cache=False)
+        names = assembler.template_names()
+        assert names and all(name.endswith(".html") for name in names)
+        assert assembler.warm_up() == len(names)
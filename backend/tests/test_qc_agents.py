@@ -0,0 +1,204 @@
+"""Tests for the fused QC fix pass (app/services/qc_agents.py).
+
+Covers:
+- FixDocument: single-pass render, conflict detection and rebase
+- plan() of each deterministic agent matches its fix() (HTML and result)
+- _apply_fix_agents() output is byte-identical to chaining the agents'
+  fix() methods, including pages where one agent's edit creates or removes
+  a match for a later agent (placeholders in img src, ids inside img tags,
+  colors next to an earlier edit)
+"""
+
+import asyncio
+import re
+
+import pytest
+
+from app.models.qc_report import QCIssue
+from app.services.qc_agents import (
+    AccessibilityAgent,
+    AnimationFixAgent,
+    ColorCoherenceAgent,
+    FixDocument,
+    LayoutFixAgent,
+)
+from app.services.quality_control import QualityControlPipeline
+
+from tests.test_qc_rules import BAD_PAGE, SECTIONS, THEME
+
+
+def _issue(type_, element, description):
+    return QCIssue(type=type_, severity="warning", element=element, description=description, auto_fixable=True)
+
+
+ANIMATION_ISSUES = [
+    _issue("animation", "h1", "Missing text-split on h1"),
+    _issue("animation", "h2", "Missing text-split on h2"),
+    _issue("animation", "a.cta", "CTA without magnetic effect"),
+    _issue("animation", "div.card", "Cards without fade-up"),
+    _issue("animation", "img", "Images without entrance animation"),
+]
+STRUCTURE_ISSUES = [
+    _issue("structure", "#hero", 'Duplicate id="hero"'),
+    _issue("structure", "body", "Unreplaced placeholder {{HERO_TITLE}}"),
+]
+ACCESSIBILITY_ISSUES = [_issue("accessibility", "img", "Image missing alt attribute")]
+
+
+def _color_issues(*colors):
+    return [_issue("color", "style", f"Off-palette color found: {c}") for c in colors]
+
+
+CONFLICT_PAGES = [
+    # Placeholder default fills an img src that the alt text is derived from
+    '<img src="{{HERO_IMAGE_URL}}"><img src="{{LOGO_URL}}" class="h-8">',
+    # Removing a duplicate id leaves the tag otherwise untouched
+    '<img id="x" src="a.jpg"><img id="x" src="b.jpg"><h1 id="x">T</h1>',
+    # Colors inside tags that also get attributes inserted
+    '<img src="c.png" style="color:#ff00ff"><div class="card" style="background: #00ff00">x</div>',
+    # Placeholder default contains '#', next to a color declaration
+    '<a href="{{HERO_CTA_URL}}" class="btn" style="color: #ff00ff">{{HERO_CTA_TEXT}}</a>',
+    # A placeholder that becomes a tag boundary and a tag spanning a removal
+    '<h2 id="a">x</h2><h2 id="a" {{LOGO_URL}}>y</h2><button>{{CURRENT_YEAR}}</button>',
+    '<p>nessun tag da correggere</p>',
+    '',
+]
+
+
+def _sequential(html, issues):
+    """Reference: each agent's fix() applied to the output of the previous one."""
+    results = []
+    html, r = LayoutFixAgent().fix(html, [i for i in issues if i.type == "structure"])
+    results.append(r)
+    html, r = AnimationFixAgent().fix(html, [i for i in issues if i.type == "animation"])
+    results.append(r)
+    html, r = ColorCoherenceAgent().fix(html, THEME, [i for i in issues if i.type == "color"])
+    results.append(r)
+    html, r = AccessibilityAgent().fix(html, [i for i in issues if i.type == "accessibility"])
+    results.append(r)
+    return html, results
+
+
+def _fused(html, issues):
+    doc = FixDocument(html)
+    results = [
+        LayoutFixAgent().plan(doc, [i for i in issues if i.type == "structure"]),
+        AnimationFixAgent().plan(doc, [i for i in issues if i.type == "animation"]),
+        ColorCoherenceAgent().plan(doc, THEME, [i for i in issues if i.type == "color"]),
+        AccessibilityAgent().plan(doc, [i for i in issues if i.type == "accessibility"]),
+    ]
+    return doc.render(), results
+
+
+# ---------------------------------------------------------------------------
+# FixDocument
+# ---------------------------------------------------------------------------
+
+class TestFixDocument:
+    def test_render_applies_edits_in_one_pass(self):
+        doc = FixDocument("abcdef")
+        doc.add([(4, 5, "E")])
+        doc.add([(0, 0, ">"), (2, 3, "")])
+        assert doc.render() == ">abdEf"
+        assert doc.html == "abcdef"
+
+    def test_no_rebase_without_conflicts(self):
+        doc = FixDocument("<h1>A</h1> color: #fff")
+        doc.add([(3, 3, ' data-animate="x"')])
+        assert doc.text_for(re.compile(r"#fff"), ":#") == "<h1>A</h1> color: #fff"
+        assert doc.rebases == 0
+
+    def test_rebase_on_adjacent_edit(self):
+        doc = FixDocument("<h1>A</h1>")
+        doc.add([(3, 3, ' id="a"')])
+        assert doc.text_for(re.compile(r"id=")) == "<h1>A</h1>"
+        assert doc.text_for(re.compile(r"<h1\b[^>]*>?")) == '<h1 id="a">A</h1>'
+        assert doc.rebases == 1
+        assert doc.render() == '<h1 id="a">A</h1>'
+
+    def test_rebase_on_trigger_character(self):
+        doc = FixDocument("x {{A}}")
+        doc.add([(2, 7, "#contact")])
+        assert doc.text_for(re.compile(r"nothing"), ":#") == "x #contact"
+        assert doc.rebases == 1
+
+
+# ---------------------------------------------------------------------------
+# plan() vs fix()
+# ---------------------------------------------------------------------------
+
+class TestPlanMatchesFix:
+    @pytest.mark.parametrize("html", CONFLICT_PAGES + [BAD_PAGE])
+    def test_each_agent(self, html):
+        cases = [
+            (LayoutFixAgent(), STRUCTURE_ISSUES),
+            (AnimationFixAgent(), ANIMATION_ISSUES),
+            (AccessibilityAgent(), ACCESSIBILITY_ISSUES),
+        ]
+        for agent, issues in cases:
+            doc = FixDocument(html)
+            result = agent.plan(doc, issues)
+            assert (doc.render(), result) == agent.fix(html, issues)
+
+        issues = _color_issues("#ff00ff", "#00ff00", "#123456")
+        doc = FixDocument(html)
+        result = ColorCoherenceAgent().plan(doc, THEME, issues)
+        assert (doc.render(), result) == ColorCoherenceAgent().fix(html, THEME, issues)
+
+    @pytest.mark.parametrize("html", CONFLICT_PAGES + [BAD_PAGE])
+    def test_all_agents_on_one_document(self, html):
+        issues = STRUCTURE_ISSUES + ANIMATION_ISSUES + ACCESSIBILITY_ISSUES + _color_issues("#ff00ff", "#00ff00")
+        assert _fused(html, issues) == _sequential(html, issues)
+
+
+# ---------------------------------------------------------------------------
+# Orchestrator
+# ---------------------------------------------------------------------------
+
+class TestApplyFixAgents:
+    @pytest.fixture
+    def pipeline(self):
+        pipeline = QualityControlPipeline()
+        pipeline.kimi = None  # deterministic text fixes, no network
+        return pipeline
+
+    async def _chain(self, pipeline, html, issues):
+        """The pre-fusion orchestrator: fix() chained through every agent."""
+        results = []
+        by_type = {}
+        for issue in issues:
+            if issue.auto_fixable:
+                by_type.setdefault(issue.type, []).append(issue)
+        if "structure" in by_type:
+            html, r = pipeline.layout_agent.fix(html, by_type["structure"])
+            results.append(r)
+        if "animation" in by_type:
+            html, r = pipeline.animation_agent.fix(html, by_type["animation"])
+            results.append(r)
+        if "color" in by_type:
+            html, r = pipeline.color_agent.fix(html, THEME, by_type["color"])
+            results.append(r)
+        if "text" in by_type:
+            html, r = await pipeline.text_agent.fix(html, by_type["text"], kimi_client=None)
+            results.append(r)
+        if "accessibility" in by_type:
+            html, r = pipeline.accessibility_agent.fix(html, by_type["accessibility"])
+            results.append(r)
+        return html, results
+
+    def test_detected_issues_on_bad_page(self, pipeline):
+        issues = [i for i in pipeline.run_automated_checks(BAD_PAGE, THEME, SECTIONS) if i.type != "section"]
+        fused = asyncio.run(pipeline._apply_fix_agents(BAD_PAGE, issues, THEME, "default"))
+        assert fused == asyncio.run(self._chain(pipeline, BAD_PAGE, issues))
+        assert fused[0] != BAD_PAGE
+
+    @pytest.mark.parametrize("html", CONFLICT_PAGES)
+    def test_conflicting_edits(self, pipeline, html):
+        issues = (
+            STRUCTURE_ISSUES + ANIMATION_ISSUES + ACCESSIBILITY_ISSUES
+            + _color_issues("#ff00ff", "#00ff00")
+            + [_issue("text", "p", "Banned phrase: 'soluzioni innovative'")]
+        )
+        html += "<p>Offriamo soluzioni innovative.</p>"
+        fused = asyncio.run(pipeline._apply_fix_agents(html, issues, THEME, "default"))
+        assert fused == asyncio.run(self._chain(pipeline, html, issues))
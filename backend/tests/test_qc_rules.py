@@ -0,0 +1,291 @@
+"""Tests for the single-pass QC rule engine (app/services/qc_rules.py).
+
+Covers:
+- Tokenizer: lossless round-trip, raw text, comments, markup inside scripts
+- Engine dispatch: per-tag subscriptions, text/comment hooks, embedded markup
+- Parity with the legacy per-check scans (same QCIssue list, same order)
+  on an assembled page and on crafted pages that trigger every check
+- run_automated_checks() uses the engine and appends visual harmony issues
+- run_incremental(): same issues as run(), per-section states reused after
+  an edit, fallback to a full run for pages that can't be cut
+"""
+
+from typing import List
+
+import pytest
+
+from app.services.qc_rules import (
+    ALL_TAGS,
+    COMMENT,
+    END_TAG,
+    RAW_TEXT,
+    START_TAG,
+    TEXT,
+    DEFAULT_RULES,
+    QCRule,
+    QCRuleEngine,
+    iter_tokens,
+)
+from app.services.template_assembler import SectionRenderCache
+from app.services.quality_control import QualityControlPipeline
+
+THEME = {
+    "primary_color": "#c8102e",
+    "secondary_color": "#1e40af",
+    "bg_color": "#ffffff",
+    "text_color": "#0f172a",
+}
+SECTIONS = ["hero", "about", "services", "contact", "footer"]
+
+BAD_PAGE = """<html><head>
+<script src="https://cdn.tailwindcss.com"></script>
+<style>.x { color: #ff00ff; background: #00ff00; }</style>
+</head>
+<body>
+<nav><a href="#hero">Home</a><a href="#missing">Servizi</a><a href="#about">Chi siamo</a></nav>
+<section id="hero" style="color: #123456">
+  <h1>{{HERO_TITLE}}</h1>
+  <h3 data-animate="spin-wildly">Sottotitolo</h3>
+  <img src="https://placehold.co/600x400">
+  <img src="foto.jpg" alt="">
+  <p>Siamo leader del settore e offriamo soluzioni innovative a 360 gradi.</p>
+</section>
+<!-- REPEAT:SERVICES -->
+<section id="about" data-animate="fade-up">
+  <h2 data-animate="fade-up">Chi siamo</h2>
+  <div id="about" data-animate="fade-up"><p data-animate="fade-up">Testo</p></div>
+  <img src="https://images.unsplash.com/photo-1?w=800" alt="Foto">
+</section>
+<script>
+  document.querySelector('[data-animate="fade-up"]');
+  el.innerHTML = '<h5 class="x">Grazie</h5><img src="placeholder.jpg">';
+  var c = "<!--";
+</script>
+<h6>Dopo lo script</h6>
+</body>"""
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return QualityControlPipeline()
+
+
+@pytest.fixture(scope="module")
+def assembled_page():
+    from app.services.template_assembler import SectionRenderCache, TemplateAssembler
+
+    assembler = TemplateAssembler(section_cache=SectionRenderCache(max_size=0))
+    return assembler.assemble({
+        "theme": dict(THEME, font_heading="Playfair Display", font_body="Inter"),
+        "meta": {"title": "Trattoria da Mario", "description": "Cucina romana"},
+        "global": {"BUSINESS_NAME": "Trattoria da Mario"},
+        "components": [
+            {"variant_id": "hero-split-01", "data": {"HERO_TITLE": "Benvenuti"}},
+            {"variant_id": "about-magazine-01", "data": {}},
+            {"variant_id": "contact-form-01", "data": {}},
+            {"variant_id": "footer-minimal-02", "data": {}},
+        ],
+    })
+
+
+# ---------------------------------------------------------------------------
+# Tokenizer
+# ---------------------------------------------------------------------------
+
+class TestTokenizer:
+    def test_tokens_concatenate_back_to_input(self):
+        tokens = list(iter_tokens(BAD_PAGE))
+        assert "".join(t.raw for t in tokens) == BAD_PAGE
+        pos = 0
+        for token in tokens:
+            assert token.start == pos
+            pos += len(token.raw)
+
+    def test_kinds_and_names(self):
+        html = '<!DOCTYPE html><P class="a">Ciao<!-- nota --></p>'
+        kinds = [(t.kind, t.name) for t in iter_tokens(html)]
+        assert kinds[1:] == [
+            (START_TAG, "p"), (TEXT, ""), (COMMENT, ""), (END_TAG, "p"),
+        ]
+
+    def test_script_contents_are_one_raw_text_token(self):
+        html = '<script>if (a < b) { x = "<!--"; }</script><section id="after"></section>'
+        tokens = list(iter_tokens(html))
+        raw = [t for t in tokens if t.kind is RAW_TEXT]
+        assert [t.raw for t in raw] == ['if (a < b) { x = "<!--"; }']
+        assert raw[0].name == "script"
+        # The unterminated "<!--" in the script does not hide the section
+        assert any(t.kind is START_TAG and t.name == "section" for t in tokens)
+
+    def test_lower_and_head(self):
+        token = next(iter_tokens('<IMG SRC="A.jpg" alt="x>y">'))
+        assert token.lower == '<img src="a.jpg" alt="x>y">'
+        assert token.head == '<IMG SRC="A.jpg" alt="x>'
+
+
+# ---------------------------------------------------------------------------
+# Engine dispatch
+# ---------------------------------------------------------------------------
+
+class _Recorder(QCRule):
+    seen: List[str] = []
+
+    def on_start_tag(self, token):
+        self.seen.append(f"start:{token.name}{'*' if token.embedded else ''}")
+
+    def on_end_tag(self, token):
+        self.seen.append(f"end:{token.name}")
+
+    def on_text(self, token):
+        self.seen.append(f"text:{token.raw.strip()}")
+
+    def on_comment(self, token):
+        self.seen.append("comment")
+
+
+class TestEngine:
+    def _run(self, rule_cls, html):
+        rule_cls.seen = []
+        QCRuleEngine([rule_cls]).run(html, THEME, SECTIONS)
+        return rule_cls.seen
+
+    def test_rules_only_receive_subscribed_tags(self):
+        class ImgOnly(_Recorder):
+            start_tags = frozenset({"img"})
+
+        assert self._run(ImgOnly, '<p><img src="a"></p><img src="b">') == ["start:img", "start:img"]
+
+    def test_all_tags_text_and_comments(self):
+        class Everything(_Recorder):
+            start_tags = ALL_TAGS
+            end_tags = ALL_TAGS
+            text = True
+            comments = True
+
+        seen = self._run(Everything, "<p>Ciao<!-- x --></p>")
+        assert seen == ["start:p", "text:Ciao", "comment", "end:p"]
+
+    def test_embedded_markup_is_opt_in(self):
+        html = "<script>el.innerHTML = '<h3>Ok</h3>';</script><!-- <h4> -->"
+
+        class Plain(_Recorder):
+            start_tags = ALL_TAGS
+
+        class Embedded(_Recorder):
+            start_tags = frozenset({"h3", "h4"})
+            embedded_markup = True
+
+        assert self._run(Plain, html) == ["start:script"]
+        assert self._run(Embedded, html) == ["start:h3*", "start:h4*"]
+
+    def test_disabled_rules_are_skipped(self):
+        class Disabled(_Recorder):
+            start_tags = ALL_TAGS
+
+            @property
+            def enabled(self):
+                return False
+
+        assert self._run(Disabled, "<p></p>") == []
+
+
+# ---------------------------------------------------------------------------
+# Parity with the legacy checks
+# ---------------------------------------------------------------------------
+
+class TestParity:
+    def test_bad_page_triggers_many_checks(self, pipeline):
+        issues = pipeline.run_automated_checks(BAD_PAGE, THEME, SECTIONS)
+        types = {issue.type for issue in issues}
+        assert {"structure", "section", "animation", "color", "accessibility", "text"} <= types
+        descriptions = " ".join(issue.description for issue in issues)
+        assert "#missing" in descriptions
+        assert "Duplicate id" in descriptions
+        assert "h1 -> h3" in descriptions
+
+    def test_bad_page_matches_legacy(self, pipeline):
+        new = pipeline.run_automated_checks(BAD_PAGE, THEME, SECTIONS)
+        old = pipeline._run_legacy_checks(BAD_PAGE, THEME, SECTIONS)
+        assert new == old
+
+    def test_assembled_page_matches_legacy(self, pipeline, assembled_page):
+        new = pipeline.run_automated_checks(assembled_page, THEME, SECTIONS)
+        old = pipeline._run_legacy_checks(assembled_page, THEME, SECTIONS)
+        assert new == old
+
+    @pytest.mark.parametrize("html", [
+        "",
+        "<!doctype html><html><body></body></html>",
+        "<section id='hero'><h2>Solo</h2></section>",
+        '<nav><a href="#a">A</a></nav><nav><a href="#b">B</a></nav><div id="a"></div>',
+        "<h1>A</h1><h4>B</h4><h1>C</h1>",
+    ])
+    def test_edge_cases_match_legacy(self, pipeline, html):
+        assert pipeline.run_automated_checks(html, {}, []) == pipeline._run_legacy_checks(html, {}, [])
+        assert pipeline.run_automated_checks(html, THEME, SECTIONS) == \
+            pipeline._run_legacy_checks(html, THEME, SECTIONS)
+
+    def test_visual_harmony_is_appended(self, pipeline):
+        variants = {"hero": "hero-split-01", "about": "about-magazine-01"}
+        new = pipeline.run_automated_checks(BAD_PAGE, THEME, SECTIONS, variants)
+        old = pipeline._run_legacy_checks(BAD_PAGE, THEME, SECTIONS, variants)
+        assert new == old
+
+
+# ---------------------------------------------------------------------------
+# Incremental runs
+# ---------------------------------------------------------------------------
+
+class TestIncremental:
+    @pytest.fixture
+    def engine(self):
+        return QCRuleEngine(DEFAULT_RULES, section_cache=SectionRenderCache())
+
+    def test_same_issues_as_full_run(self, engine, assembled_page):
+        for html in (assembled_page, BAD_PAGE, ""):
+            assert engine.run_incremental(html, THEME, SECTIONS) == engine.run(html, THEME, SECTIONS)
+            assert engine.run_incremental(html, {}, []) == engine.run(html, {}, [])
+
+    def test_edit_reruns_only_the_changed_section(self, engine, assembled_page):
+        engine.run_incremental(assembled_page, THEME, SECTIONS)
+        misses = engine.section_cache.stats()["misses"]
+
+        edited = assembled_page.replace(
+            'id="hero"', 'id="hero" data-animate="spin" style="color: #abcdef"', 1
+        )
+        issues = engine.run_incremental(edited, THEME, SECTIONS)
+        assert engine.section_cache.stats()["misses"] == misses + 1
+        assert issues == engine.run(edited, THEME, SECTIONS)
+        descriptions = [issue.description for issue in issues]
+        assert "Invalid data-animate value: 'spin'" in descriptions
+        assert "Off-palette color found: #abcdef" in descriptions
+
+    def test_page_level_rules_span_sections(self, engine):
+        html = (
+            '<nav><a href="#hero">Home</a><a href="#team">Team</a></nav>\n'
+            '<section id="hero"><h1>A</h1></section>\n'
+            '<section id="about"><h3>B</h3><div id="hero"></div></section>'
+        )
+        issues = engine.run_incremental(html, THEME, SECTIONS)
+        assert issues == engine.run(html, THEME, SECTIONS)
+        descriptions = " ".join(issue.description for issue in issues)
+        assert 'Duplicate id="hero"' in descriptions
+        assert "Nav link #team" in descriptions
+        assert "h1 -> h3" in descriptions
+
+    def test_open_nav_at_a_cut_falls_back_to_full_run(self, engine):
+        # The script string opens a <nav> for the nav rule but not for the
+        # section tree, so the page is cut while the rule is inside a nav
+        html = (
+            "<script>el.innerHTML = '<nav>';</script>"
+            '<section id="hero"><a href="#missing">x</a></section>'
+            "<script>el.innerHTML = '</nav>';</script>"
+        )
+        issues = engine.run_incremental(html, THEME, SECTIONS)
+        assert issues == engine.run(html, THEME, SECTIONS)
+        assert any("#missing" in issue.description for issue in issues)
+
+    def test_unclosed_section_falls_back_to_full_run(self, engine):
+        html = '<section id="hero"><h1>A</h1><h3>B</h3>'
+        assert engine.run_incremental(html, THEME, SECTIONS) == engine.run(html, THEME, SECTIONS)
+        assert engine.section_cache.stats()["size"] == 0
@@ -637,6 +637,44 @@ class TestReportSerialization:
             assert "message" in d["issues"][0]
 
 
+# ---------------------------------------------------------------------------
+# TEST 13: Incremental re-check (per-section facts cache)
+# ---------------------------------------------------------------------------
+
+class TestIncrementalCheck:
+    NAV = '<nav><a href="#about">Chi siamo</a><a href="#team">Team</a><a href="#">Vuoto</a></nav>'
+
+    def _page(self, about_text: str) -> str:
+        return _make_html(
+            '<section id="hero" data-animate="fade-up"><h1>Benvenuti nel nostro studio</h1>'
+            '<p>Un testo abbastanza lungo per superare il controllo sul numero di parole minimo.</p></section>'
+            f'<section id="about"><p>{about_text}</p></section>'
+            + _animate_attrs(6),
+            nav=self.NAV,
+        )
+
+    def test_recheck_after_edit_matches_fresh_check(self):
+        checker = PreDeliveryCheck()
+        checker.check(self._page("Testo breve."))
+        edited = self._page("Siamo leader del settore. <a href=''>x</a><span id='team'></span>")
+
+        misses = checker.section_cache.stats()["misses"]
+        report = checker.check(edited)
+        # Only the edited section is scanned again
+        assert checker.section_cache.stats()["misses"] == misses + 1
+        assert report.to_dict() == PreDeliveryCheck().check(edited).to_dict()
+
+        messages = [i.message for i in report.issues]
+        assert any("leader del settore" in m for m in messages)
+        assert not any(i.check_type == "broken_nav_anchor" for i in report.issues)
+        assert any("section#about" in i.location for i in report.issues if i.check_type == "empty_link")
+
+    def test_unsegmentable_page_is_checked_whole(self):
+        html = self._page("Testo") + '<section id="aperta"><p>Senza chiusura'
+        report = PreDeliveryCheck().check(html)
+        assert any(i.check_type == "broken_nav_anchor" and "#team" in i.message for i in report.issues)
+
+
 # ---------------------------------------------------------------------------
 # TEST: Quality Gate (unified, pre-assembly validation)
 # ---------------------------------------------------------------------------
@@ -0,0 +1,229 @@
+"""Regex performance regression suite for the hot-path HTML rewrites.
+
+Covers:
+- TagPattern / ElementPattern / sub_closed_tags (app/services/tag_scan.py)
+  return the same matches and substitutions as the plain regex on random pages
+- The hot paths keep their output: AnimationFixAgent card/CTA/image fixes,
+  _randomize_animations, diversify_effects, _strip_for_refine and
+  _is_section_empty on small pages and an assembled page
+- Time budgets on generated pathological pages (10k cards, 1 MB attributes,
+  tag starts nested inside attributes, unbalanced tags, unclosed
+  <style>/<svg>/<script>, long whitespace runs): each call stays under a
+  fixed budget and 4x the input costs well under 16x the time
+"""
+
+import logging
+import random
+import re
+import time
+
+import pytest
+
+from app.services.databinding_generator import DataBindingGenerator, _randomize_animations
+from app.services.effect_diversifier import diversify_effects
+from app.services.qc_agents import AccessibilityAgent, AnimationFixAgent
+from app.services.swarm_generator import SwarmGenerator
+from app.services.tag_scan import ElementPattern, TagPattern, sub_closed_tags
+
+
+@pytest.fixture(scope="module")
+def assembled_page():
+    from app.services.template_assembler import SectionRenderCache, TemplateAssembler
+
+    assembler = TemplateAssembler(section_cache=SectionRenderCache(max_size=0))
+    return assembler.assemble({
+        "theme": {"primary_color": "#c8102e", "secondary_color": "#1e40af",
+                  "font_heading": "Playfair Display", "font_body": "Inter"},
+        "meta": {"title": "Trattoria da Mario", "description": "Cucina romana"},
+        "global": {"BUSINESS_NAME": "Trattoria da Mario"},
+        "components": [
+            {"variant_id": "hero-split-01", "data": {"HERO_TITLE": "Benvenuti"}},
+            {"variant_id": "about-magazine-01", "data": {}},
+            {"variant_id": "contact-form-01", "data": {}},
+            {"variant_id": "footer-minimal-02", "data": {}},
+        ],
+    })
+
+
+# ---------------------------------------------------------------------------
+# Drivers vs plain regex
+# ---------------------------------------------------------------------------
+
+FUZZ_PIECES = [
+    "<", ">", "/", '"', " ", "\n", "=", "<a", "<A", "<a ", '<a class="btn"', "<div", "<div ",
+    '<div class="card">', "<img", '<img src="x.jpg"', " alt", ' alt="x"', " data-animate",
+    ' data-animate="fade-up"', ' data-animate="text-split"', "<h1", "<h2", "<h2 ", "</h2>", "</h1>",
+    "<style>", "</style>", "<STYLE>", "<script>", "</script>", "<nav>", "</nav>", "<head>", "</head>",
+    "<svg>", "</svg>", "<!--", "-->", "btn", "cta", "card", "class=", 'class="', "x",
+]
+
+TAG_CASES = [
+    TagPattern(r'(<a\b)(?![^>]*data-animate)([^>]*(?:btn|cta)[^>]*>)',
+               start=r'<a\b', exclude='data-animate', require='btn|cta', flags=re.IGNORECASE),
+    TagPattern(r'(<img\b)(?![^>]*\balt\b)([^>]*>)', start=r'<img\b', exclude=r'\balt\b',
+               flags=re.IGNORECASE),
+    TagPattern(r'(<h[12][^>]*?)data-animate="text-split"([^>]*)', start='<h[12]',
+               require='data-animate="text-split"', closed=False),
+    TagPattern(r'<div[^>]*class="[^"]*card[^"]*"[^>]*>\s*</div>', start='<div',
+               require=r'class="', flags=re.DOTALL),
+    TagPattern(r'<!--(?!\s*__)[^>]*?-->', start='<!--', require='-->'),
+]
+
+ELEMENT_CASES = [
+    ElementPattern(r'<style[^>]*>.*?</style>', start='<style', flags=re.IGNORECASE | re.DOTALL),
+    ElementPattern(r'<(nav|script|style|head)[\s>].*?</\1>',
+                   start=r'<(?P<name>nav|script|style|head)[\s>]', flags=re.IGNORECASE | re.DOTALL),
+]
+
+
+def _fuzz_pages(seed, count):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield "".join(rng.choice(FUZZ_PIECES) for _ in range(rng.randint(0, 50)))
+
+
+def _spans(matches):
+    return [(m.start(), m.end(), m.groups()) for m in matches]
+
+
+class TestDriversMatchRegex:
+    @pytest.mark.parametrize("index", range(len(TAG_CASES) + len(ELEMENT_CASES)))
+    def test_finditer_and_sub(self, index):
+        scan = (TAG_CASES + ELEMENT_CASES)[index]
+        for html in _fuzz_pages(3600 + index, 1500):
+            assert _spans(scan.finditer(html)) == _spans(scan.pattern.finditer(html)), html
+            assert scan.sub(r"[\g<0>]", html) == scan.pattern.sub(r"[\g<0>]", html)
+            expected = scan.pattern.search(html)
+            found = scan.search(html)
+            assert (found and found.span()) == (expected and expected.span())
+
+    def test_sub_with_callable_sees_the_same_matches(self):
+        scan = TAG_CASES[0]
+        html = '<a class="btn">x</a><a data-animate="y" class="cta"><A href="#" class="CTA">'
+        assert scan.sub(lambda m: m.group(1).upper() + m.group(2), html) == \
+            scan.pattern.sub(lambda m: m.group(1).upper() + m.group(2), html)
+
+    def test_sub_closed_tags(self):
+        tag_re = re.compile(r"<[^>]+>")
+        for html in _fuzz_pages(3690, 1500):
+            assert sub_closed_tags(tag_re, "", html) == tag_re.sub("", html)
+
+
+# ---------------------------------------------------------------------------
+# Hot paths keep their output
+# ---------------------------------------------------------------------------
+
+class TestHotPathOutput:
+    def test_animation_fixes(self):
+        agent = AnimationFixAgent()
+        html = '<a href="#" class="btn-primary">Vai</a><a class="cta" data-animate="x">y</a>'
+        assert agent._add_magnetic_to_ctas(html) == (
+            '<a data-animate="magnetic" href="#" class="btn-primary">Vai</a>'
+            '<a class="cta" data-animate="x">y</a>', 1)
+        assert agent._add_animate_to_cards('<div class="card p-4">x</div>') == (
+            '<div data-animate="fade-up" class="card p-4">x</div>', 1)
+        assert agent._add_animate_to_images('<img src="a.jpg" data-animate="x">') == (
+            '<img src="a.jpg" data-animate="x">', 0)
+
+    def test_missing_alt(self):
+        html = '<img src="a.jpg"><img alt="b" src="b.jpg"><IMG SRC="c.jpg">'
+        fixed, count = AccessibilityAgent()._fix_missing_alt(html)
+        assert count == 2 and fixed.count("alt=") == 3
+
+    def test_randomize_is_reproducible_with_a_seed(self, assembled_page):
+        first = _randomize_animations(assembled_page, seed=36)
+        assert _randomize_animations(assembled_page, seed=36) == first != assembled_page
+
+    def test_diversify_keeps_skipped_regions(self, assembled_page):
+        random.seed(36)
+        out, _ = diversify_effects(assembled_page)
+        for block in re.findall(r"<(?:script|style|nav)[\s>].*?</(?:script|style|nav)>", assembled_page, re.DOTALL):
+            assert block in out
+        assert "__SKIP_" not in out
+
+    def test_strip_for_refine_stashes_style_and_large_svg(self):
+        path = "<path d='" + "M0 0" * 200 + "'/>"
+        html = f"<style>a{{}}</style><svg><path/></svg>x  \n<svg>{path}</svg><!-- c --><!-- __KEEP__ -->"
+        stripped, stash = SwarmGenerator._strip_for_refine(html)
+        assert stripped == (
+            "<!-- __STYLE_0__ --><svg><path/></svg>x\n<svg><!-- __SVG_INNER_1__ --></svg><!-- __KEEP__ -->"
+        )
+        assert stash["styles"] == ["<style>a{}</style>"]
+        assert [s["index"] for s in stash["svgs"]] == [1] and stash["svgs"][0]["inner"] == path
+
+    @pytest.mark.parametrize("html,empty", [
+        ("<section><h2>Titolo</h2><p>" + "Pasta fresca fatta in casa ogni giorno. " * 3 + "</p></section>", False),
+        ('<section><style>a{}</style><div class="card"></div></section>', True),
+        ("<section><script>x</script>   </section>", True),
+    ])
+    def test_is_section_empty(self, html, empty):
+        assert DataBindingGenerator._is_section_empty(None, html) is empty
+
+
+# ---------------------------------------------------------------------------
+# Time budgets on pathological pages
+# ---------------------------------------------------------------------------
+
+CARD = (
+    '<div class="card rounded-xl shadow-lg"><h2 data-animate="text-split" data-split-type="words">Titolo</h2>'
+    '<p data-animate="blur-slide">Testo</p><a href="#" class="btn" data-animate="bounce-in">Vai</a>'
+    '<img src="a.jpg" data-animate="scale-in"></div>\n'
+)
+
+PATHOLOGICAL = {
+    # (generator, size giving the budgeted page)
+    "cards": (lambda n: '<section id="s">' + CARD * n + "</section>", 10_000),
+    "huge_attributes": (lambda n: (
+        f'<section><div class="card" data-x="{"a" * n}">x</div><h1 title="{"b" * n}">T</h1>'
+        f'<a class="btn" href="{"c" * n}">x</a></section>'
+    ), 1_000_000),
+    "nested_starts": (lambda n: (
+        '<div title="' + "<div <a <h1 <img <p <section <style <svg " * n + '" data-animate="x">'
+    ), 20_000),
+    "unbalanced_tags": (lambda n: (
+        '<div class="card" <h1 data-animate="text-split" <p <a class="btn" <img <section <button ' * n
+    ), 8_000),
+    "unclosed_raw_text": (lambda n: "<style>a{}<svg><script>/* x */ <!-- " * n + "<p>" + " " * n, 8_000),
+    "whitespace_runs": (lambda n: "x" + " " * n + "y\n\n" + "\t" * n + "z", 400_000),
+}
+
+_animation_agent = AnimationFixAgent()
+_accessibility_agent = AccessibilityAgent()
+
+HOT_PATHS = {
+    "cta": _animation_agent._add_magnetic_to_ctas,
+    "cards": _animation_agent._add_animate_to_cards,
+    "images": _animation_agent._add_animate_to_images,
+    "missing_alt": _accessibility_agent._fix_missing_alt,
+    "randomize_animations": _randomize_animations,
+    "diversify_effects": diversify_effects,
+    "strip_for_refine": SwarmGenerator._strip_for_refine,
+    "is_section_empty": lambda html: DataBindingGenerator._is_section_empty(None, html),
+}
+
+# Seconds per call on the full-size page; the quadratic versions took 4-50 s
+BUDGET_S = 2.0
+
+
+def _timed(fn, html):
+    logging.disable(logging.WARNING)
+    try:
+        start = time.perf_counter()
+        fn(html)
+        return time.perf_counter() - start
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+class TestTimeBudgets:
+    @pytest.mark.parametrize("page", sorted(PATHOLOGICAL))
+    @pytest.mark.parametrize("hot_path", sorted(HOT_PATHS))
+    def test_budget_and_scaling(self, page, hot_path):
+        make, size = PATHOLOGICAL[page]
+        fn = HOT_PATHS[hot_path]
+        small, large = make(size // 4), make(size)
+        t_small = min(_timed(fn, small) for _ in range(2))
+        t_large = min(_timed(fn, large) for _ in range(2))
+        assert t_large < BUDGET_S, f"{hot_path} on {page}: {t_large:.2f}s"
+        # 4x the input: linear is ~4x, quadratic would be ~16x
+        assert t_large < max(8 * t_small, 0.05), f"{hot_path} on {page}: {t_small:.3f}s -> {t_large:.3f}s"
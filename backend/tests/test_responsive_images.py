@@ -0,0 +1,192 @@
+"""Tests for the responsive image manifests (app/services/images/optimizer.py,
+app/services/images/responsive.py).
+
+Covers:
+- optimize_and_upload: manifest with the main image, WebP widths below the
+  original and AVIF variants when Pillow supports them; failed variant
+  uploads left out, failed main upload -> None; encoding and uploads run
+  off the event loop thread
+- apply_responsive_images: srcset/sizes/width/height added, <picture> with
+  an AVIF source, existing srcset/sizes/width kept, unmanaged images and
+  data-src left alone, idempotent
+- add_image_manifests / apply_photo_choices: manifests kept by src
+- The assembler emitting srcset for a managed hero photo
+"""
+
+import asyncio
+import io
+import itertools
+import threading
+
+import pytest
+
+from app.services.images import optimizer
+from app.services.images.optimizer import AVIF_TYPE, WEBP_TYPE, optimize_and_upload
+from app.services.images.responsive import (
+    DEFAULT_SIZES,
+    add_image_manifests,
+    apply_responsive_images,
+    srcset,
+)
+
+PHOTO = "https://media.e-quipe.app/sites/42/main.webp"
+
+
+def _manifest(avif: bool = False) -> dict:
+    variants = [
+        {"url": f"https://media.e-quipe.app/sites/42/{w}.webp", "width": w, "type": WEBP_TYPE}
+        for w in (400, 800)
+    ] + [{"url": PHOTO, "width": 1600, "type": WEBP_TYPE}]
+    if avif:
+        variants += [
+            {"url": f"https://media.e-quipe.app/sites/42/{w}.avif", "width": w, "type": AVIF_TYPE}
+            for w in (400, 1600)
+        ]
+    return {"src": PHOTO, "width": 1600, "height": 900, "variants": variants}
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 60, 40)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# optimize_and_upload
+# ---------------------------------------------------------------------------
+
+class TestOptimizeAndUpload:
+    @pytest.fixture
+    def uploads(self, monkeypatch):
+        calls = []
+        counter = itertools.count()
+
+        def upload(content, ext, site_id=None, user_id=None):
+            calls.append((ext, len(content)))
+            return f"https://media.e-quipe.app/sites/{site_id}/{next(counter)}{ext}"
+
+        monkeypatch.setattr(optimizer, "upload_to_r2", upload)
+        return calls
+
+    def test_manifest_with_variants(self, uploads, monkeypatch):
+        monkeypatch.setattr(optimizer, "_avif_supported", lambda: False)
+        manifest = asyncio.run(optimize_and_upload(_jpeg(1000, 500), "a.jpg", site_id=42, generate_srcset=True))
+        assert manifest["src"] == "https://media.e-quipe.app/sites/42/0.webp"
+        assert (manifest["width"], manifest["height"]) == (1000, 500)
+        assert [(v["width"], v["type"]) for v in manifest["variants"]] == [
+            (400, WEBP_TYPE), (800, WEBP_TYPE), (1000, WEBP_TYPE),
+        ]
+        assert manifest["variants"][-1]["url"] == manifest["src"]
+        assert len(uploads) == 3
+
+    def test_avif_variants(self, uploads):
+        if not optimizer._avif_supported():
+            pytest.skip("Pillow built without AVIF")
+        manifest = asyncio.run(optimize_and_upload(_jpeg(600, 300), "a.png", site_id=42, generate_srcset=True))
+        assert [(v["width"], v["type"]) for v in manifest["variants"]] == [
+            (400, WEBP_TYPE), (600, WEBP_TYPE), (400, AVIF_TYPE), (600, AVIF_TYPE),
+        ]
+        assert [ext for ext, _ in uploads] == [".webp", ".webp", ".avif", ".avif"]
+
+    def test_without_srcset(self, uploads):
+        manifest = asyncio.run(optimize_and_upload(_jpeg(300, 200), "a.jpg", site_id=7))
+        assert manifest == {"src": "https://media.e-quipe.app/sites/7/0.webp", "width": 300, "height": 200, "variants": []}
+
+    def test_runs_off_the_event_loop(self, monkeypatch):
+        threads = []
+
+        def upload(content, ext, site_id=None, user_id=None):
+            threads.append(threading.current_thread())
+            return f"https://media.e-quipe.app/sites/{site_id}/{len(threads)}{ext}"
+
+        monkeypatch.setattr(optimizer, "upload_to_r2", upload)
+        assert asyncio.run(optimize_and_upload(_jpeg(1000, 500), "a.jpg", site_id=1, generate_srcset=True))
+        assert threads and threading.main_thread() not in threads
+
+    def test_failed_uploads(self, monkeypatch):
+        results = iter(["https://m/main.webp", None, "https://m/800.webp"])
+        monkeypatch.setattr(optimizer, "upload_to_r2", lambda *a, **k: next(results))
+        monkeypatch.setattr(optimizer, "_avif_supported", lambda: False)
+        manifest = asyncio.run(optimize_and_upload(_jpeg(1000, 500), "a.jpg", site_id=1, generate_srcset=True))
+        assert [v["width"] for v in manifest["variants"]] == [800, 1000]
+
+        monkeypatch.setattr(optimizer, "upload_to_r2", lambda *a, **k: None)
+        assert asyncio.run(optimize_and_upload(_jpeg(100, 100), "a.jpg", site_id=1)) is None
+
+
+# ---------------------------------------------------------------------------
+# Rewriting
+# ---------------------------------------------------------------------------
+
+class TestApplyResponsiveImages:
+    def test_srcset_and_sizes(self):
+        html = f'<div><img src="{PHOTO}" alt="Sala" class="w-full"></div>'
+        out = apply_responsive_images(html, {PHOTO: _manifest()})
+        assert out == (
+            f'<div><img src="{PHOTO}" alt="Sala" class="w-full" srcset="{srcset(_manifest(), WEBP_TYPE)}" '
+            f'sizes="{DEFAULT_SIZES}" width="1600" height="900"></div>'
+        )
+        assert srcset(_manifest(), WEBP_TYPE).endswith(f"{PHOTO} 1600w")
+
+    def test_picture_with_avif(self):
+        html = f'<img src="{PHOTO}" sizes="50vw" width="800" />'
+        out = apply_responsive_images(html, {PHOTO: _manifest(avif=True)})
+        assert out.startswith('<picture style="display:contents"><source type="image/avif" ')
+        assert 'sizes="50vw">' in out and out.endswith(' height="900"/></picture>')
+        assert out.count("sizes=") == 2 and 'width="800"' in out and 'width="1600"' not in out
+        assert "1600.avif 1600w" in out
+
+    def test_idempotent(self):
+        manifests = {PHOTO: _manifest(avif=True)}
+        once = apply_responsive_images(f'<img src="{PHOTO}">', manifests)
+        assert apply_responsive_images(once, manifests) == once
+
+    def test_left_alone(self):
+        manifests = {PHOTO: _manifest()}
+        for html in (
+            '<img src="https://images.unsplash.com/x.jpg">',
+            f'<img src="{PHOTO}" srcset="a.webp 1x">',
+            f'<img data-src="{PHOTO}">',
+            f'<div style="background-image:url({PHOTO})"></div>',
+        ):
+            assert apply_responsive_images(html, manifests) == html
+        assert apply_responsive_images(f'<img src="{PHOTO}">', None) == f'<img src="{PHOTO}">'
+
+
+# ---------------------------------------------------------------------------
+# Site data
+# ---------------------------------------------------------------------------
+
+class TestSiteManifests:
+    def test_add_image_manifests(self):
+        site_data = {}
+        bad = {"src": "x", "variants": [{"url": "y", "width": "400", "type": WEBP_TYPE}]}
+        assert add_image_manifests(site_data, [_manifest(), bad, "nope"]) == 1
+        assert list(site_data["image_manifests"]) == [PHOTO]
+
+    def test_apply_photo_choices_keeps_manifests(self):
+        from app.services.databinding_generator import DataBindingGenerator
+
+        gen = object.__new__(DataBindingGenerator)
+        site_data = {"components": [{"data": {"HERO_IMAGE_URL": "https://placehold.co/600x400"}}]}
+        gen.apply_photo_choices(site_data, [
+            {"section_type": "hero", "action": "upload", "photo_url": PHOTO, "photo_manifests": [_manifest()]},
+        ])
+        assert site_data["components"][0]["data"]["HERO_IMAGE_URL"] == PHOTO
+        assert site_data["image_manifests"][PHOTO]["width"] == 1600
+
+    def test_assembled_page(self):
+        from app.services.template_assembler import SectionRenderCache, TemplateAssembler
+
+        assembler = TemplateAssembler(section_cache=SectionRenderCache(max_size=0))
+        site_data = {
+            "theme": {"primary_color": "#c8102e"},
+            "meta": {"title": "Trattoria"},
+            "global": {"BUSINESS_NAME": "Trattoria"},
+            "components": [{"variant_id": "hero-split-01", "data": {"HERO_IMAGE_URL": PHOTO}}],
+            "image_manifests": {PHOTO: _manifest()},
+        }
+        html = assembler.assemble(site_data)
+        assert f'srcset="{srcset(_manifest(), WEBP_TYPE)}"' in html
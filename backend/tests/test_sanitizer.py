@@ -0,0 +1,273 @@
+"""Tests for the streaming HTML sanitizer (app/services/sanitizer.py).
+
+Covers:
+- Parity with the legacy regex pipeline on an assembled page
+- Allowlist semantics: script src/markers/dangerous patterns, iframe domains,
+  object/embed/applet, event handlers, javascript: hrefs
+  (xlink:href too)
+- Browser tokenizer cases the regexes got wrong: quoted ">" in attributes,
+  comments and raw text are inert, script escape states, SVG breakouts
+- Streaming: any chunking gives the one-shot output, max_pending fails closed
+- Fuzz: random markup never crashes and sanitizing twice is stable
+- Adversarial inputs (unterminated scripts, nested comments, huge attributes)
+  scale linearly
+"""
+
+import logging
+import random
+import time
+
+import pytest
+
+from app.services.sanitizer import (
+    StreamingSanitizer,
+    _legacy_sanitize_fragment,
+    sanitize_fragment,
+    sanitize_output,
+)
+
+
+@pytest.fixture(scope="module")
+def assembled_page():
+    from app.services.template_assembler import SectionRenderCache, TemplateAssembler
+
+    assembler = TemplateAssembler(section_cache=SectionRenderCache(max_size=0))
+    return assembler.assemble({
+        "theme": {"primary_color": "#c8102e", "secondary_color": "#1e40af",
+                  "font_heading": "Playfair Display", "font_body": "Inter"},
+        "meta": {"title": "Trattoria da Mario", "description": "Cucina romana"},
+        "global": {"BUSINESS_NAME": "Trattoria da Mario"},
+        "components": [
+            {"variant_id": "hero-split-01", "data": {"HERO_TITLE": "Benvenuti"}},
+            {"variant_id": "about-magazine-01", "data": {}},
+            {"variant_id": "contact-form-01", "data": {}},
+            {"variant_id": "footer-minimal-02", "data": {}},
+        ],
+    })
+
+
+def _stream(html, chunk_sizes, **kwargs):
+    sanitizer = StreamingSanitizer(**kwargs)
+    out, pos = [], 0
+    for size in chunk_sizes:
+        out.append(sanitizer.feed(html[pos:pos + size]))
+        pos += size
+    out.append(sanitizer.close(html[pos:]))
+    return "".join(out)
+
+
+# ---------------------------------------------------------------------------
+# Legacy parity
+# ---------------------------------------------------------------------------
+
+class TestLegacyParity:
+    def test_template_assembled_page(self, assembled_page):
+        new = sanitize_fragment(assembled_page, is_template_assembled=True)
+        assert new == _legacy_sanitize_fragment(assembled_page, is_template_assembled=True)
+        assert "gsap" in new
+
+    def test_ai_page_without_handlers(self, assembled_page):
+        new = sanitize_fragment(assembled_page)
+        assert " onclick=" not in new and " onmouseover=" not in new
+        # The legacy handler regex stopped at the first inner quote and left
+        # the tail of the attribute behind; the tokenizer removes all of it
+        assert "this.style.color" not in new
+        assert "this.style.color" in _legacy_sanitize_fragment(assembled_page)
+
+    @pytest.mark.parametrize("html", [
+        '<p class="x">Ciao</p>',
+        '<script src="https://cdn.tailwindcss.com"></script><p>a</p>',
+        '<script>document.querySelector(".x").classList.add("y");</script>',
+        '<script>fetch("/x")</script><p>dopo</p>',
+        '<iframe src="https://www.youtube.com/embed/x"></iframe>',
+        '<iframe src="https://evil.example/x"></iframe><p>dopo</p>',
+        '<object data="x"><param name="a"></object><embed src="x.swf"/>ok',
+        '<a href="javascript:alert(1)">x</a><a href="/ok">y</a>',
+        '<button onclick="go()">b</button><img src=x onerror="alert(1)">',
+    ])
+    @pytest.mark.parametrize("template", [True, False])
+    def test_simple_pages(self, html, template):
+        assert sanitize_fragment(html, template) == _legacy_sanitize_fragment(html, template)
+
+
+# ---------------------------------------------------------------------------
+# Allowlists and tokenizer semantics
+# ---------------------------------------------------------------------------
+
+class TestSemantics:
+    def test_script_src_is_read_from_the_start_tag(self):
+        # Legacy searched the whole element for 'src="'
+        html = '<script>var a = \'src="https://cdn.tailwindcss.com"\'; fetch(a)</script>'
+        assert sanitize_fragment(html, True) == ""
+        assert sanitize_fragment("<SCRIPT SRC=https://cdn.tailwindcss.com></SCRIPT>") != ""
+
+    def test_trusted_marker_and_dangerous_pattern(self):
+        ok = "<script>gsap.registerPlugin(ScrollTrigger);</script>"
+        assert sanitize_fragment(ok, True) == ok
+        assert sanitize_fragment("<script>gsap.x(); eval(y)</script>", True) == ""
+
+    def test_quoted_gt_does_not_end_the_tag(self):
+        html = '<div title="a>b" onclick="x()">t</div>'
+        assert sanitize_fragment(html) == '<div title="a>b">t</div>'
+
+    def test_handler_text_outside_tags_is_kept(self):
+        html = "<p>Scrivi onclick=x nel codice</p>"
+        assert sanitize_fragment(html) == html
+
+    def test_glued_attributes_stay_separated(self):
+        assert sanitize_fragment('<a onclick="x"href="/y">t</a>') == '<a href="/y">t</a>'
+
+    @pytest.mark.parametrize("href", [
+        "javascript:alert(1)", " JavaScript:x", "java\tscript:x", "&#106;avascript:x", "javascript&colon;x",
+    ])
+    def test_javascript_href_variants(self, href):
+        assert sanitize_fragment(f'<a href="{href}">x</a>') == '<a href="#">x</a>'
+
+    @pytest.mark.parametrize("template", [True, False])
+    def test_prefixed_javascript_href(self, template):
+        html = '<svg><a xlink:href="javascript:alert(1)"><text>x</text></a></svg>'
+        assert sanitize_fragment(html, template) == '<svg><a xlink:href="#"><text>x</text></a></svg>'
+        assert sanitize_fragment(html, template) == _legacy_sanitize_fragment(html, template)
+
+    def test_comments_and_raw_text_are_inert(self):
+        html = '<!-- <script>fetch(1)</script> --><textarea><iframe src=x></textarea><style>a{}</style>'
+        assert sanitize_fragment(html) == html
+
+    def test_abrupt_comment_end(self):
+        html = "<!--><script>fetch(1)</script>x"
+        assert sanitize_fragment(html) == "<!-->x"
+
+    def test_script_escape_states(self):
+        # "<!--<script>" inside a script hides the first "</script>"
+        html = '<script><!--<script></script>fetch(1)</script><p>dopo</p>'
+        assert sanitize_fragment(html) == "<p>dopo</p>"
+
+    def test_unterminated_script_runs_to_eof(self):
+        assert sanitize_fragment("<p>a</p><script>fetch(1) <p>b</p>") == "<p>a</p>"
+        assert sanitize_fragment("<p>a</p><script>var x = 1; <p>b</p>") == "<p>a</p><script>var x = 1; <p>b</p>"
+
+    def test_svg_breakout_and_foreign_style(self):
+        html = "<svg><style><img src=x onerror=alert(1)></style></svg>"
+        assert sanitize_fragment(html) == "<svg><style><img src=x></style></svg>"
+        html = "<svg><p><style><img src=x onerror=alert(1)></style>"
+        assert sanitize_fragment(html) == html
+
+    def test_svg_title_is_not_rcdata(self):
+        html = "<svg><title><img src=x onerror=y></title></svg>"
+        assert sanitize_fragment(html) == "<svg><title><img src=x></title></svg>"
+
+    def test_removed_element_does_not_change_namespace(self):
+        # <embed> would end SVG content, but it is removed from the output
+        html = "<svg><embed><style><img src=x onerror=y></style></svg>"
+        assert sanitize_fragment(html) == "<svg><style><img src=x></style></svg>"
+
+    def test_dangling_lt_before_removed_markup(self):
+        assert sanitize_fragment("<<script>fetch(1)</script>") == "&lt;"
+
+    def test_unterminated_tag_is_dropped(self):
+        assert sanitize_fragment('<p>a</p><img src=x onerror="y') == "<p>a</p>"
+
+    def test_sanitize_output_adds_document_shell(self):
+        assert sanitize_output("<p>a</p>").startswith("<!DOCTYPE html>")
+
+
+# ---------------------------------------------------------------------------
+# Streaming
+# ---------------------------------------------------------------------------
+
+class TestStreaming:
+    def test_random_chunking_matches_one_shot(self, assembled_page):
+        rng = random.Random(35)
+        html = assembled_page + "<script>fetch(1)</script><!-- x --><svg><style>a</style></svg>"
+        for template in (True, False):
+            expected = sanitize_fragment(html, template)
+            for _ in range(5):
+                sizes = [rng.randint(1, 4000) for _ in range(len(html) // 500)]
+                assert _stream(html, sizes, is_template_assembled=template) == expected
+
+    def test_single_character_chunks(self):
+        html = '<p onclick="x">a</p><script>var a = "</p>";</script><!--x--><b>b</b>'
+        assert _stream(html, [1] * len(html)) == sanitize_fragment(html)
+
+    def test_complete_constructs_are_emitted_early(self):
+        sanitizer = StreamingSanitizer()
+        assert sanitizer.feed('<p onclick="x">a</p><scr') == "<p>a</p>"
+        assert sanitizer.feed("ipt>fetch(1)</script>b") == "b"
+        assert sanitizer.close() == ""
+
+    def test_max_pending_fails_closed(self, caplog):
+        sanitizer = StreamingSanitizer(max_pending=100)
+        assert sanitizer.feed("<p>a</p><script>") == "<p>a</p>"
+        with caplog.at_level(logging.WARNING):
+            assert sanitizer.feed("x" * 200) == ""
+        assert "scartato" in caplog.text
+        assert sanitizer.feed("</script><p>b</p>") == ""
+        assert sanitizer.close() == ""
+
+
+# ---------------------------------------------------------------------------
+# Fuzz
+# ---------------------------------------------------------------------------
+
+FUZZ_PIECES = [
+    "<", ">", "/", "<!--", "-->", "--!>", "<!", "</", "<script>", "</script>", "<script ",
+    "<style>", "</style>", "<svg>", "</svg>", "<math>", "<p>", "<img src=x onerror=y>",
+    "<iframe src=\"https://youtube.com/e\">", "</iframe>", "<object>", "</object>",
+    'onclick="a"', " href=javascript:x ", '"', "'", "=", " ", "fetch(1)", "a", "<title>",
+    "<foreignObject>", "<plaintext>", "<textarea>", "</textarea>", "<?x>", "&#x3c;",
+]
+
+
+class TestFuzz:
+    def test_random_markup(self):
+        rng = random.Random(3500)
+        for _ in range(400):
+            html = "".join(rng.choice(FUZZ_PIECES) for _ in range(rng.randint(1, 40)))
+            template = rng.random() < 0.5
+            once = sanitize_fragment(html, template)
+            # A second pass finds nothing left to remove
+            assert sanitize_fragment(once, template) == once
+            sizes = [rng.randint(1, 8) for _ in range(len(html) // 4)]
+            assert _stream(html, sizes, is_template_assembled=template) == once
+
+
+# ---------------------------------------------------------------------------
+# Linear time on adversarial inputs
+# ---------------------------------------------------------------------------
+
+ADVERSARIAL = {
+    "unterminated_script_tags": lambda n: "<script " * n + "x" * 1000,
+    "script_without_end": lambda n: "<script>" + "a<" * n,
+    "nested_comments": lambda n: "<!--" * n + "x",
+    "huge_attribute": lambda n: '<div data-x="' + "a" * (50 * n) + '" onclick=x>',
+    "unclosed_iframes": lambda n: "<iframe src=x>" * n,
+    "unclosed_objects": lambda n: "<object>" * n,
+    "lt_run": lambda n: "<" * (20 * n),
+    "script_escapes": lambda n: "<script><!--" + "<script>" * n,
+    "svg_nesting": lambda n: "<svg>" * n + "<p>" * n,
+}
+
+
+def _best_time(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+class TestLinearTime:
+    @pytest.mark.parametrize("name", sorted(ADVERSARIAL))
+    def test_doubling_the_input_about_doubles_the_time(self, name):
+        make = ADVERSARIAL[name]
+        small, large = make(2000), make(8000)
+        t_small = _best_time(lambda: sanitize_fragment(small))
+        t_large = _best_time(lambda: sanitize_fragment(large))
+        # 4x the input: linear is ~4x, quadratic would be ~16x
+        assert t_large < max(8 * t_small, 0.02)
+
+    def test_streaming_small_chunks_stays_linear(self):
+        html = "<script>" + "a<" * 40000
+        t = _best_time(lambda: _stream(html, [64] * (len(html) // 64)), repeat=1)
+        assert t < 1.0
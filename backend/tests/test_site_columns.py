@@ -0,0 +1,118 @@
+"""Tests for the deferred heavy columns of Site (app/models/site.py).
+
+Covers:
+- A plain Site load never selects config, custom_css/js, the legacy
+  html_content or qc_report; each group loads on first access, alone
+- GET /api/sites/ selects only the SiteResponse columns
+- GET /api/generate/status/{site_id} selects only the status columns, plus config
+  (the generation preview) while the site is generating
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base, ThreadedSession, get_async_db, get_db
+from app.core.security import get_current_active_user, get_current_active_user_async
+from app.main import app
+from app.models.site import Site
+from app.models.user import User
+
+HEAVY_COLUMNS = ("sites.config", "sites.custom_css", "sites.custom_js", "sites.html_content", "sites.qc_report")
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[User.__table__, Site.__table__])
+    session = sessionmaker(bind=engine, autoflush=False)()
+    user = User(email="mario@example.com", hashed_password="x")
+    session.add(user)
+    session.flush()
+    for n, status in enumerate(("ready", "generating")):
+        session.execute(Site.__table__.insert().values(
+            name=f"Sito {n}", slug=f"sito-{n}", owner_id=user.id, status=status, generation_step=2,
+            config={"_generation_preview": {"colors": ["#c8102e"]}, "components": ["x" * 1000]},
+            custom_css="body{}", custom_js="void 0", html_content="<html></html>", qc_report={"score": 9},
+        ))
+    session.commit()
+    session.info["user_id"] = user.id
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def statements(db):
+    captured = []
+    event.listen(db.bind, "before_cursor_execute", lambda *args: captured.append(args[2]))
+    return captured
+
+
+def _heavy(statements):
+    return {column for sql in statements for column in HEAVY_COLUMNS if column in sql}
+
+
+@pytest.fixture
+def client(db):
+    user = MagicMock(spec=User)
+    user.id = db.info["user_id"]
+
+    async def _override_auth():
+        return user
+
+    def _override_db():
+        yield db
+
+    async def _override_async_db():
+        yield ThreadedSession(db)
+
+    app.dependency_overrides[get_current_active_user] = _override_auth
+    app.dependency_overrides[get_current_active_user_async] = _override_auth
+    app.dependency_overrides[get_db] = _override_db
+    app.dependency_overrides[get_async_db] = _override_async_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+# ---------------------------------------------------------------------------
+# Model
+# ---------------------------------------------------------------------------
+
+def test_groups_load_on_access(db, statements):
+    site = db.query(Site).filter(Site.slug == "sito-0").one()
+    assert site.name == "Sito 0" and _heavy(statements) == set()
+
+    assert site.config["_generation_preview"]
+    assert _heavy(statements) == {"sites.config"}
+    assert site.custom_css == "body{}"
+    assert _heavy(statements) == {"sites.config", "sites.custom_css", "sites.custom_js"}
+    assert site.get_html() == "<html></html>" and site.qc_report == {"score": 9}
+    assert _heavy(statements) == set(HEAVY_COLUMNS)
+
+
+# ---------------------------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------------------------
+
+def test_list_sites(client, statements):
+    resp = client.get("/api/sites/")
+    assert resp.status_code == 200
+    assert {s["slug"] for s in resp.json()} == {"sito-0", "sito-1"}
+    site_queries = [sql for sql in statements if "FROM sites" in sql]
+    assert len(site_queries) == 1 and _heavy(statements) == set()
+    assert "sites.generation_message" not in site_queries[0]
+
+
+def test_status(client, db, statements):
+    ready, generating = db.query(Site.id).order_by(Site.id).all()
+    resp = client.get(f"/api/generate/status/{ready.id}")
+    assert resp.json()["percentage"] == 100 and resp.json()["preview_data"] is None
+    assert _heavy(statements) == set()
+
+    resp = client.get(f"/api/generate/status/{generating.id}")
+    assert resp.json()["preview_data"] == {"colors": ["#c8102e"]}
+    assert _heavy(statements) == {"sites.config"}
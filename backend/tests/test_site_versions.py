@@ -0,0 +1,174 @@
+"""Tests for the site version storage (app/services/site_versions.py).
+
+Covers:
+- make_delta/apply_delta: round trip, no trailing newline, empty pages,
+  changes at the head or tail; None past MAX_DIFF_LINES changed lines
+- save_version: snapshot every SNAPSHOT_INTERVAL, deltas in between,
+  every version rebuilt by version_html
+- Pruning to MAX_VERSIONS with the oldest kept version as a snapshot
+- A broken chain: VersionChainError on read, snapshot on save
+- A diff too large: snapshot on save and in the migration
+- migrate_site_versions: legacy full copies rewritten, re-runnable
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.site import Site
+from app.models.site_version import SiteVersion
+from app.models.user import User
+from app.services import site_versions
+from app.services.site_versions import (
+    MAX_VERSIONS,
+    SNAPSHOT_INTERVAL,
+    VersionChainError,
+    apply_delta,
+    make_delta,
+    migrate_site_versions,
+    save_version,
+    version_html,
+)
+
+
+def _page(n: int) -> str:
+    sections = "".join(f"<section id=\"s{i}\">\n  <p>Sezione {i}</p>\n</section>\n" for i in range(40))
+    return f"<html>\n<body>\n<h1>Versione {n}</h1>\n{sections}</body>\n</html>\n"
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__, Site.__table__, SiteVersion.__table__])
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def site(db):
+    user = User(email="mario@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    site = Site(name="Trattoria", slug="trattoria", owner_id=user.id)
+    db.add(site)
+    db.flush()
+    return site
+
+
+def _versions(db, site):
+    return (
+        db.query(SiteVersion)
+        .filter(SiteVersion.site_id == site.id)
+        .order_by(SiteVersion.version_number.asc())
+        .all()
+    )
+
+
+# ---------------------------------------------------------------------------
+# Deltas
+# ---------------------------------------------------------------------------
+
+class TestDelta:
+    @pytest.mark.parametrize("base, html", [
+        (_page(1), _page(2)),
+        (_page(1), _page(1).replace("Sezione 7", "Sezione sette") + "<!-- fine -->"),
+        ("a\nb\nc", "a\nB\nc"),
+        ("", _page(1)),
+        (_page(1), ""),
+        (_page(1), _page(1)),
+        (_page(1), "<!doctype html>\n" + _page(1)),
+        (_page(1), _page(1) + "<script></script>"),
+        ("a\nb\n", "a\nb\na\nb\n"),
+    ])
+    def test_round_trip(self, base, html):
+        assert apply_delta(base, make_delta(base, html)) == html
+
+    def test_delta_is_small(self):
+        base = _page(1)
+        assert len(make_delta(base, base.replace("Sezione 20", "Sezione venti"))) < 100
+
+    def test_too_many_changed_lines(self, monkeypatch):
+        monkeypatch.setattr(site_versions, "MAX_DIFF_LINES", 10)
+        base = _page(1)
+        # Only the lines between the common head and tail count
+        assert make_delta(base, base.replace("Sezione 20", "Sezione venti"))
+        assert make_delta(base, base.replace("Sezione", "Capitolo")) is None
+
+
+# ---------------------------------------------------------------------------
+# Saving and reading
+# ---------------------------------------------------------------------------
+
+class TestSaveVersion:
+    def test_layout(self, db, site):
+        for n in range(1, 8):
+            save_version(db, site, _page(n), f"Refine {n}")
+        versions = _versions(db, site)
+        snapshots = [v.version_number for v in versions if v.is_snapshot]
+        assert snapshots == [1, 1 + SNAPSHOT_INTERVAL]
+        for v in versions:
+            assert version_html(db, v) == _page(v.version_number)
+            if not v.is_snapshot:
+                assert v.base_version == v.version_number - 1 and v.delta
+
+    def test_prune_keeps_chain(self, db, site):
+        for n in range(1, MAX_VERSIONS + 8):
+            save_version(db, site, _page(n), f"Refine {n}")
+        versions = _versions(db, site)
+        assert len(versions) == MAX_VERSIONS
+        assert versions[0].version_number == 8 and versions[0].is_snapshot
+        assert [version_html(db, v) for v in versions] == [_page(v.version_number) for v in versions]
+
+    def test_broken_chain(self, db, site):
+        for n in range(1, 4):
+            save_version(db, site, _page(n), f"Refine {n}")
+        db.delete(_versions(db, site)[1])
+        db.flush()
+        with pytest.raises(VersionChainError):
+            version_html(db, _versions(db, site)[-1])
+        version = save_version(db, site, _page(4), "Refine 4")
+        assert version.is_snapshot and version_html(db, version) == _page(4)
+
+    def test_large_diff_saved_as_snapshot(self, db, site, monkeypatch):
+        monkeypatch.setattr(site_versions, "MAX_DIFF_LINES", 10)
+        save_version(db, site, _page(1), "Generazione")
+        assert not save_version(db, site, _page(2), "Refine").is_snapshot
+        version = save_version(db, site, _page(3).replace("Sezione", "Capitolo"), "Rigenerazione")
+        assert version.is_snapshot and version.delta is None
+        after = save_version(db, site, _page(4).replace("Sezione", "Capitolo"), "Refine")
+        assert after.base_version == version.version_number
+        assert version_html(db, after) == _page(4).replace("Sezione", "Capitolo")
+
+
+# ---------------------------------------------------------------------------
+# Migration
+# ---------------------------------------------------------------------------
+
+def test_migrate_legacy_rows(db, site):
+    for n in range(1, 9):
+        db.add(SiteVersion(site_id=site.id, version_number=n, html_content=_page(n), change_description=""))
+    db.commit()
+
+    stats = migrate_site_versions(db)
+    versions = _versions(db, site)
+    assert [v.version_number for v in versions if v.is_snapshot] == [1, 1 + SNAPSHOT_INTERVAL]
+    assert stats["sites"] == 1 and stats["versions"] == 8 and stats["deltas"] == 6
+    assert stats["bytes_after"] < stats["bytes_before"] / 2
+    assert [version_html(db, v) for v in versions] == [_page(n) for n in range(1, 9)]
+
+    assert migrate_site_versions(db)["bytes_after"] == stats["bytes_after"]
+
+
+def test_migrate_large_diff_as_snapshot(db, site, monkeypatch):
+    monkeypatch.setattr(site_versions, "MAX_DIFF_LINES", 10)
+    pages = [_page(1), _page(2), _page(3).replace("Sezione", "Capitolo"), _page(4).replace("Sezione", "Capitolo")]
+    for n, html in enumerate(pages, start=1):
+        db.add(SiteVersion(site_id=site.id, version_number=n, html_content=html, change_description=""))
+    db.commit()
+
+    assert migrate_site_versions(db)["deltas"] == 2
+    versions = _versions(db, site)
+    assert [v.version_number for v in versions if v.is_snapshot] == [1, 3]
+    assert [version_html(db, v) for v in versions] == pages
@@ -0,0 +1,258 @@
+"""Tests for the compiled per-page Tailwind CSS (app/services/tailwind_compiler.py).
+
+Covers:
+- Utilities: theme values, arbitrary values and properties, opacity
+  modifiers (and the ones Tailwind v3 itself drops), negative and
+  !important utilities, child-selector utilities, gradient stops
+- Variants: screens and dark (media), pseudo-classes, named groups, peers,
+  arbitrary variants, before/after content; unknown variants
+- Rule order: base, components, utilities, then variants; plugin order
+- tailwind.config parsing and class collection from attributes and scripts
+- compile_page: CDN script replaced in place, config/warn scripts dropped,
+  CDN kept for unsupported classes or configs
+- refresh_compiled_css after class edits, falling back to the CDN
+- TemplateAssembler output, sanitizer and QC resource rule, every
+  component class compiling with the head template's config
+"""
+
+from pathlib import Path
+
+import pytest
+
+from app.services.tailwind_compiler import (
+    CDN_URL,
+    COMPILED_STYLE_RE,
+    compile_page,
+    get_tailwind_compiler,
+    page_classes,
+    parse_config,
+    refresh_compiled_css,
+)
+from app.services.sanitizer import sanitize_output
+
+COMPONENTS_DIR = Path(__file__).parent.parent / "app" / "components"
+CONFIG = {"theme": {"extend": {
+    "colors": {"primary": "var(--color-primary)"},
+    "fontFamily": {"heading": ["var(--font-heading)", "sans-serif"]},
+}}}
+
+HEAD = (
+    "<html><head>\n"
+    "  <script>\n    const _warn = console.warn;\n    console.warn = (...args) => {\n"
+    "      if (args[0] && args[0].includes('cdn.tailwindcss.com')) return;\n      _warn.apply(console, args);\n"
+    "    };\n  </script>\n"
+    f'  <script src="{CDN_URL}"></script>\n'
+    "  <script>\n    tailwind.config = {\n      theme: {\n        extend: {\n"
+    "          colors: { primary: 'var(--color-primary)', },\n"
+    "          fontFamily: { heading: ['var(--font-heading)', 'sans-serif'] }\n"
+    "        }\n      }\n    }\n  </script>\n"
+    "  <style>.font-heading{letter-spacing:0}</style>\n"
+    "</head>"
+)
+
+
+@pytest.fixture(scope="module")
+def compiler():
+    return get_tailwind_compiler()
+
+
+def _rules(compiler, *classes, config=CONFIG):
+    """Compiled rules after the base layer, one per line."""
+    css, unsupported = compiler.compile(classes, config)
+    assert unsupported == []
+    return css.split("--tw-backdrop-sepia: }\n", 1)[1].splitlines()
+
+
+# ---------------------------------------------------------------------------
+# Utilities
+# ---------------------------------------------------------------------------
+
+class TestUtilities:
+    def test_theme_and_arbitrary_values(self, compiler):
+        assert _rules(compiler, "p-4", "w-1/2", "text-sm/6", "w-[calc(100%-2rem)]", "font-heading") == [
+            ".w-1\\/2{width:50%}",
+            ".w-\\[calc\\(100\\%-2rem\\)\\]{width:calc(100% - 2rem)}",
+            ".p-4{padding:1rem}",
+            ".font-heading{font-family:var(--font-heading), sans-serif}",
+            ".text-sm\\/6{font-size:0.875rem;line-height:1.5rem}",
+        ]
+
+    def test_colors_and_opacity_modifiers(self, compiler):
+        assert _rules(compiler, "bg-red-500", "bg-red-500/50", "text-primary", "text-[#abc]/[.35]") == [
+            ".bg-red-500{--tw-bg-opacity:1;background-color:rgb(239 68 68 / var(--tw-bg-opacity))}",
+            ".bg-red-500\\/50{background-color:rgb(239 68 68 / 0.5)}",
+            ".text-\\[\\#abc\\]\\/\\[\\.35\\]{color:rgb(170 187 204 / .35)}",
+            ".text-primary{color:var(--color-primary)}",
+        ]
+
+    @pytest.mark.parametrize("name", ["bg-primary/10", "bg-[var(--color-primary)]/10", "bg-red-500/33"])
+    def test_modifiers_tailwind_drops_give_no_rule(self, compiler, name):
+        # v3 can't apply an alpha to var() colors or outside the opacity scale
+        assert _rules(compiler, name) == []
+
+    def test_negative_important_and_arbitrary_property(self, compiler):
+        rules = _rules(compiler, "-mt-4", "!mb-0", "-z-10", "[mask-type:luminance]")
+        assert rules == [".-z-10{z-index:-10}", ".-mt-4{margin-top:-1rem}", ".\\!mb-0{margin-bottom:0px !important}",
+                         ".\\[mask-type\\:luminance\\]{mask-type:luminance}"]
+
+    def test_child_selectors_and_gradients(self, compiler):
+        rules = _rules(compiler, "space-y-4", "from-primary", "to-red-500/0")
+        assert rules[0].startswith(".space-y-4 > :not([hidden]) ~ :not([hidden]){--tw-space-y-reverse:0;")
+        assert rules[1] == (
+            ".from-primary{--tw-gradient-from:var(--color-primary) var(--tw-gradient-from-position);"
+            "--tw-gradient-to:rgb(255 255 255 / 0) var(--tw-gradient-to-position);"
+            "--tw-gradient-stops:var(--tw-gradient-from), var(--tw-gradient-to)}"
+        )
+        assert rules[2] == ".to-red-500\\/0{--tw-gradient-to:rgb(239 68 68 / 0) var(--tw-gradient-to-position)}"
+
+    def test_non_tailwind_classes_get_nothing(self, compiler):
+        assert _rules(compiler, "blog__item", "col-md-6", "mb-30", "xxl:flex", "bg-[var(--x)") == []
+
+
+# ---------------------------------------------------------------------------
+# Variants and order
+# ---------------------------------------------------------------------------
+
+class TestVariants:
+    def test_selectors(self, compiler):
+        rules = _rules(compiler, "hover:underline", "group-hover/link:translate-x-1", "peer-checked:block",
+                       "[&:nth-child(3)]:hidden", "before:content-['']", "after:absolute")
+        assert ".after\\:absolute::after{position:absolute;content:var(--tw-content)}" in rules
+        assert ".before\\:content-\\[\\'\\'\\]::before{--tw-content:'';content:var(--tw-content)}" in rules
+        assert ".hover\\:underline:hover{text-decoration-line:underline}" in rules
+        assert any(rule.startswith(".group\\/link:hover .group-hover\\/link\\:translate-x-1{") for rule in rules)
+        assert ".peer:checked ~ .peer-checked\\:block{display:block}" in rules
+        assert ".\\[\\&\\:nth-child\\(3\\)\\]\\:hidden:nth-child(3){display:none}" in rules
+
+    def test_media_grouped_in_variant_order(self, compiler):
+        rules = _rules(compiler, "lg:px-8", "md:flex", "md:hidden", "dark:bg-black", "sm:p-2", "px-4")
+        assert rules == [
+            ".px-4{padding-left:1rem;padding-right:1rem}",
+            "@media (prefers-color-scheme: dark){",
+            ".dark\\:bg-black{--tw-bg-opacity:1;background-color:rgb(0 0 0 / var(--tw-bg-opacity))}",
+            "}",
+            "@media (min-width: 640px){", ".sm\\:p-2{padding:0.5rem}", "}",
+            "@media (min-width: 768px){", ".md\\:flex{display:flex}", ".md\\:hidden{display:none}", "}",
+            "@media (min-width: 1024px){", ".lg\\:px-8{padding-left:2rem;padding-right:2rem}", "}",
+        ]
+
+    def test_plugin_order_decides_conflicts(self, compiler):
+        # pl-* after px-*, hidden after flex (Tailwind's registration order)
+        rules = _rules(compiler, "pl-2", "px-4", "hidden", "flex", "container")
+        assert rules[0] == ".container{width:100%}"
+        assert [rule.split("{")[0] for rule in rules if not rule.startswith(("@", "}", ".container"))] == [
+            ".flex", ".hidden", ".px-4", ".pl-2",
+        ]
+
+    def test_dark_class_strategy(self, compiler):
+        assert _rules(compiler, "dark:hidden", config={"darkMode": "class"}) == [
+            ".dark\\:hidden:is(.dark *){display:none}",
+        ]
+
+
+# ---------------------------------------------------------------------------
+# Config and class collection
+# ---------------------------------------------------------------------------
+
+class TestParsing:
+    def test_head_template_config(self):
+        head = (COMPONENTS_DIR / "head" / "head-template.html").read_text(encoding="utf-8")
+        script = head[head.index("tailwind.config"):head.index("</script>", head.index("tailwind.config"))]
+        config = parse_config(script)
+        assert config["theme"]["extend"]["colors"]["accent"] == "var(--color-accent)"
+        assert config["theme"]["extend"]["fontFamily"]["body"] == ["var(--font-body)", "sans-serif"]
+
+    @pytest.mark.parametrize("source", [
+        "tailwind.config = { plugins: [forms] }",
+        "tailwind.config = { theme: { screens: { tablet: '640px' } } }",
+        "tailwind.config = makeConfig()",
+    ])
+    def test_unsupported_configs(self, source):
+        assert parse_config(source) is None
+
+    def test_page_classes(self):
+        html = (
+            '<div class="flex  md:grid" id="a"><p class=\'text-[#fff]\'>x</p></div>'
+            "<script>btn.onclick = () => { menu.classList.toggle('hidden'); el.classList.add(\"opacity-0\", 'z-50'); "
+            "el.className = 'block p-2'; }</script>"
+        )
+        assert page_classes(html) == {"flex", "md:grid", "text-[#fff]", "hidden", "opacity-0", "z-50", "block", "p-2"}
+
+
+# ---------------------------------------------------------------------------
+# Pages
+# ---------------------------------------------------------------------------
+
+class TestCompilePage:
+    def test_cdn_replaced_in_place(self):
+        html = compile_page(HEAD + '<body class="font-heading bg-primary">x</body></html>')
+        assert CDN_URL not in html and "tailwind.config =" not in html and "console.warn" not in html
+        style = COMPILED_STYLE_RE.search(html)
+        assert html.index("<head>\n  <style data-tailwind") == 6
+        # The page's own <style> still comes after (overrides preflight)
+        assert style.end() < html.index("<style>.font-heading")
+        assert ".bg-primary{background-color:var(--color-primary)}" in style.group(1)
+        assert compile_page(html) == html
+
+    def test_pages_without_cdn_are_unchanged(self):
+        html = "<html><head><style>p{}</style></head><body class='p-4'></body></html>"
+        assert compile_page(html) == html
+
+    @pytest.mark.parametrize("name", ["text-[12qq]", "blur-[x]", "w-[100%]/50"])
+    def test_unsupported_classes_keep_the_cdn(self, compiler, name):
+        assert compiler.compile([name, "p-4"])[1] == [name]
+        html = HEAD + f'<body class="p-4 {name}"></body></html>'
+        assert compile_page(html) == html
+
+    def test_unsupported_config_keeps_the_cdn(self):
+        html = HEAD.replace("theme: {", "plugins: [], theme: {") + "<body></body></html>"
+        assert compile_page(html) == html
+
+
+class TestRefresh:
+    def test_new_classes_are_recompiled(self):
+        html = compile_page(HEAD + '<body><p class="p-4">x</p></body></html>')
+        edited = html.replace('class="p-4"', 'class="p-4 font-heading"')
+        refreshed = refresh_compiled_css(edited)
+        assert ".font-heading{font-family:var(--font-heading), sans-serif}" in COMPILED_STYLE_RE.search(refreshed).group(1)
+        assert refresh_compiled_css(refreshed) == refreshed
+        assert refresh_compiled_css(html) == html
+
+    def test_unsupported_edit_goes_back_to_the_cdn(self):
+        html = compile_page(HEAD + '<body><p class="p-4">x</p></body></html>')
+        refreshed = refresh_compiled_css(html.replace('class="p-4"', 'class="p-4 blur-[x]"'))
+        assert COMPILED_STYLE_RE.search(refreshed) is None
+        assert f'<script src="{CDN_URL}"></script>' in refreshed
+        assert '"primary": "var(--color-primary)"' in refreshed
+
+
+# ---------------------------------------------------------------------------
+# Assembler, sanitizer, QC
+# ---------------------------------------------------------------------------
+
+def test_assembled_page_is_compiled():
+    from app.services.qc_rules import qc_rule_engine
+    from app.services.template_assembler import SectionRenderCache, TemplateAssembler
+
+    assembler = TemplateAssembler(section_cache=SectionRenderCache(max_size=0))
+    html = assembler.assemble({
+        "theme": {"primary_color": "#c8102e"},
+        "meta": {"title": "Trattoria"},
+        "global": {"BUSINESS_NAME": "Trattoria"},
+        "components": [{"variant_id": "hero-split-01", "data": {}}, {"variant_id": "contact-form-01", "data": {}}],
+    })
+    style = COMPILED_STYLE_RE.search(html)
+    assert style and CDN_URL not in html
+    assert style.group(0) in sanitize_output(html, is_template_assembled=True)
+    issues = qc_rule_engine.run(html, {}, [])
+    assert not any(issue.element == "script[tailwind]" for issue in issues)
+
+
+def test_every_component_class_compiles(compiler):
+    head = (COMPONENTS_DIR / "head" / "head-template.html").read_text(encoding="utf-8")
+    script = head[head.index("tailwind.config"):head.index("</script>", head.index("tailwind.config"))]
+    classes = set()
+    for path in COMPONENTS_DIR.rglob("*.html"):
+        classes |= page_classes(path.read_text(encoding="utf-8"))
+    _, unsupported = compiler.compile(classes, parse_config(script))
+    assert unsupported == []
@@ -0,0 +1,425 @@
+"""Tests for the legacy TemplateAssembler (REPEAT engine and section cache).
+
+Covers:
+- Parity of the single-pass expander with the previous recursive
+  regex implementation on every component template
+- Nested repeats, INDEX injection, empty-item skipping
+- Case-insensitive REPEAT key lookup
+- Visible-text counter edge cases (unterminated tags, "<>")
+- Section render cache reuse and invalidation
+- Streaming assembly: chunk order, parity with assemble() once the joined
+  chunks are compiled (also with seeded animation rewriting), per-chunk
+  sanitization and section filtering
+- DataBindingGenerator streaming: same page as the whole-page sanitize and
+  empty-section passes, progress payload without HTML
+"""
+
+import random
+import re
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from app.services import template_assembler as template_assembler_module
+from app.services.databinding_generator import DataBindingGenerator
+from app.services.sanitizer import sanitize_output
+from app.services.tailwind_compiler import compile_page
+from app.services.template_assembler import (
+    SectionRenderCache,
+    TemplateAssembler,
+    _VisibleTextCounter,
+    _compile_template,
+)
+
+COMPONENTS_DIR = Path(__file__).parent.parent / "app" / "components"
+COMPONENT_FILES = sorted(COMPONENTS_DIR.rglob("*.html"))
+
+
+# ---------------------------------------------------------------------------
+# Reference: the previous recursive implementation, kept verbatim for parity
+# ---------------------------------------------------------------------------
+
+def _reference_replace_placeholders(template: str, data: Dict[str, Any]) -> str:
+    def replacer(match):
+        value = data.get(match.group(1), "")
+        if value is None:
+            value = ""
+        return str(value)
+    return re.sub(r'\{\{(\w+)\}\}', replacer, template)
+
+
+def _reference_expand_repeats(template: str, data: Dict[str, Any]) -> str:
+    pattern = r'<!-- REPEAT:(\w+) -->(.*?)<!-- /REPEAT:\1 -->'
+    key_lookup = {k.upper(): k for k in data.keys() if isinstance(data[k], list)}
+
+    def expand_block(match):
+        key = match.group(1)
+        inner_template = match.group(2)
+        items = data.get(key)
+        if items is None:
+            real_key = key_lookup.get(key.upper())
+            if real_key:
+                items = data[real_key]
+        if not isinstance(items, list) or not items:
+            return ""
+        fragments = []
+        real_idx = 0
+        for item in items:
+            if isinstance(item, dict):
+                item_with_index = {
+                    **item,
+                    "INDEX": str(real_idx + 1),
+                    "INDEX_PADDED": f"{real_idx + 1:02d}",
+                    "INDEX_ZERO": str(real_idx),
+                }
+                fragment = _reference_expand_repeats(inner_template, item_with_index)
+                fragment = _reference_replace_placeholders(fragment, item_with_index)
+                visible = re.sub(r'<[^>]+>', '', fragment)
+                visible = re.sub(r'\s+', ' ', visible).strip()
+                if len(visible) < 5:
+                    continue
+            else:
+                fragment = inner_template
+            fragments.append(fragment)
+            real_idx += 1
+        return "\n".join(fragments)
+
+    return re.sub(pattern, expand_block, template, flags=re.DOTALL)
+
+
+def _reference_render(template: str, data: Dict[str, Any]) -> str:
+    return _reference_replace_placeholders(_reference_expand_repeats(template, data), data)
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data covering the tricky paths
+# ---------------------------------------------------------------------------
+
+_VALUE_VARIANTS = [
+    "Trattoria da Mario",
+    "",
+    None,
+    "  ",
+    "<b></b>",
+    "a < b",
+    "x <y",
+    "<>",
+    "Prezzo {{BUSINESS_NAME}}",
+    42,
+]
+
+
+def _make_data(
+    placeholders: List[str], repeat_keys: List[str], rng: random.Random, depth: int = 0
+) -> Dict[str, Any]:
+    data: Dict[str, Any] = {}
+    for key in placeholders:
+        data[key] = rng.choice(_VALUE_VARIANTS) if depth else f"Valore {key.lower()}"
+    data["BUSINESS_NAME"] = "Bar Centrale"
+    if depth >= 3:
+        return data
+    for key in repeat_keys:
+        roll = rng.random()
+        if roll < 0.1:
+            continue  # missing key
+        if roll < 0.15:
+            data[key] = []
+            continue
+        items: List[Any] = []
+        for _ in range(rng.randint(1, 4)):
+            kind = rng.random()
+            if kind < 0.1:
+                items.append({})  # renders empty -> skipped
+            elif kind < 0.15:
+                items.append("raw")  # non-dict item
+            else:
+                items.append(_make_data(placeholders, repeat_keys, rng, depth + 1))
+        # Exercise the case-insensitive lookup path
+        data[key.lower() if roll > 0.9 else key] = items
+    return data
+
+
+def _template_keys(template: str):
+    placeholders = sorted(set(re.findall(r'\{\{(\w+)\}\}', template)))
+    repeat_keys = sorted(set(re.findall(r'<!-- REPEAT:(\w+) -->', template)))
+    return placeholders, repeat_keys
+
+
+@pytest.fixture(scope="module")
+def assembler() -> TemplateAssembler:
+    return TemplateAssembler()
+
+
+# ---------------------------------------------------------------------------
+# Parity
+# ---------------------------------------------------------------------------
+
+def test_component_corpus_present() -> None:
+    assert len(COMPONENT_FILES) >= 600
+
+
+@pytest.mark.parametrize(
+    "path", COMPONENT_FILES, ids=lambda p: str(p.relative_to(COMPONENTS_DIR))
+)
+def test_expand_repeats_parity(path: Path, assembler: TemplateAssembler) -> None:
+    template = path.read_text(encoding="utf-8")
+    placeholders, repeat_keys = _template_keys(template)
+    rng = random.Random(str(path.name))
+    for _ in range(4):
+        data = _make_data(placeholders, repeat_keys, rng)
+        expected = _reference_expand_repeats(template, data)
+        assert assembler._expand_repeats(template, data) == expected
+        assert assembler._replace_placeholders(expected, data) == _reference_render(template, data)
+
+
+# ---------------------------------------------------------------------------
+# Behaviour
+# ---------------------------------------------------------------------------
+
+class TestExpandRepeats:
+    def test_nested_repeats_and_index(self, assembler: TemplateAssembler) -> None:
+        template = (
+            "<ul><!-- REPEAT:CATS --><li>{{INDEX_PADDED}} {{NAME}}"
+            "<!-- REPEAT:DISHES --><span>{{INDEX}}.{{DISH}}</span><!-- /REPEAT:DISHES -->"
+            "</li><!-- /REPEAT:CATS --></ul>"
+        )
+        data = {"CATS": [
+            {"NAME": "Primi", "DISHES": [{"DISH": "Carbonara"}, {"DISH": "Amatriciana"}]},
+            {"NAME": "Secondi", "DISHES": [{"DISH": "Saltimbocca"}]},
+        ]}
+        html = assembler._expand_repeats(template, data)
+        assert html == _reference_expand_repeats(template, data)
+        assert "<li>01 Primi<span>1.Carbonara</span>\n<span>2.Amatriciana</span></li>" in html
+        assert "<li>02 Secondi" in html
+
+    def test_empty_items_skipped_without_consuming_index(self, assembler: TemplateAssembler) -> None:
+        template = "<!-- REPEAT:ITEMS --><p>{{INDEX}} {{TITLE}}</p><!-- /REPEAT:ITEMS -->"
+        data = {"ITEMS": [{"TITLE": ""}, {"TITLE": "Pizza al taglio"}]}
+        assert assembler._expand_repeats(template, data) == "<p>1 Pizza al taglio</p>"
+
+    def test_case_insensitive_key(self, assembler: TemplateAssembler) -> None:
+        template = "<!-- REPEAT:SERVICES --><p>{{TITLE}}</p><!-- /REPEAT:SERVICES -->"
+        data = {"services": [{"TITLE": "Consulenza"}]}
+        assert assembler._expand_repeats(template, data) == "<p>Consulenza</p>"
+
+    def test_top_level_placeholders_left_for_caller(self, assembler: TemplateAssembler) -> None:
+        template = "<h2>{{TITLE}}</h2><!-- REPEAT:X --><p>{{TITLE}}</p><!-- /REPEAT:X -->"
+        data = {"TITLE": "Top", "X": [{"TITLE": "Item title"}]}
+        assert assembler._expand_repeats(template, data) == "<h2>{{TITLE}}</h2><p>Item title</p>"
+
+    def test_unclosed_marker_is_text(self, assembler: TemplateAssembler) -> None:
+        template = "<!-- REPEAT:A --><!-- REPEAT:B -->{{V}} ok!<!-- /REPEAT:B -->"
+        data = {"B": [{"V": "hello"}]}
+        assert assembler._expand_repeats(template, data) == _reference_expand_repeats(template, data)
+
+    def test_compiled_template_is_cached(self) -> None:
+        template = "<!-- REPEAT:A -->{{X}}<!-- /REPEAT:A -->"
+        assert _compile_template(template) is _compile_template(template)
+
+
+class TestVisibleTextCounter:
+    @pytest.mark.parametrize("html", [
+        "<p>  Hello   world </p>",
+        "<div></div>",
+        "a <b c",
+        "<>abc",
+        "x<<a>y",
+        "  \n ",
+        "<p>ab</p><p>cd</p>",
+        "ab <i>c</i> d",
+    ])
+    def test_matches_regex_definition(self, html: str) -> None:
+        expected = len(re.sub(r'\s+', ' ', re.sub(r'<[^>]+>', '', html)).strip())
+        counter = _VisibleTextCounter(limit=10_000)
+        # Feed one character at a time to exercise chunk boundaries
+        for ch in html:
+            counter.feed(ch)
+        assert counter.finish() == expected
+
+
+# ---------------------------------------------------------------------------
+# Section render cache
+# ---------------------------------------------------------------------------
+
+def _site_data(hero_title: str) -> Dict[str, Any]:
+    return {
+        "theme": {"primary_color": "#c8102e", "bg_color": "#ffffff"},
+        "meta": {"title": "Bar Sport"},
+        "global": {"BUSINESS_NAME": "Bar Sport"},
+        "components": [
+            {"variant_id": "hero-split-01", "data": {"HERO_TITLE": hero_title}},
+            {"variant_id": "about-magazine-01", "data": {"ABOUT_TITLE": "La nostra storia"}},
+            {"variant_id": "footer-minimal-02", "data": {}},
+        ],
+    }
+
+
+class TestSectionRenderCache:
+    def test_lru_eviction_and_stats(self) -> None:
+        cache = SectionRenderCache(max_size=2)
+        cache.put(("a",), "A")
+        cache.put(("b",), "B")
+        assert cache.get(("a",)) == "A"
+        cache.put(("c",), "C")  # evicts "b", the least recently used
+        assert cache.get(("b",)) is None
+        stats = cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+        assert stats["size"] == 2
+
+    def test_reassembly_reuses_unchanged_sections(self) -> None:
+        assembler = TemplateAssembler(section_cache=SectionRenderCache())
+        original_read = assembler._read_template
+        reads: List[str] = []
+
+        def counting_read(file_path: str) -> str:
+            reads.append(file_path)
+            return original_read(file_path)
+
+        assembler._read_template = counting_read
+
+        assembler.assemble(_site_data("Aperitivo in centro"))
+        assert assembler._last_cache_stats["hits"] == 0
+        body_reads = [r for r in reads if not r.startswith("head/")]
+        assert len(body_reads) == 3
+
+        reads.clear()
+        html = assembler.assemble(_site_data("Colazione e pranzo"))
+        assert assembler._last_cache_stats == {"hits": 2, "misses": 1, "hit_rate": 0.6667}
+        assert [r for r in reads if not r.startswith("head/")] == ["hero/hero-split-01.html"]
+        assert "Colazione e pranzo" in html
+        assert "Aperitivo in centro" not in html
+
+    def test_theme_change_invalidates(self) -> None:
+        assembler = TemplateAssembler(section_cache=SectionRenderCache())
+        site_data = _site_data("Aperitivo in centro")
+        assembler.assemble(site_data)
+        site_data["theme"]["primary_color"] = "#111111"
+        assembler.assemble(site_data)
+        assert assembler._last_cache_stats["hits"] == 0
+
+
+# ---------------------------------------------------------------------------
+# Streaming assembly
+# ---------------------------------------------------------------------------
+
+async def _collect(assembler: TemplateAssembler, site_data: Dict[str, Any], **kwargs) -> List[str]:
+    return [chunk async for chunk in assembler.assemble_stream(site_data, **kwargs)]
+
+
+@pytest.fixture
+def no_diversify(monkeypatch):
+    """Leave the animation attributes alone (no AnimationRewriter)."""
+    monkeypatch.setattr(TemplateAssembler, "_animation_rewriter", lambda self, site_data: None)
+
+
+class TestAssembleStream:
+    @pytest.mark.asyncio
+    async def test_chunks_in_document_order(self, assembler: TemplateAssembler, no_diversify) -> None:
+        chunks = await _collect(assembler, _site_data("Aperitivo in centro"), sanitize=False)
+        # head, nav, hero, footer, tail (the about section renders empty and is skipped)
+        assert len(chunks) == 5
+        assert chunks[0].lstrip().startswith("<!DOCTYPE") and chunks[0].rstrip().endswith(">")
+        assert "<body" in chunks[0] and "<nav" not in chunks[0]
+        assert "<nav" in chunks[1]
+        assert "Aperitivo in centro" in chunks[2]
+        assert "<footer" in chunks[3]
+        assert chunks[4].rstrip().endswith("</html>")
+
+    @pytest.mark.asyncio
+    async def test_joined_stream_matches_assemble(self, assembler: TemplateAssembler, no_diversify) -> None:
+        site_data = _site_data("Aperitivo in centro")
+        chunks = await _collect(assembler, site_data, sanitize=False)
+        assert compile_page("".join(chunks)) == assembler.assemble(_site_data("Aperitivo in centro"))
+
+    @pytest.mark.asyncio
+    async def test_seeded_stream_matches_assemble(self, assembler: TemplateAssembler) -> None:
+        def seeded():
+            site_data = _site_data("Aperitivo in centro")
+            site_data.update({
+                "_animation_seed": 37, "_randomize_animations": True,
+                "_animation_map": {"hero": {"heading": "blur-in", "cta": "magnetic"}},
+            })
+            return site_data
+
+        chunks = await _collect(assembler, seeded(), sanitize=False)
+        streamed_effects = assembler._last_effects_used
+        assert compile_page("".join(chunks)) == assembler.assemble(seeded())
+        assert streamed_effects == assembler._last_effects_used != {}
+
+    @pytest.mark.asyncio
+    async def test_each_chunk_is_sanitized(self, assembler: TemplateAssembler, no_diversify) -> None:
+        site_data = _site_data("Aperitivo in centro")
+        site_data["components"].insert(1, {
+            "variant_id": "__inline_video__",
+            "data": {"__RAW_HTML__": (
+                '<section id="video"><p>Guarda il video del locale</p>'
+                '<script src="https://evil.example/x.js"></script></section>'
+            )},
+        })
+        chunks = await _collect(assembler, site_data)
+        video = next(c for c in chunks if 'id="video"' in c)
+        assert "evil.example" not in video
+        assert not any(c.lstrip().startswith("<!DOCTYPE") for c in chunks[1:])
+
+    @pytest.mark.asyncio
+    async def test_post_process_drops_sections(self, assembler: TemplateAssembler, no_diversify) -> None:
+        def drop_hero(chunk: str) -> str:
+            return "" if "Aperitivo in centro" in chunk else chunk
+
+        chunks = await _collect(assembler, _site_data("Aperitivo in centro"), post_process=drop_hero)
+        assert len(chunks) == 4
+        assert not any("Aperitivo in centro" in c for c in chunks)
+
+
+def _seeded_site_data() -> Dict[str, Any]:
+    site_data = _site_data("Aperitivo in centro")
+    # A title over an empty grid: removed by _post_process_html
+    site_data["components"].insert(1, {
+        "variant_id": "__inline_video__",
+        "data": {"__RAW_HTML__": (
+            '<section id="menu"><div class="max-w-6xl"><h2>Il nostro menu</h2>'
+            '<p>I piatti della casa</p><div class="grid grid-cols-3 gap-6"></div></div></section>'
+        )},
+    })
+    site_data.update({
+        "_animation_seed": 37, "_randomize_animations": True,
+        "_animation_map": {"hero": {"heading": "blur-in", "cta": "magnetic"}},
+    })
+    return site_data
+
+
+class TestGeneratorStreaming:
+    @pytest.fixture
+    def generator(self, assembler: TemplateAssembler) -> DataBindingGenerator:
+        generator = DataBindingGenerator.__new__(DataBindingGenerator)
+        generator.assembler = assembler
+        return generator
+
+    @pytest.mark.asyncio
+    async def test_matches_whole_page_passes(self, generator: DataBindingGenerator, monkeypatch) -> None:
+        streamed = compile_page(await generator._assemble_streaming(_seeded_site_data()))
+
+        # Whole page: assemble uncompiled, then sanitize, filter, compile
+        monkeypatch.setattr(template_assembler_module, "compile_page", lambda html: html)
+        raw = generator.assembler.assemble(_seeded_site_data())
+        whole = compile_page(generator._post_process_html(
+            sanitize_output(raw, is_template_assembled=True)
+        ))
+
+        # A removed chunk takes its blank-line separator with it
+        def blank_lines(html: str) -> str:
+            return re.sub(r"\n{3,}", "\n\n", html)
+
+        assert blank_lines(streamed) == blank_lines(whole)
+        assert 'id="menu"' in raw and 'id="menu"' not in streamed
+        assert "Aperitivo in centro" in streamed
+
+    @pytest.mark.asyncio
+    async def test_progress_carries_no_html(self, generator: DataBindingGenerator) -> None:
+        calls = []
+        await generator._assemble_streaming(
+            _seeded_site_data(), on_progress=lambda *args: calls.append(args),
+        )
+        assert calls == [(6, "Assemblaggio sezioni...", {"phase": "assembling", "first_screen_ready": True})]
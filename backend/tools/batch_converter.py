@@ -40,6 +40,17 @@ PROJECT_ROOT = SCRIPT_DIR.parent
 COMPONENTS_DIR = PROJECT_ROOT / "app" / "components"
 REGISTRY_PATH = COMPONENTS_DIR / "components.json"
 
+def rebuild_component_index(components_dir: Path) -> None:
+    """Refresh components.idx after components.json was rewritten."""
+    try:
+        if str(PROJECT_ROOT) not in sys.path:
+            sys.path.insert(0, str(PROJECT_ROOT))
+        from app.services.component_index import build_index
+        build_index(components_dir)
+    except Exception as e:  # the JSON is the source of truth; the index is an optimization
+        log.warning(f"Could not rebuild components.idx: {e}")
+
+
 # ── Logging ──────────────────────────────────────────────────────────────────
 
 logging.basicConfig(
@@ -1465,6 +1476,7 @@ class BatchConverter:
         with open(self.registry_path, "w", encoding="utf-8") as f:
             json.dump(self.registry, f, indent=2, ensure_ascii=False)
         log.info("Updated components.json registry")
+        rebuild_component_index(self.components_dir)
 
     # ── Save Section ─────────────────────────────────────────────────────
 
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Jinja2 v2 assembler vs legacy TemplateAssembler
+==========================================================
+Renders the same site (legacy site_data, converted for Jinja2 the way the
+generation pipeline does) with both assemblers and reports:
+
+- cold start: first full page in a fresh JinjaAssembler, per template
+  loading mode (source without cache, bytecode cache, precompiled)
+- throughput: full pages per second, section render caches disabled
+  (legacy assemble() includes its whole-page post-processing passes)
+
+Usage:
+  python tools/bench_assemblers.py
+  python tools/bench_assemblers.py --iterations 200
+
+Run tools/build_jinja_templates.py first to include the precompiled mode.
+"""
+
+import argparse
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.databinding_generator import DataBindingGenerator  # noqa: E402
+from app.services.jinja_assembler import JinjaAssembler  # noqa: E402
+from app.services.template_assembler import SectionRenderCache, TemplateAssembler  # noqa: E402
+
+# Variants available in both components/ and components_v2/
+VARIANTS = [
+    "hero-split-01",
+    "about-magazine-01",
+    "services-cards-grid-01",
+    "gallery-masonry-01",
+    "testimonials-grid-01",
+    "contact-form-01",
+    "footer-minimal-02",
+]
+
+
+def _component_data(assembler: TemplateAssembler, variant_id: str) -> Dict[str, Any]:
+    template = assembler._read_template(assembler._find_variant_file(variant_id))
+    data: Dict[str, Any] = {
+        key: f"Testo di prova per {key.lower()}"
+        for key in set(re.findall(r"\{\{(\w+)\}\}", template))
+    }
+    item = dict(data)
+    for key in set(re.findall(r"<!-- REPEAT:(\w+) -->", template)):
+        data[key] = [dict(item) for _ in range(4)]
+    return data
+
+
+def build_site_data(assembler: TemplateAssembler) -> Dict[str, Any]:
+    return {
+        "theme": {
+            "primary_color": "#c8102e",
+            "secondary_color": "#1e40af",
+            "bg_color": "#ffffff",
+            "text_color": "#0f172a",
+            "font_heading": "Playfair Display",
+            "font_body": "Inter",
+        },
+        "meta": {"title": "Trattoria da Mario", "description": "Cucina romana dal 1962"},
+        "global": {"BUSINESS_NAME": "Trattoria da Mario", "CURRENT_YEAR": "2026"},
+        "components": [
+            {"variant_id": vid, "data": _component_data(assembler, vid)} for vid in VARIANTS
+        ],
+    }
+
+
+def _timed(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _throughput(fn: Callable[[], Any], iterations: int) -> float:
+    fn()  # warm
+    return iterations / sum(_timed(fn) for _ in range(iterations))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Jinja2 vs legacy assembler")
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    legacy = TemplateAssembler(section_cache=SectionRenderCache(max_size=0))
+    site_data = build_site_data(legacy)
+    jinja_data = DataBindingGenerator._convert_to_jinja_format(site_data)
+
+    print("Cold start (first page, fresh environment):")
+    modes: List[tuple] = [
+        ("source, no cache", dict(precompiled=False, bytecode_cache=False)),
+        ("bytecode cache", dict(precompiled=False)),
+        ("precompiled", dict()),
+    ]
+    JinjaAssembler(precompiled=False).warm_up()  # populate the bytecode cache
+    for label, kwargs in modes:
+        jinja = JinjaAssembler(section_cache=SectionRenderCache(max_size=0), **kwargs)
+        if label == "precompiled" and jinja.template_source != "precompiled":
+            print(f"  {label:<18} skipped (run tools/build_jinja_templates.py)")
+            continue
+        elapsed = _timed(lambda: jinja.assemble(jinja_data))
+        print(f"  {label:<18} {elapsed * 1000:8.1f} ms")
+
+    print(f"Throughput ({args.iterations} pages, render caches off):")
+    jinja = JinjaAssembler(section_cache=SectionRenderCache(max_size=0))
+    results = {
+        "jinja2 v2": _throughput(lambda: jinja.assemble(jinja_data), args.iterations),
+        "legacy": _throughput(lambda: legacy.assemble(site_data), args.iterations),
+    }
+    for label, pages_per_s in results.items():
+        print(f"  {label:<18} {pages_per_s:8.1f} pages/s")
+    print(f"  jinja2 v2 / legacy {results['jinja2 v2'] / results['legacy']:8.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
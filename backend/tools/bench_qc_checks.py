@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: QC rule engine vs legacy per-check regex scans
+=========================================================
+Runs the Phase 1 automated checks of QualityControlPipeline on the same
+page with the legacy path (one regex scan of the page per check) and with
+the single-pass rule engine, verifies that both produce the same issues and
+reports the per-page check time. The incremental run re-checks the page
+after editing one section, so only that section's rule states are rebuilt.
+
+Usage:
+  python tools/bench_qc_checks.py
+  python tools/bench_qc_checks.py --iterations 200
+  python tools/bench_qc_checks.py --html path/to/page.html
+
+Without --html the page is assembled with TemplateAssembler from the same
+site data used by tools/bench_assemblers.py.
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from bench_assemblers import build_site_data  # noqa: E402
+from app.services.qc_rules import qc_rule_engine  # noqa: E402
+from app.services.quality_control import QualityControlPipeline  # noqa: E402
+from app.services.template_assembler import SectionRenderCache, TemplateAssembler  # noqa: E402
+
+REQUESTED_SECTIONS = ["hero", "about", "services", "gallery", "testimonials", "contact", "footer"]
+
+
+def _per_page_ms(fn: Callable[[], Any], iterations: int) -> float:
+    fn()  # warm
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark QC rule engine vs legacy checks")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--html", type=Path, help="HTML page to check (default: assembled test site)")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    assembler = TemplateAssembler(section_cache=SectionRenderCache(max_size=0))
+    site_data = build_site_data(assembler)
+    theme = site_data["theme"]
+    if args.html:
+        html = args.html.read_text(encoding="utf-8")
+    else:
+        html = assembler.assemble(site_data)
+
+    pipeline = QualityControlPipeline()
+    legacy_issues = pipeline._run_legacy_checks(html, theme, REQUESTED_SECTIONS)
+    engine_issues = pipeline.run_automated_checks(html, theme, REQUESTED_SECTIONS)
+    print(f"Page: {len(html) / 1024:.1f} KB, {len(engine_issues)} issues")
+    if engine_issues != legacy_issues:
+        print(f"  MISMATCH: legacy reported {len(legacy_issues)} issues")
+        return 1
+
+    print(f"Per-page check time ({args.iterations} runs):")
+    legacy_ms = _per_page_ms(
+        lambda: pipeline._run_legacy_checks(html, theme, REQUESTED_SECTIONS), args.iterations
+    )
+    engine_ms = _per_page_ms(
+        lambda: qc_rule_engine.run(html, theme, REQUESTED_SECTIONS), args.iterations
+    )
+    hero = html.find('id="hero"')
+    edits = iter(range(1 << 30))
+
+    def check_edited_page() -> None:
+        page = f'{html[:hero]}data-edit="{next(edits)}" {html[hero:]}'
+        qc_rule_engine.run_incremental(page, theme, REQUESTED_SECTIONS)
+
+    incremental_ms = _per_page_ms(check_edited_page, args.iterations)
+    print(f"  {'legacy scans':<18} {legacy_ms:8.2f} ms")
+    print(f"  {'rule engine':<18} {engine_ms:8.2f} ms")
+    print(f"  {'incremental':<18} {incremental_ms:8.2f} ms  (one section edited)")
+    print(f"  speedup            {legacy_ms / engine_ms:8.2f}x / {legacy_ms / incremental_ms:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming HTML sanitizer vs legacy regex pipeline
+============================================================
+Sanitizes the assembled test page with the legacy regex passes and with
+StreamingSanitizer (one shot and in 4 KB chunks), then times both on
+adversarial inputs at growing sizes. The legacy lazy regexes restart from
+every unterminated "<script"/"<iframe", so their time grows quadratically;
+the tokenizer's time grows linearly.
+
+Usage:
+  python tools/bench_sanitizer.py
+  python tools/bench_sanitizer.py --iterations 50 --sizes 1000 2000 4000
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from bench_assemblers import build_site_data  # noqa: E402
+from app.services.sanitizer import StreamingSanitizer, _legacy_sanitize_fragment  # noqa: E402
+from app.services.template_assembler import SectionRenderCache, TemplateAssembler  # noqa: E402
+
+ADVERSARIAL = {
+    "unterminated <script": lambda n: "<script " * n + "x" * 1000,
+    "unterminated <iframe": lambda n: "<iframe " * n + "x" * 1000,
+    "nested comments": lambda n: "<!--" * n + "<script>x</script>",
+    "huge attribute": lambda n: '<div data-x="' + "a" * (100 * n) + '" onclick=x>',
+}
+
+
+def _per_page_ms(fn: Callable[[], Any], iterations: int) -> float:
+    fn()  # warm
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def _streamed(html: str, template: bool, chunk: int = 4096) -> str:
+    sanitizer = StreamingSanitizer(is_template_assembled=template)
+    out = [sanitizer.feed(html[i:i + chunk]) for i in range(0, len(html), chunk)]
+    out.append(sanitizer.close())
+    return "".join(out)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark streaming sanitizer vs legacy regexes")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 2000, 4000])
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    assembler = TemplateAssembler(section_cache=SectionRenderCache(max_size=0))
+    html = assembler.assemble(build_site_data(assembler))
+    print(f"Page: {len(html) / 1024:.1f} KB ({args.iterations} runs)")
+    for template in (True, False):
+        one_shot = StreamingSanitizer(is_template_assembled=template, max_pending=None).close(html)
+        if _streamed(html, template) != one_shot:
+            print("  MISMATCH: chunked output differs from one-shot output")
+            return 1
+        label = "template" if template else "ai html"
+        legacy_ms = _per_page_ms(lambda: _legacy_sanitize_fragment(html, template), args.iterations)
+        new_ms = _per_page_ms(
+            lambda: StreamingSanitizer(is_template_assembled=template, max_pending=None).close(html),
+            args.iterations,
+        )
+        stream_ms = _per_page_ms(lambda: _streamed(html, template), args.iterations)
+        print(f"  {label:<10} legacy {legacy_ms:8.2f} ms   tokenizer {new_ms:8.2f} ms"
+              f"   streamed {stream_ms:8.2f} ms")
+
+    print("Adversarial inputs (ms per size: " + ", ".join(str(n) for n in args.sizes) + "):")
+    for name, make in ADVERSARIAL.items():
+        legacy = [_per_page_ms(lambda: _legacy_sanitize_fragment(make(n)), 1) for n in args.sizes]
+        new = [
+            _per_page_ms(lambda: StreamingSanitizer(max_pending=None).close(make(n)), 1)
+            for n in args.sizes
+        ]
+        print(f"  {name:<22} legacy " + " ".join(f"{t:8.1f}" for t in legacy))
+        print(f"  {'':<22} new    " + " ".join(f"{t:8.1f}" for t in new))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark: site version storage, full copies vs snapshots + deltas
+==================================================================
+Saves a run of versions of the same page through
+app.services.site_versions.save_version (first generation, then refines
+each editing one section's text, like the refine endpoint), checks that
+every version rebuilds exactly, and reports the bytes stored against a
+full copy per version plus the version_html latency (what rollback pays).
+
+Usage:
+  python tools/bench_site_versions.py
+  python tools/bench_site_versions.py --versions 10 --iterations 50
+  python tools/bench_site_versions.py --html path/to/page.html
+
+Uses an in-memory SQLite database. Without --html the page is assembled
+with TemplateAssembler from the same site data used by
+tools/bench_assemblers.py.
+"""
+
+import argparse
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from bench_assemblers import build_site_data  # noqa: E402
+from app.core.database import Base  # noqa: E402
+from app.models.site import Site  # noqa: E402
+from app.models.site_version import SiteVersion  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.site_versions import MAX_VERSIONS, SNAPSHOT_INTERVAL, save_version, version_html  # noqa: E402
+from app.services.template_assembler import SectionRenderCache, TemplateAssembler  # noqa: E402
+
+_TEXT_RE = re.compile(r">([^<>]{20,})<")
+
+
+def _per_call_ms(fn: Callable[[], Any], iterations: int) -> float:
+    fn()  # warm
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def _refine(html: str, n: int) -> str:
+    """The page with one text node rewritten, a different one each refine."""
+    matches = list(_TEXT_RE.finditer(html))
+    m = matches[(n * 7) % len(matches)]
+    return html[:m.start(1)] + f"Testo rivisto al refine {n}: " + m.group(1)[::-1] + html[m.end(1):]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark site version delta storage")
+    parser.add_argument("--versions", type=int, default=MAX_VERSIONS, help="Versions saved (default: MAX_VERSIONS)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--html", type=Path, help="HTML page to version (default: assembled test site)")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    if args.html:
+        html = args.html.read_text(encoding="utf-8")
+    else:
+        assembler = TemplateAssembler(section_cache=SectionRenderCache(max_size=0))
+        html = assembler.assemble(build_site_data(assembler))
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__, Site.__table__, SiteVersion.__table__])
+    db = sessionmaker(bind=engine)()
+    user = User(email="bench@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    site = Site(name="Bench", slug="bench", owner_id=user.id)
+    db.add(site)
+    db.flush()
+
+    pages = [html]
+    for n in range(1, args.versions):
+        pages.append(_refine(pages[-1], n))
+    start = time.perf_counter()
+    for n, page in enumerate(pages):
+        save_version(db, site, page, "Generazione" if n == 0 else f"Refine {n}")
+    save_ms = (time.perf_counter() - start) * 1000 / len(pages)
+    db.commit()
+
+    versions = db.query(SiteVersion).order_by(SiteVersion.version_number.asc()).all()
+    kept = pages[-len(versions):]
+    for version, page in zip(versions, kept):
+        if version_html(db, version) != page:
+            print(f"FAIL: version {version.version_number} does not rebuild", file=sys.stderr)
+            return 1
+
+    full_bytes = sum(len(p.encode("utf-8")) for p in kept)
+    stored = sum(
+        len(v.html_content.encode("utf-8")) if v.is_snapshot else len(v.delta) for v in versions
+    )
+    deltas = [len(v.delta) for v in versions if not v.is_snapshot]
+    latencies = {
+        v.version_number: _per_call_ms(lambda v=v: version_html(db, v), args.iterations) for v in versions
+    }
+    worst = max(latencies, key=latencies.get)
+
+    print(f"Page: {len(html.encode('utf-8')) / 1024:.1f} KB, {len(versions)} versions kept "
+          f"(snapshot every {SNAPSHOT_INTERVAL}), all rebuild exactly")
+    print(f"  full copies      : {full_bytes / 1024:9.1f} KB")
+    print(f"  snapshots+deltas : {stored / 1024:9.1f} KB  ({100 * (1 - stored / full_bytes):.1f}% saved, "
+          f"{len(versions) - len(deltas)} snapshots, delta avg {sum(deltas) / max(len(deltas), 1):.0f} B)")
+    print(f"  save_version     : {save_ms:9.2f} ms/version")
+    print(f"  version_html     : {sum(latencies.values()) / len(latencies):9.2f} ms avg, "
+          f"{latencies[worst]:.2f} ms worst (v{worst})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
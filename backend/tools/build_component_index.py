@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Build the binary component registry index
+=========================================
+Compiles app/components/components.json into app/components/components.idx,
+the memory-mapped index read by app.services.component_index.
+
+Usage:
+  python tools/build_component_index.py
+  python tools/build_component_index.py --components-dir path/to/components
+
+Run at build/deploy time and after editing components.json (the batch and
+stitch converters do it automatically after registering a new variant).
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.component_index import ComponentIndex, build_index  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build components.idx from components.json")
+    parser.add_argument(
+        "--components-dir",
+        type=Path,
+        default=PROJECT_ROOT / "app" / "components",
+        help="Directory containing components.json",
+    )
+    args = parser.parse_args()
+
+    index_path = build_index(args.components_dir)
+    index = ComponentIndex(args.components_dir)
+    total = sum(len(ids) for ids in index.all_variant_ids().values())
+    print(
+        f"Built {index_path} ({index_path.stat().st_size} bytes): "
+        f"{len(index.categories())} categories, {total} variants"
+    )
+    return 0 if index.source == "index" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
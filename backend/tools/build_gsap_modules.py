@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Split the GSAP engine into core and per-effect modules
+======================================================
+Splits app/components/gsap-universal.js into app/components/gsap_modules/
+(one file per block plus manifest.json), read by app.services.gsap_engine to
+emit only the core and the effects each generated page uses.
+
+Usage:
+  python tools/build_gsap_modules.py
+  python tools/build_gsap_modules.py --components-dir path/to/components
+
+Run at build/deploy time and after editing gsap-universal.js (a stale split
+is detected and the engine is then split at load).
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.gsap_engine import GsapEngine, build_modules  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Split gsap-universal.js into core and effect modules")
+    parser.add_argument(
+        "--components-dir",
+        type=Path,
+        default=PROJECT_ROOT / "app" / "components",
+        help="Directory containing gsap-universal.js",
+    )
+    args = parser.parse_args()
+
+    modules_dir = build_modules(args.components_dir)
+    engine = GsapEngine(args.components_dir)
+    core = engine.build(())
+    modules = [block for block in engine.blocks if block.effects]
+    print(
+        f"Built {modules_dir}: core {len(core)} bytes + {len(modules)} effect modules "
+        f"({len(engine.module_effects)} data-animate values), full engine {len(engine.full_source)} bytes"
+    )
+    return 0 if engine.source == "modules" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
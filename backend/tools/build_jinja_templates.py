@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Precompile the Jinja2 v2 component templates
+============================================
+Compiles every template in app/components_v2/ into Python modules under
+app/components_v2/_compiled/ (Environment.compile_templates), loaded by
+app.services.jinja_assembler instead of parsing the sources at runtime.
+
+Usage:
+  python tools/build_jinja_templates.py
+  python tools/build_jinja_templates.py --components-dir path/to/components_v2
+
+Run at build/deploy time and after editing a v2 template (a stale build is
+detected and ignored, the templates then load from source).
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.jinja_assembler import JinjaAssembler  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Precompile components_v2 Jinja2 templates")
+    parser.add_argument(
+        "--components-dir",
+        type=Path,
+        default=PROJECT_ROOT / "app" / "components_v2",
+        help="Directory containing the v2 templates",
+    )
+    args = parser.parse_args()
+
+    target = JinjaAssembler(str(args.components_dir), precompiled=False).compile_templates()
+    assembler = JinjaAssembler(str(args.components_dir))
+    loaded = assembler.warm_up()
+    print(f"Compiled {target}: {loaded} templates loaded ({assembler.template_source})")
+    return 0 if assembler.template_source == "precompiled" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
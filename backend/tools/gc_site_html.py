@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Delete site HTML blobs no site references any more
+==================================================
+The blob store (app.services.blob_store) is content-addressed: identical
+pages share a blob, so saving a new page or deleting a site leaves the old
+blob in place. This reads every sites.html_ref and deletes, from the
+configured store (HTML_BLOB_STORE), the blobs none of them points to and
+older than --min-age-hours (a page whose row isn't committed yet is
+younger). Run it periodically (e.g. a daily cron job); --dry-run only
+counts. Exits with an error when no blob store is configured.
+
+Usage:
+  python tools/gc_site_html.py --dry-run
+  python tools/gc_site_html.py --min-age-hours 48
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import app.models  # noqa: E402,F401  (registers the mappers Site relates to)
+from app.core.database import SessionLocal  # noqa: E402
+from app.models.site import Site  # noqa: E402
+from app.services.blob_store import BlobStoreError, get_blob_store, sweep_blobs  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Delete unreferenced site HTML blobs")
+    parser.add_argument("--min-age-hours", type=float, default=24, help="Keep blobs younger than this")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the blobs to delete")
+    args = parser.parse_args()
+
+    store = get_blob_store()
+    if store is None:
+        print("No blob store configured (set HTML_BLOB_BUCKET, or HTML_BLOB_STORE=local)", file=sys.stderr)
+        return 1
+
+    db = SessionLocal()
+    try:
+        referenced = {ref for (ref,) in db.query(Site.html_ref).filter(Site.html_ref.isnot(None)).distinct()}
+    finally:
+        db.close()
+
+    try:
+        stats = sweep_blobs(referenced, min_age=args.min_age_hours * 3600, dry_run=args.dry_run)
+    except BlobStoreError as e:
+        print(f"Sweep failed: {e}", file=sys.stderr)
+        return 1
+
+    action = "Would delete" if args.dry_run else "Deleted"
+    print(
+        f"{action} {stats['deleted']}/{stats['blobs']} blobs from the '{store.name}' blob store "
+        f"({stats['referenced']} referenced, {stats['recent']} recent)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
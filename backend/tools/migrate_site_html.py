@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Move site HTML from the sites row into the blob store
+=====================================================
+Sites saved before the blob store keep their page in the html_content
+column; Site.get_html() still reads it, but every load of those rows
+carries the page. This stores each page in the blob store
+(app.services.blob_store, HTML_BLOB_STORE) and leaves only html_ref in the
+row, committing every --batch-size sites. Sites already moved are skipped,
+so it can be run again after a failure. Exits with an error when no blob
+store is configured (HTML_BLOB_STORE inline, or no HTML_BLOB_BUCKET).
+
+Usage:
+  python tools/migrate_site_html.py
+  python tools/migrate_site_html.py --site-id 42 --batch-size 20
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import app.models  # noqa: E402,F401  (registers the mappers Site relates to)
+from app.core.database import SessionLocal  # noqa: E402
+from app.models.site import Site  # noqa: E402
+from app.services.blob_store import get_blob_store  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Move site HTML into the blob store")
+    parser.add_argument("--site-id", type=int, help="Migrate a single site")
+    parser.add_argument("--batch-size", type=int, default=50, help="Sites per commit")
+    args = parser.parse_args()
+
+    store = get_blob_store()
+    if store is None:
+        print("No blob store configured (set HTML_BLOB_BUCKET, or HTML_BLOB_STORE=local)", file=sys.stderr)
+        return 1
+
+    db = SessionLocal()
+    moved = inline = total_bytes = 0
+    try:
+        query = db.query(Site.id).filter(Site.html_ref.is_(None), Site.html_inline.isnot(None))
+        if args.site_id is not None:
+            query = query.filter(Site.id == args.site_id)
+        site_ids = [site_id for (site_id,) in query.order_by(Site.id).all()]
+        for start in range(0, len(site_ids), args.batch_size):
+            batch = db.query(Site).filter(Site.id.in_(site_ids[start:start + args.batch_size])).all()
+            for site in batch:
+                html = site.html_inline
+                site.set_html(html)
+                if site.html_ref:
+                    moved += 1
+                    total_bytes += len(html.encode("utf-8"))
+                else:
+                    inline += 1
+            db.commit()
+            db.expunge_all()
+    finally:
+        db.close()
+
+    print(f"Moved {moved}/{len(site_ids)} sites ({total_bytes / 1024:.1f} KB) to the '{store.name}' blob store")
+    if inline:
+        print(f"  ! {inline} sites kept inline (blob store errors, see the log)", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
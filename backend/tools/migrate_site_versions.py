@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Migrate site versions to snapshots + deltas
+===========================================
+Rewrites the rows of site_versions saved as full HTML copies into periodic
+snapshots plus compressed diffs (app.services.site_versions), one commit
+per site. Safe to run again: migrated sites are rewritten to the same
+layout.
+
+Usage:
+  python tools/migrate_site_versions.py
+  python tools/migrate_site_versions.py --site-id 42
+
+Run once after deploying the delta storage (the app startup adds the
+delta/base_version columns); new versions are saved as deltas either way.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.core.database import SessionLocal  # noqa: E402
+import app.models  # noqa: E402,F401  (registers the mappers SiteVersion relates to)
+from app.services.site_versions import migrate_site_versions  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Store site versions as snapshots + deltas")
+    parser.add_argument("--site-id", type=int, help="Migrate a single site")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        stats = migrate_site_versions(db, site_id=args.site_id)
+    finally:
+        db.close()
+    saved = stats["bytes_before"] - stats["bytes_after"]
+    print(
+        f"Migrated {stats['versions']} versions of {stats['sites']} sites "
+        f"({stats['deltas']} deltas): {stats['bytes_before'] / 1024:.1f} KB -> "
+        f"{stats['bytes_after'] / 1024:.1f} KB ({saved / 1024:.1f} KB saved)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Allow cross-origin reads of the shared assets on R2
+===================================================
+Published sites (<slug>.<SITE_BASE_DOMAIN>, custom domains) load the
+self-hosted WOFF2 fonts from R2_PUBLIC_URL/assets, another origin: the
+browser only uses a font if its response carries Access-Control-Allow-Origin,
+and publish_bundles keeps Google Fonts until it does. This adds a CORS
+rule to R2_BUCKET_NAME allowing GET/HEAD from any origin (the assets are
+public and immutable), keeping the bucket's other rules. Already
+configured buckets are left as they are.
+
+The VPS store (assets.<SITE_BASE_DOMAIN>) gets the header from the
+equipe-assets router in vps-receiver/docker-compose.yml.
+
+Usage:
+  python tools/setup_assets_cors.py
+  python tools/setup_assets_cors.py --check
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.core.config import settings  # noqa: E402
+from app.services.r2_storage import _get_s3_client  # noqa: E402
+
+ASSETS_RULE = {
+    "AllowedOrigins": ["*"],
+    "AllowedMethods": ["GET", "HEAD"],
+    "AllowedHeaders": ["*"],
+    "MaxAgeSeconds": 86400,
+}
+
+
+def _allows_assets(rule: dict) -> bool:
+    return "*" in rule.get("AllowedOrigins", []) and {"GET", "HEAD"} <= set(rule.get("AllowedMethods", []))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Set the CORS rule of the shared assets bucket")
+    parser.add_argument("--check", action="store_true", help="Only print the current rules")
+    args = parser.parse_args()
+
+    client = _get_s3_client()
+    if client is None:
+        print("R2 not configured (R2_ACCOUNT_ID, R2_ACCESS_KEY_ID)", file=sys.stderr)
+        return 1
+
+    bucket = settings.R2_BUCKET_NAME
+    try:
+        rules = client.get_bucket_cors(Bucket=bucket).get("CORSRules", [])
+    except client.exceptions.ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "NoSuchCORSConfiguration":
+            raise
+        rules = []
+
+    if args.check:
+        print(json.dumps(rules, indent=2))
+        return 0 if any(_allows_assets(rule) for rule in rules) else 1
+
+    if any(_allows_assets(rule) for rule in rules):
+        print(f"CORS of {bucket} already allows the shared assets")
+        return 0
+    client.put_bucket_cors(Bucket=bucket, CORSConfiguration={"CORSRules": rules + [ASSETS_RULE]})
+    print(f"CORS rule added to {bucket}: GET/HEAD from any origin")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -38,6 +38,17 @@ COMPONENTS_DIR = PROJECT_ROOT / "app" / "components"
 REGISTRY_PATH = COMPONENTS_DIR / "components.json"
 
 
+def rebuild_component_index(components_dir: Path) -> None:
+    """Refresh components.idx after components.json was rewritten."""
+    try:
+        if str(PROJECT_ROOT) not in sys.path:
+            sys.path.insert(0, str(PROJECT_ROOT))
+        from app.services.component_index import build_index
+        build_index(components_dir)
+    except Exception as e:  # the JSON is the source of truth; the index is an optimization
+        print(f"  Warning: could not rebuild components.idx: {e}")
+
+
 # ─── Color Mapping ────────────────────────────────────────────────────────────
 
 # Common color patterns to CSS variable mappings
@@ -929,6 +940,7 @@ class StitchConverter:
         # Save
         with open(self.registry_path, "w", encoding="utf-8") as f:
             json.dump(registry, f, indent=2, ensure_ascii=False)
+        rebuild_component_index(self.components_dir)
 
 
 # ─── CLI ──────────────────────────────────────────────────────────────────────
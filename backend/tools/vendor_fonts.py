@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Vendor the web fonts published sites self-host
+==============================================
+Downloads the families and weights listed in app/components/fonts/fonts.json
+as TTF files into app/components/fonts/ and writes manifest.json
+(family -> weight -> file), read by app.services.font_pipeline to subset
+them into WOFF2 at publish time.
+
+Usage:
+  python tools/vendor_fonts.py
+  python tools/vendor_fonts.py --fonts-dir path/to/fonts --force
+
+Run by every build script (render.yaml, backend/render.yaml,
+backend/build.sh, backend/.render-build.sh) and after editing fonts.json:
+the TTF files are not committed. Files already on disk are kept (--force
+downloads them again). A family that can't be downloaded is left out of
+the manifest (its pages keep Google Fonts) and the exit status is 1, so
+the build fails; --allow-missing accepts it (offline development).
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict
+
+import httpx
+
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.font_pipeline import (  # noqa: E402
+    FONTS_DIR,
+    MANIFEST_FILE,
+    font_filename,
+    google_fonts_url,
+    load_catalog,
+)
+
+# Without a modern browser User-Agent Google Fonts serves whole TTF files
+# (no unicode-range split), which is what the subsetter wants
+_LEGACY_USER_AGENT = "Mozilla/4.0 (compatible; MSIE 8.0; Windows NT 6.1)"
+_FACE_RE = re.compile(r"@font-face\s*{([^}]*)}")
+_WEIGHT_RE = re.compile(r"font-weight:\s*(\d+)")
+_STYLE_RE = re.compile(r"font-style:\s*(\w+)")
+_URL_RE = re.compile(r"url\((https://[^)]+)\)")
+
+
+def _family_files(client: httpx.Client, family: str, weights: list) -> Dict[int, str]:
+    """weight -> TTF URL of one family, from its Google Fonts stylesheet."""
+    url = google_fonts_url([f"{family}:wght@{';'.join(map(str, weights))}"])
+    resp = client.get(url, headers={"User-Agent": _LEGACY_USER_AGENT})
+    resp.raise_for_status()
+    files: Dict[int, str] = {}
+    for face in _FACE_RE.findall(resp.text):
+        weight, style, src = _WEIGHT_RE.search(face), _STYLE_RE.search(face), _URL_RE.search(face)
+        if weight and src and (not style or style.group(1) == "normal"):
+            files[int(weight.group(1))] = src.group(1)
+    return files
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Download the self-hosted web fonts")
+    parser.add_argument("--fonts-dir", type=Path, default=FONTS_DIR, help="Directory containing fonts.json")
+    parser.add_argument("--force", action="store_true", help="Download files already on disk again")
+    parser.add_argument("--allow-missing", action="store_true", help="Exit 0 even if some families failed")
+    args = parser.parse_args()
+
+    catalog = load_catalog(args.fonts_dir)
+    manifest: Dict[str, Dict[str, str]] = {}
+    failed = []
+    with httpx.Client(timeout=30.0, follow_redirects=True) as client:
+        for family, weights in catalog.items():
+            names = {w: font_filename(family, w) for w in weights}
+            todo = [w for w in weights if args.force or not (args.fonts_dir / names[w]).is_file()]
+            try:
+                urls = _family_files(client, family, todo) if todo else {}
+                for weight in todo:
+                    if weight not in urls:
+                        raise ValueError(f"weight {weight} not served")
+                    resp = client.get(urls[weight])
+                    resp.raise_for_status()
+                    (args.fonts_dir / names[weight]).write_bytes(resp.content)
+            except (httpx.HTTPError, ValueError) as e:
+                failed.append(family)
+                print(f"  ! {family}: {e}", file=sys.stderr)
+                continue
+            manifest[family] = {str(w): names[w] for w in weights}
+
+    (args.fonts_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"Vendored {len(manifest)}/{len(catalog)} font families into {args.fonts_dir}")
+    if failed:
+        print(f"  ! {len(failed)} families not vendored: {', '.join(failed)}", file=sys.stderr)
+        return 0 if args.allow_missing else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
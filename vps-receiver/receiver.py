@@ -3,10 +3,13 @@ E-quipe Deploy Receiver
 Riceve HTML dal backend FastAPI (Render) e lo salva su disco.
 Ascolta su 0.0.0.0:8090, autenticato con shared secret.
 """
+import base64
+import binascii
 import os
 import re
 import shutil
 from pathlib import Path
+from typing import Dict, List, Union
 from fastapi import FastAPI, HTTPException, Header
 from pydantic import BaseModel
 
@@ -21,12 +24,23 @@ BLOCKED_SLUGS = {
     "www", "api", "app", "admin", "mail", "ftp", "smtp",
     "pop", "imap", "ns1", "ns2", "cdn", "staging", "dev",
     "test", "n8n", "dashboard", "login", "register", "blog",
-    "shop", "store", "help", "support", "docs", "status"
+    "shop", "store", "help", "support", "docs", "status", "assets"
 }
 
 # Regex per validare slug
 SLUG_REGEX = re.compile(r"^[a-z0-9][a-z0-9-]{1,61}[a-z0-9]$")
 
+# Bundle condivisi (CSS/JS e font WOFF2 con hash del contenuto), serviti da
+# assets.e-quipe.app con cache immutable: un file con lo stesso nome non cambia mai.
+# I font sono letti cross-origin dai siti: Access-Control-Allow-Origin lo
+# aggiunge il router equipe-assets di Traefik (docker-compose.yml)
+ASSETS_DIR = SITES_DIR / "assets"
+ASSET_FILENAME_REGEX = re.compile(r"^[a-z0-9-]+\.[0-9a-f]{16}\.(css|js|woff2)$")
+ASSET_ENCODINGS = ("utf-8", "base64")
+
+# Varianti precompresse servite da nginx (gzip_static / brotli_static)
+COMPRESSED_EXTS = ("gz", "br")
+
 
 def validate_slug(slug: str) -> bool:
     """Valida che lo slug sia sicuro e non riservato."""
@@ -48,6 +62,66 @@ def verify_secret(x_deploy_secret: str = Header(None)):
 class DeployRequest(BaseModel):
     slug: str
     html: str
+    compressed: Dict[str, str] = {}  # "gz"/"br" -> base64 di index.html.gz/.br
+
+
+class Asset(BaseModel):
+    filename: str
+    content: str
+    encoding: str = "utf-8"  # "base64" per i file binari (font)
+    compressed: Dict[str, str] = {}
+
+
+class AssetsRequest(BaseModel):
+    assets: List[Asset]
+
+
+def decode_compressed(compressed: Dict[str, str]) -> Dict[str, bytes]:
+    """Varianti precompresse decodificate (400 se estensione o base64 non validi)."""
+    decoded = {}
+    for ext, data in compressed.items():
+        if ext not in COMPRESSED_EXTS:
+            raise HTTPException(status_code=400, detail=f"Invalid compressed variant: {ext}")
+        try:
+            decoded[ext] = base64.b64decode(data, validate=True)
+        except binascii.Error:
+            raise HTTPException(status_code=400, detail=f"Invalid base64 for .{ext}")
+    return decoded
+
+
+def decode_asset(asset: Asset) -> bytes:
+    """Contenuto del bundle in byte (400 se codifica o base64 non validi)."""
+    if asset.encoding not in ASSET_ENCODINGS:
+        raise HTTPException(status_code=400, detail=f"Invalid encoding: {asset.encoding}")
+    if asset.encoding == "utf-8":
+        return asset.content.encode("utf-8")
+    try:
+        return base64.b64decode(asset.content, validate=True)
+    except binascii.Error:
+        raise HTTPException(status_code=400, detail=f"Invalid base64 for {asset.filename}")
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Scrive su un file temporaneo e lo rinomina: nginx non serve mai un file a meta'."""
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def write_with_variants(path: Path, content: Union[str, bytes], compressed: Dict[str, bytes]) -> None:
+    """Scrive il file e le sue varianti .gz/.br, rimuovendo quelle non piu' inviate.
+
+    Le varianti vengono scritte prima del file: una richiesta nel mezzo riceve
+    la versione vecchia o la nuova, mai una variante di un contenuto diverso
+    da quello non compresso appena pubblicato.
+    """
+    for ext in COMPRESSED_EXTS:
+        variant = path.with_name(f"{path.name}.{ext}")
+        if ext in compressed:
+            write_atomic(variant, compressed[ext])
+        elif variant.exists():
+            variant.unlink()
+    write_atomic(path, content.encode("utf-8") if isinstance(content, str) else content)
 
 
 @app.get("/health")
@@ -63,11 +137,13 @@ async def deploy_site(req: DeployRequest, x_deploy_secret: str = Header(None)):
     if not validate_slug(req.slug):
         raise HTTPException(status_code=400, detail=f"Invalid slug: {req.slug}")
 
+    compressed = decode_compressed(req.compressed)
+
     site_dir = SITES_DIR / req.slug
     site_dir.mkdir(parents=True, exist_ok=True)
 
-    # Scrivi index.html
-    (site_dir / "index.html").write_text(req.html, encoding="utf-8")
+    # Scrivi index.html (+ index.html.gz / index.html.br)
+    write_with_variants(site_dir / "index.html", req.html, compressed)
 
     # Imposta permessi corretti
     os.system(f"chown -R www-data:www-data {site_dir}")
@@ -83,6 +159,33 @@ async def deploy_site(req: DeployRequest, x_deploy_secret: str = Header(None)):
     }
 
 
+@app.post("/assets")
+async def store_assets(req: AssetsRequest, x_deploy_secret: str = Header(None)):
+    """Salva i bundle condivisi mancanti (i file esistenti non vengono riscritti)."""
+    verify_secret(x_deploy_secret)
+
+    for asset in req.assets:
+        if not ASSET_FILENAME_REGEX.match(asset.filename):
+            raise HTTPException(status_code=400, detail=f"Invalid asset filename: {asset.filename}")
+    contents = [decode_asset(asset) for asset in req.assets]
+    variants = [decode_compressed(asset.compressed) for asset in req.assets]
+
+    ASSETS_DIR.mkdir(parents=True, exist_ok=True)
+    stored, existing = [], []
+    for asset, content, compressed in zip(req.assets, contents, variants):
+        path = ASSETS_DIR / asset.filename
+        if path.exists():
+            existing.append(asset.filename)
+            continue
+        write_with_variants(path, content, compressed)
+        stored.append(asset.filename)
+
+    if stored:
+        os.system(f"chown -R www-data:www-data {ASSETS_DIR}")
+
+    return {"status": "stored", "stored": stored, "existing": existing}
+
+
 @app.delete("/deploy/{slug}")
 async def undeploy_site(slug: str, x_deploy_secret: str = Header(None)):
     """Rimuove un sito pubblicato."""
@@ -107,7 +210,7 @@ async def list_sites(x_deploy_secret: str = Header(None)):
     sites = []
     if SITES_DIR.exists():
         for d in sorted(SITES_DIR.iterdir()):
-            if d.is_dir():
+            if d.is_dir() and d != ASSETS_DIR:
                 index = d / "index.html"
                 sites.append({
                     "slug": d.name,